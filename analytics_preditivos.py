@@ -15,14 +15,9 @@ from flask import Blueprint, render_template, request, jsonify, flash, redirect,
 from flask_login import login_required, current_user
 from datetime import datetime, date, timedelta
 import logging
-import numpy as np
-import pandas as pd
-from sklearn.ensemble import RandomForestRegressor, IsolationForest
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_absolute_error, r2_score
-from sklearn.cluster import KMeans
+# numpy, pandas e scikit-learn são importados dentro de cada análise: no
+# topo do módulo eles pesavam no boot de todo worker (e sem o sklearn
+# instalado o blueprint inteiro deixava de registrar).
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -94,6 +89,11 @@ class EngineAnalyticsPreditivo:
             if len(dados_historicos) < 10:  # Mínimo de dados para ML
                 return {'erro': 'Dados insuficientes para previsão de manutenções'}
             
+            import pandas as pd
+            from sklearn.ensemble import RandomForestRegressor
+            from sklearn.metrics import mean_absolute_error, r2_score
+            from sklearn.model_selection import train_test_split
+            
             # Preparar features
             df = pd.DataFrame(dados_historicos)
             features = ['km_atual', 'dias_desde_ultima_manutencao', 'idade_veiculo', 
@@ -162,6 +162,11 @@ class EngineAnalyticsPreditivo:
             if len(dados_desempenho) < 5:
                 return {'erro': 'Dados insuficientes para análise'}
             
+            import pandas as pd
+            from sklearn.cluster import KMeans
+            from sklearn.ensemble import IsolationForest
+            from sklearn.preprocessing import StandardScaler
+            
             df = pd.DataFrame(dados_desempenho)
             
             # Features para análise de problemas
@@ -247,6 +252,9 @@ class EngineAnalyticsPreditivo:
             if len(dados_custos) < 6:  # Mínimo 6 meses
                 return {'erro': 'Dados históricos insuficientes'}
             
+            import numpy as np
+            from sklearn.linear_model import LinearRegression
+            
             # Previsão por categoria de custo
             previsoes_por_categoria = {}
             
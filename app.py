@@ -1,8 +1,8 @@
 import os
+import sys
 import logging
 from flask import Flask, url_for
 from flask_login import LoginManager
-from flask_migrate import Migrate
 from flask_wtf.csrf import CSRFProtect
 from flask_cors import CORS
 from flask_limiter import Limiter
@@ -158,10 +158,12 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 app.config["MAX_CONTENT_LENGTH"] = 64 * 1024 * 1024
 
-# A confirmação do fluxo de caixa pode enviar o ano inteiro de uma vez: cada linha
-# do preview gera ~9 campos de formulário (data/obra/valor/categoria/banco/...).
-# O default do Werkzeug é 1000 partes, o que estoura num import anual e fazia o
-# RequestEntityTooLarge cair no redirect-para-referrer → 405. Elevamos o teto.
+# Há formulários com um campo por linha — o mapa de concorrência
+# (`val_{item}_{forn}`), as horas por tarefa e funcionário do RDO novo
+# (`cron_tarefa_*_func_*_horas`) — que passam do default de 1000 partes do
+# Werkzeug numa obra grande; acima dele o request cai em
+# RequestEntityTooLarge. A confirmação do fluxo de caixa já não depende
+# disto (manda só as edições), mas o teto vale para o app todo.
 app.request_class.max_form_parts = 100_000
 
 # Recarrega templates do disco a cada request (mesmo sob gunicorn, sem debug).
@@ -238,8 +240,15 @@ limiter = Limiter(
 from models import db  # Import the db instance from models
 db.init_app(app)
 
-migrate = Migrate()
-migrate.init_app(app, db)
+# Flask-Migrate só sob o CLI `flask` (`flask db ...`): o schema do SIGE é
+# mantido por migrations.py, e o import do alembic custava ~0,4 s no boot de
+# todo worker e de todo processo de teste.
+migrate = None
+_argv0 = os.path.abspath(sys.argv[0]) if sys.argv and sys.argv[0] else ''
+if 'flask' in (os.path.basename(_argv0), os.path.basename(os.path.dirname(_argv0))):
+    from flask_migrate import Migrate
+    migrate = Migrate()
+    migrate.init_app(app, db)
 
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -316,6 +325,14 @@ def split_lines(texto):
     return _f(texto)
 
 
+# Fotos de RDO por URL (nunca data URI): `?v=` leva a chave do blob, e a
+# resposta com a versão certa é cacheada como imutável.
+@app.template_global()
+def versao_foto(foto, tipo):
+    from services.rdo_foto_service import versao_foto as _f
+    return _f(foto, tipo)
+
+
 # Context processor: disponibilidade de blueprints opcionais nos templates
 @app.context_processor
 def inject_blueprint_flags():
@@ -580,16 +597,21 @@ with app.app_context():
     # que o app para aceitar conexão, e sem ele o worker do gunicorn morria
     # no boot por uma indisponibilidade de 2 segundos.
     #
-    # Esgotado o retry, o boot ABORTA em produção — mesma política do bloco
-    # de migrações mais abaixo neste arquivo (Fase 0.5 / 1.1), e pelo mesmo
-    # motivo: servir tráfego contra um schema não verificado troca uma
+    # Esgotado o retry, o boot ABORTA em produção — a política de falha de
+    # migração da Fase 0.5 / 1.1 (ver abaixo), e pelo mesmo motivo: servir tráfego contra um schema não verificado troca uma
     # falha alta e óbvia no boot por falhas espalhadas e difíceis de
     # diagnosticar em cada requisição. Fora de produção, segue com aviso.
+    #
+    # `garantir_schema()` (services/migracoes_boot) é o create_all + as
+    # migrações: com o banco em dia custa UMA query e não importa o
+    # migrations.py; com algo pendente, um worker migra sob advisory lock e
+    # os outros esperam e conferem de novo.
     import time as _time
     _erro_create_all = None
     for _attempt in (range(5) if _BOOT_DDL else ()):
         try:
-            db.create_all()
+            from services.migracoes_boot import garantir_schema
+            garantir_schema()
             logging.info("Database tables created/verified")
             _erro_create_all = None
             break
@@ -597,13 +619,13 @@ with app.app_context():
             _erro_create_all = _db_err
             if _attempt < 4:
                 logging.warning(
-                    f"[DB] create_all falhou (tentativa {_attempt + 1}/5): "
+                    f"[DB] schema falhou (tentativa {_attempt + 1}/5): "
                     f"{_db_err} — aguardando 3s")
                 _time.sleep(3)
 
     if _erro_create_all is not None:
         logging.critical(
-            f"[FATAL] create_all falhou após 5 tentativas: {_erro_create_all}",
+            f"[FATAL] schema falhou após 5 tentativas: {_erro_create_all}",
             exc_info=True)
         if IS_PRODUCTION:
             raise RuntimeError(
@@ -712,31 +734,11 @@ with app.app_context():
     if _BOOT_DDL:
         _maybe_run_demo_seed()
 
-    # [OK] MIGRAÇÕES AUTOMÁTICAS — ativas por padrão, desligáveis por
-    # SIGE_BOOT_DDL (ver o comentário no topo deste bloco).
-    if _BOOT_DDL:
-        logger.info("[SYNC] Executando migrações automáticas do banco de dados...")
-        try:
-            from migrations import executar_migracoes
-            executar_migracoes()
-            logger.info("[OK] Migrações executadas com sucesso!")
-        except Exception as e:
-            # Fase 0.5 / 1.1 — FALHA DE MIGRAÇÃO ABORTA O BOOT.
-            # Antes: `logger.warning("Aplicação continuará mesmo com erro nas
-            # migrações")` — o app passava a servir tráfego contra um schema
-            # meio-migrado, e isso rodava em TODO boot de worker do gunicorn.
-            # Combinado com a ausência de backup (o entrypoint só imprimia que
-            # fazia um), uma migração destrutiva mal formulada corrompia dados
-            # e o app subia dizendo estar saudável.
-            logger.critical(f"[FATAL] Migração falhou: {e}", exc_info=True)
-            if IS_PRODUCTION:
-                raise RuntimeError(
-                    f"Migração de banco falhou — boot abortado para não servir "
-                    f"tráfego contra schema inconsistente. Erro: {e}"
-                ) from e
-            logger.warning("[DEV] Fora de produção: seguindo apesar da falha de "
-                           "migração (em produção isso abortaria o boot)")
-    
+    # [OK] MIGRAÇÕES AUTOMÁTICAS — rodam dentro de `garantir_schema()`, no
+    # retry acima, com a mesma política de produção. Fase 0.5 / 1.1: falha
+    # de schema ABORTA o boot — antes o app servia tráfego contra um schema
+    # meio-migrado, e isso rodava em TODO boot de worker do gunicorn.
+
     # [CONFIG] AUTO-FIX UNIVERSAL - Correção automática de admin_id em TODAS as tabelas
     # Executa SEMPRE no startup para garantir que TODAS as tabelas tenham admin_id
     try:
@@ -955,6 +957,46 @@ with app.app_context():
     except Exception as e:
         logging.error(f"[ERROR] Falha instalando auto-link listener Task#62: {e}", exc_info=True)
 
+    # Dashboard — commit que grava custo/cadastro do tenant derruba o cache
+    # de métricas dele (services/dashboard_metricas)
+    try:
+        from services.dashboard_metricas import instalar_invalidacao
+        instalar_invalidacao()
+    except Exception as e:
+        logging.error(f"[ERROR] Falha instalando invalidação do dashboard: {e}", exc_info=True)
+
+    # Contabilidade — cada flush com partida atualiza o saldo mensal por
+    # conta (BalanceteMensal) na mesma transação (services/saldos_mensais)
+    try:
+        from services.saldos_mensais import instalar_manutencao
+        instalar_manutencao()
+    except Exception as e:
+        logging.error(f"[ERROR] Falha instalando manutenção dos saldos mensais: {e}", exc_info=True)
+
+    # Cronograma — desfazer anota só as linhas que a ação toca
+    # (services/cronograma_undo)
+    try:
+        from services.cronograma_undo import instalar_rastreio
+        instalar_rastreio()
+    except Exception as e:
+        logging.error(f"[ERROR] Falha instalando rastreio do desfazer do cronograma: {e}", exc_info=True)
+
+    # Métricas — o commit que mexe num RDO reconsolida os fatos de produção
+    # dele (services/fatos_producao)
+    try:
+        from services.fatos_producao import instalar_manutencao as instalar_fatos_producao
+        instalar_fatos_producao()
+    except Exception as e:
+        logging.error(f"[ERROR] Falha instalando manutenção dos fatos de produção: {e}", exc_info=True)
+
+    # Fotos de RDO — o commit que grava foto pendente acorda a fila que gera
+    # a otimizada e o thumbnail fora do request (services/rdo_foto_versoes)
+    try:
+        from services.rdo_foto_versoes import instalar_fila
+        instalar_fila(app)
+    except Exception as e:
+        logging.error(f"[ERROR] Falha instalando a fila de versões das fotos: {e}", exc_info=True)
+
     # Registrar blueprint SUBEMPREITEIROS (Task 57)
     try:
         from subempreiteiros_views import subempreiteiros_bp
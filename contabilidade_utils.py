@@ -10,7 +10,7 @@ import logging
 logger = logging.getLogger(__name__)
 from models import (
     db, PlanoContas, CentroCustoContabil, LancamentoContabil, PartidaContabil, 
-    BalanceteMensal, AuditoriaContabil, Proposta, 
+    AuditoriaContabil, Proposta, 
     NotaFiscal, FolhaPagamento
 )
 
@@ -247,7 +247,18 @@ def contabilizar_folha_pagamento(admin_id, mes_referencia):
 # --- Funções de Geração de Relatórios ---
 
 def calcular_saldo_conta(conta_codigo, admin_id, data_inicio=None, data_fim=None):
-    """Calcula o saldo de uma conta em um período."""
+    """Calcula o saldo de uma conta em um período.
+
+    Sem `data_inicio` (saldo acumulado até `data_fim`), o saldo até o fim do
+    mês anterior vem do fechamento mensal (`services.saldos_mensais`) e só
+    as partidas do mês de `data_fim` são somadas."""
+    abertura = Decimal('0.0')
+    if data_inicio is None:
+        from services.saldos_mensais import inicio_do_mes, saldos_de_abertura
+        data_inicio = inicio_do_mes(data_fim or date.today())
+        abertura = saldos_de_abertura(admin_id, data_inicio, [conta_codigo]).get(
+            conta_codigo, abertura)
+    
     query = db.session.query(func.sum(
         case((PartidaContabil.tipo_partida == 'DEBITO', PartidaContabil.valor), else_=-PartidaContabil.valor)
     )).join(LancamentoContabil).filter(
@@ -261,7 +272,7 @@ def calcular_saldo_conta(conta_codigo, admin_id, data_inicio=None, data_fim=None
         query = query.filter(LancamentoContabil.data_lancamento >= data_inicio)
     
     saldo = query.scalar() or Decimal('0.0')
-    return saldo
+    return abertura + saldo
 
 def gerar_razao_conta(admin_id, conta_codigo, data_inicio, data_fim):
     """
@@ -350,57 +361,14 @@ def gerar_razao_conta(admin_id, conta_codigo, data_inicio, data_fim):
     }
 
 def gerar_balancete_mensal(admin_id, mes_referencia):
-    """Gera o balancete mensal para todas as contas."""
-    # Obter todas as contas que aceitam lançamento
-    contas = PlanoContas.query.filter_by(admin_id=admin_id, aceita_lancamento=True).all()
-    
-    primeiro_dia = mes_referencia.replace(day=1)
-    ultimo_dia = date(mes_referencia.year, mes_referencia.month, 
-                     calendar.monthrange(mes_referencia.year, mes_referencia.month)[1])
-    
-    for conta in contas:
-        # Verificar se já existe balancete para esta conta/mês
-        balancete_existente = BalanceteMensal.query.filter_by(
-            conta_codigo=conta.codigo,
-            mes_referencia=primeiro_dia,
-            admin_id=admin_id
-        ).first()
-        
-        if balancete_existente:
-            continue
-            
-        # Calcular saldos
-        saldo_anterior = calcular_saldo_conta(conta.codigo, admin_id, None, primeiro_dia - timedelta(days=1))
-        saldo_atual = calcular_saldo_conta(conta.codigo, admin_id, None, ultimo_dia)
-        
-        # Calcular movimentação do mês
-        debitos_mes = db.session.query(func.sum(PartidaContabil.valor)).join(LancamentoContabil).filter(
-            PartidaContabil.conta_codigo == conta.codigo,
-            PartidaContabil.admin_id == admin_id,
-            PartidaContabil.tipo_partida == 'DEBITO',
-            LancamentoContabil.data_lancamento >= primeiro_dia,
-            LancamentoContabil.data_lancamento <= ultimo_dia
-        ).scalar() or Decimal('0.0')
-        
-        creditos_mes = db.session.query(func.sum(PartidaContabil.valor)).join(LancamentoContabil).filter(
-            PartidaContabil.conta_codigo == conta.codigo,
-            PartidaContabil.admin_id == admin_id,
-            PartidaContabil.tipo_partida == 'CREDITO',
-            LancamentoContabil.data_lancamento >= primeiro_dia,
-            LancamentoContabil.data_lancamento <= ultimo_dia
-        ).scalar() or Decimal('0.0')
-        
-        balancete = BalanceteMensal(
-            conta_codigo=conta.codigo,
-            mes_referencia=primeiro_dia,
-            saldo_anterior=saldo_anterior,
-            debitos_mes=debitos_mes,
-            creditos_mes=creditos_mes,
-            saldo_atual=saldo_atual,
-            admin_id=admin_id
-        )
-        db.session.add(balancete)
-    
+    """Fecha o balancete mensal para todas as contas.
+
+    As linhas das contas com movimento no mês já existem: cada lançamento as
+    mantém (`services.saldos_mensais`). Aqui entram as contas analíticas sem
+    movimento, com o saldo carregado do mês anterior."""
+    from services.saldos_mensais import fechar_mes
+
+    fechar_mes(admin_id, mes_referencia)
     db.session.commit()
 
 def gerar_balanco_patrimonial(admin_id, data_referencia):
@@ -414,14 +382,18 @@ def gerar_balanco_patrimonial(admin_id, data_referencia):
     Returns:
         dict: Estrutura completa do balanço patrimonial com ATIVO, PASSIVO e PL
     """
+    from services.razao_contabil import razao_do_periodo
+
     contas = PlanoContas.query.filter_by(admin_id=admin_id).all()
+    # Saldo (débito − crédito) de todas as contas até a data, numa consulta
+    razao = razao_do_periodo(admin_id, None, data_referencia)
     
     ativo = {'circulante': {}, 'nao_circulante': {}, 'total': Decimal('0')}
     passivo = {'circulante': {}, 'nao_circulante': {}, 'total': Decimal('0')}
     patrimonio_liquido = {}
     
     for conta in contas:
-        saldo = calcular_saldo_conta(conta.codigo, admin_id, data_inicio=None, data_fim=data_referencia)
+        saldo = razao[conta.codigo].saldo_final
         
         if saldo == 0:
             continue
@@ -579,8 +551,8 @@ def calcular_dre_mensal(admin_id: int, ano: int, mes: int):
     Returns:
         dict: Dicionário com todos os valores do DRE
     """
-    from sqlalchemy import and_
     from decimal import Decimal
+    from services.razao_contabil import razao_do_periodo
     
     try:
         # Definir período do mês
@@ -590,6 +562,11 @@ def calcular_dre_mensal(admin_id: int, ano: int, mes: int):
         else:
             data_fim = date(ano, mes + 1, 1) - timedelta(days=1)
         
+        # Movimento do mês de todas as contas numa consulta; cada linha do
+        # DRE soma por prefixo em memória (antes: uma varredura de partidas
+        # por prefixo — dezessete por DRE).
+        razao = razao_do_periodo(admin_id, data_inicio, data_fim, com_saldo_anterior=False)
+        
         # Função auxiliar para calcular saldo de contas específicas
         def calcular_valor_contas(prefixos: list, tipo_esperado: str = None):
             """
@@ -602,31 +579,16 @@ def calcular_dre_mensal(admin_id: int, ano: int, mes: int):
             total = Decimal('0')
             
             for prefixo in prefixos:
-                partidas = PartidaContabil.query.join(
-                    LancamentoContabil,
-                    PartidaContabil.lancamento_id == LancamentoContabil.id
-                ).filter(
-                    and_(
-                        PartidaContabil.admin_id == admin_id,
-                        PartidaContabil.conta_codigo.like(f'{prefixo}%'),
-                        LancamentoContabil.data_lancamento >= data_inicio,
-                        LancamentoContabil.data_lancamento <= data_fim
-                    )
-                ).all()
+                movimento = razao.soma_prefixo(prefixo)
                 
-                for partida in partidas:
-                    valor = Decimal(str(partida.valor))
-                    
-                    # Se tipo esperado for especificado, só conta se for o tipo correto
-                    if tipo_esperado:
-                        if partida.tipo_partida == tipo_esperado:
-                            total += valor
-                    else:
-                        # Senão, credita positivo e debita negativo
-                        if partida.tipo_partida == 'CREDITO':
-                            total += valor
-                        else:
-                            total -= valor
+                # Se tipo esperado for especificado, só conta se for o tipo correto
+                if tipo_esperado == 'CREDITO':
+                    total += movimento.creditos
+                elif tipo_esperado == 'DEBITO':
+                    total += movimento.debitos
+                else:
+                    # Senão, credita positivo e debita negativo
+                    total += movimento.creditos - movimento.debitos
             
             return total
         
@@ -788,7 +750,13 @@ def calcular_dre_mensal(admin_id: int, ano: int, mes: int):
 
 def obter_dados_balancete(admin_id, mes, ano):
     """
-    Obtém dados do balancete formatados para exportação
+    Obtém dados do balancete — a tela, o PDF e o Excel usam estas linhas.
+    
+    Saldos e movimento de todas as contas saem de um único GROUP BY
+    (`services.razao_contabil`); antes eram três consultas por conta, que
+    traziam as partidas para somar em Python. Conta sintética mostra o
+    consolidado das filhas; os totais somam só o movimento próprio de cada
+    conta, para nada ser contado duas vezes.
     
     Args:
         admin_id: ID do administrador
@@ -798,14 +766,16 @@ def obter_dados_balancete(admin_id, mes, ano):
     Returns:
         dict: Dicionário com contas e totais
     """
+    from services.razao_contabil import razao_do_periodo
     
     # Definir período
     primeiro_dia = date(ano, mes, 1)
     ultimo_dia = date(ano, mes, calendar.monthrange(ano, mes)[1])
-    fim_mes_anterior = primeiro_dia - timedelta(days=1)
     
     # Buscar TODAS as contas do plano de contas
     todas_contas = PlanoContas.query.filter_by(admin_id=admin_id).order_by(PlanoContas.codigo).all()
+    razao = razao_do_periodo(admin_id, primeiro_dia, ultimo_dia)
+    consolidado = razao.consolidado(todas_contas)
     
     contas_data = []
     total_debitos = Decimal('0')
@@ -814,51 +784,15 @@ def obter_dados_balancete(admin_id, mes, ano):
     total_saldo_credor = Decimal('0')
     
     for conta in todas_contas:
-        # Calcular saldo anterior
-        partidas_anteriores = db.session.query(PartidaContabil).join(LancamentoContabil).filter(
-            PartidaContabil.conta_codigo == conta.codigo,
-            PartidaContabil.admin_id == admin_id,
-            LancamentoContabil.data_lancamento <= fim_mes_anterior
-        ).all()
-        
-        debito_anterior = sum(p.valor for p in partidas_anteriores if p.tipo_partida == 'DEBITO')
-        credito_anterior = sum(p.valor for p in partidas_anteriores if p.tipo_partida == 'CREDITO')
-        
-        if conta.natureza == 'DEVEDORA':
-            saldo_anterior = debito_anterior - credito_anterior
-        else:
-            saldo_anterior = credito_anterior - debito_anterior
-        
-        # Calcular movimentação do mês
-        partidas_mes = db.session.query(PartidaContabil).join(LancamentoContabil).filter(
-            PartidaContabil.conta_codigo == conta.codigo,
-            PartidaContabil.admin_id == admin_id,
-            LancamentoContabil.data_lancamento >= primeiro_dia,
-            LancamentoContabil.data_lancamento <= ultimo_dia
-        ).all()
-        
-        debitos_mes = sum(p.valor for p in partidas_mes if p.tipo_partida == 'DEBITO')
-        creditos_mes = sum(p.valor for p in partidas_mes if p.tipo_partida == 'CREDITO')
-        
-        # Calcular saldo atual
-        partidas_ate_hoje = db.session.query(PartidaContabil).join(LancamentoContabil).filter(
-            PartidaContabil.conta_codigo == conta.codigo,
-            PartidaContabil.admin_id == admin_id,
-            LancamentoContabil.data_lancamento <= ultimo_dia
-        ).all()
-        
-        debito_total = sum(p.valor for p in partidas_ate_hoje if p.tipo_partida == 'DEBITO')
-        credito_total = sum(p.valor for p in partidas_ate_hoje if p.tipo_partida == 'CREDITO')
-        
-        if conta.natureza == 'DEVEDORA':
-            saldo_atual = debito_total - credito_total
-        else:
-            saldo_atual = credito_total - debito_total
+        movimento = consolidado[conta.codigo]
+        # Saldos no sentido da natureza da conta (credora inverte o sinal)
+        saldo_anterior = movimento.saldo_anterior_natural(conta.natureza)
+        saldo_atual = movimento.saldo_final_natural(conta.natureza)
         
-        # Só incluir contas com movimento
+        # Só incluir contas com movimento (saldo anterior != 0 OU movimentos no período > 0)
         tem_movimento = (abs(saldo_anterior) > Decimal('0.01') or 
-                        abs(debitos_mes) > Decimal('0.01') or 
-                        abs(creditos_mes) > Decimal('0.01'))
+                        abs(movimento.debitos) > Decimal('0.01') or 
+                        abs(movimento.creditos) > Decimal('0.01'))
         
         if tem_movimento:
             contas_data.append({
@@ -866,19 +800,25 @@ def obter_dados_balancete(admin_id, mes, ano):
                 'nome': conta.nome,
                 'nivel': conta.nivel,
                 'natureza': conta.natureza,
-                'debitos': debitos_mes,
-                'creditos': creditos_mes,
+                'tipo_conta': conta.tipo_conta,
+                'saldo_anterior': saldo_anterior,
+                'debitos': movimento.debitos,
+                'creditos': movimento.creditos,
+                'saldo_atual': saldo_atual,
                 'saldo_devedor': saldo_atual if saldo_atual > 0 else Decimal('0'),
-                'saldo_credor': abs(saldo_atual) if saldo_atual < 0 else Decimal('0')
+                'saldo_credor': abs(saldo_atual) if saldo_atual < 0 else Decimal('0'),
+                'aceita_lancamento': conta.aceita_lancamento
             })
-            
-            total_debitos += debitos_mes
-            total_creditos += creditos_mes
-            
-            if saldo_atual > 0:
-                total_saldo_devedor += saldo_atual
-            else:
-                total_saldo_credor += abs(saldo_atual)
+        
+        # Totais: só o movimento próprio da conta
+        proprio = razao[conta.codigo]
+        total_debitos += proprio.debitos
+        total_creditos += proprio.creditos
+        saldo_proprio = proprio.saldo_final_natural(conta.natureza)
+        if saldo_proprio > 0:
+            total_saldo_devedor += saldo_proprio
+        else:
+            total_saldo_credor += abs(saldo_proprio)
     
     return {
         'contas': contas_data,
@@ -886,7 +826,9 @@ def obter_dados_balancete(admin_id, mes, ano):
             'total_debitos': total_debitos,
             'total_creditos': total_creditos,
             'total_saldo_devedor': total_saldo_devedor,
-            'total_saldo_credor': total_saldo_credor
+            'total_saldo_credor': total_saldo_credor,
+            # Verificar equilíbrio contábil
+            'balanceado': abs(total_debitos - total_creditos) < Decimal('0.01')
         }
     }
 
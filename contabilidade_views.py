@@ -8,16 +8,17 @@ from models import (SpedContabil, DREMensal, BalancoPatrimonial, LancamentoConta
                     AuditoriaContabil, TipoUsuario, PartidaContabil, CentroCustoContabil, 
                     Obra)  # ✅ OTIMIZAÇÃO: Movido Obra do inline (linhas 1078, 1170)
 from flask_login import current_user
-from datetime import datetime, date, timedelta
+from datetime import datetime, date
 from dateutil.relativedelta import relativedelta
 from decimal import Decimal
 from sqlalchemy.orm import joinedload  # ✅ OTIMIZAÇÃO: Eager loading para evitar N+1
-import calendar
 # Imports de contabilidade_utils consolidados (antes espalhados em várias linhas)
 from contabilidade_utils import (
-    calcular_saldo_conta, criar_plano_contas_padrao, gerar_razao_conta, calcular_dre_mensal, gerar_balancete_pdf, gerar_balancete_excel,
-    gerar_dre_pdf, gerar_dre_excel, gerar_balanco_patrimonial, executar_auditoria_automatica
+    criar_plano_contas_padrao, gerar_razao_conta, calcular_dre_mensal, gerar_balancete_pdf, gerar_balancete_excel,
+    gerar_dre_pdf, gerar_dre_excel, gerar_balanco_patrimonial, executar_auditoria_automatica,
+    obter_dados_balancete
 )
+from services.razao_contabil import razao_do_periodo
 
 contabilidade_bp = Blueprint('contabilidade', __name__)
 
@@ -66,10 +67,11 @@ def dashboard_contabil():
     # Estatísticas rápidas
     total_lancamentos = LancamentoContabil.query.filter_by(admin_id=admin_id).count()
     
-    # Saldos principais
-    saldo_caixa = calcular_saldo_conta('1.1.01.001', admin_id)
-    saldo_bancos = calcular_saldo_conta('1.1.01.002', admin_id)
-    saldo_clientes = calcular_saldo_conta('1.1.02.001', admin_id)
+    # Saldos principais (uma consulta para as três contas)
+    razao = razao_do_periodo(admin_id)
+    saldo_caixa = razao['1.1.01.001'].saldo_final
+    saldo_bancos = razao['1.1.01.002'].saldo_final
+    saldo_clientes = razao['1.1.02.001'].saldo_final
     
     return render_template('contabilidade/dashboard.html',
                          dre_atual=dre_atual,
@@ -402,8 +404,10 @@ def editar_lancamento(id):
             lancamento.historico = historico
             lancamento.valor_total = total_debito
             
-            # Remover partidas antigas
-            PartidaContabil.query.filter_by(lancamento_id=lancamento.id).delete()
+            # Remover partidas antigas — pela sessão, não em lote: o flush
+            # desconta cada uma do saldo mensal (services/saldos_mensais)
+            for partida in list(lancamento.partidas):
+                db.session.delete(partida)
             
             # Criar novas partidas
             for i, p in enumerate(partidas_data):
@@ -535,103 +539,11 @@ def balancete():
         })
     comp_selecionada = f"{ano}-{mes:02d}"
     
-    # Definir período
-    primeiro_dia = date(ano, mes, 1)
-    ultimo_dia = date(ano, mes, calendar.monthrange(ano, mes)[1])
-    fim_mes_anterior = primeiro_dia - timedelta(days=1)
-    
-    # Buscar TODAS as contas do plano de contas
-    todas_contas = PlanoContas.query.filter_by(admin_id=admin_id).order_by(PlanoContas.codigo).all()
-    
-    contas_data = []
-    total_debitos = Decimal('0')
-    total_creditos = Decimal('0')
-    total_saldo_devedor = Decimal('0')
-    total_saldo_credor = Decimal('0')
-    
-    for conta in todas_contas:
-        # Calcular saldo anterior (até último dia do mês anterior)
-        partidas_anteriores = db.session.query(PartidaContabil).join(LancamentoContabil).filter(
-            PartidaContabil.conta_codigo == conta.codigo,
-            PartidaContabil.admin_id == admin_id,
-            LancamentoContabil.data_lancamento <= fim_mes_anterior
-        ).all()
-        
-        debito_anterior = sum(p.valor for p in partidas_anteriores if p.tipo_partida == 'DEBITO')
-        credito_anterior = sum(p.valor for p in partidas_anteriores if p.tipo_partida == 'CREDITO')
-        
-        # Saldo anterior depende da natureza da conta
-        if conta.natureza == 'DEVEDORA':
-            saldo_anterior = debito_anterior - credito_anterior
-        else:  # CREDORA
-            saldo_anterior = credito_anterior - debito_anterior
-        
-        # Calcular movimentação do mês
-        partidas_mes = db.session.query(PartidaContabil).join(LancamentoContabil).filter(
-            PartidaContabil.conta_codigo == conta.codigo,
-            PartidaContabil.admin_id == admin_id,
-            LancamentoContabil.data_lancamento >= primeiro_dia,
-            LancamentoContabil.data_lancamento <= ultimo_dia
-        ).all()
-        
-        debitos_mes = sum(p.valor for p in partidas_mes if p.tipo_partida == 'DEBITO')
-        creditos_mes = sum(p.valor for p in partidas_mes if p.tipo_partida == 'CREDITO')
-        
-        # Calcular saldo atual
-        partidas_ate_hoje = db.session.query(PartidaContabil).join(LancamentoContabil).filter(
-            PartidaContabil.conta_codigo == conta.codigo,
-            PartidaContabil.admin_id == admin_id,
-            LancamentoContabil.data_lancamento <= ultimo_dia
-        ).all()
-        
-        debito_total = sum(p.valor for p in partidas_ate_hoje if p.tipo_partida == 'DEBITO')
-        credito_total = sum(p.valor for p in partidas_ate_hoje if p.tipo_partida == 'CREDITO')
-        
-        if conta.natureza == 'DEVEDORA':
-            saldo_atual = debito_total - credito_total
-        else:  # CREDORA
-            saldo_atual = credito_total - debito_total
-        
-        # Só mostrar contas com movimento (saldo anterior != 0 OU movimentos no período > 0)
-        tem_movimento = (abs(saldo_anterior) > Decimal('0.01') or 
-                        abs(debitos_mes) > Decimal('0.01') or 
-                        abs(creditos_mes) > Decimal('0.01'))
-        
-        if tem_movimento:
-            contas_data.append({
-                'codigo': conta.codigo,
-                'nome': conta.nome,
-                'nivel': conta.nivel,
-                'natureza': conta.natureza,
-                'tipo_conta': conta.tipo_conta,
-                'saldo_anterior': saldo_anterior,
-                'debitos': debitos_mes,
-                'creditos': creditos_mes,
-                'saldo_atual': saldo_atual,
-                'aceita_lancamento': conta.aceita_lancamento
-            })
-            
-            # Acumular totais do período
-            total_debitos += debitos_mes
-            total_creditos += creditos_mes
-            
-            # Acumular saldos finais
-            if saldo_atual > 0:
-                total_saldo_devedor += saldo_atual
-            else:
-                total_saldo_credor += abs(saldo_atual)
-    
-    # Verificar equilíbrio contábil
-    balanceado = abs(total_debitos - total_creditos) < Decimal('0.01')
-    
-    # Preparar dados para template
-    totais = {
-        'total_debitos': total_debitos,
-        'total_creditos': total_creditos,
-        'total_saldo_devedor': total_saldo_devedor,
-        'total_saldo_credor': total_saldo_credor,
-        'balanceado': balanceado
-    }
+    # Mesmas linhas do PDF/Excel: saldos de todas as contas numa consulta,
+    # sintéticas consolidadas, totais sobre o movimento próprio
+    dados = obter_dados_balancete(admin_id, mes, ano)
+    contas_data = dados['contas']
+    totais = dados['totais']
     
     return render_template('contabilidade/balancete.html',
                          mes=mes,
@@ -43,6 +43,7 @@ from models import (
     CrmTipoMaterial, CrmTipoObra, CrmMotivoPerda,
     Cliente, ClienteObservacao, TipoUsuario, Usuario,
 )
+from services.periodo import no_mes
 
 logger = logging.getLogger(__name__)
 
@@ -440,10 +441,7 @@ def _aplicar_filtros(q, filtros):
         try:
             ano, mes = filtros['mes_chegada'].split('-')
             ano = int(ano); mes = int(mes)
-            q = q.filter(
-                db.extract('year', Lead.data_chegada) == ano,
-                db.extract('month', Lead.data_chegada) == mes,
-            )
+            q = q.filter(*no_mes(Lead.data_chegada, ano, mes))
         except (ValueError, TypeError):
             pass
     if filtros['status'] and filtros['status'] in STATUS_VALIDOS:
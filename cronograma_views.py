@@ -25,9 +25,9 @@ from services.cronograma_undo import (
     MSG_NADA_REFAZER,
     desfazer as undo_desfazer,
     estado_pilha,
+    iniciar_rastreio,
     refazer as undo_refazer,
     registrar_acao,
-    snapshot_obra,
 )
 from services.cronograma_predecessor_parser import (
     ErroParsePredecessora,
@@ -172,9 +172,10 @@ def _replanejar_pos_commit(obra_id: int, admin_id: int, cliente_mode: bool) -> N
 def _com_undo(tipo_acao: str):
     """Fase 3 — empilha a ação da rota na pilha de desfazer/refazer.
 
-    Envolve a view por FORA (fica logo abaixo de `@login_required`): tira um
-    snapshot da obra antes, deixa a rota rodar, e compara depois. Nenhuma
-    rota precisa saber que existe histórico.
+    Envolve a view por FORA (fica logo abaixo de `@login_required`): liga o
+    rastreio das linhas que a rota tocar, deixa a rota rodar, e compara só
+    essas linhas depois — o custo acompanha o tamanho da edição, não o do
+    cronograma. Nenhuma rota precisa saber que existe histórico.
 
     Duas propriedades vêm de graça do diff:
 
@@ -193,18 +194,15 @@ def _com_undo(tipo_acao: str):
                 return view(obra_id, *args, **kwargs)
             admin_id = _admin_id()
             cliente_mode = _modo_cliente()
+            rastreio = iniciar_rastreio(obra_id, admin_id, cliente_mode)
             try:
-                antes = snapshot_obra(obra_id, admin_id, cliente_mode)
-            except Exception:
-                logger.exception('[undo] falha no snapshot inicial de %s — '
-                                 'ação seguirá sem histórico', obra_id)
-                return view(obra_id, *args, **kwargs)
-
-            resposta = view(obra_id, *args, **kwargs)
+                resposta = view(obra_id, *args, **kwargs)
+            finally:
+                rastreio.encerrar()
 
             try:
                 registrar_acao(obra_id, admin_id, current_user.id, cliente_mode,
-                               tipo_acao, antes)
+                               tipo_acao, rastreio)
             except Exception:
                 db.session.rollback()
                 logger.exception('[undo] falha ao empilhar ação %r da obra %s '
@@ -961,6 +959,10 @@ def atualizar_tarefa(obra_id: int, tarefa_id: int):
 
     flag_on = _editor_v2_on()
     data = request.get_json(silent=True) or {}
+    # Para o recálculo incremental do editor v2: datas antes da edição e
+    # predecessoras que perderem o vínculo (folga muda sem data mudar).
+    datas_antes = (tarefa.data_inicio, tarefa.data_fim)
+    preds_removidas: set[int] = set()
 
     if 'nome_tarefa' in data:
         nome = str(data['nome_tarefa']).strip()
@@ -1135,6 +1137,9 @@ def atualizar_tarefa(obra_id: int, tarefa_id: int):
         except ErroParsePredecessora as exc:
             db.session.rollback()
             return jsonify({'status': 'error', 'msg': str(exc)}), 400
+        preds_removidas = {
+            v.predecessora_id for v in TarefaVinculo.query.filter_by(
+                sucessora_id=tarefa.id, obra_id=obra_id, admin_id=admin_id)}
         TarefaVinculo.query.filter_by(
             sucessora_id=tarefa.id, obra_id=obra_id, admin_id=admin_id
         ).delete(synchronize_session=False)
@@ -1201,11 +1206,18 @@ def atualizar_tarefa(obra_id: int, tarefa_id: int):
         # ErroCiclo desfaz TUDO (inclusive os vínculos recém-criados).
         precisa_recalc = bool(
             (_SCHEDULING_FIELDS | {'predecessoras_texto'}) & set(data.keys()))
+        # Edição de UMA tarefa: recálculo incremental a partir dela. Mudança
+        # de hierarquia altera o conjunto de folhas — aí, completo.
+        alteradas = None
+        if 'tarefa_pai_id' not in data:
+            alteradas = {tarefa.id} | preds_removidas
         resultado = None
         try:
             if precisa_recalc:
                 resultado = recalcular_obra(obra_id, admin_id,
-                                            cliente=cliente_mode, commit=False)
+                                            cliente=cliente_mode, commit=False,
+                                            alteradas=alteradas,
+                                            anteriores={tarefa.id: datas_antes})
             db.session.commit()
         except ErroCiclo as exc:
             db.session.rollback()
@@ -790,6 +790,8 @@ def upload_foto_rdo(rdo_id):
                     imagem_otimizada_base64=resultado.get('imagem_otimizada_base64'),
                     thumbnail_base64=resultado.get('thumbnail_base64'),
                     armazenamento=resultado.get('armazenamento', 'disco'),
+                    # Versões saem da fila depois do commit (rdo_foto_versoes)
+                    processamento=resultado.get('processamento', 'pronta'),
                 )
                 
                 db.session.add(nova_foto)
@@ -801,7 +803,8 @@ def upload_foto_rdo(rdo_id):
                     'descricao': nova_foto.descricao or '',
                     'tamanho_bytes': nova_foto.tamanho_bytes,
                     'url_thumbnail': url_for('rdo_crud.servir_foto', foto_id=nova_foto.id, tipo='thumbnail'),
-                    'url_otimizado': url_for('rdo_crud.servir_foto', foto_id=nova_foto.id, tipo='otimizado')
+                    'url_otimizado': url_for('rdo_crud.servir_foto', foto_id=nova_foto.id, tipo='otimizado'),
+                    'processando': nova_foto.processamento == 'pendente',
                 })
                 
             except ValueError as ve:
@@ -845,23 +848,11 @@ def _resolver_arquivo_foto(caminho):
     também quando a variável muda entre deploys.
     """
     # Fase 5 — a resolução principal (UPLOADS_PATH ou static/) mora em
-    # caminho_absoluto, que também recusa travessia de diretório. O
-    # fallback legado (foto gravada em static/ ANTES de o volume existir)
-    # continua aqui, com a mesma guarda de raiz.
-    from services.rdo_foto_service import caminho_absoluto
-    candidatos = []
-    principal = caminho_absoluto(caminho)
-    if principal:
-        candidatos.append(principal)
-    raiz_legado = os.path.normpath(os.path.join(os.getcwd(), 'static', 'uploads'))
-    legado = os.path.normpath(
-        os.path.join(os.getcwd(), 'static', str(caminho).lstrip('/')))
-    if legado.startswith(raiz_legado + os.sep):
-        candidatos.append(legado)
-    for candidato in candidatos:
-        if os.path.exists(candidato):
-            return candidato
-    return None
+    # caminho_absoluto, que também recusa travessia de diretório; o
+    # fallback legado (foto gravada em static/ ANTES de o volume existir) e
+    # as referências do store de blobs ficam em resolver_arquivo.
+    from services.rdo_foto_service import resolver_arquivo
+    return resolver_arquivo(caminho)
 
 
 @rdo_crud_bp.route('/foto/<int:foto_id>/<tipo>', methods=['GET'])
@@ -873,7 +864,6 @@ def servir_foto(foto_id, tipo):
     Tipos: 'thumbnail', 'otimizado', 'original'
     """
     try:
-        from flask import send_file
         from models import RDOFoto
         
         # 1. Validação multi-tenant
@@ -883,28 +873,15 @@ def servir_foto(foto_id, tipo):
         if not foto:
             return "Foto não encontrada", 404
         
-        # 2. Selecionar arquivo baseado no tipo
-        if tipo == 'thumbnail':
-            caminho = foto.thumbnail
-        elif tipo == 'otimizado':
-            caminho = foto.arquivo_otimizado
-        elif tipo == 'original':
-            caminho = foto.arquivo_original
-        else:
+        # 2. Arquivo do tipo (blob, legado em disco ou base64 do banco),
+        # com ETag, GET condicional e Range
+        from services.rdo_foto_service import TIPOS_FOTO, responder_foto
+        if tipo not in TIPOS_FOTO:
             return "Tipo inválido", 400
-        
-        if not caminho:
-            return "Arquivo não disponível", 404
-        
-        # 3. Resolver caminho físico (UPLOADS_PATH ou legado em static/)
-        caminho_completo = _resolver_arquivo_foto(caminho)
 
-        if not caminho_completo:
+        response = responder_foto(foto, tipo, versao=request.args.get('v'))
+        if response is None:
             return "Arquivo não encontrado no servidor", 404
-        
-        # 4. Servir arquivo com cache
-        response = send_file(caminho_completo, mimetype='image/webp')
-        response.headers['Cache-Control'] = 'public, max-age=604800'  # 7 dias
         return response
         
     except Exception as e:
@@ -920,6 +897,7 @@ def listar_fotos_rdo(rdo_id):
     """
     try:
         from models import RDOFoto
+        from services.rdo_foto_service import versao_foto
         
         admin_id = get_admin_id()
         rdo = RDO.query.filter_by(id=rdo_id, admin_id=admin_id).first()
@@ -937,9 +915,13 @@ def listar_fotos_rdo(rdo_id):
                 'nome_original': f.nome_original,
                 'tamanho_bytes': f.tamanho_bytes,
                 'ordem': f.ordem,
-                'url_thumbnail': url_for('rdo_crud.servir_foto', foto_id=f.id, tipo='thumbnail'),
-                'url_otimizado': url_for('rdo_crud.servir_foto', foto_id=f.id, tipo='otimizado'),
-                'url_original': url_for('rdo_crud.servir_foto', foto_id=f.id, tipo='original')
+                'url_thumbnail': url_for('rdo_crud.servir_foto', foto_id=f.id, tipo='thumbnail',
+                                         v=versao_foto(f, 'thumbnail')),
+                'url_otimizado': url_for('rdo_crud.servir_foto', foto_id=f.id, tipo='otimizado',
+                                         v=versao_foto(f, 'otimizado')),
+                'url_original': url_for('rdo_crud.servir_foto', foto_id=f.id, tipo='original',
+                                        v=versao_foto(f, 'original')),
+                'processando': f.processamento == 'pendente',
             } for f in fotos]
         })
         
@@ -991,9 +973,12 @@ def deletar_foto(foto_id):
         if not foto:
             return jsonify({'error': 'Foto não encontrada'}), 404
         
-        # Deletar arquivos físicos
+        # Deletar arquivos físicos. Blob do store fica: com deduplicação,
+        # outra foto pode apontar para o mesmo conteúdo — o órfão sai pela
+        # coleta de scripts/migrar_fotos_rdo_para_disco.py --coletar-blobs.
+        from services.blob_store import chave_da_referencia
         for caminho_rel in [foto.arquivo_original, foto.arquivo_otimizado, foto.thumbnail]:
-            if caminho_rel:
+            if caminho_rel and not chave_da_referencia(caminho_rel):
                 # Fase 5 — resolve por UPLOADS_PATH (e legado em static/);
                 # o join fixo em static/ deixava o arquivo órfão no volume.
                 caminho_completo = _resolver_arquivo_foto(caminho_rel)
@@ -17,15 +17,10 @@ from datetime import datetime
 from sqlalchemy import func
 import logging
 from io import BytesIO
-import pandas as pd
-import matplotlib
-matplotlib.use('Agg')  # Backend não-GUI
-import matplotlib.pyplot as plt
-import seaborn as sns
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+# pandas, matplotlib/seaborn e reportlab são importados no primeiro uso
+# (`_pyplot` e dentro de cada gerador): no topo do módulo eles pesavam no
+# boot de todo worker, e sem o matplotlib instalado o blueprint inteiro
+# deixava de registrar.
 import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
@@ -54,22 +49,43 @@ def get_admin_id():
             return current_user.admin_id
     return current_user.id
 
+_plt = None
+
+
+def _pyplot():
+    """matplotlib.pyplot com backend não-GUI e o estilo dos relatórios,
+    carregado na primeira vez que um gráfico é gerado."""
+    global _plt
+    if _plt is None:
+        import matplotlib
+        matplotlib.use('Agg')  # Backend não-GUI
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
+        # Configurações de estilo para gráficos
+        plt.style.use('seaborn-v0_8')
+        sns.set_palette("husl")
+        _plt = plt
+    return _plt
+
+
 class GeradorRelatorios:
     """Classe principal para geração de relatórios"""
     
     def __init__(self, admin_id):
         self.admin_id = admin_id
         
-        # Configurações de estilo para gráficos
-        plt.style.use('seaborn-v0_8')
-        sns.set_palette("husl")
-        
         # Cores padrão
         self.cores_primarias = ['#3498db', '#e74c3c', '#2ecc71', '#f39c12', '#9b59b6', '#1abc9c']
     
     def gerar_relatorio_completo_pdf(self, data_inicio, data_fim, incluir_graficos=True):
         """Gera relatório completo em PDF"""
         try:
+            from reportlab.lib import colors
+            from reportlab.lib.pagesizes import A4
+            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+            from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
+            
             buffer = BytesIO()
             doc = SimpleDocTemplate(buffer, pagesize=A4)
             styles = getSampleStyleSheet()
@@ -236,6 +252,8 @@ class GeradorRelatorios:
     def gerar_relatorio_excel_completo(self, data_inicio, data_fim):
         """Gera relatório completo em Excel com múltiplas planilhas"""
         try:
+            import pandas as pd
+            
             buffer = BytesIO()
             
             with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
@@ -298,6 +316,8 @@ class GeradorRelatorios:
             categorias = list(custos_data.keys())
             valores = [custos_data[cat]['valor'] for cat in categorias]
             
+            plt = _pyplot()
+            
             # Criar gráfico
             fig, ax = plt.subplots(figsize=(8, 6))
             wedges, texts, autotexts = ax.pie(valores, labels=categorias, autopct='%1.1f%%', 
@@ -330,6 +350,8 @@ class GeradorRelatorios:
             custos = [d['custo_total'] for d in evolucao_data]
             km = [d['km_total'] for d in evolucao_data]
             
+            plt = _pyplot()
+            
             # Criar gráfico com dois eixos Y
             fig, ax1 = plt.subplots(figsize=(10, 6))
             
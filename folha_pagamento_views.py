@@ -13,7 +13,7 @@ from io import BytesIO
 import logging
 logger = logging.getLogger(__name__)
 from sqlalchemy.orm import joinedload  # [OK] OTIMIZAÇÃO: Eager loading para evitar N+1
-from services.folha_service import processar_folha_funcionario  # [OK] OTIMIZAÇÃO: Movido do inline (linha 143)
+from services.folha_lote import calcular_folhas
 from event_manager import EventManager  # [OK] OTIMIZAÇÃO: Movido do inline (linha 144)
 
 folha_bp = Blueprint('folha', __name__)
@@ -167,9 +167,12 @@ def processar_folha_mes(ano, mes):
         erros = 0
         total_proventos_mes = 0.0
 
+        # Folha de todos de uma vez: pontos, horários, configurações e
+        # parâmetros carregados uma vez para o mês (services/folha_lote)
+        folhas = calcular_folhas(current_user.id, ano, mes, funcionarios)
+
         for funcionario in funcionarios:
-            # Calcular folha do funcionário
-            dados_folha = processar_folha_funcionario(funcionario, ano, mes)
+            dados_folha = folhas.get(funcionario.id)
             
             if dados_folha:
                 # Criar registro de folha de pagamento
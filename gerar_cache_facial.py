@@ -8,19 +8,29 @@ entre geração de cache e comparação em tempo real.
 """
 
 import os
+import json
+import fcntl
 import pickle
 import base64
 import tempfile
 import logging
+import threading
 import numpy as np
 from datetime import datetime
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-CACHE_FILE = 'cache_facial.pkl'
+CACHE_FILE = 'cache_facial.store'
 CACHE_DIR = os.path.dirname(os.path.abspath(__file__))
 CACHE_PATH = os.path.join(CACHE_DIR, CACHE_FILE)
+# Cache no formato antigo (pickle): migrado para o store na primeira abertura.
+PICKLE_PATH = os.path.join(CACHE_DIR, 'cache_facial.pkl')
+# Geração em lote: resultados por foto (retomada) e status do job em background.
+CHECKPOINT_PATH = os.path.join(CACHE_DIR, 'cache_facial.checkpoint.jsonl')
+JOB_STATUS_PATH = os.path.join(CACHE_DIR, 'cache_facial.job.json')
+
+PIPELINE_VERSION = '4.0-face-detection'
 
 
 def normalizar_embedding_l2(embedding):
@@ -43,215 +53,364 @@ def normalizar_embedding_l2(embedding):
     
     return (embedding_array / norm).tolist()
 
-def gerar_cache(admin_id=None, incluir_inativas=False):
+def _planejar(admin_id_int, incluir_inativas):
+    """
+    Funcionários ativos e as fotos de cada um, SEM o base64 (que só é lido
+    em lotes, na hora de processar). Duas consultas no total.
+
+    Returns:
+        list[dict]: [{'id', 'nome', 'codigo', 'admin_id', 'fotos':
+        [(chave, descricao)]}], na ordem do cache. A chave identifica a foto
+        no checkpoint: 'foto:<id>' ou 'principal:<funcionario_id>'.
+    """
+    from sqlalchemy import and_
+    from models import db, Funcionario, FotoFacialFuncionario
+
+    query = db.session.query(
+        Funcionario.id, Funcionario.nome, Funcionario.codigo, Funcionario.admin_id,
+        and_(Funcionario.foto_base64.isnot(None), Funcionario.foto_base64 != '').label('tem_foto'),
+    ).filter(Funcionario.ativo == True)
+    if admin_id_int is not None:
+        query = query.filter(Funcionario.admin_id == admin_id_int)
+    funcionarios = query.order_by(Funcionario.id).all()
+
+    fotos_query = db.session.query(
+        FotoFacialFuncionario.id, FotoFacialFuncionario.funcionario_id,
+        FotoFacialFuncionario.descricao, FotoFacialFuncionario.ordem,
+    ).join(Funcionario, and_(
+        Funcionario.id == FotoFacialFuncionario.funcionario_id,
+        Funcionario.admin_id == FotoFacialFuncionario.admin_id,
+    )).filter(Funcionario.ativo == True)
+    if admin_id_int is not None:
+        fotos_query = fotos_query.filter(Funcionario.admin_id == admin_id_int)
+    if not incluir_inativas:
+        fotos_query = fotos_query.filter(FotoFacialFuncionario.ativa == True)
+    fotos_por_func = {}
+    for foto in fotos_query.order_by(FotoFacialFuncionario.funcionario_id,
+                                     FotoFacialFuncionario.ordem, FotoFacialFuncionario.id):
+        fotos_por_func.setdefault(foto.funcionario_id, []).append(
+            (f'foto:{foto.id}', foto.descricao or f'Foto {foto.ordem}'))
+
+    plano = []
+    for func in funcionarios:
+        fotos = fotos_por_func.get(func.id)
+        if not fotos and func.tem_foto:
+            fotos = [(f'principal:{func.id}', 'Foto principal')]
+        if not fotos:
+            logger.warning(f"[WARN] {func.nome}: nenhuma foto disponível")
+            continue
+        plano.append({'id': func.id, 'nome': func.nome, 'codigo': func.codigo,
+                      'admin_id': int(func.admin_id) if func.admin_id is not None else None,
+                      'fotos': fotos})
+    return plano, len(funcionarios)
+
+
+def _fotos_pendentes(plano, feitas, tamanho_bloco):
+    """(chave, foto_base64) das fotos ainda sem resultado, na ordem do
+    plano; o base64 vem do banco em blocos de `tamanho_bloco` ids."""
+    from models import db, Funcionario, FotoFacialFuncionario
+
+    pendentes = [chave for f in plano for chave, _ in f['fotos'] if chave not in feitas]
+    for i in range(0, len(pendentes), tamanho_bloco):
+        bloco = pendentes[i:i + tamanho_bloco]
+        ids_foto = [int(c.split(':')[1]) for c in bloco if c.startswith('foto:')]
+        ids_func = [int(c.split(':')[1]) for c in bloco if c.startswith('principal:')]
+        base64_por_chave = {}
+        if ids_foto:
+            base64_por_chave.update(
+                (f'foto:{id_}', b64) for id_, b64 in db.session.query(
+                    FotoFacialFuncionario.id, FotoFacialFuncionario.foto_base64
+                ).filter(FotoFacialFuncionario.id.in_(ids_foto)))
+        if ids_func:
+            base64_por_chave.update(
+                (f'principal:{id_}', b64) for id_, b64 in db.session.query(
+                    Funcionario.id, Funcionario.foto_base64
+                ).filter(Funcionario.id.in_(ids_func)))
+        for chave in bloco:
+            if chave in base64_por_chave:
+                yield chave, base64_por_chave[chave]
+
+
+def _ler_checkpoint(parametros):
+    """Resultados já gravados por uma geração interrompida com os MESMOS
+    parâmetros: {chave: (embedding | None, erro | None)}."""
+    if not os.path.exists(CHECKPOINT_PATH):
+        return {}
+    feitas = {}
+    try:
+        with open(CHECKPOINT_PATH, encoding='utf-8') as f:
+            if json.loads(f.readline() or '{}').get('parametros') != parametros:
+                return {}
+            for linha in f:
+                try:
+                    chave, embedding, erro = json.loads(linha)
+                except ValueError:
+                    break  # última linha truncada pela interrupção
+                feitas[chave] = (embedding, erro)
+    except (OSError, ValueError) as e:
+        logger.warning(f"[WARN] Checkpoint ilegível, recomeçando: {e}")
+        return {}
+    return feitas
+
+
+def gerar_cache(admin_id=None, incluir_inativas=False, progresso=None, workers=None):
     """
     Gera cache de embeddings faciais para todos os funcionários.
     Usa múltiplas fotos da tabela FotoFacialFuncionario quando disponíveis.
-    
-    IMPORTANTE: Usa gerar_embedding_otimizado() para garantir que cache e
-    comparação usem EXATAMENTE o mesmo método de geração de embeddings.
-    
+
+    As fotos são processadas EM LOTE num pool de processos
+    (services/embeddings_lote), com o mesmo pré-processamento do
+    reconhecimento. Cada lote concluído vai para um checkpoint: uma geração
+    interrompida (deploy, worker reciclado) retoma de onde parou quando é
+    chamada de novo com os mesmos parâmetros.
+
     Args:
-        admin_id: Se fornecido, gera cache apenas para esse tenant.
-                  Se None, gera para TODOS os tenants (usado em scripts).
+        admin_id: Se fornecido, regenera apenas esse tenant (os demais ficam
+                  como estão no store). Se None, gera para TODOS os tenants.
         incluir_inativas: Se True, processa também fotos marcadas como inativas.
-    
+        progresso: callable(dict) chamado a cada lote com total, feitas,
+                   retomadas e erros (fotos).
+        workers: processos do pool (None = núcleos disponíveis, 0 = no
+                 próprio processo).
+
     Returns:
         dict: Estatísticas da geração do cache
     """
     from app import app
-    from models import Funcionario, FotoFacialFuncionario
-    from ponto_views import gerar_embedding_otimizado, preload_deepface_model
-    
-    # Pré-carregar modelo para acelerar geração
-    logger.info("[SYNC] Pré-carregando modelo SFace...")
-    preload_deepface_model()
-    logger.info("[OK] Modelo SFace carregado!")
-    
-    # Converter admin_id para int se necessário
+    from services import embeddings_lote
+
     admin_id_int = int(admin_id) if admin_id is not None else None
-    logger.info(f"[TARGET] admin_id recebido: {admin_id} (tipo: {type(admin_id).__name__})")
-    logger.info(f"[TARGET] admin_id_int: {admin_id_int}")
-    
+    parametros = {'admin_id': admin_id_int, 'incluir_inativas': bool(incluir_inativas),
+                  'pipeline_version': PIPELINE_VERSION}
+
     with app.app_context():
-        query = Funcionario.query.filter(Funcionario.ativo == True)
-        
-        if admin_id_int is not None:
-            query = query.filter(Funcionario.admin_id == admin_id_int)
-            logger.info(f"[DEBUG] Filtrando funcionários para admin_id={admin_id_int}")
-        else:
-            logger.info("[DEBUG] Gerando cache para TODOS os tenants")
-        
-        funcionarios = query.all()
-        
-        logger.info(f"[DEBUG] Encontrados {len(funcionarios)} funcionários ativos")
-        
-        cache = {}
-        erros = []
-        processados = 0
-        total_embeddings = 0
-        
-        for func in funcionarios:
-            try:
-                fotos_para_processar = []
-                
-                # Buscar fotos múltiplas
-                query_fotos = FotoFacialFuncionario.query.filter_by(
-                    funcionario_id=func.id,
-                    admin_id=func.admin_id
-                )
-                
-                # Filtrar por ativas apenas se não incluir inativas
-                if not incluir_inativas:
-                    query_fotos = query_fotos.filter_by(ativa=True)
-                
-                fotos_multiplas = query_fotos.order_by(FotoFacialFuncionario.ordem).all()
-                
-                if fotos_multiplas:
-                    for foto in fotos_multiplas:
-                        fotos_para_processar.append({
-                            'foto_base64': foto.foto_base64,
-                            'descricao': foto.descricao or f'Foto {foto.ordem}'
-                        })
-                    # Log detalhado
-                    fotos_ativas_count = sum(1 for f in fotos_multiplas if f.ativa)
-                    fotos_inativas_count = len(fotos_multiplas) - fotos_ativas_count
-                    logger.info(f"[PHOTO] {func.nome}: {fotos_ativas_count} ativas, {fotos_inativas_count} inativas")
-                elif func.foto_base64:
-                    fotos_para_processar.append({
-                        'foto_base64': func.foto_base64,
-                        'descricao': 'Foto principal'
-                    })
-                    logger.info(f"[PHOTO] {func.nome}: usando foto principal")
-                else:
-                    logger.warning(f"[WARN] {func.nome}: nenhuma foto disponível")
-                    continue
-                
-                embeddings_funcionario = []
-                
-                for foto_info in fotos_para_processar:
-                    try:
-                        foto_base64 = foto_info['foto_base64']
-                        if foto_base64.startswith('data:'):
-                            foto_base64 = foto_base64.split(',')[1]
-                        
-                        foto_bytes = base64.b64decode(foto_base64)
-                        
-                        with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as tmp:
-                            tmp.write(foto_bytes)
-                            tmp_path = tmp.name
-                        
-                        try:
-                            # IMPORTANTE: Usar MESMA função que a comparação usa!
-                            # Isso garante que cache e comparação sejam compatíveis.
-                            embedding = gerar_embedding_otimizado(tmp_path)
-                            
-                            if embedding is not None:
-                                # Normalizar embedding para consistência
-                                embedding_normalizado = normalizar_embedding_l2(embedding)
-                                
-                                # Log para debug
-                                norm_original = np.linalg.norm(np.array(embedding))
-                                norm_final = np.linalg.norm(np.array(embedding_normalizado))
-                                logger.debug(f" [STATS] Norm original: {norm_original:.4f}, Norm L2: {norm_final:.4f}")
-                                
-                                embeddings_funcionario.append({
-                                    'embedding': embedding_normalizado,
-                                    'descricao': foto_info['descricao']
-                                })
-                                total_embeddings += 1
-                                logger.debug(f" [OK] {foto_info['descricao']} - embedding calculado ({len(embedding_normalizado)} dims)")
-                            else:
-                                logger.warning(f" [WARN] {foto_info['descricao']} - nenhum rosto detectado")
-                                
-                        finally:
-                            if os.path.exists(tmp_path):
-                                os.remove(tmp_path)
-                                
-                    except Exception as e:
-                        logger.warning(f" [ERROR] {foto_info['descricao']} - erro: {e}")
-                
-                if embeddings_funcionario:
-                    # Garantir que admin_id seja salvo como inteiro
-                    admin_id_salvar = int(func.admin_id) if func.admin_id is not None else None
-                    
-                    cache[func.id] = {
-                        'embeddings': embeddings_funcionario,
-                        'admin_id': admin_id_salvar,  # SEMPRE int para consistência
-                        'nome': func.nome,
-                        'codigo': func.codigo,
-                        'total_fotos': len(embeddings_funcionario),
-                        'updated_at': datetime.now().isoformat()
-                    }
-                    processados += 1
-                    logger.info(f"[OK] [{processados}] {func.nome} (admin_id={admin_id_salvar}) - {len(embeddings_funcionario)} embedding(s)")
-                else:
-                    erros.append({'id': func.id, 'nome': func.nome, 'erro': 'Nenhum embedding gerado'})
-                    logger.warning(f"[WARN] {func.nome} - nenhum embedding gerado")
-                        
-            except Exception as e:
-                erros.append({'id': func.id, 'nome': func.nome, 'erro': str(e)})
-                logger.error(f"[ERROR] {func.nome} - erro: {e}")
-        
-        cache_data = {
-            'embeddings': cache,
-            'generated_at': datetime.now().isoformat(),
-            'model': 'SFace',
-            'method': 'model.forward()',  # Método usado para consistência
-            'normalized': True,  # Embeddings normalizados com L2
-            'total_funcionarios': len(funcionarios),
-            'total_processados': processados,
-            'total_embeddings': total_embeddings,
-            'pipeline_version': '4.0-face-detection',
-            'versao': '4.0'
+        plano, total_funcionarios = _planejar(admin_id_int, incluir_inativas)
+        total_fotos = sum(len(f['fotos']) for f in plano)
+        resultados = _ler_checkpoint(parametros)
+        chaves = {c for f in plano for c, _ in f['fotos']}
+        resultados = {c: r for c, r in resultados.items() if c in chaves}
+        retomadas = len(resultados)
+        logger.info(f"[DEBUG] {len(plano)} funcionários, {total_fotos} fotos "
+                    f"({retomadas} retomadas do checkpoint) admin_id={admin_id_int}")
+
+        estado = {'total': total_fotos, 'feitas': retomadas, 'retomadas': retomadas,
+                  'erros': sum(1 for e, _ in resultados.values() if e is None)}
+        if progresso:
+            progresso(dict(estado))
+
+        novo = not retomadas
+        with open(CHECKPOINT_PATH, 'w' if novo else 'a', encoding='utf-8') as ckpt:
+            if novo:
+                ckpt.write(json.dumps({'parametros': parametros}) + '\n')
+
+            def ao_concluir(lote):
+                for chave, embedding, erro in lote:
+                    resultados[chave] = (embedding, erro)
+                    ckpt.write(json.dumps([chave, embedding, erro]) + '\n')
+                    if embedding is None:
+                        estado['erros'] += 1
+                        logger.warning(f" [WARN] {chave} - {erro or 'nenhum embedding'}")
+                ckpt.flush()
+                estado['feitas'] += len(lote)
+                if progresso:
+                    progresso(dict(estado))
+
+            embeddings_lote.gerar_em_lote(
+                _fotos_pendentes(plano, resultados, embeddings_lote.TAMANHO_LOTE),
+                ao_concluir, workers=workers)
+
+    cache, erros, total_embeddings = {}, [], 0
+    for func in plano:
+        embeddings_funcionario = [
+            {'embedding': resultados[chave][0], 'descricao': descricao}
+            for chave, descricao in func['fotos']
+            if chave in resultados and resultados[chave][0] is not None]
+        if not embeddings_funcionario:
+            erros.append({'id': func['id'], 'nome': func['nome'], 'erro': 'Nenhum embedding gerado'})
+            continue
+        cache[func['id']] = {
+            'embeddings': embeddings_funcionario,
+            'admin_id': func['admin_id'],  # SEMPRE int para consistência
+            'nome': func['nome'],
+            'codigo': func['codigo'],
+            'total_fotos': len(embeddings_funcionario),
+            'updated_at': datetime.now().isoformat()
         }
-        
-        logger.info(f"[SAVE] Salvando cache em: {CACHE_PATH}")
-        logger.info(f"[STATS] Embeddings a salvar: {len(cache)} funcionários")
-        
+        total_embeddings += len(embeddings_funcionario)
+
+    cache_data = {
+        'embeddings': cache,
+        **_metadados_vazios(),
+        'total_funcionarios': total_funcionarios,
+        'total_processados': len(cache),
+        'total_embeddings': total_embeddings,
+    }
+
+    logger.info(f"[SAVE] Salvando cache em: {CACHE_PATH} ({len(cache)} funcionários)")
+    try:
+        salvar_cache(cache_data, substituir={admin_id_int} if admin_id_int is not None else None)
+        os.remove(CHECKPOINT_PATH)
+        logger.info(f"[OK] Cache salvo com sucesso! Tamanho: {os.path.getsize(CACHE_PATH)} bytes")
+    except Exception as save_error:
+        logger.error(f"[ERROR] ERRO ao salvar cache: {save_error}")
+        return {'success': False, 'error': f'Erro ao salvar: {save_error}'}
+
+    return {
+        'success': True,
+        'processados': len(cache),
+        'total': total_funcionarios,
+        'total_embeddings': total_embeddings,
+        'retomadas': retomadas,
+        'erros': erros,
+        'cache_path': CACHE_PATH
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Geração em background (job) — um por vez no servidor, status em arquivo
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _gravar_status(status):
+    fd, tmp_path = tempfile.mkstemp(prefix='.cache_facial_job.', dir=CACHE_DIR)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(status, f, ensure_ascii=False, default=str)
+    os.replace(tmp_path, JOB_STATUS_PATH)
+
+
+def _trava_job():
+    """fd com flock exclusivo do job, ou None se outro processo o segura."""
+    fd = open(JOB_STATUS_PATH + '.lock', 'a+')
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return fd
+    except BlockingIOError:
+        fd.close()
+        return None
+
+
+def status_job_cache():
+    """
+    Status da última geração em background (o arquivo é lido por qualquer
+    worker do gunicorn, não só pelo que roda o job).
+
+    Returns:
+        dict: {'estado': 'nenhum' | 'executando' | 'concluido' | 'erro' |
+        'interrompido', ...}. 'interrompido' = o processo do job morreu; a
+        próxima geração com os mesmos parâmetros retoma do checkpoint.
+    """
+    try:
+        with open(JOB_STATUS_PATH, encoding='utf-8') as f:
+            status = json.load(f)
+    except (OSError, ValueError):
+        return {'estado': 'nenhum'}
+    if status.get('estado') == 'executando':
+        fd = _trava_job()
+        if fd is not None:
+            fd.close()
+            status['estado'] = 'interrompido'
+    return status
+
+
+def iniciar_job_cache(admin_id=None, incluir_inativas=False):
+    """
+    Dispara `gerar_cache` numa thread daemon deste worker. Um job por vez no
+    servidor inteiro (flock): se já há um rodando, não inicia outro.
+
+    Returns:
+        tuple[bool, dict]: (iniciado, status atual)
+    """
+    fd = _trava_job()
+    if fd is None:
+        return False, status_job_cache()
+
+    status = {
+        'estado': 'executando',
+        'admin_id': int(admin_id) if admin_id is not None else None,
+        'incluir_inativas': bool(incluir_inativas),
+        'iniciado_em': datetime.now().isoformat(),
+        'atualizado_em': datetime.now().isoformat(),
+        'total': None, 'feitas': 0, 'retomadas': 0, 'erros': 0,
+    }
+    _gravar_status(status)
+
+    def _progresso(parcial):
+        status.update(parcial, atualizado_em=datetime.now().isoformat())
+        _gravar_status(status)
+
+    def _runner():
         try:
-            with open(CACHE_PATH, 'wb') as f:
-                pickle.dump(cache_data, f)
-                f.flush()
-                os.fsync(f.fileno())
-            
-            if os.path.exists(CACHE_PATH):
-                size = os.path.getsize(CACHE_PATH)
-                logger.info(f"[OK] Cache salvo com sucesso! Tamanho: {size} bytes")
-            else:
-                logger.error(f"[ERROR] ERRO: Arquivo não foi criado após pickle.dump!")
-        except Exception as save_error:
-            logger.error(f"[ERROR] ERRO ao salvar cache: {save_error}")
-            return {'success': False, 'error': f'Erro ao salvar: {save_error}'}
-        
-            logger.info(f"[STATS] Processados: {processados}/{len(funcionarios)}")
-        
-        return {
-            'success': True,
-            'processados': processados,
-            'total': len(funcionarios),
-            'total_embeddings': total_embeddings,
-            'erros': erros,
-            'cache_path': CACHE_PATH
-        }
+            resultado = gerar_cache(admin_id, incluir_inativas=incluir_inativas,
+                                    progresso=_progresso)
+            status['resultado'] = {k: v for k, v in resultado.items() if k != 'erros'}
+            status['funcionarios_sem_embedding'] = resultado.get('erros', [])
+            status['estado'] = 'concluido' if resultado.get('success') else 'erro'
+        except Exception as e:
+            logger.exception("[ERROR] Geração do cache facial falhou")
+            status['estado'] = 'erro'
+            status['erro'] = str(e)
+        finally:
+            status['atualizado_em'] = datetime.now().isoformat()
+            _gravar_status(status)
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            fd.close()
+
+    threading.Thread(target=_runner, name='cache-facial', daemon=True).start()
+    return True, status
+
+
+def abrir_store():
+    """
+    Abre o store mapeado (services/store_facial) do cache. Sem store mas
+    com o pickle antigo no disco, migra antes — uma vez, na primeira
+    abertura depois do deploy.
+
+    Returns:
+        StoreFacial | None: None se não houver cache nenhum
+    """
+    from services.store_facial import StoreFacial
+
+    if not os.path.exists(CACHE_PATH):
+        if not os.path.exists(PICKLE_PATH):
+            return None
+        migrar_pickle()
+    return StoreFacial(CACHE_PATH)
+
+
+def migrar_pickle(pickle_path=PICKLE_PATH):
+    """
+    Converte o cache pickle antigo no store. O pickle fica no disco (o
+    rollback do deploy ainda o lê); o store passa a ser a fonte.
+
+    Returns:
+        int: funcionários migrados
+    """
+    with open(pickle_path, 'rb') as f:
+        cache_data = pickle.load(f)
+    salvar_cache(cache_data)
+    total = len(cache_data.get('embeddings') or {})
+    logger.info(f"[OK] Cache pickle migrado para o store: {total} funcionários")
+    return total
 
 
 def carregar_cache():
     """
-    Carrega o cache de embeddings do arquivo.
-    
+    Carrega o cache de embeddings no formato de dict do pickle antigo
+    ({'embeddings': {func_id: entrada}, metadados...}).
+
+    Materializa listas Python de todos os embeddings: serve às telas de
+    status/diagnóstico. O reconhecimento usa o store mapeado direto.
+
     Returns:
         dict: Cache de embeddings ou None se não existir
     """
-    if not os.path.exists(CACHE_PATH):
-        logger.warning(f"[WARN] Cache não encontrado: {CACHE_PATH}")
-        return None
-    
     try:
-        with open(CACHE_PATH, 'rb') as f:
-            cache_data = pickle.load(f)
-        
-            logger.info(f"[OK] Cache carregado: {cache_data.get('total_processados', 0)} embeddings")
+        store = abrir_store()
+        if store is None:
+            logger.warning(f"[WARN] Cache não encontrado: {CACHE_PATH}")
+            return None
+        cache_data = dict(store.metadados)
+        cache_data['embeddings'] = store.entradas()
+        logger.info(f"[OK] Cache carregado: {len(cache_data['embeddings'])} funcionários")
         return cache_data
     except Exception as e:
         logger.error(f"[ERROR] Erro ao carregar cache: {e}")
@@ -332,158 +491,151 @@ def validar_cache():
     }
 
 
+def salvar_cache(cache_data, substituir=None):
+    """
+    Grava o cache como store compactado (services/store_facial). Com
+    `substituir` (admin_ids), só esses tenants são trocados. A gravação é
+    ATÔMICA (temporário + `os.replace`): um worker com o store antigo
+    mapeado segue lendo o arquivo antigo até sincronizar.
+    """
+    from services.store_facial import gravar
+
+    metadados = {k: v for k, v in cache_data.items() if k != 'embeddings'}
+    gravar(CACHE_PATH, cache_data.get('embeddings') or {}, metadados, substituir=substituir)
+
+
+def _metadados_vazios():
+    return {
+        'generated_at': datetime.now().isoformat(),
+        'model': 'SFace',
+        'method': 'model.forward()',
+        'normalized': True,
+        'pipeline_version': PIPELINE_VERSION,
+        'versao': '4.0'
+    }
+
+
+def _fotos_do_funcionario(func, incluir_inativas=False):
+    """Fotos a processar de um funcionário: as múltiplas (ordem), ou a foto
+    principal quando não há nenhuma. Lista de {'foto_base64', 'descricao'}."""
+    from models import FotoFacialFuncionario
+
+    query_fotos = FotoFacialFuncionario.query.filter_by(
+        funcionario_id=func.id,
+        admin_id=func.admin_id
+    )
+    if not incluir_inativas:
+        query_fotos = query_fotos.filter_by(ativa=True)
+    fotos_multiplas = query_fotos.order_by(FotoFacialFuncionario.ordem).all()
+
+    if fotos_multiplas:
+        return [{'foto_base64': foto.foto_base64,
+                 'descricao': foto.descricao or f'Foto {foto.ordem}'}
+                for foto in fotos_multiplas]
+    if func.foto_base64:
+        return [{'foto_base64': func.foto_base64, 'descricao': 'Foto principal'}]
+    return []
+
+
+def _embeddings_das_fotos(fotos, gerar_embedding_otimizado):
+    """Embeddings L2-normalizados das fotos; foto sem rosto ou com erro é
+    pulada (com log), como na geração completa."""
+    embeddings = []
+    for foto_info in fotos:
+        try:
+            foto_base64 = foto_info['foto_base64']
+            if foto_base64.startswith('data:'):
+                foto_base64 = foto_base64.split(',')[1]
+
+            foto_bytes = base64.b64decode(foto_base64)
+
+            with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as tmp:
+                tmp.write(foto_bytes)
+                tmp_path = tmp.name
+
+            try:
+                # IMPORTANTE: Usar MESMA função que a comparação usa!
+                embedding = gerar_embedding_otimizado(tmp_path)
+                if embedding is not None:
+                    embeddings.append({
+                        'embedding': normalizar_embedding_l2(embedding),
+                        'descricao': foto_info['descricao']
+                    })
+                else:
+                    logger.warning(f" [WARN] {foto_info['descricao']} - nenhum rosto detectado")
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+        except Exception as e:
+            logger.warning(f" [ERROR] {foto_info['descricao']} - erro: {e}")
+    return embeddings
+
+
 def atualizar_embedding_funcionario(funcionario_id):
     """
-    Atualiza os embeddings de um funcionário específico no cache.
-    Usa múltiplas fotos da tabela FotoFacialFuncionario quando disponíveis.
-    
+    Atualiza os embeddings de UM funcionário no cache: anexa um registro ao
+    store (ou um tombstone, se ele ficou sem embedding) — o resto do
+    arquivo não é reescrito. Usa múltiplas fotos (ativas) da tabela
+    FotoFacialFuncionario quando disponíveis, senão a foto principal.
+
     IMPORTANTE: Usa gerar_embedding_otimizado() para consistência.
-    
+
     Args:
         funcionario_id: ID do funcionário
-    
+
     Returns:
-        bool: True se atualizado com sucesso
+        dict | None: a entrada gravada, ou None quando o funcionário saiu do
+        cache (inexistente, sem foto ou sem nenhum embedding gerado).
     """
     from app import app
-    from models import Funcionario, FotoFacialFuncionario
+    from models import Funcionario
     from ponto_views import gerar_embedding_otimizado, preload_deepface_model
-    
+    from services.store_facial import anexar
+
     # Pré-carregar modelo
     preload_deepface_model()
-    
-    cache_data = carregar_cache()
-    if not cache_data:
-        cache_data = {
-            'embeddings': {},
-            'generated_at': datetime.now().isoformat(),
-            'model': 'SFace',
-            'method': 'model.forward()',
-            'normalized': True,
-            'total_funcionarios': 0,
-            'total_processados': 0,
-            'total_embeddings': 0,
-            'versao': '3.0'
-        }
-    
+
     with app.app_context():
         func = Funcionario.query.get(funcionario_id)
-        if not func:
-            if funcionario_id in cache_data['embeddings']:
-                del cache_data['embeddings'][funcionario_id]
-                with open(CACHE_PATH, 'wb') as f:
-                    pickle.dump(cache_data, f)
-            return True
-        
-        fotos_para_processar = []
-        
-        fotos_multiplas = FotoFacialFuncionario.query.filter_by(
-            funcionario_id=func.id,
-            admin_id=func.admin_id,
-            ativa=True
-        ).order_by(FotoFacialFuncionario.ordem).all()
-        
-        if fotos_multiplas:
-            for foto in fotos_multiplas:
-                fotos_para_processar.append({
-                    'foto_base64': foto.foto_base64,
-                    'descricao': foto.descricao or f'Foto {foto.ordem}'
-                })
-                logger.info(f"[PHOTO] {func.nome}: {len(fotos_multiplas)} fotos múltiplas encontradas")
-        elif func.foto_base64:
-            fotos_para_processar.append({
-                'foto_base64': func.foto_base64,
-                'descricao': 'Foto principal'
-            })
-            logger.info(f"[PHOTO] {func.nome}: usando foto principal")
-        else:
-            if funcionario_id in cache_data['embeddings']:
-                del cache_data['embeddings'][funcionario_id]
-                with open(CACHE_PATH, 'wb') as f:
-                    pickle.dump(cache_data, f)
-                    logger.warning(f"[WARN] {func.nome}: nenhuma foto disponível, removido do cache")
-            return True
-        
         embeddings_funcionario = []
-        
-        for foto_info in fotos_para_processar:
-            try:
-                foto_base64 = foto_info['foto_base64']
-                if foto_base64.startswith('data:'):
-                    foto_base64 = foto_base64.split(',')[1]
-                
-                foto_bytes = base64.b64decode(foto_base64)
-                
-                with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as tmp:
-                    tmp.write(foto_bytes)
-                    tmp_path = tmp.name
-                
-                try:
-                    # IMPORTANTE: Usar MESMA função que a comparação usa!
-                    embedding = gerar_embedding_otimizado(tmp_path)
-                    
-                    if embedding is not None:
-                        # Normalizar embedding para consistência
-                        embedding_normalizado = normalizar_embedding_l2(embedding)
-                        
-                        embeddings_funcionario.append({
-                            'embedding': embedding_normalizado,
-                            'descricao': foto_info['descricao']
-                        })
-                        logger.debug(f" [OK] {foto_info['descricao']} - embedding calculado ({len(embedding_normalizado)} dims)")
-                        
-                finally:
-                    if os.path.exists(tmp_path):
-                        os.remove(tmp_path)
-                        
-            except Exception as e:
-                logger.warning(f" [ERROR] {foto_info['descricao']} - erro: {e}")
-        
+        if func:
+            fotos = _fotos_do_funcionario(func)
+            logger.info(f"[PHOTO] {func.nome}: {len(fotos)} foto(s) a processar")
+            embeddings_funcionario = _embeddings_das_fotos(fotos, gerar_embedding_otimizado)
+
+        if abrir_store() is None:
+            salvar_cache({'embeddings': {}, **_metadados_vazios()})
+
+        entrada = None
         if embeddings_funcionario:
-            cache_data['embeddings'][func.id] = {
+            entrada = {
                 'embeddings': embeddings_funcionario,
-                'admin_id': func.admin_id,
+                'admin_id': int(func.admin_id) if func.admin_id is not None else None,
                 'nome': func.nome,
                 'codigo': func.codigo,
                 'total_fotos': len(embeddings_funcionario),
                 'updated_at': datetime.now().isoformat()
             }
-            
-            cache_data['total_processados'] = len(cache_data['embeddings'])
-            cache_data['method'] = 'model.forward()'
-            cache_data['normalized'] = True
-            cache_data['versao'] = '3.0'
-            
-            with open(CACHE_PATH, 'wb') as f:
-                pickle.dump(cache_data, f)
-            
-                logger.info(f"[OK] Embeddings atualizados: {func.nome} ({len(embeddings_funcionario)} fotos)")
-            return True
+            logger.info(f"[OK] Embeddings atualizados: {func.nome} ({len(embeddings_funcionario)} fotos)")
         else:
-            if funcionario_id in cache_data['embeddings']:
-                del cache_data['embeddings'][funcionario_id]
-                with open(CACHE_PATH, 'wb') as f:
-                    pickle.dump(cache_data, f)
-                    logger.warning(f"[WARN] {func.nome}: nenhum embedding gerado")
-            return False
+            logger.warning(f"[WARN] Funcionário {funcionario_id}: sem foto/embedding, removido do cache")
+        anexar(CACHE_PATH, funcionario_id, entrada)
+        return entrada
 
 
 def remover_funcionario_cache(funcionario_id):
     """
-    Remove um funcionário do cache.
+    Remove um funcionário do cache (tombstone anexado ao store).
     
     Args:
         funcionario_id: ID do funcionário
     """
-    cache_data = carregar_cache()
-    if cache_data and funcionario_id in cache_data['embeddings']:
-        del cache_data['embeddings'][funcionario_id]
-        cache_data['total_processados'] = len(cache_data['embeddings'])
-        
-        with open(CACHE_PATH, 'wb') as f:
-            pickle.dump(cache_data, f)
-        
-            logger.info(f"[DEL] Funcionário {funcionario_id} removido do cache")
+    from services.store_facial import anexar
+
+    if abrir_store() is not None:
+        anexar(CACHE_PATH, funcionario_id, None)
+        logger.info(f"[DEL] Funcionário {funcionario_id} removido do cache")
 
 
 if __name__ == '__main__':
@@ -166,9 +166,10 @@ MODULOS_VALIDOS = set(MODULO_CONFIG.keys())
 
 
 def _parse_xlsx(arquivo):
-    import openpyxl
-    wb = openpyxl.load_workbook(arquivo, data_only=True)
-    return wb.active
+    """Pasta em modo somente leitura (services/leitor_planilha) — quem chama
+    fecha com `.close()` depois de processar a aba ativa."""
+    from services import leitor_planilha
+    return leitor_planilha.abrir(arquivo)
 
 
 # ─── Rotas ────────────────────────────────────────────────────────────────────
@@ -217,7 +218,8 @@ def _handle_preview(modulo):
     admin_id = get_admin_id_robusta()
 
     try:
-        ws = _parse_xlsx(arquivo)
+        wb = _parse_xlsx(arquivo)
+        ws = wb.active
     except Exception as e:
         flash(f'Erro ao abrir planilha: {e}', 'danger')
         return redirect(url_for('importacao.index'))
@@ -240,6 +242,8 @@ def _handle_preview(modulo):
         logger.error(f'[IMPORTACAO][{modulo}] Erro no preview: {e}', exc_info=True)
         flash(f'Erro inesperado ao processar planilha: {e}', 'danger')
         return redirect(url_for('importacao.index'))
+    finally:
+        wb.close()
 
     cfg = MODULO_CONFIG[modulo]
     # Assina com admin_id + modulo para impedir adulteração e replay cross-context
@@ -465,15 +469,6 @@ def fluxo_caixa_upload():
         _db.session.rollback()
         logger.warning(f'[FLUXO_CAIXA] Falha ao persistir sugestões: {_exc_sug}')
 
-    # Assinar payload com HMAC (envelope contendo os 3 tipos + transferências)
-    payload = {
-        'entradas': entradas,
-        'saidas_auto': saidas_auto,
-        'saidas_manual': saidas_manual,
-        'transferencias': transferencias,
-    }
-    dados_assinados = _assinar_payload([payload], admin_id, 'fluxo_caixa')
-
     from models import BancoEmpresa, CategoriaFluxoCaixa, Obra
     bancos = BancoEmpresa.query.filter_by(admin_id=admin_id, ativo=True).order_by(BancoEmpresa.nome_banco).all()
     categorias_tenant = CategoriaFluxoCaixa.query.filter_by(admin_id=admin_id, ativo=True).order_by(
@@ -506,6 +501,16 @@ def fluxo_caixa_upload():
         if tc and not row.get('categoria_fluxo_caixa_id') and tc in _cat_ent_map:
             row['categoria_fluxo_caixa_id'] = _cat_ent_map[tc]
 
+    # O preview fica no servidor (depois da pré-seleção acima, que é o que a
+    # tela mostra); a página leva só o token, e as linhas, o `_sid`.
+    from services import preview_importacao
+    token = preview_importacao.guardar(admin_id, 'fluxo_caixa', {
+        'entradas': entradas,
+        'saidas_auto': saidas_auto,
+        'saidas_manual': saidas_manual,
+        'transferencias': transferencias,
+    })
+
     return render_template(
         'importacao/preview_fluxo.html',
         entradas=entradas,
@@ -516,7 +521,7 @@ def fluxo_caixa_upload():
         categorias_tenant=categorias_tenant,
         categorias_saida=categorias_saida,
         categorias_entrada=categorias_entrada,
-        dados_json=dados_assinados,
+        dados_json=token,
         bancos=bancos,
         obras=obras,
         total_saidas=len(saidas_auto) + len(saidas_manual),
@@ -528,10 +533,27 @@ def fluxo_caixa_upload():
     )
 
 
+_SECOES_FLUXO = ('entradas', 'saidas_auto', 'saidas_manual', 'transferencias')
+
+
+def _preview_fluxo(token, admin_id):
+    """As seções do preview guardado sob `token`; None se o token é inválido,
+    de outro tenant ou venceu."""
+    from services import preview_importacao
+    return preview_importacao.carregar(token, admin_id, 'fluxo_caixa', _SECOES_FLUXO)
+
+
+def _regravar_preview_fluxo(token, admin_id, payload):
+    """Regrava o preview reclassificado sob o mesmo token (os `_sid` seguem nas linhas)."""
+    from services import preview_importacao
+    preview_importacao.substituir(token, admin_id, 'fluxo_caixa',
+                                  {s: payload.get(s, []) for s in _SECOES_FLUXO})
+
+
 def _reclassificar_payload(admin_id, payload):
     """Reclassifica o payload do preview em memória com as Regras + Memória Exata
-    atuais do tenant. Devolve (cls, novo_token) onde cls = {entradas, saidas_auto,
-    saidas_manual, sugestoes} e novo_token é o payload re-assinado (HMAC)."""
+    atuais do tenant. Devolve (cls, novo_payload) onde cls = {entradas, saidas_auto,
+    saidas_manual, sugestoes} e novo_payload são as seções a regravar."""
     from models import CategoriaFluxoCaixa
     from services.classificador_cadastro import _norm as _norm_cat, Contexto
     from services.seed_palavras_chave import regras_do_tenant, carregar_memoria_exata
@@ -549,15 +571,15 @@ def _reclassificar_payload(admin_id, payload):
         'saidas_manual': cls['saidas_manual'],
         'transferencias': payload.get('transferencias', []),
     }
-    return cls, _assinar_payload([novo_payload], admin_id, 'fluxo_caixa')
+    return cls, novo_payload
 
 
 @importacao_bp.route('/fluxo-caixa/classificar-termo', methods=['POST'])
 @login_required
 def fluxo_caixa_classificar_termo():
     """Loop ao vivo (§7.4): cria uma Regra (origem='usuario') para o Termo e
-    RECLASSIFICA o payload em memória, devolvendo as seções + a fila atualizadas —
-    sem re-upload. Payload-como-estado: recebe e devolve o payload assinado (HMAC)."""
+    RECLASSIFICA o preview guardado no servidor, devolvendo as seções + a fila
+    atualizadas — sem re-upload. O token do preview não muda."""
     admin_id = get_admin_id_robusta()
     data = request.get_json(silent=True) or request.form
     token = data.get('dados_json', '')
@@ -568,8 +590,8 @@ def fluxo_caixa_classificar_termo():
     except (TypeError, ValueError):
         return jsonify({'ok': False, 'erro': 'categoria_id inválido'}), 400
 
-    rows = _verificar_payload(token, admin_id, 'fluxo_caixa')
-    if rows is None or not rows:
+    payload = _preview_fluxo(token, admin_id)
+    if payload is None:
         return jsonify({'ok': False, 'erro': 'Preview inválido ou expirado.'}), 400
     if not termo:
         return jsonify({'ok': False, 'erro': 'Termo vazio.'}), 400
@@ -597,10 +619,11 @@ def fluxo_caixa_classificar_termo():
             tipo=tipo, origem='usuario', ativo=True))
         db.session.commit()
 
-    cls, novo_token = _reclassificar_payload(admin_id, rows[0])
+    cls, novo_payload = _reclassificar_payload(admin_id, payload)
+    _regravar_preview_fluxo(token, admin_id, novo_payload)
     return jsonify({
         'ok': True,
-        'dados_json': novo_token,
+        'dados_json': token,
         'entradas': cls['entradas'],
         'saidas_auto': cls['saidas_auto'],
         'saidas_manual': cls['saidas_manual'],
@@ -627,8 +650,8 @@ def fluxo_caixa_corrigir_linha():
     except (TypeError, ValueError):
         return jsonify({'ok': False, 'erro': 'categoria_id inválido'}), 400
 
-    rows = _verificar_payload(token, admin_id, 'fluxo_caixa')
-    if rows is None or not rows:
+    payload = _preview_fluxo(token, admin_id)
+    if payload is None:
         return jsonify({'ok': False, 'erro': 'Preview inválido ou expirado.'}), 400
     if tipo not in ('ENTRADA', 'SAIDA'):
         return jsonify({'ok': False, 'erro': 'Tipo inválido.'}), 400
@@ -665,7 +688,7 @@ def fluxo_caixa_corrigir_linha():
     # Pendentes de texto idêntico) e reclassifica o payload.
     registrar_correcao(admin_id, lanc, categoria_id)
     db.session.commit()
-    cls, _ = _reclassificar_payload(admin_id, rows[0])
+    cls, _ = _reclassificar_payload(admin_id, payload)
 
     # PIN da linha corrigida: a decisão do usuário é autoritária NESTA importação,
     # mesmo quando uma Regra classificaria diferente (ordem Regra→Memória não
@@ -698,10 +721,11 @@ def fluxo_caixa_corrigir_linha():
 
     novo_payload = {'entradas': entradas, 'saidas_auto': saidas_auto,
                     'saidas_manual': saidas_manual,
-                    'transferencias': rows[0].get('transferencias', [])}
+                    'transferencias': payload.get('transferencias', [])}
+    _regravar_preview_fluxo(token, admin_id, novo_payload)
     return jsonify({
         'ok': True,
-        'dados_json': _assinar_payload([novo_payload], admin_id, 'fluxo_caixa'),
+        'dados_json': token,
         'entradas': entradas,
         'saidas_auto': saidas_auto,
         'saidas_manual': saidas_manual,
@@ -736,8 +760,8 @@ def fluxo_caixa_confirmar_regra_refinada():
     palavras = _csv(data.get('palavras'))
     gatilho_extra = _csv(data.get('gatilho_extra'))
 
-    rows = _verificar_payload(token, admin_id, 'fluxo_caixa')
-    if rows is None or not rows:
+    payload = _preview_fluxo(token, admin_id)
+    if payload is None:
         return jsonify({'ok': False, 'erro': 'Preview inválido ou expirado.'}), 400
     if not palavras or not gatilho_extra:
         return jsonify({'ok': False, 'erro': 'Regra refinada incompleta.'}), 400
@@ -757,10 +781,11 @@ def fluxo_caixa_confirmar_regra_refinada():
         prioridade=prioridade, tipo=tipo, origem='usuario', ativo=True))
     db.session.commit()
 
-    cls, novo_token = _reclassificar_payload(admin_id, rows[0])
+    cls, novo_payload = _reclassificar_payload(admin_id, payload)
+    _regravar_preview_fluxo(token, admin_id, novo_payload)
     return jsonify({
         'ok': True,
-        'dados_json': novo_token,
+        'dados_json': token,
         'entradas': cls['entradas'],
         'saidas_auto': cls['saidas_auto'],
         'saidas_manual': cls['saidas_manual'],
@@ -768,75 +793,130 @@ def fluxo_caixa_confirmar_regra_refinada():
     })
 
 
+_CAMPOS_TEXTO = ('obra', 'cat', 'banco', 'data', 'desc', 'valor', 'destinatario')
+_CAMPOS_MARCA = ('apenas_pag', 'reembolso')
+
+
+def _ler_edicoes(bruto):
+    """{_sid: {campo: valor}} a partir do JSON `edicoes` da confirmação.
+    Campo desconhecido, _sid não numérico ou valor do tipo errado (texto nos
+    campos, booleano nas caixas de marcar) é descartado — o resto da linha
+    fica como o preview mostrou."""
+    try:
+        dados = json.loads(bruto or '{}')
+    except (TypeError, ValueError):
+        return {}
+    if not isinstance(dados, dict):
+        return {}
+    edicoes = {}
+    for sid, campos in dados.items():
+        if not str(sid).isdigit() or not isinstance(campos, dict):
+            continue
+        linha = {c: v.strip() for c, v in campos.items()
+                 if c in _CAMPOS_TEXTO and isinstance(v, str)}
+        linha.update((c, v) for c, v in campos.items()
+                     if c in _CAMPOS_MARCA and isinstance(v, bool))
+        edicoes[int(sid)] = linha
+    return edicoes
+
+
+def _campos_da_linha(r):
+    """Os valores que o preview_fluxo.html mostra para a linha `r`, com os
+    nomes dos campos do formulário — o que a confirmação recebia da linha
+    que o usuário não tocou."""
+    if r.get('entidade_id'):
+        destinatario = f"{r.get('entidade_tipo')}:{r.get('entidade_id')}"
+    elif r.get('entidade_sugerida_id'):
+        destinatario = f"{r.get('entidade_sugerida_tipo')}:{r.get('entidade_sugerida_id')}"
+    else:
+        destinatario = ''
+    cfc_id = r.get('categoria_fluxo_caixa_id')
+    try:
+        valor = '%.2f' % float(r.get('valor') or 0)
+    except (TypeError, ValueError):
+        valor = ''
+    return {
+        'obra': r.get('obra_id'),
+        'cat': f'cfc_{cfc_id}' if cfc_id else '',
+        'apenas_pag': bool(r.get('sugestao_apenas_pagamento')),
+        'reembolso': bool(r.get('eh_reembolso')),
+        'banco': r.get('banco_id'),
+        'data': str(r.get('data') or ''),
+        'desc': r.get('descricao') or '',
+        'valor': valor,
+        'destinatario': destinatario,
+    }
+
+
 @importacao_bp.route('/fluxo-caixa/confirmar', methods=['POST'])
 @login_required
 def fluxo_caixa_confirmar():
-    """Persiste os dados confirmados após o preview."""
+    """Persiste o preview guardado sob o token, com as edições da tela.
+
+    O formulário manda só o token e `edicoes` — {_sid: {campo: valor}} com o
+    que o usuário mudou —, não mais os ~9 campos de cada linha. As linhas são
+    lidas do preview em lotes enquanto o `importar` grava."""
     admin_id = get_admin_id_robusta()
     token = request.form.get('dados_json', '')
 
-    rows = _verificar_payload(token, admin_id, 'fluxo_caixa')
-    if rows is None or not rows:
+    from services import preview_importacao
+    if not preview_importacao.existe(token, admin_id, 'fluxo_caixa'):
         flash('Dados de preview inválidos ou expirados — faça o upload novamente.', 'danger')
         return redirect(url_for('importacao.index'))
+    edicoes = _ler_edicoes(request.form.get('edicoes'))
+
+    # Pré-carregar IDs válidos do tenant para validação de ownership — o que a
+    # tela oferece nos selects (obras, categorias e bancos ativos).
+    from models import (BancoEmpresa, CategoriaFluxoCaixa, Fornecedor as _Forn,
+                        Funcionario as _Func, Obra as ObraModel)
+    _allowed_obra_ids = {
+        r[0] for r in ObraModel.query.filter_by(admin_id=admin_id, ativo=True)
+                                      .with_entities(ObraModel.id).all()
+    }
+    _allowed_banco_ids = {
+        r[0] for r in BancoEmpresa.query.filter_by(admin_id=admin_id, ativo=True)
+                                        .with_entities(BancoEmpresa.id).all()
+    }
+    _allowed_cfc_ids = {'ENTRADA': set(), 'SAIDA': set()}
+    for cfc_id, cfc_tipo in (CategoriaFluxoCaixa.query
+                             .filter_by(admin_id=admin_id, ativo=True)
+                             .with_entities(CategoriaFluxoCaixa.id, CategoriaFluxoCaixa.tipo)):
+        _allowed_cfc_ids.setdefault(cfc_tipo, set()).add(cfc_id)
+    _allowed_forn_ids = {
+        r[0] for r in _Forn.query.filter_by(admin_id=admin_id, ativo=True)
+                                  .with_entities(_Forn.id).all()
+    }
+    _allowed_func_ids = {
+        r[0] for r in _Func.query.filter_by(admin_id=admin_id, ativo=True)
+                                  .with_entities(_Func.id).all()
+    }
 
-    payload = rows[0]
-
-    # Coletar edições manuais do form
-    saidas_auto = payload.get('saidas_auto', [])
-    saidas_manual = payload.get('saidas_manual', [])
-    entradas = payload.get('entradas', [])
-
-    # Pré-computar IDs de obras permitidas para este tenant (validação de ownership)
-    from models import Obra as ObraModel
-    _obras_tenant = ObraModel.query.filter_by(admin_id=admin_id, ativo=True).with_entities(ObraModel.id).all()
-    _allowed_obra_ids = {r[0] for r in _obras_tenant}
-
-    def _obra_segura(obra_val):
-        """Converte valor do form em obra_id validado contra o tenant. Retorna None se inválido."""
-        if not obra_val:
+    def _id_seguro(valor, permitidos):
+        """Converte valor do form em id validado contra o tenant. Retorna None se inválido."""
+        if not valor:
             return None
         try:
-            oid = int(obra_val)
+            oid = int(valor)
         except (ValueError, TypeError):
             return None
-        return oid if oid in _allowed_obra_ids else None
+        return oid if oid in permitidos else None
 
-    def _aplicar_categoria(row, cat_val, tipo_esperado=None):
+    def _aplicar_categoria(row, cat_val, tipo_esperado):
         """Detecta prefixo cfc_<id> para categoria personalizada; senão usa tipo_categoria.
-        Se tipo_esperado for fornecido ('ENTRADA' ou 'SAIDA'), valida tenant + tipo antes de aplicar.
+        Valida tenant + tipo ('ENTRADA' ou 'SAIDA') antes de aplicar.
         IDs inválidos ou cross-tenant são silenciosamente ignorados.
         """
         if not cat_val:
             return
         if cat_val.startswith('cfc_'):
-            try:
-                cfc_id = int(cat_val[4:])
-            except ValueError:
-                return
-            from models import CategoriaFluxoCaixa
-            q = CategoriaFluxoCaixa.query.filter_by(id=cfc_id, admin_id=admin_id, ativo=True)
-            if tipo_esperado:
-                q = q.filter_by(tipo=tipo_esperado)
-            cfc = q.first()
-            if cfc:
-                row['categoria_fluxo_caixa_id'] = cfc.id
+            cfc_id = _id_seguro(cat_val[4:], _allowed_cfc_ids.get(tipo_esperado, ()))
+            if cfc_id:
+                row['categoria_fluxo_caixa_id'] = cfc_id
                 row['tipo_categoria'] = row.get('tipo_categoria') or 'OUTROS'
         else:
             row['tipo_categoria'] = cat_val
             row['categoria_fluxo_caixa_id'] = None
 
-    # Pré-carregar IDs válidos do tenant para validação de ownership
-    from models import Fornecedor as _Forn, Funcionario as _Func
-    _allowed_forn_ids = {
-        r[0] for r in _Forn.query.filter_by(admin_id=admin_id, ativo=True)
-                                  .with_entities(_Forn.id).all()
-    }
-    _allowed_func_ids = {
-        r[0] for r in _Func.query.filter_by(admin_id=admin_id, ativo=True)
-                                  .with_entities(_Func.id).all()
-    }
-
     def _aplicar_destinatario(row, dest_val):
         """Override de entidade_tipo/entidade_id a partir do valor 'tipo:id' do Tom Select.
         Valor vazio limpa o vínculo. IDs fora do tenant são silenciosamente ignorados.
@@ -848,10 +928,7 @@ def fluxo_caixa_confirmar():
             return
         if ':' not in dest_val:
             return
-        partes = dest_val.split(':', 1)
-        if len(partes) != 2:
-            return
-        tipo, id_str = partes
+        tipo, id_str = dest_val.split(':', 1)
         if tipo not in ('funcionario', 'fornecedor') or not id_str.isdigit():
             return
         eid = int(id_str)
@@ -865,74 +942,33 @@ def fluxo_caixa_confirmar():
         row['entidade_tipo'] = tipo
         row['entidade_id'] = eid
 
-    # Aplicar edições manuais nas saídas auto
-    for i, row in enumerate(saidas_auto):
-        row['obra_id'] = _obra_segura(request.form.get(f'obra_auto_{i}', '').strip())
-        cat_editada = request.form.get(f'cat_auto_{i}')
-        if cat_editada:
-            _aplicar_categoria(row, cat_editada, tipo_esperado='SAIDA')
-        # Checkbox "apenas pagamento"
-        row['apenas_pagamento'] = request.form.get(f'apenas_pag_auto_{i}') is not None
-        # Checkbox "reembolso"
-        row['eh_reembolso'] = request.form.get(f'reembolso_auto_{i}') is not None
-        # Banco vinculado
-        banco_id_val = request.form.get(f'banco_auto_{i}', '').strip()
-        row['banco_id'] = int(banco_id_val) if banco_id_val else None
-        # Inline edits
-        data_edit = request.form.get(f'data_auto_{i}', '').strip()
-        if data_edit:
-            row['data'] = data_edit
-        desc_edit = request.form.get(f'desc_auto_{i}', '').strip()
-        if desc_edit:
-            row['descricao'] = desc_edit
-        valor_edit = request.form.get(f'valor_auto_{i}', '').strip()
-        if valor_edit:
-            try:
-                row['valor'] = float(valor_edit.replace(',', '.'))
-            except ValueError:
-                pass
-        # Override de destinatário (Tom Select)
-        _aplicar_destinatario(row, request.form.get(f'destinatario_auto_{i}', '').strip())
-
-    # Aplicar edições manuais das saídas manuais
-    for i, row in enumerate(saidas_manual):
-        row['obra_id'] = _obra_segura(request.form.get(f'obra_manual_{i}', '').strip())
-        cat_manual = request.form.get(f'cat_manual_{i}')
-        if cat_manual:
-            _aplicar_categoria(row, cat_manual, tipo_esperado='SAIDA')
-        elif not row.get('tipo_categoria'):
+    def _editar(row, secao):
+        """A linha do preview com as edições da tela aplicadas (o que não foi
+        editado vale o que a tela mostrou)."""
+        campos = {**_campos_da_linha(row), **edicoes.get(row.get('_sid'), {})}
+        row['obra_id'] = _id_seguro(campos['obra'], _allowed_obra_ids)
+        if secao == 'entradas':
+            _aplicar_categoria(row, campos['cat'], 'ENTRADA')
+            return row
+        _aplicar_categoria(row, campos['cat'], 'SAIDA')
+        if secao == 'saidas_manual' and not row.get('tipo_categoria'):
             row['tipo_categoria'] = 'OUTROS'
-        # Checkbox "apenas pagamento"
-        row['apenas_pagamento'] = request.form.get(f'apenas_pag_manual_{i}') is not None
-        # Checkbox "reembolso"
-        row['eh_reembolso'] = request.form.get(f'reembolso_manual_{i}') is not None
-        # Banco vinculado
-        banco_id_val = request.form.get(f'banco_manual_{i}', '').strip()
-        row['banco_id'] = int(banco_id_val) if banco_id_val else None
+        row['apenas_pagamento'] = bool(campos['apenas_pag'])
+        row['eh_reembolso'] = bool(campos['reembolso'])
+        row['banco_id'] = _id_seguro(campos['banco'], _allowed_banco_ids)
         # Inline edits
-        data_edit = request.form.get(f'data_manual_{i}', '').strip()
-        if data_edit:
-            row['data'] = data_edit
-        desc_edit = request.form.get(f'desc_manual_{i}', '').strip()
-        if desc_edit:
-            row['descricao'] = desc_edit
-        valor_edit = request.form.get(f'valor_manual_{i}', '').strip()
-        if valor_edit:
+        if campos['data']:
+            row['data'] = campos['data']
+        if campos['desc']:
+            row['descricao'] = campos['desc']
+        if campos['valor']:
             try:
-                row['valor'] = float(valor_edit.replace(',', '.'))
+                row['valor'] = float(campos['valor'].replace(',', '.'))
             except ValueError:
                 pass
         # Override de destinatário (Tom Select)
-        _aplicar_destinatario(row, request.form.get(f'destinatario_manual_{i}', '').strip())
-
-    # Aplicar obra e categorias personalizadas nas entradas
-    for i, row in enumerate(entradas):
-        row['obra_id'] = _obra_segura(request.form.get(f'obra_entrada_{i}', '').strip())
-        cat_entrada = request.form.get(f'cat_entrada_{i}')
-        if cat_entrada:
-            _aplicar_categoria(row, cat_entrada, tipo_esperado='ENTRADA')
-
-    todas_saidas = saidas_auto + saidas_manual
+        _aplicar_destinatario(row, campos['destinatario'])
+        return row
 
     batch_id = f"import_{datetime.now().strftime('%Y%m%d_%H%M')}_{uuid.uuid4().hex[:6]}"
 
@@ -940,8 +976,11 @@ def fluxo_caixa_confirmar():
         from services.importacao_excel import ImportacaoFluxoCaixa
         svc = ImportacaoFluxoCaixa()
         resultado = svc.importar({
-            'entradas': entradas,
-            'saidas': todas_saidas,
+            'entradas': preview_importacao.Linhas(
+                token, admin_id, 'fluxo_caixa', ('entradas',), editar=_editar),
+            'saidas': preview_importacao.Linhas(
+                token, admin_id, 'fluxo_caixa', ('saidas_auto', 'saidas_manual'),
+                editar=_editar),
             'batch_id': batch_id,
         }, admin_id)
     except Exception as e:
@@ -949,6 +988,11 @@ def fluxo_caixa_confirmar():
         flash(f'Erro ao importar: {e}', 'danger')
         return redirect(url_for('importacao.index'))
 
+    # Importado, o preview sai do staging (um segundo envio do mesmo token cai
+    # em "expirado"). Com erro, fica — dá para corrigir e confirmar de novo.
+    if not resultado.get('erros'):
+        preview_importacao.descartar(token, admin_id, 'fluxo_caixa')
+
     # Intervalo de datas do batch para o botão "Ver no Fluxo de Caixa" —
     # garante que a tela abra cobrindo exatamente o que foi importado.
     fc_data_min = fc_data_max = None
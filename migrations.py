@@ -6435,6 +6435,200 @@ def _migration_311_nota_e_adiantamento():
                 "criadas (Fase 2 — a obrigação passa a nascer do que chegou).")
 
 
+def _migration_312_saldos_mensais():
+    """Saldos mensais por conta — `balancete_mensal` passa a ser mantido a
+    cada lançamento (services/saldos_mensais) e os relatórios contábeis leem
+    dali o saldo de abertura em vez de somar o histórico inteiro.
+
+    Backfill obrigatório: até aqui a tabela só tinha as linhas que alguém
+    gerou pela tela de balancete, e geradas uma vez — lançamento posterior no
+    mesmo mês não as atualizava. Relatório lendo a abertura de uma tabela
+    incompleta daria saldo errado, em silêncio. Por isso cada tenant com
+    partida é reconstruído do zero (`reconstruir`: um GROUP BY por conta e
+    mês), um commit por tenant.
+
+    Mais o índice (admin_id, conta_codigo, mes_referencia) da consulta de
+    abertura. Idempotente: reconstruir apaga e regrava.
+    """
+    from sqlalchemy import text as sa_text
+    from services.saldos_mensais import reconstruir
+
+    with db.engine.begin() as conn:
+        conn.execute(sa_text(
+            "CREATE INDEX IF NOT EXISTS ix_balancete_mensal_admin_conta_mes "
+            "ON balancete_mensal (admin_id, conta_codigo, mes_referencia)"))
+
+    tenants = [a for (a,) in db.session.execute(sa_text(
+        "SELECT DISTINCT admin_id FROM partida_contabil ORDER BY admin_id"))]
+    linhas = 0
+    for admin_id in tenants:
+        linhas += reconstruir(admin_id)
+        db.session.commit()
+    logger.info(f"[Migration 312] balancete_mensal reconstruído: {len(tenants)} "
+                f"tenant(s), {linhas} linha(s) (conta × mês).")
+
+
+def _migration_313_preview_importacao():
+    """Preview de importação no servidor — `preview_importacao_linha`.
+
+    A confirmação do fluxo de caixa mandava o preview inteiro de volta (o
+    payload assinado + ~9 campos por linha); agora o preview fica nesta
+    tabela, chaveado pelo token do upload, e a confirmação manda só as
+    edições (services/preview_importacao). Tabela de passagem: sem backfill,
+    as linhas vivem até a confirmação ou até vencer.
+
+    Índices: (token, secao, id) da leitura em lotes e criado_em da limpeza.
+    Idempotente: IF NOT EXISTS em tudo.
+    """
+    from sqlalchemy import text as sa_text
+    with db.engine.begin() as conn:
+        conn.execute(sa_text("""
+            CREATE TABLE IF NOT EXISTS preview_importacao_linha (
+                id SERIAL PRIMARY KEY,
+                token VARCHAR(32) NOT NULL,
+                admin_id INTEGER NOT NULL
+                    REFERENCES usuario(id) ON DELETE CASCADE,
+                modulo VARCHAR(30) NOT NULL,
+                secao VARCHAR(20) NOT NULL,
+                dados JSON NOT NULL,
+                criado_em TIMESTAMP NOT NULL
+            )"""))
+        conn.execute(sa_text(
+            "CREATE INDEX IF NOT EXISTS ix_preview_importacao_token_secao "
+            "ON preview_importacao_linha (token, secao, id)"))
+        conn.execute(sa_text(
+            "CREATE INDEX IF NOT EXISTS ix_preview_importacao_linha_criado_em "
+            "ON preview_importacao_linha (criado_em)"))
+
+    logger.info("[Migration 313] preview_importacao_linha criada (preview do "
+                "fluxo de caixa guardado no servidor).")
+
+
+def _migration_314_fatos_producao():
+    """Fatos de produção de mão de obra — `fato_producao_mao_obra`, uma linha
+    por (RDO, serviço, funcionário) com as métricas da subatividade já
+    somadas (services/fatos_producao). Os relatórios por funcionário das
+    métricas (cards, ranking, detalhe) passam a ler dali.
+
+    Backfill obrigatório: a tabela nasce vazia e os relatórios leriam
+    "nenhum funcionário" até cada RDO ser tocado de novo. Cada tenant com RDO
+    é consolidado do zero (`reconstruir`), um commit por tenant.
+
+    Índices: (admin_id, data) do ranking do período, (admin_id,
+    funcionario_id, data) do detalhe. Idempotente: IF NOT EXISTS e
+    reconstruir apaga e regrava.
+    """
+    from sqlalchemy import text as sa_text
+    from services.fatos_producao import reconstruir
+
+    with db.engine.begin() as conn:
+        conn.execute(sa_text("""
+            CREATE TABLE IF NOT EXISTS fato_producao_mao_obra (
+                id SERIAL PRIMARY KEY,
+                admin_id INTEGER NOT NULL REFERENCES usuario(id) ON DELETE CASCADE,
+                obra_id INTEGER NOT NULL REFERENCES obra(id) ON DELETE CASCADE,
+                rdo_id INTEGER NOT NULL REFERENCES rdo(id) ON DELETE CASCADE,
+                servico_id INTEGER REFERENCES servico(id) ON DELETE SET NULL,
+                funcionario_id INTEGER NOT NULL
+                    REFERENCES funcionario(id) ON DELETE CASCADE,
+                data DATE NOT NULL,
+                composicao_servico_id INTEGER,
+                coeficiente DOUBLE PRECISION,
+                horas DOUBLE PRECISION NOT NULL DEFAULT 0,
+                quantidade DOUBLE PRECISION,
+                quantidade_equipe DOUBLE PRECISION,
+                custo DOUBLE PRECISION,
+                receita DOUBLE PRECISION,
+                n_subatividades INTEGER NOT NULL DEFAULT 0,
+                n_equipe_mista INTEGER NOT NULL DEFAULT 0,
+                prod_hh_single_soma DOUBLE PRECISION NOT NULL DEFAULT 0,
+                prod_hh_single_n INTEGER NOT NULL DEFAULT 0,
+                prod_hh_mista_soma DOUBLE PRECISION NOT NULL DEFAULT 0,
+                prod_hh_mista_n INTEGER NOT NULL DEFAULT 0,
+                indice_single_soma DOUBLE PRECISION NOT NULL DEFAULT 0,
+                indice_single_n INTEGER NOT NULL DEFAULT 0,
+                indice_mista_soma DOUBLE PRECISION NOT NULL DEFAULT 0,
+                indice_mista_n INTEGER NOT NULL DEFAULT 0,
+                n_gargalo INTEGER NOT NULL DEFAULT 0,
+                n_subutilizado INTEGER NOT NULL DEFAULT 0,
+                consolidado_em TIMESTAMP NOT NULL DEFAULT now(),
+                CONSTRAINT uq_fato_producao_rdo_servico_func
+                    UNIQUE (rdo_id, servico_id, funcionario_id)
+            )"""))
+        conn.execute(sa_text(
+            "CREATE INDEX IF NOT EXISTS ix_fato_producao_mao_obra_rdo_id "
+            "ON fato_producao_mao_obra (rdo_id)"))
+        conn.execute(sa_text(
+            "CREATE INDEX IF NOT EXISTS ix_fato_producao_admin_data "
+            "ON fato_producao_mao_obra (admin_id, data)"))
+        conn.execute(sa_text(
+            "CREATE INDEX IF NOT EXISTS ix_fato_producao_admin_func_data "
+            "ON fato_producao_mao_obra (admin_id, funcionario_id, data)"))
+
+    tenants = [a for (a,) in db.session.execute(sa_text(
+        "SELECT DISTINCT admin_id FROM rdo WHERE admin_id IS NOT NULL ORDER BY admin_id"))]
+    linhas = 0
+    for admin_id in tenants:
+        linhas += reconstruir(admin_id)
+        db.session.commit()
+    logger.info(f"[Migration 314] fato_producao_mao_obra consolidada: {len(tenants)} "
+                f"tenant(s), {linhas} linha(s) (RDO × serviço × funcionário).")
+
+
+def _migration_315_indices_periodo_ponto():
+    """Filtros de período sargáveis do ponto e da folha (services/periodo).
+
+    Folha, custo do funcionário e KPIs do ponto filtram o mês como intervalo
+    meio-aberto de `data`, não mais com extract(year/month). O intervalo só
+    vira Index Cond com `data` como SEGUNDA coluna de um índice composto
+    atrás da chave de cada caminho: (funcionario_id, data) da folha
+    individual e dos KPIs, (obra_id, data) da folha da obra, (admin_id,
+    data) da folha do tenant inteiro.
+
+    Os três estão no modelo e na migração 40, mas lá depois do backfill do
+    admin_id, no mesmo try que só loga o erro: se um passo anterior falhou, o
+    índice não nasceu e a migração ficou registrada. Aqui ficam sozinhos e
+    fora de qualquer ramo (o padrão da 213). Idempotente: IF NOT EXISTS.
+    """
+    from sqlalchemy import text as sa_text
+
+    with db.engine.begin() as conn:
+        for nome, colunas in (('idx_registro_ponto_funcionario_data', 'funcionario_id, data'),
+                              ('idx_registro_ponto_obra_data', 'obra_id, data'),
+                              ('idx_registro_ponto_admin_data', 'admin_id, data')):
+            conn.execute(sa_text(
+                f"CREATE INDEX IF NOT EXISTS {nome} ON registro_ponto ({colunas})"))
+    logger.info("[Migration 315] índices (funcionario_id|obra_id|admin_id, data) "
+                "do registro_ponto garantidos")
+
+
+def _migration_316_rdo_foto_processamento():
+    """Versões das fotos de RDO fora do request (services/rdo_foto_versoes).
+
+    rdo_foto.processamento ('pendente' | 'pronta' | 'falha'), o contador de
+    tentativas e a reserva de quem está gerando. O acervo inteiro já tem as
+    versões, então o default 'pronta' descreve o histórico; com DEFAULT
+    constante o ADD COLUMN não reescreve a tabela. O índice parcial só tem
+    as pendentes — é ele que a fila varre. Idempotente: IF NOT EXISTS.
+    """
+    from sqlalchemy import text as sa_text
+
+    with db.engine.begin() as conn:
+        conn.execute(sa_text(
+            "ALTER TABLE rdo_foto ADD COLUMN IF NOT EXISTS processamento "
+            "VARCHAR(10) NOT NULL DEFAULT 'pronta'"))
+        conn.execute(sa_text(
+            "ALTER TABLE rdo_foto ADD COLUMN IF NOT EXISTS processamento_tentativas "
+            "INTEGER NOT NULL DEFAULT 0"))
+        conn.execute(sa_text(
+            "ALTER TABLE rdo_foto ADD COLUMN IF NOT EXISTS processamento_reservado_ate "
+            "TIMESTAMP"))
+        conn.execute(sa_text(
+            "CREATE INDEX IF NOT EXISTS ix_rdo_foto_processamento_pendente "
+            "ON rdo_foto (id) WHERE processamento = 'pendente'"))
+    logger.info("[Migration 316] rdo_foto.processamento + índice das pendentes garantidos")
+
+
 def _migration_288_regime_e_liberacao():
     """Fase 2 — o regime do pedido, a liberação da conta e a trilha do lote.
 
@@ -6877,6 +7071,298 @@ def _migration_282_backfill_dropdown_crm():
                 total_grupos, total_opcoes)
 
 
+def _migracoes_ativas():
+    """(número, descrição, função) de cada migração do boot, em ordem de
+    execução. Os números também estão em services/migracoes_boot.ATIVAS —
+    o registro leve que o boot confere sem importar este módulo; o teste
+    test_migrations_numeracao::test_o_registro_leve_do_boot_bate_com_a_lista
+    garante que os dois batem."""
+    # Task #44 — local helper para migration_181 (dim_area_manual em orcamento_item e proposta_itens)
+    def _migration_181_inline():
+        from sqlalchemy import text as _text
+        logger.info("[Migration 181] Iniciando — dim_area_manual em orcamento_item e proposta_itens")
+        for _tbl in ('orcamento_item', 'proposta_itens'):
+            db.session.execute(_text(
+                f"ALTER TABLE {_tbl} ADD COLUMN IF NOT EXISTS dim_area_manual NUMERIC(15,4)"
+            ))
+        db.session.commit()
+        logger.info("[Migration 181] Concluída com sucesso")
+
+    # Task #36 v2 — local helper para migration_180 (proposta_itens dim fields)
+    def _migration_180_inline():
+        from sqlalchemy import text as _text
+        logger.info("[Migration 180] Iniciando — Medição Dimensional em proposta_itens")
+        for _col, _tipo in [
+            ('tipo_medicao_override', 'VARCHAR(30)'),
+            ('dim_largura', 'NUMERIC(15,4)'),
+            ('dim_comprimento', 'NUMERIC(15,4)'),
+            ('dim_perimetro', 'NUMERIC(15,4)'),
+            ('dim_pe_direito', 'NUMERIC(15,4)'),
+        ]:
+            db.session.execute(_text(
+                f"ALTER TABLE proposta_itens ADD COLUMN IF NOT EXISTS {_col} {_tipo}"
+            ))
+        db.session.commit()
+        logger.info("[Migration 180] Concluída com sucesso")
+
+    # ===== MIGRAÇÕES ATIVAS COM RASTREAMENTO =====
+    return [
+        (20, "Sistema de Veículos Inteligente", _migration_20_unified_vehicle_system),
+        (27, "Sistema de Alimentação", _migration_27_alimentacao_system),
+        (33, "Recriar frota_despesa", _migration_33_recreate_frota_despesa),
+        (34, "Campos pagamento Restaurante", _migration_34_restaurante_campos_pagamento),
+        (35, "Coluna numero_nota_fiscal custo_veiculo", _migration_35_custo_veiculo_numero_nota_fiscal),
+        (36, "Remover tabelas propostas legado", _migration_36_remove_old_propostas_tables),
+        (37, "Renomear campos propostas_comerciais", _migration_37_rename_propostas_fields),
+        (38, "Criar proposta_historico", _migration_38_create_proposta_historico),
+        (39, "Sistema Almoxarifado v3.0", _migration_39_create_almoxarifado_system),
+        (40, "Sistema Ponto Eletrônico Compartilhado", _migration_40_ponto_compartilhado),
+        (41, "Sistema Financeiro v9.0", _migration_41_sistema_financeiro),
+        (42, "Configuração Obras/Funcionário Ponto", _migration_42_funcionario_obras_ponto),
+        (43, "Completar estruturas v9.0", _migration_43_completar_estruturas_v9),
+        (44, "Adicionar jornada_semanal a funcionario", _migration_44_adicionar_jornada_semanal),
+        (45, "Corrigir schema da tabela propostas_comerciais", _migration_45_corrigir_schema_propostas),
+        (46, "Adicionar descricao a centro_custo_contabil", _migration_46_adicionar_descricao_centro_custo),
+        (47, "Adicionar fornecedor_id ao almoxarifado_movimento", _migration_47_almoxarifado_fornecedor),
+        (48, "Adicionar admin_id em 17 modelos faltantes", _migration_48_adicionar_admin_id_modelos_faltantes),
+        (49, "Campos de alertas veículos (IPVA/Seguro)", _migration_49_vehicle_alertas),
+        (50, "Schema completo tabela uso_veiculo", _migration_50_uso_veiculo_schema_completo),
+        (51, "Schema completo tabela custo_veiculo", _migration_51_custo_veiculo_schema_completo),
+        (52, "RDO Foto - otimização de campos", _migration_52_rdo_foto_campos_otimizacao),
+        (53, "RDO Foto - persistência Base64", _migration_53_rdo_foto_base64),
+        (54, "Tamanho logo portal do cliente", _migration_54_logo_tamanho_portal),
+        (55, "Token cliente para portal público", _migration_55_token_cliente_proposta),
+        (56, "PropostaArquivo - persistência Base64", _migration_56_proposta_arquivo_base64),
+        (57, "Campos CRUD movimentações almoxarifado", _migration_57_almoxarifado_movimento_campos_crud),
+        (58, "Sistema de Rastreamento de Lotes FIFO", _migration_58_almoxarifado_lotes_fifo),
+        (59, "Sistema de Itens de Alimentação v2.0", _migration_59_alimentacao_itens_sistema),
+        (60, "Adicionar created_at em centro_custo_contabil", _migration_60_centro_custo_created_at),
+        (61, "Sistema HorarioDia para horários flexíveis", _migration_61_horario_dia_sistema),
+        (62, "Tornar colunas legadas de HorarioTrabalho nullable", _migration_62_horario_trabalho_nullable),
+        (63, "Tolerância minutos para horas extras/atrasos", _migration_63_tolerancia_minutos),
+        (64, "Tabela folha_processada para dashboard custos obra", _migration_64_folha_processada),
+        (65, "Adicionar coluna nome em fornecedor", _migration_65_fornecedor_nome),
+        (66, "Campos reconhecimento facial RegistroPonto", _migration_66_reconhecimento_facial_ponto),
+        (67, "Sistema de Geofencing (Cerca Virtual)", _migration_67_geofencing),
+        (68, "Sistema de Múltiplas Fotos Faciais", _migration_68_multiplas_fotos_faciais),
+        (69, "custo_veiculo.obra_id nullable", _migration_69_custo_veiculo_obra_nullable),
+        (70, "Versionamento V1/V2 por Tenant (Feature Flag)", _migration_70_versao_sistema_usuario),
+        (71, "Remuneração por Diária V2 (Funcionario)", _migration_71_remuneracao_diaria_funcionario),
+        (72, "Alimentação V2 - funcionario_id e centro_custo_id por item", _migration_72_alimentacao_item_v2),
+        (73, "Transporte V2 - tabelas categoria_transporte e lancamento_transporte", _migration_73_transporte_v2),
+        (74, "Compras V2 - tabelas pedido_compra e pedido_compra_item", _migration_74_compras_v2),
+        (75, "Cronograma V2 - CalendarioEmpresa e TarefaCronograma", _migration_75_cronograma_v2),
+        (76, "RDO Apontamento Cronograma V2 - tabela rdo_apontamento_cronograma", _migration_76_rdo_apontamento_cronograma),
+        (77, "Gestão de Custos V2 - tabelas gestao_custo_pai e gestao_custo_filho", _migration_77_gestao_custos_v2),
+        (78, "Transporte V2 - centro_custo_id nullable + funcionario_id nullable", _migration_78_transporte_centro_custo_nullable),
+        (79, "Reembolso V2 - tabela reembolso_funcionario", _migration_79_reembolso_funcionario),
+        (80, "Reembolso V2 - categoria e comprovante_url", _migration_80_reembolso_campos_extras),
+        (81, "Reembolso V2 - gestao_custo_pai_id FK", _migration_81_reembolso_gestao_custo_pai_id),
+        (82, "Obra codigo - unique por tenant (codigo+admin_id)", _migration_82_obra_codigo_per_tenant),
+        (83, "GestaoCustoPai - data_vencimento e numero_documento para DESPESA_GERAL", _migration_83_gestao_custo_vencimento),
+        (84, "AlimentacaoLancamento - restaurante_id nullable para V2", _migration_84_alimentacao_restaurante_nullable),
+        (85, "GestaoCustoPai - fornecedor_id, forma_pagamento, valor_pago, saldo, conta_contabil_codigo, data_emissao, numero_parcela, total_parcelas", _migration_85_gestao_custo_pai_novas_colunas),
+        (86, "CustoObra - colunas extras (funcionario_id, rdo_id, categoria, horas, quantidade, veiculo, almoxarifado)", _migration_86_custo_obra_colunas_extras),
+        (87, "Proposta - numero_proposta unique por tenant (numero_proposta + admin_id)", migration_87_proposta_numero_unique_por_tenant),
+        (88, "TarefaCronograma - campo responsavel (empresa/terceiros)", migration_88_tarefa_cronograma_responsavel),
+        (89, "RDO - criado_por_id nullable (FK usuario)", migration_89_rdo_criado_por_nullable),
+        (90, "RDOMaoObra - subatividade_id (FK cascade) + horas_extras", migration_90_rdo_mao_obra_subatividade),
+        (91, "RDOMaoObra - tarefa_cronograma_id (FK SET NULL) para métricas por tarefa", migration_91_rdo_mao_obra_tarefa_cronograma),
+        (92, "AlmoxarifadoMovimento - pedido_compra_id FK opcional para rastreamento de origem", migration_92_almoxarifado_pedido_compra_id),
+        (93, "PedidoCompra - centro_custo_id nullable (obra é o centro de custo principal)", migration_93_pedido_compra_centro_custo_nullable),
+        (94, "SubatividadeMestre - unidade_medida e meta_produtividade para catálogo de produtividade", migration_94_subatividade_mestre_produtividade),
+        (95, "CronogramaTemplate e CronogramaTemplateItem - templates reutilizáveis de cronograma", migration_95_cronograma_templates),
+        (96, "RDOServicoSubatividade - quantidade_produzida, subatividade_mestre_id e snapshots de produtividade", migration_96_rdo_servico_subatividade_produtividade),
+        (97, "RDOMaoObra - produtividade_real e indice_produtividade calculados na finalização do RDO", migration_97_rdo_mao_obra_produtividade),
+        (98, "SubatividadeMestre tipo+servico_id nullable, CronogramaTemplateItem parent_item_id - catálogo hierárquico", migration_98_catalogo_hierarquico),
+        (99, "RDOServicoSubatividade servico_id nullable para suportar subatividades sem serviço vinculado", migration_99_rdo_servico_sub_nullable),
+        (100, "TarefaCronograma - subatividade_mestre_id FK para rastreamento de catálogo", migration_100_tarefa_cronograma_subatividade_mestre_id),
+        (101, "Funcionario - chave_pix, valor_va e valor_vt para PIX e benefícios diários", migration_101_funcionario_pix_va_vt),
+        (102, "Funcionario - codigo unique por tenant (codigo+admin_id) em vez de global", migration_102_funcionario_codigo_per_tenant),
+        (103, "import_batch_id em gestao_custo_pai, conta_pagar, conta_receber, fluxo_caixa — rollback de importação", migration_103_import_batch_id),
+        (104, "Fornecedor - tipo_fornecedor (MATERIAL / PRESTADOR_SERVICO / OUTRO)", migration_104_tipo_fornecedor),
+        (105, "FluxoCaixa - banco_id FK opcional para BancoEmpresa", migration_105_fluxo_caixa_banco_id),
+        (106, "RDO e filhos — ON DELETE CASCADE para exclusão em cascata com Obra", migration_106_rdo_obra_cascade),
+        (107, "Portal do Cliente — chave_pix, status_aprovacao_cliente, medicao_obra", migration_107_portal_cliente_obra),
+        (108, "Medição Quinzenal — itens comerciais, tarefas vinculadas, expansão medicao_obra", migration_108_medicao_quinzenal),
+        (109, "Mapa de Concorrência — tabelas mapa_concorrencia e opcao_concorrencia", migration_109_mapa_concorrencia),
+        (110, "OpcaoConcorrencia — enforça NOT NULL em admin_id", migration_110_opcao_concorrencia_admin_not_null),
+        (111, "CronogramaCliente — cronograma editável para portal do cliente", migration_111_cronograma_cliente),
+        (112, "MapaConcorrenciaV2 — tabela multi-fornecedor com cotações por item", migration_112_mapa_concorrencia_v2),
+        (113, "TarefaCronograma — data_entrega_real DATE para entregas/terceiros", migration_113_tarefa_cronograma_data_entrega_real),
+        (114, "Subempreiteiro + RDOSubempreitadaApontamento + GestaoCustoPai.subempreiteiro_id", migration_114_subempreiteiro),
+        (115, "Consolidar GestaoCustoPai duplicados por (admin_id, entidade_id, categoria normalizada)", migration_115_consolidar_gestao_custo_pai_duplicados),
+        (116, "PedidoCompra — tipo_compra (normal/aprovacao_cliente) + processada_apos_aprovacao", migration_116_pedido_compra_tipo_compra),
+        (117, "TarefaCronograma — is_cliente BOOLEAN (paridade total no editor cliente)", migration_117_tarefa_cronograma_is_cliente),
+        (118, "Task #70 — Resumo de Custos da Obra (obra_servico_custo + equipe + cotação + percentual_administracao)", migration_118_resumo_custos_obra),
+        (119, "Task #74 — GestaoCustoFilho.obra_servico_custo_id (vínculo direto custo→serviço)", migration_119_gestao_custo_filho_obra_servico),
+        (120, "Task #76 — NotificacaoOrcamento (alertas de estouro de orçamento por serviço)", migration_120_notificacao_orcamento),
+        (121, "Task #82 — Catálogo de Insumos + Composição de Serviços + Orçamento Paramétrico", migration_121_catalogo_servicos_orcamento),
+        (122, "Task #82 — ItemMedicaoComercial.proposta_item_id (dedupe determinístico de propagação)", migration_122_item_medicao_proposta_item_id),
+        (123, "Task #82 — ComposicaoServico.unidade (snapshot da unidade do insumo)", migration_123_composicao_servico_unidade),
+        (124, "Task #89 — Snapshot de cálculo paramétrico em PropostaItem e ItemMedicaoComercial", migration_124_snapshot_calculo_parametrico),
+        (125, "Task #102 — Cronograma automático na aprovação (servico.template_padrao_id, propostas.cronograma_default_json, tarefa_cronograma.gerada_por_proposta_item_id)", migration_125_cronograma_automatico_aprovacao),
+        (126, "Task #115 — Orçamento + OrcamentoItem (camada interna que gera Proposta)", migration_126_orcamento),
+        (127, "Task #115 v2 — propostas_comerciais.orcamento_id (Orçamento → N Propostas)", migration_127_proposta_orcamento_id),
+        (128, "Task #118 — cronograma_template_override_id em orcamento_item e proposta_itens + composicao_snapshot em proposta_itens", migration_128_orcamento_item_cronograma_override),
+        (129, "Task #158 — assinatura e engenheiro responsável em configuracao_empresa", migration_129_configuracao_empresa_assinatura_engenheiro),
+        (130, "Task #165 — alinhar tipos numéricos de orçamento/proposta_itens (Float→Numeric)", migration_130_alinhar_tipos_numericos_orcamento_proposta),
+        (131, "Task #166 — coeficiente_padrao em insumo (sugestão p/ composição)", migration_131_insumo_coeficiente_padrao),
+        (132, "Task #172 — Obra.cliente_id FK + backfill por nome/email do cliente", migration_132_obra_cliente_id_fk),
+        (133, "Task #173 — engenheiro_responsavel + FKs em configuracao_empresa e propostas_comerciais (backfill do legado)", migration_133_engenheiro_responsavel),
+        (134, "Task #174 — proposta_clausula + proposta_template_clausula (backfill cláusulas configuráveis)", migration_134_clausulas_configuraveis),
+        (135, "Task #191 — tema do sistema (cor_header_nav, cor_fundo_app, tema_preset em configuracao_empresa)", migration_135_tema_sistema_configuracao_empresa),
+        (137, "Task #176/#178 — backfill obras órfãs + DROP legacy cliente_*/engenheiro_* + obra.cliente_id NOT NULL", migration_137_drop_legacy_cliente_e_engenheiro),
+        (138, "Task #162 — scrub de defaults legados em proposta_templates (Lucas Barbosa / São José dos Campos)", migration_138_scrub_proposta_templates_defaults),
+        (139, "Task #142 — rdo_apontamento_cronograma.percentual_planejado nullable + backfill NULL para tarefas sem plano", migration_139_apontamento_cronograma_planejado_nullable),
+        (140, "Task #200 — obra.cronograma_revisado_em (gate de revisão inicial de cronograma)", migration_140_obra_cronograma_revisado_em),
+        (141, "Task #201 — drop tabelas legadas de propostas (proposta + 7 dependentes/órfãs)", migration_141_drop_legacy_propostas_tables),
+        (142, "Task #21 — Mapa V2: prazo/obs/condições por fornecedor + fornecedor_escolhido_id por item + relatorio_compra_mapa", migration_142_mapa_v2_relatorio_compra),
+        (143, "Task #21 — relatorio_compra_mapa: UNIQUE (mapa_id, versao) p/ versionamento seguro sob concorrência", migration_143_relatorio_compra_unique_versao),
+        (144, "Task #31 — versionamento + revisão obrigatória de propostas (proposta + proposta_clausula)", migration_144_proposta_versionamento_revisao),
+        (145, "Task #38 — rdo_mao_obra.peso_distribuicao (peso da tarefa principal do funcionário)", migration_145_rdo_mao_obra_peso_distribuicao),
+        (146, "Task #42 — CRM de Leads: 9 tabelas (lead, lead_historico, 7 listas mestras) + seed genérico (sem Responsáveis)", migration_146_crm_leads_e_seed_generico),
+        (147, "Task #18 hotfix — itens_inclusos/itens_exclusos em proposta_itens e orcamento_item", migration_147_proposta_orcamento_itens_inclusos_exclusos),
+        (148, "Task #47 — proposta_templates.padrao + índice parcial único + backfill (template mais antigo por admin)", migration_148_proposta_templates_padrao),
+        (149, "Task #43 — webhook_entrega (fila/log de notificações para n8n)", migration_149_webhook_entrega),
+        (150, "Task #63 — Orçamento Operacional da Obra (3 tabelas + backfill)", migration_150_obra_orcamento_operacional),
+        (151, "Task #62 — vínculos Cronograma↔Subatividade↔Serviço↔Mão-de-obra", migration_151_vinculo_subatividade_composicao),
+        (152, "Task #2 — rdo_custo_diario: tabela + índices parciais para custo diário de mão-de-obra", migration_152_rdo_custo_diario),
+        (153, "Task #3 — composicao_servico_historico: histórico de alterações de coeficiente via métricas", migration_153_composicao_servico_historico),
+        # Migração 154 APOSENTADA do boot — agora roda sob demanda via
+        # scripts/migrar_rdos_rascunho_legados.py. Mantida marcada como
+        # 'success' no migration_history (via _aposentar_migracao_154)
+        # para garantir idempotência em ambientes que ainda não a tinham
+        # registrado. A função migration_154_force_rdo_finalizado segue
+        # viva como biblioteca usada pelo script avulso.
+        (155, "Task #5 — RDO: drop coluna rdo_mao_obra.horas_extras (hora extra removida do RDO)", migration_155_drop_rdo_mao_obra_horas_extras),
+        (156, "Task #7 — custo_obra.descricao: ampliar de VARCHAR(200) para VARCHAR(500) (RDO com muitas subatividades)", migration_156_custo_obra_descricao_500),
+        (157, "Task #69 — backfill produtividade_real/indice_produtividade em RDOMaoObra para RDOs Finalizados com dados suficientes", migration_157_backfill_produtividade_rdo),
+        (158, "Task #77 — cliente_observacao: histórico de anotações livres por cliente (CRM)", migration_158_cliente_observacao),
+        (159, "Task #84 — backfill composicao_servico_id/vinculo_status em rdo_mao_obra para registros históricos nulos", migration_159_backfill_composicao_servico_id),
+        (160, "Task #95 — CRM: adicionar vendedor_id e orcamentista_id na tabela lead + backfill de responsavel_id", migration_160_crm_vendedor_orcamentista),
+        (161, "CRM: adicionar coluna prioridade (boolean) na tabela lead", migration_161_lead_prioridade),
+        (162, "Task #110 — CRM: validacao_aprovada, validado_por_id, validado_em na tabela lead", migration_162_lead_validacao),
+        (163, "Task #113 — CRM: adicionar coluna prazo (Date, nullable) na tabela lead", migration_163_lead_prazo),
+        (164, "Task #119 — rdo_ocorrencia: adicionar colunas faltantes (tipo_ocorrencia, severidade, descricao_ocorrencia, etc.)", migrar_campos_rdo_ocorrencia),
+        (165, "Task #6 — Módulo Custos do Escritório (3 tabelas + seed 10 categorias padrão por tenant)", migration_165_custos_escritorio),
+        (166, "Task #10 — Catálogos Auxiliares (categoria_fluxo_caixa, categoria_fornecedor, categoria_reembolso, fornecedor_categorias M2M, fluxo_caixa.categoria_fluxo_caixa_id)", migration_166_catalogos_auxiliares),
+        (167, "Task #11 — Compras Parceladas: novos campos em conta_pagar/pedido_compra/gestao_custo_pai + tabelas dia_pagamento_config e fechamento_pagamento", migration_167_compras_parceladas),
+        (168, "Task #11 v2 — gestao_custo_pai.fechamento_id FK para fechamento_pagamento (fonte única de obrigação financeira de compras)", migration_168_gcp_fechamento_id),
+        (169, "Task #17 — Seed de categorias padrão nos catálogos (categoria_fluxo_caixa, categoria_fornecedor, categoria_reembolso) para todos os tenants existentes", migration_169_seed_categorias_catalogo),
+        (170, "Task #19 — fator_comercial + unidade_comercial em insumo (quantidade comercial/embalagem)", migration_170_insumo_quantidade_comercial),
+        (171, "Task #23 — observacao_validacao em propostas_comerciais (nota interna de validação)", migration_171_proposta_observacao_validacao),
+        (172, "CRM — comentario_revisao em lead (comentário do supervisor ao pedir revisão)", migration_172_lead_comentario_revisao),
+        (173, "Motor universal de dropdowns — DropdownGrupo + DropdownOpcao + seed CRM", migration_173_dropdown_motor),
+        (174, "Motor de dropdowns v2 — ext_id + sync CRM→DropdownOpcao + seed padrão", migration_174_dropdown_ext_id_sync),
+        (175, "Task #10 — seed grupos universais (Obras, RDO, Frota, Financeiro, Almoxarifado, Alimentação, Serviços, Funcionários)", migration_175_seed_novos_grupos),
+        (176, "Task #10 v2 — corrige valores incorretos de rdo_tempo/rdo_condicao_trabalho/rdo_status_equipamento para todos os tenants", migration_176_fix_rdo_slugs),
+        (177, "Task #10 v3 — corrige almoxarifado_tipo_movimento: SAÍDA→SAIDA, DEVOLUÇÃO→DEVOLUCAO para todos os tenants", migration_177_fix_almox_tipo_movimento),
+        (178, "Task #29 — Grupos Financeiros: criar tabela grupo_financeiro + coluna grupo_financeiro_id em categoria_fluxo_caixa", migration_178_grupo_financeiro),
+        (179, "Task #36 — Medição dimensional: tipo_medicao em insumo/servico + campos dim_ em orcamento_item", migration_179_tipo_medicao),
+        (180, "Task #36 v2 — Medição dimensional: campos dim_ em proposta_itens (propagação orçamento → proposta)", _migration_180_inline),
+        (181, "Task #44 — Área manual: dim_area_manual em orcamento_item e proposta_itens", _migration_181_inline),
+        (182, "Task #28 — Substituir categorias padrão de fluxo de caixa pela estrutura de construção civil (44 categorias + grupo_financeiro) e migrar tenants existentes", migration_182_replace_categorias_fluxo_caixa),
+        (183, "Task #57 — FluxoCaixa: adicionar fornecedor_id e funcionario_id (destinatário do lançamento)", _migration_183_fluxo_caixa_destinatario),
+        (184, "Task #58 — Re-seed CategoriaFornecedor com lista completa de construção civil para todos os tenants", _migration_184_reseed_categoria_fornecedor),
+        (185, "Task #75 — Insumo: adicionar coluna fracionavel (BOOLEAN NOT NULL DEFAULT TRUE) para controle de arredondamento de compra", _migration_185_insumo_fracionavel),
+        (186, "Fix #1 Fase 1 — BancoEmpresa: data_saldo_inicial + índice fluxo_caixa(banco_id, data_movimento)", _migration_186_banco_data_saldo_inicial),
+        (188, "Fix #4 — FluxoCaixa.valor: converter FLOAT8 → NUMERIC(15,2) com arredondamento", _migration_188_fluxo_caixa_valor_numeric),
+        (189, "Bloco 3 — BDI completo (TCU): colunas de BDI em configuracao_empresa (default 0/60/90) e override nullable em propostas_comerciais", _migration_189_bdi_completo),
+        (190, "Cadastro de Regras de Classificação de Fluxo de Caixa: palavra_chave_categoria + palavra_chave_sugestao + correcao_classificacao (ADR-0002)", migration_190_palavra_chave_classificacao),
+        (191, "Seed das Regras de Classificação de Fluxo de Caixa (PalavraChaveCategoria origem='sistema') para todos os tenants existentes", migration_191_seed_regras_classificacao_sistema),
+        (192, "Fundir 'Serviços Terceirizados de Obra' em 'Subempreitada' — reaponta regras origem='sistema' em todos os tenants (decisão 2026-06-10)", migration_192_fundir_terceirizados_em_subempreitada),
+        (196, "fonte pagamento Veks/Fat em obra_servico_custo", _migration_196_obra_servico_custo_fonte_pagamento),
+        (197, "Físico-financeiro — tabela medicao_contrato", _migration_197_medicao_contrato),
+        (198, "Físico-financeiro — obra.fluxo_caixa_planilha (snapshot verbatim)", _migration_198_obra_fluxo_caixa_planilha),
+        (199, "Físico-financeiro — tabela obra_servico_custo_item (linhas de custo por etapa)", _migration_199_obra_servico_custo_item),
+        (200, "Físico-financeiro — datas de desembolso por linha de custo", _migration_200_osc_item_datas),
+        (201, "Obra.regime_medicao (fixa|percentual) + backfill percentual p/ obras com medição física", _migration_201_obra_regime_medicao),
+        (202, "Custos unificados — valor_realizado por período + strip sufixo (mês/aa) das descrições", _migration_202_osc_item_valor_realizado),
+        (203, "Realizado por lançamentos — remove obra_servico_custo_item.valor_realizado", _migration_203_drop_valor_realizado),
+        (204, "Lançamento por categoria — gestao_custo_pai.categoria_fluxo_caixa_id", _migration_204_gestao_custo_pai_categoria_fc),
+        (205, "Compras por etapa — pedido_compra.obra_servico_custo_id", _migration_205_pedido_compra_obra_servico_custo),
+        (206, "Alimentação/Transporte por etapa — obra_servico_custo_id", _migration_206_alimentacao_transporte_obra_servico_custo),
+        (207, "Cronograma-mpp M02 — tabelas de importação/versionamento (importacao, versao, snapshot, mapeamento, evento)", _migration_207_cronograma_versionamento),
+        (208, "Cronograma-mpp M02 — identidade estável em tarefa_cronograma (mpp_uid/wbs/fingerprint/is_marco/ativa)", _migration_208_tarefa_cronograma_identidade),
+        (209, "Cronograma-mpp M02 — semântica de apontamento em rdo_apontamento_cronograma (tipo/percentuais/snapshot)", _migration_209_rdo_apontamento_semantico),
+        (210, "Cronograma-mpp M02 — backfill versão nº1 + snapshots + tipo_apontamento", _migration_210_backfill_versao_inicial),
+        (211, "Cronograma-mpp M10 — flag de rollout configuracao_empresa.cronograma_mpp_ativo (default FALSE)", _migration_211_configuracao_empresa_cronograma_mpp),
+        (212, "Cronograma-mpp — backfill versão nº1 nas obras criadas após a 210 (ponto de rollback do 1º import)", _migration_212_backfill_versao_inicial_obras_novas),
+        (213, "Fase 0.5 — índices que nunca nasceram (create_all antes das migrações) + poda de 61 redundantes", _migration_213_indices_faltantes_e_duplicados),
+        (214, "Fase 1 — FK de identidade usuario.funcionario_id (nullable, UNIQUE parcial)", migration_214_usuario_funcionario_id),
+        (215, "Fase 1 — tabela usuario_obra (escopo por obra: usuario_id, obra_id, papel)", migration_215_usuario_obra),
+        (216, "Fase 1 — flag de rollout configuracao_empresa.escopo_obra_ativo (default FALSE)", migration_216_escopo_obra_flag),
+        # Fase 0.6 usou 217-219; a Fase 1 usa 214-216.
+        (217, "Fase 0.6 / D5 — canoniza obra.status ('Em Andamento' → 'Em andamento') e o dropdown obra_status", _migration_217_canonizar_status_obra),
+        (218, "Fase 0.6 / D4 — plano_contas por tenant: backfill + PK (admin_id, codigo) + 6 FKs compostas", _migration_218_plano_contas_por_tenant),
+        (219, "Fase 0.6 / D1 — linhagem de item entre versões da proposta + base congelada da medição emitida", _migration_219_revisao_proposta_linhagem_e_base),
+        (220, "Cronograma editável — tarefa_cronograma.modo_apontamento (quantidade|percentual, NULL = dedução legada)", migration_220_tarefa_modo_apontamento),
+        (221, "Cronograma editável — backfill de modo_apontamento congelando a dedução vigente (no-op de comportamento)", migration_221_backfill_modo_apontamento),
+        (222, "Cronograma editável Fase 1 — tabela tarefa_vinculo + is_critica/folga_dias + flag cronograma_editor_v2 (default FALSE)", _migration_222_tarefa_vinculo_e_colunas),
+        (223, "Cronograma editável Fase 1 — backfill predecessora_id → tarefa_vinculo TI/0 (intra-obra/tenant; sujas puladas e logadas)", _migration_223_backfill_vinculos_de_predecessora),
+        (224, "Cronograma editável Fase 3 — tabela cronograma_acao (pilha de desfazer/refazer por obra+usuário+modo)", _migration_224_cronograma_acao),
+        (225, "Cronograma editável Fase 4 — cronograma_baseline + itens (linha de base, uma ativa por obra via índice parcial)", _migration_225_cronograma_baseline),
+        (226, "RDO em porcentagem livre — flag configuracao_empresa.rdo_percentual_livre (default FALSE)", _migration_226_flag_rdo_percentual_livre),
+        (230, "Fase 2 — tabela obra_transicao_estado (historico de transicoes: de/para/quem/quando/motivo)", migration_230_obra_transicao_estado),
+        (231, "Fase 2 — obra.estado (VARCHAR+CHECK) + backfill derivado de status/ativo + historico do backfill", migration_231_obra_estado),
+        (232, "Fase 2 — alinha obra.status (espelho legado) ao obra.estado derivado pela 231", migration_232_normalizar_status_legado),
+        (240, "Fase 3 — tabela requisicao_compra (documento de demanda, obra_id NOT NULL)", migration_240_requisicao_compra),
+        (241, "Fase 3 — tabela requisicao_compra_item", migration_241_requisicao_compra_item),
+        (242, "Fase 3 — trilha de auditoria requisicao_transicao (quem/quando/valor)", migration_242_requisicao_transicao),
+        (243, "Fase 3 — faixa_alcada + seed das faixas recomendadas (5k / 30k / acima) por tenant", migration_243_faixa_alcada),
+        (244, "Fase 3 — pedido_compra.requisicao_id (origem do pedido; NULL = avulso legado)", migration_244_pedido_compra_requisicao_id),
+        (245, "Fase 3 — PapelObra.COMPRADOR (estende o enum de papel de obra)", migration_245_papel_obra_comprador),
+        (246, "Fase 3 — flag por tenant compras_governanca_ativa (default FALSE)", migration_246_flag_compras_governanca),
+        (247, "Fase 3 — obra.token_cliente_expira_em + trilha portal_acesso_evento (IP/UA)", migration_247_portal_token_expiracao_e_trilha),
+        (250, "Fase 4 — centro_custo: unicidade (admin_id, codigo) + índice único parcial do centro administrativo", migration_250_centro_custo_unicidade_por_tenant),
+        (251, "Fase 4 — seed do centro de custo administrativo (um por tenant)", migration_251_seed_centro_custo_administrativo),
+        (252, "Fase 4 — gestao_custo_pai.obra_id (nullable, derivada dos filhos)", migration_252_gestao_custo_pai_obra_id),
+        (253, "Fase 4 — CHECK ck_gestao_custo_filho_destino em modo NOT VALID (trava a escrita nova)", migration_253_check_destino_custo_not_valid),
+        (254, "Fase 4 — VALIDATE do CHECK de destino (varre o histórico; aborta e retenta se houver pendência)", migration_254_validate_check_destino_custo),
+        (260, "Fase 5 — rdo.estado (ciclo de vida) + backfill histórico como 'preenchido'", migration_260_rdo_estado),
+        (261, "Fase 5 — tabela rdo_transicao_estado (trilha do ciclo de vida do RDO)", migration_261_rdo_transicao_estado),
+        (262, "Fase 5 — tabela rdo_assinatura (autoria + hash + carimbo de tempo + IP)", migration_262_rdo_assinatura),
+        (263, "Fase 5 — rdo.rdo_retificado_id + motivo_retificacao (RDO retificador)", migration_263_rdo_retificador),
+        (264, "Fase 5 — rdo_foto.armazenamento ('banco'|'disco'): marcador da migração de fotos", migration_264_rdo_foto_armazenamento),
+        (265, "Carimba tipo_apontamento nas linhas de RDO que ficaram sem rótulo (import e views/rdo)", migration_265_backfill_tipo_apontamento_restante),
+        (266, "Repara as linhas de base v1 do backfill 210/212 (snapshot de cronograma de cliente, versão em tenant errado)", migration_266_reparar_linhas_de_base_do_backfill),
+        (267, "Fase 9a — obra_signatario_cliente + rdo_assinatura.signatario_cliente_id", _migration_267_signatario_cliente),
+        (268, "Fase 9a — unicidade de assinatura por signatário (dois índices parciais)", _migration_268_unicidade_assinatura_por_signatario),
+        (269, "Fase 9a — remove uq_rdo_assinatura_papel também quando é ÍNDICE (a 268 só tratava constraint)", _migration_269_remover_indice_unico_antigo_de_assinatura),
+        (277, "Editor de cronograma v2 em todo o parque — linha de base primeiro, flag ligada em todos os tenants, default da coluna vira TRUE", _migration_277_editor_v2_em_todo_o_parque),
+        (278, "p10 — cronograma_baseline.bac (orçamento congelado junto com o prazo; NULL = baseline anterior)", _migration_278_baseline_bac),
+        (279, "E02 — drop de notificacao_cliente, auto-guardado pela contagem (falha e retenta se houver linha)", _migration_279_drop_notificacao_cliente),
+        (280, "B5.6 / D-B5.6(A) — conta_pagar.banco_id: o banco debitado na baixa, para o estorno creditar de volta (NULL = sem banco ou pré-migração)", _migration_280_conta_pagar_banco_id),
+        (281, "B6.1 / D-B6.1 — conta_receber.banco_id: o banco creditado na baixa, para o estorno de recebimento debitar de volta (NULL = sem banco, pré-migração ou OBRA_MEDICAO)", _migration_281_conta_receber_banco_id),
+        (282, "CRM C1 / D-CRM.1 — backfill dos dropdowns: cria o grupo que a 173 pulou e copia as opções legadas crm_* que a 174 não alcançou (JOIN sem grupo não casa)", _migration_282_backfill_dropdown_crm),
+        (283, "Fase 4 — recebimento_pedido + recebimento_pedido_item; pedido_compra.exige_atesto (regime carimbado na linha) e situacao_recebimento", _migration_283_recebimento_atesto),
+        (284, "Fase 4 — configuracao_empresa.recebimento_atesto_ativo: a virada do recebimento é por tenant (default FALSE)", _migration_284_flag_recebimento_atesto),
+        (285, "Fase 4/C2 — recebimento_pedido_item.almoxarifado_saida_movimento_id: a saída de consumo pareada do atesto, para o estorno saber o que desfazer", _migration_285_saida_do_atesto),
+        (286, "Timbre dos PDFs — configuracao_empresa.timbre_pdf (JSONB): logo, dados da empresa e cores num JSON importável pela tela", _migration_286_timbre_pdf),
+        (288, "Fase 2 — pedido_compra.fluxo_pagamento; conta_pagar.situacao_liberacao/liberada_por_id/liberada_em; trilha de quem fechou e reabriu o lote", _migration_288_regime_e_liberacao),
+        (289, "Fase 2 — configuracao_empresa.financeiro_dois_fluxos_ativo (default FALSE) + tolerancia_divergencia_nf_pct (2,00%, decisão D1 editável)", _migration_289_flag_e_tolerancia),
+        (296, "Fase 2/F5 — fechamento_pagamento.criado_por_id: quem MONTOU o lote, sem o qual a segregacao \"quem monta nao fecha\" nao e verificavel. 290-295 e faixa da Fase 8; 300-307 da Fase 9", _migration_296_fechamento_criado_por),
+        # ⚠️ migration_history.migration_name e VARCHAR(200): descricao mais
+        # longa que isso faz o INSERT do historico falhar em SILENCIO
+        # (record_migration engole a excecao) — a migration roda, nao fica
+        # registrada e volta a rodar a cada boot. O "porque" longo mora na
+        # docstring de cada funcao; aqui cabe so a frase. Ver 📌 no spec.
+        (297, "Fase 3 — faixa_alcada.minimo_cotacoes (default 0) e condicoes_ativas (default ''); backfill minimo_cotacoes=2 onde exige_mapa_concorrencia e true (preserva o >= 2 de hoje; o 3 e a D6, por UPDATE)", _migration_297_faixa_condicoes),
+        (298, "Fase 3 — requisicao_compra.regime_alcada/emergencial/ratificada_em/degrau_aplicado (defaults = o registro historico) + os dois indices do acumulado do anti-fracionamento", _migration_298_requisicao_alcada),
+        (299, "Fase 3 — configuracao_empresa.alcadas_avancadas_ativa (default FALSE) + janela_fracionamento_dias (30 dias, decisao D2 editavel)", _migration_299_flag_e_janela),
+        (308, "Fecho da Fase 2 — conta_pagar.liberacao_justificativa: nao-nulo = liberacao excepcional, a porta de escape do D6. 308 e nao 300: 300-307 e faixa da Fase 9 e 290-295 da Fase 8, nenhuma aplicada", _migration_308_liberacao_justificativa),
+        (309, "E02 segunda tentativa — a 279 gravou success e nao pegou: create_all roda antes das migrations e recriou a tabela enquanto o modelo existia. Drop guardado pela contagem, como a 279", _migration_309_drop_notificacao_cliente_de_novo),
+        (310, "Saida da segregacao — fechamento_pagamento.segregacao_justificativa: nao-nulo = quem montou o lote o fechou e escreveu por que. Carimbar criado_por_id liga o guarda pela 1a vez", _migration_310_segregacao_justificativa),
+        (311, "Fase 2 do ciclo — nota_fiscal_pedido (chave_acesso NULLABLE, ao contrario da NotaFiscal legada) + adiantamento_fornecedor. ERA 287: o numero colidiu com outra linhagem do repo", _migration_311_nota_e_adiantamento),
+        (312, "Saldos mensais — balancete_mensal mantido a cada lançamento: índice da abertura + reconstrução de todos os tenants (a tabela só tinha o que a tela gerou)", _migration_312_saldos_mensais),
+        (313, "Preview de importação no servidor — preview_importacao_linha: o fluxo de caixa confirma com o token e só as edições, sem devolver o preview pelo formulário", _migration_313_preview_importacao),
+        (314, "Fatos de produção — fato_producao_mao_obra por (RDO, serviço, funcionário), mantida no commit: ranking, cards e detalhe do funcionário leem dali. Backfill de todos os tenants", _migration_314_fatos_producao),
+        (315, "Filtros de período sargáveis — mês/ano como intervalo meio-aberto de data (services/periodo); índices (funcionario_id|obra_id|admin_id, data) do registro_ponto fora de ramo condicional", _migration_315_indices_periodo_ponto),
+        (316, "Fotos de RDO — versões (otimizada, thumbnail) geradas por fila fora do request: rdo_foto.processamento/tentativas/reservado_ate + índice parcial das pendentes", _migration_316_rdo_foto_processamento),
+    ]
+
+
 def executar_migracoes():
     """
     Execute todas as migrações necessárias automaticamente com rastreamento
@@ -6906,285 +7392,7 @@ def executar_migracoes():
 
         logger.info("🔄 Verificando migrações pendentes...")
         
-        # Task #44 — local helper para migration_181 (dim_area_manual em orcamento_item e proposta_itens)
-        def _migration_181_inline():
-            from sqlalchemy import text as _text
-            logger.info("[Migration 181] Iniciando — dim_area_manual em orcamento_item e proposta_itens")
-            for _tbl in ('orcamento_item', 'proposta_itens'):
-                db.session.execute(_text(
-                    f"ALTER TABLE {_tbl} ADD COLUMN IF NOT EXISTS dim_area_manual NUMERIC(15,4)"
-                ))
-            db.session.commit()
-            logger.info("[Migration 181] Concluída com sucesso")
-
-        # Task #36 v2 — local helper para migration_180 (proposta_itens dim fields)
-        def _migration_180_inline():
-            from sqlalchemy import text as _text
-            logger.info("[Migration 180] Iniciando — Medição Dimensional em proposta_itens")
-            for _col, _tipo in [
-                ('tipo_medicao_override', 'VARCHAR(30)'),
-                ('dim_largura', 'NUMERIC(15,4)'),
-                ('dim_comprimento', 'NUMERIC(15,4)'),
-                ('dim_perimetro', 'NUMERIC(15,4)'),
-                ('dim_pe_direito', 'NUMERIC(15,4)'),
-            ]:
-                db.session.execute(_text(
-                    f"ALTER TABLE proposta_itens ADD COLUMN IF NOT EXISTS {_col} {_tipo}"
-                ))
-            db.session.commit()
-            logger.info("[Migration 180] Concluída com sucesso")
-
-        # ===== MIGRAÇÕES ATIVAS COM RASTREAMENTO =====
-        migrations_to_run = [
-            (20, "Sistema de Veículos Inteligente", _migration_20_unified_vehicle_system),
-            (27, "Sistema de Alimentação", _migration_27_alimentacao_system),
-            (33, "Recriar frota_despesa", _migration_33_recreate_frota_despesa),
-            (34, "Campos pagamento Restaurante", _migration_34_restaurante_campos_pagamento),
-            (35, "Coluna numero_nota_fiscal custo_veiculo", _migration_35_custo_veiculo_numero_nota_fiscal),
-            (36, "Remover tabelas propostas legado", _migration_36_remove_old_propostas_tables),
-            (37, "Renomear campos propostas_comerciais", _migration_37_rename_propostas_fields),
-            (38, "Criar proposta_historico", _migration_38_create_proposta_historico),
-            (39, "Sistema Almoxarifado v3.0", _migration_39_create_almoxarifado_system),
-            (40, "Sistema Ponto Eletrônico Compartilhado", _migration_40_ponto_compartilhado),
-            (41, "Sistema Financeiro v9.0", _migration_41_sistema_financeiro),
-            (42, "Configuração Obras/Funcionário Ponto", _migration_42_funcionario_obras_ponto),
-            (43, "Completar estruturas v9.0", _migration_43_completar_estruturas_v9),
-            (44, "Adicionar jornada_semanal a funcionario", _migration_44_adicionar_jornada_semanal),
-            (45, "Corrigir schema da tabela propostas_comerciais", _migration_45_corrigir_schema_propostas),
-            (46, "Adicionar descricao a centro_custo_contabil", _migration_46_adicionar_descricao_centro_custo),
-            (47, "Adicionar fornecedor_id ao almoxarifado_movimento", _migration_47_almoxarifado_fornecedor),
-            (48, "Adicionar admin_id em 17 modelos faltantes", _migration_48_adicionar_admin_id_modelos_faltantes),
-            (49, "Campos de alertas veículos (IPVA/Seguro)", _migration_49_vehicle_alertas),
-            (50, "Schema completo tabela uso_veiculo", _migration_50_uso_veiculo_schema_completo),
-            (51, "Schema completo tabela custo_veiculo", _migration_51_custo_veiculo_schema_completo),
-            (52, "RDO Foto - otimização de campos", _migration_52_rdo_foto_campos_otimizacao),
-            (53, "RDO Foto - persistência Base64", _migration_53_rdo_foto_base64),
-            (54, "Tamanho logo portal do cliente", _migration_54_logo_tamanho_portal),
-            (55, "Token cliente para portal público", _migration_55_token_cliente_proposta),
-            (56, "PropostaArquivo - persistência Base64", _migration_56_proposta_arquivo_base64),
-            (57, "Campos CRUD movimentações almoxarifado", _migration_57_almoxarifado_movimento_campos_crud),
-            (58, "Sistema de Rastreamento de Lotes FIFO", _migration_58_almoxarifado_lotes_fifo),
-            (59, "Sistema de Itens de Alimentação v2.0", _migration_59_alimentacao_itens_sistema),
-            (60, "Adicionar created_at em centro_custo_contabil", _migration_60_centro_custo_created_at),
-            (61, "Sistema HorarioDia para horários flexíveis", _migration_61_horario_dia_sistema),
-            (62, "Tornar colunas legadas de HorarioTrabalho nullable", _migration_62_horario_trabalho_nullable),
-            (63, "Tolerância minutos para horas extras/atrasos", _migration_63_tolerancia_minutos),
-            (64, "Tabela folha_processada para dashboard custos obra", _migration_64_folha_processada),
-            (65, "Adicionar coluna nome em fornecedor", _migration_65_fornecedor_nome),
-            (66, "Campos reconhecimento facial RegistroPonto", _migration_66_reconhecimento_facial_ponto),
-            (67, "Sistema de Geofencing (Cerca Virtual)", _migration_67_geofencing),
-            (68, "Sistema de Múltiplas Fotos Faciais", _migration_68_multiplas_fotos_faciais),
-            (69, "custo_veiculo.obra_id nullable", _migration_69_custo_veiculo_obra_nullable),
-            (70, "Versionamento V1/V2 por Tenant (Feature Flag)", _migration_70_versao_sistema_usuario),
-            (71, "Remuneração por Diária V2 (Funcionario)", _migration_71_remuneracao_diaria_funcionario),
-            (72, "Alimentação V2 - funcionario_id e centro_custo_id por item", _migration_72_alimentacao_item_v2),
-            (73, "Transporte V2 - tabelas categoria_transporte e lancamento_transporte", _migration_73_transporte_v2),
-            (74, "Compras V2 - tabelas pedido_compra e pedido_compra_item", _migration_74_compras_v2),
-            (75, "Cronograma V2 - CalendarioEmpresa e TarefaCronograma", _migration_75_cronograma_v2),
-            (76, "RDO Apontamento Cronograma V2 - tabela rdo_apontamento_cronograma", _migration_76_rdo_apontamento_cronograma),
-            (77, "Gestão de Custos V2 - tabelas gestao_custo_pai e gestao_custo_filho", _migration_77_gestao_custos_v2),
-            (78, "Transporte V2 - centro_custo_id nullable + funcionario_id nullable", _migration_78_transporte_centro_custo_nullable),
-            (79, "Reembolso V2 - tabela reembolso_funcionario", _migration_79_reembolso_funcionario),
-            (80, "Reembolso V2 - categoria e comprovante_url", _migration_80_reembolso_campos_extras),
-            (81, "Reembolso V2 - gestao_custo_pai_id FK", _migration_81_reembolso_gestao_custo_pai_id),
-            (82, "Obra codigo - unique por tenant (codigo+admin_id)", _migration_82_obra_codigo_per_tenant),
-            (83, "GestaoCustoPai - data_vencimento e numero_documento para DESPESA_GERAL", _migration_83_gestao_custo_vencimento),
-            (84, "AlimentacaoLancamento - restaurante_id nullable para V2", _migration_84_alimentacao_restaurante_nullable),
-            (85, "GestaoCustoPai - fornecedor_id, forma_pagamento, valor_pago, saldo, conta_contabil_codigo, data_emissao, numero_parcela, total_parcelas", _migration_85_gestao_custo_pai_novas_colunas),
-            (86, "CustoObra - colunas extras (funcionario_id, rdo_id, categoria, horas, quantidade, veiculo, almoxarifado)", _migration_86_custo_obra_colunas_extras),
-            (87, "Proposta - numero_proposta unique por tenant (numero_proposta + admin_id)", migration_87_proposta_numero_unique_por_tenant),
-            (88, "TarefaCronograma - campo responsavel (empresa/terceiros)", migration_88_tarefa_cronograma_responsavel),
-            (89, "RDO - criado_por_id nullable (FK usuario)", migration_89_rdo_criado_por_nullable),
-            (90, "RDOMaoObra - subatividade_id (FK cascade) + horas_extras", migration_90_rdo_mao_obra_subatividade),
-            (91, "RDOMaoObra - tarefa_cronograma_id (FK SET NULL) para métricas por tarefa", migration_91_rdo_mao_obra_tarefa_cronograma),
-            (92, "AlmoxarifadoMovimento - pedido_compra_id FK opcional para rastreamento de origem", migration_92_almoxarifado_pedido_compra_id),
-            (93, "PedidoCompra - centro_custo_id nullable (obra é o centro de custo principal)", migration_93_pedido_compra_centro_custo_nullable),
-            (94, "SubatividadeMestre - unidade_medida e meta_produtividade para catálogo de produtividade", migration_94_subatividade_mestre_produtividade),
-            (95, "CronogramaTemplate e CronogramaTemplateItem - templates reutilizáveis de cronograma", migration_95_cronograma_templates),
-            (96, "RDOServicoSubatividade - quantidade_produzida, subatividade_mestre_id e snapshots de produtividade", migration_96_rdo_servico_subatividade_produtividade),
-            (97, "RDOMaoObra - produtividade_real e indice_produtividade calculados na finalização do RDO", migration_97_rdo_mao_obra_produtividade),
-            (98, "SubatividadeMestre tipo+servico_id nullable, CronogramaTemplateItem parent_item_id - catálogo hierárquico", migration_98_catalogo_hierarquico),
-            (99, "RDOServicoSubatividade servico_id nullable para suportar subatividades sem serviço vinculado", migration_99_rdo_servico_sub_nullable),
-            (100, "TarefaCronograma - subatividade_mestre_id FK para rastreamento de catálogo", migration_100_tarefa_cronograma_subatividade_mestre_id),
-            (101, "Funcionario - chave_pix, valor_va e valor_vt para PIX e benefícios diários", migration_101_funcionario_pix_va_vt),
-            (102, "Funcionario - codigo unique por tenant (codigo+admin_id) em vez de global", migration_102_funcionario_codigo_per_tenant),
-            (103, "import_batch_id em gestao_custo_pai, conta_pagar, conta_receber, fluxo_caixa — rollback de importação", migration_103_import_batch_id),
-            (104, "Fornecedor - tipo_fornecedor (MATERIAL / PRESTADOR_SERVICO / OUTRO)", migration_104_tipo_fornecedor),
-            (105, "FluxoCaixa - banco_id FK opcional para BancoEmpresa", migration_105_fluxo_caixa_banco_id),
-            (106, "RDO e filhos — ON DELETE CASCADE para exclusão em cascata com Obra", migration_106_rdo_obra_cascade),
-            (107, "Portal do Cliente — chave_pix, status_aprovacao_cliente, medicao_obra", migration_107_portal_cliente_obra),
-            (108, "Medição Quinzenal — itens comerciais, tarefas vinculadas, expansão medicao_obra", migration_108_medicao_quinzenal),
-            (109, "Mapa de Concorrência — tabelas mapa_concorrencia e opcao_concorrencia", migration_109_mapa_concorrencia),
-            (110, "OpcaoConcorrencia — enforça NOT NULL em admin_id", migration_110_opcao_concorrencia_admin_not_null),
-            (111, "CronogramaCliente — cronograma editável para portal do cliente", migration_111_cronograma_cliente),
-            (112, "MapaConcorrenciaV2 — tabela multi-fornecedor com cotações por item", migration_112_mapa_concorrencia_v2),
-            (113, "TarefaCronograma — data_entrega_real DATE para entregas/terceiros", migration_113_tarefa_cronograma_data_entrega_real),
-            (114, "Subempreiteiro + RDOSubempreitadaApontamento + GestaoCustoPai.subempreiteiro_id", migration_114_subempreiteiro),
-            (115, "Consolidar GestaoCustoPai duplicados por (admin_id, entidade_id, categoria normalizada)", migration_115_consolidar_gestao_custo_pai_duplicados),
-            (116, "PedidoCompra — tipo_compra (normal/aprovacao_cliente) + processada_apos_aprovacao", migration_116_pedido_compra_tipo_compra),
-            (117, "TarefaCronograma — is_cliente BOOLEAN (paridade total no editor cliente)", migration_117_tarefa_cronograma_is_cliente),
-            (118, "Task #70 — Resumo de Custos da Obra (obra_servico_custo + equipe + cotação + percentual_administracao)", migration_118_resumo_custos_obra),
-            (119, "Task #74 — GestaoCustoFilho.obra_servico_custo_id (vínculo direto custo→serviço)", migration_119_gestao_custo_filho_obra_servico),
-            (120, "Task #76 — NotificacaoOrcamento (alertas de estouro de orçamento por serviço)", migration_120_notificacao_orcamento),
-            (121, "Task #82 — Catálogo de Insumos + Composição de Serviços + Orçamento Paramétrico", migration_121_catalogo_servicos_orcamento),
-            (122, "Task #82 — ItemMedicaoComercial.proposta_item_id (dedupe determinístico de propagação)", migration_122_item_medicao_proposta_item_id),
-            (123, "Task #82 — ComposicaoServico.unidade (snapshot da unidade do insumo)", migration_123_composicao_servico_unidade),
-            (124, "Task #89 — Snapshot de cálculo paramétrico em PropostaItem e ItemMedicaoComercial", migration_124_snapshot_calculo_parametrico),
-            (125, "Task #102 — Cronograma automático na aprovação (servico.template_padrao_id, propostas.cronograma_default_json, tarefa_cronograma.gerada_por_proposta_item_id)", migration_125_cronograma_automatico_aprovacao),
-            (126, "Task #115 — Orçamento + OrcamentoItem (camada interna que gera Proposta)", migration_126_orcamento),
-            (127, "Task #115 v2 — propostas_comerciais.orcamento_id (Orçamento → N Propostas)", migration_127_proposta_orcamento_id),
-            (128, "Task #118 — cronograma_template_override_id em orcamento_item e proposta_itens + composicao_snapshot em proposta_itens", migration_128_orcamento_item_cronograma_override),
-            (129, "Task #158 — assinatura e engenheiro responsável em configuracao_empresa", migration_129_configuracao_empresa_assinatura_engenheiro),
-            (130, "Task #165 — alinhar tipos numéricos de orçamento/proposta_itens (Float→Numeric)", migration_130_alinhar_tipos_numericos_orcamento_proposta),
-            (131, "Task #166 — coeficiente_padrao em insumo (sugestão p/ composição)", migration_131_insumo_coeficiente_padrao),
-            (132, "Task #172 — Obra.cliente_id FK + backfill por nome/email do cliente", migration_132_obra_cliente_id_fk),
-            (133, "Task #173 — engenheiro_responsavel + FKs em configuracao_empresa e propostas_comerciais (backfill do legado)", migration_133_engenheiro_responsavel),
-            (134, "Task #174 — proposta_clausula + proposta_template_clausula (backfill cláusulas configuráveis)", migration_134_clausulas_configuraveis),
-            (135, "Task #191 — tema do sistema (cor_header_nav, cor_fundo_app, tema_preset em configuracao_empresa)", migration_135_tema_sistema_configuracao_empresa),
-            (137, "Task #176/#178 — backfill obras órfãs + DROP legacy cliente_*/engenheiro_* + obra.cliente_id NOT NULL", migration_137_drop_legacy_cliente_e_engenheiro),
-            (138, "Task #162 — scrub de defaults legados em proposta_templates (Lucas Barbosa / São José dos Campos)", migration_138_scrub_proposta_templates_defaults),
-            (139, "Task #142 — rdo_apontamento_cronograma.percentual_planejado nullable + backfill NULL para tarefas sem plano", migration_139_apontamento_cronograma_planejado_nullable),
-            (140, "Task #200 — obra.cronograma_revisado_em (gate de revisão inicial de cronograma)", migration_140_obra_cronograma_revisado_em),
-            (141, "Task #201 — drop tabelas legadas de propostas (proposta + 7 dependentes/órfãs)", migration_141_drop_legacy_propostas_tables),
-            (142, "Task #21 — Mapa V2: prazo/obs/condições por fornecedor + fornecedor_escolhido_id por item + relatorio_compra_mapa", migration_142_mapa_v2_relatorio_compra),
-            (143, "Task #21 — relatorio_compra_mapa: UNIQUE (mapa_id, versao) p/ versionamento seguro sob concorrência", migration_143_relatorio_compra_unique_versao),
-            (144, "Task #31 — versionamento + revisão obrigatória de propostas (proposta + proposta_clausula)", migration_144_proposta_versionamento_revisao),
-            (145, "Task #38 — rdo_mao_obra.peso_distribuicao (peso da tarefa principal do funcionário)", migration_145_rdo_mao_obra_peso_distribuicao),
-            (146, "Task #42 — CRM de Leads: 9 tabelas (lead, lead_historico, 7 listas mestras) + seed genérico (sem Responsáveis)", migration_146_crm_leads_e_seed_generico),
-            (147, "Task #18 hotfix — itens_inclusos/itens_exclusos em proposta_itens e orcamento_item", migration_147_proposta_orcamento_itens_inclusos_exclusos),
-            (148, "Task #47 — proposta_templates.padrao + índice parcial único + backfill (template mais antigo por admin)", migration_148_proposta_templates_padrao),
-            (149, "Task #43 — webhook_entrega (fila/log de notificações para n8n)", migration_149_webhook_entrega),
-            (150, "Task #63 — Orçamento Operacional da Obra (3 tabelas + backfill)", migration_150_obra_orcamento_operacional),
-            (151, "Task #62 — vínculos Cronograma↔Subatividade↔Serviço↔Mão-de-obra", migration_151_vinculo_subatividade_composicao),
-            (152, "Task #2 — rdo_custo_diario: tabela + índices parciais para custo diário de mão-de-obra", migration_152_rdo_custo_diario),
-            (153, "Task #3 — composicao_servico_historico: histórico de alterações de coeficiente via métricas", migration_153_composicao_servico_historico),
-            # Migração 154 APOSENTADA do boot — agora roda sob demanda via
-            # scripts/migrar_rdos_rascunho_legados.py. Mantida marcada como
-            # 'success' no migration_history (via _aposentar_migracao_154)
-            # para garantir idempotência em ambientes que ainda não a tinham
-            # registrado. A função migration_154_force_rdo_finalizado segue
-            # viva como biblioteca usada pelo script avulso.
-            (155, "Task #5 — RDO: drop coluna rdo_mao_obra.horas_extras (hora extra removida do RDO)", migration_155_drop_rdo_mao_obra_horas_extras),
-            (156, "Task #7 — custo_obra.descricao: ampliar de VARCHAR(200) para VARCHAR(500) (RDO com muitas subatividades)", migration_156_custo_obra_descricao_500),
-            (157, "Task #69 — backfill produtividade_real/indice_produtividade em RDOMaoObra para RDOs Finalizados com dados suficientes", migration_157_backfill_produtividade_rdo),
-            (158, "Task #77 — cliente_observacao: histórico de anotações livres por cliente (CRM)", migration_158_cliente_observacao),
-            (159, "Task #84 — backfill composicao_servico_id/vinculo_status em rdo_mao_obra para registros históricos nulos", migration_159_backfill_composicao_servico_id),
-            (160, "Task #95 — CRM: adicionar vendedor_id e orcamentista_id na tabela lead + backfill de responsavel_id", migration_160_crm_vendedor_orcamentista),
-            (161, "CRM: adicionar coluna prioridade (boolean) na tabela lead", migration_161_lead_prioridade),
-            (162, "Task #110 — CRM: validacao_aprovada, validado_por_id, validado_em na tabela lead", migration_162_lead_validacao),
-            (163, "Task #113 — CRM: adicionar coluna prazo (Date, nullable) na tabela lead", migration_163_lead_prazo),
-            (164, "Task #119 — rdo_ocorrencia: adicionar colunas faltantes (tipo_ocorrencia, severidade, descricao_ocorrencia, etc.)", migrar_campos_rdo_ocorrencia),
-            (165, "Task #6 — Módulo Custos do Escritório (3 tabelas + seed 10 categorias padrão por tenant)", migration_165_custos_escritorio),
-            (166, "Task #10 — Catálogos Auxiliares (categoria_fluxo_caixa, categoria_fornecedor, categoria_reembolso, fornecedor_categorias M2M, fluxo_caixa.categoria_fluxo_caixa_id)", migration_166_catalogos_auxiliares),
-            (167, "Task #11 — Compras Parceladas: novos campos em conta_pagar/pedido_compra/gestao_custo_pai + tabelas dia_pagamento_config e fechamento_pagamento", migration_167_compras_parceladas),
-            (168, "Task #11 v2 — gestao_custo_pai.fechamento_id FK para fechamento_pagamento (fonte única de obrigação financeira de compras)", migration_168_gcp_fechamento_id),
-            (169, "Task #17 — Seed de categorias padrão nos catálogos (categoria_fluxo_caixa, categoria_fornecedor, categoria_reembolso) para todos os tenants existentes", migration_169_seed_categorias_catalogo),
-            (170, "Task #19 — fator_comercial + unidade_comercial em insumo (quantidade comercial/embalagem)", migration_170_insumo_quantidade_comercial),
-            (171, "Task #23 — observacao_validacao em propostas_comerciais (nota interna de validação)", migration_171_proposta_observacao_validacao),
-            (172, "CRM — comentario_revisao em lead (comentário do supervisor ao pedir revisão)", migration_172_lead_comentario_revisao),
-            (173, "Motor universal de dropdowns — DropdownGrupo + DropdownOpcao + seed CRM", migration_173_dropdown_motor),
-            (174, "Motor de dropdowns v2 — ext_id + sync CRM→DropdownOpcao + seed padrão", migration_174_dropdown_ext_id_sync),
-            (175, "Task #10 — seed grupos universais (Obras, RDO, Frota, Financeiro, Almoxarifado, Alimentação, Serviços, Funcionários)", migration_175_seed_novos_grupos),
-            (176, "Task #10 v2 — corrige valores incorretos de rdo_tempo/rdo_condicao_trabalho/rdo_status_equipamento para todos os tenants", migration_176_fix_rdo_slugs),
-            (177, "Task #10 v3 — corrige almoxarifado_tipo_movimento: SAÍDA→SAIDA, DEVOLUÇÃO→DEVOLUCAO para todos os tenants", migration_177_fix_almox_tipo_movimento),
-            (178, "Task #29 — Grupos Financeiros: criar tabela grupo_financeiro + coluna grupo_financeiro_id em categoria_fluxo_caixa", migration_178_grupo_financeiro),
-            (179, "Task #36 — Medição dimensional: tipo_medicao em insumo/servico + campos dim_ em orcamento_item", migration_179_tipo_medicao),
-            (180, "Task #36 v2 — Medição dimensional: campos dim_ em proposta_itens (propagação orçamento → proposta)", _migration_180_inline),
-            (181, "Task #44 — Área manual: dim_area_manual em orcamento_item e proposta_itens", _migration_181_inline),
-            (182, "Task #28 — Substituir categorias padrão de fluxo de caixa pela estrutura de construção civil (44 categorias + grupo_financeiro) e migrar tenants existentes", migration_182_replace_categorias_fluxo_caixa),
-            (183, "Task #57 — FluxoCaixa: adicionar fornecedor_id e funcionario_id (destinatário do lançamento)", _migration_183_fluxo_caixa_destinatario),
-            (184, "Task #58 — Re-seed CategoriaFornecedor com lista completa de construção civil para todos os tenants", _migration_184_reseed_categoria_fornecedor),
-            (185, "Task #75 — Insumo: adicionar coluna fracionavel (BOOLEAN NOT NULL DEFAULT TRUE) para controle de arredondamento de compra", _migration_185_insumo_fracionavel),
-            (186, "Fix #1 Fase 1 — BancoEmpresa: data_saldo_inicial + índice fluxo_caixa(banco_id, data_movimento)", _migration_186_banco_data_saldo_inicial),
-            (188, "Fix #4 — FluxoCaixa.valor: converter FLOAT8 → NUMERIC(15,2) com arredondamento", _migration_188_fluxo_caixa_valor_numeric),
-            (189, "Bloco 3 — BDI completo (TCU): colunas de BDI em configuracao_empresa (default 0/60/90) e override nullable em propostas_comerciais", _migration_189_bdi_completo),
-            (190, "Cadastro de Regras de Classificação de Fluxo de Caixa: palavra_chave_categoria + palavra_chave_sugestao + correcao_classificacao (ADR-0002)", migration_190_palavra_chave_classificacao),
-            (191, "Seed das Regras de Classificação de Fluxo de Caixa (PalavraChaveCategoria origem='sistema') para todos os tenants existentes", migration_191_seed_regras_classificacao_sistema),
-            (192, "Fundir 'Serviços Terceirizados de Obra' em 'Subempreitada' — reaponta regras origem='sistema' em todos os tenants (decisão 2026-06-10)", migration_192_fundir_terceirizados_em_subempreitada),
-            (196, "fonte pagamento Veks/Fat em obra_servico_custo", _migration_196_obra_servico_custo_fonte_pagamento),
-            (197, "Físico-financeiro — tabela medicao_contrato", _migration_197_medicao_contrato),
-            (198, "Físico-financeiro — obra.fluxo_caixa_planilha (snapshot verbatim)", _migration_198_obra_fluxo_caixa_planilha),
-            (199, "Físico-financeiro — tabela obra_servico_custo_item (linhas de custo por etapa)", _migration_199_obra_servico_custo_item),
-            (200, "Físico-financeiro — datas de desembolso por linha de custo", _migration_200_osc_item_datas),
-            (201, "Obra.regime_medicao (fixa|percentual) + backfill percentual p/ obras com medição física", _migration_201_obra_regime_medicao),
-            (202, "Custos unificados — valor_realizado por período + strip sufixo (mês/aa) das descrições", _migration_202_osc_item_valor_realizado),
-            (203, "Realizado por lançamentos — remove obra_servico_custo_item.valor_realizado", _migration_203_drop_valor_realizado),
-            (204, "Lançamento por categoria — gestao_custo_pai.categoria_fluxo_caixa_id", _migration_204_gestao_custo_pai_categoria_fc),
-            (205, "Compras por etapa — pedido_compra.obra_servico_custo_id", _migration_205_pedido_compra_obra_servico_custo),
-            (206, "Alimentação/Transporte por etapa — obra_servico_custo_id", _migration_206_alimentacao_transporte_obra_servico_custo),
-            (207, "Cronograma-mpp M02 — tabelas de importação/versionamento (importacao, versao, snapshot, mapeamento, evento)", _migration_207_cronograma_versionamento),
-            (208, "Cronograma-mpp M02 — identidade estável em tarefa_cronograma (mpp_uid/wbs/fingerprint/is_marco/ativa)", _migration_208_tarefa_cronograma_identidade),
-            (209, "Cronograma-mpp M02 — semântica de apontamento em rdo_apontamento_cronograma (tipo/percentuais/snapshot)", _migration_209_rdo_apontamento_semantico),
-            (210, "Cronograma-mpp M02 — backfill versão nº1 + snapshots + tipo_apontamento", _migration_210_backfill_versao_inicial),
-            (211, "Cronograma-mpp M10 — flag de rollout configuracao_empresa.cronograma_mpp_ativo (default FALSE)", _migration_211_configuracao_empresa_cronograma_mpp),
-            (212, "Cronograma-mpp — backfill versão nº1 nas obras criadas após a 210 (ponto de rollback do 1º import)", _migration_212_backfill_versao_inicial_obras_novas),
-            (213, "Fase 0.5 — índices que nunca nasceram (create_all antes das migrações) + poda de 61 redundantes", _migration_213_indices_faltantes_e_duplicados),
-            (214, "Fase 1 — FK de identidade usuario.funcionario_id (nullable, UNIQUE parcial)", migration_214_usuario_funcionario_id),
-            (215, "Fase 1 — tabela usuario_obra (escopo por obra: usuario_id, obra_id, papel)", migration_215_usuario_obra),
-            (216, "Fase 1 — flag de rollout configuracao_empresa.escopo_obra_ativo (default FALSE)", migration_216_escopo_obra_flag),
-            # Fase 0.6 usou 217-219; a Fase 1 usa 214-216.
-            (217, "Fase 0.6 / D5 — canoniza obra.status ('Em Andamento' → 'Em andamento') e o dropdown obra_status", _migration_217_canonizar_status_obra),
-            (218, "Fase 0.6 / D4 — plano_contas por tenant: backfill + PK (admin_id, codigo) + 6 FKs compostas", _migration_218_plano_contas_por_tenant),
-            (219, "Fase 0.6 / D1 — linhagem de item entre versões da proposta + base congelada da medição emitida", _migration_219_revisao_proposta_linhagem_e_base),
-            (220, "Cronograma editável — tarefa_cronograma.modo_apontamento (quantidade|percentual, NULL = dedução legada)", migration_220_tarefa_modo_apontamento),
-            (221, "Cronograma editável — backfill de modo_apontamento congelando a dedução vigente (no-op de comportamento)", migration_221_backfill_modo_apontamento),
-            (222, "Cronograma editável Fase 1 — tabela tarefa_vinculo + is_critica/folga_dias + flag cronograma_editor_v2 (default FALSE)", _migration_222_tarefa_vinculo_e_colunas),
-            (223, "Cronograma editável Fase 1 — backfill predecessora_id → tarefa_vinculo TI/0 (intra-obra/tenant; sujas puladas e logadas)", _migration_223_backfill_vinculos_de_predecessora),
-            (224, "Cronograma editável Fase 3 — tabela cronograma_acao (pilha de desfazer/refazer por obra+usuário+modo)", _migration_224_cronograma_acao),
-            (225, "Cronograma editável Fase 4 — cronograma_baseline + itens (linha de base, uma ativa por obra via índice parcial)", _migration_225_cronograma_baseline),
-            (226, "RDO em porcentagem livre — flag configuracao_empresa.rdo_percentual_livre (default FALSE)", _migration_226_flag_rdo_percentual_livre),
-            (230, "Fase 2 — tabela obra_transicao_estado (historico de transicoes: de/para/quem/quando/motivo)", migration_230_obra_transicao_estado),
-            (231, "Fase 2 — obra.estado (VARCHAR+CHECK) + backfill derivado de status/ativo + historico do backfill", migration_231_obra_estado),
-            (232, "Fase 2 — alinha obra.status (espelho legado) ao obra.estado derivado pela 231", migration_232_normalizar_status_legado),
-            (240, "Fase 3 — tabela requisicao_compra (documento de demanda, obra_id NOT NULL)", migration_240_requisicao_compra),
-            (241, "Fase 3 — tabela requisicao_compra_item", migration_241_requisicao_compra_item),
-            (242, "Fase 3 — trilha de auditoria requisicao_transicao (quem/quando/valor)", migration_242_requisicao_transicao),
-            (243, "Fase 3 — faixa_alcada + seed das faixas recomendadas (5k / 30k / acima) por tenant", migration_243_faixa_alcada),
-            (244, "Fase 3 — pedido_compra.requisicao_id (origem do pedido; NULL = avulso legado)", migration_244_pedido_compra_requisicao_id),
-            (245, "Fase 3 — PapelObra.COMPRADOR (estende o enum de papel de obra)", migration_245_papel_obra_comprador),
-            (246, "Fase 3 — flag por tenant compras_governanca_ativa (default FALSE)", migration_246_flag_compras_governanca),
-            (247, "Fase 3 — obra.token_cliente_expira_em + trilha portal_acesso_evento (IP/UA)", migration_247_portal_token_expiracao_e_trilha),
-            (250, "Fase 4 — centro_custo: unicidade (admin_id, codigo) + índice único parcial do centro administrativo", migration_250_centro_custo_unicidade_por_tenant),
-            (251, "Fase 4 — seed do centro de custo administrativo (um por tenant)", migration_251_seed_centro_custo_administrativo),
-            (252, "Fase 4 — gestao_custo_pai.obra_id (nullable, derivada dos filhos)", migration_252_gestao_custo_pai_obra_id),
-            (253, "Fase 4 — CHECK ck_gestao_custo_filho_destino em modo NOT VALID (trava a escrita nova)", migration_253_check_destino_custo_not_valid),
-            (254, "Fase 4 — VALIDATE do CHECK de destino (varre o histórico; aborta e retenta se houver pendência)", migration_254_validate_check_destino_custo),
-            (260, "Fase 5 — rdo.estado (ciclo de vida) + backfill histórico como 'preenchido'", migration_260_rdo_estado),
-            (261, "Fase 5 — tabela rdo_transicao_estado (trilha do ciclo de vida do RDO)", migration_261_rdo_transicao_estado),
-            (262, "Fase 5 — tabela rdo_assinatura (autoria + hash + carimbo de tempo + IP)", migration_262_rdo_assinatura),
-            (263, "Fase 5 — rdo.rdo_retificado_id + motivo_retificacao (RDO retificador)", migration_263_rdo_retificador),
-            (264, "Fase 5 — rdo_foto.armazenamento ('banco'|'disco'): marcador da migração de fotos", migration_264_rdo_foto_armazenamento),
-            (265, "Carimba tipo_apontamento nas linhas de RDO que ficaram sem rótulo (import e views/rdo)", migration_265_backfill_tipo_apontamento_restante),
-            (266, "Repara as linhas de base v1 do backfill 210/212 (snapshot de cronograma de cliente, versão em tenant errado)", migration_266_reparar_linhas_de_base_do_backfill),
-            (267, "Fase 9a — obra_signatario_cliente + rdo_assinatura.signatario_cliente_id", _migration_267_signatario_cliente),
-            (268, "Fase 9a — unicidade de assinatura por signatário (dois índices parciais)", _migration_268_unicidade_assinatura_por_signatario),
-            (269, "Fase 9a — remove uq_rdo_assinatura_papel também quando é ÍNDICE (a 268 só tratava constraint)", _migration_269_remover_indice_unico_antigo_de_assinatura),
-            (277, "Editor de cronograma v2 em todo o parque — linha de base primeiro, flag ligada em todos os tenants, default da coluna vira TRUE", _migration_277_editor_v2_em_todo_o_parque),
-            (278, "p10 — cronograma_baseline.bac (orçamento congelado junto com o prazo; NULL = baseline anterior)", _migration_278_baseline_bac),
-            (279, "E02 — drop de notificacao_cliente, auto-guardado pela contagem (falha e retenta se houver linha)", _migration_279_drop_notificacao_cliente),
-            (280, "B5.6 / D-B5.6(A) — conta_pagar.banco_id: o banco debitado na baixa, para o estorno creditar de volta (NULL = sem banco ou pré-migração)", _migration_280_conta_pagar_banco_id),
-            (281, "B6.1 / D-B6.1 — conta_receber.banco_id: o banco creditado na baixa, para o estorno de recebimento debitar de volta (NULL = sem banco, pré-migração ou OBRA_MEDICAO)", _migration_281_conta_receber_banco_id),
-            (282, "CRM C1 / D-CRM.1 — backfill dos dropdowns: cria o grupo que a 173 pulou e copia as opções legadas crm_* que a 174 não alcançou (JOIN sem grupo não casa)", _migration_282_backfill_dropdown_crm),
-            (283, "Fase 4 — recebimento_pedido + recebimento_pedido_item; pedido_compra.exige_atesto (regime carimbado na linha) e situacao_recebimento", _migration_283_recebimento_atesto),
-            (284, "Fase 4 — configuracao_empresa.recebimento_atesto_ativo: a virada do recebimento é por tenant (default FALSE)", _migration_284_flag_recebimento_atesto),
-            (285, "Fase 4/C2 — recebimento_pedido_item.almoxarifado_saida_movimento_id: a saída de consumo pareada do atesto, para o estorno saber o que desfazer", _migration_285_saida_do_atesto),
-            (286, "Timbre dos PDFs — configuracao_empresa.timbre_pdf (JSONB): logo, dados da empresa e cores num JSON importável pela tela", _migration_286_timbre_pdf),
-            (288, "Fase 2 — pedido_compra.fluxo_pagamento; conta_pagar.situacao_liberacao/liberada_por_id/liberada_em; trilha de quem fechou e reabriu o lote", _migration_288_regime_e_liberacao),
-            (289, "Fase 2 — configuracao_empresa.financeiro_dois_fluxos_ativo (default FALSE) + tolerancia_divergencia_nf_pct (2,00%, decisão D1 editável)", _migration_289_flag_e_tolerancia),
-            (296, "Fase 2/F5 — fechamento_pagamento.criado_por_id: quem MONTOU o lote, sem o qual a segregacao \"quem monta nao fecha\" nao e verificavel. 290-295 e faixa da Fase 8; 300-307 da Fase 9", _migration_296_fechamento_criado_por),
-            # ⚠️ migration_history.migration_name e VARCHAR(200): descricao mais
-            # longa que isso faz o INSERT do historico falhar em SILENCIO
-            # (record_migration engole a excecao) — a migration roda, nao fica
-            # registrada e volta a rodar a cada boot. O "porque" longo mora na
-            # docstring de cada funcao; aqui cabe so a frase. Ver 📌 no spec.
-            (297, "Fase 3 — faixa_alcada.minimo_cotacoes (default 0) e condicoes_ativas (default ''); backfill minimo_cotacoes=2 onde exige_mapa_concorrencia e true (preserva o >= 2 de hoje; o 3 e a D6, por UPDATE)", _migration_297_faixa_condicoes),
-            (298, "Fase 3 — requisicao_compra.regime_alcada/emergencial/ratificada_em/degrau_aplicado (defaults = o registro historico) + os dois indices do acumulado do anti-fracionamento", _migration_298_requisicao_alcada),
-            (299, "Fase 3 — configuracao_empresa.alcadas_avancadas_ativa (default FALSE) + janela_fracionamento_dias (30 dias, decisao D2 editavel)", _migration_299_flag_e_janela),
-            (308, "Fecho da Fase 2 — conta_pagar.liberacao_justificativa: nao-nulo = liberacao excepcional, a porta de escape do D6. 308 e nao 300: 300-307 e faixa da Fase 9 e 290-295 da Fase 8, nenhuma aplicada", _migration_308_liberacao_justificativa),
-            (309, "E02 segunda tentativa — a 279 gravou success e nao pegou: create_all roda antes das migrations e recriou a tabela enquanto o modelo existia. Drop guardado pela contagem, como a 279", _migration_309_drop_notificacao_cliente_de_novo),
-            (310, "Saida da segregacao — fechamento_pagamento.segregacao_justificativa: nao-nulo = quem montou o lote o fechou e escreveu por que. Carimbar criado_por_id liga o guarda pela 1a vez", _migration_310_segregacao_justificativa),
-            (311, "Fase 2 do ciclo — nota_fiscal_pedido (chave_acesso NULLABLE, ao contrario da NotaFiscal legada) + adiantamento_fornecedor. ERA 287: o numero colidiu com outra linhagem do repo", _migration_311_nota_e_adiantamento),
-        ]
+        migrations_to_run = _migracoes_ativas()
         
         # Executar migrações — skip em memória para as já aplicadas
         total_migrations = len(migrations_to_run)
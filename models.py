@@ -1292,9 +1292,11 @@ class RDO(db.Model):
     def gerar_numero_rdo(self):
         """Gera número único para RDO"""
         if not self.numero_rdo:
+            from services.periodo import no_ano
+
             ano = self.data_relatorio.year
             count = db.session.query(func.count(RDO.id)).filter(
-                func.extract('year', RDO.data_relatorio) == ano,
+                *no_ano(RDO.data_relatorio, ano),
                 RDO.obra_id == self.obra_id
             ).scalar() or 0
             self.numero_rdo = f"RDO-{ano}-{count + 1:03d}"
@@ -1427,6 +1429,72 @@ class RDOCustoDiario(db.Model):
         )
 
 
+class FatoProducaoMaoObra(db.Model):
+    """Produção de mão de obra consolidada por (RDO, serviço, funcionário).
+
+    Uma linha por funcionário em cada serviço de cada RDO finalizado, com o
+    que as métricas de produtividade (services/metricas_produtividade)
+    calculam por subatividade já somado: horas, produção rateada, custo,
+    receita e os contadores das médias (produtividade por HH, índice de
+    equipe, gargalo). Os relatórios por funcionário leem daqui em vez de
+    refazer o período a partir de RDOMaoObra.
+
+    Mantida por services/fatos_producao: o commit que mexe num RDO (ou nos
+    apontamentos, subatividades e custos dele) reconsolida as linhas desse
+    RDO; coeficiente e operacional alterados reconsolidam os RDOs do serviço.
+    `servico_id` NULL junta as horas sem subatividade (ou de subatividade
+    sem serviço) — entram nas horas do funcionário, não nos serviços.
+    """
+    __tablename__ = 'fato_producao_mao_obra'
+
+    id = db.Column(db.Integer, primary_key=True)
+    admin_id = db.Column(db.Integer, db.ForeignKey('usuario.id', ondelete='CASCADE'),
+                         nullable=False)
+    obra_id = db.Column(db.Integer, db.ForeignKey('obra.id', ondelete='CASCADE'),
+                        nullable=False)
+    rdo_id = db.Column(db.Integer, db.ForeignKey('rdo.id', ondelete='CASCADE'),
+                       nullable=False, index=True)
+    servico_id = db.Column(db.Integer, db.ForeignKey('servico.id', ondelete='SET NULL'),
+                           nullable=True)
+    funcionario_id = db.Column(db.Integer, db.ForeignKey('funcionario.id', ondelete='CASCADE'),
+                               nullable=False)
+    data = db.Column(db.Date, nullable=False)
+    # Papel dele no serviço (o do primeiro apontamento) e o coeficiente na
+    # consolidação.
+    composicao_servico_id = db.Column(db.Integer, nullable=True)
+    coeficiente = db.Column(db.Float, nullable=True)
+
+    horas = db.Column(db.Float, nullable=False, default=0.0)
+    quantidade = db.Column(db.Float, nullable=True)          # produção rateada (single_role)
+    quantidade_equipe = db.Column(db.Float, nullable=True)   # Σ produção das subatividades dele
+    custo = db.Column(db.Float, nullable=True)
+    receita = db.Column(db.Float, nullable=True)
+
+    # Contadores por subatividade: modo, produtividade por HH e índice de
+    # equipe (soma e quantidade, separados por modo), gargalo e subutilizado.
+    n_subatividades = db.Column(db.Integer, nullable=False, default=0)
+    n_equipe_mista = db.Column(db.Integer, nullable=False, default=0)
+    prod_hh_single_soma = db.Column(db.Float, nullable=False, default=0.0)
+    prod_hh_single_n = db.Column(db.Integer, nullable=False, default=0)
+    prod_hh_mista_soma = db.Column(db.Float, nullable=False, default=0.0)
+    prod_hh_mista_n = db.Column(db.Integer, nullable=False, default=0)
+    indice_single_soma = db.Column(db.Float, nullable=False, default=0.0)
+    indice_single_n = db.Column(db.Integer, nullable=False, default=0)
+    indice_mista_soma = db.Column(db.Float, nullable=False, default=0.0)
+    indice_mista_n = db.Column(db.Integer, nullable=False, default=0)
+    n_gargalo = db.Column(db.Integer, nullable=False, default=0)
+    n_subutilizado = db.Column(db.Integer, nullable=False, default=0)
+
+    consolidado_em = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('rdo_id', 'servico_id', 'funcionario_id',
+                            name='uq_fato_producao_rdo_servico_func'),
+        db.Index('ix_fato_producao_admin_data', 'admin_id', 'data'),
+        db.Index('ix_fato_producao_admin_func_data', 'admin_id', 'funcionario_id', 'data'),
+    )
+
+
 class RDOEquipamento(db.Model):
     __tablename__ = 'rdo_equipamento'
     
@@ -1510,6 +1578,17 @@ class RDOFoto(db.Model):
     armazenamento = db.Column(db.String(10), nullable=False, default='banco',
                               server_default='banco', index=True)
 
+    # ── Versões geradas fora do request (services/rdo_foto_versoes) ─────
+    # O upload guarda só o original e grava 'pendente'; a fila gera a
+    # otimizada e o thumbnail e passa a 'pronta' ('falha' depois de
+    # MAX_TENTATIVAS). `processamento_reservado_ate` é a reserva de quem
+    # está gerando: vencida, a foto volta para a fila sozinha.
+    processamento = db.Column(db.String(10), nullable=False, default='pronta',
+                              server_default='pronta')
+    processamento_tentativas = db.Column(db.Integer, nullable=False, default=0,
+                                         server_default='0')
+    processamento_reservado_ate = db.Column(db.DateTime)
+
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Fase 5 — `lazy='selectin'` fazia TODA consulta de RDO (inclusive a
@@ -1520,6 +1599,11 @@ class RDOFoto(db.Model):
         'fotos', lazy='select', order_by='RDOFoto.ordem',
         cascade='all, delete-orphan', passive_deletes=True))
 
+    __table_args__ = (
+        db.Index('ix_rdo_foto_processamento_pendente', 'id',
+                 postgresql_where=db.text("processamento = 'pendente'")),
+    )
+
 
 class RDOTransicaoEstado(db.Model):
     """Trilha de auditoria do ciclo de vida do RDO — Fase 5.
@@ -3370,6 +3454,10 @@ class BalanceteMensal(db.Model):
     __table_args__ = (
         db.UniqueConstraint('conta_codigo', 'mes_referencia', 'admin_id',
                             name='uq_balancete_conta_mes_admin'),
+        # Abertura do mês (services/saldos_mensais): DISTINCT ON conta por
+        # tenant, a última linha antes do mês. Ver migration 312.
+        db.Index('ix_balancete_mensal_admin_conta_mes',
+                 'admin_id', 'conta_codigo', 'mes_referencia'),
         # Fase 0.6 / D4 — a conta contábil pertence ao tenant: FK composta
         # contra a PK (admin_id, codigo) de plano_contas. Ver migration 218.
         db.ForeignKeyConstraint(
@@ -3840,10 +3928,12 @@ class Proposta(db.Model):
     
     def gerar_numero_proposta(self):
         """Gera número sequencial da proposta"""
+        from services.periodo import no_ano
+
         ano_atual = date.today().year
         # Contar propostas do ano atual
         count = db.session.query(func.count(Proposta.id)).filter(
-            func.extract('year', Proposta.data_proposta) == ano_atual
+            *no_ano(Proposta.data_proposta, ano_atual)
         ).scalar() or 0
         
         proximo_numero = count + 1
@@ -8843,6 +8933,32 @@ class WebhookEntrega(db.Model):
         return f'<WebhookEntrega {self.id} {self.event} {self.status}>'
 
 
+# ──────────────────────────────────────────────────────────────────────────────
+# Preview de importação no servidor (migration 313) — services/preview_importacao
+# ──────────────────────────────────────────────────────────────────────────────
+class PreviewImportacaoLinha(db.Model):
+    """Uma linha do preview de importação, guardada até a confirmação.
+
+    O token agrupa as linhas de um upload; `secao` é a seção do preview
+    (entradas, saidas_auto, ...) e `dados` o dict da linha, com o `_sid` que
+    a identifica. Vencidas (VALIDADE) são apagadas a cada upload novo.
+    """
+
+    __tablename__ = 'preview_importacao_linha'
+    __table_args__ = (
+        db.Index('ix_preview_importacao_token_secao', 'token', 'secao', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    token = db.Column(db.String(32), nullable=False)
+    admin_id = db.Column(db.Integer, db.ForeignKey('usuario.id', ondelete='CASCADE'),
+                         nullable=False)
+    modulo = db.Column(db.String(30), nullable=False)
+    secao = db.Column(db.String(20), nullable=False)
+    dados = db.Column(db.JSON, nullable=False)
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
 # ════════════════════════════════════════════════════════════════════════
 # Task #63 — Orçamento Operacional da Obra
 # ════════════════════════════════════════════════════════════════════════
@@ -36,17 +36,14 @@ from utils_facial import (
 )
 from utils_geofencing import validar_localizacao_na_obra
 import logging
-import numpy as np
 import base64
 import tempfile
 import os
 
 logger = logging.getLogger(__name__)
 
-# Cache global de embeddings com auto-reload baseado em mtime
-_cache_facial = None
-_cache_loaded = False
-_cache_mtime = 0  # Timestamp de modificação do arquivo quando carregado
+# Store de embeddings mapeado (services/store_facial), um por worker
+_store_facial = None
 _deepface_model_loaded = False
 _sface_model = None  # Cache do modelo TensorFlow em memória
 _face_cascade = None  # Cache do classificador Haar para detecção facial
@@ -88,11 +85,30 @@ def get_sface_model():
         logger.warning(f"⚠️ Erro ao carregar SFace: {e}")
         return None
 
+def _inferencia_compartilhada():
+    """True se o serviço de inferência facial está configurado e respondendo."""
+    from services import inferencia_facial
+
+    if not inferencia_facial.configurado():
+        return False
+    try:
+        inferencia_facial.saude()
+        return True
+    except inferencia_facial.InferenciaIndisponivel:
+        return False
+
 def preload_deepface_model():
-    """Pré-carrega o modelo DeepFace para evitar delay na primeira requisição"""
+    """Pré-carrega o modelo DeepFace para evitar delay na primeira requisição.
+
+    Com o serviço de inferência compartilhado no ar
+    (services/inferencia_facial) o modelo mora lá e o worker não o carrega;
+    se o serviço cair, `get_sface_model` carrega aqui na primeira batida.
+    """
     global _deepface_model_loaded, _sface_model
     if _deepface_model_loaded and _sface_model is not None:
         return True
+    if _inferencia_compartilhada():
+        return True
     try:
         import time
         start = time.time()
@@ -180,12 +196,24 @@ def gerar_embedding_otimizado(img_path):
     - Shape: (batch, 112, 112, 3)
     """
     import time
-    import cv2
     import numpy as np
+    from services import inferencia_facial
     
     start_total = time.time()
     logger.info(f"🔍 gerar_embedding_otimizado - INÍCIO (img: {img_path})")
     
+    # Serviço compartilhado (modelo fora do worker), se configurado
+    if inferencia_facial.configurado():
+        try:
+            with open(img_path, 'rb') as f:
+                embedding = inferencia_facial.embedding(f.read())
+            logger.info(f"⚡ inferência compartilhada: {time.time()-start_total:.3f}s")
+            return embedding
+        except inferencia_facial.InferenciaIndisponivel:
+            pass
+    
+    import cv2
+    
     # Tentar usar modelo cacheado primeiro
     model = get_sface_model()
     if model is not None:
@@ -199,41 +227,14 @@ def gerar_embedding_otimizado(img_path):
                 raise ValueError("Não foi possível ler a imagem")
             logger.info(f"⏱️ cv2.imread: {time.time()-t0:.3f}s (shape: {img.shape})")
             
-            # 2. Detectar rosto usando Haar cascade (CRITICAL FIX)
-            t0 = time.time()
-            face_cascade = get_face_cascade()
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
-            elapsed_detection = time.time() - t0
-            logger.info(f"⏱️ Face detection: {elapsed_detection:.3f}s ({len(faces)} face(s) found)")
-            
-            # 3. Crop face region or fallback to full image (use largest face)
-            t0 = time.time()
-            if len(faces) > 0:
-                if len(faces) > 1:
-                    faces_sorted = sorted(faces, key=lambda f: f[2] * f[3], reverse=True)
-                    x, y, w, h = faces_sorted[0]
-                else:
-                    x, y, w, h = faces[0]
-                margin = 0.2
-                img_h, img_w = img.shape[:2]
-                x1 = max(0, int(x - w * margin))
-                y1 = max(0, int(y - h * margin))
-                x2 = min(img_w, int(x + w + w * margin))
-                y2 = min(img_h, int(y + h + h * margin))
-                face_crop = img[y1:y2, x1:x2]
-                img_resized = cv2.resize(face_crop, (112, 112))
-                logger.info(f"✅ Face cropped: ({x},{y},{w},{h}) -> margin crop ({x1},{y1})-({x2},{y2})")
-            else:
-                logger.warning(f"⚠️ No face detected in {img_path}, using full image resize (fallback)")
-                img_resized = cv2.resize(img, (112, 112))
-            logger.info(f"⏱️ crop+resize: {time.time()-t0:.3f}s")
-            
-            # 4. Normalizar para [0, 1] - SFace espera esse formato
+            # 2-4. Detectar rosto (Haar), recortar o maior com margem,
+            # 112x112 e normalizar para [0, 1] — o MESMO pré-processamento
+            # da geração em lote do cache (services/embeddings_lote).
             t0 = time.time()
-            img_normalized = img_resized.astype(np.float32) / 255.0
+            from services.embeddings_lote import preparar_rosto
+            img_normalized = preparar_rosto(img, get_face_cascade())
             img_batch = np.expand_dims(img_normalized, axis=0)
-            logger.info(f"⏱️ normalize+batch: {time.time()-t0:.3f}s")
+            logger.info(f"⏱️ detecção+crop+normalize: {time.time()-t0:.3f}s")
             
             # 5. Gerar embedding usando forward() (OpenCV DNN)
             t0 = time.time()
@@ -347,54 +348,72 @@ def redimensionar_imagem_para_reconhecimento(foto_base64, max_width=640, max_hei
         logger.error(f"Erro ao redimensionar imagem: {e}")
         return foto_base64
 
-def carregar_cache_facial():
+def obter_store_facial():
     """
-    Carrega o cache de embeddings do arquivo.
-    Verifica automaticamente se o arquivo no disco foi atualizado (mtime)
-    para recarregar entre workers do Gunicorn.
+    Store de embeddings do worker, sincronizado com o disco: o que outro
+    worker anexou (foto alterada) ou a troca do arquivo (cache regenerado)
+    aparece aqui sem recarregar nada além dos registros novos.
     """
-    global _cache_facial, _cache_loaded, _cache_mtime
-    
+    global _store_facial
     try:
-        from gerar_cache_facial import carregar_cache, CACHE_PATH
-        
-        file_mtime = 0
-        if os.path.exists(CACHE_PATH):
-            file_mtime = os.path.getmtime(CACHE_PATH)
-        
-        if _cache_loaded and file_mtime <= _cache_mtime:
-            return _cache_facial
-        
-        if _cache_loaded and file_mtime > _cache_mtime:
-            logger.info(f"🔄 Cache atualizado no disco detectado (mtime: {file_mtime} > {_cache_mtime}), recarregando...")
-        
-        _cache_facial = carregar_cache()
-        _cache_loaded = True
-        _cache_mtime = file_mtime
-        
-        if _cache_facial:
-            cache_version = _cache_facial.get('pipeline_version', 'unknown')
+        if _store_facial is None:
+            from gerar_cache_facial import abrir_store
+            _store_facial = abrir_store()
+            if _store_facial is None:
+                return None
+            cache_version = _store_facial.metadados.get('pipeline_version', 'unknown')
             if cache_version != PIPELINE_VERSION:
                 logger.warning(f"⚠️ [CACHE OBSOLETO] Cache pipeline={cache_version}, atual={PIPELINE_VERSION}. Regenere o cache via /ponto/api/cache/gerar!")
-            total = len(_cache_facial.get('embeddings', {}))
-            logger.info(f"✅ Cache facial carregado: {total} funcionários (mtime={file_mtime}, pipeline={cache_version})")
-        else:
-            logger.warning("⚠️ Cache facial vazio ou não encontrado")
-        return _cache_facial
+            logger.info(f"✅ Store facial aberto: {len(_store_facial.tenants())} tenants (pipeline={cache_version})")
+            return _store_facial
+        return _store_facial.sincronizar()
     except Exception as e:
-        logger.warning(f"⚠️ Erro ao carregar cache facial: {e}")
-        _cache_loaded = True
-        _cache_mtime = 0
+        logger.warning(f"⚠️ Erro ao abrir store facial: {e}")
+        return None
+
+def carregar_cache_facial():
+    """
+    Cache de embeddings como dict (formato do pickle antigo), lido do store.
+    Para as telas de status/diagnóstico — o reconhecimento usa o store
+    mapeado direto, via `obter_store_facial`.
+    """
+    if obter_store_facial() is None:
+        logger.warning("⚠️ Cache facial vazio ou não encontrado")
         return None
+    from gerar_cache_facial import carregar_cache
+    return carregar_cache()
 
 def recarregar_cache_facial():
-    """Força recarga do cache"""
-    global _cache_facial, _cache_loaded, _cache_mtime
-    _cache_loaded = False
-    _cache_facial = None
-    _cache_mtime = 0
+    """Força reabrir o store (e reconstruir os índices faciais)"""
+    global _store_facial
+    from services.indice_facial import descartar_indices
+    _store_facial = None
+    descartar_indices()
     return carregar_cache_facial()
 
+def atualizar_funcionario_no_cache(funcionario_id, admin_id):
+    """
+    Reflete no cache a mudança de fotos de UM funcionário (foto incluída,
+    excluída, ativada/desativada): regera só os embeddings dele e anexa o
+    registro ao store. A versão do tenant no store muda, então o índice
+    facial do tenant se refaz na próxima batida — neste worker e nos outros,
+    que veem o registro novo pelo mapa compartilhado.
+
+    Sem o modelo SFace disponível não há como gerar embedding; o cache fica
+    como está em vez de tirar o funcionário dele.
+    """
+    from gerar_cache_facial import atualizar_embedding_funcionario
+
+    if not preload_deepface_model():
+        logger.warning(f"⚠️ Modelo indisponível: cache do funcionário {funcionario_id} não atualizado")
+        return
+    try:
+        atualizar_embedding_funcionario(funcionario_id)
+    except Exception as e:
+        logger.warning(f"⚠️ Atualização pontual do cache falhou ({e})")
+        return
+    obter_store_facial()
+
 def identificar_por_cache(foto_base64, admin_id, threshold=0.80):
     """
     Identifica funcionário usando cache de embeddings (muito mais rápido).
@@ -411,52 +430,54 @@ def identificar_por_cache(foto_base64, admin_id, threshold=0.80):
     start_func = time.time()
     timings = {}
     
+    # Serviço compartilhado: embedding e busca no índice do tenant lá
+    from services import inferencia_facial
+    if inferencia_facial.configurado():
+        try:
+            if foto_base64.startswith('data:'):
+                foto_base64 = foto_base64.split(',')[1]
+            foto_base64 = redimensionar_imagem_para_reconhecimento(foto_base64, max_width=640, max_height=480)
+            resultado = inferencia_facial.identificar(base64.b64decode(foto_base64), admin_id, threshold)
+            logger.info(f"⚡ Identificação compartilhada: {resultado[:2]} | TOTAL={time.time()-start_func:.2f}s")
+            return resultado
+        except inferencia_facial.InferenciaIndisponivel:
+            pass
+        except Exception as e:
+            logger.error(f"Erro na identificação por cache: {e}")
+            return None, None, str(e)
+    
     try:
         t0 = time.time()
         from deepface import DeepFace
+        import numpy as np
         timings['import'] = time.time() - t0
     except ImportError:
         return None, None, "DeepFace não instalado"
     
     t0 = time.time()
-    cache = carregar_cache_facial()
+    store = obter_store_facial()
     timings['load_cache'] = time.time() - t0
     
-    if not cache or 'embeddings' not in cache:
+    if store is None:
         logger.warning("⚠️ Cache não disponível para reconhecimento")
         return None, None, "Cache não disponível"
     
     t0 = time.time()
-    embeddings_cache = cache['embeddings']
+    from services.indice_facial import indice_do_tenant
     admin_id_int = int(admin_id) if admin_id else None
-    
-    # Log detalhado para debug multi-tenant
-    logger.info(f"🔍 Buscando embeddings para admin_id={admin_id_int} (type: {type(admin_id_int).__name__})")
-    logger.info(f"📊 Cache total: {len(embeddings_cache)} funcionários")
-    
-    embeddings_tenant = {}
-    admin_ids_no_cache = set()
-    
-    for fid, data in embeddings_cache.items():
-        cache_admin_id = data.get('admin_id')
-        cache_admin_id_int = int(cache_admin_id) if cache_admin_id is not None else None
-        admin_ids_no_cache.add(cache_admin_id_int)
-        
-        if cache_admin_id_int == admin_id_int:
-            embeddings_tenant[fid] = data
-    
+    indice = indice_do_tenant(admin_id_int, store.versao(admin_id_int),
+                              lambda: store.indice(admin_id_int))
     timings['filter_tenant'] = time.time() - t0
     
-    # Log dos admin_ids encontrados no cache
-    logger.info(f"📊 Admin IDs no cache: {sorted(list(admin_ids_no_cache))}")
-    logger.info(f"📊 Match para admin_id={admin_id_int}: {len(embeddings_tenant)} funcionários")
+    logger.info(f"📊 Índice facial admin_id={admin_id_int}: {indice.total_funcionarios} funcionários, {len(indice)} embeddings")
     
-    if not embeddings_tenant:
+    if not len(indice):
+        admin_ids_no_cache = sorted(store.tenants(), key=lambda x: (x is None, x))
         logger.error(f"❌ NENHUM embedding encontrado para admin_id={admin_id_int}!")
-        logger.error(f"   Admin IDs disponíveis: {sorted(list(admin_ids_no_cache))}")
-        return None, None, f"Nenhum embedding no cache para admin_id={admin_id_int}. Disponíveis: {sorted(list(admin_ids_no_cache))}"
+        logger.error(f"   Admin IDs disponíveis: {admin_ids_no_cache}")
+        return None, None, f"Nenhum embedding no cache para admin_id={admin_id_int}. Disponíveis: {admin_ids_no_cache}"
     
-    logger.info(f"⏱️ Cache: import={timings['import']:.2f}s, load={timings['load_cache']:.2f}s, filter={timings['filter_tenant']:.3f}s - {len(embeddings_tenant)} func.")
+    logger.info(f"⏱️ Cache: import={timings['import']:.2f}s, load={timings['load_cache']:.2f}s, indice={timings['filter_tenant']:.3f}s - {indice.total_funcionarios} func.")
     
     try:
         if foto_base64.startswith('data:'):
@@ -499,42 +520,13 @@ def identificar_por_cache(foto_base64, admin_id, threshold=0.80):
             if os.path.exists(tmp_path):
                 os.remove(tmp_path)
         
-        melhor_match_id = None
-        menor_distancia = float('inf')
-        melhor_foto_desc = None
-        total_comparacoes = 0
-        
         # Log do embedding capturado (primeiros 5 valores)
         logger.info(f"📊 Embedding capturado: dims={len(embedding_capturado)}, primeiros 5={embedding_capturado[:5].tolist()}")
         
-        for func_id, data in embeddings_tenant.items():
-            embeddings_list = data.get('embeddings', [])
-            
-            if not embeddings_list:
-                if 'embedding' in data:
-                    embeddings_list = [{'embedding': data['embedding'], 'descricao': 'Foto principal'}]
-                else:
-                    continue
-            
-            for emb_info in embeddings_list:
-                if isinstance(emb_info, dict):
-                    embedding_cache = np.array(emb_info['embedding'], dtype=np.float32)
-                    descricao = emb_info.get('descricao', 'Foto')
-                else:
-                    embedding_cache = np.array(emb_info, dtype=np.float32)
-                    descricao = 'Foto'
-                
-                distancia = np.linalg.norm(embedding_capturado - embedding_cache)
-                total_comparacoes += 1
-                
-                if total_comparacoes <= 3:
-                    cache_norm = np.linalg.norm(embedding_cache)
-                    logger.info(f"📊 Comparação #{total_comparacoes}: func={func_id} ({data.get('nome', '?')}), dist={distancia:.4f}, cache_norm={cache_norm:.4f}, primeiros3_cache={embedding_cache[:3].tolist()}")
-                
-                if distancia < menor_distancia:
-                    menor_distancia = distancia
-                    melhor_match_id = func_id
-                    melhor_foto_desc = descricao
+        # Uma multiplicação matriz × vetor contra todos os embeddings do
+        # tenant (services/indice_facial) — no lugar do laço por par.
+        melhor_match_id, menor_distancia, melhor_foto_desc = indice.buscar(
+            embedding_capturado, k=1)[0]
         
         total_time = time.time() - start_func
         
@@ -551,26 +543,38 @@ def identificar_por_cache(foto_base64, admin_id, threshold=0.80):
 
 ponto_bp = Blueprint('ponto', __name__, url_prefix='/ponto')
 
-# Pré-carregar modelo DeepFace e cache facial no import do módulo
-try:
-    import threading
-    def _async_preload():
-        try:
-            preload_deepface_model()
-            # Também pré-carregar o cache facial para cada worker
-            cache = carregar_cache_facial()
-            if cache:
-                total = len(cache.get('embeddings', {}))
-                logger.info(f"✅ Cache facial pré-carregado no worker: {total} funcionários")
-            else:
-                logger.info("ℹ️ Nenhum cache facial disponível no startup (gere via /ponto/api/cache/gerar)")
-        except Exception as e:
-            logger.warning(f"⚠️ Preload async falhou: {e}")
-    
-    threading.Thread(target=_async_preload, daemon=True).start()
-    logger.info("🚀 Iniciando pré-carregamento assíncrono do modelo DeepFace + cache facial")
-except Exception as e:
-    logger.warning(f"⚠️ Não foi possível iniciar preload: {e}")
+# Pré-carregar modelo DeepFace e cache facial no PRIMEIRO request do ponto
+# (não no import do módulo): o worker que nunca atende o ponto — e todo
+# processo de teste ou script que importa o app — não carrega TensorFlow.
+_preload_iniciado = False
+
+def _async_preload():
+    try:
+        if _inferencia_compartilhada():
+            # Modelo e índices moram no serviço de inferência
+            logger.info("✅ Inferência facial compartilhada no ar — sem preload no worker")
+            return
+        preload_deepface_model()
+        # Também abrir o store facial (mapeado, compartilhado) no worker
+        if obter_store_facial() is not None:
+            logger.info("✅ Store facial aberto no worker")
+        else:
+            logger.info("ℹ️ Nenhum cache facial disponível no startup (gere via /ponto/api/cache/gerar)")
+    except Exception as e:
+        logger.warning(f"⚠️ Preload async falhou: {e}")
+
+@ponto_bp.before_request
+def _iniciar_preload_facial():
+    global _preload_iniciado
+    if _preload_iniciado:
+        return
+    _preload_iniciado = True
+    try:
+        import threading
+        threading.Thread(target=_async_preload, daemon=True).start()
+        logger.info("🚀 Iniciando pré-carregamento assíncrono do modelo DeepFace + cache facial")
+    except Exception as e:
+        logger.warning(f"⚠️ Não foi possível iniciar preload: {e}")
 
 # Rota de debug para verificar se o blueprint está funcionando
 @ponto_bp.route('/')
@@ -1788,7 +1792,7 @@ def ponto_facial_automatico():
     """Página de ponto por reconhecimento facial automático"""
     try:
         preload_deepface_model()
-        carregar_cache_facial()
+        obter_store_facial()
         
         admin_id = get_tenant_admin_id()
         
@@ -1820,57 +1824,39 @@ def ponto_facial_automatico():
 @login_required
 @admin_required
 def gerar_cache_embeddings():
-    """API para gerar/regenerar cache de embeddings faciais"""
+    """
+    API para gerar/regenerar cache de embeddings faciais do tenant.
+
+    A geração roda em background (gerar_cache_facial.iniciar_job_cache) —
+    para um tenant grande ela leva minutos, e o request não fica preso.
+    Responde 202 na hora; o andamento sai de /api/cache/gerar/status.
+    """
     try:
-        from gerar_cache_facial import gerar_cache, CACHE_PATH
+        from gerar_cache_facial import iniciar_job_cache
         admin_id = get_tenant_admin_id()
         
         # Opção para incluir fotos inativas (via query parameter)
         incluir_inativas = request.args.get('incluir_inativas', 'false').lower() == 'true'
         
-        logger.info(f"🔄 INICIANDO geração de cache facial para admin_id={admin_id}")
-        logger.info(f"📁 Cache será salvo em: {CACHE_PATH}")
-        logger.info(f"📸 Incluir fotos inativas: {incluir_inativas}")
-        
-        resultado = gerar_cache(admin_id, incluir_inativas=incluir_inativas)
-        
-        logger.info(f"📊 Resultado: {resultado}")
-        
-        if resultado['success']:
-            import os
-            if os.path.exists(CACHE_PATH):
-                size = os.path.getsize(CACHE_PATH)
-                mtime = os.path.getmtime(CACHE_PATH)
-                import datetime
-                mod_time = datetime.datetime.fromtimestamp(mtime)
-                logger.info(f"✅ Cache salvo: {size} bytes, modificado em {mod_time}")
-            else:
-                logger.error(f"❌ ERRO: Arquivo de cache não foi criado em {CACHE_PATH}")
-            
-            recarregar_cache_facial()
-            
-            cache_reload = carregar_cache_facial()
-            if cache_reload:
-                total_in_memory = len(cache_reload.get('embeddings', {}))
-                logger.info(f"✅ Cache recarregado na memória: {total_in_memory} funcionários")
-            
-            return jsonify({
-                'success': True,
-                'message': f"Cache gerado com sucesso! {resultado['processados']} funcionários processados.",
-                'processados': resultado['processados'],
-                'total': resultado['total'],
-                'erros': len(resultado.get('erros', [])),
-                'cache_path': str(CACHE_PATH)
-            })
-        else:
-            logger.error(f"❌ Erro na geração: {resultado.get('error')}")
+        iniciado, status = iniciar_job_cache(admin_id, incluir_inativas=incluir_inativas)
+        if not iniciado:
+            logger.info(f"⏳ Geração de cache já em andamento (admin_id={status.get('admin_id')})")
             return jsonify({
                 'success': False,
-                'message': resultado.get('error', 'Erro desconhecido')
-            }), 500
+                'em_andamento': True,
+                'message': 'Já existe uma geração de cache em andamento. Aguarde a conclusão.',
+                'job': _status_job_do_tenant(status, admin_id),
+            }), 409
+        
+        logger.info(f"🔄 Geração de cache facial iniciada em background para admin_id={admin_id} (inativas={incluir_inativas})")
+        return jsonify({
+            'success': True,
+            'message': 'Geração do cache iniciada.',
+            'job': _status_job_do_tenant(status, admin_id),
+        }), 202
             
     except Exception as e:
-        logger.error(f"❌ EXCEÇÃO ao gerar cache: {e}")
+        logger.error(f"❌ EXCEÇÃO ao iniciar geração do cache: {e}")
         import traceback
         logger.error(traceback.format_exc())
         return jsonify({
@@ -1879,6 +1865,23 @@ def gerar_cache_embeddings():
         }), 500
 
 
+def _status_job_do_tenant(status, admin_id):
+    """Status do job visto por um tenant: detalhes só do próprio job; de
+    outro tenant, apenas que o gerador está ocupado."""
+    dono = status.get('admin_id')
+    if dono is not None and admin_id is not None and int(dono) != int(admin_id):
+        return {'estado': 'ocupado' if status.get('estado') == 'executando' else 'nenhum'}
+    return status
+
+
+@ponto_bp.route('/api/cache/gerar/status', methods=['GET'])
+@login_required
+def status_geracao_cache():
+    """Andamento da geração do cache em background (polling da tela)."""
+    from gerar_cache_facial import status_job_cache
+    return jsonify(_status_job_do_tenant(status_job_cache(), get_tenant_admin_id()))
+
+
 @ponto_bp.route('/api/cache/status', methods=['GET'])
 @login_required
 def status_cache_embeddings():
@@ -1965,6 +1968,7 @@ def status_cache_embeddings():
 def verificar_cache():
     """Verifica compatibilidade do cache comparando embedding ao vivo vs cacheado"""
     import time
+    import numpy as np
     
     admin_id = get_tenant_admin_id()
     cache = carregar_cache_facial()
@@ -2580,7 +2584,7 @@ def adicionar_foto_facial(funcionario_id):
         db.session.add(nova_foto)
         db.session.commit()
         
-        recarregar_cache_facial()
+        atualizar_funcionario_no_cache(funcionario_id, admin_id)
         
         logger.info(f"Nova foto facial adicionada para funcionário {funcionario.nome} (ID: {funcionario_id})")
         
@@ -2615,7 +2619,7 @@ def excluir_foto_facial(foto_id):
         db.session.delete(foto)
         db.session.commit()
         
-        recarregar_cache_facial()
+        atualizar_funcionario_no_cache(funcionario_id, admin_id)
         
         logger.info(f"Foto facial {foto_id} excluída do funcionário {funcionario_id}")
         
@@ -2645,7 +2649,7 @@ def ativar_foto_facial(foto_id):
         foto.ativa = not foto.ativa
         db.session.commit()
         
-        recarregar_cache_facial()
+        atualizar_funcionario_no_cache(foto.funcionario_id, admin_id)
         
         status = 'ativada' if foto.ativa else 'desativada'
         logger.info(f"Foto facial {foto_id} {status}")
@@ -55,8 +55,8 @@ ALLOWED_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.webp', '.pdf'}
 PRAZO_TOKEN_DIAS = 180
 
 # Paginação dos RDOs no portal: bloco inicial e teto por página (ver
-# `portal_obra`). O teto existe porque cada linha traz o thumbnail base64 da
-# primeira foto do RDO.
+# `portal_obra`). O teto existe porque cada linha pede o thumbnail da
+# primeira foto do RDO (uma requisição a `portal_foto_rdo` por linha).
 RDOS_POR_PAGINA = 20
 RDOS_LIMITE_MAX = 500
 
@@ -314,9 +314,9 @@ def portal_obra(token: str):
     # MUDO — na Baia (42 RDOs) o cliente via de 17/07 pra frente e o contador
     # do hero dizia "20", como se a obra começasse ali. Agora o total vem de um
     # COUNT separado (o hero mostra o real) e o rodapé da seção diz o que está
-    # mostrando de quanto. Teto de RDOS_LIMITE_MAX porque a linha carrega o
-    # thumbnail base64 da 1ª foto: obra longa pediria a página inteira de uma
-    # vez se o parâmetro viesse cru da URL.
+    # mostrando de quanto. Teto de RDOS_LIMITE_MAX porque cada linha pede o
+    # thumbnail da 1ª foto: obra longa pediria a página inteira de uma vez se
+    # o parâmetro viesse cru da URL.
     rdos_total = (
         RDO.query
         .filter_by(obra_id=obra.id, admin_id=admin_id, status='Finalizado')
@@ -1076,6 +1076,28 @@ def portal_rdo_detalhe(token: str, rdo_id: int):
     )
 
 
+@portal_obras_bp.route('/obra/<token>/foto/<int:foto_id>/<tipo>')
+def portal_foto_rdo(token: str, foto_id: int, tipo: str):
+    """Foto de RDO da obra do token, pela mesma entrega da tela interna
+    (`rdo_foto_service.responder_foto`: ETag, 304, Range, imutável com
+    `?v=`). O portal deixou de embutir a base64 no HTML — a página de um
+    RDO com 20 fotos carregava ~2,5 MB de data URI antes da primeira."""
+    from services.rdo_foto_service import TIPOS_FOTO, responder_foto
+
+    obra, inactive_response = _resolve_obra_for_view(token)
+    if inactive_response is not None or tipo not in TIPOS_FOTO:
+        abort(404)
+    foto = (RDOFoto.query
+            .join(RDO, RDO.id == RDOFoto.rdo_id)
+            .filter(RDOFoto.id == foto_id, RDOFoto.admin_id == obra.admin_id,
+                    RDO.obra_id == obra.id)
+            .first())
+    resposta = responder_foto(foto, tipo, versao=request.args.get('v')) if foto else None
+    if resposta is None:
+        abort(404)
+    return resposta
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # CIÊNCIA DO CLIENTE NO RDO (Fase 9a; percurso refeito em 29/07 — ver
 # docs/superpowers/specs/2026-07-29-ciencia-rdo-portal-ux-design.md)
@@ -18,27 +18,24 @@ sys.path.append('/app')
 logger.info("=== SIGE pre_start.py iniciando ===")
 
 try:
-    from app import app, db
+    from app import app
 except Exception as e:
     logger.error(f"ERRO ao importar app: {e}")
     sys.exit(1)
 
 with app.app_context():
-    logger.info("Criando/verificando tabelas (db.create_all)...")
+    # create_all + executar_migracoes, sob o advisory lock de
+    # services/migracoes_boot: com o banco em dia é uma query só; com algo
+    # pendente, um processo migra e os demais esperam.
+    logger.info("Verificando schema e migracoes (garantir_schema)...")
     try:
-        db.create_all()
-        logger.info("db.create_all concluido.")
+        from services.migracoes_boot import garantir_schema
+        if garantir_schema():
+            logger.info("create_all + executar_migracoes concluidos.")
+        else:
+            logger.info("Schema em dia — nada a migrar.")
     except Exception as e:
-        logger.error(f"ERRO em db.create_all: {e}")
-        sys.exit(1)
-
-    logger.info("Executando migracoes de schema (executar_migracoes)...")
-    try:
-        from migrations import executar_migracoes
-        executar_migracoes()
-        logger.info("executar_migracoes concluido.")
-    except Exception as e:
-        logger.error(f"ERRO em executar_migracoes: {e}")
+        logger.error(f"ERRO ao garantir schema: {e}")
         sys.exit(1)
 
     # NOTA: o passo legado que tentava executar 'migrate_gestao_custos.py'
@@ -18,7 +18,6 @@ from datetime import datetime, date, timedelta
 from sqlalchemy import func, desc, and_, extract, case
 import logging
 from collections import defaultdict
-import numpy as np
 
 # Importar modelos
 from models import (
@@ -590,6 +589,7 @@ def analisar_eficiencia_financeira(admin_id, data_inicio, data_fim):
 
 def gerar_previsoes_financeiras(admin_id, data_inicio, data_fim):
     """Gera previsões financeiras baseadas em tendências"""
+    import numpy as np
     
     try:
         # Dados históricos mensais (últimos 12 meses antes do período)
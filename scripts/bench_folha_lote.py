@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""Mede a folha do mês de um tenant — funcionário a funcionário
+(`processar_folha_funcionario` + `salvar_folha_processada` por linha, o que
+`processar_e_salvar_folha_obra` fazia) × em lote (`services/folha_lote`).
+
+Semeia N funcionários sintéticos no admin informado — metade com
+HorarioTrabalho, um quarto horista, benefícios, ~22 pontos cada espalhados
+por 3 obras — processa o mês pelos dois caminhos e apaga tudo no fim. Conta
+as idas ao banco e separa, no lote, o tempo das consultas (`carregar_mes`)
+do cálculo puro, que é o que um pool de processos poderia dividir.
+
+    python scripts/bench_folha_lote.py --admin-id 1
+    python scripts/bench_folha_lote.py --admin-id 1 --funcionarios 200 2000
+
+Medido na criação (banco local, 1 CPU), 2.000 funcionários × 3 obras (6.000
+linhas de FolhaProcessada, 44.000 pontos): funcionário a funcionário 178,7 s
+e 66.000 statements; em lote 10,1 s e 15 statements — carregar 3,3 s,
+cálculo 2,7 s (1,35 ms por funcionário), gravar 4,0 s. 200 funcionários:
+18,9 s e 6.600 × 0,74 s e 10. Obra a obra (`processar_e_salvar_folha_obra`
+nas 3 obras, regravando) 22,9 s e 36 statements: cada obra recalcula a folha
+inteira dos seus funcionários. Importar o app leva ~8 s por processo, mais
+que o cálculo do tenant inteiro — daí não haver pool de processos.
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ANO, MES = 2026, 3
+
+
+def _semear(admin_id, n):
+    from datetime import date, time as hora
+
+    from models import (BeneficioFuncionario, Cliente, ConfiguracaoSalarial, Funcionario,
+                        HorarioDia, HorarioTrabalho, Obra, ParametrosLegais, RegistroPonto, db)
+    from services.gravacao_lote import inserir
+
+    marca = f'BFL{uuid.uuid4().hex[:6].upper()}'
+    criou_params = not ParametrosLegais.query.filter_by(
+        admin_id=admin_id, ano_vigencia=ANO, ativo=True).first()
+    if criou_params:
+        db.session.add(ParametrosLegais(admin_id=admin_id, ano_vigencia=ANO, ativo=True))
+    cliente = Cliente(nome=f'Cliente {marca}', admin_id=admin_id)
+    db.session.add(cliente)
+    db.session.flush()
+    obras = [Obra(nome=f'Obra {marca} {i}', codigo=f'{marca}{i}', data_inicio=date(2026, 1, 1),
+                  admin_id=admin_id, cliente_id=cliente.id, status='Em andamento')
+             for i in range(3)]
+    horario = HorarioTrabalho(nome=f'Horario {marca}', admin_id=admin_id,
+                              entrada=hora(7), saida=hora(17), horas_diarias=9)
+    db.session.add_all(obras + [horario])
+    db.session.flush()
+    inserir(HorarioDia, [dict(horario_id=horario.id, dia_semana=d, admin_id=admin_id,
+                              entrada=hora(7), saida=hora(17), pausa_horas=1, trabalha=d < 5)
+                         for d in range(7)])
+    ids = inserir(Funcionario, [dict(
+        codigo=f'{marca[:4]}{i:05d}', nome=f'Func {marca} {i}', cpf=f'{marca[3:]}{i:05d}',
+        data_admissao=date(2026, 1, 2), admin_id=admin_id, ativo=True, salario=2000 + i % 40 * 75,
+        tipo_remuneracao='salario', horario_trabalho_id=horario.id if i % 2 else None)
+        for i in range(n)], ids=True)
+    inserir(ConfiguracaoSalarial, [dict(
+        funcionario_id=f, salario_base=0, tipo_salario='HORISTA', valor_hora=28,
+        dependentes=i % 3, data_inicio=date(2026, 1, 1), ativo=True, admin_id=admin_id)
+        for i, f in enumerate(ids) if i % 4 == 0])
+    inserir(BeneficioFuncionario, [dict(
+        funcionario_id=f, tipo_beneficio='VR', valor=440, percentual_desconto=20,
+        data_inicio=date(2026, 1, 1), ativo=True, admin_id=admin_id)
+        for i, f in enumerate(ids) if i % 3 == 0])
+    dias_uteis = [d for d in range(1, 32) if date(ANO, MES, d).weekday() < 5]
+    inserir(RegistroPonto, [dict(
+        funcionario_id=f, obra_id=obras[(i + d) % 3].id, admin_id=admin_id,
+        data=date(ANO, MES, d), horas_trabalhadas=8.0 + (d % 4 == 0),
+        horas_extras=1.0 if d % 4 == 0 else 0.0, tipo_registro='trabalhado')
+        for i, f in enumerate(ids) for d in dias_uteis])
+    db.session.commit()
+    return marca, ids, [o.id for o in obras], horario.id, cliente.id, criou_params
+
+
+def _limpar(admin_id, ids, obras, horario_id, cliente_id, criou_params):
+    from models import (BeneficioFuncionario, Cliente, ConfiguracaoSalarial, FolhaProcessada,
+                        Funcionario, HorarioDia, HorarioTrabalho, Obra, ParametrosLegais,
+                        RegistroPonto, db)
+
+    for modelo in (FolhaProcessada, RegistroPonto, ConfiguracaoSalarial, BeneficioFuncionario):
+        modelo.query.filter(modelo.funcionario_id.in_(ids)).delete(synchronize_session=False)
+    Funcionario.query.filter(Funcionario.id.in_(ids)).delete(synchronize_session=False)
+    HorarioDia.query.filter_by(horario_id=horario_id).delete(synchronize_session=False)
+    HorarioTrabalho.query.filter_by(id=horario_id).delete(synchronize_session=False)
+    Obra.query.filter(Obra.id.in_(obras)).delete(synchronize_session=False)
+    Cliente.query.filter_by(id=cliente_id).delete(synchronize_session=False)
+    if criou_params:
+        ParametrosLegais.query.filter_by(admin_id=admin_id, ano_vigencia=ANO).delete()
+    db.session.commit()
+
+
+def medir(admin_id, n):
+    from sqlalchemy import event
+
+    from models import FolhaProcessada, Funcionario, RegistroPonto, db
+    from services import folha_lote
+    from services.folha_service import processar_folha_funcionario, salvar_folha_processada
+
+    semeado = _semear(admin_id, n)
+    _marca, ids, obras = semeado[:3]
+    statements = [0]
+
+    def _contar(*_a, **_k):
+        statements[0] += 1
+
+    event.listen(db.engine, 'before_cursor_execute', _contar)
+    try:
+        pares = sorted(db.session.query(RegistroPonto.funcionario_id, RegistroPonto.obra_id)
+                       .filter(RegistroPonto.funcionario_id.in_(ids)).distinct().all())
+        db.session.expire_all()
+        statements[0] = 0
+
+        t0 = time.perf_counter()
+        for func_id, obra_id in pares:
+            dados = processar_folha_funcionario(Funcionario.query.get(func_id), ANO, MES)
+            salvar_folha_processada(func_id, obra_id, ANO, MES, dados, admin_id)
+        dt_individual, st_individual = time.perf_counter() - t0, statements[0]
+
+        FolhaProcessada.query.filter(FolhaProcessada.funcionario_id.in_(ids)) \
+            .delete(synchronize_session=False)
+        db.session.commit()
+        db.session.expire_all()
+        statements[0] = 0
+
+        # O tempo de `carregar_mes` dentro de `calcular_folhas`: o resto é o
+        # cálculo puro.
+        carregar, tempos = folha_lote.carregar_mes, []
+
+        def _carregar_medido(*a):
+            t = time.perf_counter()
+            try:
+                return carregar(*a)
+            finally:
+                tempos.append(time.perf_counter() - t)
+
+        folha_lote.carregar_mes = _carregar_medido
+        try:
+            t0 = time.perf_counter()
+            funcionarios = Funcionario.query.filter(Funcionario.id.in_(ids)).order_by(Funcionario.id).all()
+            folhas = folha_lote.calcular_folhas(admin_id, ANO, MES, funcionarios)
+            dt_calcular = time.perf_counter() - t0
+        finally:
+            folha_lote.carregar_mes = carregar
+        dt_carregar = tempos[0]
+        linhas = [(f, o, folhas[f]) for f, o in pares]
+        t0 = time.perf_counter()
+        folha_lote.salvar(admin_id, ANO, MES, linhas)
+        db.session.commit()
+        dt_salvar, st_lote = time.perf_counter() - t0, statements[0]
+        db.session.expire_all()
+        statements[0] = 0
+
+        # Obra a obra, por cima do que o lote do tenant gravou (UPDATE).
+        t0 = time.perf_counter()
+        for obra_id in obras:
+            stats = folha_lote.processar_e_salvar(admin_id, ANO, MES, obra_id=obra_id)
+            assert not stats['erros'], stats
+        dt_lote_obras, st_lote_obras = time.perf_counter() - t0, statements[0]
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _contar)
+        _limpar(admin_id, *semeado[1:])
+
+    print(f'{n:>6} funcionários, {len(pares)} linhas')
+    print(f'   funcionário a funcionário         {dt_individual:7.2f} s  {st_individual:>7} statements')
+    print(f'   em lote (tenant)                  {dt_calcular + dt_salvar:7.2f} s  {st_lote:>7} statements  '
+          f'(carregar {dt_carregar:.2f} s, cálculo {dt_calcular - dt_carregar:.2f} s = '
+          f'{(dt_calcular - dt_carregar) / n * 1000:.2f} ms/func, gravar {dt_salvar:.2f} s)')
+    print(f'   em lote (obra a obra, regravando) {dt_lote_obras:7.2f} s  {st_lote_obras:>7} statements')
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    ap.add_argument('--admin-id', type=int, required=True)
+    ap.add_argument('--funcionarios', type=int, nargs='+', default=[2000])
+    args = ap.parse_args()
+
+    from app import app
+    with app.app_context():
+        for n in args.funcionarios:
+            medir(args.admin_id, n)
+
+
+if __name__ == '__main__':
+    main()
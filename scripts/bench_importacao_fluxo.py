@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Mede o `ImportacaoFluxoCaixa.importar` num import anual — linha a linha
+(objeto ORM + flush por lançamento, `em_lote=False`) × em lote
+(`services/gravacao_lote`: INSERT ... VALUES em blocos com os ids de volta).
+
+Gera o preview sintético do `bench_preview_importacao` (~85% saídas, 2/3
+automáticas, 15% entradas, 2.000 fornecedores que o import cria) e importa
+cada caminho num lote próprio. Conta também as idas ao banco (execuções de
+statement). Usa o banco configurado (DATABASE_URL) e um admin existente; o
+que cada rodada grava é apagado no fim (pelo `import_batch_id`, e os
+fornecedores `IMP-` criados nela).
+
+    python scripts/bench_importacao_fluxo.py --admin-id 1
+    python scripts/bench_importacao_fluxo.py --admin-id 1 --linhas 1000 10000 --so-lote
+
+Medido na criação (banco local): 10.000 lançamentos (8.571 saídas, 1.429
+entradas, 2.000 fornecedores novos) — linha a linha 58,5 s e 51.146
+statements; em lote 2,9 s e 51. 1.000 lançamentos — 8,2 s e 6.432 × 0,27 s
+e 14. Boa parte do linha a linha é o recálculo do resumo de custos da obra,
+que o listener de GestaoCustoFilho dispara a cada flush; em lote ele roda
+uma vez por obra no fim.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _limpar(admin_id, batch_id, desde):
+    from models import (ContaPagar, ContaReceber, FluxoCaixa, Fornecedor,
+                        GestaoCustoFilho, GestaoCustoPai, db)
+
+    pais = db.session.query(GestaoCustoPai.id).filter(
+        GestaoCustoPai.admin_id == admin_id, GestaoCustoPai.import_batch_id == batch_id)
+    GestaoCustoFilho.query.filter(GestaoCustoFilho.pai_id.in_(pais.scalar_subquery())) \
+        .delete(synchronize_session=False)
+    for modelo in (FluxoCaixa, ContaPagar, ContaReceber, GestaoCustoPai):
+        modelo.query.filter(modelo.admin_id == admin_id, modelo.import_batch_id == batch_id) \
+            .delete(synchronize_session=False)
+    Fornecedor.query.filter(Fornecedor.admin_id == admin_id, Fornecedor.cnpj.like('IMP-%'),
+                            Fornecedor.created_at >= desde).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def medir(n_linhas, admin_id, em_lote):
+    from datetime import datetime
+
+    from sqlalchemy import event
+
+    from models import db
+    from scripts.bench_preview_importacao import preview_sintetico
+    from services.importacao_excel import ImportacaoFluxoCaixa
+
+    secoes = preview_sintetico(n_linhas)
+    batch_id = f'bench_{"lote" if em_lote else "linha"}_{n_linhas}_{os.getpid()}'
+    dados = {'entradas': secoes['entradas'],
+             'saidas': secoes['saidas_auto'] + secoes['saidas_manual'],
+             'batch_id': batch_id}
+
+    statements = [0]
+
+    def _contar(*_a, **_k):
+        statements[0] += 1
+
+    motor = db.engine
+    event.listen(motor, 'before_cursor_execute', _contar)
+    desde = datetime.utcnow()
+    try:
+        t0 = time.perf_counter()
+        resultado = ImportacaoFluxoCaixa().importar(dados, admin_id, em_lote=em_lote)
+        dt = time.perf_counter() - t0
+    finally:
+        event.remove(motor, 'before_cursor_execute', _contar)
+        _limpar(admin_id, batch_id, desde)
+    assert not resultado['erros'], resultado['erros'][:3]
+    print(f'{n_linhas:>7} lançamentos  {"em lote    " if em_lote else "linha a linha"} '
+          f'{dt:7.2f} s  {statements[0]:>7} statements  '
+          f'({resultado["n_saidas"]} saídas, {resultado["n_entradas"]} entradas, '
+          f'{resultado["n_fornecedores_criados"]} fornecedores criados)')
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    ap.add_argument('--admin-id', type=int, required=True)
+    ap.add_argument('--linhas', type=int, nargs='+', default=[10_000])
+    ap.add_argument('--so-lote', action='store_true',
+                    help='não roda o caminho linha a linha (lento)')
+    args = ap.parse_args()
+
+    from app import app
+    with app.app_context():
+        for n in args.linhas:
+            if not args.so_lote:
+                medir(n, args.admin_id, em_lote=False)
+            medir(n, args.admin_id, em_lote=True)
+
+
+if __name__ == '__main__':
+    main()
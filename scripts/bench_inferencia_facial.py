@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""Mede o serviço de inferência facial compartilhado (services/inferencia_facial):
+latência p50/p95 de `identificar` com C clientes simultâneos (processos,
+como os workers do gunicorn), com micro-lote × sem lote (`--lote-max 1`), e
+o RSS do servidor e de um worker-cliente.
+
+Sem `--sface` o modelo é um custo sintético — `forward` de n rostos dorme
+`--custo-base-ms + n × --custo-rosto-ms`, a forma do custo do SFace (uma
+parte fixa por chamada e outra por imagem) — e o pré-processamento é um
+hash; não toca banco, modelo nem OpenCV. Com `--sface --imagem foto.jpg`
+sobe o SFace de verdade (DeepFace + OpenCV) e mede a foto dada.
+
+    python scripts/bench_inferencia_facial.py
+    python scripts/bench_inferencia_facial.py --clientes 8 --pedidos 50
+    python scripts/bench_inferencia_facial.py --sface --imagem rosto.jpg
+
+Medido na criação (custo sintético 8 ms + 2 ms/rosto, 8 clientes × 40
+pedidos, 2.000 funcionários, 1 CPU): sem lote p50 82 ms / p95 86 ms; com
+micro-lote p50 35 ms / p95 54 ms, lote médio 6,4. O worker-cliente fica em
+35 MB de RSS (não importa TensorFlow nem DeepFace) e o servidor em 47 MB
+sem o modelo. O SFace por worker não pôde ser medido aqui (sem deepface e
+OpenCV no ambiente): rode com `--sface` numa máquina com o modelo.
+"""
+import argparse
+import hashlib
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _rss_mb():
+    with open('/proc/self/status') as f:
+        for linha in f:
+            if linha.startswith('VmRSS:'):
+                return int(linha.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class _ModeloSintetico:
+    def __init__(self, base_ms, rosto_ms):
+        self.base, self.rosto = base_ms / 1000, rosto_ms / 1000
+
+    def forward(self, lote):
+        time.sleep(self.base + self.rosto * len(lote))
+        return np.asarray(lote).reshape(len(lote), -1)[:, :128] * 3.0
+
+
+def _rosto_sintetico(imagem):
+    h = hashlib.sha256(imagem).digest() * 4
+    return np.frombuffer(h, dtype=np.uint8).astype(np.float32)[:128] / 255.0 - 0.5
+
+
+def _store_sintetico(path, funcionarios, tenants):
+    from services import store_facial
+
+    rng = np.random.default_rng(0)
+    vetores = rng.standard_normal((funcionarios, 128)).astype(np.float32)
+    vetores /= np.linalg.norm(vetores, axis=1, keepdims=True)
+    store_facial.gravar(path, {fid + 1: {'admin_id': fid % tenants + 1, 'nome': f'F{fid}',
+                                         'embeddings': [{'embedding': vetores[fid].tolist(),
+                                                         'descricao': 'Foto'}]}
+                               for fid in range(funcionarios)}, {'versao': '4.0'})
+
+
+def _cliente(sock, imagem, pedidos, tenants, fila):
+    os.environ['SIGE_INFERENCIA_FACIAL_SOCKET'] = sock
+    from services import inferencia_facial
+
+    tempos = []
+    try:
+        for i in range(pedidos):
+            t0 = time.perf_counter()
+            inferencia_facial.identificar(imagem or f'{os.getpid()}-{i}'.encode(),
+                                          i % tenants + 1, 0.8)
+            tempos.append((time.perf_counter() - t0) * 1000)
+    except inferencia_facial.InferenciaIndisponivel as e:
+        fila.put(e)
+        return
+    fila.put((tempos, _rss_mb()))
+
+
+def _rodada(args, lote_max, store_path, imagem):
+    from services.inferencia_facial import ServidorInferencia
+    from services.store_facial import StoreFacial
+
+    sock = os.path.join(tempfile.mkdtemp(prefix='sige-facial-'), 'facial.sock')
+    if args.sface:
+        from deepface import DeepFace
+        modelo, preparar = DeepFace.build_model('SFace'), None
+    else:
+        modelo = _ModeloSintetico(args.custo_base_ms, args.custo_rosto_ms)
+        preparar = _rosto_sintetico
+    servidor = ServidorInferencia(sock, modelo, preparar=preparar,
+                                  abrir_store=lambda: StoreFacial(store_path),
+                                  lote_max=lote_max, espera_ms=args.espera_ms)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+
+    ctx = multiprocessing.get_context('spawn')
+    fila = ctx.Queue()
+    procs = [ctx.Process(target=_cliente, args=(sock, imagem, args.pedidos, args.tenants, fila))
+             for _ in range(args.clientes)]
+    for p in procs:
+        p.start()
+    resultados = [fila.get() for _ in procs]
+    for p in procs:
+        p.join()
+    servidor.shutdown()
+    servidor.server_close()
+    falhas = [r for r in resultados if isinstance(r, Exception)]
+    if falhas:
+        raise SystemExit(f'{len(falhas)} cliente(s) sem resposta: {falhas[0]}')
+
+    tempos = np.array([t for r, _rss in resultados for t in r[args.pedidos // 10:]])
+    lotes = servidor.lotes
+    return {'p50': np.percentile(tempos, 50), 'p95': np.percentile(tempos, 95),
+            'lote_medio': lotes.rostos / lotes.lotes if lotes.lotes else 0.0,
+            'rss_cliente': max(rss for _t, rss in resultados)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Bench do serviço de inferência facial')
+    parser.add_argument('--clientes', type=int, default=8, help='processos-cliente simultâneos')
+    parser.add_argument('--pedidos', type=int, default=40, help='identificações por cliente')
+    parser.add_argument('--funcionarios', type=int, default=2000)
+    parser.add_argument('--tenants', type=int, default=10)
+    parser.add_argument('--lote-max', type=int, default=16)
+    parser.add_argument('--espera-ms', type=float, default=4.0)
+    parser.add_argument('--custo-base-ms', type=float, default=8.0,
+                        help='custo fixo do forward sintético')
+    parser.add_argument('--custo-rosto-ms', type=float, default=2.0,
+                        help='custo por rosto do forward sintético')
+    parser.add_argument('--sface', action='store_true', help='usa o SFace de verdade')
+    parser.add_argument('--imagem', help='foto usada com --sface')
+    args = parser.parse_args(argv)
+    if args.sface and not args.imagem:
+        parser.error('--sface precisa de --imagem')
+    imagem = open(args.imagem, 'rb').read() if args.imagem else None
+
+    store_path = os.path.join(tempfile.mkdtemp(prefix='sige-store-'), 'cache.store')
+    _store_sintetico(store_path, args.funcionarios, args.tenants)
+    rss_antes = _rss_mb()
+
+    print(f'{args.clientes} clientes × {args.pedidos} pedidos, {args.funcionarios} funcionários '
+          f'em {args.tenants} tenants, modelo {"SFace" if args.sface else "sintético"}')
+    for nome, lote_max in (('sem lote', 1), ('micro-lote', args.lote_max)):
+        r = _rodada(args, lote_max, store_path, imagem)
+        print(f'  {nome:<10} p50 {r["p50"]:6.1f} ms  p95 {r["p95"]:6.1f} ms  '
+              f'lote médio {r["lote_medio"]:4.1f}  RSS cliente {r["rss_cliente"]:.0f} MB')
+    print(f'  RSS do servidor: {_rss_mb():.0f} MB (+{_rss_mb() - rss_antes:.0f} MB do modelo/índices)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Mede a confirmação do fluxo de caixa — o preview de volta no formulário
+(payload assinado + ~9 campos por linha, como era) × o preview guardado no
+servidor com a confirmação mandando só as edições
+(`services/preview_importacao`).
+
+Para cada tamanho de período gera um preview sintético no formato do
+`ImportacaoFluxoCaixa.processar` e mede o que a confirmação custa ANTES do
+`importar`: bytes do corpo multipart e o tempo do servidor para recebê-lo
+(parse do Werkzeug + verificação — HMAC e json.loads do payload inteiro no
+caminho antigo, a consulta do token no novo). E o que passou a custar em
+outro lugar: gravar o preview no upload e lê-lo em lotes durante o import.
+
+Usa o banco configurado (DATABASE_URL) e um admin existente; as linhas de
+staging gravadas aqui são apagadas no fim.
+
+    python scripts/bench_preview_importacao.py --admin-id 1
+    python scripts/bench_preview_importacao.py --admin-id 1 --linhas 1000 10000 --edicoes 50
+
+Medido na criação (20 edições): 1.000 linhas — antigo 0,9 MB em 8.001
+partes, 0,2 s para receber; novo 1,2 kB em 3 partes, 1,2 ms. 10.000 linhas
+— antigo 9,4 MB, 80.000 partes, 1,6–2,2 s; novo 1,3 kB, 1,3 ms. 40.000 —
+antigo 37,9 MB, 320.000 partes, 6,4 s; novo 1,3 kB, 1,5 ms. Gravar o preview
+no upload: 0,1 s / 0,6–1,0 s / 4,0 s; ler em lotes no import: 0,01 s /
+0,1 s / 0,3 s.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CAMPOS_SAIDA = ('data', 'destinatario', 'desc', 'obra', 'valor', 'cat', 'apenas_pag',
+                'reembolso', 'banco')
+
+
+def preview_sintetico(n_linhas, semente=1):
+    """Seções como o `processar` devolve: ~85% saídas (2/3 auto), 15% entradas."""
+    rng = random.Random(semente)
+    entradas, auto, manual = [], [], []
+    for i in range(n_linhas):
+        base = {'data': f'{1 + i % 28:02d}/{1 + i % 12:02d}/2025',
+                'valor': round(rng.uniform(10, 9000), 2),
+                'descricao': f'Lançamento {i} ref. NF {100000 + i}', 'status': 'PAGO',
+                'obra_id': None, 'cc': f'Obra {i % 40}', 'plano_contas': 'Materiais',
+                'categoria_nome': 'Materiais de Obra', 'tipo_categoria': 'MATERIAL',
+                'categoria_fluxo_caixa_id': None, 'fuzzy_score': rng.randint(40, 100)}
+        if i % 7 == 0:
+            entradas.append({**base, 'cliente': f'Cliente {i % 90}'})
+        else:
+            (manual if i % 3 == 0 else auto).append(
+                {**base, 'fornecedor': f'Fornecedor {i % 2000}', 'banco_id': None,
+                 'entidade_tipo': None, 'entidade_id': None, 'eh_reembolso': False})
+    return {'entradas': entradas, 'saidas_auto': auto, 'saidas_manual': manual,
+            'transferencias': []}
+
+
+def _corpo(campos):
+    from werkzeug.test import encode_multipart
+    return encode_multipart(campos, boundary='----bench')[1]
+
+
+def _receber(corpo, verificar):
+    """O que o servidor faz com a confirmação antes do `importar`."""
+    from werkzeug.formparser import parse_form_data
+    ambiente = {'REQUEST_METHOD': 'POST', 'wsgi.input': io.BytesIO(corpo),
+                'CONTENT_LENGTH': str(len(corpo)),
+                'CONTENT_TYPE': 'multipart/form-data; boundary=----bench'}
+    t0 = time.perf_counter()
+    _stream, form, _files = parse_form_data(ambiente, max_form_parts=None)
+    assert verificar(form)
+    return time.perf_counter() - t0
+
+
+def medir(n_linhas, admin_id, n_edicoes):
+    from importacao_views import _assinar_payload, _verificar_payload
+    from services import preview_importacao
+
+    secoes = preview_sintetico(n_linhas)
+
+    # Antes: o payload assinado no campo oculto + os campos de cada linha.
+    campos = {'csrf_token': 'x' * 90,
+              'dados_json': _assinar_payload([secoes], admin_id, 'fluxo_caixa')}
+    for secao, sufixo, nomes in (('saidas_auto', 'auto', CAMPOS_SAIDA),
+                                 ('saidas_manual', 'manual', CAMPOS_SAIDA),
+                                 ('entradas', 'entrada', ('obra', 'cat'))):
+        for i, r in enumerate(secoes[secao]):
+            for nome in nomes:
+                campos[f'{nome}_{sufixo}_{i}'] = str(r.get('valor', '') if nome == 'valor' else '')
+    antigo = _corpo(campos)
+    t_antigo = min(_receber(antigo, lambda f: _verificar_payload(
+        f['dados_json'], admin_id, 'fluxo_caixa')) for _ in range(3))
+
+    # Agora: o preview gravado no upload, a confirmação com token + edições.
+    t0 = time.perf_counter()
+    token = preview_importacao.guardar(admin_id, 'fluxo_caixa', secoes)
+    t_guardar = time.perf_counter() - t0
+    try:
+        sids = [r['_sid'] for r in secoes['saidas_auto']][:n_edicoes]
+        edicoes = {sid: {'valor': '123,45', 'reembolso': True} for sid in sids}
+        novo = _corpo({'csrf_token': 'x' * 90, 'dados_json': token,
+                       'edicoes': json.dumps(edicoes)})
+        t_novo = min(_receber(novo, lambda f: preview_importacao.existe(
+            f['dados_json'], admin_id, 'fluxo_caixa')) for _ in range(3))
+        t0 = time.perf_counter()
+        lidas = sum(1 for _ in preview_importacao.Linhas(
+            token, admin_id, 'fluxo_caixa', ('entradas', 'saidas_auto', 'saidas_manual')))
+        t_ler = time.perf_counter() - t0
+        assert lidas == n_linhas
+    finally:
+        preview_importacao.descartar(token, admin_id, 'fluxo_caixa')
+
+    partes_antigas = len(campos)
+    print(f'{n_linhas:>7} linhas  antigo {len(antigo) / 2**20:6.1f} MB {partes_antigas:>7} partes '
+          f'{t_antigo * 1000:7.1f} ms | novo {len(novo) / 1024:5.1f} kB 3 partes '
+          f'{t_novo * 1000:5.1f} ms | gravar {t_guardar:5.2f} s  ler em lotes {t_ler:5.2f} s')
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    ap.add_argument('--admin-id', type=int, required=True)
+    ap.add_argument('--linhas', type=int, nargs='+', default=[1_000, 10_000])
+    ap.add_argument('--edicoes', type=int, default=20,
+                    help='linhas editadas pelo usuário na confirmação nova')
+    args = ap.parse_args()
+
+    from app import app
+    with app.app_context():
+        for n in args.linhas:
+            medir(n, args.admin_id, args.edicoes)
+
+
+if __name__ == '__main__':
+    main()
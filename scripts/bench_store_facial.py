@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Mede o cache facial em N processos (os workers do gunicorn) — pickle
+antigo × store mapeado (`services/store_facial`).
+
+Somente CPU/memória — não toca banco nem modelo. Gera um cache sintético
+(embeddings 128-d L2-normalizados), grava nos dois formatos e sobe N
+processos que fazem o que um worker faz no boot + primeira batida de cada
+tenant: carregar o cache e montar o índice facial de todos os tenants.
+Cada processo reporta o tempo de carga e RSS/PSS de /proc/self/smaps_rollup
+(PSS divide as páginas compartilhadas entre quem as mapeia — é a medida
+certa para "quanto a máquina gasta").
+
+    python scripts/bench_store_facial.py                        # 20.000 func.
+    python scripts/bench_store_facial.py --funcionarios 50000 --workers 8
+
+Medido na criação (20.000 funcionários × 3 fotos, 40 tenants, 4 workers):
+pickle 6.212 ms e +354 MB de PSS por worker; store 216 ms e +15 MB.
+"""
+import argparse
+import multiprocessing
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import store_facial  # noqa: E402
+from services.indice_facial import IndiceFacial  # noqa: E402
+
+
+def _memoria_kb():
+    campos = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for linha in f:
+            partes = linha.split()
+            if partes[0] in ('Rss:', 'Pss:'):
+                campos[partes[0][:-1]] = int(partes[1])
+    return campos
+
+
+def _cache_sintetico(funcionarios, fotos, tenants, semente=0):
+    rng = np.random.default_rng(semente)
+    vetores = rng.standard_normal((funcionarios * fotos, 128)).astype(np.float32)
+    vetores /= np.linalg.norm(vetores, axis=1, keepdims=True)
+    embeddings = {}
+    for fid in range(funcionarios):
+        embeddings[fid + 1] = {
+            'admin_id': fid % tenants + 1, 'nome': f'Funcionário {fid}',
+            'codigo': f'F{fid:05d}', 'updated_at': '2026-01-01T00:00:00',
+            'embeddings': [{'embedding': vetores[fid * fotos + i].tolist(),
+                            'descricao': f'Foto {i}'} for i in range(fotos)],
+        }
+    return {'embeddings': embeddings, 'versao': '4.0'}
+
+
+def _worker_pickle(path, tenants, fila):
+    antes = _memoria_kb()
+    t0 = time.perf_counter()
+    with open(path, 'rb') as f:
+        cache = pickle.load(f)
+    indices = [IndiceFacial.de_cache(cache, t) for t in range(1, tenants + 1)]
+    fila.put((time.perf_counter() - t0, antes, _memoria_kb(), sum(map(len, indices))))
+
+
+def _worker_store(path, tenants, fila):
+    antes = _memoria_kb()
+    t0 = time.perf_counter()
+    store = store_facial.StoreFacial(path)
+    indices = [store.indice(t) for t in range(1, tenants + 1)]
+    for indice in indices:                  # toca as páginas, como uma busca
+        indice.distancias(indice.matriz[0])
+    fila.put((time.perf_counter() - t0, antes, _memoria_kb(), sum(map(len, indices))))
+
+
+def _rodar(alvo, path, tenants, workers):
+    ctx = multiprocessing.get_context('spawn')
+    fila = ctx.Queue()
+    barreira = [ctx.Process(target=alvo, args=(path, tenants, fila)) for _ in range(workers)]
+    for p in barreira:
+        p.start()
+    resultados = [fila.get() for _ in barreira]
+    for p in barreira:
+        p.join()
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--funcionarios', type=int, default=20000)
+    parser.add_argument('--fotos', type=int, default=3)
+    parser.add_argument('--tenants', type=int, default=40)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    cache = _cache_sintetico(args.funcionarios, args.fotos, args.tenants)
+    with tempfile.TemporaryDirectory() as tmp:
+        pkl, store = os.path.join(tmp, 'cache.pkl'), os.path.join(tmp, 'cache.store')
+        with open(pkl, 'wb') as f:
+            pickle.dump(cache, f)
+        store_facial.gravar(store, cache['embeddings'], {'versao': '4.0'})
+        print(f'{args.funcionarios} funcionários × {args.fotos} fotos, {args.tenants} tenants, '
+              f'{args.workers} workers — pickle {os.path.getsize(pkl) / 2**20:.1f} MB, '
+              f'store {os.path.getsize(store) / 2**20:.1f} MB')
+
+        linhas = None
+        for nome, alvo, path in (('pickle', _worker_pickle, pkl),
+                                 ('store', _worker_store, store)):
+            resultados = _rodar(alvo, path, args.tenants, args.workers)
+            total = {r[3] for r in resultados}
+            assert len(total) == 1 and (linhas is None or total == {linhas}), total
+            linhas = total.pop()
+            ms = sorted(r[0] * 1000 for r in resultados)
+            rss = np.mean([(r[2]['Rss'] - r[1]['Rss']) / 1024 for r in resultados])
+            pss = np.mean([(r[2]['Pss'] - r[1]['Pss']) / 1024 for r in resultados])
+            print(f'{nome:>6}: carga {ms[len(ms) // 2]:8.0f} ms (mediana)  '
+                  f'+RSS {rss:7.1f} MB  +PSS {pss:7.1f} MB por worker')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Converte o cache facial pickle (`cache_facial.pkl`) no store mapeado
+(`cache_facial.store`, ver `services/store_facial`).
+
+A migração também acontece sozinha na primeira abertura do store
+(`gerar_cache_facial.abrir_store`); este script é para fazê-la no deploy,
+antes de subir os workers, e para conferir o resultado: o índice de cada
+tenant lido do store tem de ser idêntico ao montado do pickle.
+
+    python scripts/migrar_cache_facial_pickle.py
+    python scripts/migrar_cache_facial_pickle.py --pickle /caminho/cache_facial.pkl
+
+O pickle NÃO é apagado (o rollback do deploy ainda o lê).
+"""
+import argparse
+import os
+import pickle
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gerar_cache_facial  # noqa: E402
+from services.indice_facial import IndiceFacial  # noqa: E402
+from services.store_facial import StoreFacial  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pickle', default=gerar_cache_facial.PICKLE_PATH)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.pickle):
+        print(f'Pickle não encontrado: {args.pickle}')
+        return 1
+
+    total = gerar_cache_facial.migrar_pickle(args.pickle)
+    with open(args.pickle, 'rb') as f:
+        cache = pickle.load(f)
+    store = StoreFacial(gerar_cache_facial.CACHE_PATH)
+
+    divergentes = []
+    for admin_id in store.tenants():
+        do_store = store.indice(admin_id)
+        do_pickle = IndiceFacial.de_cache(cache, admin_id)
+        if not (np.array_equal(do_store.matriz, do_pickle.matriz)
+                and np.array_equal(do_store.func_ids, do_pickle.func_ids)):
+            divergentes.append(admin_id)
+
+    print(f'{total} funcionários, {len(store.tenants())} tenants → '
+          f'{gerar_cache_facial.CACHE_PATH} '
+          f'({os.path.getsize(gerar_cache_facial.CACHE_PATH)} bytes)')
+    if divergentes:
+        print(f'DIVERGÊNCIA nos tenants {divergentes}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -18,7 +18,7 @@ em janela curta. As colunas de caminho (`arquivo_original`,
 `arquivo_otimizado`, `thumbnail`) já existem e já estão preenchidas.
 
 ═══════════════════════════════════════════════════════════════════════
-DUAS PASSADAS, PORQUE A PRIMEIRA É REVERSÍVEL E A SEGUNDA NÃO
+PASSADAS — A PRIMEIRA É REVERSÍVEL, A SEGUNDA NÃO
 ═══════════════════════════════════════════════════════════════════════
 
   Passada 1 — `migrar_para_disco()`
@@ -33,6 +33,15 @@ DUAS PASSADAS, PORQUE A PRIMEIRA É REVERSÍVEL E A SEGUNDA NÃO
       não abra. Depois disso, a foto SÓ existe no volume — se o volume
       não for persistente, o próximo deploy destrói o acervo.
 
+  Passada 3 — `mover_para_blobs()`
+      Copia os arquivos de `uploads/rdo/<admin>/<rdo>/…` para o store
+      endereçado por conteúdo (services/blob_store.py) e troca as
+      referências para `uploads/blobs/ab/cd/<sha256>`. O legado fica no
+      disco; apagar `uploads/rdo` é passo manual, depois de conferir.
+      Uploads novos já nascem no store. `--coletar-blobs` apaga os blobs
+      que nenhuma foto referencia (foto excluída não apaga blob, porque
+      outra foto pode ter o mesmo conteúdo).
+
 PRÉ-REQUISITOS DA PASSADA 2 (ver docs/fase-5-rollout.md):
   volume persistente montado · UPLOADS_PATH definido · Task 13 aplicada ·
   dump completo guardado fora do servidor · snapshot do volume ·
@@ -44,11 +53,14 @@ Uso:
     python scripts/migrar_fotos_rdo_para_disco.py --admin-id 7 --liberar
     python scripts/migrar_fotos_rdo_para_disco.py --admin-id 7 --liberar --aplicar
     python scripts/migrar_fotos_rdo_para_disco.py --admin-id 7 --reverter --aplicar
+    python scripts/migrar_fotos_rdo_para_disco.py --admin-id 7 --blobs --aplicar
+    python scripts/migrar_fotos_rdo_para_disco.py --coletar-blobs --aplicar
 """
 from __future__ import annotations
 
 import argparse
 import base64
+import hashlib
 import logging
 import os
 import sys
@@ -283,6 +295,139 @@ def reverter(admin_id=None, aplicar=False):
     return relatorio
 
 
+def mover_para_blobs(admin_id=None, aplicar=False, lote=LOTE_PADRAO,
+                     limite=None):
+    """Passada 3 — leva os arquivos legados (`uploads/rdo/<admin>/<rdo>/…`)
+    para o store de blobs endereçado por conteúdo e troca as referências no
+    banco. NÃO apaga o legado: só depois de conferir a tela, o PDF e o
+    export, `static/uploads/rdo` (ou `$UPLOADS_PATH/rdo`) pode ser removido
+    à mão. Foto cujo arquivo não abre fica como está e entra em `falhas`.
+    """
+    from app import app, db
+    from models import RDOFoto
+    from services.blob_store import blobs, chave_da_referencia, referencia
+    from services.rdo_foto_service import resolver_arquivo
+
+    relatorio = {'analisadas': 0, 'movidas': 0, 'ja_no_store': 0,
+                 'bytes_legado': 0, 'blobs_novos': 0, 'bytes_novos': 0,
+                 'falhas': [], 'aplicar': aplicar}
+    store = blobs()
+    vistos = set()
+
+    with app.app_context():
+        query = RDOFoto.query
+        if admin_id is not None:
+            query = query.filter(RDOFoto.admin_id == admin_id)
+        query = query.order_by(RDOFoto.id.asc())
+        if limite:
+            query = query.limit(limite)
+
+        fotos = query.all()
+        for indice, foto in enumerate(fotos, start=1):
+            relatorio['analisadas'] += 1
+            trocas = {}
+            for coluna, _b64, _sufixo in _TRIO:
+                relativo = getattr(foto, coluna, None)
+                if not relativo or chave_da_referencia(relativo):
+                    continue
+                caminho = resolver_arquivo(relativo)
+                if not _arquivo_valido(caminho):
+                    relatorio['falhas'].append(
+                        {'foto_id': foto.id, 'motivo': 'arquivo_invalido',
+                         'caminho': relativo})
+                    trocas = None
+                    break
+                tamanho = os.path.getsize(caminho)
+                relatorio['bytes_legado'] += tamanho
+                with open(caminho, 'rb') as fh:
+                    chave = hashlib.file_digest(fh, 'sha256').hexdigest()
+                if chave not in vistos and not store.existe(chave):
+                    relatorio['blobs_novos'] += 1
+                    relatorio['bytes_novos'] += tamanho
+                vistos.add(chave)
+                if aplicar:
+                    store.guardar_arquivo(caminho)
+                trocas[coluna] = referencia(chave)
+            if trocas is None:
+                continue
+            if not trocas:
+                relatorio['ja_no_store'] += 1
+                continue
+
+            relatorio['movidas'] += 1
+            if aplicar:
+                if foto.caminho_arquivo in (foto.arquivo_otimizado, foto.arquivo_original):
+                    antigo = ('arquivo_otimizado' if foto.caminho_arquivo == foto.arquivo_otimizado
+                              else 'arquivo_original')
+                    foto.caminho_arquivo = trocas.get(antigo, foto.caminho_arquivo)
+                for coluna, valor in trocas.items():
+                    setattr(foto, coluna, valor)
+                if indice % lote == 0:
+                    db.session.commit()
+                    logger.info('… %s/%s', indice, len(fotos))
+
+        if aplicar:
+            db.session.commit()
+
+    logger.info('passada 3: %s foto(s) movida(s) para o store, %s já estavam; '
+                '%.1f MB de legado → %.1f MB em %s blob(s) [%s]',
+                relatorio['movidas'], relatorio['ja_no_store'],
+                relatorio['bytes_legado'] / 1e6, relatorio['bytes_novos'] / 1e6,
+                relatorio['blobs_novos'], 'APLICADO' if aplicar else 'DRY-RUN')
+    return relatorio
+
+
+def coletar_blobs(aplicar=False, idade_minima_s=3600):
+    """Apaga do store os blobs que nenhuma foto referencia — `deletar_foto`
+    não apaga blob, porque com deduplicação outra foto pode usar o mesmo.
+    Blob mais novo que `idade_minima_s` fica: o upload grava (ou, se o
+    conteúdo já existe, toca) o blob antes de a linha de RDOFoto ser
+    commitada. O órfão é renomeado antes de sair e a data é conferida de
+    novo: `guardar` que o tocou entre a primeira olhada e o rename o
+    devolve; o que chegar depois do rename não acha o blob e o regrava."""
+    import time
+
+    from app import app, db
+    from models import RDOFoto
+    from services.blob_store import chave_da_referencia, chave_valida, raiz_blobs
+
+    relatorio = {'blobs': 0, 'orfaos': 0, 'bytes_orfaos': 0, 'aplicar': aplicar}
+    with app.app_context():
+        referenciadas = set()
+        for linha in db.session.query(RDOFoto.arquivo_original, RDOFoto.arquivo_otimizado,
+                                      RDOFoto.thumbnail, RDOFoto.caminho_arquivo):
+            referenciadas.update(filter(None, map(chave_da_referencia, linha)))
+
+    limite = time.time() - idade_minima_s
+    for pasta, _dirs, arquivos in os.walk(raiz_blobs()):
+        for nome in arquivos:
+            if not chave_valida(nome):
+                continue
+            relatorio['blobs'] += 1
+            caminho = os.path.join(pasta, nome)
+            if nome in referenciadas or os.path.getmtime(caminho) > limite:
+                continue
+            if aplicar:
+                coletando = os.path.join(pasta, f'.coletando-{nome}')
+                try:
+                    os.rename(caminho, coletando)
+                except FileNotFoundError:
+                    continue
+                if os.path.getmtime(coletando) > limite:
+                    os.replace(coletando, caminho)
+                    continue
+                caminho = coletando
+            relatorio['orfaos'] += 1
+            relatorio['bytes_orfaos'] += os.path.getsize(caminho)
+            if aplicar:
+                os.remove(caminho)
+
+    logger.info('coleta: %s blob(s), %s órfão(s), %.1f MB [%s]', relatorio['blobs'],
+                relatorio['orfaos'], relatorio['bytes_orfaos'] / 1e6,
+                'APLICADO' if aplicar else 'DRY-RUN')
+    return relatorio
+
+
 def main():
     parser = argparse.ArgumentParser(description=__doc__,
                                      formatter_class=argparse.RawDescriptionHelpFormatter)
@@ -294,6 +439,10 @@ def main():
                         help='passada 2: zera a base64 (DESTRUTIVO)')
     parser.add_argument('--reverter', action='store_true',
                         help='rollback da passada 1')
+    parser.add_argument('--blobs', action='store_true',
+                        help='passada 3: move os arquivos legados para o store de blobs')
+    parser.add_argument('--coletar-blobs', action='store_true',
+                        help='apaga os blobs que nenhuma foto referencia')
     parser.add_argument('--lote', type=int, default=LOTE_PADRAO)
     parser.add_argument('--limite', type=int, default=None,
                         help='processa no máximo N fotos (ensaio)')
@@ -307,6 +456,12 @@ def main():
 
     if args.reverter:
         relatorio = reverter(admin_id=args.admin_id, aplicar=args.aplicar)
+    elif args.coletar_blobs:
+        relatorio = coletar_blobs(aplicar=args.aplicar)
+    elif args.blobs:
+        relatorio = mover_para_blobs(admin_id=args.admin_id,
+                                     aplicar=args.aplicar, lote=args.lote,
+                                     limite=args.limite)
     elif args.liberar:
         relatorio = liberar_base64(admin_id=args.admin_id,
                                    aplicar=args.aplicar, lote=args.lote,
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Reconsolida os fatos de produção de mão de obra (`fato_producao_mao_obra`).
+
+A tabela é mantida a cada commit que mexe num RDO, nos apontamentos, nas
+subatividades ou nos custos diários dele (services/fatos_producao), e os
+relatórios por funcionário das métricas leem dali. O que escreve por fora
+do ORM — SQL cru, carga em lote, restauração de backup — não passa pelo
+commit, e os fatos ficam para trás. Este script é o backfill e o reparo:
+apaga as linhas do tenant a partir da data pedida e as reconsolida dos RDOs
+finalizados.
+
+Uso:
+
+    # mostra quantas linhas cada tenant teria — não escreve nada
+    python scripts/reconstruir_fatos_producao.py --admin-id 42 --desde 2026-03-01
+
+    python scripts/reconstruir_fatos_producao.py --admin-id 42 --desde 2026-03-01 --aplicar
+    python scripts/reconstruir_fatos_producao.py --aplicar          # todos, do zero
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Reconsolida fato_producao_mao_obra a partir de uma data')
+    parser.add_argument('--admin-id', type=int, default=None,
+                        help='limita a um tenant (sem ele: todos com RDO)')
+    parser.add_argument('--desde', default=None, metavar='AAAA-MM-DD',
+                        help='primeira data reconsolidada (sem ela: desde o início)')
+    parser.add_argument('--aplicar', action='store_true',
+                        help='ESCREVE. Sem esta flag, reconsolida e desfaz (rollback).')
+    args = parser.parse_args(argv)
+    desde = datetime.strptime(args.desde, '%Y-%m-%d').date() if args.desde else None
+
+    from sqlalchemy import text
+
+    from app import app, db
+    from services.fatos_producao import reconstruir
+
+    with app.app_context():
+        if args.admin_id:
+            tenants = [args.admin_id]
+        else:
+            tenants = [a for (a,) in db.session.execute(text(
+                'SELECT DISTINCT admin_id FROM rdo WHERE admin_id IS NOT NULL ORDER BY admin_id'))]
+        for admin_id in tenants:
+            t0 = time.perf_counter()
+            linhas = reconstruir(admin_id, desde)
+            if args.aplicar:
+                db.session.commit()
+            else:
+                db.session.rollback()
+            print(f'tenant {admin_id}: {linhas} linha(s) (RDO × serviço × funcionário) '
+                  f'em {time.perf_counter() - t0:.1f} s'
+                  f'{"" if args.aplicar else " — simulação, nada gravado"}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Reconstrói os saldos mensais por conta (`balancete_mensal`) a partir de um mês.
+
+A tabela é mantida a cada flush que grava partida (services/saldos_mensais),
+e os relatórios contábeis leem dela o saldo de abertura. O que escreve
+partida por fora do ORM — SQL cru, `query.delete()`, restauração de backup —
+não passa pelo flush, e o saldo mensal fica para trás. Este script é o
+reparo: apaga as linhas do tenant a partir do mês pedido e as regrava de um
+GROUP BY das partidas, carregando a abertura do mês anterior.
+
+Uso:
+
+    # mostra quantas linhas cada tenant teria — não escreve nada
+    python scripts/reconstruir_saldos_mensais.py --admin-id 42 --desde 2026-03
+
+    python scripts/reconstruir_saldos_mensais.py --admin-id 42 --desde 2026-03 --aplicar
+    python scripts/reconstruir_saldos_mensais.py --aplicar          # todos, do zero
+
+Toma o advisory lock exclusivo do tenant: espera lançamento em andamento
+terminar, e segura os novos até o commit.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Reconstrói balancete_mensal a partir de um mês')
+    parser.add_argument('--admin-id', type=int, default=None,
+                        help='limita a um tenant (sem ele: todos com partida)')
+    parser.add_argument('--desde', default=None, metavar='AAAA-MM',
+                        help='primeiro mês reconstruído (sem ele: desde o início)')
+    parser.add_argument('--aplicar', action='store_true',
+                        help='ESCREVE. Sem esta flag, reconstrói e desfaz (rollback).')
+    args = parser.parse_args(argv)
+    desde = datetime.strptime(args.desde, '%Y-%m').date() if args.desde else None
+
+    from sqlalchemy import text
+
+    from app import app, db
+    from services.saldos_mensais import reconstruir
+
+    with app.app_context():
+        if args.admin_id:
+            tenants = [args.admin_id]
+        else:
+            tenants = [a for (a,) in db.session.execute(text(
+                'SELECT DISTINCT admin_id FROM partida_contabil ORDER BY admin_id'))]
+        for admin_id in tenants:
+            linhas = reconstruir(admin_id, desde)
+            if args.aplicar:
+                db.session.commit()
+            else:
+                db.session.rollback()
+            print(f'tenant {admin_id}: {linhas} linha(s) (conta × mês)'
+                  f'{"" if args.aplicar else " — simulação, nada gravado"}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
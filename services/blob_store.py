@@ -0,0 +1,195 @@
+"""Store de blobs endereçado por conteúdo — as fotos de RDO moram aqui.
+
+A chave é o SHA-256 do conteúdo (64 hex). A mesma foto enviada duas vezes
+(reimportação do físico-financeiro, cópia de RDO, o mesmo arquivo em duas
+obras) vira UM arquivo; a chave também é o ETag forte de quem serve a foto,
+porque conteúdo e chave não podem divergir.
+
+No disco (`BackendDisco`), a chave vira `ab/cd/abcd…` sob a raiz — dois
+níveis de 256 diretórios, para nenhum diretório passar de poucas centenas
+de entradas com o acervo de ~29 mil fotos × 3 versões. A escrita é
+temporário + fsync + `os.replace`: leitor nunca vê blob pela metade, e dois
+workers gravando o mesmo conteúdo ao mesmo tempo produzem o mesmo arquivo.
+
+A raiz é `$UPLOADS_PATH/blobs` (volume persistente) ou
+`static/uploads/blobs` sem volume — lida a cada chamada, como
+`rdo_foto_service.caminho_absoluto`. O banco guarda a referência
+`uploads/blobs/ab/cd/<chave>`: é um caminho relativo que o
+`caminho_absoluto` de sempre resolve, então quem ainda lê arquivo por
+caminho (o script de migração, o `_resolver_arquivo_foto`) continua
+funcionando; quem quer a chave usa `chave_da_referencia`.
+
+Outro backend (objeto em S3, por exemplo) implementa `BackendBlobs` — a
+referência no banco não muda, só onde o conteúdo da chave mora. Blob nunca
+é apagado junto com a foto: com deduplicação, outra foto pode apontar para
+o mesmo conteúdo. Órfãos saem pela coleta do
+scripts/migrar_fotos_rdo_para_disco.py (`--coletar-blobs`), que poupa blob
+recente — por isso guardar conteúdo que já existe renova a data dele.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import re
+import shutil
+import tempfile
+
+PREFIXO_REFERENCIA = 'uploads/blobs/'
+_CHAVE = re.compile(r'[0-9a-f]{64}')
+_BLOCO = 1 << 20
+
+
+def raiz_blobs() -> str:
+    base = os.environ.get('UPLOADS_PATH') or os.path.join(os.getcwd(), 'static', 'uploads')
+    return os.path.join(base, 'blobs')
+
+
+def chave_valida(chave) -> bool:
+    return bool(chave) and _CHAVE.fullmatch(str(chave)) is not None
+
+
+def referencia(chave: str) -> str:
+    """Caminho relativo gravado no banco para a chave."""
+    return f'{PREFIXO_REFERENCIA}{chave[:2]}/{chave[2:4]}/{chave}'
+
+
+def chave_da_referencia(ref) -> str | None:
+    """A chave de `uploads/blobs/ab/cd/<chave>`; None para caminho legado."""
+    if not ref or not str(ref).startswith(PREFIXO_REFERENCIA):
+        return None
+    chave = str(ref).rsplit('/', 1)[-1]
+    return chave if chave_valida(chave) and ref == referencia(chave) else None
+
+
+class BackendBlobs:
+    """Onde o conteúdo de cada chave mora. A chave chega validada."""
+
+    def existe(self, chave: str) -> bool:
+        raise NotImplementedError
+
+    def tocar(self, chave: str) -> bool:
+        """Renova a data do blob e diz se ele existe. É o acerto da
+        deduplicação: blob reaproveitado volta a ser recente, e a coleta de
+        órfãos não o apaga antes de a foto nova ser commitada."""
+        raise NotImplementedError
+
+    def gravar(self, chave: str, origem) -> None:
+        """Grava o conteúdo do arquivo aberto `origem` sob a chave —
+        atômico: ou o blob inteiro, ou nada."""
+        raise NotImplementedError
+
+    def abrir(self, chave: str):
+        """Arquivo binário aberto para leitura; FileNotFoundError se faltar."""
+        raise NotImplementedError
+
+    def tamanho(self, chave: str) -> int:
+        raise NotImplementedError
+
+    def caminho_local(self, chave: str) -> str | None:
+        """Caminho no sistema de arquivos, quando existe — permite
+        `send_file` com sendfile(2) e o ImageReader do ReportLab direto do
+        disco. Backend remoto devolve None e quem lê usa `abrir`."""
+        return None
+
+
+class BackendDisco(BackendBlobs):
+    def __init__(self, raiz: str):
+        self.raiz = raiz
+
+    def _caminho(self, chave):
+        return os.path.join(self.raiz, chave[:2], chave[2:4], chave)
+
+    def existe(self, chave):
+        return os.path.exists(self._caminho(chave))
+
+    def tocar(self, chave):
+        try:
+            os.utime(self._caminho(chave))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def gravar(self, chave, origem):
+        destino = self._caminho(chave)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        fd, temporario = tempfile.mkstemp(dir=os.path.dirname(destino), prefix='.parcial-')
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                shutil.copyfileobj(origem, fh, _BLOCO)
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.chmod(temporario, 0o644)
+            os.replace(temporario, destino)
+        except BaseException:
+            try:
+                os.remove(temporario)
+            except OSError:
+                pass
+            raise
+
+    def abrir(self, chave):
+        return open(self._caminho(chave), 'rb')
+
+    def tamanho(self, chave):
+        return os.path.getsize(self._caminho(chave))
+
+    def caminho_local(self, chave):
+        caminho = self._caminho(chave)
+        return caminho if os.path.exists(caminho) else None
+
+
+class BlobStore:
+    """Deduplicação e verificação por cima de um `BackendBlobs`."""
+
+    def __init__(self, backend: BackendBlobs):
+        self.backend = backend
+
+    def guardar(self, dados: bytes) -> str:
+        """Guarda os bytes e devolve a chave; conteúdo já presente não é
+        regravado, só tocado (`BackendBlobs.tocar`)."""
+        chave = hashlib.sha256(dados).hexdigest()
+        if not self.backend.tocar(chave):
+            self.backend.gravar(chave, io.BytesIO(dados))
+        return chave
+
+    def guardar_arquivo(self, caminho: str) -> str:
+        """Como `guardar`, lendo de um arquivo em blocos (sem carregar a
+        foto original inteira em memória para calcular o hash)."""
+        h = hashlib.sha256()
+        with open(caminho, 'rb') as fh:
+            for bloco in iter(lambda: fh.read(_BLOCO), b''):
+                h.update(bloco)
+            chave = h.hexdigest()
+            if not self.backend.tocar(chave):
+                fh.seek(0)
+                self.backend.gravar(chave, fh)
+        return chave
+
+    def existe(self, chave) -> bool:
+        return chave_valida(chave) and self.backend.existe(chave)
+
+    def ler(self, chave: str) -> bytes:
+        if not chave_valida(chave):
+            raise FileNotFoundError(chave)
+        with self.backend.abrir(chave) as fh:
+            return fh.read()
+
+    def caminho_local(self, chave: str) -> str | None:
+        return self.backend.caminho_local(chave) if chave_valida(chave) else None
+
+    def verificar(self, chave: str) -> bool:
+        """True se o conteúdo guardado ainda tem o hash da chave (bit rot,
+        arquivo truncado por disco cheio antes da escrita atômica)."""
+        if not self.existe(chave):
+            return False
+        h = hashlib.sha256()
+        with self.backend.abrir(chave) as fh:
+            for bloco in iter(lambda: fh.read(_BLOCO), b''):
+                h.update(bloco)
+        return h.hexdigest() == chave
+
+
+def blobs() -> BlobStore:
+    """O store do processo, no disco sob `raiz_blobs()`."""
+    return BlobStore(BackendDisco(raiz_blobs()))
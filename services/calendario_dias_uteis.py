@@ -0,0 +1,175 @@
+"""Calendário de dias úteis pré-computado — índice compartilhado pelos motores
+de cronograma.
+
+`utils/cronograma_engine` (calcular_data_fim, dias_uteis_entre,
+proximo_dia_util), `services/cronograma_scheduler` (somar_dias_uteis,
+duracao_util_entre) e `services/cronograma_fisico_financeiro`
+(fasear_por_dias_uteis) andavam de um em um dia com `timedelta(days=1)`. O
+passe para trás do scheduler chama essas funções dentro de laços aninhados —
+numa obra de milhares de tarefas, com durações de meses, era ali que o
+recálculo passava o tempo.
+
+Aqui o calendário vira DUAS listas, montadas uma vez por configuração:
+
+  * `acum[i]`  — nº de dias úteis em [base, base + i) (soma de prefixo);
+  * `uteis[k]` — ordinal do k-ésimo dia útil a partir de `base`.
+
+Contar dias úteis entre duas datas é uma subtração de `acum`; somar N dias
+úteis é um índice em `uteis`. O intervalo coberto cresce sob demanda
+(data fora da faixa → reconstrução maior), então nenhuma data é recusada.
+
+Regra de dia útil = a de sempre: sábado/domingo conforme `CalendarioEmpresa`
+(`considerar_sabado`/`considerar_domingo`) e, opcionalmente, um conjunto de
+feriados. `calendario_do_tenant` NÃO carrega feriados: `CalendarioUtil` é a
+tabela da folha (chave primária só na data, sem tenant de fato) e o
+cronograma nunca pulou feriado — ligá-los aqui deslocaria datas já gravadas.
+Quem precisar passa `feriados=` explicitamente.
+
+Puro (sem DB) exceto `calendario_do_tenant`, cujo import de models é tardio.
+"""
+from __future__ import annotations
+
+import threading
+from datetime import date
+from functools import lru_cache
+
+# Faixa inicial: cobre todo cronograma real do sistema com folga. Fora dela o
+# índice cresce sozinho (ver `_cobrir`).
+_BASE_INICIAL = date(2000, 1, 1).toordinal()
+_FIM_INICIAL = date(2041, 1, 1).toordinal()
+_MARGEM_MINIMA = 366
+
+
+class CalendarioDiasUteis:
+    """Índice de dias úteis para UMA configuração (sábado, domingo, feriados).
+
+    Imutável do ponto de vista de quem usa: o estado interno é uma única
+    tupla trocada de uma vez quando a faixa cresce, então leitores
+    concorrentes (threads do gunicorn) nunca veem listas pela metade.
+    """
+
+    def __init__(self, considerar_sabado: bool = False,
+                 considerar_domingo: bool = False, feriados=()):
+        self.considerar_sabado = bool(considerar_sabado)
+        self.considerar_domingo = bool(considerar_domingo)
+        self.feriados = frozenset(d.toordinal() for d in feriados)
+        self._lock = threading.Lock()
+        self._indice = self._construir(_BASE_INICIAL, _FIM_INICIAL)
+
+    # ── Índice ──────────────────────────────────────────────────────────────
+
+    def _util_ordinal(self, o: int) -> bool:
+        wd = (o + 6) % 7  # mesmo valor de date.weekday(): 0=Seg … 6=Dom
+        if wd == 5 and not self.considerar_sabado:
+            return False
+        if wd == 6 and not self.considerar_domingo:
+            return False
+        return o not in self.feriados
+
+    def _construir(self, base: int, fim: int) -> tuple:
+        """(base, fim, acum, uteis) para os ordinais em [base, fim)."""
+        acum = [0]
+        uteis = []
+        for o in range(base, fim):
+            if self._util_ordinal(o):
+                uteis.append(o)
+            acum.append(len(uteis))
+        return base, fim, acum, uteis
+
+    def _cobrir(self, o_min: int, o_max: int) -> tuple:
+        """Índice que cobre [o_min, o_max]; reconstrói maior se preciso."""
+        indice = self._indice
+        if indice[0] <= o_min and o_max < indice[1]:
+            return indice
+        with self._lock:
+            base, fim = self._indice[0], self._indice[1]
+            if o_min < base:
+                base = o_min - max(_MARGEM_MINIMA, fim - base)
+            if o_max >= fim:
+                fim = o_max + 1 + max(_MARGEM_MINIMA, fim - base)
+            if (base, fim) != self._indice[:2]:
+                self._indice = self._construir(base, fim)
+            return self._indice
+
+    def _deslocar(self, o: int, n: int) -> date:
+        """Dia útil na posição (úteis até `o`) + `n` — ver `somar`."""
+        alcance = _MARGEM_MINIMA + 2 * abs(n)
+        while True:
+            indice = self._cobrir(o - alcance, o + alcance)
+            base, _fim, acum, uteis = indice
+            k = acum[o - base + 1] + n
+            if 0 <= k < len(uteis):
+                return date.fromordinal(uteis[k])
+            alcance *= 2
+
+    # ── Consultas ───────────────────────────────────────────────────────────
+
+    def eh_util(self, d: date) -> bool:
+        return self._util_ordinal(d.toordinal())
+
+    def contar(self, inicio: date, fim: date) -> int:
+        """Dias úteis entre `inicio` e `fim`, inclusivo nos dois extremos.
+        `fim < inicio` → 0."""
+        if fim < inicio:
+            return 0
+        o_ini, o_fim = inicio.toordinal(), fim.toordinal()
+        base, _fim, acum, _uteis = self._cobrir(o_ini, o_fim)
+        return acum[o_fim - base + 1] - acum[o_ini - base]
+
+    def somar(self, d: date, n: int) -> date:
+        """Anda `n` dias úteis a partir de `d`; cada passo pousa num útil.
+
+        n>0: o n-ésimo útil estritamente DEPOIS de `d`;
+        n<0: o |n|-ésimo útil estritamente ANTES de `d`;
+        n=0: o próprio `d` se útil, senão o próximo útil.
+        """
+        o = d.toordinal()
+        if n > 0:
+            return self._deslocar(o, n - 1)
+        if n < 0:
+            # posição do último útil antes de `d` = úteis até o-1, menos 1
+            return self._deslocar(o - 1, n)
+        return self._deslocar(o - 1, 0)
+
+    def proximo(self, d: date) -> date:
+        """O próprio `d` se útil; senão o próximo útil."""
+        return self.somar(d, 0)
+
+    def anterior(self, d: date) -> date:
+        """O próprio `d` se útil; senão o útil anterior."""
+        return self._deslocar(d.toordinal(), -1)
+
+    def dias_por_mes(self, inicio: date, fim: date) -> dict:
+        """{'YYYY-MM': dias úteis} entre `inicio` e `fim` (inclusivo), só
+        meses com pelo menos um dia útil — uma subtração por mês."""
+        out: dict[str, int] = {}
+        ano, mes = inicio.year, inicio.month
+        while (ano, mes) <= (fim.year, fim.month):
+            prox = date(ano + (mes == 12), mes % 12 + 1, 1)
+            de = max(inicio, date(ano, mes, 1))
+            ate = min(fim, date.fromordinal(prox.toordinal() - 1))
+            n = self.contar(de, ate)
+            if n:
+                out[f'{ano:04d}-{mes:02d}'] = n
+            ano, mes = prox.year, prox.month
+        return out
+
+
+@lru_cache(maxsize=64)
+def obter_calendario(considerar_sabado: bool = False,
+                     considerar_domingo: bool = False,
+                     feriados: frozenset = frozenset()) -> CalendarioDiasUteis:
+    """Índice compartilhado por configuração — todos os tenants com o mesmo
+    calendário usam a mesma instância (montada uma vez por processo)."""
+    return CalendarioDiasUteis(considerar_sabado, considerar_domingo, feriados)
+
+
+def calendario_do_tenant(admin_id: int) -> CalendarioDiasUteis:
+    """Índice do tenant a partir de `CalendarioEmpresa` (via
+    `utils.cronograma_engine.get_calendario`, que cria o padrão seg–sex se
+    não existir). Sem feriados — ver docstring do módulo."""
+    from utils.cronograma_engine import get_calendario
+
+    cal = get_calendario(admin_id)
+    return obter_calendario(bool(cal.considerar_sabado),
+                            bool(cal.considerar_domingo))
@@ -8,10 +8,15 @@ A ordem de resolução (Regra → Memória Exata → Pendente), o desempate por
 prioridade e a decisão auto/Pendente vivem AQUI dentro (locality) — quem chama
 (`processar()`, endpoints do loop ao vivo) só consome o Veredito.
 
+As Regras são compiladas (`compilar`, com cache por conteúdo) num autômato
+de gatilhos por tipo e campo — ver a seção "Regras compiladas".
+
 Linguagem: CONTEXT.md (Regra de Classificação, Gatilho, Prioridade, Pendente de
 Classificação, Memória Exata). Ver ADR-0002 e spec 2026-06-09 §5.
 """
+import threading
 import unicodedata as _ud
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from typing import Optional
 
@@ -53,6 +58,8 @@ class Contexto:
     """Tudo que o classificador precisa, já carregado em memória."""
     regras: list = field(default_factory=list)
     memoria_exata: dict = field(default_factory=dict)  # texto_norm → (cat_id, cat_nome)
+    # (assinatura das regras, ClassificadorCompilado) — ver _compilado_do()
+    _compilado: tuple = field(default=None, init=False, repr=False, compare=False)
 
 
 @dataclass
@@ -211,22 +218,226 @@ def _chave_desempate(regra: Regra, campos: dict) -> tuple:
     """Ordena candidatas — menor tupla vence. Em ordem de critério:
     1. menor prioridade; 2. usuário antes de sistema; 3. campo específico antes
     de 'qualquer'; 4. match mais longo (especificidade)."""
+    return _chave(regra, _maior_match(regra, campos))
+
+
+def _chave(regra: Regra, maior_match: int) -> tuple:
     origem_rank = 0 if regra.origem == "usuario" else 1
     campo_rank = 1 if regra.campo_alvo == "qualquer" else 0
-    return (regra.prioridade, origem_rank, campo_rank, -_maior_match(regra, campos))
+    return (regra.prioridade, origem_rank, campo_rank, -maior_match)
 
 
-def regra_vencedora(lanc: Lancamento, ctx: Contexto):
-    """A Regra que classificaria o Lançamento (menor desempate), ou None se
-    nenhuma casa. Exposta para detectar a regra conflitante numa Correção."""
+def _vencedora_por_varredura(lanc: Lancamento, regras) -> Optional[Regra]:
+    """Regra a regra, gatilho a gatilho — o motor antes do autômato. Fica como
+    a referência de paridade do `ClassificadorCompilado` (testes)."""
     campos = _campos_busca(lanc)
-    candidatas = [r for r in ctx.regras
+    candidatas = [r for r in regras
                   if r.tipo == lanc.tipo and _regra_casa(r, campos, lanc.tem_obra)]
     if not candidatas:
         return None
     return min(candidatas, key=lambda r: _chave_desempate(r, campos))
 
 
+# ── Regras compiladas: um autômato de gatilhos por (tipo, campo) ────────────
+#
+# A varredura acima custa, por Lançamento, (nº de Regras × palavras de cada
+# uma) normalizações e buscas de substring — e `_maior_match` renormaliza tudo
+# de novo no desempate. Numa importação anual (milhares de linhas) com as
+# centenas de Regras de um tenant, é o grosso do tempo do preview.
+#
+# Compilado, cada texto alvo é lido UMA vez por um Aho–Corasick que contém
+# todos os gatilhos, exceções e gatilhos extra (já normalizados) das Regras
+# daquele tipo que olham aquele campo. O que sai da passada — os padrões que
+# ocorrem — é projetado nas Regras por índices invertidos: quem casou, com o
+# maior match; quem a exceção anulou; quem satisfez o extra. O desempate é a
+# mesma `_chave_desempate`, com o maior match já calculado.
+
+class _Automato:
+    """Aho–Corasick: uma passada no texto devolve os padrões que ocorrem nele
+    (mesma resposta que `padrao in texto`, para todos os padrões de uma vez)."""
+
+    def __init__(self, padroes):
+        self.padroes = list(padroes)
+        self._vazios = frozenset(i for i, p in enumerate(self.padroes) if not p)
+        trans = [{}]
+        saida = [set()]
+        for i, padrao in enumerate(self.padroes):
+            if not padrao:
+                continue                    # '' está em qualquer texto
+            estado = 0
+            for ch in padrao:
+                prox = trans[estado].get(ch)
+                if prox is None:
+                    prox = trans[estado][ch] = len(trans)
+                    trans.append({})
+                    saida.append(set())
+                estado = prox
+            saida[estado].add(i)
+        # Links de falha em largura; a saída de cada estado herda a do sufixo.
+        falha = [0] * len(trans)
+        fila = list(trans[0].values())
+        for estado in fila:
+            for ch, prox in trans[estado].items():
+                fila.append(prox)
+                f = falha[estado]
+                while f and ch not in trans[f]:
+                    f = falha[f]
+                falha[prox] = trans[f].get(ch, 0)
+                saida[prox] |= saida[falha[prox]]
+        self._trans = trans
+        self._falha = falha
+        self._saida = [frozenset(s) for s in saida]
+
+    def ocorrencias(self, texto: str) -> set:
+        trans, falha, saida = self._trans, self._falha, self._saida
+        achados = set(self._vazios)
+        estado = 0
+        for ch in texto:
+            while estado and ch not in trans[estado]:
+                estado = falha[estado]
+            estado = trans[estado].get(ch, 0)
+            if saida[estado]:
+                achados |= saida[estado]
+        return achados
+
+
+class _IndiceDoTipo:
+    """Regras de um tipo (ENTRADA/SAIDA) compiladas por campo alvo. Os
+    índices são posições na lista de Regras compilada."""
+
+    def __init__(self, regras, posicoes):
+        self.regras = regras
+        padroes = {}        # campo → {padrão normalizado: id}
+        # campo → id do padrão → [(idx da regra, tamanho)] / [idx da regra]
+        self.gatilhos, self.excecoes, self.extras = {}, {}, {}
+        self.exige_extra = set()
+
+        def _registrar(campo, palavra, destino, valor):
+            ids = padroes.setdefault(campo, {})
+            pid = ids.setdefault(_norm_kw(palavra), len(ids))
+            destino.setdefault(campo, {}).setdefault(pid, []).append(valor)
+
+        for i in posicoes:
+            r = regras[i]
+            for p in r.palavras:
+                _registrar(r.campo_alvo, p, self.gatilhos, (i, len(_norm_kw(p))))
+            for e in r.excecoes:
+                _registrar(r.campo_alvo, e, self.excecoes, i)
+            if r.gatilho_extra:
+                self.exige_extra.add(i)
+                for p in r.gatilho_extra:
+                    _registrar(r.campo_extra, p, self.extras, i)
+        self.automatos = {campo: _Automato(ids) for campo, ids in padroes.items()}
+
+    def candidatas(self, campos: dict, tem_obra: bool) -> dict:
+        """{idx da regra: maior match} das Regras que casam — a mesma
+        resposta de `_regra_casa` + `_maior_match`, regra a regra."""
+        achados = {campo: aut.ocorrencias(_alvo(campo, campos))
+                   for campo, aut in self.automatos.items()}
+        maior = {}
+        for campo, por_padrao in self.gatilhos.items():
+            for pid in achados[campo]:
+                for i, tamanho in por_padrao.get(pid, ()):
+                    if tamanho >= maior.get(i, 0):
+                        maior[i] = tamanho
+        if not maior:
+            return maior
+        anuladas = {i for campo, por_padrao in self.excecoes.items()
+                    for pid in achados[campo] for i in por_padrao.get(pid, ())}
+        com_extra = {i for campo, por_padrao in self.extras.items()
+                     for pid in achados[campo] for i in por_padrao.get(pid, ())}
+        return {
+            i: tamanho for i, tamanho in maior.items()
+            if i not in anuladas
+            and (i not in self.exige_extra or i in com_extra)
+            and _condicao_obra_ok(self.regras[i], tem_obra)
+        }
+
+
+class ClassificadorCompilado:
+    """As Regras de um tenant prontas para classificar em lote.
+
+    Imutável depois de construído; compartilhado entre requests pelo cache de
+    `compilar` (a chave é o conteúdo das Regras, então editar/criar/desativar
+    uma Regra no cadastro gera outra chave — não há o que invalidar à mão).
+    Responde em POSIÇÕES na lista de Regras: quem chama traduz para os
+    próprios objetos Regra, iguais em conteúdo aos compilados."""
+
+    def __init__(self, regras):
+        self.regras = list(regras)
+        self._por_tipo = {}
+        for tipo in {r.tipo for r in self.regras}:
+            self._por_tipo[tipo] = _IndiceDoTipo(
+                self.regras, [i for i, r in enumerate(self.regras) if r.tipo == tipo])
+
+    def candidatas(self, lanc: Lancamento) -> dict:
+        """{posição da Regra: maior match} de todas as Regras que casam."""
+        indice = self._por_tipo.get(lanc.tipo)
+        if indice is None:
+            return {}
+        return indice.candidatas(_campos_busca(lanc), lanc.tem_obra)
+
+    def vencedora(self, lanc: Lancamento) -> Optional[int]:
+        """Posição da Regra vencedora (menor `_chave`; empate: a primeira)."""
+        melhor, melhor_chave = None, None
+        for i, tamanho in sorted(self.candidatas(lanc).items()):
+            chave = _chave(self.regras[i], tamanho)
+            if melhor_chave is None or chave < melhor_chave:
+                melhor, melhor_chave = i, chave
+        return melhor
+
+
+def _assinatura(regras) -> tuple:
+    return tuple(
+        (tuple(r.palavras), r.categoria_id, r.categoria_nome, r.campo_alvo,
+         tuple(r.excecoes), r.condicao_obra, r.prioridade, r.origem, r.tipo,
+         tuple(r.gatilho_extra), r.campo_extra)
+        for r in regras
+    )
+
+
+_COMPILADOS_MAX = 64        # um por tenant ativo, com folga
+_compilados: "OrderedDict[tuple, ClassificadorCompilado]" = OrderedDict()
+_compilados_lock = threading.Lock()
+
+
+def compilar(regras) -> ClassificadorCompilado:
+    """O ClassificadorCompilado destas Regras — do cache (LRU) quando o mesmo
+    conjunto já foi compilado neste processo. O preview, o loop ao vivo e a
+    Correção recarregam as Regras do tenant a cada request; o que custa é
+    compilar, e só recompila quando o cadastro mudou."""
+    chave = _assinatura(regras)
+    with _compilados_lock:
+        compilado = _compilados.get(chave)
+        if compilado is not None:
+            _compilados.move_to_end(chave)
+            return compilado
+    compilado = ClassificadorCompilado(regras)
+    with _compilados_lock:
+        _compilados[chave] = compilado
+        while len(_compilados) > _COMPILADOS_MAX:
+            _compilados.popitem(last=False)
+    return compilado
+
+
+def _compilado_do(ctx: Contexto) -> ClassificadorCompilado:
+    """Compila uma vez por Contexto (o preview classifica milhares de linhas
+    com o mesmo). A chave é o CONTEÚDO das Regras (`_assinatura`), não a
+    identidade da lista: Regra editada no lugar também recompila."""
+    assinatura = _assinatura(ctx.regras)
+    memo = ctx._compilado
+    if memo is None or memo[0] != assinatura:
+        memo = ctx._compilado = (assinatura, compilar(ctx.regras))
+    return memo[1]
+
+
+def regra_vencedora(lanc: Lancamento, ctx: Contexto):
+    """A Regra que classificaria o Lançamento (menor desempate), ou None se
+    nenhuma casa. Exposta para detectar a regra conflitante numa Correção."""
+    i = _compilado_do(ctx).vencedora(lanc)
+    return None if i is None else ctx.regras[i]
+
+
 def classificar(lanc: Lancamento, ctx: Contexto) -> Veredito:
     """Devolve o Veredito do Lançamento.
 
@@ -337,10 +548,11 @@ def gerar_sugestoes(pendentes, regras_existentes=()):
     distintas, cada uma com os Lançamentos que cobre (drill-down), ordenada por
     impacto. Um termo candidato que contenha um gatilho já cadastrado é descartado
     (o cadastro já sabe classificá-lo)."""
-    cobertos = {_norm(p) for r in regras_existentes for p in r.palavras if _norm(p)}
+    cobertos = _Automato(sorted({_norm(p) for r in regras_existentes
+                                 for p in r.palavras if _norm(p)}))
 
     def _coberto(termo):
-        return any(kw in termo for kw in cobertos)
+        return bool(cobertos.ocorrencias(termo))
 
     # termo candidato -> índices dos Pendentes cujo fornecedor o contém
     cand = {}
@@ -6,22 +6,15 @@ ObraServicoCusto + pesos do IMC + datas das tarefas.
 """
 from __future__ import annotations
 
-from datetime import date, timedelta
+from datetime import date
 from decimal import Decimal, ROUND_HALF_UP
 
+from services.calendario_dias_uteis import obter_calendario
+
 CENTAVO = Decimal("0.01")
 NAO_FASEADO = "__nao_faseado__"
 
 
-def _is_dia_util(d: date, considerar_sabado: bool, considerar_domingo: bool) -> bool:
-    wd = d.weekday()  # 0=seg ... 5=sab 6=dom
-    if wd == 5 and not considerar_sabado:
-        return False
-    if wd == 6 and not considerar_domingo:
-        return False
-    return True
-
-
 def fasear_por_dias_uteis(valor: Decimal, data_inicio, data_fim,
                           considerar_sabado: bool, considerar_domingo: bool) -> dict:
     """Distribui `valor` pelos dias úteis entre data_inicio e data_fim (inclusive),
@@ -33,15 +26,11 @@ def fasear_por_dias_uteis(valor: Decimal, data_inicio, data_fim,
     if not data_inicio or not data_fim:
         return {NAO_FASEADO: valor}
 
-    dias_por_mes: dict[str, int] = {}
-    d = data_inicio
-    total_dias = 0
-    while d <= data_fim:
-        if _is_dia_util(d, considerar_sabado, considerar_domingo):
-            chave = f"{d.year:04d}-{d.month:02d}"
-            dias_por_mes[chave] = dias_por_mes.get(chave, 0) + 1
-            total_dias += 1
-        d += timedelta(days=1)
+    # Contagem por mês numa subtração de soma de prefixo por mês (índice
+    # compartilhado de services/calendario_dias_uteis), não um laço por dia.
+    dias_por_mes = obter_calendario(
+        considerar_sabado, considerar_domingo).dias_por_mes(data_inicio, data_fim)
+    total_dias = sum(dias_por_mes.values())
 
     if total_dias == 0:
         return {NAO_FASEADO: valor}
@@ -19,9 +19,11 @@ Vocabulário dos vínculos (pt-BR do MS Project):
   TT (término→término, FF) · IT (início→término, SF).
 
 Estrutura do módulo:
-  * B1 — matemática de dias úteis (funções puras);
+  * B1 — matemática de dias úteis (funções puras, sobre o índice de
+    `services/calendario_dias_uteis`);
   * B2 — dataclasses `NoTarefa`/`VinculoSpec`, grafo, ciclo, ordem topológica;
-  * B4/B5 — `calcular_agendamento` (passe p/ frente + roll-up + folga), puro;
+  * B4/B5 — `calcular_agendamento` (passe p/ frente + roll-up + folga) e a
+    variante `calcular_agendamento_incremental`, puros;
   * B3/B6 — predicado de âncora e persistência (`recalcular_obra`,
     `sincronizar_vinculos_de_predecessora_id`) — únicos pontos que tocam DB
     (imports de models são tardios, dentro das funções: o módulo importa
@@ -31,7 +33,7 @@ from __future__ import annotations
 
 import logging
 from dataclasses import dataclass, field
-from datetime import date, timedelta
+from datetime import date
 
 logger = logging.getLogger(__name__)
 
@@ -42,6 +44,18 @@ TIPOS_VINCULO = ('TI', 'II', 'TT', 'IT')
 # B1 — Matemática de dias úteis (seg–sex fixo; funções puras)
 # ─────────────────────────────────────────────────────────────────────────────
 
+# A aritmética é delegada ao índice pré-computado de
+# `services/calendario_dias_uteis` (soma de prefixo): o passe para trás chama
+# `somar_dias_uteis`/`duracao_util_entre` por vínculo, e andar de um em um
+# dia ali custava O(duração) a cada chamada. A configuração é a fixa da Fase 1 (seg–sex,
+# sem feriados) — trocar para o calendário do tenant é a fase futura da
+# docstring do módulo, e aí muda só `_calendario`.
+
+def _calendario():
+    from services.calendario_dias_uteis import obter_calendario
+    return obter_calendario(False, False)
+
+
 def eh_dia_util(d: date) -> bool:
     """Segunda a sexta. Calendário fixo da Fase 1 (ver docstring do módulo)."""
     return d.weekday() < 5
@@ -53,16 +67,12 @@ def proximo_dia_util(d: date) -> date:
     Atenção: semântica diferente do homônimo em `utils/cronograma_engine`
     (que devolve o útil estritamente APÓS `d`).
     """
-    while not eh_dia_util(d):
-        d += timedelta(days=1)
-    return d
+    return _calendario().proximo(d)
 
 
 def dia_util_anterior(d: date) -> date:
     """O próprio `d` se for útil; senão rola PARA TRÁS até o útil anterior."""
-    while not eh_dia_util(d):
-        d -= timedelta(days=1)
-    return d
+    return _calendario().anterior(d)
 
 
 def somar_dias_uteis(d: date, n: int) -> date:
@@ -71,15 +81,7 @@ def somar_dias_uteis(d: date, n: int) -> date:
     n=0 apenas normaliza: `proximo_dia_util(d)` (sábado → segunda).
     Cada passo pousa num dia útil: somar_dias_uteis(sexta, 1) = segunda.
     """
-    if n == 0:
-        return proximo_dia_util(d)
-    passo = 1 if n > 0 else -1
-    restantes = abs(n)
-    while restantes > 0:
-        d += timedelta(days=passo)
-        if eh_dia_util(d):
-            restantes -= 1
-    return d
+    return _calendario().somar(d, n)
 
 
 def fim_por_duracao(inicio: date, duracao: int) -> date:
@@ -93,13 +95,7 @@ def fim_por_duracao(inicio: date, duracao: int) -> date:
 def duracao_util_entre(inicio: date, fim: date) -> int:
     """Nº de dias úteis entre `inicio` e `fim`, inclusivo nos dois extremos.
     `fim < inicio` → 0."""
-    total = 0
-    d = inicio
-    while d <= fim:
-        if eh_dia_util(d):
-            total += 1
-        d += timedelta(days=1)
-    return total
+    return _calendario().contar(inicio, fim)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -117,6 +113,10 @@ class NoTarefa:
     pai_id: int | None = None
     is_marco: bool = False
     ancorada: bool = False
+    # Folga/criticidade GRAVADAS pelo último recálculo: só o modo incremental
+    # lê (o completo as recalcula do zero).
+    folga_dias: int | None = None
+    is_critica: bool = False
 
 
 @dataclass
@@ -304,6 +304,136 @@ def _profundidade(no: NoTarefa, por_id: dict[int, NoTarefa]) -> int:
     return nivel
 
 
+def _preparar_grafo(nos: list[NoTarefa], vinculos: list[VinculoSpec]):
+    """Estrutura comum aos dois modos: índice por id, pais, grafo das folhas
+    (validado contra ciclo), ordem topológica e adjacência de entrada."""
+    por_id = {n.id: n for n in nos}
+    pai_ids = {n.pai_id for n in nos if n.pai_id}
+    folhas = [n for n in nos if n.id not in pai_ids]
+
+    sucessores = montar_grafo(folhas, vinculos)
+    ciclo = detectar_ciclo(folhas, sucessores)
+    if ciclo:
+        raise ErroCiclo(_mensagem_ciclo(ciclo, por_id), ciclo)
+    ordem = ordenar_topologicamente(folhas, sucessores)
+
+    predecessores: dict[int, list[VinculoSpec]] = {}
+    for lista in sucessores.values():
+        for v in lista:
+            predecessores.setdefault(v.sucessora_id, []).append(v)
+    return por_id, pai_ids, sucessores, predecessores, ordem
+
+
+def _efetivas_ancorada(no: NoTarefa, inicio: date | None,
+                       fim: date | None) -> tuple[date | None, date | None]:
+    # As datas GRAVADAS da ancorada nunca mudam (é o que ancorar
+    # significa) — o resultado devolve `no.inicio`/`no.fim` crus. Mas o
+    # início EFETIVO, do qual se deriva o fim quando ele não existe, tem de
+    # ser dia útil: `fim_por_duracao` conta a partir do dia em que se
+    # trabalha.
+    #
+    # Sem normalizar, um início em fim de semana perdia um dia útil:
+    # sábado + 2 dias dava segunda, quando o trabalho começa segunda
+    # e termina terça. Em dev, 2.952 tarefas ativas começam em fim de
+    # semana — e como `efetivas` alimenta as restrições das
+    # sucessoras, o erro escorria para a cadeia inteira.
+    dur_span = 0 if no.is_marco else int(no.duracao or 0)
+    ini_ef = proximo_dia_util(inicio) if inicio else None
+    fim_ef = fim or (fim_por_duracao(ini_ef, dur_span) if ini_ef else None)
+    return ini_ef, fim_ef
+
+
+def _agendar_folha(no: NoTarefa, preds: list[VinculoSpec],
+                   efetivas: dict[int, tuple[date | None, date | None]],
+                   hoje: date):
+    """Passe para frente de UMA folha, dadas as datas efetivas das
+    predecessoras. Devolve (resultado, datas efetivas da própria folha)."""
+    dur = int(no.duracao or 0)
+    dur_span = 0 if no.is_marco else dur  # marco agenda como duração 0
+
+    if no.ancorada:
+        ini_ef, fim_ef = _efetivas_ancorada(no, no.inicio, no.fim)
+        if ini_ef is None:
+            logger.warning(
+                '[scheduler] tarefa ancorada %s ("%s") sem data_inicio — '
+                'não alimenta restrições das sucessoras', no.id, no.nome)
+        return ResultadoTarefa(inicio=no.inicio, fim=no.fim, duracao=dur), (ini_ef, fim_ef)
+
+    recuo = max(dur_span, 1) - 1
+    candidatos: list[date] = []
+    for v in preds:
+        pi, pf = efetivas.get(v.predecessora_id, (None, None))
+        restricao = _restricao_inicio(v, pi, pf, recuo)
+        if restricao is None:
+            logger.warning(
+                '[scheduler] vínculo %s %s→%s ignorado: predecessora sem '
+                'as datas necessárias (dado legado)',
+                v.tipo, v.predecessora_id, v.sucessora_id)
+        else:
+            candidatos.append(restricao)
+    if not candidatos:
+        # Âncora "não começar antes de": a própria data_inicio (ou hoje),
+        # normalizada para dia útil.
+        candidatos.append(proximo_dia_util(no.inicio or hoje))
+
+    inicio = max(candidatos)
+    fim = fim_por_duracao(inicio, dur_span)
+    return ResultadoTarefa(inicio=inicio, fim=fim, duracao=dur), (inicio, fim)
+
+
+def _datas_tardias(ini_ef: date, fim_ef: date, sucs: list[VinculoSpec],
+                   tardias: dict[int, tuple[date, date]],
+                   fim_projeto: date) -> tuple[date, date, int]:
+    """Passe para trás de UMA folha: (late_start, late_finish, folga total),
+    dadas as datas tardias das sucessoras."""
+    span = max(duracao_util_entre(ini_ef, fim_ef), 1)
+    candidatos_lf: list[date] = []
+    for v in sucs:
+        tarde_suc = tardias.get(v.sucessora_id)
+        if tarde_suc is None:
+            continue
+        ls_s, lf_s = tarde_suc
+        if v.tipo == 'TI':      # P.fim ≤ S.late_start - (1+L)
+            candidatos_lf.append(somar_dias_uteis(ls_s, -(1 + v.lag)))
+        elif v.tipo == 'II':    # P.inicio ≤ S.late_start - L
+            ls_u = somar_dias_uteis(ls_s, -v.lag)
+            candidatos_lf.append(fim_por_duracao(ls_u, span))
+        elif v.tipo == 'TT':    # P.fim ≤ S.late_finish - L
+            candidatos_lf.append(somar_dias_uteis(lf_s, -v.lag))
+        elif v.tipo == 'IT':    # P.inicio ≤ S.late_finish - L
+            ls_u = somar_dias_uteis(lf_s, -v.lag)
+            candidatos_lf.append(fim_por_duracao(ls_u, span))
+    lf = min(candidatos_lf) if candidatos_lf else fim_projeto
+    ls = somar_dias_uteis(lf, -(span - 1)) if span > 1 else lf
+    folga = max(duracao_util_entre(ini_ef, ls) - 1, 0)
+    return ls, lf, folga
+
+
+def _rollup_pai(pai: NoTarefa, filhas_res: list[ResultadoTarefa]) -> ResultadoTarefa:
+    com_datas = [r for r in filhas_res if r.inicio and r.fim]
+    if com_datas:
+        ini = min(r.inicio for r in com_datas)
+        fim = max(r.fim for r in com_datas)
+        dur = duracao_util_entre(ini, fim)
+    else:
+        # Nenhuma filha com datas (dado legado): mantém as do pai.
+        ini, fim, dur = pai.inicio, pai.fim, int(pai.duracao or 0)
+    folgas = [r.folga_dias for r in filhas_res if r.folga_dias is not None]
+    return ResultadoTarefa(
+        inicio=ini, fim=fim, duracao=dur,
+        folga_dias=min(folgas) if folgas else None,
+        is_critica=any(r.is_critica for r in filhas_res),
+    )
+
+
+def _filhos_por_pai(nos: list[NoTarefa]) -> dict[int, list[int]]:
+    filhos: dict[int, list[int]] = {}
+    for n in nos:
+        if n.pai_id:
+            filhos.setdefault(n.pai_id, []).append(n.id)
+    return filhos
+
+
 def calcular_agendamento(nos: list[NoTarefa], vinculos: list[VinculoSpec],
                          hoje: date | None = None) -> dict[int, ResultadoTarefa]:
     """Passe para frente + roll-up + folga/caminho crítico. 100% puro.
@@ -328,20 +458,7 @@ def calcular_agendamento(nos: list[NoTarefa], vinculos: list[VinculoSpec],
     if hoje is None:
         hoje = date.today()
 
-    por_id = {n.id: n for n in nos}
-    pai_ids = {n.pai_id for n in nos if n.pai_id}
-    folhas = [n for n in nos if n.id not in pai_ids]
-
-    sucessores = montar_grafo(folhas, vinculos)
-    ciclo = detectar_ciclo(folhas, sucessores)
-    if ciclo:
-        raise ErroCiclo(_mensagem_ciclo(ciclo, por_id), ciclo)
-    ordem = ordenar_topologicamente(folhas, sucessores)
-
-    predecessores: dict[int, list[VinculoSpec]] = {}
-    for lista in sucessores.values():
-        for v in lista:
-            predecessores.setdefault(v.sucessora_id, []).append(v)
+    por_id, pai_ids, sucessores, predecessores, ordem = _preparar_grafo(nos, vinculos)
 
     resultados: dict[int, ResultadoTarefa] = {}
     # Datas "efetivas" usadas na propagação: para ancoradas, as reais
@@ -351,53 +468,8 @@ def calcular_agendamento(nos: list[NoTarefa], vinculos: list[VinculoSpec],
 
     # ── Passe para frente (folhas, ordem topológica) ──
     for tid in ordem:
-        no = por_id[tid]
-        dur = int(no.duracao or 0)
-        dur_span = 0 if no.is_marco else dur  # marco agenda como duração 0
-
-        if no.ancorada:
-            # As datas GRAVADAS da ancorada nunca mudam (é o que ancorar
-            # significa) — `resultados` abaixo devolve `no.inicio`/`no.fim`
-            # crus. Mas o início EFETIVO, do qual se deriva o fim quando ele
-            # não existe, tem de ser dia útil: `fim_por_duracao` conta a
-            # partir do dia em que se trabalha.
-            #
-            # Sem normalizar, um início em fim de semana perdia um dia útil:
-            # sábado + 2 dias dava segunda, quando o trabalho começa segunda
-            # e termina terça. Em dev, 2.952 tarefas ativas começam em fim de
-            # semana — e como `efetivas` alimenta as restrições das
-            # sucessoras, o erro escorria para a cadeia inteira.
-            ini_ef = proximo_dia_util(no.inicio) if no.inicio else None
-            fim_ef = no.fim or (fim_por_duracao(ini_ef, dur_span) if ini_ef else None)
-            if ini_ef is None:
-                logger.warning(
-                    '[scheduler] tarefa ancorada %s ("%s") sem data_inicio — '
-                    'não alimenta restrições das sucessoras', no.id, no.nome)
-            resultados[tid] = ResultadoTarefa(inicio=no.inicio, fim=no.fim, duracao=dur)
-            efetivas[tid] = (ini_ef, fim_ef)
-            continue
-
-        recuo = max(dur_span, 1) - 1
-        candidatos: list[date] = []
-        for v in predecessores.get(tid, []):
-            pi, pf = efetivas.get(v.predecessora_id, (None, None))
-            restricao = _restricao_inicio(v, pi, pf, recuo)
-            if restricao is None:
-                logger.warning(
-                    '[scheduler] vínculo %s %s→%s ignorado: predecessora sem '
-                    'as datas necessárias (dado legado)',
-                    v.tipo, v.predecessora_id, v.sucessora_id)
-            else:
-                candidatos.append(restricao)
-        if not candidatos:
-            # Âncora "não começar antes de": a própria data_inicio (ou hoje),
-            # normalizada para dia útil.
-            candidatos.append(proximo_dia_util(no.inicio or hoje))
-
-        inicio = max(candidatos)
-        fim = fim_por_duracao(inicio, dur_span)
-        resultados[tid] = ResultadoTarefa(inicio=inicio, fim=fim, duracao=dur)
-        efetivas[tid] = (inicio, fim)
+        resultados[tid], efetivas[tid] = _agendar_folha(
+            por_id[tid], predecessores.get(tid, []), efetivas, hoje)
 
     # ── Passe para trás: folga total e caminho crítico (folhas) ──
     fins = [f for (_, f) in efetivas.values() if f is not None]
@@ -408,53 +480,164 @@ def calcular_agendamento(nos: list[NoTarefa], vinculos: list[VinculoSpec],
             ini_ef, fim_ef = efetivas[tid]
             if ini_ef is None or fim_ef is None:
                 continue  # sem datas: folga fica None, não restringe ninguém
-            span = max(duracao_util_entre(ini_ef, fim_ef), 1)
-            candidatos_lf: list[date] = []
-            for v in sucessores.get(tid, []):
-                tarde_suc = tardias.get(v.sucessora_id)
-                if tarde_suc is None:
-                    continue
-                ls_s, lf_s = tarde_suc
-                if v.tipo == 'TI':      # P.fim ≤ S.late_start - (1+L)
-                    candidatos_lf.append(somar_dias_uteis(ls_s, -(1 + v.lag)))
-                elif v.tipo == 'II':    # P.inicio ≤ S.late_start - L
-                    ls_u = somar_dias_uteis(ls_s, -v.lag)
-                    candidatos_lf.append(fim_por_duracao(ls_u, span))
-                elif v.tipo == 'TT':    # P.fim ≤ S.late_finish - L
-                    candidatos_lf.append(somar_dias_uteis(lf_s, -v.lag))
-                elif v.tipo == 'IT':    # P.inicio ≤ S.late_finish - L
-                    ls_u = somar_dias_uteis(lf_s, -v.lag)
-                    candidatos_lf.append(fim_por_duracao(ls_u, span))
-            lf = min(candidatos_lf) if candidatos_lf else fim_projeto
-            ls = somar_dias_uteis(lf, -(span - 1)) if span > 1 else lf
+            ls, lf, folga = _datas_tardias(
+                ini_ef, fim_ef, sucessores.get(tid, []), tardias, fim_projeto)
             tardias[tid] = (ls, lf)
-            folga = max(duracao_util_entre(ini_ef, ls) - 1, 0)
             resultados[tid].folga_dias = folga
             resultados[tid].is_critica = (folga == 0)
 
     # ── Roll-up dos pais (qualquer profundidade, de baixo para cima) ──
-    filhos_por_pai: dict[int, list[int]] = {}
-    for n in nos:
-        if n.pai_id:
-            filhos_por_pai.setdefault(n.pai_id, []).append(n.id)
+    filhos_por_pai = _filhos_por_pai(nos)
     pais = [n for n in nos if n.id in pai_ids]
     for pai in sorted(pais, key=lambda n: _profundidade(n, por_id), reverse=True):
-        filhas_res = [resultados[c] for c in filhos_por_pai.get(pai.id, [])
-                      if c in resultados]
-        com_datas = [r for r in filhas_res if r.inicio and r.fim]
-        if com_datas:
-            ini = min(r.inicio for r in com_datas)
-            fim = max(r.fim for r in com_datas)
-            dur = duracao_util_entre(ini, fim)
+        resultados[pai.id] = _rollup_pai(pai, [
+            resultados[c] for c in filhos_por_pai.get(pai.id, []) if c in resultados])
+
+    return resultados
+
+
+def _resultado_gravado(no: NoTarefa) -> ResultadoTarefa:
+    """O que o último recálculo completo deixou gravado para `no`."""
+    return ResultadoTarefa(inicio=no.inicio, fim=no.fim, duracao=int(no.duracao or 0),
+                           folga_dias=no.folga_dias, is_critica=bool(no.is_critica))
+
+
+def calcular_agendamento_incremental(
+        nos: list[NoTarefa], vinculos: list[VinculoSpec], alteradas: set[int],
+        hoje: date | None = None,
+        anteriores: dict[int, tuple[date | None, date | None]] | None = None,
+) -> dict[int, ResultadoTarefa]:
+    """Reagenda a partir de uma edição pontual, sem refazer a obra inteira.
+
+    PRÉ-CONDIÇÃO: tirando `alteradas`, as datas/folga/criticidade gravadas em
+    `nos` são as do último `calcular_agendamento` (é o que `recalcular_obra`
+    mantém). Sob ela, devolve os MESMOS resultados do cálculo completo — mas
+    só para as tarefas que ele precisou revisitar; as ausentes do dict
+    continuam como estão gravadas.
+
+    `alteradas`: folhas cujos próprios campos de agendamento (duração,
+    início, marco, âncora) ou vínculos de ENTRADA mudaram — mais as
+    predecessoras de vínculos removidos, cuja folga muda sem que data alguma
+    ande. `anteriores`: (inicio, fim) gravados das alteradas ANTES da edição;
+    sem eles não há como saber se o fim do projeto mudou e a folga é
+    recalculada na obra toda.
+
+      * passe para frente: só as alteradas e, em ordem topológica, as
+        sucessoras de quem de fato andou — a propagação para onde as datas
+        efetivas saem iguais às gravadas;
+      * passe para trás: com o fim do projeto igual, as datas tardias só
+        mudam nas ancestrais (pelo grafo de vínculos) de quem andou — só ali
+        a folga é refeita; fim do projeto diferente → folga da obra toda;
+      * roll-up: só os pais acima de alguma folha revisitada.
+
+    Alterada que não é folha (ou não está em `nos`) muda a hierarquia ou o
+    grafo, e folha datada sem folga gravada denuncia obra que nunca foi
+    recalculada inteira: nos dois casos cai no `calcular_agendamento`
+    completo, que também é devolvido.
+    """
+    if hoje is None:
+        hoje = date.today()
+
+    por_id, pai_ids, sucessores, predecessores, ordem = _preparar_grafo(nos, vinculos)
+    if any(tid not in por_id or tid in pai_ids for tid in alteradas):
+        return calcular_agendamento(nos, vinculos, hoje=hoje)
+
+    efetivas: dict[int, tuple[date | None, date | None]] = {}
+    for tid in ordem:
+        no = por_id[tid]
+        efetivas[tid] = (_efetivas_ancorada(no, no.inicio, no.fim) if no.ancorada
+                         else (no.inicio, no.fim))
+    if any(efetivas[tid][0] and efetivas[tid][1] and por_id[tid].folga_dias is None
+           for tid in ordem if tid not in alteradas):
+        # Folha com datas e sem folga gravada: a obra nunca passou inteira
+        # pelo motor novo (flag recém-ligada, tarefa criada por fora) — a
+        # pré-condição não vale.
+        return calcular_agendamento(nos, vinculos, hoje=hoje)
+    fins_antes = {tid: f for tid, (_, f) in efetivas.items()}
+
+    # ── Passe para frente: só o que pode ter andado ──
+    resultados: dict[int, ResultadoTarefa] = {}
+    pendentes = set(alteradas)
+    movidas: set[int] = set()
+    for tid in ordem:
+        if tid not in pendentes:
+            continue
+        antes = efetivas[tid]
+        resultados[tid], efetivas[tid] = _agendar_folha(
+            por_id[tid], predecessores.get(tid, []), efetivas, hoje)
+        if tid in alteradas or efetivas[tid] != antes:
+            movidas.add(tid)
+            pendentes.update(v.sucessora_id for v in sucessores.get(tid, []))
         else:
-            # Nenhuma filha com datas (dado legado): mantém as do pai.
-            ini, fim, dur = pai.inicio, pai.fim, int(pai.duracao or 0)
-        folgas = [r.folga_dias for r in filhas_res if r.folga_dias is not None]
-        resultados[pai.id] = ResultadoTarefa(
-            inicio=ini, fim=fim, duracao=dur,
-            folga_dias=min(folgas) if folgas else None,
-            is_critica=any(r.is_critica for r in filhas_res),
-        )
+            del resultados[tid]  # saiu igual ao gravado: nada a escrever
+
+    # ── Passe para trás ──
+    fins = [f for (_, f) in efetivas.values() if f is not None]
+    fim_projeto = max(fins) if fins else None
+    fim_antes = None
+    conhecido = all(tid in (anteriores or {}) for tid in alteradas)
+    if conhecido:
+        for tid in alteradas:
+            no = por_id[tid]
+            ini, fim = anteriores[tid]
+            fins_antes[tid] = (_efetivas_ancorada(no, ini, fim)[1] if no.ancorada
+                               else fim)
+        fins_antigos = [f for f in fins_antes.values() if f is not None]
+        fim_antes = max(fins_antigos) if fins_antigos else None
+
+    if conhecido and fim_antes == fim_projeto:
+        # Datas tardias de X dependem só das descendentes de X: mudam apenas
+        # nas ancestrais de quem andou. Para recalculá-las, as tardias das
+        # descendentes delas (inalteradas, mas não gravadas) são refeitas.
+        refazer = set(movidas)
+        fila = list(movidas)
+        while fila:
+            for v in predecessores.get(fila.pop(), []):
+                if v.predecessora_id not in refazer:
+                    refazer.add(v.predecessora_id)
+                    fila.append(v.predecessora_id)
+    else:
+        refazer = set(ordem)
+    necessarias = set(refazer)
+    fila = list(refazer)
+    while fila:
+        for v in sucessores.get(fila.pop(), []):
+            if v.sucessora_id not in necessarias:
+                necessarias.add(v.sucessora_id)
+                fila.append(v.sucessora_id)
+
+    tardias: dict[int, tuple[date, date]] = {}
+    for tid in reversed(ordem):
+        if tid not in necessarias:
+            continue
+        if tid in refazer and tid not in resultados:
+            resultados[tid] = _resultado_gravado(por_id[tid])
+        ini_ef, fim_ef = efetivas[tid]
+        if fim_projeto is None or ini_ef is None or fim_ef is None:
+            if tid in refazer:
+                resultados[tid].folga_dias = None
+                resultados[tid].is_critica = False
+            continue
+        ls, lf, folga = _datas_tardias(
+            ini_ef, fim_ef, sucessores.get(tid, []), tardias, fim_projeto)
+        tardias[tid] = (ls, lf)
+        if tid in refazer:
+            resultados[tid].folga_dias = folga
+            resultados[tid].is_critica = (folga == 0)
+
+    # ── Roll-up: só os pais acima de alguma folha revisitada ──
+    tocados: set[int] = set()
+    for tid in list(resultados):
+        no = por_id[tid]
+        while no is not None and no.pai_id and no.pai_id not in tocados:
+            tocados.add(no.pai_id)
+            no = por_id.get(no.pai_id)
+    filhos_por_pai = _filhos_por_pai(nos)
+    pais = [por_id[p] for p in tocados if p in por_id]
+    for pai in sorted(pais, key=lambda n: _profundidade(n, por_id), reverse=True):
+        resultados[pai.id] = _rollup_pai(pai, [
+            resultados[c] if c in resultados else _resultado_gravado(por_id[c])
+            for c in filhos_por_pai.get(pai.id, [])])
 
     return resultados
 
@@ -520,7 +703,9 @@ def ids_tarefas_iniciadas(obra_id: int, admin_id: int, cliente: bool = False) ->
 # ─────────────────────────────────────────────────────────────────────────────
 
 def recalcular_obra(obra_id: int, admin_id: int, *, cliente: bool = False,
-                    commit: bool = True) -> ResultadoAgendamento:
+                    commit: bool = True, alteradas: set[int] | None = None,
+                    anteriores: dict[int, tuple] | None = None,
+                    ) -> ResultadoAgendamento:
     """Recalcula a obra inteira com o motor novo e persiste SÓ os diffs.
 
     Carga em 3 queries (tarefas ativas do modo, vínculos, apontamentos IN);
@@ -533,6 +718,16 @@ def recalcular_obra(obra_id: int, admin_id: int, *, cliente: bool = False,
     `ErroCiclo` propaga SEM commitar (com `commit=True` faz rollback também
     do que o caller tenha deixado pendente na sessão — ex.: vínculo recém-
     criado que fecha o ciclo).
+
+    `alteradas` (ids das folhas editadas — ver
+    `calcular_agendamento_incremental`) liga o modo INCREMENTAL: propaga só a
+    partir delas, e o rollup de percentual se restringe às alteradas e aos
+    pais revisitados. A carga é a mesma (o grafo inteiro é necessário para a
+    ordem topológica), mas o motor e as escritas ficam proporcionais ao que
+    a edição realmente moveu. Sem `alteradas`, recálculo completo.
+    `anteriores` traz (data_inicio, data_fim) de antes da edição das
+    alteradas cujas DATAS o caller mudou; as demais alteradas são tomadas
+    como estão no banco.
     """
     from models import TarefaCronograma, TarefaVinculo, db
     from utils.cronograma_engine import rollup_percentual_pos_recalculo
@@ -566,6 +761,8 @@ def recalcular_obra(obra_id: int, admin_id: int, *, cliente: bool = False,
             pai_id=t.tarefa_pai_id,
             is_marco=bool(t.is_marco),
             ancorada=(t.id in iniciadas),
+            folga_dias=t.folga_dias,
+            is_critica=bool(t.is_critica),
         )
         for t in tarefas
     ]
@@ -580,7 +777,15 @@ def recalcular_obra(obra_id: int, admin_id: int, *, cliente: bool = False,
     ]
 
     try:
-        resultados = calcular_agendamento(nos, specs, hoje=date.today())
+        if alteradas:
+            datas_antes = {t.id: (t.data_inicio, t.data_fim)
+                           for t in tarefas if t.id in alteradas}
+            datas_antes.update(anteriores or {})
+            resultados = calcular_agendamento_incremental(
+                nos, specs, set(alteradas), hoje=date.today(),
+                anteriores=datas_antes)
+        else:
+            resultados = calcular_agendamento(nos, specs, hoje=date.today())
     except ErroCiclo:
         if commit:
             db.session.rollback()
@@ -613,7 +818,11 @@ def recalcular_obra(obra_id: int, admin_id: int, *, cliente: bool = False,
     # Percentuais: mesma rotina do engine antigo (folhas ← último apontamento;
     # pais ← média ponderada pela duração) — helper compartilhado, sem commit.
     pai_ids = {t.tarefa_pai_id for t in tarefas if t.tarefa_pai_id}
-    rollup_percentual_pos_recalculo(tarefas, pai_ids, admin_id)
+    if alteradas and len(resultados) < len(tarefas):
+        escopo = set(alteradas) | (set(resultados) & pai_ids)
+        rollup_percentual_pos_recalculo(tarefas, pai_ids, admin_id, escopo=escopo)
+    else:
+        rollup_percentual_pos_recalculo(tarefas, pai_ids, admin_id)
 
     if commit:
         db.session.commit()
@@ -621,8 +830,9 @@ def recalcular_obra(obra_id: int, admin_id: int, *, cliente: bool = False,
         db.session.flush()
 
     logger.info(
-        '[scheduler] obra %s recalculada: %d tarefa(s), %d afetada(s)',
-        obra_id, len(tarefas), len(afetadas))
+        '[scheduler] obra %s recalculada%s: %d tarefa(s), %d revisitada(s), '
+        '%d afetada(s)', obra_id, ' (incremental)' if alteradas else '',
+        len(tarefas), len(resultados), len(afetadas))
     return ResultadoAgendamento(tarefas_afetadas=afetadas, total_tarefas=len(tarefas))
 
 
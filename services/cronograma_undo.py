@@ -5,9 +5,20 @@ Plano: `docs/superpowers/plans/2026-07-24-cronograma-fase3-plano.md`.
 
 Como funciona
 -------------
-Cada ação do usuário na grade é capturada por comparação de dois snapshots
-da obra (antes e depois da rota rodar). O diff é feito **por campo**: o
-payload guarda só o que aquela ação mudou, nunca a linha inteira.
+Cada ação do usuário na grade é capturada por comparação do estado antes e
+depois da rota rodar. O diff é feito **por campo**: o payload guarda só o
+que aquela ação mudou, nunca a linha inteira.
+
+O "antes" não é mais um snapshot da obra inteira (duas cargas completas por
+edição de célula, crescendo com o cronograma): `iniciar_rastreio` liga, na
+sessão, listeners que anotam só as linhas que a rota toca — no
+`before_flush` (objetos sujos/excluídos com histórico em campo versionado)
+e no `do_orm_execute` (UPDATE/DELETE em massa, como o re-parent da
+exclusão) — lendo do banco o estado delas antes da primeira escrita. No fim,
+`registrar_acao` relê só essas linhas e passa os dois retratos parciais ao
+mesmo `diff_snapshots`. Rollback na rota não precisa de tratamento: a
+releitura vê o banco como ficou. `snapshot_obra` continua valendo para
+quem passar o snapshot inteiro.
 
 Isso é a decisão central do módulo. Com payload de linha inteira, esta
 sequência destruiria dado real: o usuário renomeia uma tarefa (o snapshot
@@ -42,6 +53,8 @@ isso, as duas pontas de um `ORDER BY id`. Escopo = (obra, usuário, modo).
 import logging
 from datetime import date, datetime
 
+from sqlalchemy import event, inspect, select, tuple_
+
 from models import db, CronogramaAcao, TarefaCronograma, TarefaVinculo
 
 logger = logging.getLogger(__name__)
@@ -167,6 +180,178 @@ def diff_snapshots(antes: dict, depois: dict):
             {'tarefas': t_depois, 'vinculos': v_depois})
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Rastreio das linhas tocadas
+# ─────────────────────────────────────────────────────────────────────────────
+
+_INFO_RASTREIO = '_cronograma_undo_rastreio'
+_instalado = False
+
+
+def _chave_vinculo(pred_id, suc_id) -> str:
+    return f'{pred_id}-{suc_id}'
+
+
+class Rastreio:
+    """Estado anterior das linhas que a ação tocou, no formato de
+    `snapshot_obra` (None = a linha não existia antes da ação)."""
+
+    def __init__(self, obra_id: int, admin_id: int, cliente: bool):
+        self.obra_id = obra_id
+        self.admin_id = admin_id
+        self.cliente = cliente
+        self.tarefas: dict = {}
+        self.vinculos: dict = {}
+        self.vinculo_ids: set = set()
+
+    # -- anotação ------------------------------------------------------------
+
+    def _ler_tarefas(self, session, criterio) -> None:
+        colunas = [getattr(TarefaCronograma, c) for c in CAMPOS_TAREFA]
+        linhas = session.execute(
+            select(TarefaCronograma.id, *colunas).where(
+                *([criterio] if criterio is not None else []),
+                TarefaCronograma.obra_id == self.obra_id,
+                TarefaCronograma.admin_id == self.admin_id,
+                TarefaCronograma.is_cliente == self.cliente,
+            )
+        ).all()
+        for id_, *valores in linhas:
+            self.tarefas.setdefault(str(id_), {
+                c: _serializar(v) for c, v in zip(CAMPOS_TAREFA, valores, strict=True)})
+
+    def _ler_vinculos(self, session, criterio) -> None:
+        colunas = [getattr(TarefaVinculo, c) for c in CAMPOS_VINCULO]
+        linhas = session.execute(
+            select(TarefaVinculo.id, TarefaVinculo.predecessora_id,
+                   TarefaVinculo.sucessora_id, *colunas).where(
+                *([criterio] if criterio is not None else []),
+                TarefaVinculo.obra_id == self.obra_id,
+                TarefaVinculo.admin_id == self.admin_id,
+            )
+        ).all()
+        for id_, pred_id, suc_id, *valores in linhas:
+            self.vinculo_ids.add(id_)
+            self.vinculos.setdefault(_chave_vinculo(pred_id, suc_id),
+                                     dict(zip(CAMPOS_VINCULO, valores, strict=True)))
+
+    def antes_de_gravar(self, session, tarefa_ids, vinculo_ids) -> None:
+        """Lê do banco — SELECT de colunas, não de entidades, para não
+        receber de volta o objeto já alterado do identity map — as linhas
+        ainda não anotadas."""
+        novas_t = {i for i in tarefa_ids if str(i) not in self.tarefas}
+        novas_v = set(vinculo_ids) - self.vinculo_ids
+        with session.no_autoflush:
+            if novas_t:
+                self._ler_tarefas(session, TarefaCronograma.id.in_(novas_t))
+            if novas_v:
+                self._ler_vinculos(session, TarefaVinculo.id.in_(novas_v))
+
+    def criadas(self, objetos) -> None:
+        """Linhas inseridas pela ação (já com id): não existiam antes."""
+        for obj in objetos:
+            if isinstance(obj, TarefaCronograma):
+                if (obj.obra_id, obj.admin_id, bool(obj.is_cliente)) == \
+                        (self.obra_id, self.admin_id, bool(self.cliente)):
+                    self.tarefas.setdefault(str(obj.id), None)
+            elif isinstance(obj, TarefaVinculo):
+                if (obj.obra_id, obj.admin_id) == (self.obra_id, self.admin_id):
+                    self.vinculo_ids.add(obj.id)
+                    self.vinculos.setdefault(
+                        _chave_vinculo(obj.predecessora_id, obj.sucessora_id), None)
+
+    # -- fechamento ----------------------------------------------------------
+
+    def encerrar(self) -> None:
+        """Desliga a anotação (o que já foi anotado fica)."""
+        info = db.session.info
+        if info.get(_INFO_RASTREIO) is self:
+            del info[_INFO_RASTREIO]
+
+    def retratos(self) -> tuple:
+        """`(antes, depois)` no formato de `snapshot_obra`, restritos às
+        linhas tocadas — o depois relido do banco em duas queries."""
+        self.encerrar()
+        depois = Rastreio(self.obra_id, self.admin_id, self.cliente)
+        if self.tarefas:
+            depois._ler_tarefas(db.session, TarefaCronograma.id.in_(
+                [int(t) for t in self.tarefas]))
+        if self.vinculos or self.vinculo_ids:
+            pares = [tuple(int(p) for p in k.split('-')) for k in self.vinculos]
+            criterio = TarefaVinculo.id.in_(self.vinculo_ids)
+            if pares:
+                criterio = criterio | tuple_(
+                    TarefaVinculo.predecessora_id, TarefaVinculo.sucessora_id).in_(pares)
+            depois._ler_vinculos(db.session, criterio)
+        antes = {
+            'tarefas': {k: v for k, v in self.tarefas.items() if v is not None},
+            'vinculos': {k: v for k, v in self.vinculos.items() if v is not None},
+        }
+        return antes, {'tarefas': depois.tarefas, 'vinculos': depois.vinculos}
+
+
+def _tocou(obj, campos) -> bool:
+    estado = inspect(obj)
+    return any(estado.attrs[c].history.has_changes() for c in campos)
+
+
+def instalar_rastreio() -> None:
+    """Listeners na `db.session` que alimentam o `Rastreio` ativo em
+    `session.info`. Sem rastreio ativo, saem na primeira linha. Idempotente."""
+    global _instalado
+    if _instalado:
+        return
+    _instalado = True
+
+    campos_vinculo = ('predecessora_id', 'sucessora_id') + CAMPOS_VINCULO
+
+    @event.listens_for(db.session, 'before_flush')
+    def _antes_do_flush(session, _ctx, _instancias):
+        rastreio = session.info.get(_INFO_RASTREIO)
+        if rastreio is None:
+            return
+        tarefas, vinculos = set(), set()
+        for obj in session.dirty:
+            if isinstance(obj, TarefaCronograma) and _tocou(obj, CAMPOS_TAREFA):
+                tarefas.add(obj.id)
+            elif isinstance(obj, TarefaVinculo) and _tocou(obj, campos_vinculo):
+                vinculos.add(obj.id)
+        for obj in session.deleted:
+            if isinstance(obj, TarefaCronograma):
+                tarefas.add(obj.id)
+            elif isinstance(obj, TarefaVinculo):
+                vinculos.add(obj.id)
+        if tarefas or vinculos:
+            rastreio.antes_de_gravar(session, tarefas, vinculos)
+
+    @event.listens_for(db.session, 'after_flush')
+    def _depois_do_flush(session, _ctx):
+        rastreio = session.info.get(_INFO_RASTREIO)
+        if rastreio is not None and session.new:
+            rastreio.criadas(session.new)
+
+    @event.listens_for(db.session, 'do_orm_execute')
+    def _em_massa(estado):
+        rastreio = estado.session.info.get(_INFO_RASTREIO)
+        if rastreio is None or not (estado.is_update or estado.is_delete):
+            return
+        mapper = estado.bind_mapper
+        criterio = estado.statement.whereclause
+        if mapper is not None and mapper.class_ is TarefaCronograma:
+            rastreio._ler_tarefas(estado.session, criterio)
+        elif mapper is not None and mapper.class_ is TarefaVinculo:
+            rastreio._ler_vinculos(estado.session, criterio)
+
+
+def iniciar_rastreio(obra_id: int, admin_id: int, cliente: bool = False) -> Rastreio:
+    """Passa a anotar, na sessão corrente, as linhas da obra que forem
+    tocadas. Feche com `registrar_acao(..., rastreio)` ou `encerrar()`."""
+    instalar_rastreio()
+    rastreio = Rastreio(obra_id, admin_id, cliente)
+    db.session.info[_INFO_RASTREIO] = rastreio
+    return rastreio
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Aplicação
 # ─────────────────────────────────────────────────────────────────────────────
@@ -229,13 +414,18 @@ def _pilha(obra_id: int, usuario_id: int, cliente: bool):
 
 
 def registrar_acao(obra_id: int, admin_id: int, usuario_id: int, cliente: bool,
-                   tipo_acao: str, antes: dict) -> CronogramaAcao | None:
-    """Fecha o par snapshot-antes/agora e empilha a ação, se houve mudança.
+                   tipo_acao: str, antes) -> CronogramaAcao | None:
+    """Fecha o par antes/agora e empilha a ação, se houve mudança.
 
-    Devolve a ação gravada, ou None quando a rota não mudou nada (erro
-    validado, no-op) — nesse caso a pilha fica intocada.
+    `antes` é o `Rastreio` de `iniciar_rastreio` (só as linhas tocadas) ou
+    um `snapshot_obra` inteiro. Devolve a ação gravada, ou None quando a
+    rota não mudou nada (erro validado, no-op) — nesse caso a pilha fica
+    intocada.
     """
-    depois = snapshot_obra(obra_id, admin_id, cliente)
+    if isinstance(antes, Rastreio):
+        antes, depois = antes.retratos()
+    else:
+        depois = snapshot_obra(obra_id, admin_id, cliente)
     payload_antes, payload_depois = diff_snapshots(antes, depois)
     if payload_antes is None:
         return None
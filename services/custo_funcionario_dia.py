@@ -391,7 +391,7 @@ def gerar_dias_ociosos_mensalista(
     try:
         from app import db
         from models import RDOCustoDiario, Funcionario
-        from calendar import monthrange
+        from services.periodo import no_mes
 
         funcionario = Funcionario.query.filter_by(
             id=funcionario_id, admin_id=admin_id
@@ -407,8 +407,7 @@ def gerar_dias_ociosos_mensalista(
             r.data
             for r in RDOCustoDiario.query.filter(
                 RDOCustoDiario.funcionario_id == funcionario_id,
-                RDOCustoDiario.data >= date(ano, mes, 1),
-                RDOCustoDiario.data <= date(ano, mes, ultimo),
+                *no_mes(RDOCustoDiario.data, ano, mes),
             ).all()
         }
 
@@ -0,0 +1,375 @@
+"""Métricas do dashboard principal — poucas consultas agregadas por tenant e
+período, num cache com TTL que as escritas do tenant invalidam.
+
+`views/dashboard.dashboard` fazia um `.count()` por número do cabeçalho
+(funcionários, obras, veículos — este duas vezes), um por status de proposta,
+trazia as propostas enviadas inteiras para contar as expiradas em Python,
+somava cada fonte de custo com `.all()` + `sum()` em Python (GCF quatro
+vezes, uma por grupo de categorias), buscava o funcionário de cada falta
+justificada (`Funcionario.query.get` no laço) e chamava
+`calcular_metricas_funcionario` por funcionário — meia dúzia de consultas
+cada, para usar só a mão de obra. Dezenas de idas ao banco por abertura,
+crescendo com o tamanho do tenant.
+
+Aqui cada bloco é UMA consulta:
+
+  * `contagens`  — obras (FILTER por ativo/estado + soma de contrato) com
+    funcionários, veículos e templates como subconsultas escalares;
+  * `propostas`  — todos os status, expiradas, valor médio e últimos 6 meses
+    com `COUNT(*) FILTER (WHERE …)`; + uma para os 3 templates mais usados;
+  * `custos`     — GCF num GROUP BY de categoria; as demais fontes como
+    subconsultas escalares de um SELECT só; faltas justificadas num GROUP BY
+    de mês (custo = Σ salário ÷ dias úteis do mês, o mesmo da soma por falta);
+  * mão de obra  — `calcular_mao_obra_em_lote` (uma consulta de ponto).
+
+`metricas` junta tudo num dict e o guarda por (tenant, período, hoje) por
+`SIGE_DASHBOARD_TTL` segundos (padrão 60; 0 desliga). A invalidação é por
+listener de sessão (`instalar_invalidacao`, chamado no boot como o auto-link
+da Task #62): um commit que grava qualquer modelo de `_MODELOS_OBSERVADOS`
+derruba o cache daquele tenant NESTE processo. Os outros workers do gunicorn
+e as escritas em massa (`query.update`, SQL cru) não passam por aqui — para
+esses o teto de defasagem é o TTL.
+
+O que depende da seleção de obras do gráfico, e a lista de obras com
+progresso (objetos ORM), continua na view, fora do cache.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import and_, func, select
+
+logger = logging.getLogger(__name__)
+
+ESTADOS_EM_ANDAMENTO = ('planejamento', 'em_execucao', 'pausada')
+STATUS_GCF_CONTABIL = ('PENDENTE', 'SOLICITADO', 'AUTORIZADO', 'PARCIAL', 'PAGO')
+
+# Categorias de GestaoCustoFilho por card do dashboard.
+CATEGORIAS_GCF = {
+    'mao_obra': ('SALARIO', 'MAO_OBRA_DIRETA'),
+    'alimentacao': ('ALIMENTACAO',),
+    'transporte': ('TRANSPORTE',),
+    'outros': ('OUTROS', 'ALUGUEL_UTILITIES', 'TRIBUTOS', 'COMPRA', 'SERVICO'),
+}
+
+# Escrita num destes invalida o cache do tenant (`admin_id` da linha). Os
+# sem `admin_id` (horário de trabalho) invalidam todos.
+_MODELOS_OBSERVADOS = frozenset({
+    'Funcionario', 'Obra', 'Veiculo', 'Proposta', 'PropostaTemplate',
+    'RegistroPonto', 'RegistroAlimentacao', 'AlimentacaoLancamento',
+    'OutroCusto', 'CustoObra', 'VehicleExpense', 'LancamentoTransporte',
+    'GestaoCustoPai', 'GestaoCustoFilho', 'HorarioTrabalho',
+})
+_TODOS = object()
+_INFO_PENDENTES = '_dashboard_metricas_invalidar'
+_MAX_PERIODOS_POR_TENANT = 8
+
+
+def _ttl() -> float:
+    return float(os.environ.get('SIGE_DASHBOARD_TTL', '60'))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Consultas
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _escalar(expr, modelo, *filtros):
+    return select(expr).select_from(modelo).where(*filtros).scalar_subquery()
+
+
+def contagens(admin_id: int) -> dict:
+    """Números do cabeçalho que não dependem do período."""
+    from models import Funcionario, Obra, PropostaTemplate, Veiculo, db
+
+    ativa = Obra.ativo.is_(True)
+    em_andamento = and_(ativa, Obra.estado.in_(ESTADOS_EM_ANDAMENTO))
+    linha = db.session.execute(
+        select(
+            func.count().filter(ativa),
+            func.count().filter(em_andamento),
+            func.coalesce(func.sum(Obra.valor_contrato).filter(em_andamento), 0),
+            _escalar(func.count(), Funcionario,
+                     Funcionario.admin_id == admin_id, Funcionario.ativo.is_(True)),
+            _escalar(func.count(), Veiculo,
+                     Veiculo.admin_id == admin_id, Veiculo.ativo.is_(True)),
+            _escalar(func.count(), PropostaTemplate, PropostaTemplate.admin_id == admin_id),
+        ).select_from(Obra).where(Obra.admin_id == admin_id)
+    ).one()
+    obras, em_andamento_n, contrato, funcionarios, veiculos, templates = linha
+    return {
+        'total_funcionarios': funcionarios,
+        'total_obras': obras,
+        'obras_ativas_count': em_andamento_n,
+        'valor_contrato_total': float(contrato or 0),
+        'total_veiculos': veiculos,
+        'total_templates': templates,
+    }
+
+
+def propostas(admin_id: int, data_inicio: date, data_fim: date, hoje: date) -> dict:
+    """Propostas por status no período, expiradas (enviada vencida — validade
+    0 vale 7, como no cálculo antigo), valor médio aprovado e média mensal
+    dos últimos 180 dias."""
+    from models import Proposta, PropostaTemplate, db
+
+    no_periodo = and_(Proposta.data_proposta >= data_inicio,
+                      Proposta.data_proposta <= data_fim)
+    por_status = {s: func.count().filter(no_periodo, Proposta.status == s)
+                  for s in ('aprovada', 'enviada', 'rascunho', 'rejeitada')}
+    validade = func.coalesce(func.nullif(Proposta.validade_dias, 0), 7)
+    linha = db.session.execute(
+        select(
+            *por_status.values(),
+            func.count().filter(no_periodo),
+            func.count().filter(Proposta.status == 'enviada',
+                                Proposta.validade_dias.isnot(None),
+                                Proposta.data_proposta + validade < hoje),
+            func.avg(Proposta.valor_total).filter(no_periodo, Proposta.status == 'aprovada',
+                                                  Proposta.valor_total > 0),
+            func.count().filter(Proposta.criado_em >= hoje - timedelta(days=180)),
+        ).where(Proposta.admin_id == admin_id)
+    ).one()
+    aprovadas, enviadas, rascunho, rejeitadas, total, expiradas, valor_medio, seis_meses = linha
+
+    decididas = enviadas + aprovadas + rejeitadas
+    templates = db.session.query(PropostaTemplate.nome, PropostaTemplate.uso_contador).filter(
+        PropostaTemplate.admin_id == admin_id
+    ).order_by(PropostaTemplate.uso_contador.desc()).limit(3).all()
+    return {
+        'propostas_aprovadas': aprovadas,
+        'propostas_enviadas': enviadas,
+        'propostas_rascunho': rascunho,
+        'propostas_rejeitadas': rejeitadas,
+        'propostas_expiradas': expiradas,
+        'total_propostas': total,
+        'taxa_conversao': round(aprovadas / decididas * 100, 1) if decididas else 0,
+        'valor_medio': float(valor_medio or 0),
+        'propostas_por_mes': round(seis_meses / 6, 1) if seis_meses else 0,
+        'templates_populares': [{'nome': nome, 'uso': uso} for nome, uso in templates],
+    }
+
+
+def custos(admin_id: int, data_inicio: date, data_fim: date) -> dict:
+    """Custos do período por card, sem a mão de obra de ponto (ver
+    `metricas`). Mesmas fontes e filtros que a view somava uma a uma."""
+    from models import (AlimentacaoLancamento, CustoObra, Funcionario, GestaoCustoFilho,
+                        GestaoCustoPai, LancamentoTransporte, OutroCusto, RegistroAlimentacao,
+                        VehicleExpense, db)
+
+    gcf = dict(db.session.query(
+        GestaoCustoPai.tipo_categoria, func.sum(GestaoCustoFilho.valor)
+    ).join(
+        GestaoCustoPai, GestaoCustoPai.id == GestaoCustoFilho.pai_id
+    ).filter(
+        GestaoCustoFilho.admin_id == admin_id,
+        GestaoCustoFilho.data_referencia >= data_inicio,
+        GestaoCustoFilho.data_referencia <= data_fim,
+        GestaoCustoPai.status.in_(STATUS_GCF_CONTABIL),
+    ).group_by(GestaoCustoPai.tipo_categoria).all())
+    gcf_card = {card: sum(float(gcf.get(c) or 0) for c in cats)
+                for card, cats in CATEGORIAS_GCF.items()}
+
+    def _soma(coluna, modelo, data, *filtros):
+        return _escalar(func.coalesce(func.sum(coluna), 0), modelo,
+                        modelo.admin_id == admin_id, data >= data_inicio, data <= data_fim,
+                        *filtros)
+
+    linha = db.session.execute(select(
+        _soma(AlimentacaoLancamento.valor_total, AlimentacaoLancamento, AlimentacaoLancamento.data),
+        select(func.coalesce(func.sum(RegistroAlimentacao.valor), 0)).select_from(
+            RegistroAlimentacao).join(
+            Funcionario, RegistroAlimentacao.funcionario_id == Funcionario.id).where(
+            Funcionario.admin_id == admin_id, RegistroAlimentacao.data >= data_inicio,
+            RegistroAlimentacao.data <= data_fim).scalar_subquery(),
+        _soma(OutroCusto.valor, OutroCusto, OutroCusto.data,
+              OutroCusto.kpi_associado == 'custo_alimentacao'),
+        _soma(OutroCusto.valor, OutroCusto, OutroCusto.data,
+              ~OutroCusto.tipo.in_(['transporte', 'alimentacao', 'material'])),
+        _soma(VehicleExpense.valor, VehicleExpense, VehicleExpense.data_custo),
+        _soma(CustoObra.valor, CustoObra, CustoObra.data, CustoObra.tipo.in_(['transporte', 'veiculo'])),
+        _soma(CustoObra.valor, CustoObra, CustoObra.data, CustoObra.tipo.in_(['outros', 'servico'])),
+        _soma(LancamentoTransporte.valor, LancamentoTransporte, LancamentoTransporte.data_lancamento),
+        _soma(GestaoCustoPai.valor_total, GestaoCustoPai, GestaoCustoPai.data_emissao,
+              GestaoCustoPai.tipo_categoria == 'MATERIAL'),
+    )).one()
+    (alim_lanc, alim_registro, alim_outro, outros_outro, veiculo, obra_transporte,
+     obra_outros, lancamento_transporte, material) = (float(v or 0) for v in linha)
+
+    return {
+        'gcf_mao_obra': gcf_card['mao_obra'],
+        'alimentacao': alim_lanc + alim_registro + alim_outro + gcf_card['alimentacao'],
+        'transporte': veiculo + obra_transporte + lancamento_transporte + gcf_card['transporte'],
+        'material': material,
+        'outros': outros_outro + obra_outros + gcf_card['outros'],
+    }
+
+
+def faltas_justificadas(admin_id: int, data_inicio: date, data_fim: date) -> tuple:
+    """(quantidade, custo) — cada falta justificada vale salário ÷ dias úteis
+    (seg–sex) do mês dela; somado por mês é Σ salário ÷ dias úteis."""
+    import calendar
+
+    from models import Funcionario, RegistroPonto, db
+    from services.calendario_dias_uteis import obter_calendario
+
+    ano = func.extract('year', RegistroPonto.data)
+    mes = func.extract('month', RegistroPonto.data)
+    linhas = db.session.query(
+        ano, mes, func.count(RegistroPonto.id), func.sum(Funcionario.salario)
+    ).outerjoin(
+        Funcionario, Funcionario.id == RegistroPonto.funcionario_id
+    ).filter(
+        RegistroPonto.admin_id == admin_id,
+        RegistroPonto.data >= data_inicio,
+        RegistroPonto.data <= data_fim,
+        RegistroPonto.tipo_registro == 'falta_justificada',
+    ).group_by(ano, mes).all()
+
+    calendario = obter_calendario()
+    quantidade, custo = 0, 0.0
+    for a, m, n, salarios in linhas:
+        a, m = int(a), int(m)
+        quantidade += n
+        if salarios:
+            uteis = calendario.contar(date(a, m, 1), date(a, m, calendar.monthrange(a, m)[1]))
+            custo += float(salarios) / uteis
+    return quantidade, custo
+
+
+def mao_obra(admin_id: int, data_inicio: date, data_fim: date) -> dict:
+    """Totais de ponto/mão de obra dos funcionários ativos do tenant."""
+    from models import Funcionario
+    from services.funcionario_metrics import calcular_mao_obra_em_lote
+
+    funcionarios = Funcionario.query.filter_by(admin_id=admin_id, ativo=True).all()
+    por_funcionario = calcular_mao_obra_em_lote(funcionarios, data_inicio, data_fim, admin_id)
+    return {
+        chave: sum(m[chave] for m in por_funcionario.values())
+        for chave in ('custo_mao_obra', 'horas_trabalhadas', 'horas_extras', 'faltas')
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Cache por tenant
+# ─────────────────────────────────────────────────────────────────────────────
+
+_cache: dict = {}          # admin_id → {(inicio, fim, hoje): (expira_em, metricas)}
+_cache_lock = threading.Lock()
+
+
+def _calcular(admin_id: int, data_inicio: date, data_fim: date, hoje: date) -> dict:
+    m = {**contagens(admin_id), **propostas(admin_id, data_inicio, data_fim, hoje)}
+    c = custos(admin_id, data_inicio, data_fim)
+    mo = mao_obra(admin_id, data_inicio, data_fim)
+    qtd_faltas, custo_faltas = faltas_justificadas(admin_id, data_inicio, data_fim)
+    custo_mao_obra = mo['custo_mao_obra'] + c['gcf_mao_obra']
+    total = custo_mao_obra + c['alimentacao'] + c['transporte'] + c['material'] + c['outros']
+    m.update({
+        'total_horas': mo['horas_trabalhadas'],
+        'total_extras': mo['horas_extras'],
+        'total_faltas': mo['faltas'],
+        'custos_detalhados': {
+            'alimentacao': c['alimentacao'],
+            'transporte': c['transporte'],
+            'mao_obra': custo_mao_obra,
+            'material': c['material'],
+            'outros': c['outros'],
+            'faltas_justificadas': custo_faltas,
+            'faltas_justificadas_qtd': qtd_faltas,
+            'total': total,
+        },
+    })
+    m['outros_templates'] = m.pop('total_templates') - len(m['templates_populares'])
+    return m
+
+
+def vazias() -> dict:
+    """Mesmas chaves de `metricas`, zeradas — o que o dashboard mostra se o
+    cálculo falhar."""
+    return {
+        'total_funcionarios': 0, 'total_obras': 0, 'obras_ativas_count': 0,
+        'valor_contrato_total': 0, 'total_veiculos': 0,
+        'propostas_aprovadas': 0, 'propostas_enviadas': 0, 'propostas_rascunho': 0,
+        'propostas_rejeitadas': 0, 'propostas_expiradas': 0, 'total_propostas': 0,
+        'taxa_conversao': 0, 'valor_medio': 0, 'propostas_por_mes': 0,
+        'templates_populares': [], 'outros_templates': 0,
+        'total_horas': 0, 'total_extras': 0, 'total_faltas': 0,
+        'custos_detalhados': {'alimentacao': 0, 'transporte': 0, 'mao_obra': 0,
+                              'material': 0, 'outros': 0, 'faltas_justificadas': 0,
+                              'faltas_justificadas_qtd': 0, 'total': 0},
+    }
+
+
+def metricas(admin_id: int, data_inicio: date, data_fim: date,
+             hoje: date | None = None) -> dict:
+    """Todas as métricas do dashboard do tenant no período — do cache se
+    houver entrada viva. O dict devolvido é compartilhado: não alterar."""
+    hoje = hoje or date.today()
+    chave = (data_inicio, data_fim, hoje)
+    ttl = _ttl()
+    agora = time.monotonic()
+    if ttl > 0:
+        with _cache_lock:
+            entrada = _cache.get(admin_id, {}).get(chave)
+        if entrada and entrada[0] > agora:
+            return entrada[1]
+
+    valor = _calcular(admin_id, data_inicio, data_fim, hoje)
+    if ttl > 0:
+        with _cache_lock:
+            periodos = _cache.setdefault(admin_id, {})
+            periodos[chave] = (agora + ttl, valor)
+            if len(periodos) > _MAX_PERIODOS_POR_TENANT:
+                del periodos[min(periodos, key=lambda k: periodos[k][0])]
+    return valor
+
+
+def invalidar(admin_id: int | None = None) -> None:
+    """Descarta o cache do tenant (None: de todos)."""
+    with _cache_lock:
+        if admin_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(admin_id, None)
+
+
+def anotar(admin_id: int | None, session=None) -> None:
+    """Anota o tenant como o `after_flush` anotaria — para gravações que não
+    passam pela unit of work (insert() em lote). O próximo commit invalida."""
+    if session is None:
+        from models import db
+        session = db.session
+    session.info.setdefault(_INFO_PENDENTES, set()).add(admin_id or _TODOS)
+
+
+def instalar_invalidacao() -> None:
+    """Listeners na `db.session`: o flush anota os tenants tocados em
+    `session.info`; o commit os invalida. Rollback não limpa a anotação — o
+    pior caso é invalidar a mais no próximo commit, e descartá-la num
+    rollback de savepoint perderia o que o commit externo grava."""
+    from sqlalchemy import event
+
+    from models import db
+
+    @event.listens_for(db.session, 'after_flush')
+    def _anotar(session, _flush_ctx):
+        pendentes = session.info.setdefault(_INFO_PENDENTES, set())
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            if type(obj).__name__ in _MODELOS_OBSERVADOS:
+                pendentes.add(getattr(obj, 'admin_id', None) or _TODOS)
+
+    @event.listens_for(db.session, 'after_commit')
+    def _invalidar(session):
+        pendentes = session.info.pop(_INFO_PENDENTES, None)
+        if not pendentes:
+            return
+        if _TODOS in pendentes:
+            invalidar()
+            return
+        for admin_id in pendentes:
+            invalidar(admin_id)
+
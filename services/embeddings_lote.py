@@ -0,0 +1,187 @@
+"""Geração de embeddings faciais EM LOTE, num pool de processos.
+
+`gerar_cache_facial.gerar_cache` processava foto a foto: base64 → arquivo
+temporário → `cv2.imread` → detecção → `model.forward` de UMA imagem, tudo
+na thread do request. Aqui:
+
+  * a imagem é decodificada em memória (`cv2.imdecode`), sem arquivo;
+  * o pré-processamento (detecção Haar, recorte com margem, 112×112, [0,1])
+    é o MESMO de `ponto_views.gerar_embedding_otimizado`, que passou a usar
+    `preparar_rosto` daqui — cache e reconhecimento seguem compatíveis;
+  * as fotos vão em lotes para um `ProcessPoolExecutor` (um processo por
+    núcleo disponível), cada processo com o modelo SFace carregado uma vez
+    no inicializador, e o lote inteiro numa chamada de `model.forward`;
+  * os resultados voltam em streaming, lote a lote, para quem chamou —
+    que grava checkpoint e progresso (ver `gerar_cache_facial`).
+
+O pool usa `spawn`: o chamador é uma thread de um worker do gunicorn, e
+`fork` de um processo com threads e TensorFlow carregado é receita de
+deadlock no filho.
+"""
+from __future__ import annotations
+
+import base64
+import logging
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_LOTE = 32
+TAMANHO_ROSTO = (112, 112)
+
+
+def workers_disponiveis() -> int:
+    """Núcleos que este processo pode usar (respeita cgroup/affinity);
+    `SIGE_FACIAL_WORKERS` sobrepõe."""
+    configurado = os.environ.get('SIGE_FACIAL_WORKERS')
+    if configurado:
+        return max(0, int(configurado))
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Pré-processamento (compartilhado com o reconhecimento)
+# ─────────────────────────────────────────────────────────────────────────────
+
+def decodificar_imagem(foto_base64: str):
+    """BGR (como `cv2.imread`) a partir do base64, com ou sem prefixo
+    `data:`; None se não for imagem."""
+    import cv2
+
+    if foto_base64.startswith('data:'):
+        foto_base64 = foto_base64.split(',')[1]
+    dados = np.frombuffer(base64.b64decode(foto_base64), dtype=np.uint8)
+    return cv2.imdecode(dados, cv2.IMREAD_COLOR) if dados.size else None
+
+
+def preparar_rosto(img, face_cascade, margem: float = 0.2) -> np.ndarray:
+    """Recorte do MAIOR rosto detectado (com margem), 112×112, float32 em
+    [0, 1] — a entrada do SFace. Sem rosto detectado, a imagem inteira."""
+    import cv2
+
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5,
+                                          minSize=(30, 30))
+    if len(faces) > 0:
+        x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+        img_h, img_w = img.shape[:2]
+        x1 = max(0, int(x - w * margem))
+        y1 = max(0, int(y - h * margem))
+        x2 = min(img_w, int(x + w + w * margem))
+        y2 = min(img_h, int(y + h + h * margem))
+        img = img[y1:y2, x1:x2]
+    return cv2.resize(img, TAMANHO_ROSTO).astype(np.float32) / 255.0
+
+
+def normalizar_l2(matriz: np.ndarray) -> np.ndarray:
+    """Cada linha com norma 1 (linha nula fica como está)."""
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    return matriz / np.where(normas == 0, 1.0, normas)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Processo do pool
+# ─────────────────────────────────────────────────────────────────────────────
+
+_modelo = None
+_cascade = None
+
+
+def inicializar_worker() -> None:
+    """Carrega SFace e o classificador Haar uma vez por processo do pool."""
+    global _modelo, _cascade
+    import cv2
+    from deepface import DeepFace
+
+    _modelo = DeepFace.build_model('SFace')
+    _cascade = cv2.CascadeClassifier(
+        cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+
+
+def _forward(modelo, lote: np.ndarray) -> np.ndarray:
+    saida = np.asarray(modelo.forward(lote), dtype=np.float32)
+    if saida.size == len(lote) * saida.shape[-1]:
+        return saida.reshape(len(lote), -1)
+    # Versão do SFace que só processa a primeira imagem do lote.
+    return np.vstack([np.asarray(modelo.forward(lote[i:i + 1]), dtype=np.float32).reshape(1, -1)
+                      for i in range(len(lote))])
+
+
+def processar_lote(itens: list[tuple[str, str]]) -> list[tuple[str, list | None, str | None]]:
+    """[(chave, foto_base64)] → [(chave, embedding L2-normalizado | None,
+    erro | None)], na mesma ordem. Foto ilegível vira erro da foto, não do
+    lote."""
+    if _modelo is None:
+        inicializar_worker()
+    rostos, posicoes, saida = [], [], []
+    for chave, foto_base64 in itens:
+        try:
+            img = decodificar_imagem(foto_base64)
+            if img is None:
+                saida.append((chave, None, 'imagem ilegível'))
+                continue
+            posicoes.append(len(saida))
+            saida.append((chave, None, None))
+            rostos.append(preparar_rosto(img, _cascade))
+        except Exception as e:
+            saida.append((chave, None, str(e)))
+    if rostos:
+        embeddings = normalizar_l2(_forward(_modelo, np.stack(rostos)))
+        for pos, emb in zip(posicoes, embeddings, strict=True):
+            saida[pos] = (saida[pos][0], emb.tolist(), None)
+    return saida
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Orquestração
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _em_lotes(itens, tamanho):
+    lote = []
+    for item in itens:
+        lote.append(item)
+        if len(lote) == tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def gerar_em_lote(itens, ao_concluir, *, workers: int | None = None,
+                  tamanho_lote: int | None = None, processar=None,
+                  inicializar=None) -> None:
+    """Consome `itens` ([(chave, foto_base64)], pode ser gerador — só
+    ~2 lotes por processo ficam em memória) e chama `ao_concluir(resultados)`
+    a cada lote pronto, na ordem em que ficam prontos.
+
+    `workers=0` processa no próprio processo (sem pool): testes, e máquinas
+    de um núcleo, onde o pool só somaria a carga do modelo num filho.
+    """
+    workers = workers_disponiveis() if workers is None else workers
+    processar = processar or processar_lote
+    inicializar = inicializar or inicializar_worker
+    lotes = _em_lotes(itens, tamanho_lote or TAMANHO_LOTE)
+    if workers <= 1:
+        inicializar()
+        for lote in lotes:
+            ao_concluir(processar(lote))
+        return
+
+    import multiprocessing
+    with ProcessPoolExecutor(max_workers=workers, initializer=inicializar,
+                             mp_context=multiprocessing.get_context('spawn')) as pool:
+        pendentes = set()
+        for lote in lotes:
+            pendentes.add(pool.submit(processar, lote))
+            if len(pendentes) >= 2 * workers:
+                prontos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+                for futuro in prontos:
+                    ao_concluir(futuro.result())
+        for futuro in as_completed(pendentes):
+            ao_concluir(futuro.result())
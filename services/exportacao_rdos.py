@@ -36,11 +36,9 @@ A chave `tarefa_mpp` de cada apontamento:
 """
 from __future__ import annotations
 
-import base64
 import io
 import json
 import logging
-import os
 import zipfile
 from datetime import datetime
 
@@ -211,28 +209,18 @@ def _item_rdo(rdo, chave_por_tarefa_id):
 
 
 def _bytes_da_foto(foto):
-    """Bytes da imagem, na ordem de preferência disco → base64 otimizada →
-    base64 original. Devolve (bytes, extensão) ou (None, None)."""
-    from services.rdo_foto_service import caminho_absoluto
-
-    for rel in (foto.caminho_arquivo, foto.arquivo_otimizado,
-                foto.arquivo_original):
-        caminho = caminho_absoluto(rel)
-        if caminho and os.path.exists(caminho):
-            with open(caminho, 'rb') as fh:
-                ext = os.path.splitext(caminho)[1].lstrip('.') or 'jpg'
-                return fh.read(), ext
-
-    for col, ext in (('imagem_otimizada_base64', 'webp'),
-                     ('imagem_original_base64', 'jpg')):
-        b64 = getattr(foto, col, None)  # deferred: só carrega aqui
-        if b64:
-            try:
-                dados = base64.b64decode(b64.split(',', 1)[-1])
-            except Exception:
-                continue
-            return dados, ext
-    return None, None
+    """Bytes da imagem, na ordem de preferência arquivo (blob ou disco) da
+    versão otimizada → da original → base64. Devolve (bytes, extensão) ou
+    (None, None)."""
+    from services.rdo_foto_service import ler_foto
+
+    dados, mimetype = ler_foto(foto, 'otimizado', 'original')
+    if dados is None:
+        return None, None
+    return dados, _EXTENSAO.get(mimetype, 'webp')
+
+
+_EXTENSAO = {'image/jpeg': 'jpg', 'image/png': 'png', 'image/gif': 'gif', 'image/webp': 'webp'}
 
 
 def exportar_obra(obra, admin_id, com_fotos=False):
@@ -0,0 +1,298 @@
+"""Fatos de produção de mão de obra (`FatoProducaoMaoObra`), mantidos a cada commit.
+
+Os relatórios por funcionário das métricas de produtividade (cards,
+ranking, detalhe) refaziam o período inteiro a cada chamada: apontamentos,
+subatividades, custos, operacional e a conta de cada subatividade — um
+ranking anual relia e recalculava um ano de RDOs. Agora eles somam linhas
+já consolidadas: uma por (RDO, serviço, funcionário), com o que a conta da
+subatividade (`_calcular_metricas_subatividade`) dá para ele — horas,
+produção rateada, custo, receita — e os contadores das médias.
+
+A linha sai do MESMO caminho dos relatórios por subatividade: `_Periodo`
+sobre `_carregar_frame(rdo_ids=...)`. Consolidar é idempotente — apaga as
+linhas dos RDOs e as regrava. Quem consolida:
+
+  * o commit (`instalar_manutencao`) — o flush anota os RDOs tocados (o
+    próprio RDO: status, data, obra, estado do ciclo de vida; apontamentos,
+    subatividades e custos diários, inclusive por `query.delete()`/
+    `update()`), e também o serviço cujo coeficiente mudou e o (obra,
+    serviço) cujo operacional ganhou versão. No `before_commit` os RDOs
+    anotados são reconsolidados num savepoint, na transação do commit;
+  * `reconstruir` — backfill e reparo do tenant, para o que escreveu por
+    fora do ORM (SQL cru, carga em lote). `scripts/
+    reconstruir_fatos_producao.py` e a migração 314 usam esta.
+
+Falha na consolidação não derruba o commit: o savepoint volta, o aviso vai
+para o log e os fatos daqueles RDOs ficam para o próximo commit que os
+tocar (ou para `reconstruir`) — relatório atrasado é melhor que RDO que não
+salva.
+"""
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from datetime import date
+
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy import select, tuple_
+
+logger = logging.getLogger(__name__)
+
+_INFO_PENDENTES = 'fatos_producao_pendentes'
+_INFO_CONSOLIDANDO = 'fatos_producao_consolidando'
+
+# RDOs por carga: o IN da consolidação e o lote do backfill.
+_LOTE = 500
+
+# Filhos do RDO que entram na conta; a mudança em qualquer um reconsolida o RDO.
+_FILHOS = ('RDOMaoObra', 'RDOServicoSubatividade', 'RDOCustoDiario')
+_CAMPOS_RDO = ('status', 'data_relatorio', 'obra_id', 'admin_id', 'estado')
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Consolidação
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _somar(linha: dict, campo: str, valor) -> None:
+    """Soma que distingue "nada" de zero: None não entra; o primeiro valor
+    troca o None da linha."""
+    if valor is not None:
+        linha[campo] = (linha[campo] or 0.0) + valor
+
+
+def linhas_de_fato(admin_id: int, periodo) -> list:
+    """As linhas de `FatoProducaoMaoObra` do `_Periodo`: as métricas de cada
+    subatividade somadas por (RDO, serviço, funcionário), na ordem dos
+    apontamentos."""
+    linhas: dict = {}
+    for chave in periodo.grupos:
+        m = periodo.metricas(chave)
+        if not m:
+            continue
+        mista = m['modo'] == 'equipe_mista'
+        modo = 'mista' if mista else 'single'
+        qtd = m['quantidade_produzida']
+        prod_hh = qtd / m['total_hh'] if qtd and m['total_hh'] > 0 else None
+        for fid, fm in m['func_metricas'].items():
+            k = (m['rdo_id'], m['servico_id'], fid)
+            linha = linhas.get(k)
+            if linha is None:
+                cid = fm['composicao_id']
+                linha = linhas[k] = {
+                    'admin_id': admin_id, 'obra_id': m['obra_id'], 'rdo_id': m['rdo_id'],
+                    'servico_id': m['servico_id'], 'funcionario_id': fid,
+                    'data': m['rdo_data'], 'composicao_servico_id': cid,
+                    'coeficiente': periodo.coef_cache.get(cid) if cid else None,
+                    'horas': 0.0, 'quantidade': None, 'quantidade_equipe': None,
+                    'custo': None, 'receita': None,
+                    'n_subatividades': 0, 'n_equipe_mista': 0,
+                    'prod_hh_single_soma': 0.0, 'prod_hh_single_n': 0,
+                    'prod_hh_mista_soma': 0.0, 'prod_hh_mista_n': 0,
+                    'indice_single_soma': 0.0, 'indice_single_n': 0,
+                    'indice_mista_soma': 0.0, 'indice_mista_n': 0,
+                    'n_gargalo': 0, 'n_subutilizado': 0,
+                }
+            linha['horas'] += fm['horas_na_sub']
+            _somar(linha, 'quantidade', fm['producao_rateada'])
+            _somar(linha, 'quantidade_equipe', qtd)
+            _somar(linha, 'custo', fm['custo_na_sub'])
+            _somar(linha, 'receita', fm['receita_dele'])
+            linha['n_subatividades'] += 1
+            linha['n_equipe_mista'] += mista
+            if prod_hh is not None:
+                linha[f'prod_hh_{modo}_soma'] += prod_hh
+                linha[f'prod_hh_{modo}_n'] += 1
+            if m['indice_equipe'] is not None:
+                linha[f'indice_{modo}_soma'] += m['indice_equipe']
+                linha[f'indice_{modo}_n'] += 1
+            if m['papel_gargalo_id'] and fm['composicao_id'] == m['papel_gargalo_id']:
+                linha['n_gargalo'] += 1
+            if (m['papel_subutilizado_nome'] and periodo.nome_cache.get(
+                    fm['composicao_id'], '') == m['papel_subutilizado_nome']):
+                linha['n_subutilizado'] += 1
+    return list(linhas.values())
+
+
+def consolidar_rdos(rdo_ids) -> int:
+    """Apaga e regrava os fatos dos RDOs (os que não estão finalizados, ou
+    não existem mais, ficam sem linha). Devolve quantas linhas entraram.
+    Não faz commit."""
+    from models import RDO, FatoProducaoMaoObra, db
+    from services.metricas_produtividade import _Periodo, _carregar_frame
+
+    ids = sorted({i for i in rdo_ids if i})
+    t = FatoProducaoMaoObra.__table__
+    gravadas = 0
+    for i in range(0, len(ids), _LOTE):
+        lote = ids[i:i + _LOTE]
+        db.session.execute(t.delete().where(t.c.rdo_id.in_(lote)))
+        por_tenant = defaultdict(list)
+        for rdo_id, admin_id in db.session.query(RDO.id, RDO.admin_id).filter(
+                RDO.id.in_(lote), RDO.status == 'Finalizado'):
+            por_tenant[admin_id].append(rdo_id)
+        for admin_id, rdos in por_tenant.items():
+            periodo = _Periodo(_carregar_frame(admin_id, None, None, rdo_ids=rdos))
+            linhas = linhas_de_fato(admin_id, periodo)
+            if linhas:
+                db.session.execute(t.insert(), linhas)
+                gravadas += len(linhas)
+    return gravadas
+
+
+def reconstruir(admin_id: int, desde: date | None = None) -> int:
+    """Apaga e reconsolida os fatos do tenant a partir de `desde` (sem ele,
+    todos), em lotes de RDOs. Devolve o número de linhas gravadas. Não faz
+    commit."""
+    from models import RDO, FatoProducaoMaoObra, db
+
+    t = FatoProducaoMaoObra.__table__
+    apagar = t.delete().where(t.c.admin_id == admin_id)
+    q = db.session.query(RDO.id).filter(RDO.admin_id == admin_id, RDO.status == 'Finalizado')
+    if desde:
+        apagar = apagar.where(t.c.data >= desde)
+        q = q.filter(RDO.data_relatorio >= desde)
+    db.session.execute(apagar)
+    linhas = consolidar_rdos([rdo_id for (rdo_id,) in q.order_by(RDO.id)])
+    logger.info(f"[FATOS] tenant {admin_id}: {linhas} linha(s) consolidada(s)"
+                f"{f' desde {desde:%d/%m/%Y}' if desde else ''}")
+    return linhas
+
+
+def rdos_afetados(servicos=(), obra_servicos=()) -> set:
+    """RDOs com fato nos `servicos` (coeficiente mudou) ou nos pares
+    (obra, serviço) (operacional mudou)."""
+    from models import FatoProducaoMaoObra as F, db
+
+    ids = set()
+    if servicos:
+        ids.update(db.session.execute(select(F.rdo_id).distinct().where(
+            F.servico_id.in_(list(servicos)))).scalars())
+    if obra_servicos:
+        ids.update(db.session.execute(select(F.rdo_id).distinct().where(
+            tuple_(F.obra_id, F.servico_id).in_(list(obra_servicos)))).scalars())
+    return ids
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Manutenção no commit
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _valores(obj, attr) -> set:
+    """O valor atual de `attr` e o de antes do flush (se mudou), sem None."""
+    historico = sa_inspect(obj).attrs[attr].history
+    return {v for v in (getattr(obj, attr), *historico.deleted) if v is not None}
+
+
+def _mudou(obj, campos) -> bool:
+    estado = sa_inspect(obj)
+    return any(estado.attrs[c].history.has_changes() for c in campos)
+
+
+def _pendentes(session) -> dict:
+    return session.info.setdefault(_INFO_PENDENTES, {
+        'rdos': set(), 'servicos': set(), 'itens': set(), 'operacionais': set()})
+
+
+def _anotar(session, objetos, novos_ou_removidos: bool) -> None:
+    pend = None
+    for obj in objetos:
+        nome = type(obj).__name__
+        if nome == 'RDO':
+            if novos_ou_removidos or _mudou(obj, _CAMPOS_RDO):
+                pend = pend or _pendentes(session)
+                pend['rdos'].add(obj.id)
+        elif nome in _FILHOS:
+            pend = pend or _pendentes(session)
+            pend['rdos'] |= _valores(obj, 'rdo_id')
+        elif nome == 'ComposicaoServico':
+            if obj not in session.new and (novos_ou_removidos or _mudou(obj, ('coeficiente', 'servico_id'))):
+                pend = pend or _pendentes(session)
+                pend['servicos'] |= _valores(obj, 'servico_id')
+        elif nome == 'ObraOrcamentoOperacionalItem':
+            pend = pend or _pendentes(session)
+            pend['operacionais'] |= {(op, s) for op in _valores(obj, 'operacional_id')
+                                     for s in _valores(obj, 'servico_id')}
+        elif nome == 'ObraOrcamentoOperacionalItemVersao':
+            pend = pend or _pendentes(session)
+            pend['itens'] |= _valores(obj, 'item_id')
+
+
+def _rdos_pendentes(pend: dict) -> set:
+    from models import ObraOrcamentoOperacional, ObraOrcamentoOperacionalItem, db
+
+    pares = set(pend['operacionais'])
+    if pend['itens']:
+        pares.update(db.session.query(
+            ObraOrcamentoOperacionalItem.operacional_id, ObraOrcamentoOperacionalItem.servico_id,
+        ).filter(ObraOrcamentoOperacionalItem.id.in_(pend['itens'])))
+    obra_servicos = set()
+    if pares:
+        obras = dict(db.session.query(ObraOrcamentoOperacional.id, ObraOrcamentoOperacional.obra_id)
+                     .filter(ObraOrcamentoOperacional.id.in_({op for op, _ in pares})))
+        obra_servicos = {(obras[op], s) for op, s in pares if op in obras and s}
+    return set(pend['rdos']) | rdos_afetados(pend['servicos'], obra_servicos)
+
+
+def instalar_manutencao() -> None:
+    """Listeners na `db.session`: o flush (e o UPDATE/DELETE em massa) anota
+    em `session.info` o que mudou; o `before_commit` reconsolida os RDOs
+    afetados num savepoint. Rollback não limpa a anotação — reconsolidar a
+    mais é inofensivo, e descartá-la num rollback de savepoint perderia o
+    que o commit externo grava."""
+    from sqlalchemy import event
+
+    from models import db
+
+    @event.listens_for(db.session, 'before_flush')
+    def _anotar_removidos(session, _flush_ctx, _instancias):
+        # Depois do DELETE não há mais linha para carregar o que expirou.
+        _anotar(session, list(session.deleted), True)
+
+    @event.listens_for(db.session, 'after_flush')
+    def _anotar_flush(session, _flush_ctx):
+        _anotar(session, list(session.new), True)
+        _anotar(session, [o for o in session.dirty
+                          if session.is_modified(o, include_collections=False)], False)
+
+    @event.listens_for(db.session, 'do_orm_execute')
+    def _anotar_em_massa(estado):
+        if not (estado.is_update or estado.is_delete) or estado.bind_mapper is None:
+            return
+        modelo = estado.bind_mapper.class_
+        if modelo.__name__ in _FILHOS:
+            coluna = modelo.rdo_id
+        elif modelo.__name__ == 'RDO':
+            coluna = modelo.id
+        else:
+            return
+        q = select(coluna).distinct()
+        if estado.statement.whereclause is not None:
+            q = q.where(estado.statement.whereclause)
+        ids = {i for i in estado.session.execute(q).scalars() if i is not None}
+        if ids:
+            _pendentes(estado.session)['rdos'] |= ids
+
+    @event.listens_for(db.session, 'before_commit')
+    def _consolidar(session):
+        if session.info.get(_INFO_CONSOLIDANDO):
+            return
+        session.info[_INFO_CONSOLIDANDO] = True
+        try:
+            # O `before_commit` vem ANTES do flush do commit: o que ainda está
+            # só na sessão precisa descer agora para ser anotado.
+            session.flush()
+            pend = session.info.pop(_INFO_PENDENTES, None)
+            if not pend:
+                return
+            try:
+                with session.begin_nested():
+                    rdo_ids = _rdos_pendentes(pend)
+                    if rdo_ids:
+                        consolidar_rdos(rdo_ids)
+            except Exception:
+                logger.warning("[FATOS] falha consolidando os fatos de produção no commit "
+                               "(rdos=%s servicos=%s) — ficam para o próximo commit ou "
+                               "reconstruir()", sorted(pend['rdos'])[:20],
+                               sorted(pend['servicos']), exc_info=True)
+        finally:
+            session.info.pop(_INFO_CONSOLIDANDO, None)
@@ -6,9 +6,9 @@ Centraliza todos os cálculos de folha, INSS, IR, FGTS e horas extras
 from datetime import date, datetime
 from decimal import Decimal
 from typing import Dict, Optional
-from sqlalchemy import extract
 from models import db, Funcionario, RegistroPonto, ParametrosLegais, ConfiguracaoSalarial, BeneficioFuncionario, CalendarioUtil, HorarioDia, HorarioTrabalho
 from utils import calcular_valor_hora_periodo
+from services.periodo import no_mes
 import logging
 
 logger = logging.getLogger(__name__)
@@ -55,6 +55,11 @@ _fallback_warning_emitted = set()
 
 _cache_parametros_legais = {}
 
+# Sentinela dos argumentos pré-carregados: "consulte o banco", distinto de
+# None ("não tem"). A folha em lote (services/folha_lote) carrega tudo do mês
+# de uma vez e passa aqui — o cálculo é o mesmo da folha individual.
+_BUSCAR = object()
+
 def _obter_parametros_legais(admin_id: int, ano: int):
     """
     Busca ParametrosLegais por admin_id e ano_vigencia.
@@ -227,8 +232,7 @@ def _calcular_horas_contratuais_reais(horario_padrao, ano: int, mes: int, feriad
     
     if feriados_set is None:
         feriados_db = CalendarioUtil.query.filter(
-            CalendarioUtil.data >= primeiro_dia,
-            CalendarioUtil.data <= ultimo_dia,
+            *no_mes(CalendarioUtil.data, ano, mes),
             CalendarioUtil.eh_feriado == True
         ).all()
         feriados_set = {f.data for f in feriados_db}
@@ -310,54 +314,71 @@ def calcular_horas_mes(funcionario_id: int, ano: int, mes: int) -> Dict:
         }
     """
     try:
-        import calendar
-        
         funcionario = Funcionario.query.get(funcionario_id)
         if not funcionario:
             logger.warning(f"[calcular_horas_mes] Funcionário {funcionario_id} não encontrado")
             return _resultado_vazio_horas()
         
-        primeiro_dia = date(ano, mes, 1)
-        ultimo_dia = date(ano, mes, calendar.monthrange(ano, mes)[1])
-        
         feriados_calendario = CalendarioUtil.query.filter(
-            CalendarioUtil.data >= primeiro_dia,
-            CalendarioUtil.data <= ultimo_dia,
+            *no_mes(CalendarioUtil.data, ano, mes),
             CalendarioUtil.eh_feriado == True
         ).all()
         datas_feriados = {f.data for f in feriados_calendario}
         
+        # Intervalo de datas (sargável), não extract(year/month): o mês
+        # inteiro é Index Cond em (funcionario_id, data).
         registros = RegistroPonto.query.filter(
             RegistroPonto.funcionario_id == funcionario_id,
-            extract('year', RegistroPonto.data) == ano,
-            extract('month', RegistroPonto.data) == mes
-        ).all()
-        
+            *no_mes(RegistroPonto.data, ano, mes),
+        ).order_by(RegistroPonto.id).all()
+
         horario_trabalho = funcionario.horario_trabalho
-        
-        tolerancia_minutos = 10
-        if funcionario.admin_id:
-            params = _obter_parametros_legais(funcionario.admin_id, ano)
-            if params and hasattr(params, 'tolerancia_minutos') and params.tolerancia_minutos is not None:
-                tolerancia_minutos = params.tolerancia_minutos
-        
-        if horario_trabalho and horario_trabalho.dias.count() > 0:
-            return _calcular_horas_mes_novo(
-                funcionario, horario_trabalho, registros, 
-                primeiro_dia, ultimo_dia, datas_feriados, ano, mes,
-                tolerancia_minutos=tolerancia_minutos
-            )
-        else:
-            logger.debug(f"[calcular_horas_mes] Func {funcionario_id} sem HorarioTrabalho, usando lógica legada")
-            return _calcular_horas_mes_legado(
-                funcionario_id, registros, primeiro_dia, ultimo_dia, datas_feriados
-            )
-        
+        horarios_dia_map = (
+            {hd.dia_semana: hd for hd in horario_trabalho.dias} if horario_trabalho else {})
+
+        params = _obter_parametros_legais(funcionario.admin_id, ano) if funcionario.admin_id else None
+
+        return horas_do_mes(
+            funcionario, horario_trabalho, horarios_dia_map, registros,
+            datas_feriados, ano, mes, tolerancia_minutos=_tolerancia_minutos(params)
+        )
+
     except Exception as e:
         logger.error(f"Erro ao calcular horas do mês: {e}", exc_info=True)
         return _resultado_vazio_horas()
 
 
+def _tolerancia_minutos(params) -> int:
+    if params and hasattr(params, 'tolerancia_minutos') and params.tolerancia_minutos is not None:
+        return params.tolerancia_minutos
+    return 10
+
+
+def horas_do_mes(funcionario, horario_trabalho, horarios_dia_map: Dict, registros: list,
+                 datas_feriados: set, ano: int, mes: int, tolerancia_minutos: int = 10) -> Dict:
+    """
+    Horas do mês a partir do que já foi carregado — o miolo de
+    `calcular_horas_mes`, sem consultas. `horarios_dia_map` é
+    {dia_semana: HorarioDia} do horário do funcionário (vazio: lógica legada).
+    """
+    import calendar
+
+    primeiro_dia = date(ano, mes, 1)
+    ultimo_dia = date(ano, mes, calendar.monthrange(ano, mes)[1])
+
+    if horario_trabalho and horarios_dia_map:
+        return _calcular_horas_mes_novo(
+            funcionario, horario_trabalho, registros,
+            primeiro_dia, ultimo_dia, datas_feriados, ano, mes,
+            tolerancia_minutos=tolerancia_minutos,
+            horarios_dia_map=horarios_dia_map
+        )
+    logger.debug(f"[calcular_horas_mes] Func {funcionario.id} sem HorarioTrabalho, usando lógica legada")
+    return _calcular_horas_mes_legado(
+        funcionario.id, registros, primeiro_dia, ultimo_dia, datas_feriados
+    )
+
+
 def _resultado_vazio_horas() -> Dict:
     """Retorna resultado vazio para casos de erro ou funcionário não encontrado"""
     return {
@@ -385,7 +406,8 @@ def _calcular_horas_mes_novo(
     datas_feriados: set,
     ano: int,
     mes: int,
-    tolerancia_minutos: int = 10
+    tolerancia_minutos: int = 10,
+    horarios_dia_map: Optional[Dict] = None
 ) -> Dict:
     """
     Nova lógica de cálculo baseada em HorarioDia.
@@ -404,10 +426,12 @@ def _calcular_horas_mes_novo(
         ano: Ano de referência
         mes: Mês de referência
         tolerancia_minutos: Minutos de tolerância para extras/atrasos (default: 10)
+        horarios_dia_map: {dia_semana: HorarioDia} já carregado (None: lê de horario_trabalho.dias)
     """
     from datetime import timedelta
-    
-    horarios_dia_map = {hd.dia_semana: hd for hd in horario_trabalho.dias}
+
+    if horarios_dia_map is None:
+        horarios_dia_map = {hd.dia_semana: hd for hd in horario_trabalho.dias}
     
     registros_por_data = {}
     for reg in registros:
@@ -632,7 +656,19 @@ def calcular_dsr(horas_info: Dict, valor_hora_normal: Decimal) -> Decimal:
         return Decimal('0')
 
 
-def calcular_valor_hora_dinamico(funcionario: Funcionario, horas_info: Dict, data_inicio: date, data_fim: date) -> Decimal:
+def _config_salarial_vigente(funcionario_id: int):
+    """ConfiguracaoSalarial ativa e não encerrada (a que vale para o salário)."""
+    return ConfiguracaoSalarial.query.filter_by(
+        funcionario_id=funcionario_id,
+        ativo=True
+    ).filter(
+        ConfiguracaoSalarial.data_fim.is_(None) |
+        (ConfiguracaoSalarial.data_fim >= date.today())
+    ).order_by(ConfiguracaoSalarial.id).first()
+
+
+def calcular_valor_hora_dinamico(funcionario: Funcionario, horas_info: Dict, data_inicio: date, data_fim: date,
+                                 config=_BUSCAR) -> Decimal:
     """
     Calcula o valor da hora baseado nas horas contratuais REAIS do mês.
     
@@ -644,18 +680,14 @@ def calcular_valor_hora_dinamico(funcionario: Funcionario, horas_info: Dict, dat
         horas_info: Dicionário com 'horas_contratuais_mes' calculado
         data_inicio: Data de início do período
         data_fim: Data de fim do período
-        
+        config: ConfiguracaoSalarial vigente já carregada (ou None); omitido, consulta
+
     Returns:
         Decimal: Valor da hora normal
     """
     try:
-        config = ConfiguracaoSalarial.query.filter_by(
-            funcionario_id=funcionario.id,
-            ativo=True
-        ).filter(
-            ConfiguracaoSalarial.data_fim.is_(None) | 
-            (ConfiguracaoSalarial.data_fim >= date.today())
-        ).first()
+        if config is _BUSCAR:
+            config = _config_salarial_vigente(funcionario.id)
         
         if config:
             salario_base = config.salario_base
@@ -686,7 +718,8 @@ def calcular_valor_hora_dinamico(funcionario: Funcionario, horas_info: Dict, dat
         return Decimal(str(calcular_valor_hora_periodo(funcionario, data_inicio, data_fim)))
 
 
-def calcular_salario_bruto(funcionario: Funcionario, horas_info: Dict, data_inicio: date, data_fim: date) -> Dict:
+def calcular_salario_bruto(funcionario: Funcionario, horas_info: Dict, data_inicio: date, data_fim: date,
+                           config=_BUSCAR) -> Dict:
     """
     Calcula salário bruto considerando tipo de salário e horas extras.
     
@@ -703,7 +736,8 @@ def calcular_salario_bruto(funcionario: Funcionario, horas_info: Dict, data_inic
         horas_info: Dicionário com informações de horas trabalhadas
         data_inicio: Data de início do período
         data_fim: Data de fim do período
-        
+        config: ConfiguracaoSalarial vigente já carregada (ou None); omitido, consulta
+
     Returns:
         Dict: {
             'salario_bruto': Decimal - base para INSS/IRRF (sem faltas),
@@ -717,14 +751,9 @@ def calcular_salario_bruto(funcionario: Funcionario, horas_info: Dict, data_inic
         }
     """
     try:
-        config = ConfiguracaoSalarial.query.filter_by(
-            funcionario_id=funcionario.id,
-            ativo=True
-        ).filter(
-            ConfiguracaoSalarial.data_fim.is_(None) | 
-            (ConfiguracaoSalarial.data_fim >= date.today())
-        ).first()
-        
+        if config is _BUSCAR:
+            config = _config_salarial_vigente(funcionario.id)
+
         if not config:
             salario_base = Decimal(str(funcionario.salario or 0))
             tipo_salario = 'MENSAL'
@@ -736,12 +765,12 @@ def calcular_salario_bruto(funcionario: Funcionario, horas_info: Dict, data_inic
             if config and config.valor_hora:
                 valor_hora = config.valor_hora
             else:
-                valor_hora = calcular_valor_hora_dinamico(funcionario, horas_info, data_inicio, data_fim)
+                valor_hora = calcular_valor_hora_dinamico(funcionario, horas_info, data_inicio, data_fim, config)
             salario_normal = valor_hora * Decimal(str(horas_info['total']))
         else:
             salario_normal = salario_base
         
-        valor_hora_normal = calcular_valor_hora_dinamico(funcionario, horas_info, data_inicio, data_fim)
+        valor_hora_normal = calcular_valor_hora_dinamico(funcionario, horas_info, data_inicio, data_fim, config)
         
         valor_he_50 = valor_hora_normal * Decimal('1.5') * Decimal(str(horas_info.get('extras_50', 0)))
         valor_he_100 = valor_hora_normal * Decimal('2.0') * Decimal(str(horas_info.get('extras_100', 0)))
@@ -888,7 +917,8 @@ def calcular_irrf(salario_bruto: Decimal, inss: Decimal, dependentes: int = 0, t
     return Decimal('0')
 
 
-def calcular_descontos(salario_bruto: Decimal, funcionario: Funcionario, params=None) -> Dict:
+def calcular_descontos(salario_bruto: Decimal, funcionario: Funcionario, params=None,
+                       dependentes=None, beneficios=None) -> Dict:
     """
     Calcula todos os descontos (INSS, IR, benefícios, etc).
     
@@ -896,7 +926,9 @@ def calcular_descontos(salario_bruto: Decimal, funcionario: Funcionario, params=
         salario_bruto: Valor do salário bruto
         funcionario: Objeto Funcionario
         params: Objeto ParametrosLegais (OBRIGATÓRIO para cálculos precisos)
-        
+        dependentes: nº de dependentes para o IRRF já carregado (None: consulta)
+        beneficios: BeneficioFuncionario vigentes já carregados (None: consulta)
+
     Returns:
         dict: Dicionário com todos os descontos
         
@@ -920,21 +952,23 @@ def calcular_descontos(salario_bruto: Decimal, funcionario: Funcionario, params=
     
     inss = calcular_inss(salario_bruto, tabela_inss)
     
-    config = ConfiguracaoSalarial.query.filter_by(
-        funcionario_id=funcionario.id,
-        ativo=True
-    ).first()
-    dependentes = config.dependentes if config else 0
-    
+    if dependentes is None:
+        config = ConfiguracaoSalarial.query.filter_by(
+            funcionario_id=funcionario.id,
+            ativo=True
+        ).order_by(ConfiguracaoSalarial.id).first()
+        dependentes = config.dependentes if config else 0
+
     irrf = calcular_irrf(salario_bruto, inss, dependentes, tabela_irrf, deducao_dep)
-    
-    beneficios = BeneficioFuncionario.query.filter_by(
-        funcionario_id=funcionario.id,
-        ativo=True
-    ).filter(
-        BeneficioFuncionario.data_fim.is_(None) |
-        (BeneficioFuncionario.data_fim >= date.today())
-    ).all()
+
+    if beneficios is None:
+        beneficios = BeneficioFuncionario.query.filter_by(
+            funcionario_id=funcionario.id,
+            ativo=True
+        ).filter(
+            BeneficioFuncionario.data_fim.is_(None) |
+            (BeneficioFuncionario.data_fim >= date.today())
+        ).all()
     
     total_beneficios = Decimal('0')
     desconto_beneficios = Decimal('0')
@@ -995,7 +1029,9 @@ def calcular_encargos_patronais(salario_bruto: Decimal, params=None) -> Dict:
 # PROCESSAMENTO COMPLETO
 # ========================================
 
-def processar_folha_funcionario(funcionario: Funcionario, ano: int, mes: int, params=None) -> Dict:
+def processar_folha_funcionario(funcionario: Funcionario, ano: int, mes: int, params=None,
+                                horas_info=None, config=_BUSCAR, dependentes=None,
+                                beneficios=None) -> Dict:
     """
     Processa a folha completa de um funcionário.
     
@@ -1007,7 +1043,9 @@ def processar_folha_funcionario(funcionario: Funcionario, ano: int, mes: int, pa
         ano: Ano de referência
         mes: Mês de referência
         params: Objeto ParametrosLegais (opcional, busca automaticamente se não informado)
-        
+        horas_info, config, dependentes, beneficios: já carregados pela folha em
+            lote (services/folha_lote); omitidos, cada função consulta o seu
+
     Returns:
         dict: Dados completos da folha processada
     """
@@ -1030,16 +1068,17 @@ def processar_folha_funcionario(funcionario: Funcionario, ano: int, mes: int, pa
                 "Configure os parâmetros legais (INSS/IRRF) em Configurações > Parâmetros Legais."
             )
         
-        horas_info = calcular_horas_mes(funcionario.id, ano, mes)
-        
-        resultado_bruto = calcular_salario_bruto(funcionario, horas_info, data_inicio, data_fim)
+        if horas_info is None:
+            horas_info = calcular_horas_mes(funcionario.id, ano, mes)
+
+        resultado_bruto = calcular_salario_bruto(funcionario, horas_info, data_inicio, data_fim, config)
         
         salario_bruto = resultado_bruto['salario_bruto']
         desconto_faltas = resultado_bruto['desconto_faltas']
         desconto_atrasos = resultado_bruto['desconto_atrasos']
         total_proventos = resultado_bruto['total_proventos']
         
-        descontos = calcular_descontos(salario_bruto, funcionario, params)
+        descontos = calcular_descontos(salario_bruto, funcionario, params, dependentes, beneficios)
         
         encargos = calcular_encargos_patronais(salario_bruto, params)
         
@@ -1109,6 +1148,66 @@ def processar_folha_funcionario(funcionario: Funcionario, ano: int, mes: int, pa
 # FUNÇÕES PARA DASHBOARD DE CUSTOS POR OBRA
 # ========================================
 
+# Colunas de FolhaProcessada ← chaves do dict de processar_folha_funcionario().
+_COLUNAS_FOLHA_PROCESSADA = (
+    ('salario_base', 'salario_base'),
+    ('salario_bruto', 'salario_bruto'),
+    ('total_proventos', 'total_proventos'),
+    ('total_descontos', 'total_descontos'),
+    ('salario_liquido', 'salario_liquido'),
+    ('valor_he_50', 'valor_he_50'),
+    ('valor_he_100', 'valor_he_100'),
+    ('valor_dsr', 'valor_dsr'),
+    ('encargos_fgts', 'fgts'),
+    ('custo_total_empresa', 'custo_total_empresa'),
+    ('inss_funcionario', 'inss'),
+    ('irrf', 'irrf'),
+    ('desconto_faltas', 'desconto_faltas'),
+    ('desconto_atrasos', 'desconto_atrasos'),
+    ('horas_trabalhadas', 'horas_trabalhadas'),
+    ('horas_extras_50', 'horas_extras_50'),
+    ('horas_extras_100', 'horas_extras_100'),
+    ('horas_falta', 'horas_falta'),
+)
+
+
+def _valores_folha_processada(dados_folha: Dict) -> Dict:
+    """
+    Valores das colunas de FolhaProcessada para um `dados_folha` — os mesmos
+    para a gravação individual (`salvar_folha_processada`) e a em lote
+    (`services/folha_lote.salvar`).
+    """
+    valores = {coluna: Decimal(str(dados_folha.get(chave, 0)))
+               for coluna, chave in _COLUNAS_FOLHA_PROCESSADA}
+
+    # ── A24a/B2.14 — INSS patronal por SUBTRAÇÃO, não por fator ──
+    #
+    # Os dois ramos de `salvar_folha_processada` gravavam
+    # `encargos_patronais * Decimal('0.7')`.
+    # O fator só seria exato se o FGTS valesse 8% — e a alíquota é
+    # configurável por tenant. Mesmo a 8%, `0.20/0.28 = 0.714285…`, não
+    # 0.7: R$ 588,00 gravados onde o certo são R$ 600,00, e a linha passava
+    # a violar o próprio invariante DENTRO dela mesma —
+    # `fgts + inss_patronal` dava 828 com `custo_total − salario_bruto` em
+    # 840.
+    #
+    # Preferimos a chave direta quando ela existe (o produtor agora a
+    # expõe) e a subtração quando não existe — `salvar_folha_processada` é
+    # pública e recebe dict arbitrário. **Nenhum fator novo**: só a
+    # subtração é exata para qualquer alíquota.
+    #
+    # `Decimal(str(...))` porque o dict vem com float, e `Decimal(float)`
+    # traz cauda binária.
+    if dados_folha.get('inss_patronal') is not None:
+        valores['encargos_inss_patronal'] = Decimal(str(dados_folha.get('inss_patronal', 0)))
+    else:
+        valores['encargos_inss_patronal'] = (
+            Decimal(str(dados_folha.get('encargos_patronais', 0)))
+            - Decimal(str(dados_folha.get('fgts', 0)))
+        )
+    return valores
+
+
 def salvar_folha_processada(funcionario_id: int, obra_id: Optional[int], ano: int, mes: int, 
                             dados_folha: Dict, admin_id: int) -> bool:
     """
@@ -1136,53 +1235,13 @@ def salvar_folha_processada(funcionario_id: int, obra_id: Optional[int], ano: in
             mes=mes
         ).first()
 
-        # ── A24a/B2.14 — INSS patronal por SUBTRAÇÃO, não por fator ──
-        #
-        # Os dois ramos abaixo gravavam `encargos_patronais * Decimal('0.7')`.
-        # O fator só seria exato se o FGTS valesse 8% — e a alíquota é
-        # configurável por tenant. Mesmo a 8%, `0.20/0.28 = 0.714285…`, não
-        # 0.7: R$ 588,00 gravados onde o certo são R$ 600,00, e a linha passava
-        # a violar o próprio invariante DENTRO dela mesma —
-        # `fgts + inss_patronal` dava 828 com `custo_total − salario_bruto` em
-        # 840.
-        #
-        # Preferimos a chave direta quando ela existe (o produtor agora a
-        # expõe) e a subtração quando não existe — `salvar_folha_processada` é
-        # pública e recebe dict arbitrário. **Nenhum fator novo**: só a
-        # subtração é exata para qualquer alíquota.
-        #
-        # `Decimal(str(...))` porque o dict vem com float, e `Decimal(float)`
-        # traz cauda binária.
-        if dados_folha.get('inss_patronal') is not None:
-            _inss_patronal = Decimal(str(dados_folha.get('inss_patronal', 0)))
-        else:
-            _inss_patronal = (
-                Decimal(str(dados_folha.get('encargos_patronais', 0)))
-                - Decimal(str(dados_folha.get('fgts', 0)))
-            )
+        valores = _valores_folha_processada(dados_folha)
 
         if folha_existente:
-            folha_existente.salario_base = Decimal(str(dados_folha.get('salario_base', 0)))
-            folha_existente.salario_bruto = Decimal(str(dados_folha.get('salario_bruto', 0)))
-            folha_existente.total_proventos = Decimal(str(dados_folha.get('total_proventos', 0)))
-            folha_existente.total_descontos = Decimal(str(dados_folha.get('total_descontos', 0)))
-            folha_existente.salario_liquido = Decimal(str(dados_folha.get('salario_liquido', 0)))
-            folha_existente.valor_he_50 = Decimal(str(dados_folha.get('valor_he_50', 0)))
-            folha_existente.valor_he_100 = Decimal(str(dados_folha.get('valor_he_100', 0)))
-            folha_existente.valor_dsr = Decimal(str(dados_folha.get('valor_dsr', 0)))
-            folha_existente.encargos_fgts = Decimal(str(dados_folha.get('fgts', 0)))
-            folha_existente.encargos_inss_patronal = _inss_patronal
-            folha_existente.custo_total_empresa = Decimal(str(dados_folha.get('custo_total_empresa', 0)))
-            folha_existente.inss_funcionario = Decimal(str(dados_folha.get('inss', 0)))
-            folha_existente.irrf = Decimal(str(dados_folha.get('irrf', 0)))
-            folha_existente.desconto_faltas = Decimal(str(dados_folha.get('desconto_faltas', 0)))
-            folha_existente.desconto_atrasos = Decimal(str(dados_folha.get('desconto_atrasos', 0)))
-            folha_existente.horas_trabalhadas = Decimal(str(dados_folha.get('horas_trabalhadas', 0)))
-            folha_existente.horas_extras_50 = Decimal(str(dados_folha.get('horas_extras_50', 0)))
-            folha_existente.horas_extras_100 = Decimal(str(dados_folha.get('horas_extras_100', 0)))
-            folha_existente.horas_falta = Decimal(str(dados_folha.get('horas_falta', 0)))
+            for coluna, valor in valores.items():
+                setattr(folha_existente, coluna, valor)
             folha_existente.processado_em = datetime.utcnow()
-            
+
             logger.debug(f"[salvar_folha_processada] Atualizado: func={funcionario_id}, obra={obra_id}, {mes:02d}/{ano}")
         else:
             nova_folha = FolhaProcessada(
@@ -1191,26 +1250,8 @@ def salvar_folha_processada(funcionario_id: int, obra_id: Optional[int], ano: in
                 admin_id=admin_id,
                 ano=ano,
                 mes=mes,
-                salario_base=Decimal(str(dados_folha.get('salario_base', 0))),
-                salario_bruto=Decimal(str(dados_folha.get('salario_bruto', 0))),
-                total_proventos=Decimal(str(dados_folha.get('total_proventos', 0))),
-                total_descontos=Decimal(str(dados_folha.get('total_descontos', 0))),
-                salario_liquido=Decimal(str(dados_folha.get('salario_liquido', 0))),
-                valor_he_50=Decimal(str(dados_folha.get('valor_he_50', 0))),
-                valor_he_100=Decimal(str(dados_folha.get('valor_he_100', 0))),
-                valor_dsr=Decimal(str(dados_folha.get('valor_dsr', 0))),
-                encargos_fgts=Decimal(str(dados_folha.get('fgts', 0))),
-                encargos_inss_patronal=_inss_patronal,
-                custo_total_empresa=Decimal(str(dados_folha.get('custo_total_empresa', 0))),
-                inss_funcionario=Decimal(str(dados_folha.get('inss', 0))),
-                irrf=Decimal(str(dados_folha.get('irrf', 0))),
-                desconto_faltas=Decimal(str(dados_folha.get('desconto_faltas', 0))),
-                desconto_atrasos=Decimal(str(dados_folha.get('desconto_atrasos', 0))),
-                horas_trabalhadas=Decimal(str(dados_folha.get('horas_trabalhadas', 0))),
-                horas_extras_50=Decimal(str(dados_folha.get('horas_extras_50', 0))),
-                horas_extras_100=Decimal(str(dados_folha.get('horas_extras_100', 0))),
-                horas_falta=Decimal(str(dados_folha.get('horas_falta', 0))),
-                processado_em=datetime.utcnow()
+                processado_em=datetime.utcnow(),
+                **valores
             )
             db.session.add(nova_folha)
             logger.debug(f"[salvar_folha_processada] Criado: func={funcionario_id}, obra={obra_id}, {mes:02d}/{ano}")
@@ -1410,7 +1451,7 @@ def obter_dados_folha_obra(obra_id: int, data_inicio: date, data_fim: date, admi
 def processar_e_salvar_folha_obra(obra_id: int, ano: int, mes: int, admin_id: int) -> Dict:
     """
     Processa e salva folhas de todos os funcionários que trabalharam em uma obra no período.
-    Útil para recalcular dados de custo de uma obra.
+    Útil para recalcular dados de custo de uma obra. Em lote: ver services/folha_lote.
     
     Args:
         obra_id: ID da obra
@@ -1422,48 +1463,10 @@ def processar_e_salvar_folha_obra(obra_id: int, ano: int, mes: int, admin_id: in
         dict com estatísticas do processamento
     """
     try:
-        from models import RegistroPonto
-        
-        funcionarios_ids = db.session.query(RegistroPonto.funcionario_id).filter(
-            RegistroPonto.obra_id == obra_id,
-            extract('year', RegistroPonto.data) == ano,
-            extract('month', RegistroPonto.data) == mes
-        ).distinct().all()
-        
-        funcionarios_ids = [f[0] for f in funcionarios_ids]
-        
-        processados = 0
-        erros = 0
-        
-        for func_id in funcionarios_ids:
-            try:
-                funcionario = Funcionario.query.get(func_id)
-                if not funcionario:
-                    continue
-                
-                dados_folha = processar_folha_funcionario(funcionario, ano, mes)
-                
-                if dados_folha:
-                    if salvar_folha_processada(func_id, obra_id, ano, mes, dados_folha, admin_id):
-                        processados += 1
-                    else:
-                        erros += 1
-                else:
-                    erros += 1
-                    
-            except Exception as e:
-                logger.error(f"[processar_e_salvar_folha_obra] Erro func={func_id}: {e}")
-                erros += 1
-        
-        return {
-            'obra_id': obra_id,
-            'ano': ano,
-            'mes': mes,
-            'funcionarios_encontrados': len(funcionarios_ids),
-            'processados_com_sucesso': processados,
-            'erros': erros
-        }
-        
+        from services import folha_lote
+
+        return folha_lote.processar_e_salvar(admin_id, ano, mes, obra_id=obra_id)
+
     except Exception as e:
         logger.error(f"[processar_e_salvar_folha_obra] Erro geral: {e}", exc_info=True)
         return {
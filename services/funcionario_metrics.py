@@ -143,6 +143,51 @@ def _resumo_ponto(funcionario_id: int, data_inicio: date, data_fim: date, admin_
     }
 
 
+def _resumo_ponto_em_lote(funcionario_ids, data_inicio: date, data_fim: date,
+                          admin_id: Optional[int] = None) -> dict:
+    """`_resumo_ponto` de vários funcionários numa consulta só (GROUP BY
+    funcionário, contagens por tipo com FILTER). Mesmas regras do laço: tipo
+    vazio conta como 'trabalhado', e dia trabalhado é registro fora das
+    faltas com hora normal ou extra. Funcionário sem registro não aparece."""
+    if not funcionario_ids:
+        return {}
+    tipo = sa_func.lower(sa_func.coalesce(
+        sa_func.nullif(RegistroPonto.tipo_registro, ""), "trabalhado"))
+    horas = sa_func.coalesce(RegistroPonto.horas_trabalhadas, 0.0)
+    extras = sa_func.coalesce(RegistroPonto.horas_extras, 0.0)
+    q = db.session.query(
+        RegistroPonto.funcionario_id,
+        sa_func.count(),
+        sa_func.sum(horas),
+        sa_func.sum(extras),
+        sa_func.sum(sa_func.coalesce(RegistroPonto.total_atraso_horas, 0.0)),
+        sa_func.count().filter(tipo == "falta"),
+        sa_func.count().filter(tipo == "falta_justificada"),
+        sa_func.count().filter(
+            tipo.notin_(("falta", "falta_justificada")),
+            (horas > 0) | (extras > 0)),
+    ).filter(
+        RegistroPonto.funcionario_id.in_(list(funcionario_ids)),
+        RegistroPonto.data >= data_inicio,
+        RegistroPonto.data <= data_fim,
+    )
+    if admin_id is not None:
+        q = q.filter(RegistroPonto.admin_id == admin_id)
+    return {
+        fid: {
+            "registros_count": n,
+            "horas_trabalhadas": float(h or 0),
+            "horas_extras": float(e or 0),
+            "atrasos_horas": float(a or 0),
+            "faltas": faltas,
+            "faltas_justificadas": justificadas,
+            "dias_trabalhados": trabalhados,
+        }
+        for fid, n, h, e, a, faltas, justificadas, trabalhados
+        in q.group_by(RegistroPonto.funcionario_id)
+    }
+
+
 def _custo_alimentacao_real(funcionario_id: int, data_inicio: date, data_fim: date, admin_id: Optional[int] = None) -> float:
     """Soma alimentação real (híbrido v1+v2):
 
@@ -297,8 +342,10 @@ def _dias_uteis(data_inicio: date, data_fim: date) -> int:
     return dias
 
 
-def _custo_mo_salarista(funcionario: Funcionario, ponto: dict, data_inicio: date) -> dict:
-    valor_hora = calcular_valor_hora(funcionario, data_inicio)
+def _custo_mo_salarista(funcionario: Funcionario, ponto: dict, data_inicio: date,
+                        valor_hora: Optional[float] = None) -> dict:
+    if valor_hora is None:
+        valor_hora = calcular_valor_hora(funcionario, data_inicio)
     valor_horas = ponto["horas_trabalhadas"] * valor_hora
     valor_extras = ponto["horas_extras"] * valor_hora * 1.5
     valor_faltas = ponto["faltas"] * valor_hora * 8
@@ -500,6 +547,60 @@ def calcular_metricas_lista(
     return resultado
 
 
+def calcular_mao_obra_em_lote(
+    funcionarios: list,
+    data_inicio: date,
+    data_fim: date,
+    admin_id: Optional[int] = None,
+) -> dict:
+    """`{funcionario_id: métricas}` só com a parte de ponto/mão de obra de
+    `calcular_metricas_funcionario` (horas, extras, faltas, dias pagos,
+    `custo_mao_obra`) — os mesmos números, para quem soma o tenant inteiro
+    (dashboard) e não precisa de alimentação/reembolso/almoxarifado.
+
+    Uma consulta de ponto para todos (`_resumo_ponto_em_lote`) em vez de uma
+    por funcionário; o valor/hora, que depende só de salário e horário
+    (`utils.calcular_valor_hora_periodo`, que lê os dias do horário a cada
+    chamada), é calculado uma vez por combinação distinta. Erro num
+    funcionário é logado e ele fica de fora, como no laço do dashboard.
+    """
+    import logging as _logging
+    _log = _logging.getLogger(__name__)
+
+    resumos = _resumo_ponto_em_lote([f.id for f in funcionarios], data_inicio, data_fim, admin_id)
+    valores_hora: dict = {}
+    resultado = {}
+    for f in funcionarios:
+        ponto = resumos.get(f.id)
+        if ponto is None:
+            resultado[f.id] = {"horas_trabalhadas": 0.0, "horas_extras": 0.0, "faltas": 0,
+                               "faltas_justificadas": 0, "dias_pagos": 0, "custo_mao_obra": 0.0}
+            continue
+        try:
+            if get_modo_remuneracao(f) == "diaria":
+                dias_pagos = ponto["dias_trabalhados"]
+                mo = _custo_mo_diarista(f, ponto, dias_pagos)
+            else:
+                dias_pagos = ponto["dias_trabalhados"] + ponto["faltas_justificadas"]
+                chave = (f.salario, f.horario_trabalho_id)
+                if chave not in valores_hora:
+                    valores_hora[chave] = calcular_valor_hora(f, data_inicio)
+                mo = _custo_mo_salarista(f, ponto, data_inicio, valores_hora[chave])
+        except Exception as e:  # noqa: BLE001
+            _log.error("calcular_mao_obra_em_lote falhou para funcionario_id=%s: %s",
+                       f.id, e, exc_info=True)
+            continue
+        resultado[f.id] = {
+            "horas_trabalhadas": ponto["horas_trabalhadas"],
+            "horas_extras": ponto["horas_extras"],
+            "faltas": ponto["faltas"],
+            "faltas_justificadas": ponto["faltas_justificadas"],
+            "dias_pagos": dias_pagos,
+            "custo_mao_obra": mo["custo_mao_obra"],
+        }
+    return resultado
+
+
 def agregar_kpis_geral(metricas_lista: list, num_funcionarios_ativos: int) -> dict:
     """Agrega métricas individuais em KPIs do cabeçalho da tela `/funcionarios`."""
     total_horas = sum(k.get("total_horas", 0) for k in metricas_lista)
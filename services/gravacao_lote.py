@@ -0,0 +1,77 @@
+"""Gravação em lote para os importadores: INSERT ... VALUES em blocos, com os
+ids devolvidos na ordem das linhas.
+
+`db.session.add()` + `flush()` por linha é uma ida ao banco por objeto, e cada
+`flush` ainda percorre a unit of work inteira. Aqui cada tabela vai em blocos
+de `LOTE` linhas num único `INSERT ... VALUES (...), (...) RETURNING id` (o
+"insertmanyvalues" do SQLAlchemy 2.0); `sort_by_parameter_order` garante que
+o i-ésimo id devolvido é o da i-ésima linha — é com ele que as tabelas filhas
+apontam para a mãe (GestaoCustoFilho/FluxoCaixa/ContaPagar → GestaoCustoPai).
+Os defaults de coluna (`data_criacao`, `status`, `situacao_liberacao`...) são
+do Core e valem igual.
+
+Gravar por fora da unit of work pula os listeners de mapper e de flush. Os
+que importam para o que os importadores gravam são refeitos por `depois_da_carga`:
+
+  * o recálculo do resumo de custos das obras tocadas por GestaoCustoFilho
+    (`models._gestao_custo_filho_changed` → `recalcular_obra`), uma vez por
+    obra em vez de uma por flush;
+  * a invalidação do cache do dashboard do tenant (`dashboard_metricas`).
+
+Nada aqui faz commit: a transação é a do chamador (tudo-ou-nada).
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+LOTE = 1000
+
+
+def em_blocos(linhas, tamanho=LOTE):
+    """Fatia qualquer iterável em listas de até `tamanho` itens."""
+    bloco = []
+    for linha in linhas:
+        bloco.append(linha)
+        if len(bloco) >= tamanho:
+            yield bloco
+            bloco = []
+    if bloco:
+        yield bloco
+
+
+def inserir(modelo, linhas, ids=False, ignorar_conflito=False, lote=LOTE):
+    """Insere `linhas` (dicts com as MESMAS chaves, nomes de coluna) na tabela
+    de `modelo` (model ou `db.Table`). Com `ids=True` devolve os ids gerados,
+    na ordem de `linhas`; `ignorar_conflito` é o ON CONFLICT DO NOTHING."""
+    from sqlalchemy import insert
+    from sqlalchemy.dialects.postgresql import insert as insert_pg
+    from models import db
+
+    if not linhas:
+        return []
+    db.session.flush()   # o que estiver pendente na sessão vai antes (FKs)
+    tabela = getattr(modelo, '__table__', modelo)
+    if ignorar_conflito:
+        stmt = insert_pg(tabela).on_conflict_do_nothing()
+    else:
+        stmt = insert(tabela)
+    if ids:
+        stmt = stmt.returning(tabela.c.id, sort_by_parameter_order=True)
+    gerados = []
+    for i in range(0, len(linhas), lote):
+        resultado = db.session.execute(stmt, linhas[i:i + lote])
+        if ids:
+            gerados.extend(resultado.scalars())
+    return gerados
+
+
+def depois_da_carga(admin_id, obras=()):
+    """Efeitos colaterais que os listeners teriam disparado: recalcula o resumo
+    de custos de cada obra em `obras` e anota o tenant para o dashboard."""
+    from services import dashboard_metricas
+    from services.resumo_custos_obra import recalcular_obra
+
+    dashboard_metricas.anotar(admin_id)
+    for obra_id in sorted(set(o for o in obras if o)):
+        if not recalcular_obra(obra_id, admin_id=admin_id):
+            logger.warning('resumo_custos: recalcular_obra(%s) retornou False', obra_id)
@@ -12,6 +12,8 @@ import logging
 import re
 from datetime import datetime, date
 
+from services import leitor_planilha
+
 logger = logging.getLogger(__name__)
 
 # ── Helpers compartilhados ─────────────────────────────────────────────────────
@@ -89,19 +91,8 @@ def _detectar_header_row(ws, must_contain):
         s = ''.join(c for c in s if unicodedata.category(c) != 'Mn')
         s = s.replace(' ', '_').replace('*', '').strip('_')
         return s
-    for r in range(1, min(6, ws.max_row + 1)):
-        vals = [ws.cell(row=r, column=c).value for c in range(1, ws.max_column + 1)]
-        normalized = [n(str(v)) for v in vals]
-        if any(term in normalized for term in must_contain):
-            return r, [ws.cell(row=r, column=c).value for c in range(1, ws.max_column + 1)]
-    return None, None
-
-def _cel(ws, row_num, hm, *keys):
-    """Retorna o valor da primeira chave encontrada no header_map."""
-    for k in keys:
-        if k in hm:
-            return ws.cell(row=row_num, column=hm[k] + 1).value
-    return None
+    return leitor_planilha.cabecalho(
+        ws, lambda vals: any(term in [n(str(v)) for v in vals] for term in must_contain))
 
 
 def _obter_ou_criar_cliente_placeholder(admin_id: int) -> int:
@@ -205,9 +196,7 @@ class ImportacaoFuncionarios:
         validos, erros = [], []
         cpfs_vistos = set()
 
-        for rn in range(header_row + 1, ws.max_row + 1):
-            def c(*keys):
-                return _cel(ws, rn, hm, *keys)
+        for rn, c in leitor_planilha.registros(ws, header_row, hm):
 
             nome = _norm(c('nome'))
             if not nome or nome.upper() in ('NOME', '-', '#N/A', 'NONE'):
@@ -432,8 +421,35 @@ class ImportacaoDiarias:
     # ── Detecção de formato ────────────────────────────────────────────────────
     def _is_formato_colaboradores(self, ws):
         """Retorna True se a planilha usa o formato multi-colaborador."""
-        cell_a1 = _norm(ws.cell(1, 1).value).upper()
-        return 'COLABORADOR' in cell_a1
+        for _rn, row in leitor_planilha.linhas(ws, max_row=1, largura=1):
+            return 'COLABORADOR' in _norm(row[0]).upper()
+        return False
+
+    # ── Cadastros da conta em memória (um hit no BD por processar) ─────────────
+    def _indices_do(self, admin_id):
+        """Funcionários e obras do tenant, carregados uma vez por `processar`.
+
+        Antes cada linha da planilha fazia duas consultas (`ILIKE` do nome do
+        funcionário e da obra/código); a planilha de colaboradores repete os
+        mesmos nomes em todas as linhas do mês."""
+        cache = self.__dict__.setdefault('_indices', {})
+        if admin_id not in cache:
+            from models import Funcionario, Obra
+            from services.indice_entidades import IndiceNomes
+            funcionarios = (Funcionario.query.with_entities(Funcionario.id, Funcionario.nome)
+                            .filter(Funcionario.admin_id == admin_id)
+                            .order_by(Funcionario.id).all())
+            obras = (Obra.query.with_entities(Obra.id, Obra.nome, Obra.codigo)
+                     .filter(Obra.admin_id == admin_id).order_by(Obra.id).all())
+            cache[admin_id] = {
+                'funcionarios': IndiceNomes(funcionarios),
+                'obras': IndiceNomes((o.id, o.nome) for o in obras),
+                'obras_por_codigo': {},
+            }
+            for o in obras:
+                if o.codigo:
+                    cache[admin_id]['obras_por_codigo'].setdefault(o.codigo, (o.id, o.nome))
+        return cache[admin_id]
 
     # ── Busca ou prepara funcionário (usado nos dois formatos) ─────────────────
     def _resolver_funcionario(self, nome, admin_id, valor_diaria=0, valor_va=0, valor_vt=0):
@@ -441,12 +457,9 @@ class ImportacaoDiarias:
         Busca funcionário por nome. Se não encontrado, prepara dict de criação.
         Retorna (func_id_ou_None, nome_normalizado, func_criar, aviso)
         """
-        from models import Funcionario
-        func = (Funcionario.query
-                .filter(Funcionario.nome.ilike(nome), Funcionario.admin_id == admin_id)
-                .first())
-        if func:
-            return func.id, func.nome, False, None
+        achado = self._indices_do(admin_id)['funcionarios'].exato(nome)
+        if achado:
+            return achado[0], achado[1], False, None
         # Não encontrado → será criado no importar()
         aviso = f'Funcionário "{nome}" não encontrado — será criado automaticamente'
         return None, nome.title(), True, aviso
@@ -457,15 +470,14 @@ class ImportacaoDiarias:
         Busca obra por nome/código. Se não encontrada, prepara criação automática.
         Retorna (obra_id_ou_None, obra_nome, obra_criar)
         """
-        from models import Obra
         if not obra_raw:
             return None, '(sem obra)', False
-        obra = (Obra.query
-                .filter(Obra.admin_id == admin_id)
-                .filter((Obra.nome.ilike(obra_raw)) | (Obra.codigo == obra_raw))
-                .first())
-        if obra:
-            return obra.id, obra.nome, False
+        indices = self._indices_do(admin_id)
+        achados = [a for a in (indices['obras'].exato(obra_raw),
+                               indices['obras_por_codigo'].get(obra_raw)) if a]
+        if achados:
+            obra_id, obra_nome = min(achados)
+            return obra_id, obra_nome, False
         # Não encontrada → será criada automaticamente
         return None, obra_raw.title(), True
 
@@ -480,9 +492,9 @@ class ImportacaoDiarias:
         funcionario_nome = None
         em_dados = False
         col_data = col_cc = col_diaria = col_vt = col_va = None
+        largura = 1
 
-        for rn in range(1, ws.max_row + 1):
-            row = [ws.cell(rn, c).value for c in range(1, ws.max_column + 1)]
+        for rn, row in leitor_planilha.linhas(ws, largura=1):
 
             # ── Detecta linha COLABORADOR ──────────────────────────────────────
             primeira = _norm(row[0]).upper()
@@ -507,12 +519,18 @@ class ImportacaoDiarias:
                                    if 'DIÁRIA' in v or 'DIARIA' in v), None)
                 col_vt = next((i for i, v in enumerate(normalized_row) if 'VT' in v), None)
                 col_va = next((i for i, v in enumerate(normalized_row) if 'VA' in v), None)
+                largura = 1 + max(c for c in (col_data, col_cc, col_diaria, col_vt, col_va)
+                                  if c is not None)
                 em_dados = True
                 continue
 
             # ── Processa linha de dados ────────────────────────────────────
             if not em_dados or funcionario_nome is None:
                 continue
+            # Em read_only a linha acaba na última célula preenchida: dia sem
+            # VT/VA vem mais curto que o cabeçalho.
+            if len(row) < largura:
+                row = tuple(row) + (None,) * (largura - len(row))
 
             data_ref = _parse_data(row[col_data] if col_data is not None else None)
             if not data_ref:
@@ -578,9 +596,7 @@ class ImportacaoDiarias:
         hm = _mapear_headers(raw_headers)
         validos, erros = [], []
 
-        for rn in range(header_row + 1, ws.max_row + 1):
-            def c(*keys):
-                return _cel(ws, rn, hm, *keys)
+        for rn, c in leitor_planilha.registros(ws, header_row, hm):
 
             nome = _norm(c('nome_funcionario', 'nome', 'funcionario'))
             if not nome:
@@ -646,6 +662,7 @@ class ImportacaoDiarias:
 
     # ── Entry point ───────────────────────────────────────────────────────────
     def processar(self, ws, admin_id):
+        self._indices = {}
         if self._is_formato_colaboradores(ws):
             return self._processar_colaboradores(ws, admin_id)
         return self._processar_sige(ws, admin_id)
@@ -820,9 +837,7 @@ class ImportacaoAlimentacao:
         hm = _mapear_headers(raw_headers)
         validos, erros = [], []
 
-        for rn in range(header_row + 1, ws.max_row + 1):
-            def c(*keys):
-                return _cel(ws, rn, hm, *keys)
+        for rn, c in leitor_planilha.registros(ws, header_row, hm):
 
             data_ref = _parse_data(c('data'))
             if not data_ref:
@@ -881,36 +896,50 @@ class ImportacaoAlimentacao:
         return validos, erros
 
     def importar(self, rows, admin_id):
-        from models import db, AlimentacaoLancamento
-        from sqlalchemy import text
+        """Cada bloco de `gravacao_lote.LOTE` linhas vai num savepoint, com um
+        INSERT em lote para os lançamentos e outro para as associações. Se o
+        bloco falha, é refeito linha a linha, cada linha no seu savepoint — a
+        linha ruim vira erro e as outras entram, como sempre foi."""
+        from models import db, AlimentacaoLancamento, alimentacao_funcionarios_assoc
+        from services import gravacao_lote
         criados, erros = 0, []
 
-        for row in rows:
+        def _gravar(bloco):
+            ids = gravacao_lote.inserir(AlimentacaoLancamento, [{
+                'data': _parse_data(row['data']),
+                'valor_total': _parse_float(row['valor_total']),
+                'descricao': row['descricao'],
+                'obra_id': row.get('obra_id'),
+                'admin_id': admin_id,
+            } for row in bloco], ids=True)
+            # Associar funcionários (tabela M2M: alimentacao_funcionarios_assoc)
+            gravacao_lote.inserir(alimentacao_funcionarios_assoc, [
+                {'lancamento_id': lid, 'funcionario_id': fid, 'admin_id': admin_id}
+                for row, lid in zip(bloco, ids, strict=True)
+                for fid in row.get('funcionario_ids', [])
+            ], ignorar_conflito=True)
+
+        for bloco in gravacao_lote.em_blocos(rows):
             sp = db.session.begin_nested()
             try:
-                data_ref = _parse_data(row['data'])
-                lanc = AlimentacaoLancamento(
-                    data=data_ref,
-                    valor_total=_parse_float(row['valor_total']),
-                    descricao=row['descricao'],
-                    obra_id=row.get('obra_id'),
-                    admin_id=admin_id,
-                )
-                db.session.add(lanc)
-                db.session.flush()
-
-                # Associar funcionários (tabela M2M: alimentacao_funcionarios_assoc)
-                for fid in row.get('funcionario_ids', []):
-                    db.session.execute(
-                        text('INSERT INTO alimentacao_funcionarios_assoc (lancamento_id, funcionario_id, admin_id) VALUES (:lid, :fid, :aid) ON CONFLICT DO NOTHING'),
-                        {'lid': lanc.id, 'fid': fid, 'aid': admin_id}
-                    )
+                _gravar(bloco)
                 sp.commit()
-                criados += 1
-            except Exception as e:
+                criados += len(bloco)
+                continue
+            except Exception:
                 sp.rollback()
-                erros.append({'linha': row['linha'], 'motivo': str(e)})
+            for row in bloco:
+                sp = db.session.begin_nested()
+                try:
+                    _gravar([row])
+                    sp.commit()
+                    criados += 1
+                except Exception as e:
+                    sp.rollback()
+                    erros.append({'linha': row['linha'], 'motivo': str(e)})
 
+        if criados:
+            gravacao_lote.depois_da_carga(admin_id)
         try:
             db.session.commit()
         except Exception as e:
@@ -944,9 +973,7 @@ class ImportacaoTransporte:
             for c in CategoriaTransporte.query.filter_by(admin_id=admin_id).all()
         }
 
-        for rn in range(header_row + 1, ws.max_row + 1):
-            def c(*keys):
-                return _cel(ws, rn, hm, *keys)
+        for rn, c in leitor_planilha.registros(ws, header_row, hm):
 
             nome = _norm(c('nome_funcionario', 'nome', 'funcionario'))
             if not nome:
@@ -1069,9 +1096,7 @@ class ImportacaoCustos:
         hm = _mapear_headers(raw_headers)
         validos, erros = [], []
 
-        for rn in range(header_row + 1, ws.max_row + 1):
-            def c(*keys):
-                return _cel(ws, rn, hm, *keys)
+        for rn, c in leitor_planilha.registros(ws, header_row, hm):
 
             fornecedor = _norm(c('fornecedor', 'nome', 'empresa'))
             descricao = _norm(c('descricao', 'historico', 'item'))
@@ -1429,8 +1454,11 @@ _CC_OBRA_ALIAS = {
 }
 
 
-def _match_cc_obra(cc, obras_dict):
-    """Retorna obra_id ou None (None = usar obra ADMINISTRATIVO)."""
+def _match_cc_obra(cc, obras_dict, indice=None):
+    """Retorna obra_id ou None (None = usar obra ADMINISTRATIVO).
+
+    `indice`: `IndiceNomes` das obras (chave = obra_id) montado uma vez pela
+    importação — mesmo resultado do extractOne, sem repontuar por linha."""
     if not cc:
         return None
     cc_norm = _normalizar(cc)
@@ -1459,6 +1487,8 @@ def _match_cc_obra(cc, obras_dict):
     # Usa token_set_ratio (não WRatio) com corte alto: evita falso positivo
     # por palavra isolada — ex.: "Gespi - Engenharia" NÃO deve casar com
     # "Soares Picon Engenharia" só porque compartilham "Engenharia".
+    if indice is not None:
+        return indice.acima(cc_norm, 88)
     try:
         from thefuzz import process as fuzz_process, fuzz
         if obras_dict:
@@ -1472,7 +1502,7 @@ def _match_cc_obra(cc, obras_dict):
     return None
 
 
-def _fuzzy_match_entidade(nome_excel, funcionarios, fornecedores):
+def _fuzzy_match_entidade(nome_excel, funcionarios, fornecedores, indice=None):
     """
     Retorna (tipo, id, nome_banco, score) ou (None, None, None, 0).
     tipo = 'funcionario' | 'fornecedor'
@@ -1482,7 +1512,11 @@ def _fuzzy_match_entidade(nome_excel, funcionarios, fornecedores):
 
     funcionarios: list of (id, nome)
     fornecedores: list of (id, nome, razao_social, nome_fantasia)  — aliases opcionais
+    indice: `IndiceEntidades` dessas mesmas listas — a importação monta uma
+            vez e o resultado sai do índice (idêntico ao laço abaixo).
     """
+    if indice is not None:
+        return indice.casar(nome_excel)
     try:
         from thefuzz import fuzz
     except ImportError:
@@ -1803,240 +1837,251 @@ class ImportacaoFluxoCaixa:
         data_inicio / data_fim: date objects para filtrar o período.
         Se ambos None, processa todas as datas do arquivo.
         """
-        import openpyxl
         from datetime import datetime as dt
 
-        wb = openpyxl.load_workbook(arquivo_path_ou_file, data_only=True)
-
-        # Carregar entidades em memória (um hit no BD)
-        from models import Funcionario, Fornecedor, BancoEmpresa
-        funcionarios = [(f.id, f.nome) for f in
-                        Funcionario.query.filter_by(admin_id=admin_id, ativo=True).all()]
-        # Bancos: (id, chave) — chave = nome normalizado sem o prefixo "banco "
-        bancos_match = [(b.id, _normalizar(b.nome_banco).replace('banco ', '').strip())
-                        for b in BancoEmpresa.query.filter_by(admin_id=admin_id, ativo=True).all()]
-        # Fornecedores: tupla (id, nome, razao_social, nome_fantasia) para fuzzy com 3 aliases
-        fornecedores = []
-        for f in Fornecedor.query.filter_by(admin_id=admin_id, ativo=True).all():
-            fornecedores.append((f.id, f.nome or '', f.razao_social or '', f.nome_fantasia or ''))
-
-        # Carregar obras em memória para match fuzzy de CC
-        from models import Obra
-        obras_qs = Obra.query.filter_by(admin_id=admin_id).all()
-        obras_dict = {_normalizar(o.nome): o.id for o in obras_qs}
-
-        # Pre-computar fornecedores MATERIAL com compras no período (para sugestao_apenas_pagamento)
-        # Nota: a query de PedidoCompra é feita DEPOIS de coletar as datas do arquivo
-        # para que, quando o usuário não passar data_inicio/data_fim, seja possível
-        # usar o intervalo real das datas encontradas no arquivo.
-        # Portanto, _forn_com_compras é populado após o primeiro parse das abas.
-        _forn_material_ids = set()
-        _forn_com_compras = set()  # será preenchido após o primeiro loop
-
-        entradas = []
-        saidas_auto = []
-        saidas_manual = []
-        ignorados = []
-        transferencias = []   # transferências internas entre contas
-        primeiro_dia = None   # primeira data com lançamento no arquivo
-        todas_datas = set()   # todas as datas encontradas no arquivo
-
-        def _dentro_periodo(d):
-            if data_inicio and d < data_inicio:
-                return False
-            if data_fim and d > data_fim:
-                return False
-            return True
-
-        # ── Aba Entrada ──────────────────────────────────────────────────────
-        if 'Entrada' in wb.sheetnames:
-            ws_e = wb['Entrada']
-            for row in ws_e.iter_rows(min_row=6, values_only=True):
-                data_val = row[0]
-                if not data_val or not isinstance(data_val, (dt, date)):
-                    continue
-                data_obj = data_val.date() if isinstance(data_val, dt) else data_val
-                todas_datas.add(data_obj)
-                if primeiro_dia is None or data_obj < primeiro_dia:
-                    primeiro_dia = data_obj
-                if not _dentro_periodo(data_obj):
-                    continue
-
-                plano = _norm(row[1]) if row[1] else ''
-                cliente = _norm(row[2]) if row[2] else ''
-                desc = _norm(row[3]) if row[3] else ''
-                cc = _norm(row[4]) if row[4] else ''
-                status_raw = _norm(row[9]) if len(row) > 9 else ''
-                valor = None
-                for i in range(10, min(len(row), 13)):
-                    if row[i] and isinstance(row[i], (int, float)):
-                        valor = float(row[i])
-                        break
-                    elif row[i]:
-                        v = _parse_float(row[i])
-                        if v > 0:
-                            valor = v
+        wb = leitor_planilha.abrir(arquivo_path_ou_file)
+        try:
+            # Carregar entidades em memória (um hit no BD)
+            from models import Funcionario, Fornecedor, BancoEmpresa
+            funcionarios = [(f.id, f.nome) for f in
+                            Funcionario.query.filter_by(admin_id=admin_id, ativo=True).all()]
+            # Bancos: (id, chave) — chave = nome normalizado sem o prefixo "banco "
+            bancos_match = [(b.id, _normalizar(b.nome_banco).replace('banco ', '').strip())
+                            for b in BancoEmpresa.query.filter_by(admin_id=admin_id, ativo=True).all()]
+            # Fornecedores: tupla (id, nome, razao_social, nome_fantasia) para fuzzy com 3 aliases
+            fornecedores = []
+            for f in Fornecedor.query.filter_by(admin_id=admin_id, ativo=True).all():
+                fornecedores.append((f.id, f.nome or '', f.razao_social or '', f.nome_fantasia or ''))
+
+            # Carregar obras em memória para match fuzzy de CC
+            from models import Obra
+            obras_qs = Obra.query.filter_by(admin_id=admin_id).all()
+            obras_dict = {_normalizar(o.nome): o.id for o in obras_qs}
+
+            # Índices do casamento fuzzy: nomes normalizados uma vez, pré-seleção
+            # por token/bigrama e memória por nome distinto (services/indice_entidades).
+            indice_entidades = indice_obras = None
+            try:
+                from services.indice_entidades import IndiceEntidades, IndiceNomes
+                indice_entidades = IndiceEntidades(funcionarios, fornecedores)
+                indice_obras = IndiceNomes((oid, nome) for nome, oid in obras_dict.items())
+            except ImportError:
+                pass
+
+            # Pre-computar fornecedores MATERIAL com compras no período (para sugestao_apenas_pagamento)
+            # Nota: a query de PedidoCompra é feita DEPOIS de coletar as datas do arquivo
+            # para que, quando o usuário não passar data_inicio/data_fim, seja possível
+            # usar o intervalo real das datas encontradas no arquivo.
+            # Portanto, _forn_com_compras é populado após o primeiro parse das abas.
+            _forn_material_ids = set()
+            _forn_com_compras = set()  # será preenchido após o primeiro loop
+
+            entradas = []
+            saidas_auto = []
+            saidas_manual = []
+            ignorados = []
+            transferencias = []   # transferências internas entre contas
+            primeiro_dia = None   # primeira data com lançamento no arquivo
+            todas_datas = set()   # todas as datas encontradas no arquivo
+
+            def _dentro_periodo(d):
+                if data_inicio and d < data_inicio:
+                    return False
+                if data_fim and d > data_fim:
+                    return False
+                return True
+
+            # ── Aba Entrada ──────────────────────────────────────────────────────
+            if 'Entrada' in wb.sheetnames:
+                ws_e = wb['Entrada']
+                for _rn, row in leitor_planilha.linhas(ws_e, min_row=6, largura=13):
+                    data_val = row[0]
+                    if not data_val or not isinstance(data_val, (dt, date)):
+                        continue
+                    data_obj = data_val.date() if isinstance(data_val, dt) else data_val
+                    todas_datas.add(data_obj)
+                    if primeiro_dia is None or data_obj < primeiro_dia:
+                        primeiro_dia = data_obj
+                    if not _dentro_periodo(data_obj):
+                        continue
+
+                    plano = _norm(row[1]) if row[1] else ''
+                    cliente = _norm(row[2]) if row[2] else ''
+                    desc = _norm(row[3]) if row[3] else ''
+                    cc = _norm(row[4]) if row[4] else ''
+                    status_raw = _norm(row[9]) if len(row) > 9 else ''
+                    valor = None
+                    for i in range(10, min(len(row), 13)):
+                        if row[i] and isinstance(row[i], (int, float)):
+                            valor = float(row[i])
                             break
+                        elif row[i]:
+                            v = _parse_float(row[i])
+                            if v > 0:
+                                valor = v
+                                break
+
+                    if not valor:
+                        continue
+
+                    status = 'PAGO' if 'pago' in _normalizar(status_raw) else 'PENDENTE'
+                    obra_id = _match_cc_obra(cc, obras_dict, indice_obras)
+
+                    # Classificar categoria da entrada (Nível 1: plano; Nível 2b: keywords)
+                    cat_ent = _categoria_por_plano(plano)
+                    if cat_ent is None:
+                        cat_ent = _classificar_keywords(desc + ' ' + plano)
+
+                    # Fuzzy match do cliente
+                    _CONF = 85
+                    _SUGG = 40
+                    ent_tipo, _ent_id_raw, ent_nome_banco, ent_score = _fuzzy_match_entidade(
+                        cliente, funcionarios, fornecedores, indice_entidades)
+                    _confirmed_ent = ent_score > _CONF
+                    _suggested_ent = _SUGG < ent_score <= _CONF and _ent_id_raw is not None
+
+                    entradas.append({
+                        'tipo': 'entrada',
+                        'data': str(data_obj),
+                        'plano_contas': plano,
+                        'cliente': cliente,
+                        'descricao': desc,
+                        'cc': cc,
+                        'obra_id': obra_id,
+                        'valor': valor,
+                        'status': status,
+                        'banco_id': _match_banco_coluna(row[5] if len(row) > 5 else '', bancos_match),
+                        'tipo_categoria': cat_ent,
+                        'categoria_fluxo_caixa_id': None,  # será resolvido pela view
+                        'entidade_tipo': ent_tipo if _confirmed_ent else None,
+                        'entidade_id': _ent_id_raw if _confirmed_ent else None,
+                        'entidade_nome_banco': ent_nome_banco if _confirmed_ent else None,
+                        'entidade_nome': ent_nome_banco if _confirmed_ent else None,
+                        'entidade_sugerida_tipo': ent_tipo if _suggested_ent else None,
+                        'entidade_sugerida_id': _ent_id_raw if _suggested_ent else None,
+                        'entidade_sugerida_nome': ent_nome_banco if _suggested_ent else None,
+                        'fuzzy_score': ent_score,
+                    })
 
-                if not valor:
-                    continue
-
-                status = 'PAGO' if 'pago' in _normalizar(status_raw) else 'PENDENTE'
-                obra_id = _match_cc_obra(cc, obras_dict)
-
-                # Classificar categoria da entrada (Nível 1: plano; Nível 2b: keywords)
-                cat_ent = _categoria_por_plano(plano)
-                if cat_ent is None:
-                    cat_ent = _classificar_keywords(desc + ' ' + plano)
-
-                # Fuzzy match do cliente
-                _CONF = 85
-                _SUGG = 40
-                ent_tipo, _ent_id_raw, ent_nome_banco, ent_score = _fuzzy_match_entidade(
-                    cliente, funcionarios, fornecedores)
-                _confirmed_ent = ent_score > _CONF
-                _suggested_ent = _SUGG < ent_score <= _CONF and _ent_id_raw is not None
-
-                entradas.append({
-                    'tipo': 'entrada',
-                    'data': str(data_obj),
-                    'plano_contas': plano,
-                    'cliente': cliente,
-                    'descricao': desc,
-                    'cc': cc,
-                    'obra_id': obra_id,
-                    'valor': valor,
-                    'status': status,
-                    'banco_id': _match_banco_coluna(row[5] if len(row) > 5 else '', bancos_match),
-                    'tipo_categoria': cat_ent,
-                    'categoria_fluxo_caixa_id': None,  # será resolvido pela view
-                    'entidade_tipo': ent_tipo if _confirmed_ent else None,
-                    'entidade_id': _ent_id_raw if _confirmed_ent else None,
-                    'entidade_nome_banco': ent_nome_banco if _confirmed_ent else None,
-                    'entidade_nome': ent_nome_banco if _confirmed_ent else None,
-                    'entidade_sugerida_tipo': ent_tipo if _suggested_ent else None,
-                    'entidade_sugerida_id': _ent_id_raw if _suggested_ent else None,
-                    'entidade_sugerida_nome': ent_nome_banco if _suggested_ent else None,
-                    'fuzzy_score': ent_score,
-                })
-
-        # ── Aba Saída ────────────────────────────────────────────────────────
-        if 'Saída' in wb.sheetnames:
-            ws_s = wb['Saída']
-            for row in ws_s.iter_rows(min_row=6, values_only=True):
-                data_val = row[1]
-                if not data_val or not isinstance(data_val, (dt, date)):
-                    continue
-                data_obj = data_val.date() if isinstance(data_val, dt) else data_val
-                todas_datas.add(data_obj)
-                if primeiro_dia is None or data_obj < primeiro_dia:
-                    primeiro_dia = data_obj
-                if not _dentro_periodo(data_obj):
-                    continue
-
-                plano = _norm(row[2]) if len(row) > 2 and row[2] else ''
-                fornecedor_nome = _norm(row[3]) if len(row) > 3 and row[3] else ''
-                desc = _norm(row[4]) if len(row) > 4 and row[4] else ''
-                cc = _norm(row[5]) if len(row) > 5 and row[5] else ''
-                valor = None
-                for i in range(10, min(len(row), 14)):
-                    if row[i] and isinstance(row[i], (int, float)):
-                        valor = float(row[i])
-                        break
-                    elif row[i]:
-                        v = _parse_float(row[i])
-                        if v > 0:
-                            valor = v
+            # ── Aba Saída ────────────────────────────────────────────────────────
+            if 'Saída' in wb.sheetnames:
+                ws_s = wb['Saída']
+                for _rn, row in leitor_planilha.linhas(ws_s, min_row=6, largura=13):
+                    data_val = row[1]
+                    if not data_val or not isinstance(data_val, (dt, date)):
+                        continue
+                    data_obj = data_val.date() if isinstance(data_val, dt) else data_val
+                    todas_datas.add(data_obj)
+                    if primeiro_dia is None or data_obj < primeiro_dia:
+                        primeiro_dia = data_obj
+                    if not _dentro_periodo(data_obj):
+                        continue
+
+                    plano = _norm(row[2]) if len(row) > 2 and row[2] else ''
+                    fornecedor_nome = _norm(row[3]) if len(row) > 3 and row[3] else ''
+                    desc = _norm(row[4]) if len(row) > 4 and row[4] else ''
+                    cc = _norm(row[5]) if len(row) > 5 and row[5] else ''
+                    valor = None
+                    for i in range(10, min(len(row), 14)):
+                        if row[i] and isinstance(row[i], (int, float)):
+                            valor = float(row[i])
+                            break
+                        elif row[i]:
+                            v = _parse_float(row[i])
+                            if v > 0:
+                                valor = v
+                                break
+
+                    # Determinar status — procurar em colunas restantes
+                    status_raw = ''
+                    for i in range(6, min(len(row), 12)):
+                        cell = _norm(row[i]) if row[i] else ''
+                        if 'pago' in cell.lower() or 'aberto' in cell.lower():
+                            status_raw = cell
                             break
 
-                # Determinar status — procurar em colunas restantes
-                status_raw = ''
-                for i in range(6, min(len(row), 12)):
-                    cell = _norm(row[i]) if row[i] else ''
-                    if 'pago' in cell.lower() or 'aberto' in cell.lower():
-                        status_raw = cell
-                        break
-
-                # Transferência interna → lista própria (não ignorado)
-                if _eh_transferencia_interna(desc + ' ' + plano, valor):
-                    _orig, _dest = _match_bancos_transferencia(
-                        desc + ' ' + plano + ' ' + fornecedor_nome, bancos_match)
-                    transferencias.append({
+                    # Transferência interna → lista própria (não ignorado)
+                    if _eh_transferencia_interna(desc + ' ' + plano, valor):
+                        _orig, _dest = _match_bancos_transferencia(
+                            desc + ' ' + plano + ' ' + fornecedor_nome, bancos_match)
+                        transferencias.append({
+                            'data': str(data_obj),
+                            'fornecedor': fornecedor_nome,
+                            'descricao': desc,
+                            'valor': valor,
+                            'motivo': 'Transferência interna',
+                            'banco_origem_id': _orig,
+                            'banco_destino_id': _dest,
+                        })
+                        continue
+
+                    status = 'PAGO' if 'pago' in _normalizar(status_raw) else 'PENDENTE'
+                    obra_id = _match_cc_obra(cc, obras_dict, indice_obras)
+
+                    # Fuzzy match do fornecedor
+                    _CONF = 85
+                    _SUGG = 40
+                    ent_tipo, _ent_id_raw, ent_nome_banco, ent_score = _fuzzy_match_entidade(
+                        fornecedor_nome, funcionarios, fornecedores, indice_entidades)
+                    _confirmed_ent = ent_score > _CONF
+                    _suggested_ent = _SUGG < ent_score <= _CONF and _ent_id_raw is not None
+                    ent_id = _ent_id_raw if _confirmed_ent else None
+                    obs_fuzzy = None
+                    if not _confirmed_ent and not _suggested_ent and fornecedor_nome:
+                        obs_fuzzy = f'[EXCEL] {fornecedor_nome} — vincular manualmente'
+
+                    texto_busca = (desc + ' ' + fornecedor_nome).strip()
+                    eh_reembolso = _eh_reembolso(desc)
+
+                    # Nível 1: Plano de Contas
+                    cat = _categoria_por_plano(plano)
+
+                    # Nível 2a: Reembolso com contexto
+                    precisa_revisao = False
+                    if cat is None and eh_reembolso:
+                        cat, _ = _classificar_reembolso_contexto(desc)
+                        if cat is None:
+                            precisa_revisao = True
+
+                    # Nível 2b: keywords gerais
+                    if cat is None and not precisa_revisao:
+                        cat = _classificar_keywords(texto_busca)
+                        if cat is None:
+                            precisa_revisao = True
+
+                    banco_id_row = _match_banco_coluna(
+                        row[6] if len(row) > 6 else '', bancos_match)
+                    registro = {
+                        'tipo': 'saida',
                         'data': str(data_obj),
+                        'plano_contas': plano,
                         'fornecedor': fornecedor_nome,
                         'descricao': desc,
+                        'cc': cc,
+                        'obra_id': obra_id,
                         'valor': valor,
-                        'motivo': 'Transferência interna',
-                        'banco_origem_id': _orig,
-                        'banco_destino_id': _dest,
-                    })
-                    continue
-
-                status = 'PAGO' if 'pago' in _normalizar(status_raw) else 'PENDENTE'
-                obra_id = _match_cc_obra(cc, obras_dict)
-
-                # Fuzzy match do fornecedor
-                _CONF = 85
-                _SUGG = 40
-                ent_tipo, _ent_id_raw, ent_nome_banco, ent_score = _fuzzy_match_entidade(
-                    fornecedor_nome, funcionarios, fornecedores)
-                _confirmed_ent = ent_score > _CONF
-                _suggested_ent = _SUGG < ent_score <= _CONF and _ent_id_raw is not None
-                ent_id = _ent_id_raw if _confirmed_ent else None
-                obs_fuzzy = None
-                if not _confirmed_ent and not _suggested_ent and fornecedor_nome:
-                    obs_fuzzy = f'[EXCEL] {fornecedor_nome} — vincular manualmente'
-
-                texto_busca = (desc + ' ' + fornecedor_nome).strip()
-                eh_reembolso = _eh_reembolso(desc)
-
-                # Nível 1: Plano de Contas
-                cat = _categoria_por_plano(plano)
-
-                # Nível 2a: Reembolso com contexto
-                precisa_revisao = False
-                if cat is None and eh_reembolso:
-                    cat, _ = _classificar_reembolso_contexto(desc)
-                    if cat is None:
-                        precisa_revisao = True
-
-                # Nível 2b: keywords gerais
-                if cat is None and not precisa_revisao:
-                    cat = _classificar_keywords(texto_busca)
-                    if cat is None:
-                        precisa_revisao = True
-
-                banco_id_row = _match_banco_coluna(
-                    row[6] if len(row) > 6 else '', bancos_match)
-                registro = {
-                    'tipo': 'saida',
-                    'data': str(data_obj),
-                    'plano_contas': plano,
-                    'fornecedor': fornecedor_nome,
-                    'descricao': desc,
-                    'cc': cc,
-                    'obra_id': obra_id,
-                    'valor': valor,
-                    'status': status,
-                    'banco_id': banco_id_row,
-                    'tipo_categoria': cat,
-                    'eh_reembolso': eh_reembolso,
-                    'entidade_tipo': ent_tipo if _confirmed_ent else None,
-                    'entidade_id': ent_id,
-                    'entidade_nome_banco': ent_nome_banco if _confirmed_ent else None,
-                    'entidade_nome': ent_nome_banco if _confirmed_ent else None,
-                    'entidade_sugerida_tipo': ent_tipo if _suggested_ent else None,
-                    'entidade_sugerida_id': _ent_id_raw if _suggested_ent else None,
-                    'entidade_sugerida_nome': ent_nome_banco if _suggested_ent else None,
-                    'fuzzy_score': ent_score,
-                    'observacoes': obs_fuzzy,
-                    'sugestao_apenas_pagamento': False,  # será ajustado após todos os loops
-                }
-
-                if precisa_revisao:
-                    saidas_manual.append(registro)
-                else:
-                    saidas_auto.append(registro)
+                        'status': status,
+                        'banco_id': banco_id_row,
+                        'tipo_categoria': cat,
+                        'eh_reembolso': eh_reembolso,
+                        'entidade_tipo': ent_tipo if _confirmed_ent else None,
+                        'entidade_id': ent_id,
+                        'entidade_nome_banco': ent_nome_banco if _confirmed_ent else None,
+                        'entidade_nome': ent_nome_banco if _confirmed_ent else None,
+                        'entidade_sugerida_tipo': ent_tipo if _suggested_ent else None,
+                        'entidade_sugerida_id': _ent_id_raw if _suggested_ent else None,
+                        'entidade_sugerida_nome': ent_nome_banco if _suggested_ent else None,
+                        'fuzzy_score': ent_score,
+                        'observacoes': obs_fuzzy,
+                        'sugestao_apenas_pagamento': False,  # será ajustado após todos os loops
+                    }
+
+                    if precisa_revisao:
+                        saidas_manual.append(registro)
+                    else:
+                        saidas_auto.append(registro)
+        finally:
+            wb.close()
 
         # ── Sugestão "Apenas Pagamento" ──────────────────────────────────────────
         # Feita APÓS todos os loops para que todas_datas contenha o intervalo real do arquivo.
@@ -2126,7 +2171,7 @@ class ImportacaoFluxoCaixa:
             'sugestoes': sugestoes_dict,
         }
 
-    def importar(self, dados, admin_id):
+    def importar(self, dados, admin_id, em_lote=True):
         """
         Persiste os registros confirmados no BD.
         dados = {
@@ -2134,6 +2179,18 @@ class ImportacaoFluxoCaixa:
           'saidas': [...],  # combinação de auto + manual já com categorias definidas
           'batch_id': str,
         }
+        'entradas'/'saidas' podem ser qualquer iterável que se possa percorrer
+        mais de uma vez — a confirmação passa `preview_importacao.Linhas`, que
+        lê o preview do banco em lotes. As saídas são percorridas duas vezes.
+
+        `em_lote` (padrão): as linhas vão em blocos de `gravacao_lote.LOTE` —
+        uma consulta de duplicidade por bloco, fornecedores novos num insert
+        só, e GCP/GCF/FluxoCaixa/ContaPagar/ContaReceber em INSERT ... VALUES
+        com os ids de volta para os vínculos (GCF, FluxoCaixa e o ContaPagar
+        do reembolso apontam para o GCP). `em_lote=False` é o caminho antigo,
+        objeto ORM + flush por lançamento — a referência do teste de paridade
+        e do benchmark. Nos dois, tudo-ou-nada: um commit no fim, rollback
+        total em qualquer erro.
         Retorna dict com totais por categoria + contagens.
         """
         import uuid
@@ -2141,6 +2198,7 @@ class ImportacaoFluxoCaixa:
         from decimal import Decimal
         from models import (db, GestaoCustoPai, GestaoCustoFilho, ContaPagar,
                             ContaReceber, FluxoCaixa, Obra)
+        from services import gravacao_lote
 
         batch_id = dados.get('batch_id') or \
             f"import_{dt.now().strftime('%Y%m%d_%H%M')}_{uuid.uuid4().hex[:6]}"
@@ -2156,6 +2214,7 @@ class ImportacaoFluxoCaixa:
         duplicados = 0
         detalhe_entradas = []
         detalhe_saidas = []
+        obras_tocadas = set()
 
         # Garantir obra administrativa
         from datetime import date as _date
@@ -2180,38 +2239,95 @@ class ImportacaoFluxoCaixa:
         # Lookup reverso obra_id → nome para o relatório de detalhe
         _obras_nome_map = {o.id: o.nome for o in Obra.query.filter_by(admin_id=admin_id).all()}
 
-        def _ja_existe_saida(data_str, valor, fornecedor, aid):
-            """Checa chave de não-duplicidade para saídas.
+        def _saidas_existentes(chaves):
+            """Das chaves (fornecedor, valor, data) dadas, as que já existem.
 
             Ignora linhas do PRÓPRIO lote atual: duas despesas legítimas com
             mesmo (fornecedor, valor, data) — ex.: duas diárias iguais no mesmo
             dia — devem AMBAS ser importadas. O dedup serve só para impedir
             reimportar o mesmo arquivo (lote diferente / dados pré-existentes).
+            Uma consulta por bloco, não por linha.
             """
-            existing = GestaoCustoPai.query.filter(
-                GestaoCustoPai.admin_id == aid,
-                GestaoCustoPai.entidade_nome == fornecedor,
-                GestaoCustoPai.valor_total == Decimal(str(valor)),
+            nomes = {c[0] for c in chaves}
+            datas = {c[2] for c in chaves if c[2] is not None}
+            if not datas:
+                return set()
+            return set(db.session.query(
+                GestaoCustoPai.entidade_nome, GestaoCustoPai.valor_total,
+                GestaoCustoFilho.data_referencia,
+            ).join(
+                GestaoCustoFilho, GestaoCustoFilho.pai_id == GestaoCustoPai.id
+            ).filter(
+                GestaoCustoPai.admin_id == admin_id,
+                GestaoCustoPai.entidade_nome.in_(nomes),
+                GestaoCustoFilho.data_referencia.in_(datas),
                 db.or_(GestaoCustoPai.import_batch_id.is_(None),
                        GestaoCustoPai.import_batch_id != batch_id),
-            ).join(
-                GestaoCustoFilho,
-                GestaoCustoFilho.pai_id == GestaoCustoPai.id
+            ).distinct().all())
+
+        def _entradas_existentes(chaves):
+            nomes = {c[0] for c in chaves}
+            datas = {c[2] for c in chaves if c[2] is not None}
+            if not datas:
+                return set()
+            return set(db.session.query(
+                ContaReceber.cliente_nome, ContaReceber.valor_original,
+                ContaReceber.data_emissao,
             ).filter(
-                GestaoCustoFilho.data_referencia == _parse_data(data_str)
-            ).first()
-            return existing is not None
-
-        def _ja_existe_entrada(data_str, valor, cliente, aid):
-            existing = ContaReceber.query.filter(
-                ContaReceber.admin_id == aid,
-                ContaReceber.cliente_nome == cliente,
-                ContaReceber.valor_original == Decimal(str(valor)),
-                ContaReceber.data_emissao == _parse_data(data_str),
+                ContaReceber.admin_id == admin_id,
+                ContaReceber.cliente_nome.in_(nomes),
+                ContaReceber.data_emissao.in_(datas),
                 db.or_(ContaReceber.import_batch_id.is_(None),
                        ContaReceber.import_batch_id != batch_id),
-            ).first()
-            return existing is not None
+            ).distinct().all())
+
+        def _gravar_saidas(pendentes):
+            """Persiste as saídas de um bloco; o GCP recebe o id antes dos filhos."""
+            com_pai = [v for v in pendentes if v['gcp']]
+            if em_lote:
+                ids = gravacao_lote.inserir(GestaoCustoPai, [v['gcp'] for v in com_pai], ids=True)
+            else:
+                ids = []
+                for v in com_pai:
+                    gcp = GestaoCustoPai(**v['gcp'])
+                    db.session.add(gcp)
+                    db.session.flush()
+                    ids.append(gcp.id)
+            for v, gcp_id in zip(com_pai, ids, strict=True):
+                v['gcf']['pai_id'] = gcp_id
+                if v['fc']:
+                    v['fc']['referencia_id'] = gcp_id
+                if v['cp']:
+                    v['cp']['origem_id'] = gcp_id
+            for modelo, chave in ((GestaoCustoFilho, 'gcf'), (FluxoCaixa, 'fc'),
+                                  (ContaPagar, 'cp')):
+                linhas = [v[chave] for v in pendentes if v[chave]]
+                if em_lote:
+                    gravacao_lote.inserir(modelo, linhas)
+                else:
+                    db.session.add_all([modelo(**d) for d in linhas])
+
+        def _gravar_entradas(pendentes):
+            if em_lote:
+                ids = gravacao_lote.inserir(ContaReceber, [v['cr'] for v in pendentes], ids=True)
+            else:
+                ids = []
+                for v in pendentes:
+                    cr = ContaReceber(**v['cr'])
+                    db.session.add(cr)
+                    db.session.flush()
+                    ids.append(cr.id)
+            for v, cr_id in zip(pendentes, ids, strict=True):
+                if v['fc']:
+                    v['fc']['referencia_id'] = cr_id
+            linhas = [v['fc'] for v in pendentes if v['fc']]
+            if em_lote:
+                gravacao_lote.inserir(FluxoCaixa, linhas)
+            else:
+                db.session.add_all([FluxoCaixa(**d) for d in linhas])
+
+        # Um bloco por consulta de duplicidade; no caminho linha a linha, uma linha.
+        tamanho_bloco = gravacao_lote.LOTE if em_lote else 1
 
         try:
             # ── Auto-criar Fornecedores não reconhecidos ─────────────────────
@@ -2268,256 +2384,276 @@ class ImportacaoFluxoCaixa:
                     best_plano = plano_row if plano_row else prev[2]
                     nomes_nao_matched[nome_lower] = (nome, best_cat, best_plano)
 
-            for nome_lower, (nome_original, best_cat, best_plano) in nomes_nao_matched.items():
-                existente = FornecedorModel.query.filter(
+            # Já cadastrados: uma consulta por bloco de nomes (o primeiro id por nome).
+            for bloco in gravacao_lote.em_blocos(list(nomes_nao_matched), tamanho_bloco):
+                for forn_id, nome_lower in db.session.query(
+                    FornecedorModel.id, db.func.lower(FornecedorModel.nome),
+                ).filter(
                     FornecedorModel.admin_id == admin_id,
-                    db.func.lower(FornecedorModel.nome) == nome_lower
-                ).first()
-                if existente:
-                    _fornecedor_id_map[nome_lower] = existente.id
+                    db.func.lower(FornecedorModel.nome).in_(bloco),
+                ).order_by(FornecedorModel.id):
+                    _fornecedor_id_map.setdefault(nome_lower, forn_id)
+
+            novos = []
+            for nome_lower, (nome_original, best_cat, best_plano) in nomes_nao_matched.items():
+                if nome_lower in _fornecedor_id_map:
                     continue
                 tipo = _inferir_tipo_fornecedor(best_cat, nome_lower, best_plano)
                 cnpj_placeholder = f'IMP-{uuid.uuid4().hex[:14]}'
-                novo_forn = FornecedorModel(
-                    nome=nome_original[:100],
-                    cnpj=cnpj_placeholder,
-                    tipo_fornecedor=tipo,
-                    admin_id=admin_id,
-                    ativo=True,
-                )
-                db.session.add(novo_forn)
-                db.session.flush()
-                _fornecedor_id_map[nome_lower] = novo_forn.id
-                n_fornecedores_criados += 1
+                novos.append((nome_lower, {
+                    'nome': nome_original[:100],
+                    'cnpj': cnpj_placeholder,
+                    'tipo_fornecedor': tipo,
+                    'admin_id': admin_id,
+                    'ativo': True,
+                }))
+            if em_lote:
+                ids_novos = gravacao_lote.inserir(FornecedorModel, [d for _, d in novos], ids=True)
+            else:
+                ids_novos = []
+                for _, d in novos:
+                    novo_forn = FornecedorModel(**d)
+                    db.session.add(novo_forn)
+                    db.session.flush()
+                    ids_novos.append(novo_forn.id)
+            for (nome_lower, _), forn_id in zip(novos, ids_novos, strict=True):
+                _fornecedor_id_map[nome_lower] = forn_id
+            n_fornecedores_criados = len(novos)
 
             # ── Saídas ──────────────────────────────────────────────────────
             # Erros em qualquer linha propagam para o bloco externo que faz rollback total
-            for row in dados.get('saidas', []):
-                cat = row.get('tipo_categoria') or 'OUTROS'
-                valor = _parse_decimal(row.get('valor') or 0)
-                fornecedor = row.get('fornecedor') or 'Desconhecido'
-                data_str = row.get('data', '')
-                status = row.get('status', 'PENDENTE')
-                obra_id = _obra_efetiva(row.get('obra_id'))
-                ent_id = row.get('entidade_id')
-                ent_tipo_row = row.get('entidade_tipo')
-                obs = row.get('observacoes') or ''
-                apenas_pagamento = bool(row.get('apenas_pagamento', False))
-
-                # Usar fornecedor auto-criado se entidade não estava vinculada
-                if not ent_id and fornecedor.lower() in _fornecedor_id_map:
-                    ent_id = _fornecedor_id_map[fornecedor.lower()]
-
-                if _ja_existe_saida(data_str, valor, fornecedor, admin_id):
-                    duplicados += 1
-                    continue
+            for bloco in gravacao_lote.em_blocos(dados.get('saidas', []), tamanho_bloco):
+                linhas = []
+                for row in bloco:
+                    valor = _parse_decimal(row.get('valor') or 0)
+                    fornecedor = row.get('fornecedor') or 'Desconhecido'
+                    linhas.append((row, valor, fornecedor,
+                                   _parse_data(row.get('data', ''))))
+                existentes = _saidas_existentes(
+                    [(fornecedor, valor, data_obj) for _, valor, fornecedor, data_obj in linhas])
+
+                pendentes = []
+                for row, valor, fornecedor, data_obj in linhas:
+                    if (fornecedor, valor, data_obj) in existentes:
+                        duplicados += 1
+                        continue
+
+                    cat = row.get('tipo_categoria') or 'OUTROS'
+                    data_str = row.get('data', '')
+                    status = row.get('status', 'PENDENTE')
+                    obra_id = _obra_efetiva(row.get('obra_id'))
+                    ent_id = row.get('entidade_id')
+                    ent_tipo_row = row.get('entidade_tipo')
+                    obs = row.get('observacoes') or ''
+                    apenas_pagamento = bool(row.get('apenas_pagamento', False))
+
+                    # Usar fornecedor auto-criado se entidade não estava vinculada
+                    if not ent_id and fornecedor.lower() in _fornecedor_id_map:
+                        ent_id = _fornecedor_id_map[fornecedor.lower()]
+
+                    banco_id_row = row.get('banco_id') or None
 
-                data_obj = _parse_data(data_str)
-
-                banco_id_row = row.get('banco_id') or None
-
-                cfc_id = row.get('categoria_fluxo_caixa_id') or None
-
-                # Derivar tipo de entidade uma vez, antes de qualquer branch
-                eh_forn_row = ent_tipo_row == 'fornecedor'
-                eh_func_row = ent_tipo_row == 'funcionario'
-                _fc_forn_id = ent_id if (ent_id and eh_forn_row) else None
-                _fc_func_id = ent_id if (ent_id and eh_func_row) else None
-
-                if apenas_pagamento:
-                    # ── Modo "Apenas Pagamento": cria apenas FluxoCaixa, sem GCP/GCF/ContaPagar
-                    fc = FluxoCaixa(
-                        admin_id=admin_id,
-                        data_movimento=data_obj,
-                        tipo_movimento='SAIDA',
-                        categoria=cat,
-                        valor=valor,
-                        descricao=(row.get('descricao') or fornecedor)[:200],
-                        obra_id=obra_id,
-                        observacoes=obs or None,
-                        import_batch_id=batch_id,
-                        banco_id=banco_id_row,
-                        categoria_fluxo_caixa_id=cfc_id,
-                        fornecedor_id=_fc_forn_id,
-                        funcionario_id=_fc_func_id,
-                    )
-                    db.session.add(fc)
-                    n_fluxo += 1
-                    n_apenas_pagamento += 1
-
-                else:
-                    # ── Modo normal: GCP + GCF + FluxoCaixa + ContaPagar (reembolso) ─
-                    status_gcp = 'PAGO' if status == 'PAGO' else 'PENDENTE'
-
-                    # GestaoCustoPai
-                    gcp = GestaoCustoPai(
-                        tipo_categoria=cat,
-                        entidade_nome=fornecedor,
-                        entidade_id=ent_id,
-                        valor_total=Decimal(str(valor)),
-                        status=status_gcp,
-                        data_pagamento=data_obj if status == 'PAGO' else None,
-                        observacoes=obs or None,
-                        admin_id=admin_id,
-                        import_batch_id=batch_id,
-                    )
-                    db.session.add(gcp)
-                    db.session.flush()
+                    cfc_id = row.get('categoria_fluxo_caixa_id') or None
 
-                    # GestaoCustoFilho
-                    gcf = GestaoCustoFilho(
-                        pai_id=gcp.id,
-                        descricao=(row.get('descricao') or fornecedor)[:300],
-                        valor=Decimal(str(valor)),
-                        data_referencia=data_obj,
-                        obra_id=obra_id,
-                        admin_id=admin_id,
-                    )
-                    db.session.add(gcf)
-
-                    # FluxoCaixa para PAGO
-                    if status == 'PAGO':
-                        fc = FluxoCaixa(
-                            admin_id=admin_id,
-                            data_movimento=data_obj,
-                            tipo_movimento='SAIDA',
-                            categoria=cat,
-                            valor=valor,
-                            descricao=(row.get('descricao') or fornecedor)[:200],
-                            obra_id=obra_id,
-                            referencia_id=gcp.id,
-                            referencia_tabela='gestao_custo_pai',
-                            observacoes=obs or None,
-                            import_batch_id=batch_id,
-                            categoria_fluxo_caixa_id=cfc_id,
-                            fornecedor_id=_fc_forn_id,
-                            funcionario_id=_fc_func_id,
-                        )
-                        db.session.add(fc)
+                    # Derivar tipo de entidade uma vez, antes de qualquer branch
+                    eh_forn_row = ent_tipo_row == 'fornecedor'
+                    eh_func_row = ent_tipo_row == 'funcionario'
+                    _fc_forn_id = ent_id if (ent_id and eh_forn_row) else None
+                    _fc_func_id = ent_id if (ent_id and eh_func_row) else None
+
+                    # Linhas com as mesmas colunas em todo o bloco: o INSERT em
+                    # lote é um só por tabela. Os vínculos com o GCP
+                    # (pai_id/referencia_id/origem_id) entram em _gravar_saidas.
+                    v = {'gcp': None, 'gcf': None, 'fc': None, 'cp': None}
+                    fc = {
+                        'admin_id': admin_id,
+                        'data_movimento': data_obj,
+                        'tipo_movimento': 'SAIDA',
+                        'categoria': cat,
+                        'valor': valor,
+                        'descricao': (row.get('descricao') or fornecedor)[:200],
+                        'obra_id': obra_id,
+                        'referencia_id': None,
+                        'referencia_tabela': None,
+                        'observacoes': obs or None,
+                        'import_batch_id': batch_id,
+                        'banco_id': None,
+                        'categoria_fluxo_caixa_id': cfc_id,
+                        'fornecedor_id': _fc_forn_id,
+                        'funcionario_id': _fc_func_id,
+                    }
+
+                    if apenas_pagamento:
+                        # ── Modo "Apenas Pagamento": cria apenas FluxoCaixa, sem GCP/GCF/ContaPagar
+                        fc['banco_id'] = banco_id_row
+                        v['fc'] = fc
                         n_fluxo += 1
+                        n_apenas_pagamento += 1
 
-                    # ContaPagar para reembolsos
-                    if row.get('eh_reembolso') and data_obj:
-                        eh_forn = eh_forn_row
-                        eh_func = eh_func_row
-
-                        obs_parts = []
-                        if cat:
-                            obs_parts.append(f'Categoria: {cat}')
-                        if eh_func and ent_id:
-                            obs_parts.append(f'FUNCIONARIO_ID: {ent_id}')
-                            obs_parts.append(f'Funcionario: {row.get("entidade_nome_banco") or fornecedor}')
-                        if obs:
-                            obs_parts.append(obs)
-                        obs_final = '. '.join(obs_parts) or None
-
-                        cp = ContaPagar(
-                            descricao=f"[REEMBOLSO] {row.get('descricao') or fornecedor}",
-                            valor_original=Decimal(str(valor)),
-                            valor_pago=Decimal(str(valor)) if status == 'PAGO' else Decimal('0'),
-                            saldo=Decimal('0') if status == 'PAGO' else Decimal(str(valor)),
-                            data_emissao=data_obj,
-                            data_vencimento=data_obj,
-                            data_pagamento=data_obj if status == 'PAGO' else None,
-                            status='PAGO' if status == 'PAGO' else 'PENDENTE',
-                            obra_id=obra_id,
-                            admin_id=admin_id,
-                            fornecedor_id=ent_id if (ent_id and eh_forn) else None,
-                            observacoes=obs_final,
-                            origem_tipo='gestao_custo_pai',
-                            origem_id=gcp.id,
-                            import_batch_id=batch_id,
-                        )
-                        db.session.add(cp)
-                        n_conta_pagar += 1
-
-                n_saidas += 1
-                totais[cat] = totais.get(cat, {'count': 0, 'valor': Decimal('0')})
-                totais[cat]['count'] += 1
-                totais[cat]['valor'] += valor
-
-                # Detalhe para o relatório de resultado
-                _obra_oid = _obra_efetiva(obra_id)
-                detalhe_saidas.append({
-                    'data': data_str,
-                    'descricao': (row.get('descricao') or fornecedor)[:120],
-                    'valor': valor,
-                    'categoria': cat,
-                    'obra_nome': _obras_nome_map.get(_obra_oid, '—'),
-                    'modo': 'Manual' if not row.get('tipo_categoria') else 'Auto',
-                })
+                    else:
+                        # ── Modo normal: GCP + GCF + FluxoCaixa + ContaPagar (reembolso) ─
+                        status_gcp = 'PAGO' if status == 'PAGO' else 'PENDENTE'
+
+                        v['gcp'] = {
+                            'tipo_categoria': cat,
+                            'entidade_nome': fornecedor,
+                            'entidade_id': ent_id,
+                            'valor_total': Decimal(str(valor)),
+                            'status': status_gcp,
+                            'data_pagamento': data_obj if status == 'PAGO' else None,
+                            'observacoes': obs or None,
+                            'admin_id': admin_id,
+                            'import_batch_id': batch_id,
+                        }
+                        v['gcf'] = {
+                            'pai_id': None,
+                            'descricao': (row.get('descricao') or fornecedor)[:300],
+                            'valor': Decimal(str(valor)),
+                            'data_referencia': data_obj,
+                            'obra_id': obra_id,
+                            'admin_id': admin_id,
+                        }
+                        obras_tocadas.add(obra_id)
+
+                        # FluxoCaixa para PAGO
+                        if status == 'PAGO':
+                            fc['referencia_tabela'] = 'gestao_custo_pai'
+                            v['fc'] = fc
+                            n_fluxo += 1
+
+                        # ContaPagar para reembolsos
+                        if row.get('eh_reembolso') and data_obj:
+                            eh_forn = eh_forn_row
+                            eh_func = eh_func_row
+
+                            obs_parts = []
+                            if cat:
+                                obs_parts.append(f'Categoria: {cat}')
+                            if eh_func and ent_id:
+                                obs_parts.append(f'FUNCIONARIO_ID: {ent_id}')
+                                obs_parts.append(f'Funcionario: {row.get("entidade_nome_banco") or fornecedor}')
+                            if obs:
+                                obs_parts.append(obs)
+                            obs_final = '. '.join(obs_parts) or None
+
+                            v['cp'] = {
+                                'descricao': f"[REEMBOLSO] {row.get('descricao') or fornecedor}",
+                                'valor_original': Decimal(str(valor)),
+                                'valor_pago': Decimal(str(valor)) if status == 'PAGO' else Decimal('0'),
+                                'saldo': Decimal('0') if status == 'PAGO' else Decimal(str(valor)),
+                                'data_emissao': data_obj,
+                                'data_vencimento': data_obj,
+                                'data_pagamento': data_obj if status == 'PAGO' else None,
+                                'status': 'PAGO' if status == 'PAGO' else 'PENDENTE',
+                                'obra_id': obra_id,
+                                'admin_id': admin_id,
+                                'fornecedor_id': ent_id if (ent_id and eh_forn) else None,
+                                'observacoes': obs_final,
+                                'origem_tipo': 'gestao_custo_pai',
+                                'origem_id': None,
+                                'import_batch_id': batch_id,
+                            }
+                            n_conta_pagar += 1
+
+                    pendentes.append(v)
+                    n_saidas += 1
+                    totais[cat] = totais.get(cat, {'count': 0, 'valor': Decimal('0')})
+                    totais[cat]['count'] += 1
+                    totais[cat]['valor'] += valor
+
+                    # Detalhe para o relatório de resultado
+                    _obra_oid = _obra_efetiva(obra_id)
+                    detalhe_saidas.append({
+                        'data': data_str,
+                        'descricao': (row.get('descricao') or fornecedor)[:120],
+                        'valor': valor,
+                        'categoria': cat,
+                        'obra_nome': _obras_nome_map.get(_obra_oid, '—'),
+                        'modo': 'Manual' if not row.get('tipo_categoria') else 'Auto',
+                    })
+
+                _gravar_saidas(pendentes)
 
             # ── Entradas ─────────────────────────────────────────────────────
-            for row in dados.get('entradas', []):
-                valor = _parse_decimal(row.get('valor') or 0)
-                cliente = row.get('cliente') or 'Desconhecido'
-                data_str = row.get('data', '')
-                status = row.get('status', 'PENDENTE')
-                obra_id = _obra_efetiva(row.get('obra_id'))
-
-                if _ja_existe_entrada(data_str, valor, cliente, admin_id):
-                    duplicados += 1
-                    continue
+            for bloco in gravacao_lote.em_blocos(dados.get('entradas', []), tamanho_bloco):
+                linhas = []
+                for row in bloco:
+                    valor = _parse_decimal(row.get('valor') or 0)
+                    cliente = row.get('cliente') or 'Desconhecido'
+                    linhas.append((row, valor, cliente, _parse_data(row.get('data', ''))))
+                existentes = _entradas_existentes(
+                    [(cliente, valor, data_obj) for _, valor, cliente, data_obj in linhas])
+
+                pendentes = []
+                for row, valor, cliente, data_obj in linhas:
+                    if (cliente, valor, data_obj) in existentes:
+                        duplicados += 1
+                        continue
+
+                    data_str = row.get('data', '')
+                    status = row.get('status', 'PENDENTE')
+                    obra_id = _obra_efetiva(row.get('obra_id'))
+
+                    # Observação estruturada para entradas sem vínculo automático
+                    cr_obs = None
+                    if not row.get('entidade_id'):
+                        cr_obs = f'Vincular manualmente: cliente "{cliente}" não identificado automaticamente.'
+
+                    v = {'cr': {
+                        'cliente_nome': cliente,
+                        'descricao': row.get('descricao') or f'Entrada {data_str}',
+                        'valor_original': Decimal(str(valor)),
+                        'valor_recebido': Decimal(str(valor)) if status == 'PAGO' else Decimal('0'),
+                        'saldo': Decimal('0') if status == 'PAGO' else Decimal(str(valor)),
+                        'data_emissao': data_obj,
+                        'data_vencimento': data_obj,
+                        'data_recebimento': data_obj if status == 'PAGO' else None,
+                        'status': 'RECEBIDO' if status == 'PAGO' else 'PENDENTE',
+                        'obra_id': obra_id,
+                        'admin_id': admin_id,
+                        'observacoes': cr_obs,
+                        'import_batch_id': batch_id,
+                    }, 'fc': None}
 
-                data_obj = _parse_data(data_str)
-
-                # Observação estruturada para entradas sem vínculo automático
-                cr_obs = None
-                if not row.get('entidade_id'):
-                    cr_obs = f'Vincular manualmente: cliente "{cliente}" não identificado automaticamente.'
-
-                cr = ContaReceber(
-                    cliente_nome=cliente,
-                    descricao=row.get('descricao') or f'Entrada {data_str}',
-                    valor_original=Decimal(str(valor)),
-                    valor_recebido=Decimal(str(valor)) if status == 'PAGO' else Decimal('0'),
-                    saldo=Decimal('0') if status == 'PAGO' else Decimal(str(valor)),
-                    data_emissao=data_obj,
-                    data_vencimento=data_obj,
-                    data_recebimento=data_obj if status == 'PAGO' else None,
-                    status='RECEBIDO' if status == 'PAGO' else 'PENDENTE',
-                    obra_id=obra_id,
-                    admin_id=admin_id,
-                    observacoes=cr_obs,
-                    import_batch_id=batch_id,
-                )
-                db.session.add(cr)
-                db.session.flush()
+                    if status == 'PAGO':
+                        cfc_id = row.get('categoria_fluxo_caixa_id') or None
+                        v['fc'] = {
+                            'admin_id': admin_id,
+                            'data_movimento': data_obj,
+                            'tipo_movimento': 'ENTRADA',
+                            'categoria': 'receita',
+                            'valor': valor,
+                            'descricao': (row.get('descricao') or cliente)[:200],
+                            'obra_id': obra_id,
+                            'referencia_id': None,
+                            'referencia_tabela': 'conta_receber',
+                            'import_batch_id': batch_id,
+                            'categoria_fluxo_caixa_id': cfc_id,
+                        }
+                        n_fluxo += 1
 
-                if status == 'PAGO':
-                    cfc_id = row.get('categoria_fluxo_caixa_id') or None
-                    fc = FluxoCaixa(
-                        admin_id=admin_id,
-                        data_movimento=data_obj,
-                        tipo_movimento='ENTRADA',
-                        categoria='receita',
-                        valor=valor,
-                        descricao=(row.get('descricao') or cliente)[:200],
-                        obra_id=obra_id,
-                        referencia_id=cr.id,
-                        referencia_tabela='conta_receber',
-                        import_batch_id=batch_id,
-                        categoria_fluxo_caixa_id=cfc_id,
-                    )
-                    db.session.add(fc)
-                    n_fluxo += 1
-
-                n_entradas += 1
-
-                # Detalhe para o relatório de resultado
-                _obra_oid_e = _obra_efetiva(obra_id)
-                _cfc_id_e = row.get('categoria_fluxo_caixa_id')
-                detalhe_entradas.append({
-                    'data': data_str,
-                    'descricao': (row.get('descricao') or cliente)[:120],
-                    'valor': valor,
-                    'categoria_id': _cfc_id_e,
-                    'tipo_categoria': row.get('tipo_categoria'),
-                    'obra_nome': _obras_nome_map.get(_obra_oid_e, '—'),
-                    'modo': 'Auto' if row.get('tipo_categoria') else 'Manual',
-                    'status': status,
-                })
+                    pendentes.append(v)
+                    n_entradas += 1
+
+                    # Detalhe para o relatório de resultado
+                    _obra_oid_e = _obra_efetiva(obra_id)
+                    _cfc_id_e = row.get('categoria_fluxo_caixa_id')
+                    detalhe_entradas.append({
+                        'data': data_str,
+                        'descricao': (row.get('descricao') or cliente)[:120],
+                        'valor': valor,
+                        'categoria_id': _cfc_id_e,
+                        'tipo_categoria': row.get('tipo_categoria'),
+                        'obra_nome': _obras_nome_map.get(_obra_oid_e, '—'),
+                        'modo': 'Auto' if row.get('tipo_categoria') else 'Manual',
+                        'status': status,
+                    })
+
+                _gravar_entradas(pendentes)
 
+            if em_lote:
+                # O que os listeners de GestaoCustoFilho/dashboard fariam no flush.
+                gravacao_lote.depois_da_carga(admin_id, obras_tocadas)
             db.session.commit()
 
         except Exception as e:
@@ -0,0 +1,223 @@
+"""Índice de nomes para o casamento fuzzy das importações de planilha.
+
+`_fuzzy_match_entidade` comparava, linha a linha, o nome do Excel com TODOS os
+funcionários e depois com os três aliases de TODOS os fornecedores
+(`fuzz.token_set_ratio`, renormalizando o nome do banco a cada comparação):
+uma importação custava linhas × (funcionários + 3 × fornecedores)
+comparações em Python. `_match_cc_obra` fazia o mesmo com as obras, e a
+importação de diárias ia ao banco (`ILIKE`) por linha para achar
+funcionário e obra.
+
+`IndiceNomes` é montado uma vez por importação:
+
+  * os nomes já passam pela normalização da casa (`_normalizar`) e pelo
+    pré-processamento do thefuzz (`full_process`): o que o scorer vê;
+  * um índice invertido por token e por bigrama de caractere seleciona os
+    candidatos antes da pontuação exata;
+  * o resultado é memorizado por nome distinto (o mesmo fornecedor aparece
+    em dezenas de linhas do fluxo de caixa).
+
+A pré-seleção não muda a resposta. Para `token_set_ratio` chegar ao limiar,
+o candidato precisa dividir com o nome tokens inteiros suficientes, ou
+bigramas suficientes (cada edição destrói no máximo dois). As contagens
+saem das listas invertidas e os limites estão em `_pre_selecao`. Quem fica
+de fora com certeza não chega ao limiar. Se ninguém da pré-seleção passa,
+a pontuação vai a todos os candidatos, de uma vez, em C
+(`rapidfuzz.cdist`). Assim a "melhor sugestão" abaixo do limiar, que o
+preview também mostra, continua exata.
+
+Pontuação e desempate são os do laço antigo: score inteiro arredondado
+como o thefuzz devolve, e no empate vence o primeiro da lista.
+"""
+from __future__ import annotations
+
+import unicodedata as _ud
+
+import numpy as np
+
+
+def _normalizar(texto) -> str:
+    """Lowercase sem acentos (= `importacao_excel._normalizar`)."""
+    s = str(texto or '').lower()
+    s = _ud.normalize('NFD', s)
+    s = ''.join(c for c in s if _ud.category(c) != 'Mn')
+    return s.strip()
+
+
+def _processado(texto) -> str:
+    """A string que `thefuzz.fuzz.token_set_ratio(_normalizar(a), ...)` pontua."""
+    from thefuzz import utils
+    return utils.full_process(_normalizar(texto), force_ascii=True)
+
+
+def _bigramas(tokens) -> set:
+    return {t[i:i + 2] for t in tokens for i in range(len(t) - 1)}
+
+
+class IndiceNomes:
+    """Nomes candidatos (com a chave de cada um) prontos para o casamento fuzzy.
+
+    `itens`: sequência de (chave, nome). A ordem é a do desempate."""
+
+    def __init__(self, itens):
+        self.chaves, self.nomes, self._textos, comprimentos = [], [], [], []
+        self._por_token: dict[str, list] = {}
+        self._por_bigrama: dict[str, list] = {}
+        for pos, (chave, nome) in enumerate(itens):
+            texto = _processado(nome)
+            self.chaves.append(chave)
+            self.nomes.append(nome)
+            self._textos.append(texto)
+            tokens = set(texto.split())
+            comprimentos.append(len(' '.join(tokens)))
+            for t in tokens:
+                self._por_token.setdefault(t, []).append(pos)
+            for b in _bigramas(tokens):
+                self._por_bigrama.setdefault(b, []).append(pos)
+        self._por_token = {t: np.asarray(p, dtype=np.int64)
+                           for t, p in self._por_token.items()}
+        self._por_bigrama = {b: np.asarray(p, dtype=np.int64)
+                             for b, p in self._por_bigrama.items()}
+        self._comprimentos = np.asarray(comprimentos, dtype=np.int64)
+        self._memo: dict = {}
+
+    def __len__(self):
+        return len(self.chaves)
+
+    # ── pontuação exata ─────────────────────────────────────────────────────
+    def _pontuar(self, texto: str, posicoes=None) -> np.ndarray:
+        """Scores float (0–100) de `texto` contra os candidatos."""
+        from rapidfuzz import fuzz, process
+        escolhas = self._textos if posicoes is None else [self._textos[p] for p in posicoes]
+        return process.cdist([texto], escolhas, scorer=fuzz.token_set_ratio,
+                             dtype=np.float64)[0]
+
+    def _pre_selecao(self, texto: str, similaridade: float):
+        """Posições (em ordem) cujo `token_set_ratio` com `texto` PODE chegar a
+        `similaridade` (fração de 1). Os limites são necessários, então
+        quem fica de fora com certeza não chega lá.
+
+        Com I = tokens em comum, A/B = tamanho dos tokens que só o nome/só o
+        candidato têm (juntos por espaço) e S = tamanho de I junto, o
+        token_set é o máximo de:
+          * 100, se A ou B é vazio com I não vazio;
+          * 2S/(2S+1+A) e 2S/(2S+1+B);
+          * 1 − d/(2S+2+A+B), com d as inserções/remoções entre as sobras
+            (sem I: 1 − d/(A+B)). Aqui d ≥ |A−B|, e cada edição destrói no
+            máximo dois bigramas distintos das sobras do nome. Então o
+            candidato divide pelo menos (bigramas do nome − os de I − 2·d)
+            bigramas com ele.
+        Tudo sai de contagens nas listas invertidas, sem pontuar ninguém."""
+        tokens = sorted(set(texto.split()))
+        n = len(self)
+        comuns = np.zeros(n, dtype=np.int64)      # |I|
+        letras = np.zeros(n, dtype=np.int64)      # soma dos tamanhos de I
+        bigramas_comuns = np.zeros(n, dtype=np.int64)
+        for t in tokens:
+            postos = self._por_token.get(t)
+            if postos is not None:
+                comuns[postos] += 1
+                letras[postos] += len(t)
+                bigramas_comuns[postos] += max(len(t) - 1, 0)
+        listas = [self._por_bigrama[b] for b in _bigramas(tokens) if b in self._por_bigrama]
+        dividos = (np.bincount(np.concatenate(listas), minlength=n) if listas
+                   else np.zeros(n, dtype=np.int64))
+
+        r = similaridade - 1e-9
+        tem_comum = comuns > 0
+        sep = tem_comum.astype(np.int64)
+        S = np.where(tem_comum, letras + comuns - 1, 0)
+        A = np.maximum(len(' '.join(tokens)) - S - sep, 0)
+        B = np.maximum(self._comprimentos - S - sep, 0)
+        d_max = np.floor((1 - r) * (2 * S + 2 * sep + A + B))
+        pode = tem_comum & ((A == 0) | (B == 0)
+                            | (2 * S >= r * (2 * S + 1 + A))
+                            | (2 * S >= r * (2 * S + 1 + B)))
+        pode |= ((np.abs(A - B) <= d_max)
+                 & (dividos >= len(_bigramas(tokens)) - bigramas_comuns - 2 * d_max)
+                 & (self._comprimentos > 0))
+        return np.flatnonzero(pode).tolist()
+
+    # ── consultas ───────────────────────────────────────────────────────────
+    def melhor(self, nome, limiar: int = 85):
+        """(chave, nome, score) do candidato de maior score inteiro (o do
+        thefuzz); (None, None, 0) se nenhum pontua. Igual ao laço
+        `if score > melhor_score` sobre a lista, só que a pré-seleção
+        resolve sem pontuar todos quando alguém passa de `limiar`."""
+        texto = _processado(nome)
+        memo = ('melhor', texto, limiar)
+        if memo in self._memo:
+            return self._memo[memo]
+        resultado = (None, None, 0)
+        if len(self) and texto:
+            achado = None
+            posicoes = self._pre_selecao(texto, (limiar + 0.5) / 100)
+            if posicoes:
+                scores = np.round(self._pontuar(texto, posicoes))
+                i = int(np.argmax(scores))
+                if scores[i] > limiar:
+                    achado = posicoes[i], int(scores[i])
+            if achado is None:
+                scores = np.round(self._pontuar(texto))
+                i = int(np.argmax(scores))
+                achado = i, int(scores[i])
+            pos, score = achado
+            if score > 0:
+                resultado = (self.chaves[pos], self.nomes[pos], score)
+        self._memo[memo] = resultado
+        return resultado
+
+    def acima(self, nome, corte: float):
+        """Chave do candidato de maior score (float) ≥ `corte`, ou None — o
+        `process.extractOne(..., score_cutoff=corte)` do thefuzz."""
+        texto = _processado(nome)
+        memo = ('acima', texto, corte)
+        if memo in self._memo:
+            return self._memo[memo]
+        chave = None
+        if len(self) and texto:
+            posicoes = self._pre_selecao(texto, corte / 100)
+            if posicoes:
+                scores = self._pontuar(texto, posicoes)
+                i = int(np.argmax(scores))
+                if scores[i] >= corte:
+                    chave = self.chaves[posicoes[i]]
+        self._memo[memo] = chave
+        return chave
+
+    def exato(self, nome):
+        """(chave, nome) do primeiro candidato cujo nome é `nome` sem
+        distinção de caixa (o `ILIKE` sem curinga que as diárias faziam por
+        linha), ou None."""
+        if not hasattr(self, '_por_nome'):
+            self._por_nome = {}
+            for chave, n in zip(self.chaves, self.nomes, strict=True):
+                self._por_nome.setdefault(str(n or '').lower(), (chave, n))
+        return self._por_nome.get(str(nome or '').lower())
+
+
+class IndiceEntidades:
+    """Funcionários e fornecedores de uma importação — o `_fuzzy_match_entidade`
+    com os nomes indexados uma vez.
+
+    funcionarios: list of (id, nome)
+    fornecedores: list of (id, nome, razao_social, nome_fantasia)"""
+
+    LIMIAR = 85
+
+    def __init__(self, funcionarios, fornecedores):
+        self.funcionarios = IndiceNomes((f[0], f[1]) for f in funcionarios)
+        self.fornecedores = IndiceNomes(
+            (f[0], alias) for f in fornecedores for alias in f[1:] if alias)
+
+    def casar(self, nome_excel):
+        """(tipo, id, nome_banco, score) — mesmo contrato de `_fuzzy_match_entidade`."""
+        f_id, f_nome, f_score = self.funcionarios.melhor(nome_excel, self.LIMIAR)
+        if f_score > self.LIMIAR:
+            return 'funcionario', f_id, f_nome, f_score
+        s_id, s_nome, s_score = self.fornecedores.melhor(nome_excel, self.LIMIAR)
+        if s_score > self.LIMIAR:
+            return 'fornecedor', s_id, s_nome, s_score
+        if f_score >= s_score:
+            return 'funcionario', f_id, f_nome, f_score
+        return 'fornecedor', s_id, s_nome, s_score
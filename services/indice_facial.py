@@ -0,0 +1,159 @@
+"""Índice facial em memória, por tenant — busca por vizinho mais próximo
+numa única multiplicação matriz × vetor.
+
+`ponto_views.identificar_por_cache` comparava a foto capturada com cada
+embedding do cache num laço Python: um `np.array` novo e um
+`np.linalg.norm` por par. No pico do ponto (centenas de funcionários numa
+obra, vários embeddings cada) isso entrava na latência de TODA batida.
+
+Aqui cada tenant tem uma matriz float32 contígua (um embedding por linha,
+na ordem do cache), o vetor de ids de funcionário de cada linha e as normas
+ao quadrado pré-computadas. A distância euclidiana sai de
+
+    ‖q − e‖² = ‖q‖² + ‖e‖² − 2·q·e
+
+com o produto `matriz @ q` feito de uma vez. Os embeddings do cache já são
+L2-normalizados (‖e‖ = 1), mas as normas guardadas cobrem cache legado não
+normalizado sem mudar a resposta. Empates desempatam como o laço antigo:
+vence a PRIMEIRA linha na ordem do cache (`argsort` estável).
+
+Instâncias são IMUTÁVEIS: o registro por tenant troca a referência numa
+atribuição só — uma busca concorrente vê o índice antigo inteiro ou o novo
+inteiro, nunca um meio-termo. Os dados vêm do store mapeado
+(`services.store_facial`), e é lá que a troca de UM funcionário é
+incremental (registro no log + lápide); aqui o índice do tenant só é
+remontado quando a versão dele no store muda. Matriz de tenant sem
+alterações pendentes chega como visão do mapa, sem cópia.
+"""
+from __future__ import annotations
+
+import threading
+
+import numpy as np
+
+
+class IndiceFacial:
+    """Embeddings de um tenant: matriz (n, d) float32 + id por linha."""
+
+    __slots__ = ('matriz', 'func_ids', 'descricoes', '_normas2')
+
+    def __init__(self, matriz: np.ndarray, func_ids: np.ndarray,
+                 descricoes: list[str]):
+        self.matriz = np.ascontiguousarray(matriz, dtype=np.float32)
+        self.func_ids = np.asarray(func_ids, dtype=np.int64)
+        self.descricoes = descricoes
+        self._normas2 = np.einsum('ij,ij->i', self.matriz, self.matriz)
+
+    def __len__(self) -> int:
+        return len(self.func_ids)
+
+    @property
+    def total_funcionarios(self) -> int:
+        return len(np.unique(self.func_ids))
+
+    @staticmethod
+    def _linhas(func_id: int, embeddings: list) -> tuple[list, list, list]:
+        """Normaliza as formas de entrada do cache (dict com 'embedding' e
+        'descricao', ou a lista crua de floats do formato antigo)."""
+        vetores, ids, descricoes = [], [], []
+        for emb in embeddings:
+            if isinstance(emb, dict):
+                vetores.append(emb['embedding'])
+                descricoes.append(emb.get('descricao', 'Foto'))
+            else:
+                vetores.append(emb)
+                descricoes.append('Foto')
+            ids.append(func_id)
+        return vetores, ids, descricoes
+
+    @staticmethod
+    def _embeddings_da_entrada(entrada: dict) -> list:
+        embeddings = entrada.get('embeddings') or []
+        if not embeddings and 'embedding' in entrada:
+            embeddings = [{'embedding': entrada['embedding'],
+                           'descricao': 'Foto principal'}]
+        return embeddings
+
+    @classmethod
+    def vazio(cls, dimensao: int = 128) -> 'IndiceFacial':
+        return cls(np.zeros((0, dimensao), dtype=np.float32),
+                   np.zeros(0, dtype=np.int64), [])
+
+    @classmethod
+    def de_entradas(cls, entradas: dict) -> 'IndiceFacial':
+        """Constrói a partir de {func_id: entrada do cache} de UM tenant."""
+        vetores, ids, descricoes = [], [], []
+        for func_id, entrada in entradas.items():
+            v, i, d = cls._linhas(func_id, cls._embeddings_da_entrada(entrada))
+            vetores += v
+            ids += i
+            descricoes += d
+        if not vetores:
+            return cls.vazio()
+        return cls(np.asarray(vetores, dtype=np.float32), ids, descricoes)
+
+    @classmethod
+    def de_cache(cls, cache_data: dict | None, admin_id: int) -> 'IndiceFacial':
+        """Constrói a partir do cache inteiro (`gerar_cache_facial`),
+        filtrando o tenant — mesma comparação int-a-int do laço antigo."""
+        admin_id = int(admin_id) if admin_id is not None else None
+        entradas = {}
+        for func_id, entrada in ((cache_data or {}).get('embeddings') or {}).items():
+            dono = entrada.get('admin_id')
+            if (int(dono) if dono is not None else None) == admin_id:
+                entradas[func_id] = entrada
+        return cls.de_entradas(entradas)
+
+    def distancias(self, embedding) -> np.ndarray:
+        """Distância euclidiana de `embedding` a cada linha do índice."""
+        q = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        d2 = self._normas2 - 2.0 * (self.matriz @ q) + float(q @ q)
+        return np.sqrt(np.maximum(d2, 0.0))
+
+    def buscar(self, embedding, k: int = 1) -> list[tuple[int, float, str]]:
+        """Os `k` funcionários mais próximos: [(func_id, distância, descrição
+        da foto que casou)], do mais próximo ao mais distante. Cada
+        funcionário aparece uma vez, pela sua MELHOR foto."""
+        if not len(self):
+            return []
+        dist = self.distancias(embedding)
+        resultado, vistos = [], set()
+        for linha in np.argsort(dist, kind='stable'):
+            fid = int(self.func_ids[linha])
+            if fid in vistos:
+                continue
+            vistos.add(fid)
+            resultado.append((fid, float(dist[linha]), self.descricoes[linha]))
+            if len(resultado) == k:
+                break
+        return resultado
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Registro por tenant (um por processo/worker)
+# ─────────────────────────────────────────────────────────────────────────────
+
+_indices: dict[int | None, tuple[object, IndiceFacial]] = {}  # admin_id → (origem, índice)
+_lock = threading.Lock()
+
+
+def indice_do_tenant(admin_id: int, origem: object, construir) -> IndiceFacial:
+    """Índice do tenant, reconstruído por `construir()` só quando `origem`
+    muda — a versão do tenant no store facial (`StoreFacial.versao`), que
+    só avança quando um funcionário DESTE tenant é gravado ou removido."""
+    admin_id = int(admin_id) if admin_id is not None else None
+    atual = _indices.get(admin_id)
+    if atual is not None and atual[0] == origem:
+        return atual[1]
+    with _lock:
+        atual = _indices.get(admin_id)
+        if atual is None or atual[0] != origem:
+            atual = (origem, construir())
+            _indices[admin_id] = atual
+    return atual[1]
+
+
+def descartar_indices() -> None:
+    """Esquece todos os índices (cache regenerado por inteiro)."""
+    with _lock:
+        _indices.clear()
@@ -0,0 +1,385 @@
+"""Inferência facial num processo só, servida aos workers por socket Unix.
+
+Cada worker do gunicorn importava `ponto_views`, e o `_async_preload` de lá
+carregava o SFace (TensorFlow/Keras) e o store facial no worker — memória
+de TF em todos os processos, para uma tela (a do ponto) que só alguns
+requests usam. Com `SIGE_INFERENCIA_FACIAL_SOCKET` apontando para um socket,
+o modelo e os índices faciais moram num processo à parte:
+
+    python -m services.inferencia_facial --socket /run/sige/facial.sock
+
+e os workers pedem a ele:
+
+  * `embedding` — o vetor de UMA imagem, o mesmo de
+    `ponto_views.gerar_embedding_otimizado` (Haar + recorte + 112×112 +
+    `model.forward`, via `services.embeddings_lote.preparar_rosto`);
+  * `identificar` — embedding + busca no índice do tenant
+    (`services.indice_facial`), a resposta de `identificar_por_cache`;
+  * `distancias` — distância cosseno da captura a cada foto cadastrada,
+    o que `utils_facial.reconhecer_com_multiplas_fotos` compara;
+  * `saude` — pid, RSS e tamanho médio dos lotes.
+
+Micro-lotes: cada conexão prepara a imagem na sua thread e entrega o rosto
+a UMA thread do modelo, que junta o que chegar em `espera_ms` (até
+`lote_max` rostos) num `model.forward` só — batidas simultâneas no pico da
+manhã viram um lote, não N chamadas serializadas.
+
+Sem o socket configurado, ou com o servidor fora do ar, tudo continua no
+processo como antes: o cliente levanta `InferenciaIndisponivel` e quem
+chamou segue o caminho local. Uma falha de conexão suspende as tentativas
+por `PAUSA_APOS_FALHA` segundos, para a batida não pagar o timeout a cada
+vez.
+
+Protocolo: uma requisição por conexão. Quadro = `>II` (tamanho do
+cabeçalho JSON, tamanho do corpo) + cabeçalho + corpo; imagens vão cruas no
+corpo, com `tamanhos` no cabeçalho quando são várias.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SOCKET_ENV = 'SIGE_INFERENCIA_FACIAL_SOCKET'
+TIMEOUT_ENV = 'SIGE_INFERENCIA_FACIAL_TIMEOUT'
+TIMEOUT_PADRAO = 10.0
+PAUSA_APOS_FALHA = 30.0
+
+LOTE_MAX = 16
+ESPERA_MS = 4.0
+
+_QUADRO = struct.Struct('>II')
+
+
+class InferenciaIndisponivel(Exception):
+    """O serviço não respondeu (não configurado, fora do ar, erro do lado de
+    lá). Quem chama cai na inferência local."""
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Quadros
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _ler_exato(conexao, n: int) -> bytes:
+    partes, faltam = [], n
+    while faltam:
+        parte = conexao.recv(min(faltam, 1 << 20))
+        if not parte:
+            raise ConnectionError('conexão fechada no meio do quadro')
+        partes.append(parte)
+        faltam -= len(parte)
+    return b''.join(partes)
+
+
+def _enviar(conexao, cabecalho: dict, corpo: bytes = b'') -> None:
+    dados = json.dumps(cabecalho).encode()
+    conexao.sendall(_QUADRO.pack(len(dados), len(corpo)) + dados + corpo)
+
+
+def _receber(conexao) -> tuple[dict, bytes]:
+    tam_cabecalho, tam_corpo = _QUADRO.unpack(_ler_exato(conexao, _QUADRO.size))
+    cabecalho = json.loads(_ler_exato(conexao, tam_cabecalho))
+    return cabecalho, _ler_exato(conexao, tam_corpo)
+
+
+def _partes(corpo: bytes, tamanhos) -> list[bytes]:
+    saida, pos = [], 0
+    for t in tamanhos:
+        saida.append(corpo[pos:pos + t])
+        pos += t
+    return saida
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Cliente (workers)
+# ─────────────────────────────────────────────────────────────────────────────
+
+_pausa_ate = 0.0
+
+
+def configurado() -> str | None:
+    """Caminho do socket, se a inferência compartilhada estiver ligada."""
+    return os.environ.get(SOCKET_ENV) or None
+
+
+def _chamar(cabecalho: dict, corpo: bytes = b'') -> dict:
+    global _pausa_ate
+    caminho = configurado()
+    if not caminho:
+        raise InferenciaIndisponivel('inferência compartilhada não configurada')
+    if time.monotonic() < _pausa_ate:
+        raise InferenciaIndisponivel('serviço em pausa após falha recente')
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conexao:
+            conexao.settimeout(float(os.environ.get(TIMEOUT_ENV) or TIMEOUT_PADRAO))
+            conexao.connect(caminho)
+            _enviar(conexao, cabecalho, corpo)
+            resposta, _ = _receber(conexao)
+    except (OSError, ValueError) as e:
+        _pausa_ate = time.monotonic() + PAUSA_APOS_FALHA
+        logger.warning(f"[inferencia-facial] {caminho} indisponível ({e}) — inferência local "
+                       f"pelos próximos {PAUSA_APOS_FALHA:.0f}s")
+        raise InferenciaIndisponivel(str(e)) from e
+    if 'falha' in resposta:
+        raise InferenciaIndisponivel(resposta['falha'])
+    return resposta
+
+
+def embedding(imagem: bytes) -> list | None:
+    """Embedding (não normalizado, como o de `gerar_embedding_otimizado`) da
+    imagem; None se ela não for legível."""
+    return _chamar({'op': 'embedding'}, imagem)['embedding']
+
+
+def identificar(imagem: bytes, admin_id, threshold: float) -> tuple:
+    """(funcionario_id, distância, erro) — o contrato de
+    `ponto_views.identificar_por_cache`."""
+    r = _chamar({'op': 'identificar', 'admin_id': admin_id, 'threshold': threshold}, imagem)
+    return r['funcionario_id'], r['distancia'], r['erro']
+
+
+def distancias(captura: bytes, referencias: list[bytes]) -> list:
+    """Distância cosseno da captura a cada referência (None para referência
+    ilegível). Captura ilegível levanta `ValueError`."""
+    r = _chamar({'op': 'distancias', 'tamanhos': [len(captura)] + [len(x) for x in referencias]},
+                captura + b''.join(referencias))
+    if r['erro']:
+        raise ValueError(r['erro'])
+    return r['distancias']
+
+
+def saude() -> dict:
+    return _chamar({'op': 'saude'})
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Servidor
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _preparar_padrao():
+    """Bytes da imagem → rosto 112×112 em [0, 1] (None se ilegível): o
+    pré-processamento de `gerar_embedding_otimizado`."""
+    import cv2
+
+    from services.embeddings_lote import preparar_rosto
+
+    cascade = cv2.CascadeClassifier(
+        cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+
+    def preparar(imagem: bytes):
+        dados = np.frombuffer(imagem, dtype=np.uint8)
+        img = cv2.imdecode(dados, cv2.IMREAD_COLOR) if dados.size else None
+        return None if img is None else preparar_rosto(img, cascade)
+
+    return preparar
+
+
+class _Lotes:
+    """A thread do modelo: junta os rostos que chegam em `espera_ms` (até
+    `lote_max`) num `forward` só e devolve a cada pedido as suas linhas."""
+
+    def __init__(self, modelo, lote_max: int, espera_ms: float):
+        self.modelo = modelo
+        self.lote_max = lote_max
+        self.espera = espera_ms / 1000.0
+        self.lotes = 0
+        self.rostos = 0
+        self._fila: queue.Queue = queue.Queue()
+        threading.Thread(target=self._laco, name='inferencia-facial-lotes', daemon=True).start()
+
+    def embeddings(self, rostos: list) -> np.ndarray:
+        futuro: Future = Future()
+        self._fila.put((rostos, futuro))
+        return futuro.result()
+
+    def _laco(self) -> None:
+        from services.embeddings_lote import _forward
+
+        while True:
+            pedidos = [self._fila.get()]
+            n = len(pedidos[0][0])
+            prazo = time.monotonic() + self.espera
+            while n < self.lote_max:
+                restante = prazo - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    pedido = self._fila.get(timeout=restante)
+                except queue.Empty:
+                    break
+                pedidos.append(pedido)
+                n += len(pedido[0])
+            try:
+                saida = _forward(self.modelo, np.stack([r for rostos, _f in pedidos for r in rostos]))
+            except Exception as e:
+                for _rostos, futuro in pedidos:
+                    futuro.set_exception(e)
+                continue
+            self.lotes += 1
+            self.rostos += n
+            pos = 0
+            for rostos, futuro in pedidos:
+                futuro.set_result(saida[pos:pos + len(rostos)])
+                pos += len(rostos)
+
+
+class ServidorInferencia(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Uma thread por conexão para ler e preparar a imagem; o modelo numa só
+    (`_Lotes`). `modelo` precisa de `forward(lote)`; `preparar` e
+    `abrir_store` existem para os testes (o padrão é OpenCV e o cache de
+    `gerar_cache_facial`)."""
+
+    daemon_threads = True
+    # O padrão (5) estoura no pico: com a fila de listen cheia o connect do
+    # worker espera até o timeout em vez de entrar no próximo lote.
+    request_queue_size = 128
+
+    def __init__(self, caminho: str, modelo, *, preparar=None, abrir_store=None,
+                 lote_max: int = LOTE_MAX, espera_ms: float = ESPERA_MS):
+        if os.path.exists(caminho):
+            os.unlink(caminho)
+        self.lotes = _Lotes(modelo, lote_max, espera_ms)
+        self.preparar = preparar or _preparar_padrao()
+        if abrir_store is None:
+            from gerar_cache_facial import abrir_store
+        self._abrir_store = abrir_store
+        self._store = None
+        self._store_lock = threading.Lock()
+        super().__init__(caminho, _Atendimento)
+
+    def store(self):
+        """Store facial sincronizado com o disco (aberto na primeira busca:
+        o cache pode nascer depois do servidor)."""
+        with self._store_lock:
+            if self._store is None:
+                self._store = self._abrir_store()
+                return self._store
+            return self._store.sincronizar()
+
+    def embeddings(self, imagens: list[bytes]) -> list:
+        rostos, posicoes = [], []
+        for i, imagem in enumerate(imagens):
+            rosto = self.preparar(imagem)
+            if rosto is not None:
+                posicoes.append(i)
+                rostos.append(rosto)
+        saida = [None] * len(imagens)
+        if rostos:
+            for i, emb in zip(posicoes, self.lotes.embeddings(rostos), strict=True):
+                saida[i] = emb
+        return saida
+
+    # ── operações ────────────────────────────────────────────────────────
+
+    def op_embedding(self, cabecalho, corpo):
+        emb = self.embeddings([corpo])[0]
+        return {'embedding': None if emb is None else emb.tolist()}
+
+    def op_identificar(self, cabecalho, corpo):
+        from services.embeddings_lote import normalizar_l2
+        from services.indice_facial import indice_do_tenant
+
+        store = self.store()
+        if store is None:
+            return {'funcionario_id': None, 'distancia': None, 'erro': 'Cache não disponível'}
+        admin_id = int(cabecalho['admin_id']) if cabecalho.get('admin_id') else None
+        indice = indice_do_tenant(admin_id, store.versao(admin_id),
+                                  lambda: store.indice(admin_id))
+        if not len(indice):
+            return {'funcionario_id': None, 'distancia': None,
+                    'erro': f'Nenhum embedding no cache para admin_id={admin_id}'}
+        emb = self.embeddings([corpo])[0]
+        if emb is None:
+            return {'funcionario_id': None, 'distancia': None,
+                    'erro': 'Nenhum rosto detectado na foto'}
+        fid, dist, _desc = indice.buscar(normalizar_l2(emb[None, :])[0], k=1)[0]
+        if dist <= cabecalho['threshold']:
+            return {'funcionario_id': fid, 'distancia': dist, 'erro': None}
+        return {'funcionario_id': None, 'distancia': dist,
+                'erro': f"Distância {dist:.4f} acima do threshold {cabecalho['threshold']}"}
+
+    def op_distancias(self, cabecalho, corpo):
+        from services.embeddings_lote import normalizar_l2
+
+        captura, *refs = self.embeddings(_partes(corpo, cabecalho['tamanhos']))
+        if captura is None:
+            return {'distancias': None, 'erro': 'Erro ao processar imagem'}
+        q = normalizar_l2(captura[None, :])[0]
+        return {'distancias': [None if r is None else float(1.0 - normalizar_l2(r[None, :])[0] @ q)
+                               for r in refs], 'erro': None}
+
+    def op_saude(self, cabecalho, corpo):
+        import resource
+
+        return {'pid': os.getpid(),
+                'rss_max_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                'lotes': self.lotes.lotes, 'rostos': self.lotes.rostos,
+                'lote_medio': self.lotes.rostos / self.lotes.lotes if self.lotes.lotes else 0.0}
+
+
+class _Atendimento(socketserver.BaseRequestHandler):
+    def handle(self):
+        try:
+            cabecalho, corpo = _receber(self.request)
+        except (OSError, ValueError):
+            return
+        operacao = getattr(self.server, f"op_{cabecalho.get('op')}", None)
+        try:
+            if operacao is None:
+                raise ValueError(f"operação desconhecida: {cabecalho.get('op')!r}")
+            resposta = operacao(cabecalho, corpo)
+        except Exception as e:
+            logger.warning(f"[inferencia-facial] {cabecalho.get('op')} falhou: {e}", exc_info=True)
+            resposta = {'falha': f'{type(e).__name__}: {e}'}
+        try:
+            _enviar(self.request, resposta)
+        except OSError:
+            pass
+
+
+def main(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Serviço de inferência facial (SFace) por socket Unix')
+    parser.add_argument('--socket', default=os.environ.get(SOCKET_ENV),
+                        help=f'caminho do socket (padrão: ${SOCKET_ENV})')
+    parser.add_argument('--lote-max', type=int, default=LOTE_MAX,
+                        help='rostos por model.forward')
+    parser.add_argument('--espera-ms', type=float, default=ESPERA_MS,
+                        help='quanto o lote espera por mais rostos')
+    args = parser.parse_args(argv)
+    if not args.socket:
+        parser.error(f'informe --socket ou {SOCKET_ENV}')
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    from deepface import DeepFace
+
+    t0 = time.perf_counter()
+    modelo = DeepFace.build_model('SFace')
+    servidor = ServidorInferencia(args.socket, modelo, lote_max=args.lote_max,
+                                  espera_ms=args.espera_ms)
+    os.chmod(args.socket, 0o660)
+    logger.info(f"[inferencia-facial] SFace carregado em {time.perf_counter() - t0:.1f}s; "
+                f"ouvindo {args.socket} (lote até {args.lote_max}, espera {args.espera_ms} ms)")
+    try:
+        servidor.serve_forever()
+    finally:
+        servidor.server_close()
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
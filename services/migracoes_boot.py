@@ -0,0 +1,147 @@
+"""Schema no boot: uma query quando está tudo em dia, um processo migrando
+por vez quando não está.
+
+Antes, cada worker do gunicorn (e o `pre_start.py`, e o `import app` de cada
+script) pagava no import do app, com o banco já migrado:
+
+* `db.create_all()` — um `has_table` por modelo, ~200 roundtrips;
+* o import de `migrations.py` (18 mil linhas) só para montar a lista;
+* o DDL da migration_history (`CREATE TABLE/INDEX IF NOT EXISTS` pedem lock
+  na tabela mesmo quando ela existe) e o INSERT das aposentadas;
+* e nenhuma exclusão entre processos: dois workers subindo juntos com uma
+  migração nova rodavam a mesma migração ao mesmo tempo.
+
+Aqui o boot confere com UMA query se as migrações de `ATIVAS` (e as
+aposentadas) estão com `success` no histórico e se toda tabela dos modelos
+existe. Em dia, não importa `migrations` nem chama `create_all`. Se faltar
+algo, pega um advisory lock de sessão — quem chegar depois espera o
+primeiro terminar, confere de novo e, em geral, sai sem fazer nada — e só
+então roda `create_all` + `executar_migracoes()` como antes.
+
+Migração nova entra nos dois lugares: em `migrations._migracoes_ativas()` e
+em `ATIVAS`. O tests/test_migrations_numeracao.py falha se divergirem — sem isso
+o boot acharia o schema em dia e a migração nova nunca rodaria.
+
+Medido na criação (1 CPU, banco de teste migrado, 196 tabelas): o trabalho
+de schema por processo caiu de 0,21 s e ~205 statements (create_all 0,10 s
+com 198 queries, import de migrations 0,11 s, DDL/consulta do histórico)
+para 1 query de ~2 ms.
+"""
+from __future__ import annotations
+
+import contextlib
+import logging
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Números de `migrations._migracoes_ativas()`, na mesma ordem.
+ATIVAS = (
+    20, 27, 33, 34, 35, 36, 37, 38, 39, 40, 41, 42, 43, 44, 45, 46, 47, 48, 49,
+    50, 51, 52, 53, 54, 55, 56, 57, 58, 59, 60, 61, 62, 63, 64, 65, 66, 67,
+    68, 69, 70, 71, 72, 73, 74, 75, 76, 77, 78, 79, 80, 81, 82, 83, 84, 85,
+    86, 87, 88, 89, 90, 91, 92, 93, 94, 95, 96, 97, 98, 99,
+    100, 101, 102, 103, 104, 105, 106, 107, 108, 109, 110, 111, 112, 113, 114,
+    115, 116, 117, 118, 119, 120, 121, 122, 123, 124, 125, 126, 127, 128, 129,
+    130, 131, 132, 133, 134, 135, 137, 138, 139, 140, 141, 142, 143, 144, 145,
+    146, 147, 148, 149,
+    150, 151, 152, 153, 155, 156, 157, 158, 159, 160, 161, 162, 163, 164, 165,
+    166, 167, 168, 169, 170, 171, 172, 173, 174, 175, 176, 177, 178, 179, 180,
+    181, 182, 183, 184, 185, 186, 188, 189, 190, 191, 192, 196, 197, 198, 199,
+    200, 201, 202, 203, 204, 205, 206, 207, 208, 209, 210, 211, 212, 213, 214,
+    215, 216, 217, 218, 219, 220, 221, 222, 223, 224, 225, 226, 230, 231, 232,
+    240, 241, 242, 243, 244, 245, 246, 247,
+    250, 251, 252, 253, 254, 260, 261, 262, 263, 264, 265, 266, 267, 268, 269,
+    277, 278, 279, 280, 281, 282, 283, 284, 285, 286, 288, 289, 296, 297, 298,
+    299,
+    308, 309, 310, 311, 312, 313, 314, 315, 316,
+)
+
+# `migrations._aposentar_migracoes_retiradas()` as grava como 'success'.
+APOSENTADAS = (154,)
+
+# Chave do advisory lock (classe, 0) — mesma convenção de
+# services/saldos_mensais._LOCK_SALDOS.
+_LOCK_MIGRACOES = 7310
+
+
+def pendencias(engine=None) -> tuple[set[int], list[str]]:
+    """(migrações sem 'success', tabelas dos modelos que não existem) numa
+    query só. Sem migration_history (banco novo) tudo está pendente."""
+    from models import db
+
+    engine = engine or db.engine
+    esperadas = [*ATIVAS, *APOSENTADAS]
+    tabelas = sorted(db.metadata.tables)
+    try:
+        with engine.connect() as conn:
+            aplicadas, faltando = conn.execute(text("""
+                SELECT (SELECT coalesce(array_agg(migration_number), '{}')
+                          FROM migration_history
+                         WHERE status = 'success'
+                           AND migration_number = ANY(CAST(:esperadas AS int[]))),
+                       (SELECT coalesce(array_agg(t), '{}')
+                          FROM unnest(CAST(:tabelas AS text[])) AS t
+                         WHERE to_regclass(t) IS NULL)
+            """), {'esperadas': esperadas, 'tabelas': tabelas}).one()
+    except Exception as e:
+        logger.info(f"[migrações] histórico ilegível ({e.__class__.__name__}) — tudo pendente")
+        return set(esperadas), tabelas
+    return set(esperadas) - set(aplicadas), list(faltando)
+
+
+def schema_em_dia(engine=None) -> bool:
+    migracoes, tabelas = pendencias(engine)
+    return not migracoes and not tabelas
+
+
+@contextlib.contextmanager
+def trava_de_migracao(engine=None):
+    """Advisory lock de sessão numa conexão própria: um processo migra, os
+    outros esperam aqui. Liberado na saída; se a conexão quebrar no meio, ela
+    é descartada do pool em vez de voltar com o lock preso."""
+    from models import db
+
+    engine = engine or db.engine
+    conn = engine.connect()
+    try:
+        chave = {'classe': _LOCK_MIGRACOES}
+        if not conn.execute(text('SELECT pg_try_advisory_lock(:classe, 0)'), chave).scalar():
+            logger.info("[migrações] outro processo está migrando — aguardando")
+            conn.execute(text('SELECT pg_advisory_lock(:classe, 0)'), chave)
+        conn.commit()
+        try:
+            yield
+        finally:
+            conn.execute(text('SELECT pg_advisory_unlock(:classe, 0)'), chave)
+            conn.commit()
+    except Exception:
+        conn.invalidate()
+        raise
+    finally:
+        conn.close()
+
+
+def garantir_schema() -> bool:
+    """Leva o schema ao dia se preciso. Devolve True quando rodou
+    `create_all` + migrações, False quando já estava em dia (uma query).
+    Erros de `create_all` sobem para quem chamou (o retry do app.py);
+    `executar_migracoes()` continua registrando falhas no histórico sem
+    levantar, e a migração falha roda de novo no próximo boot."""
+    if schema_em_dia():
+        logger.info("[migrações] schema em dia — nada a fazer")
+        return False
+    from models import db
+
+    with trava_de_migracao():
+        migracoes, tabelas = pendencias()
+        if not migracoes and not tabelas:
+            logger.info("[migrações] outro processo terminou o trabalho — nada a fazer")
+            return False
+        logger.info(f"[migrações] {len(migracoes)} migração(ões) e {len(tabelas)} "
+                    f"tabela(s) pendentes — migrando")
+        db.create_all()
+        from migrations import executar_migracoes
+        executar_migracoes()
+    return True
@@ -175,6 +175,12 @@ def obter_operacional_vigente(obra_id: int, item_id: int, data_referencia: datet
         )
     if not versao:
         return None
+    return versao_como_dict(versao)
+
+
+def versao_como_dict(versao) -> dict:
+    """O dict de `obter_operacional_vigente` para uma versão (objeto ou linha
+    com as mesmas colunas)."""
     return {
         'versao_id': versao.id,
         'composicao': versao.composicao_snapshot or [],
@@ -185,6 +191,21 @@ def obter_operacional_vigente(obra_id: int, item_id: int, data_referencia: datet
     }
 
 
+def escolher_versao_vigente(versoes, data_referencia: datetime):
+    """Entre as `versoes` de UM item (em qualquer ordem), a que
+    `obter_operacional_vigente` escolheria em `data_referencia` — mesma
+    janela, mesmo desempate e mesmo fallback para a 1ª versão — sem ir ao
+    banco. Para quem resolve muitas datas dos mesmos itens de uma vez."""
+    if not versoes:
+        return None
+    na_janela = [v for v in versoes
+                 if v.vigente_de <= data_referencia
+                 and (v.vigente_ate is None or v.vigente_ate > data_referencia)]
+    if na_janela:
+        return max(na_janela, key=lambda v: (v.vigente_de, v.id))
+    return min(versoes, key=lambda v: (v.vigente_de, v.id))
+
+
 def listar_versoes(item_id: int) -> list:
     """Lista todas as versões do item operacional, mais recente primeiro."""
     versoes = (
@@ -0,0 +1,43 @@
+"""Filtros de período sargáveis — mês e ano como intervalo meio-aberto de datas.
+
+`extract('year', coluna) == ano AND extract('month', coluna) == mes` não usa
+índice: o PostgreSQL tem de calcular o extract de cada linha candidata. No
+ponto isso é o histórico inteiro do funcionário (ou da obra) a cada folha,
+mesmo com `(funcionario_id, data)` indexado — o índice só serve à primeira
+coluna. Como intervalo, `data >= primeiro_dia AND data < primeiro_do_seguinte`,
+a faixa inteira vira Index Cond.
+
+Meio-aberto, e não `<= ultimo_dia`: vale igual para coluna `Date` e
+`DateTime` (o último dia inteiro entra, sem depender de 23:59:59) e dispensa
+o `monthrange` em quem só quer filtrar. `limites_mes` continua existindo para
+quem precisa do último dia em si (contar dias úteis, montar o calendário).
+"""
+from __future__ import annotations
+
+import calendar
+from datetime import date
+
+
+def limites_mes(ano: int, mes: int) -> tuple[date, date]:
+    """(primeiro, último) dia do mês — fechado, para contas de calendário."""
+    return date(ano, mes, 1), date(ano, mes, calendar.monthrange(ano, mes)[1])
+
+
+def intervalo_mes(ano: int, mes: int) -> tuple[date, date]:
+    """[primeiro dia do mês, primeiro dia do mês seguinte)."""
+    return date(ano, mes, 1), (date(ano + 1, 1, 1) if mes == 12 else date(ano, mes + 1, 1))
+
+
+def no_intervalo(coluna, inicio, fim_exclusivo) -> tuple:
+    """Condições `inicio <= coluna < fim_exclusivo`, para `.filter(*...)`."""
+    return coluna >= inicio, coluna < fim_exclusivo
+
+
+def no_mes(coluna, ano: int, mes: int) -> tuple:
+    """Condições de `coluna` no mês — o filtro sargável no lugar de extract."""
+    return no_intervalo(coluna, *intervalo_mes(ano, mes))
+
+
+def no_ano(coluna, ano: int) -> tuple:
+    """Condições de `coluna` no ano."""
+    return no_intervalo(coluna, date(ano, 1, 1), date(ano + 1, 1, 1))
@@ -0,0 +1,156 @@
+"""Preview de importação guardado no servidor (staging), chaveado por token.
+
+O preview do fluxo de caixa ia e voltava inteiro pelo navegador: o payload
+classificado, assinado com HMAC, num campo oculto, e na confirmação cada
+linha devolvia ~9 campos de formulário (data/obra/valor/categoria/banco/...)
+que o servidor reaplicava por índice. Um import anual eram dezenas de
+milhares de partes multipart (foi por ela que o app.py subiu o
+`max_form_parts` do Werkzeug para 100.000) e o corpo da confirmação crescia
+com o período.
+
+Aqui o que o `ImportacaoFluxoCaixa.processar` devolve fica numa tabela
+(`preview_importacao_linha`), uma linha do banco por linha do preview, e a
+página só carrega o token. Cada linha ganha um `_sid` estável, que sobrevive
+à reclassificação do loop ao vivo (a linha pode mudar de seção, o `_sid`
+não muda) e é por ele que a confirmação manda só o que o usuário editou.
+
+  * `guardar` — grava as seções e devolve o token (insert em lotes);
+  * `carregar` — as seções inteiras (o loop ao vivo reclassifica tudo);
+  * `substituir` — regrava as seções sob o mesmo token;
+  * `Linhas` — as linhas de uma ou mais seções, lidas do banco em lotes a
+    cada iteração (o `importar` percorre as saídas duas vezes);
+  * `descartar` — apaga o preview depois de importado.
+
+Preview vale `VALIDADE`; os vencidos são apagados a cada `guardar`.
+"""
+from __future__ import annotations
+
+import json
+import uuid
+from datetime import datetime, timedelta
+
+VALIDADE = timedelta(hours=24)
+LOTE = 500
+
+# Linha-marco gravada com todo preview: um upload sem nenhuma linha também
+# tem token válido (a confirmação diz "nada a importar", não "expirado").
+_MARCO = '_preview'
+
+
+def _token_valido(token):
+    return isinstance(token, str) and len(token) == 32 and all(
+        c in '0123456789abcdef' for c in token)
+
+
+def _filtro(token, admin_id, modulo):
+    from models import PreviewImportacaoLinha as P
+    return (P.token == token, P.admin_id == admin_id, P.modulo == modulo,
+            P.criado_em >= datetime.utcnow() - VALIDADE)
+
+
+def _inserir(token, admin_id, modulo, secoes, agora):
+    from sqlalchemy import insert
+    from models import PreviewImportacaoLinha, db
+
+    proximo = 1 + max((r.get('_sid') or 0 for linhas in secoes.values() for r in linhas),
+                      default=0)
+    lote = [{'token': token, 'admin_id': admin_id, 'modulo': modulo,
+             'secao': _MARCO, 'criado_em': agora, 'dados': {}}]
+    for secao, linhas in secoes.items():
+        for r in linhas:
+            if not r.get('_sid'):
+                r['_sid'] = proximo
+                proximo += 1
+            # Mesma serialização do payload assinado (datas viram texto).
+            lote.append({'token': token, 'admin_id': admin_id, 'modulo': modulo,
+                         'secao': secao, 'criado_em': agora,
+                         'dados': json.loads(json.dumps(r, default=str))})
+            if len(lote) >= LOTE:
+                db.session.execute(insert(PreviewImportacaoLinha), lote)
+                lote = []
+    if lote:
+        db.session.execute(insert(PreviewImportacaoLinha), lote)
+
+
+def guardar(admin_id, modulo, secoes, commit=True):
+    """Grava `secoes` ({nome: [dict, ...]}) e devolve o token novo.
+
+    Os dicts ganham `_sid` in-place — o template usa para identificar a linha."""
+    from models import PreviewImportacaoLinha as P, db
+
+    agora = datetime.utcnow()
+    P.query.filter(P.criado_em < agora - VALIDADE).delete(synchronize_session=False)
+    token = uuid.uuid4().hex
+    _inserir(token, admin_id, modulo, secoes, agora)
+    if commit:
+        db.session.commit()
+    return token
+
+
+def existe(token, admin_id, modulo):
+    from models import PreviewImportacaoLinha as P, db
+    if not _token_valido(token):
+        return False
+    return db.session.query(P.query.filter(*_filtro(token, admin_id, modulo)).exists()).scalar()
+
+
+def carregar(token, admin_id, modulo, secoes=()):
+    """{seção: [dict, ...]} na ordem gravada, com `secoes` presentes mesmo
+    vazias; None se o token não existe, é de outro tenant ou venceu."""
+    from models import PreviewImportacaoLinha as P, db
+    if not _token_valido(token):
+        return None
+    linhas = db.session.query(P.secao, P.dados).filter(
+        *_filtro(token, admin_id, modulo)).order_by(P.id).all()
+    if not linhas:
+        return None
+    resultado = {s: [] for s in secoes}
+    for secao, dados in linhas:
+        if secao != _MARCO:
+            resultado.setdefault(secao, []).append(dados)
+    return resultado
+
+
+def substituir(token, admin_id, modulo, secoes, commit=True):
+    """Regrava as seções sob o mesmo token (os `_sid` vêm nos dicts)."""
+    from models import PreviewImportacaoLinha as P, db
+    P.query.filter(P.token == token, P.admin_id == admin_id,
+                   P.modulo == modulo).delete(synchronize_session=False)
+    _inserir(token, admin_id, modulo, secoes, datetime.utcnow())
+    if commit:
+        db.session.commit()
+
+
+def descartar(token, admin_id, modulo, commit=True):
+    from models import PreviewImportacaoLinha as P, db
+    P.query.filter(P.token == token, P.admin_id == admin_id,
+                   P.modulo == modulo).delete(synchronize_session=False)
+    if commit:
+        db.session.commit()
+
+
+class Linhas:
+    """As linhas das `secoes`, na ordem, lidas em lotes de `lote` (paginação
+    pelo id) — a memória é a de um lote, não a do preview.
+
+    Re-iterável: cada `for` volta ao banco. `editar(dados, secao)`, se dado,
+    transforma cada linha antes de entregá-la."""
+
+    def __init__(self, token, admin_id, modulo, secoes, editar=None, lote=LOTE):
+        self.token, self.admin_id, self.modulo = token, admin_id, modulo
+        self.secoes, self.editar, self.lote = tuple(secoes), editar, lote
+
+    def __iter__(self):
+        from models import PreviewImportacaoLinha as P, db
+        filtro = _filtro(self.token, self.admin_id, self.modulo)
+        for secao in self.secoes:
+            ultimo = 0
+            while True:
+                lote = db.session.query(P.id, P.dados).filter(
+                    *filtro, P.secao == secao, P.id > ultimo,
+                ).order_by(P.id).limit(self.lote).all()
+                for _id, dados in lote:
+                    yield self.editar(dados, secao) if self.editar else dados
+                if len(lote) < self.lote:
+                    break
+                ultimo = lote[-1][0]
@@ -0,0 +1,156 @@
+"""Razão agregado — saldos de TODAS as contas do tenant numa consulta.
+
+Balancete (tela, PDF, Excel e o snapshot `BalanceteMensal`), DRE e balanço
+iam conta a conta: `gerar_balancete_mensal` fazia quatro consultas por conta
+(dois `calcular_saldo_conta` + débitos + créditos do mês), a tela e o
+`obter_dados_balancete` traziam as partidas de cada conta três vezes para
+somar em Python, o balanço um `calcular_saldo_conta` por conta do plano e o
+DRE uma varredura de partidas por prefixo (dezessete prefixos por DRE, dois
+DREs por abertura da tela).
+
+Aqui é um GROUP BY `conta_codigo` sobre `PartidaContabil ⋈
+LancamentoContabil` com somas filtradas de débitos e créditos do período; o
+saldo anterior sai do fechamento mensal mantido em `BalanceteMensal`
+(`services.saldos_mensais`), então só as partidas do período — e dos dias
+do mês antes dele — são lidas. Dali saem, para cada conta, saldo anterior,
+movimento e saldo final, e em memória:
+
+  * `Razao.consolidado` — a hierarquia (`conta_pai_codigo`) somada de baixo
+    para cima: conta sintética = própria + descendentes;
+  * `Razao.soma_prefixo` — a soma por prefixo de código, a MESMA semântica
+    do `LIKE 'prefixo%'` que o DRE usava (inclui partidas em código fora do
+    plano, que a hierarquia não alcança).
+
+Valores em `Decimal`, como as consultas antigas devolviam.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import func
+
+ZERO = Decimal('0')
+
+
+@dataclass(frozen=True)
+class Movimento:
+    """Saldo de abertura e movimento de uma conta (ou de um grupo delas)."""
+    saldo_anterior: Decimal = ZERO      # débito − crédito antes do período
+    debitos: Decimal = ZERO
+    creditos: Decimal = ZERO
+
+    def __add__(self, outro: 'Movimento') -> 'Movimento':
+        return Movimento(self.saldo_anterior + outro.saldo_anterior,
+                         self.debitos + outro.debitos,
+                         self.creditos + outro.creditos)
+
+    @property
+    def saldo_final(self) -> Decimal:
+        """Débito − crédito até o fim do período."""
+        return self.saldo_anterior + self.debitos - self.creditos
+
+    def saldo_anterior_natural(self, natureza: str) -> Decimal:
+        """Saldo anterior no sentido da conta: credora inverte o sinal."""
+        return self.saldo_anterior if natureza == 'DEVEDORA' else -self.saldo_anterior
+
+    def saldo_final_natural(self, natureza: str) -> Decimal:
+        return self.saldo_final if natureza == 'DEVEDORA' else -self.saldo_final
+
+
+VAZIO = Movimento()
+
+
+class Razao:
+    """Movimento por código de conta de um tenant num período."""
+
+    def __init__(self, por_conta: dict):
+        self.por_conta = por_conta
+
+    def __getitem__(self, codigo: str) -> Movimento:
+        return self.por_conta.get(codigo, VAZIO)
+
+    def soma_prefixo(self, prefixo: str) -> Movimento:
+        """Soma das contas cujo código começa com `prefixo` (= `LIKE 'p%'`)."""
+        total = VAZIO
+        for codigo, mov in self.por_conta.items():
+            if codigo.startswith(prefixo):
+                total = total + mov
+        return total
+
+    def consolidado(self, contas) -> dict:
+        """{codigo: Movimento} de cada conta de `contas` (PlanoContas) com os
+        descendentes somados, seguindo `conta_pai_codigo`. Partida em código
+        fora do plano fica só na própria linha."""
+        pai = {c.codigo: c.conta_pai_codigo for c in contas}
+        total = {c.codigo: self[c.codigo] for c in contas}
+        for codigo, mov in self.por_conta.items():
+            if codigo not in pai:
+                continue
+            vistos = {codigo}
+            acima = pai[codigo]
+            while acima in pai and acima not in vistos:     # ciclo no plano não trava
+                vistos.add(acima)
+                total[acima] = total[acima] + mov
+                acima = pai[acima]
+        return total
+
+
+def razao_do_periodo(admin_id: int, data_inicio: date | None = None,
+                     data_fim: date | None = None, *,
+                     com_saldo_anterior: bool = True) -> Razao:
+    """Por conta, saldo antes de `data_inicio` e débitos/créditos entre
+    `data_inicio` e `data_fim` (inclusive; sem `data_fim`, não há teto).
+
+    O saldo anterior vem do fechamento mensal (`services.saldos_mensais`):
+    a abertura do mês de `data_inicio` numa consulta, mais os dias desse mês
+    antes de `data_inicio` somados das partidas — nenhuma partida de meses
+    anteriores é lida. Sem `data_inicio`, o período começa no mês de
+    `data_fim` (ou no corrente): `saldo_final` é o acumulado desde sempre, e
+    débitos/créditos são só desse mês.
+
+    `com_saldo_anterior=False` (DRE: só o movimento do período importa) não
+    lê o fechamento; sem `data_inicio`, aí sim, tudo até `data_fim` é
+    movimento."""
+    from models import LancamentoContabil, PartidaContabil, db
+    from services.saldos_mensais import inicio_do_mes, saldos_de_abertura
+
+    abertura = {}
+    varre_desde = data_inicio
+    if com_saldo_anterior:
+        if data_inicio is None:
+            data_inicio = inicio_do_mes(data_fim or date.today())
+        varre_desde = inicio_do_mes(data_inicio)
+        abertura = saldos_de_abertura(admin_id, varre_desde)
+
+    data = LancamentoContabil.data_lancamento
+    debito = PartidaContabil.tipo_partida == 'DEBITO'
+    credito = PartidaContabil.tipo_partida == 'CREDITO'
+
+    def _soma(*filtros):
+        filtros = [f for f in filtros if f is not None]
+        return func.sum(PartidaContabil.valor).filter(*filtros)
+
+    durante = data >= data_inicio if data_inicio else None
+    colunas = [PartidaContabil.conta_codigo, _soma(debito, durante), _soma(credito, durante)]
+    # Dias do mês de data_inicio antes dela (não há quando é dia 1)
+    dias_antes = com_saldo_anterior and varre_desde < data_inicio
+    if dias_antes:
+        colunas += [_soma(debito, data < data_inicio), _soma(credito, data < data_inicio)]
+
+    q = db.session.query(*colunas).join(
+        LancamentoContabil, PartidaContabil.lancamento_id == LancamentoContabil.id
+    ).filter(PartidaContabil.admin_id == admin_id)
+    if varre_desde:
+        q = q.filter(data >= varre_desde)
+    if data_fim:
+        q = q.filter(data <= data_fim)
+
+    por_conta = {conta: Movimento(saldo_anterior=saldo) for conta, saldo in abertura.items()}
+    for codigo, debitos, creditos, *antes in q.group_by(PartidaContabil.conta_codigo):
+        saldo_anterior = abertura.get(codigo, ZERO)
+        if antes:
+            saldo_anterior += (antes[0] or ZERO) - (antes[1] or ZERO)
+        por_conta[codigo] = Movimento(saldo_anterior, debitos or ZERO, creditos or ZERO)
+    return Razao(por_conta)
@@ -8,8 +8,6 @@ import os
 import base64
 from io import BytesIO
 from PIL import Image
-from werkzeug.utils import secure_filename
-from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
@@ -361,83 +359,57 @@ def processar_imagem_base64(file):
 
 def salvar_foto_rdo(file, admin_id, rdo_id):
     """
-    Orquestra todo o fluxo de salvamento:
+    Orquestra o salvamento no request — só o que é barato:
     1. Valida imagem
-    2. Cria estrutura de diretórios
-    3. Salva original
-    4. Gera versão otimizada
-    5. Gera thumbnail
-    6. Retorna caminhos relativos
-    
+    2. Guarda o ORIGINAL no store de blobs (services/blob_store) —
+       endereçado pelo SHA-256, então a mesma foto enviada de novo não
+       ocupa disco
+    3. Retorna a referência do original e `processamento='pendente'`
+
+    A versão otimizada e o thumbnail saem da fila de
+    services/rdo_foto_versoes depois do commit (o encode WebP custava
+    2 a 6 s por foto dentro do request); até lá `arquivo_otimizado` e
+    `thumbnail` ficam None e a foto é servida com o aviso de processamento.
+
     Args:
         file: FileStorage object
         admin_id: ID do admin (multi-tenant)
         rdo_id: ID do RDO
-        
+
     Returns:
         dict: {
-            'arquivo_original': 'caminho/relativo',
-            'arquivo_otimizado': 'caminho/relativo', 
-            'thumbnail': 'caminho/relativo',
+            'arquivo_original': 'uploads/blobs/…',
+            'arquivo_otimizado': None,
+            'thumbnail': None,
+            'processamento': 'pendente',
             'nome_original': 'nome.jpg',
             'tamanho_bytes': 123456
         }
-        
+
     Raises:
         ValueError: Se validação falhar
-        Exception: Se erro no processamento
     """
+    from services.blob_store import blobs, referencia
+
     # 1. Validar
     valido, erro = validar_imagem(file)
     if not valido:
         raise ValueError(erro)
-    
-    # 2. Criar diretórios (multi-tenant)
-    pasta_tenant = os.path.join(UPLOAD_BASE, str(admin_id), str(rdo_id))
-    os.makedirs(pasta_tenant, exist_ok=True)
-    
-    # 3. Gerar nomes seguros
-    nome_seguro = secure_filename(file.filename)
-    base_nome, ext_original = os.path.splitext(nome_seguro)
-    timestamp = int(datetime.now().timestamp())
-    
-    # Caminhos absolutos
-    caminho_original = os.path.join(pasta_tenant, f"{base_nome}_{timestamp}_original{ext_original}")
-    caminho_otimizado = os.path.join(pasta_tenant, f"{base_nome}_{timestamp}.webp")
-    caminho_thumbnail = os.path.join(pasta_tenant, f"{base_nome}_{timestamp}_thumb.webp")
-    
-    # 4. Salvar original
-    file.save(caminho_original)
-    tamanho = os.path.getsize(caminho_original)
-    logger.info(f"📁 Arquivo original salvo: {caminho_original} ({tamanho} bytes)")
-    
-    # 5. Gerar otimizado
-    if not otimizar_para_webp(caminho_original, caminho_otimizado):
-        # Tentar limpar arquivo original se falhou
-        try:
-            os.remove(caminho_original)
-        except:
-            pass
-        raise Exception("Erro ao otimizar imagem")
-    
-    # 6. Gerar thumbnail
-    if not gerar_thumbnail(caminho_original, caminho_thumbnail):
-        # Tentar limpar arquivos se falhou
-        try:
-            os.remove(caminho_original)
-            os.remove(caminho_otimizado)
-        except:
-            pass
-        raise Exception("Erro ao gerar thumbnail")
-    
-    base_relativo = f"uploads/rdo/{admin_id}/{rdo_id}"
+
+    # 2. Store endereçado por conteúdo (escrita atômica, deduplicada)
+    file.seek(0)
+    dados = file.read()
+    chave_original = blobs().guardar(dados)
+    logger.info(f"📁 Original no store de blobs: {chave_original[:12]}… "
+                f"(RDO {rdo_id}, tenant {admin_id}, {len(dados)} bytes)")
 
     resultado = {
-        'arquivo_original': f"{base_relativo}/{os.path.basename(caminho_original)}",
-        'arquivo_otimizado': f"{base_relativo}/{os.path.basename(caminho_otimizado)}",
-        'thumbnail': f"{base_relativo}/{os.path.basename(caminho_thumbnail)}",
+        'arquivo_original': referencia(chave_original),
+        'arquivo_otimizado': None,
+        'thumbnail': None,
+        'processamento': 'pendente',
         'nome_original': file.filename,
-        'tamanho_bytes': tamanho,
+        'tamanho_bytes': len(dados),
         # As chaves base64 vêm SEMPRE (para o caller não precisar saber a
         # política); o VALOR só é preenchido quando não há volume.
         'imagem_original_base64': None,
@@ -452,22 +424,192 @@ def salvar_foto_rdo(file, admin_id, rdo_id):
     # rdo_foto ocupava 16 GB de TOAST, 28.860 de 28.870 fotos já em disco.
     # Nesse caso a pulamos.
     # SEM volume, o disco é EFÊMERO: some no próximo deploy. Aí a base64 no
-    # banco (persistente) é a ÚNICA cópia durável, então voltamos a gravá-la
-    # (comportamento pré-Fase 5) e marcamos armazenamento='banco'. É o
-    # interruptor que torna a otimização segura: ela só liga quando existe
-    # um volume de verdade para onde migrar.
+    # banco (persistente) é a ÚNICA cópia durável e marcamos
+    # armazenamento='banco'. O original vai como veio (sem re-encode); a
+    # otimizada e o thumbnail a fila grava junto com as versões.
     if not volume_persistente_ativo():
-        file.seek(0)
-        dados = processar_imagem_base64(file)
-        resultado['imagem_original_base64'] = dados['imagem_original_base64']
-        resultado['imagem_otimizada_base64'] = dados['imagem_otimizada_base64']
-        resultado['thumbnail_base64'] = dados['thumbnail_base64']
+        with Image.open(BytesIO(dados)) as img:
+            mimetype = Image.MIME.get(img.format, 'image/webp')
+        resultado['imagem_original_base64'] = (
+            f"data:{mimetype};base64,{base64.b64encode(dados).decode('ascii')}")
         resultado['armazenamento'] = 'banco'
-        logger.info("✅ Foto processada (disco + base64 no banco — SEM volume "
+        logger.info("✅ Foto recebida (disco + base64 no banco — SEM volume "
                     "persistente): %s → %s (%s bytes)",
-                    file.filename, resultado['arquivo_otimizado'], tamanho)
+                    file.filename, resultado['arquivo_original'], len(dados))
     else:
-        logger.info("✅ Foto processada (só disco — volume persistente ativo): "
+        logger.info("✅ Foto recebida (só disco — volume persistente ativo): "
                     "%s → %s (%s bytes)",
-                    file.filename, resultado['arquivo_otimizado'], tamanho)
+                    file.filename, resultado['arquivo_original'], len(dados))
     return resultado
+
+
+# ─── Leitura e entrega das fotos ────────────────────────────────────────
+# Telas, portal, PDF e export leem a foto por aqui. A base64 do banco é o
+# ÚLTIMO recurso (foto 'banco' cujo arquivo sumiu com o disco efêmero):
+# decodificar ~400 KB de TEXT a cada PDF, ou embuti-los no HTML de cada
+# tela, era o custo que o store de blobs existe para tirar do caminho.
+
+# tipo → (coluna com a referência do arquivo, coluna base64 equivalente)
+TIPOS_FOTO = {
+    'thumbnail': ('thumbnail', 'thumbnail_base64'),
+    'otimizado': ('arquivo_otimizado', 'imagem_otimizada_base64'),
+    'original': ('arquivo_original', 'imagem_original_base64'),
+}
+
+_ASSINATURAS = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF8', 'image/gif'),
+)
+
+
+def mimetype_da_imagem(cabeca):
+    """Mimetype pelos primeiros bytes — o blob não tem extensão."""
+    if cabeca[:4] == b'RIFF' and cabeca[8:12] == b'WEBP':
+        return 'image/webp'
+    for assinatura, mimetype in _ASSINATURAS:
+        if cabeca.startswith(assinatura):
+            return mimetype
+    return 'image/webp'
+
+
+def resolver_arquivo(caminho):
+    """Arquivo físico de uma referência do banco: blob do store, o caminho
+    de `caminho_absoluto` ou, por último, o legado em static/uploads/
+    (foto gravada antes de UPLOADS_PATH existir). None se nada existir."""
+    from services.blob_store import blobs, chave_da_referencia
+
+    chave = chave_da_referencia(caminho)
+    if chave:
+        return blobs().caminho_local(chave)
+    candidatos = []
+    principal = caminho_absoluto(caminho)
+    if principal:
+        candidatos.append(principal)
+    raiz_legado = os.path.normpath(os.path.join(os.getcwd(), 'static', 'uploads'))
+    legado = os.path.normpath(
+        os.path.join(os.getcwd(), 'static', str(caminho).lstrip('/')))
+    if legado.startswith(raiz_legado + os.sep):
+        candidatos.append(legado)
+    for candidato in candidatos:
+        if os.path.exists(candidato):
+            return candidato
+    return None
+
+
+def _base64_da_coluna(foto, coluna):
+    valor = getattr(foto, coluna, None)  # deferred: só carrega aqui
+    if not valor:
+        return None
+    try:
+        return base64.b64decode(valor.split(',', 1)[1] if valor.startswith('data:') else valor)
+    except Exception:
+        return None
+
+
+def versao_foto(foto, tipo):
+    """Chave do blob da versão `tipo` (None para arquivo legado ou base64).
+    Vai na URL como `?v=`: a URL muda quando o conteúdo muda, e a resposta
+    pode ser cacheada como imutável."""
+    from services.blob_store import chave_da_referencia
+
+    return chave_da_referencia(getattr(foto, TIPOS_FOTO[tipo][0], None))
+
+
+def ler_foto(foto, *tipos):
+    """(bytes, mimetype) da primeira versão disponível entre `tipos` (todas
+    se omitido): primeiro os arquivos — inclusive `caminho_arquivo` —, só
+    depois a base64. (None, None) se nada existir."""
+    from services.blob_store import blobs, chave_da_referencia
+
+    tipos = tipos or ('otimizado', 'original', 'thumbnail')
+    store = blobs()
+    referencias = [getattr(foto, TIPOS_FOTO[t][0], None) for t in tipos]
+    for ref in referencias + [foto.caminho_arquivo]:
+        if not ref:
+            continue
+        chave = chave_da_referencia(ref)
+        try:
+            if chave:
+                dados = store.ler(chave)
+            else:
+                caminho = resolver_arquivo(ref)
+                if not caminho:
+                    continue
+                with open(caminho, 'rb') as fh:
+                    dados = fh.read()
+        except OSError:
+            continue
+        if dados:
+            return dados, mimetype_da_imagem(dados[:12])
+    for tipo in tipos:
+        dados = _base64_da_coluna(foto, TIPOS_FOTO[tipo][1])
+        if dados:
+            return dados, mimetype_da_imagem(dados[:12])
+    return None, None
+
+
+def _resposta_processando():
+    from flask import current_app, send_file
+
+    resposta = send_file(
+        os.path.join(current_app.static_folder, 'images', 'foto-processando.svg'),
+        mimetype='image/svg+xml', etag=False, conditional=False)
+    resposta.headers['Cache-Control'] = 'no-store'
+    return resposta
+
+
+def responder_foto(foto, tipo, versao=None):
+    """Resposta HTTP com a versão `tipo` da foto, ou None se ela não existir.
+
+    ETag forte e GET condicional (304) e Range (206) ficam com o
+    `send_file` do Flask. Blob do store: o ETag é a chave, e quando a URL
+    traz `?v=<chave>` a resposta é imutável por um ano — conteúdo novo
+    muda a URL. Arquivo legado: ETag do Werkzeug (mtime+tamanho), 7 dias.
+    Base64 do banco: ETag do SHA-256 dos bytes, revalidado a cada uso.
+    Versão ainda na fila (services/rdo_foto_versoes): o aviso de
+    processamento, `no-store` — o próximo carregamento já pega a foto.
+    Versão que a fila desistiu de gerar ('falha'): o original.
+    Sempre `private`: a foto é do tenant, não de cache compartilhado.
+    """
+    import hashlib
+
+    from flask import send_file
+    from services.blob_store import blobs, chave_da_referencia
+
+    coluna, coluna_base64 = TIPOS_FOTO[tipo]
+    ref = getattr(foto, coluna, None)
+    chave = chave_da_referencia(ref)
+    if chave:
+        caminho = blobs().caminho_local(chave)
+        if caminho:
+            with open(caminho, 'rb') as fh:
+                mimetype = mimetype_da_imagem(fh.read(12))
+            resposta = send_file(caminho, mimetype=mimetype, etag=chave, conditional=True)
+            resposta.headers['Cache-Control'] = (
+                'private, max-age=31536000, immutable' if versao == chave
+                else 'private, no-cache')
+            return resposta
+    elif ref:
+        caminho = resolver_arquivo(ref)
+        if caminho:
+            with open(caminho, 'rb') as fh:
+                mimetype = mimetype_da_imagem(fh.read(12))
+            resposta = send_file(caminho, mimetype=mimetype, conditional=True)
+            resposta.headers['Cache-Control'] = 'private, max-age=604800'
+            return resposta
+
+    if not ref and foto.processamento == 'pendente':
+        return _resposta_processando()
+    if not ref and foto.processamento == 'falha' and tipo != 'original':
+        # A fila desistiu das versões (original que o PIL não abre, por
+        # exemplo): o original no lugar, sem o `?v=` da versão.
+        return responder_foto(foto, 'original')
+
+    dados = _base64_da_coluna(foto, coluna_base64)
+    if not dados:
+        return None
+    resposta = send_file(BytesIO(dados), mimetype=mimetype_da_imagem(dados[:12]),
+                         etag=hashlib.sha256(dados).hexdigest(), conditional=True)
+    resposta.headers['Cache-Control'] = 'private, no-cache'
+    return resposta
@@ -0,0 +1,339 @@
+"""Versões das fotos de RDO (otimizada e thumbnail) geradas fora do request.
+
+`salvar_foto_rdo` gerava tudo dentro do upload: WebP 1920 px com `method=6`
+(o encode mais lento), thumbnail e, sem volume persistente, mais três
+encodes para a base64 — um deles da foto inteira em WebP q85. Medido na
+criação (1 CPU, JPEG 4032×3024 de 4,5 MB): 2,1 s por foto com volume,
+6,6 s sem volume. O encarregado que sobe as 20 fotos do dia esperava de
+40 s a mais de 2 min com a tela parada.
+
+Agora o upload valida, guarda o original no store de blobs e grava a foto
+com `processamento='pendente'`. O commit acorda a fila deste processo:
+
+* uma thread daemon, que sobe já no boot (a forma do entregador de
+  utils/webhook_dispatcher), reserva lotes de pendentes — `FOR UPDATE
+  SKIP LOCKED` + prazo em `processamento_reservado_ate`, então dois
+  workers do gunicorn não geram a mesma foto, e a foto de um processo que
+  morreu volta sozinha quando a reserva vence;
+* o encode roda num `ProcessPoolExecutor` limitado (`SIGE_FOTOS_WORKERS`,
+  padrão 1 por processo; 0 = na própria thread), com `spawn` pelo mesmo
+  motivo de services/embeddings_lote;
+* as versões entram no store e, sem volume, também na base64 — a cópia
+  que sobrevive ao deploy;
+* até lá, `responder_foto` entrega static/images/foto-processando.svg,
+  sem cache.
+
+WebP com `method=4` em vez de 6: na mesma foto, a otimizada caiu de
+1,43 s para 0,72 s e ficou 9% maior. O thumbnail sai da otimizada, não do
+original. O acervo é regenerado por scripts/rerenderizar_fotos_rdo.py, que
+usa `renderizar` em todos os núcleos.
+"""
+from __future__ import annotations
+
+import base64
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from io import BytesIO
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Os valores de rdo_foto_service.otimizar_para_webp/gerar_thumbnail — aqui
+# para o processo do pool não importar aquele módulo (que mexe no disco no
+# import).
+QUALIDADE_WEBP = 70
+MAX_DIMENSAO = 1920
+THUMBNAIL_SIZE = 200
+METODO_WEBP = 4
+
+# Fila — fotos reservadas por lote, prazo da reserva (bem acima do pior
+# lote: 8 fotos × ~1 s por processo), tentativas e espera entre elas.
+LOTE = 8
+RESERVA_SECONDS = 10 * 60
+MAX_TENTATIVAS = 3
+NOVA_TENTATIVA_SECONDS = 60
+
+# Sem upload novo, a thread ainda varre a cada N segundos: pega a foto de
+# um processo que morreu com a reserva vencida e as novas tentativas.
+_INTERVALO_LACO_SECONDS = 60
+_INFO_PENDENTES = 'rdo_foto_versoes.pendentes'
+
+_app = None
+_acordar = threading.Event()
+_laco_lock = threading.Lock()
+_laco_iniciado = False
+_pool_lock = threading.Lock()
+_pool = None
+
+
+def fila_automatica() -> bool:
+    """`SIGE_FOTOS_FILA=0` desliga a thread: as pendentes só andam com
+    `drenar()` chamado por quem quiser (a suíte de testes, um script)."""
+    return os.environ.get('SIGE_FOTOS_FILA', '1') != '0'
+
+
+def workers() -> int:
+    """Processos do pool de encode; `SIGE_FOTOS_WORKERS=0` gera na thread
+    da fila, sem pool."""
+    return max(0, int(os.environ.get('SIGE_FOTOS_WORKERS') or 1))
+
+
+# ─── Encode (roda no processo do pool) ──────────────────────────────────
+
+def _em_rgb(img):
+    """PNG com transparência sobre fundo branco, como no upload de sempre."""
+    if img.mode in ('RGBA', 'LA', 'P'):
+        fundo = Image.new('RGB', img.size, (255, 255, 255))
+        if img.mode == 'RGBA':
+            fundo.paste(img, mask=img.split()[-1])
+        else:
+            fundo.paste(img)
+        return fundo
+    return img if img.mode == 'RGB' else img.convert('RGB')
+
+
+def _webp(img) -> bytes:
+    saida = BytesIO()
+    img.save(saida, 'WEBP', quality=QUALIDADE_WEBP, method=METODO_WEBP)
+    return saida.getvalue()
+
+
+def renderizar(dados: bytes) -> tuple[bytes, bytes]:
+    """(otimizada, thumbnail) em WebP a partir dos bytes do original: a
+    otimizada cabe em MAX_DIMENSAO, o thumbnail é o quadrado central com
+    THUMBNAIL_SIZE de lado."""
+    with Image.open(BytesIO(dados)) as original:
+        otimizada = _em_rgb(original)
+        otimizada.thumbnail((MAX_DIMENSAO, MAX_DIMENSAO), Image.Resampling.LANCZOS)
+        otimizada.load()  # foto menor que MAX_DIMENSAO: o thumbnail não lê os pixels
+    largura, altura = otimizada.size
+    lado = min(largura, altura)
+    esquerda, topo = (largura - lado) // 2, (altura - lado) // 2
+    miniatura = otimizada.crop((esquerda, topo, esquerda + lado, topo + lado))
+    miniatura.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.Resampling.LANCZOS)
+    return _webp(otimizada), _webp(miniatura)
+
+
+def _executor():
+    global _pool
+    if workers() == 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            import multiprocessing
+
+            _pool = ProcessPoolExecutor(max_workers=workers(),
+                                        mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def _descartar_pool() -> None:
+    """Processo do pool morto (OOM numa foto enorme): o próximo lote sobe
+    outro pool em vez de falhar todas as fotos no pool quebrado."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+# ─── Aplicação no banco ─────────────────────────────────────────────────
+
+def _data_uri(dados: bytes) -> str:
+    return 'data:image/webp;base64,' + base64.b64encode(dados).decode('ascii')
+
+
+def aplicar_versoes(foto, otimizada: bytes, miniatura: bytes) -> None:
+    """Grava as versões no store e as referências na foto (sem commit).
+    Foto 'banco' (sem volume) ganha também a base64 das duas."""
+    from services.blob_store import blobs, referencia
+
+    store = blobs()
+    foto.arquivo_otimizado = referencia(store.guardar(otimizada))
+    foto.thumbnail = referencia(store.guardar(miniatura))
+    if foto.armazenamento == 'banco':
+        foto.imagem_otimizada_base64 = _data_uri(otimizada)
+        foto.thumbnail_base64 = _data_uri(miniatura)
+    foto.processamento = 'pronta'
+    foto.processamento_reservado_ate = None
+
+
+def _registrar_falha(foto, erro, agora: datetime) -> None:
+    foto.processamento_tentativas = (foto.processamento_tentativas or 0) + 1
+    if foto.processamento_tentativas >= MAX_TENTATIVAS:
+        foto.processamento = 'falha'
+        foto.processamento_reservado_ate = None
+    else:
+        foto.processamento_reservado_ate = agora + timedelta(seconds=NOVA_TENTATIVA_SECONDS)
+    logger.warning("[fotos] foto %s: versões não geradas (tentativa %s/%s): %s",
+                   foto.id, foto.processamento_tentativas, MAX_TENTATIVAS, erro)
+
+
+# ─── Fila ───────────────────────────────────────────────────────────────
+
+def _reservar_lote(agora: datetime, limite: int) -> list[int]:
+    """Reserva até `limite` pendentes vencidas e devolve os ids (commit
+    próprio). Mesma mecânica de webhook_dispatcher._reservar_lote."""
+    from sqlalchemy import select, update
+
+    from models import RDOFoto, db
+
+    vencidas = (
+        select(RDOFoto.id)
+        .where(RDOFoto.processamento == 'pendente')
+        .where((RDOFoto.processamento_reservado_ate == None)  # noqa: E711
+               | (RDOFoto.processamento_reservado_ate <= agora))
+        .order_by(RDOFoto.id.asc())
+        .limit(limite)
+        .with_for_update(skip_locked=True)
+    )
+    ids = db.session.execute(
+        update(RDOFoto)
+        .where(RDOFoto.id.in_(vencidas.scalar_subquery()))
+        .values(processamento_reservado_ate=agora + timedelta(seconds=RESERVA_SECONDS))
+        .returning(RDOFoto.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    db.session.commit()
+    return ids
+
+
+def processar_pendentes(limite: int = LOTE) -> int:
+    """Gera as versões de um lote de pendentes, com um commit por foto: a
+    foto apagada no meio do lote (StaleDataError no UPDATE) perde só a
+    própria gravação. Devolve quantas fotos foram tentadas (prontas ou com
+    falha)."""
+    from models import RDOFoto, db
+    from services.rdo_foto_service import ler_foto
+
+    agora = datetime.utcnow()
+    try:
+        ids = _reservar_lote(agora, limite)
+        if not ids:
+            return 0
+        fotos = RDOFoto.query.filter(RDOFoto.id.in_(ids)).order_by(RDOFoto.id.asc()).all()
+    except Exception:
+        logger.exception("[fotos] erro ao reservar pendentes")
+        db.session.rollback()
+        return 0
+
+    def gravar(foto_id, mudanca, *args) -> bool:
+        try:
+            mudanca(*args)
+            db.session.commit()
+            return True
+        except Exception:
+            # A reserva continua valendo: a foto volta a vencer sozinha.
+            logger.exception("[fotos] erro ao gravar a foto %s", foto_id)
+            db.session.rollback()
+            return False
+
+    pool = _executor()
+    em_voo = []
+    for foto in fotos:
+        dados, _mimetype = ler_foto(foto, 'original')
+        if not dados:
+            gravar(foto.id, _registrar_falha, foto, 'original não encontrado', agora)
+            continue
+        em_voo.append((foto.id, foto, pool.submit(renderizar, dados) if pool else dados))
+
+    prontas = 0
+    for foto_id, foto, trabalho in em_voo:
+        try:
+            versoes = trabalho.result() if pool else renderizar(trabalho)
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                _descartar_pool()
+            gravar(foto_id, _registrar_falha, foto, e, agora)
+            continue
+        prontas += gravar(foto_id, aplicar_versoes, foto, *versoes)
+    logger.info("[fotos] lote de %d foto(s): %d pronta(s)", len(fotos), prontas)
+    return len(fotos)
+
+
+def drenar(limite: int = LOTE) -> int:
+    """Processa lotes até não sobrar pendente vencida. Devolve o total."""
+    total = 0
+    while True:
+        n = processar_pendentes(limite)
+        total += n
+        if n < limite:
+            return total
+
+
+def _volta(app) -> None:
+    """Uma volta da fila: espera o aviso (ou o intervalo) e drena."""
+    try:
+        _acordar.wait(_INTERVALO_LACO_SECONDS)
+        _acordar.clear()
+        with app.app_context():
+            drenar()
+    except Exception:
+        logger.exception("[fotos] erro na fila de versões — continuando")
+
+
+def _laco(app):
+    logger.info("[fotos] fila de versões iniciada (workers=%d, lote=%d, intervalo=%ds)",
+                workers(), LOTE, _INTERVALO_LACO_SECONDS)
+    while True:
+        _volta(app)
+
+
+def iniciar_laco(app) -> bool:
+    """Sobe a thread da fila deste processo (idempotente) e a faz varrer
+    já. Devolve True se uma nova thread foi iniciada; False se já estava
+    rodando ou se a fila está desligada."""
+    global _laco_iniciado
+    if not fila_automatica():
+        return False
+    with _laco_lock:
+        iniciada = not _laco_iniciado
+        if iniciada:
+            threading.Thread(target=_laco, args=(app,), name='rdo-foto-versoes',
+                             daemon=True).start()
+            _laco_iniciado = True
+    _acordar.set()
+    return iniciada
+
+
+def acordar() -> None:
+    """Chama a fila deste processo (subindo a thread se preciso)."""
+    if _app is not None:
+        iniciar_laco(_app)
+
+
+def _anotar(session, _flush_ctx):
+    from models import RDOFoto
+
+    if any(isinstance(obj, RDOFoto) and obj.processamento == 'pendente'
+           for obj in session.new):
+        session.info[_INFO_PENDENTES] = True
+
+
+def _acordar_fila(session):
+    if session.info.pop(_INFO_PENDENTES, None):
+        acordar()
+
+
+def instalar_fila(app) -> None:
+    """Listeners na `db.session`: o flush que insere foto pendente anota em
+    `session.info`; o commit acorda a fila — antes dele a thread não veria
+    a linha. E a thread sobe já no boot, como o entregador de webhooks: a
+    pendente de um processo que morreu (ou de antes do deploy) volta quando
+    a reserva vence, sem esperar o próximo upload. Idempotente."""
+    global _app
+    from sqlalchemy import event
+
+    from models import db
+
+    _app = app
+    if not event.contains(db.session, 'after_flush', _anotar):
+        event.listen(db.session, 'after_flush', _anotar)
+    if not event.contains(db.session, 'after_commit', _acordar_fila):
+        event.listen(db.session, 'after_commit', _acordar_fila)
+    iniciar_laco(app)
@@ -68,8 +68,9 @@ def materializar_fotos_rdo(rdo, admin_id, dia, fotos, base=None, prefixo_log='FF
     imagens da pasta em ordem numérica, com legenda vazia — assim dias sem legenda
     também importam as fotos.
 
-    Reusa `salvar_foto_rdo` (mesma otimização WebP + base64 do upload da tela), de
-    modo que a foto fica persistida no banco (sobrevive a deploy/restart). Fotos
+    Reusa `salvar_foto_rdo` (mesmo store de blobs + base64 do upload da tela, com
+    as versões WebP geradas pela fila depois do commit), de modo que a foto fica
+    persistida no banco (sobrevive a deploy/restart). Fotos
     ausentes na pasta viram warning — NÃO quebram o import. Retorna nº de fotos
     criadas.
 
@@ -117,7 +118,7 @@ def materializar_fotos_rdo(rdo, admin_id, dia, fotos, base=None, prefixo_log='FF
             admin_id=admin_id, rdo_id=rdo.id,
             # campos legados NOT NULL
             nome_arquivo=res['nome_original'],
-            caminho_arquivo=res['arquivo_otimizado'],
+            caminho_arquivo=res['arquivo_original'],
             legenda=legenda, descricao=legenda,
             # v9.0 (arquivos físicos, backup)
             arquivo_original=res['arquivo_original'],
@@ -133,6 +134,8 @@ def materializar_fotos_rdo(rdo, admin_id, dia, fotos, base=None, prefixo_log='FF
             imagem_otimizada_base64=res.get('imagem_otimizada_base64'),
             thumbnail_base64=res.get('thumbnail_base64'),
             armazenamento=res.get('armazenamento', 'disco'),
+            # otimizada e thumbnail saem da fila depois do commit
+            processamento=res.get('processamento', 'pronta'),
         ))
         criadas += 1
     return criadas
@@ -92,38 +92,12 @@ def _logo_image(config, max_w=110, max_h=42):
 
 
 def _foto_image(foto, max_w=255, max_h=160):
-    """Renderiza uma RDOFoto em Image. Prefere a versão otimizada
-    (1200px) → thumbnail (300px) → original → caminho_arquivo no disco.
-    Mantém aspect ratio."""
-    raw = None
-    for attr in ('imagem_otimizada_base64', 'thumbnail_base64', 'imagem_original_base64'):
-        val = (getattr(foto, attr, None) or '').strip()
-        if val:
-            raw = val
-            break
-    data = None
-    if raw:
-        raw = re.sub(r'^data:image/[^;]+;base64,', '', raw)
-        try:
-            data = base64.b64decode(raw)
-        except Exception:
-            data = None
-    if not data and foto.caminho_arquivo:
-        # Fallback: ler do disco (caminho relativo a static/)
-        import os
-        candidates = [
-            foto.caminho_arquivo,
-            os.path.join('static', foto.caminho_arquivo),
-            os.path.join('/home/runner/workspace/static', foto.caminho_arquivo.lstrip('/')),
-        ]
-        for path in candidates:
-            try:
-                if os.path.exists(path):
-                    with open(path, 'rb') as fp:
-                        data = fp.read()
-                    break
-            except Exception:
-                continue
+    """Renderiza uma RDOFoto em Image. Prefere o arquivo (blob do store ou
+    disco) da versão otimizada (1200px) → thumbnail (300px) → original; a
+    base64 do banco só quando nenhum arquivo existe. Mantém aspect ratio."""
+    from services.rdo_foto_service import ler_foto
+
+    data, _mimetype = ler_foto(foto, 'otimizado', 'thumbnail', 'original')
     if not data:
         return None
     try:
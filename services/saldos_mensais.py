@@ -0,0 +1,329 @@
+"""Saldos mensais por conta, mantidos a cada lançamento (`BalanceteMensal`).
+
+O razão agregado (`services.razao_contabil`) já lia o plano inteiro numa
+consulta, mas o saldo anterior ainda saía de somar TODAS as partidas do
+tenant desde o primeiro lançamento — o custo de cada balancete/balanço
+crescia com o histórico, não com o período pedido.
+
+`BalanceteMensal` vira a tabela de saldos corridos: uma linha por (conta,
+mês) com movimento, e a invariante
+
+    saldo_anterior = Σ (débito − crédito) antes do mês
+    saldo_atual    = saldo_anterior + debitos_mes − creditos_mes
+
+O saldo de abertura de uma conta num mês qualquer é o `saldo_atual` da
+última linha dela antes desse mês (ou zero). Quem mantém:
+
+  * o flush (`instalar_manutencao`) — partida nova, removida ou alterada, e
+    lançamento que mudou de data, viram deltas por (conta, mês): upsert da
+    linha do mês e o mesmo delta nos saldos das linhas dos meses seguintes.
+    Na MESMA transação do lançamento: rollback desfaz os dois;
+  * `fechar_mes` — o "fechamento" que o `gerar_balancete_mensal` fazia:
+    completa o mês com as contas analíticas sem movimento, saldo carregado;
+  * `reconstruir` — reparo a partir de um mês, para o que escreveu partidas
+    por fora do ORM (SQL cru, `query.delete()`). `scripts/
+    reconstruir_saldos_mensais.py` e a migração 312 (backfill) usam esta.
+
+Saldos no sinal débito − crédito, como `calcular_saldo_conta`.
+"""
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import Date, cast, func, select, text
+from sqlalchemy import inspect as sa_inspect
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal('0')
+
+# Chave do advisory lock por tenant: o flush de lançamento toma a versão
+# compartilhada, `reconstruir` a exclusiva — reconstruir não corre junto de
+# um lançamento em andamento do mesmo tenant (perderia o delta dele).
+# Dentro do tenant, cada (tenant, conta) tem o seu lock exclusivo, também
+# até o fim da transação (ver `_travar_contas`).
+_LOCK_SALDOS = 7309
+
+_CAMPOS_PARTIDA = ('valor', 'tipo_partida', 'conta_codigo', 'lancamento_id', 'admin_id')
+
+
+def inicio_do_mes(d: date) -> date:
+    return d.replace(day=1)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Leitura
+# ─────────────────────────────────────────────────────────────────────────────
+
+def saldos_de_abertura(admin_id: int, mes: date, contas=None) -> dict:
+    """{conta: saldo (D − C) no fim do mês anterior a `mes`} — o
+    `saldo_atual` da última linha de cada conta (ou só das `contas`) antes
+    de `mes`. Uma consulta (DISTINCT ON), sem tocar em partida."""
+    from models import BalanceteMensal, db
+
+    q = (db.session.query(BalanceteMensal.conta_codigo, BalanceteMensal.saldo_atual)
+         .filter(BalanceteMensal.admin_id == admin_id,
+                 BalanceteMensal.mes_referencia < inicio_do_mes(mes)))
+    if contas is not None:
+        q = q.filter(BalanceteMensal.conta_codigo.in_(list(contas)))
+    q = (q.distinct(BalanceteMensal.conta_codigo)
+           .order_by(BalanceteMensal.conta_codigo, BalanceteMensal.mes_referencia.desc()))
+    return {conta: saldo for conta, saldo in q if saldo}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Escrita
+# ─────────────────────────────────────────────────────────────────────────────
+
+_CHAVE = ['conta_codigo', 'mes_referencia', 'admin_id']
+
+
+def _upsert(tabela, valores, atualizar):
+    from sqlalchemy.dialects.postgresql import insert
+
+    ins = insert(tabela).values(**valores)
+    return ins.on_conflict_do_update(
+        index_elements=_CHAVE,
+        set_={coluna: expr(tabela.c, ins.excluded) for coluna, expr in atualizar.items()})
+
+
+def aplicar_delta(session, admin_id: int, conta: str, mes: date,
+                  debitos: Decimal, creditos: Decimal) -> None:
+    """Soma (débitos, créditos) ao mês `mes` da conta e propaga a diferença
+    para os saldos dos meses seguintes. Duas instruções.
+
+    Quem chama segura o lock da conta (`_travar_contas`) até o fim da
+    transação. O lock de linha não bastava: a transação que CRIA a linha de
+    um mês posterior calcula a abertura no próprio snapshot, e a que lança
+    num mês anterior propaga com `mes > M` sem enxergar essa linha ainda não
+    commitada — o saldo ficava errado para sempre. Com o lock, a segunda
+    espera a primeira commitar e, em READ COMMITTED, cada instrução dela já
+    vê a linha nova."""
+    from models import BalanceteMensal
+
+    t = BalanceteMensal.__table__
+    delta = debitos - creditos
+    if delta:
+        session.execute(t.update().where(
+            t.c.admin_id == admin_id, t.c.conta_codigo == conta, t.c.mes_referencia > mes,
+        ).values(saldo_anterior=t.c.saldo_anterior + delta,
+                 saldo_atual=t.c.saldo_atual + delta))
+    abertura = func.coalesce(select(t.c.saldo_atual).where(
+        t.c.admin_id == admin_id, t.c.conta_codigo == conta, t.c.mes_referencia < mes,
+    ).order_by(t.c.mes_referencia.desc()).limit(1).scalar_subquery(), 0)
+    session.execute(_upsert(t, dict(
+        conta_codigo=conta, mes_referencia=mes, admin_id=admin_id,
+        saldo_anterior=abertura, debitos_mes=debitos, creditos_mes=creditos,
+        saldo_atual=abertura + delta, processado_em=func.now(),
+    ), {
+        'debitos_mes': lambda c, novo: c.debitos_mes + novo.debitos_mes,
+        'creditos_mes': lambda c, novo: c.creditos_mes + novo.creditos_mes,
+        'saldo_atual': lambda c, novo: c.saldo_atual + novo.debitos_mes - novo.creditos_mes,
+        'processado_em': lambda c, novo: novo.processado_em,
+    }))
+
+
+def _travar_contas(session, chaves) -> None:
+    """Lock exclusivo de transação por (admin_id, conta), em ordem — dois
+    flushes que tocam as mesmas contas as travam na mesma sequência."""
+    for admin_id, conta in sorted(chaves):
+        session.execute(text('SELECT pg_advisory_xact_lock(hashtextextended(:chave, :classe))'),
+                        {'chave': f'{admin_id}:{conta}', 'classe': _LOCK_SALDOS})
+
+
+def fechar_mes(admin_id: int, mes_referencia: date) -> int:
+    """Completa `mes_referencia` com uma linha para cada conta analítica que
+    ainda não tem — sem movimento, saldo de abertura carregado. Devolve
+    quantas entraram. Não faz commit."""
+    from sqlalchemy.dialects.postgresql import insert
+
+    from models import BalanceteMensal, PlanoContas, db
+
+    mes = inicio_do_mes(mes_referencia)
+    ja_existem = {conta for (conta,) in db.session.query(BalanceteMensal.conta_codigo).filter_by(
+        admin_id=admin_id, mes_referencia=mes)}
+    contas = [c for (c,) in db.session.query(PlanoContas.codigo).filter_by(
+        admin_id=admin_id, aceita_lancamento=True) if c not in ja_existem]
+    if not contas:
+        return 0
+    abertura = saldos_de_abertura(admin_id, mes)
+    linhas = [dict(conta_codigo=c, mes_referencia=mes, admin_id=admin_id,
+                   saldo_anterior=abertura.get(c, ZERO), debitos_mes=ZERO, creditos_mes=ZERO,
+                   saldo_atual=abertura.get(c, ZERO))
+              for c in contas]
+    db.session.execute(insert(BalanceteMensal.__table__).values(linhas).on_conflict_do_nothing(
+        index_elements=_CHAVE))
+    return len(linhas)
+
+
+def reconstruir(admin_id: int, desde: date | None = None) -> int:
+    """Apaga e recalcula as linhas do tenant a partir do mês de `desde`
+    (sem `desde`, desde o primeiro lançamento): abertura das linhas
+    anteriores + um GROUP BY (conta, mês) das partidas. Devolve o número de
+    linhas gravadas. Meses fechados por `fechar_mes` voltam a ter só as
+    contas com movimento. Não faz commit."""
+    from models import BalanceteMensal, LancamentoContabil, PartidaContabil, db
+
+    db.session.execute(text('SELECT pg_advisory_xact_lock(:classe, :tenant)'),
+                       {'classe': _LOCK_SALDOS, 'tenant': admin_id})
+    t = BalanceteMensal.__table__
+    mes = inicio_do_mes(desde) if desde else None
+    saldo = saldos_de_abertura(admin_id, mes) if mes else {}
+
+    data = LancamentoContabil.data_lancamento
+    mes_da_partida = cast(func.date_trunc('month', data), Date)
+    valor = PartidaContabil.valor
+    q = db.session.query(
+        PartidaContabil.conta_codigo, mes_da_partida,
+        func.sum(valor).filter(PartidaContabil.tipo_partida == 'DEBITO'),
+        func.sum(valor).filter(PartidaContabil.tipo_partida == 'CREDITO'),
+    ).join(LancamentoContabil, PartidaContabil.lancamento_id == LancamentoContabil.id).filter(
+        PartidaContabil.admin_id == admin_id)
+    if mes:
+        q = q.filter(data >= mes)
+    q = q.group_by(PartidaContabil.conta_codigo, mes_da_partida).order_by(
+        PartidaContabil.conta_codigo, mes_da_partida)
+
+    linhas = []
+    for conta, mes_linha, debitos, creditos in q:
+        debitos, creditos = debitos or ZERO, creditos or ZERO
+        anterior = saldo.get(conta, ZERO)
+        saldo[conta] = anterior + debitos - creditos
+        linhas.append(dict(conta_codigo=conta, mes_referencia=mes_linha, admin_id=admin_id,
+                           saldo_anterior=anterior, debitos_mes=debitos, creditos_mes=creditos,
+                           saldo_atual=saldo[conta]))
+
+    apagar = t.delete().where(t.c.admin_id == admin_id)
+    if mes:
+        apagar = apagar.where(t.c.mes_referencia >= mes)
+    db.session.execute(apagar)
+    if linhas:
+        db.session.execute(t.insert(), linhas)
+    logger.info(f"[SALDOS] tenant {admin_id}: {len(linhas)} linha(s) reconstruída(s)"
+                f"{f' desde {mes:%m/%Y}' if mes else ''}")
+    return len(linhas)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Manutenção no flush
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _antes(obj, attr):
+    """Valor de `attr` antes deste flush (o atual, se não mudou)."""
+    historico = sa_inspect(obj).attrs[attr].history
+    return historico.deleted[0] if historico.deleted else getattr(obj, attr)
+
+
+def _mudou(obj, campos) -> bool:
+    estado = sa_inspect(obj)
+    return any(estado.attrs[c].history.has_changes() for c in campos)
+
+
+def deltas_do_flush(session) -> dict:
+    """{(admin_id, conta, mês): [débitos, créditos]} que o flush em curso
+    aplica ao razão: +partidas novas, −removidas, −antes/+depois das
+    alteradas e das partidas de lançamento que mudou de mês."""
+    from sqlalchemy.orm.util import identity_key
+
+    from models import LancamentoContabil, PartidaContabil
+
+    novas = [o for o in session.new if isinstance(o, PartidaContabil)]
+    removidas = [o for o in session.deleted if isinstance(o, PartidaContabil)]
+    alteradas = [o for o in session.dirty
+                 if isinstance(o, PartidaContabil) and _mudou(o, _CAMPOS_PARTIDA)]
+    movidos = [o for o in session.dirty
+               if isinstance(o, LancamentoContabil) and _mudou(o, ('data_lancamento',))]
+    if not (novas or removidas or alteradas or movidos):
+        return {}
+
+    vistas = {id(p) for p in (*novas, *removidas, *alteradas)}
+    for lanc in movidos:
+        for p in lanc.partidas:
+            if id(p) not in vistas:
+                vistas.add(id(p))
+                alteradas.append(p)
+
+    lancs = {o.id: o for o in (*session.new, *session.deleted, *movidos)
+             if isinstance(o, LancamentoContabil)}
+    ids = {_antes(p, 'lancamento_id') for p in (*removidas, *alteradas)} | {
+        p.lancamento_id for p in (*novas, *alteradas)}
+    for lanc_id in ids - set(lancs):
+        lanc = session.identity_map.get(identity_key(LancamentoContabil, lanc_id))
+        if lanc is not None:
+            lancs[lanc_id] = lanc
+    faltam = ids - set(lancs) - {None}
+    datas = dict(session.execute(
+        select(LancamentoContabil.id, LancamentoContabil.data_lancamento)
+        .where(LancamentoContabil.id.in_(faltam))).all()) if faltam else {}
+
+    deltas = defaultdict(lambda: [ZERO, ZERO])
+
+    def somar(p, antes, sinal):
+        ler = _antes if antes else getattr
+        lanc_id = ler(p, 'lancamento_id')
+        lanc = lancs.get(lanc_id)
+        data = ler(lanc, 'data_lancamento') if lanc is not None else datas.get(lanc_id)
+        if data is None:
+            return
+        chave = (ler(p, 'admin_id'), ler(p, 'conta_codigo'), inicio_do_mes(data))
+        lado = 0 if ler(p, 'tipo_partida') == 'DEBITO' else 1
+        deltas[chave][lado] += sinal * Decimal(str(ler(p, 'valor') or 0))
+
+    for p in novas:
+        somar(p, False, 1)
+    for p in removidas:
+        somar(p, True, -1)
+    for p in alteradas:
+        somar(p, True, -1)
+        somar(p, False, 1)
+    return {chave: d for chave, d in deltas.items() if d[0] or d[1]}
+
+
+def _nada(_alvo, valor, _antigo, _iniciador):
+    return valor
+
+
+def instalar_manutencao() -> None:
+    """Listener `after_flush` na `db.session`: os deltas do flush entram no
+    `BalanceteMensal` na mesma transação. Falha aqui derruba o flush — um
+    lançamento gravado com o saldo mensal errado é pior que um lançamento
+    recusado."""
+    from sqlalchemy import event
+
+    from models import LancamentoContabil, PartidaContabil, db
+
+    # Atribuição num objeto expirado (depois de um commit) não guardaria o
+    # valor anterior no histórico — e é dele que sai o delta negativo.
+    # active_history carrega o valor antigo antes de sobrescrever.
+    for atributo in (LancamentoContabil.data_lancamento,
+                     *(getattr(PartidaContabil, c) for c in _CAMPOS_PARTIDA)):
+        event.listen(atributo, 'set', _nada, active_history=True)
+
+    @event.listens_for(db.session, 'before_flush')
+    def _carregar_removidos(session, _flush_ctx, _instancias):
+        # Depois do DELETE não há mais linha para carregar o que expirou.
+        for obj in session.deleted:
+            if isinstance(obj, PartidaContabil):
+                campos = list(_CAMPOS_PARTIDA)
+            elif isinstance(obj, LancamentoContabil):
+                campos = ['data_lancamento']
+            else:
+                continue
+            expirados = sa_inspect(obj).unloaded & set(campos)
+            if expirados:
+                session.refresh(obj, list(expirados))
+
+    @event.listens_for(db.session, 'after_flush')
+    def _manter(session, _flush_ctx):
+        deltas = deltas_do_flush(session)
+        if not deltas:
+            return
+        for tenant in sorted({admin_id for admin_id, _, _ in deltas}):
+            session.execute(text('SELECT pg_advisory_xact_lock_shared(:classe, :tenant)'),
+                            {'classe': _LOCK_SALDOS, 'tenant': tenant})
+        _travar_contas(session, {(admin_id, conta) for admin_id, conta, _ in deltas})
+        for (admin_id, conta, mes), (debitos, creditos) in sorted(deltas.items()):
+            aplicar_delta(session, admin_id, conta, mes, debitos, creditos)
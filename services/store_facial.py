@@ -0,0 +1,408 @@
+"""Store binário de embeddings faciais, aberto com mmap — substitui o pickle
+`cache_facial.pkl` de `gerar_cache_facial`.
+
+O pickle tinha dois custos que cresciam com a empresa: cada worker do
+gunicorn o despickleava em listas Python de floats próprias (memória =
+workers × funcionários × fotos × 128 objetos float), e qualquer mudança de
+UMA foto reescrevia o arquivo inteiro — que todos os workers então
+recarregavam inteiro pelo mtime.
+
+Formato (little-endian, tudo alinhado a 64 bytes):
+
+    cabeçalho     MAGIC, versão, dimensão, nº de tenants, fim da base,
+                  fim do log (o ponto de COMMIT), tamanho dos metadados
+    metadados     JSON (generated_at, pipeline_version, model...)
+    tabela        por tenant: admin_id, offset e nº de linhas do bloco,
+                  offset e tamanho do JSON do tenant
+    base          por tenant, contíguos: matriz float32 (linhas × dim),
+                  ids de funcionário int64 (linhas), JSON com a descrição de
+                  cada linha e nome/código/updated_at de cada funcionário
+    log           registros anexados depois da base: (admin_id, func_id,
+                  nº de embeddings, tombstone, JSON) + floats
+
+O arquivo é mapeado só-leitura e compartilhado (MAP_SHARED): as páginas da
+base ficam UMA vez no page cache, e a matriz de um tenant sem registro no
+log vira um `np.frombuffer` sem cópia dentro do índice facial.
+
+Mudança de um funcionário é um registro ANEXADO ao log — o último registro
+de um funcionário vence; tombstone o remove. A escrita é atômica: grava o
+registro depois do fim do log, fsync, e só então avança o "fim do log" no
+cabeçalho (8 bytes, fsync). Um leitor nunca olha além do fim commitado, e
+lixo de um append interrompido é sobrescrito pelo próximo. Escritores
+concorrentes (workers) se serializam por `flock` num arquivo `.lock`.
+
+`gravar` (geração completa, migração do pickle) reescreve tudo compactado —
+log vazio — num temporário + `os.replace`: leitor com o mapa antigo segue
+lendo o inode antigo até sincronizar.
+"""
+from __future__ import annotations
+
+import fcntl
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import NamedTuple
+
+import numpy as np
+
+MAGIC = b'SIGEFACE'
+VERSAO = 1
+ALINHAMENTO = 64
+DIMENSAO_PADRAO = 128
+
+# magic, versão, dim, n_tenants, base_fim, log_fim, meta_len
+_CABECALHO = struct.Struct('<8sHHIQQQ')
+_TAM_CABECALHO = 64
+_OFF_LOG_FIM = 8 + 2 + 2 + 4 + 8
+# admin_id, offset da matriz, linhas, offset do JSON, tamanho do JSON
+_TENANT = struct.Struct('<qQQQQ')
+# admin_id, func_id, nº de embeddings, tombstone, tamanho do JSON
+_REGISTRO = struct.Struct('<qqIII4x')
+
+_SEM_ADMIN = -(2 ** 63)  # admin_id None no cache legado
+
+
+def _alinhar(n: int, a: int = ALINHAMENTO) -> int:
+    return (n + a - 1) // a * a
+
+
+def _admin_para_disco(admin_id) -> int:
+    return _SEM_ADMIN if admin_id is None else int(admin_id)
+
+
+def _admin_do_disco(valor: int):
+    return None if valor == _SEM_ADMIN else valor
+
+
+def _vetores_da_entrada(entrada: dict) -> tuple[list, list[str]]:
+    """(vetores, descrições) de uma entrada no formato do cache pickle."""
+    embeddings = entrada.get('embeddings') or []
+    if not embeddings and 'embedding' in entrada:
+        embeddings = [{'embedding': entrada['embedding'], 'descricao': 'Foto principal'}]
+    vetores, descricoes = [], []
+    for emb in embeddings:
+        if isinstance(emb, dict):
+            vetores.append(emb['embedding'])
+            descricoes.append(emb.get('descricao', 'Foto'))
+        else:
+            vetores.append(emb)
+            descricoes.append('Foto')
+    return vetores, descricoes
+
+
+def _info_funcionario(entrada: dict) -> dict:
+    return {k: entrada.get(k) for k in ('nome', 'codigo', 'updated_at')}
+
+
+@contextmanager
+def _travado(path: str):
+    with open(path + '.lock', 'a+b') as trava:
+        fcntl.flock(trava, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(trava, fcntl.LOCK_UN)
+
+
+def gravar(path: str, entradas: dict, metadados: dict | None = None,
+           substituir: set | None = None) -> None:
+    """Escreve o store COMPACTADO a partir de {func_id: entrada} no formato
+    do cache pickle (`embeddings` + `admin_id`, `nome`, `codigo`...).
+    Dentro de cada tenant, a ordem das linhas segue a do dict.
+
+    Com `substituir` (conjunto de admin_ids), só esses tenants são trocados:
+    os demais são relidos do store atual DENTRO da trava — um anexo de outro
+    tenant feito durante uma geração longa não se perde."""
+    with _travado(path):
+        if substituir is not None and os.path.exists(path):
+            substituir = {int(a) if a is not None else None for a in substituir}
+            mantidas = {fid: e for fid, e in StoreFacial(path).entradas().items()
+                        if e['admin_id'] not in substituir}
+            entradas = {**mantidas, **entradas}
+        _gravar_compactado(path, entradas, metadados)
+
+
+def _gravar_compactado(path: str, entradas: dict, metadados: dict | None) -> None:
+    por_tenant: dict = {}
+    dim = None
+    for func_id, entrada in entradas.items():
+        vetores, descricoes = _vetores_da_entrada(entrada)
+        if not vetores:
+            continue
+        bloco = np.asarray(vetores, dtype=np.float32)
+        if dim is None:
+            dim = bloco.shape[1]
+        elif bloco.shape[1] != dim:
+            raise ValueError(f'Funcionário {func_id}: embedding com '
+                             f'{bloco.shape[1]} dimensões, esperado {dim}')
+        dono = entrada.get('admin_id')
+        dono = int(dono) if dono is not None else None
+        por_tenant.setdefault(dono, []).append((int(func_id), bloco, descricoes,
+                                                _info_funcionario(entrada)))
+    dim = dim or DIMENSAO_PADRAO
+
+    meta = json.dumps(metadados or {}, ensure_ascii=False, default=str).encode()
+    off_tabela = _alinhar(_TAM_CABECALHO + len(meta))
+    cursor = _alinhar(off_tabela + _TENANT.size * len(por_tenant))
+    tabela, blocos = [], []
+    for admin_id, funcs in por_tenant.items():
+        matriz = np.vstack([b for _, b, _, _ in funcs])
+        ids = np.concatenate([np.full(len(b), f, dtype=np.int64) for f, b, _, _ in funcs])
+        json_tenant = json.dumps({
+            'descricoes': [d for _, _, ds, _ in funcs for d in ds],
+            'funcionarios': {str(f): info for f, _, _, info in funcs},
+        }, ensure_ascii=False, default=str).encode()
+        off_matriz = cursor
+        off_ids = off_matriz + matriz.nbytes
+        off_json = _alinhar(off_ids + ids.nbytes)
+        cursor = _alinhar(off_json + len(json_tenant))
+        tabela.append(_TENANT.pack(_admin_para_disco(admin_id), off_matriz,
+                                   len(ids), off_json, len(json_tenant)))
+        blocos.append((off_matriz, matriz.tobytes() + ids.tobytes()))
+        blocos.append((off_json, json_tenant))
+
+    diretorio = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix='.store_facial.', dir=diretorio)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_CABECALHO.pack(MAGIC, VERSAO, dim, len(tabela),
+                                    cursor, cursor, len(meta)).ljust(_TAM_CABECALHO, b'\0'))
+            f.write(meta)
+            f.seek(off_tabela)
+            f.write(b''.join(tabela))
+            for offset, dados in blocos:
+                f.seek(offset)
+                f.write(dados)
+            f.truncate(cursor)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def anexar(path: str, func_id: int, entrada: dict | None) -> None:
+    """Substitui (ou, com `entrada=None`, remove) UM funcionário, anexando
+    um registro ao log. Atômico para leitores; serializado entre escritores."""
+    vetores, descricoes = _vetores_da_entrada(entrada) if entrada else ([], [])
+    dono = (entrada or {}).get('admin_id')
+    dono = int(dono) if dono is not None else None
+    corpo = json.dumps({'descricoes': descricoes,
+                        **_info_funcionario(entrada or {})},
+                       ensure_ascii=False, default=str).encode()
+    floats = np.asarray(vetores, dtype=np.float32).tobytes() if vetores else b''
+
+    with _travado(path), open(path, 'r+b') as f:
+        magic, _, dim, _, _, log_fim, _ = _CABECALHO.unpack(f.read(_CABECALHO.size))
+        if magic != MAGIC:
+            raise ValueError(f'{path}: não é um store facial')
+        if vetores and len(vetores[0]) != dim:
+            raise ValueError(f'Embedding com {len(vetores[0])} dimensões num store de {dim}')
+        registro = (_REGISTRO.pack(_admin_para_disco(dono), int(func_id), len(vetores),
+                                   0 if vetores else 1, len(corpo))
+                    + corpo.ljust(_alinhar(len(corpo), 8), b'\0') + floats)
+        f.seek(log_fim)
+        f.write(registro)
+        f.truncate(log_fim + len(registro))
+        f.flush()
+        os.fsync(f.fileno())
+        f.seek(_OFF_LOG_FIM)
+        f.write(struct.pack('<Q', log_fim + len(registro)))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class _Mapa(NamedTuple):
+    """Um retrato do store aberto. Nunca é alterado: `sincronizar` monta
+    outro e publica numa atribuição só."""
+    ino: int
+    mm: mmap.mmap
+    dim: int
+    metadados: dict
+    base: dict        # admin_id → (matriz, ids, json_off, json_len)
+    dono_base: dict   # func_id → admin_id
+    log: dict         # func_id → (admin_id, offset dos floats, n, json); na ordem do log
+    versao_tenant: dict
+    log_lido: int
+
+
+class StoreFacial:
+    """Leitor mapeado de um store. Um por processo; `sincronizar()` antes de
+    usar traz o que outros processos anexaram (ou a troca do arquivo).
+
+    Todo o estado lido do arquivo (mapa, offsets da base, log) vive num
+    `_Mapa` imutável em `self._mapa`. Cada consulta lê a referência UMA vez
+    e usa só aquele retrato: uma sincronização concorrente nunca casa o
+    mapa novo com offsets do antigo."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mapa = self._abrir()
+
+    @property
+    def dim(self) -> int:
+        return self._mapa.dim
+
+    @property
+    def metadados(self) -> dict:
+        return self._mapa.metadados
+
+    @property
+    def _log_lido(self) -> int:
+        return self._mapa.log_lido
+
+    # ── abertura / sincronização ──
+
+    def _abrir(self) -> _Mapa:
+        with open(self.path, 'rb') as f:
+            ino = os.fstat(f.fileno()).st_ino
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, versao, dim, n_tenants, base_fim, _,
+         meta_len) = _CABECALHO.unpack_from(mm, 0)
+        if magic != MAGIC or versao != VERSAO:
+            raise ValueError(f'{self.path}: store facial inválido ou de outra versão')
+        metadados = json.loads(bytes(mm[_TAM_CABECALHO:_TAM_CABECALHO + meta_len]) or b'{}')
+        off_tabela = _alinhar(_TAM_CABECALHO + meta_len)
+
+        base: dict = {}
+        dono_base: dict = {}
+        for i in range(n_tenants):
+            admin, off_m, linhas, off_j, len_j = _TENANT.unpack_from(
+                mm, off_tabela + i * _TENANT.size)
+            admin = _admin_do_disco(admin)
+            matriz = np.frombuffer(mm, dtype=np.float32, count=linhas * dim,
+                                   offset=off_m).reshape(linhas, dim)
+            ids = np.frombuffer(mm, dtype=np.int64, count=linhas,
+                                offset=off_m + matriz.nbytes)
+            base[admin] = (matriz, ids, off_j, len_j)
+            for fid in np.unique(ids).tolist():
+                dono_base[fid] = admin
+
+        return self._ler_log(_Mapa(ino, mm, dim, metadados, base, dono_base,
+                                   {}, {}, base_fim))
+
+    def _ler_log(self, mapa: _Mapa) -> _Mapa:
+        """O retrato com os registros anexados desde `mapa.log_lido` — o
+        mesmo objeto quando nada mudou."""
+        (log_fim,) = struct.unpack_from('<Q', mapa.mm, _OFF_LOG_FIM)
+        if log_fim == mapa.log_lido:
+            return mapa
+        mm = mapa.mm
+        if log_fim > len(mm):
+            with open(self.path, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            # Os arrays da base apontam para o mapa antigo, que continua
+            # válido (o arquivo só cresceu); não precisam ser refeitos.
+        log, versao_tenant = dict(mapa.log), dict(mapa.versao_tenant)
+        pos = mapa.log_lido
+        while pos < log_fim:
+            admin, fid, n, tombstone, len_j = _REGISTRO.unpack_from(mm, pos)
+            admin = _admin_do_disco(admin)
+            pos += _REGISTRO.size
+            corpo = json.loads(bytes(mm[pos:pos + len_j]))
+            pos += _alinhar(len_j, 8)
+            anterior = log.pop(fid, None)
+            tocados = {admin, mapa.dono_base.get(fid)}
+            if anterior is not None:
+                tocados.add(anterior[0])
+            # Tombstone fica no dict com n=0: ainda mascara a linha da base.
+            log[fid] = (admin, None if tombstone else pos, n, corpo)
+            for t in tocados:
+                versao_tenant[t] = pos
+            pos += n * mapa.dim * 4
+        return mapa._replace(mm=mm, log=log, versao_tenant=versao_tenant,
+                             log_lido=log_fim)
+
+    def sincronizar(self) -> 'StoreFacial':
+        """Barato quando nada mudou: um stat e a leitura de 8 bytes do
+        cabeçalho (que o mapa compartilhado já enxerga)."""
+        try:
+            ino = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return self
+        with self._lock:
+            mapa = self._mapa
+            self._mapa = self._abrir() if ino != mapa.ino else self._ler_log(mapa)
+        return self
+
+    # ── consultas ──
+
+    def versao(self, admin_id) -> tuple:
+        """Muda sempre que algo do tenant muda: chave do índice facial."""
+        mapa = self._mapa
+        return (mapa.ino, mapa.versao_tenant.get(admin_id, 0))
+
+    def tenants(self) -> set:
+        mapa = self._mapa
+        return set(mapa.base) | {v[0] for v in mapa.log.values() if v[2]}
+
+    @staticmethod
+    def _json_base(mapa: _Mapa, admin_id) -> dict:
+        _, _, off, tam = mapa.base[admin_id]
+        return json.loads(bytes(mapa.mm[off:off + tam]))
+
+    @staticmethod
+    def _do_log(mapa: _Mapa, admin_id):
+        """Registros vivos do log para o tenant, na ordem do log."""
+        for fid, (admin, off, n, corpo) in mapa.log.items():
+            if admin == admin_id and n:
+                yield fid, np.frombuffer(mapa.mm, dtype=np.float32, count=n * mapa.dim,
+                                         offset=off).reshape(n, mapa.dim), corpo
+
+    def linhas(self, admin_id) -> tuple[np.ndarray, np.ndarray, list[str]]:
+        """(matriz, ids, descrições) do tenant. Sem registro no log, a
+        matriz é a visão do mapa — nenhuma cópia."""
+        mapa = self._mapa
+        matriz, ids, _, _ = mapa.base.get(
+            admin_id, (np.zeros((0, mapa.dim), np.float32), np.zeros(0, np.int64), 0, 0))
+        descricoes = (self._json_base(mapa, admin_id)['descricoes']
+                      if admin_id in mapa.base else [])
+        if mapa.log:
+            manter = ~np.isin(ids, np.fromiter(mapa.log, dtype=np.int64))
+            do_log = list(self._do_log(mapa, admin_id))
+            if not manter.all() or do_log:
+                matriz = np.vstack([matriz[manter]] + [m for _, m, _ in do_log])
+                ids = np.concatenate([ids[manter]] + [
+                    np.full(len(m), fid, dtype=np.int64) for fid, m, _ in do_log])
+                descricoes = [d for d, k in zip(descricoes, manter, strict=True) if k] + [
+                    d for _, _, c in do_log for d in c['descricoes']]
+        return matriz, ids, descricoes
+
+    def indice(self, admin_id):
+        from services.indice_facial import IndiceFacial
+        return IndiceFacial(*self.linhas(admin_id))
+
+    def entradas(self) -> dict:
+        """O dict no formato do cache pickle ({func_id: entrada}) — para as
+        telas de diagnóstico. Materializa listas Python: fora do caminho
+        quente de propósito."""
+        mapa = self._mapa
+        saida: dict = {}
+        for admin_id in mapa.base:
+            matriz, ids, _, _ = mapa.base[admin_id]
+            meta = self._json_base(mapa, admin_id)
+            for linha, (fid, desc) in enumerate(zip(ids.tolist(), meta['descricoes'], strict=True)):
+                if fid in mapa.log:
+                    continue
+                if fid not in saida:
+                    saida[fid] = {'embeddings': [], 'admin_id': admin_id,
+                                  **meta['funcionarios'].get(str(fid), {})}
+                saida[fid]['embeddings'].append(
+                    {'embedding': matriz[linha].tolist(), 'descricao': desc})
+        for admin_id in {v[0] for v in mapa.log.values()}:
+            for fid, matriz, corpo in self._do_log(mapa, admin_id):
+                saida[fid] = {'embeddings': [
+                    {'embedding': v.tolist(), 'descricao': d}
+                    for v, d in zip(matriz, corpo['descricoes'], strict=True)],
+                    'admin_id': admin_id,
+                    **{k: corpo.get(k) for k in ('nome', 'codigo', 'updated_at')}}
+        for entrada in saida.values():
+            entrada['total_fotos'] = len(entrada['embeddings'])
+        return saida
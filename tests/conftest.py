@@ -61,6 +61,12 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 os.environ.setdefault("SIGE_ENABLE_DEMO_SEED", "false")
 os.environ.setdefault("SIGE_BOOT_DDL", "0")
 
+# A fila que gera as versões das fotos de RDO (services/rdo_foto_versoes)
+# roda numa thread que o commit acorda. Na suíte ela disputaria as fotos
+# com o teste que acabou de subir uma: os testes chamam `drenar()` quando
+# precisam das versões.
+os.environ.setdefault("SIGE_FOTOS_FILA", "0")
+
 try:
     import main  # noqa: F401
 except Exception:
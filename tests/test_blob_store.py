@@ -0,0 +1,339 @@
+"""Store de blobs das fotos de RDO (services/blob_store.py) e a entrega HTTP.
+
+Chave = SHA-256 do conteúdo: a mesma foto vira um arquivo só, sob
+`ab/cd/<chave>`, e a chave é o ETag forte de `servir_foto` e de
+`portal_foto_rdo` (304 com If-None-Match, 206 com Range, imutável com
+`?v=<chave>`). A passada 3 do scripts/migrar_fotos_rdo_para_disco.py leva o
+legado para o store; `--coletar-blobs` apaga o que nenhuma foto referencia.
+"""
+import hashlib
+import os
+import sys
+import time
+import uuid
+from datetime import date
+from io import BytesIO
+
+import pytest
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+from werkzeug.security import generate_password_hash
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: F401 — registra os blueprints
+from app import app, db
+from models import Cliente, Obra, RDO, RDOFoto, TipoUsuario, Usuario
+from services.blob_store import (BackendDisco, BlobStore, blobs, chave_da_referencia,
+                                 raiz_blobs, referencia)
+from services.rdo_foto_versoes import drenar
+
+pytestmark = pytest.mark.integration
+
+
+@pytest.fixture(autouse=True)
+def _config(tmp_path, monkeypatch):
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    if not app.secret_key:
+        app.secret_key = 'test-blob-store'
+    monkeypatch.setenv('UPLOADS_PATH', str(tmp_path))
+    yield
+
+
+def _sfx():
+    return uuid.uuid4().hex[:8]
+
+
+def _jpeg(cor=(200, 30, 30)):
+    buf = BytesIO()
+    Image.new('RGB', (640, 480), cor).save(buf, format='JPEG')
+    return buf.getvalue()
+
+
+@pytest.fixture
+def cenario():
+    with app.app_context():
+        suf = _sfx()
+        admin = Usuario(username=f'blob_{suf}', email=f'blob_{suf}@test.local',
+                        nome=f'Admin Blob {suf}',
+                        password_hash=generate_password_hash('Senha@2026'),
+                        tipo_usuario=TipoUsuario.ADMIN, ativo=True, versao_sistema='v2')
+        db.session.add(admin)
+        db.session.flush()
+        cli = Cliente(nome=f'CLI-BLOB-{suf}', admin_id=admin.id)
+        db.session.add(cli)
+        db.session.flush()
+        obra = Obra(nome=f'Obra Blob {suf}', codigo=f'BL{suf[:6].upper()}',
+                    data_inicio=date(2026, 1, 1), admin_id=admin.id, cliente_id=cli.id,
+                    valor_contrato=1000, token_cliente=f'tok-blob-{suf}', portal_ativo=True)
+        db.session.add(obra)
+        db.session.flush()
+        rdo = RDO(numero_rdo=f'RDO-BLOB-{suf}', data_relatorio=date(2026, 6, 22),
+                  obra_id=obra.id, admin_id=admin.id, status='Finalizado')
+        db.session.add(rdo)
+        db.session.commit()
+        return {'admin_id': admin.id, 'obra_id': obra.id, 'rdo_id': rdo.id,
+                'token': obra.token_cliente}
+
+
+def _cliente(admin_id):
+    cliente = app.test_client()
+    with cliente.session_transaction() as sess:
+        sess['_user_id'] = str(admin_id)
+        sess['_fresh'] = True
+    return cliente
+
+
+def _upload(cenario, dados=None):
+    cliente = _cliente(cenario['admin_id'])
+    arquivo = FileStorage(stream=BytesIO(dados or _jpeg()), filename='foto.jpg',
+                          content_type='image/jpeg')
+    cliente.post(f"/rdo/{cenario['rdo_id']}/fotos/upload", data={'fotos[]': arquivo},
+                 content_type='multipart/form-data')
+    with app.app_context():
+        drenar()  # otimizada e thumbnail saem da fila (services/rdo_foto_versoes)
+        foto = (RDOFoto.query.filter_by(rdo_id=cenario['rdo_id'])
+                .order_by(RDOFoto.id.desc()).first())
+        return cliente, foto.id, chave_da_referencia(foto.thumbnail)
+
+
+# ───────────────────────────────────────────────────────────────────────────
+# Store (unidade — sem banco)
+# ───────────────────────────────────────────────────────────────────────────
+
+def test_mesmo_conteudo_vira_um_blob_sob_ab_cd(tmp_path):
+    store = BlobStore(BackendDisco(str(tmp_path)))
+    dados = b'foto' * 1000
+    chave = store.guardar(dados)
+    assert chave == hashlib.sha256(dados).hexdigest()
+    assert store.guardar(dados) == chave
+    origem = tmp_path / 'origem.bin'
+    origem.write_bytes(dados)
+    assert store.guardar_arquivo(str(origem)) == chave
+
+    caminho = tmp_path / chave[:2] / chave[2:4] / chave
+    assert store.caminho_local(chave) == str(caminho)
+    assert sorted(p.name for p in tmp_path.rglob('*') if p.is_file()) == sorted(['origem.bin', chave])
+    assert store.ler(chave) == dados and store.verificar(chave)
+
+
+def test_escrita_interrompida_nao_deixa_blob_nem_temporario(tmp_path):
+    store = BlobStore(BackendDisco(str(tmp_path)))
+
+    class Quebra(BytesIO):
+        def read(self, *a):
+            raise OSError('disco cheio')
+
+    chave = hashlib.sha256(b'x').hexdigest()
+    with pytest.raises(OSError):
+        store.backend.gravar(chave, Quebra())
+    assert not store.existe(chave)
+    assert not [p for p in tmp_path.rglob('*') if p.is_file()]
+
+
+def test_blob_corrompido_falha_na_verificacao(tmp_path):
+    store = BlobStore(BackendDisco(str(tmp_path)))
+    chave = store.guardar(b'conteudo')
+    with open(store.caminho_local(chave), 'wb') as fh:
+        fh.write(b'outro')
+    assert not store.verificar(chave)
+
+
+def test_referencia_e_chave_vao_e_voltam():
+    chave = hashlib.sha256(b'a').hexdigest()
+    ref = referencia(chave)
+    assert ref == f'uploads/blobs/{chave[:2]}/{chave[2:4]}/{chave}'
+    assert chave_da_referencia(ref) == chave
+    assert chave_da_referencia('uploads/rdo/1/2/foto.webp') is None
+    assert chave_da_referencia(f'uploads/blobs/00/00/{chave}') is None
+    assert chave_da_referencia('uploads/blobs/../../etc/passwd') is None
+    assert chave_da_referencia(None) is None
+
+
+def test_raiz_segue_uploads_path(tmp_path):
+    assert raiz_blobs() == os.path.join(str(tmp_path), 'blobs')
+
+
+# ───────────────────────────────────────────────────────────────────────────
+# Upload e entrega HTTP
+# ───────────────────────────────────────────────────────────────────────────
+
+def test_upload_grava_no_store_e_o_reenvio_nao_duplica(cenario, tmp_path):
+    dados = _jpeg()
+    _, _, chave1 = _upload(cenario, dados)
+    _, _, chave2 = _upload(cenario, dados)
+    assert chave1 and chave1 == chave2
+    # Conta pelas referências das duas fotos, não pelos arquivos da pasta:
+    # `drenar()` pega também pendentes deixadas por outros testes.
+    with app.app_context():
+        fotos = RDOFoto.query.filter_by(rdo_id=cenario['rdo_id']).all()
+        refs = {r for f in fotos for r in (f.arquivo_original, f.arquivo_otimizado, f.thumbnail)}
+    assert len(fotos) == 2 and len(refs) == 3  # original, otimizado, thumbnail
+    assert all(blobs().existe(chave_da_referencia(r)) for r in refs)
+    assert not [p for p in tmp_path.glob('rdo/**/*') if p.is_file()]
+
+
+def test_servir_foto_com_etag_304_range_e_imutavel(cenario):
+    cliente, foto_id, chave = _upload(cenario)
+    url = f'/rdo/foto/{foto_id}/thumbnail'
+
+    r = cliente.get(url)
+    assert r.status_code == 200
+    assert r.headers['ETag'] == f'"{chave}"'
+    assert r.headers['Cache-Control'] == 'private, no-cache'
+    assert r.mimetype == 'image/webp'
+    assert hashlib.sha256(r.data).hexdigest() == chave
+
+    assert cliente.get(url, headers={'If-None-Match': f'"{chave}"'}).status_code == 304
+
+    parcial = cliente.get(url, headers={'Range': 'bytes=0-99'})
+    assert parcial.status_code == 206 and parcial.data == r.data[:100]
+
+    imutavel = cliente.get(f'{url}?v={chave}')
+    assert imutavel.headers['Cache-Control'] == 'private, max-age=31536000, immutable'
+
+
+def test_tela_e_lista_de_fotos_levam_a_versao_na_url(cenario):
+    cliente, foto_id, chave = _upload(cenario)
+    corpo = cliente.get(f"/rdo/{cenario['rdo_id']}").get_data(as_text=True)
+    assert f'/rdo/foto/{foto_id}/thumbnail?v={chave}' in corpo
+    assert 'data:image/webp' not in corpo
+
+
+def test_portal_serve_a_foto_so_da_obra_do_token(cenario):
+    _, foto_id, chave = _upload(cenario)
+    cliente = app.test_client()
+    token = cenario['token']
+
+    pagina = cliente.get(f"/portal/obra/{token}/rdo/{cenario['rdo_id']}").get_data(as_text=True)
+    assert f'/portal/obra/{token}/foto/{foto_id}/otimizado' in pagina
+    assert 'data:image/webp' not in pagina
+
+    r = cliente.get(f'/portal/obra/{token}/foto/{foto_id}/thumbnail?v={chave}')
+    assert r.status_code == 200 and r.headers['ETag'] == f'"{chave}"'
+
+    with app.app_context():
+        cli = Cliente(nome=f'CLI-BLOB-{_sfx()}', admin_id=cenario['admin_id'])
+        db.session.add(cli)
+        db.session.flush()
+        outra = Obra(nome='Outra', codigo=f'BO{_sfx()[:6].upper()}', data_inicio=date(2026, 1, 1),
+                     admin_id=cenario['admin_id'], cliente_id=cli.id, valor_contrato=1,
+                     token_cliente=f'tok-blob-outra-{_sfx()}', portal_ativo=True)
+        db.session.add(outra)
+        db.session.commit()
+        outro_token = outra.token_cliente
+    assert cliente.get(f'/portal/obra/{outro_token}/foto/{foto_id}/thumbnail').status_code == 404
+    assert cliente.get(f'/portal/obra/{token}/foto/{foto_id}/base64').status_code == 404
+
+
+def test_pdf_e_export_leem_do_store(cenario):
+    from services.rdo_foto_service import ler_foto
+
+    _, foto_id, _ = _upload(cenario)
+    with app.app_context():
+        foto = db.session.get(RDOFoto, foto_id)
+        dados, mimetype = ler_foto(foto, 'otimizado')
+        assert mimetype == 'image/webp'
+        assert hashlib.sha256(dados).hexdigest() == chave_da_referencia(foto.arquivo_otimizado)
+
+
+# ───────────────────────────────────────────────────────────────────────────
+# Passada 3 e coleta
+# ───────────────────────────────────────────────────────────────────────────
+
+def _foto_legada(cenario, tmp_path, nome, dados):
+    relativo = f"uploads/rdo/{cenario['admin_id']}/{cenario['rdo_id']}/{nome}"
+    caminho = tmp_path / relativo.removeprefix('uploads/')
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    caminho.write_bytes(dados)
+    with app.app_context():
+        foto = RDOFoto(admin_id=cenario['admin_id'], rdo_id=cenario['rdo_id'],
+                       nome_arquivo=nome, caminho_arquivo=relativo, nome_original=nome,
+                       arquivo_original=relativo, arquivo_otimizado=relativo,
+                       thumbnail=relativo, armazenamento='disco')
+        db.session.add(foto)
+        db.session.commit()
+        return foto.id, caminho
+
+
+def test_passada_3_move_o_legado_para_o_store(cenario, tmp_path):
+    from scripts.migrar_fotos_rdo_para_disco import mover_para_blobs
+
+    dados = _jpeg((10, 200, 10))
+    foto_a, arquivo_a = _foto_legada(cenario, tmp_path, 'a.jpg', dados)
+    foto_b, _ = _foto_legada(cenario, tmp_path, 'b.jpg', dados)
+
+    seco = mover_para_blobs(admin_id=cenario['admin_id'])
+    assert seco['movidas'] == 2 and seco['blobs_novos'] == 1
+    assert not (tmp_path / 'blobs').exists()
+
+    relatorio = mover_para_blobs(admin_id=cenario['admin_id'], aplicar=True)
+    assert relatorio['movidas'] == 2 and not relatorio['falhas']
+    chave = hashlib.sha256(dados).hexdigest()
+    with app.app_context():
+        for foto_id in (foto_a, foto_b):
+            foto = db.session.get(RDOFoto, foto_id)
+            assert {foto.arquivo_original, foto.arquivo_otimizado, foto.thumbnail,
+                    foto.caminho_arquivo} == {referencia(chave)}
+    assert arquivo_a.exists(), 'a passada 3 não apaga o legado'
+    assert blobs().verificar(chave)
+
+    assert mover_para_blobs(admin_id=cenario['admin_id'], aplicar=True)['ja_no_store'] == 2
+
+
+def test_coleta_apaga_so_blob_orfao_e_antigo(cenario, tmp_path):
+    from scripts.migrar_fotos_rdo_para_disco import coletar_blobs
+
+    _, _, chave_em_uso = _upload(cenario)
+    store = blobs()
+    orfao_antigo = store.guardar(b'orfao antigo')
+    orfao_novo = store.guardar(b'orfao recem gravado')
+    velho = time.time() - 7200
+    os.utime(store.caminho_local(orfao_antigo), (velho, velho))
+    os.utime(store.caminho_local(chave_em_uso), (velho, velho))
+
+    assert coletar_blobs()['orfaos'] == 1
+    assert store.existe(orfao_antigo)
+
+    relatorio = coletar_blobs(aplicar=True)
+    assert relatorio['orfaos'] == 1
+    assert not store.existe(orfao_antigo)
+    assert store.existe(orfao_novo) and store.existe(chave_em_uso)
+
+
+def test_coleta_poupa_orfao_antigo_reaproveitado_pelo_guardar(cenario):
+    """O upload de conteúdo repetido acha o blob, não o regrava e só commita
+    a foto depois: a coleta rodando nesse meio não pode apagar o blob."""
+    from scripts.migrar_fotos_rdo_para_disco import coletar_blobs
+
+    store = blobs()
+    chave = store.guardar(b'orfao que volta a ser usado')
+    velho = time.time() - 7200
+    os.utime(store.caminho_local(chave), (velho, velho))
+
+    assert store.guardar(b'orfao que volta a ser usado') == chave
+    coletar_blobs(aplicar=True)
+    assert store.verificar(chave)
+    assert not any(n.startswith('.coletando-')
+                   for n in os.listdir(os.path.dirname(store.caminho_local(chave))))
+
+
+def test_coleta_devolve_o_blob_tocado_entre_a_olhada_e_o_rename(cenario, monkeypatch):
+    from scripts import migrar_fotos_rdo_para_disco as script
+
+    store = blobs()
+    chave = store.guardar(b'orfao tocado no meio da coleta')
+    velho = time.time() - 7200
+    os.utime(store.caminho_local(chave), (velho, velho))
+
+    renomear = os.rename
+
+    def guardar_e_renomear(origem, destino):
+        if os.path.basename(origem) == chave:
+            store.guardar(b'orfao tocado no meio da coleta')
+        renomear(origem, destino)
+
+    monkeypatch.setattr(script.os, 'rename', guardar_e_renomear)
+    script.coletar_blobs(aplicar=True)
+    assert store.verificar(chave)
@@ -0,0 +1,61 @@
+"""Boot a frio do `main:app` — o import que todo worker do gunicorn (e todo
+processo de teste) paga.
+
+numpy, pandas, scikit-learn, matplotlib/seaborn, reportlab, DeepFace e o
+alembic entram no primeiro request que precisa deles, não no import: o
+processo novo que só faz `import main` não pode tê-los carregado, e o tempo
+de parede fica dentro do orçamento (`SIGE_BOOT_ORCAMENTO_S`, padrão 6 s —
+medido 3,4 s na criação, 1 CPU, sem .pyc). Quando estourar,
+`python scripts/perfil_importacao.py` mostra quem pesa.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.perfil_importacao import cadeia, ler_importtime, medir
+
+pytestmark = pytest.mark.integration
+
+ORCAMENTO_S = float(os.environ.get('SIGE_BOOT_ORCAMENTO_S') or 6.0)
+
+
+@pytest.fixture(scope='module')
+def boot():
+    return medir('main')
+
+
+def test_boot_nao_carrega_bibliotecas_pesadas(boot):
+    assert not boot['pesadas'], '\n'.join(
+        ' ← '.join(cadeia(boot['modulos'], nome)) for nome in boot['pesadas'])
+
+
+def test_boot_dentro_do_orcamento(boot):
+    mais_caros = sorted(boot['modulos'], key=lambda m: -m['proprio'])[:8]
+    assert boot['segundos'] <= ORCAMENTO_S, (
+        f"import main levou {boot['segundos']:.2f} s (orçamento {ORCAMENTO_S} s); "
+        + ', '.join(f"{m['nome']} {m['proprio'] / 1000:.0f} ms" for m in mais_caros))
+
+
+def test_blueprints_com_dependencia_opcional_registram():
+    """Sem sklearn/matplotlib no ambiente o blueprint registra do mesmo
+    jeito; só a análise que precisa deles falha, no request."""
+    from app import app
+
+    assert {'analytics_preditivos', 'exportacao_relatorios'} <= set(app.blueprints)
+
+
+def test_leitura_do_importtime_acha_quem_importou():
+    texto = '\n'.join([
+        'import time: self [us] | cumulative | imported package',
+        'import time:        10 |         10 |     numpy.core',
+        'import time:        50 |         60 |   numpy',
+        'import time:         5 |          5 |   flask',
+        'import time:       100 |        165 | analytics',
+    ])
+    modulos = ler_importtime(texto)
+    assert [m['nome'] for m in modulos] == ['numpy.core', 'numpy', 'flask', 'analytics']
+    assert cadeia(modulos, 'numpy.core') == ['numpy.core', 'numpy', 'analytics']
+    assert modulos[-1]['importado_por'] is None
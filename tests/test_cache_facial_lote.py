@@ -0,0 +1,168 @@
+"""Geração do cache facial em lote (services/embeddings_lote +
+gerar_cache_facial.gerar_cache / iniciar_job_cache).
+
+O modelo SFace não entra aqui: `processar_lote` é trocado por um falso
+determinístico (o "embedding" sai do conteúdo da foto), e o que se testa é o
+encanamento — plano de fotos por funcionário (ativas, ordem, foto principal
+como fallback), checkpoint e retomada, troca SÓ do tenant regerado no store,
+pool de processos e o job em background com status em arquivo.
+"""
+import hashlib
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gerar_cache_facial
+from app import app, db
+from helpers_tenant import dois_tenants
+from models import FotoFacialFuncionario, Funcionario
+from services import embeddings_lote, store_facial
+from services.store_facial import StoreFacial
+
+pytestmark = pytest.mark.integration
+
+
+def _vetor(foto_base64):
+    h = hashlib.sha256(foto_base64.encode()).digest()
+    v = np.frombuffer(h[:16], dtype=np.uint8).astype(np.float32)[:4] + 1
+    return (v / np.linalg.norm(v)).tolist()
+
+
+def processar_falso(itens):
+    """Como `processar_lote`: 'sem-rosto' vira erro da foto."""
+    return [(chave, None, 'nenhum rosto') if b64 == 'sem-rosto' else (chave, _vetor(b64), None)
+            for chave, b64 in itens]
+
+
+@pytest.fixture
+def cache_tmp(tmp_path, monkeypatch):
+    for nome, arquivo in (('CACHE_PATH', 'cache.store'),
+                          ('CHECKPOINT_PATH', 'cache.checkpoint.jsonl'),
+                          ('JOB_STATUS_PATH', 'cache.job.json')):
+        monkeypatch.setattr(gerar_cache_facial, nome, str(tmp_path / arquivo))
+    monkeypatch.setattr(gerar_cache_facial, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(embeddings_lote, 'processar_lote', processar_falso)
+    monkeypatch.setattr(embeddings_lote, 'inicializar_worker', lambda: None)
+    return tmp_path
+
+
+def _cenario():
+    """Tenant A: funcionário com 2 fotos ativas (fora de ordem de inserção)
+    + 1 inativa + 1 sem rosto; segundo funcionário só com foto principal.
+    Tenant B: funcionário com foto principal."""
+    with app.app_context():
+        a, b = dois_tenants('lote', com_fatos=False)
+        func_a = db.session.get(Funcionario, a.funcionario_id)
+        for ordem, b64, ativa in ((2, 'perfil', True), (1, 'frente', True),
+                                  (3, 'antiga', False), (4, 'sem-rosto', True)):
+            db.session.add(FotoFacialFuncionario(
+                funcionario_id=func_a.id, admin_id=a.admin_id, foto_base64=b64,
+                descricao=f'desc-{b64}', ordem=ordem, ativa=ativa))
+        func_a2 = Funcionario(codigo=f'{a.marca[:8]}X', nome=f'Segundo {a.marca}',
+                              cpf=f'{func_a.id:011d}', data_admissao=func_a.data_admissao,
+                              admin_id=a.admin_id, ativo=True, foto_base64='principal-a2')
+        db.session.add(func_a2)
+        db.session.get(Funcionario, b.funcionario_id).foto_base64 = 'principal-b'
+        db.session.commit()
+        return a, b, func_a2.id
+
+
+def test_gera_o_tenant_com_fotos_ativas_em_ordem(cache_tmp):
+    a, b, func_a2 = _cenario()
+    resultado = gerar_cache_facial.gerar_cache(a.admin_id, workers=0)
+    assert resultado['success'] and resultado['processados'] == 2
+
+    entradas = StoreFacial(gerar_cache_facial.CACHE_PATH).entradas()
+    assert set(entradas) == {a.funcionario_id, func_a2}
+    fotos = entradas[a.funcionario_id]['embeddings']
+    assert [f['descricao'] for f in fotos] == ['desc-frente', 'desc-perfil']
+    assert np.allclose(fotos[0]['embedding'], _vetor('frente'))
+    assert entradas[func_a2]['embeddings'][0]['descricao'] == 'Foto principal'
+    assert not os.path.exists(gerar_cache_facial.CHECKPOINT_PATH)
+
+
+def test_regerar_um_tenant_preserva_os_outros(cache_tmp):
+    a, b, _ = _cenario()
+    gerar_cache_facial.gerar_cache(b.admin_id, workers=0)
+    store_facial.anexar(gerar_cache_facial.CACHE_PATH, 999999001,
+                        {'admin_id': b.admin_id, 'embeddings': [_vetor('anexo')]})
+    gerar_cache_facial.gerar_cache(a.admin_id, workers=0)
+
+    entradas = StoreFacial(gerar_cache_facial.CACHE_PATH).entradas()
+    assert {b.funcionario_id, 999999001, a.funcionario_id} <= set(entradas)
+
+
+def test_geracao_interrompida_retoma_do_checkpoint(cache_tmp, monkeypatch):
+    a, _, _ = _cenario()
+    monkeypatch.setattr(embeddings_lote, 'TAMANHO_LOTE', 1)
+    chamadas = []
+
+    def quebra_no_segundo_lote(itens):
+        chamadas.append([c for c, _ in itens])
+        if len(chamadas) == 2:
+            raise RuntimeError('worker reciclado')
+        return processar_falso(itens)
+
+    monkeypatch.setattr(embeddings_lote, 'processar_lote', quebra_no_segundo_lote)
+    with pytest.raises(RuntimeError):
+        gerar_cache_facial.gerar_cache(a.admin_id, workers=0)
+    assert os.path.exists(gerar_cache_facial.CHECKPOINT_PATH)
+
+    chamadas.clear()
+    monkeypatch.setattr(embeddings_lote, 'processar_lote',
+                        lambda itens: chamadas.append([c for c, _ in itens]) or processar_falso(itens))
+    resultado = gerar_cache_facial.gerar_cache(a.admin_id, workers=0)
+    assert resultado['retomadas'] == 1
+    assert len(chamadas) == 3                       # 4 fotos, 1 já feita
+    # Parâmetros diferentes não reaproveitam o checkpoint de outro job.
+    assert gerar_cache_facial._ler_checkpoint({'admin_id': -1}) == {}
+
+
+def test_pool_de_processos_devolve_todos_os_lotes():
+    itens = [(f'foto:{i}', f'b64-{i}') for i in range(50)]
+    recebidos = []
+    embeddings_lote.gerar_em_lote(iter(itens), recebidos.extend, workers=2,
+                                  tamanho_lote=7, processar=processar_falso,
+                                  inicializar=_inicializar_nada)
+    assert sorted(recebidos) == sorted(processar_falso(itens))
+
+
+def _inicializar_nada():
+    pass
+
+
+def test_job_em_background_reporta_progresso_e_um_por_vez(cache_tmp, monkeypatch):
+    a, _, _ = _cenario()
+    liberar = threading.Event()
+
+    def processar_lento(itens):
+        liberar.wait(10)
+        return processar_falso(itens)
+
+    monkeypatch.setattr(embeddings_lote, 'processar_lote', processar_lento)
+    monkeypatch.setenv('SIGE_FACIAL_WORKERS', '0')    # closure: sem pool
+    iniciado, status = gerar_cache_facial.iniciar_job_cache(a.admin_id)
+    assert iniciado and status['estado'] == 'executando'
+    outro, _ = gerar_cache_facial.iniciar_job_cache(a.admin_id)
+    assert not outro
+
+    liberar.set()
+    for _ in range(100):
+        status = gerar_cache_facial.status_job_cache()
+        if status['estado'] != 'executando':
+            break
+        time.sleep(0.05)
+    assert status['estado'] == 'concluido'
+    assert status['feitas'] == status['total'] == 4
+    assert status['resultado']['processados'] == 2
+
+
+def test_status_de_job_morto_vira_interrompido(cache_tmp):
+    gerar_cache_facial._gravar_status({'estado': 'executando', 'feitas': 3})
+    assert gerar_cache_facial.status_job_cache()['estado'] == 'interrompido'
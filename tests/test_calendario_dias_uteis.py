@@ -0,0 +1,106 @@
+"""Índice de dias úteis (services/calendario_dias_uteis).
+
+Testes UNITÁRIOS, sem DB/app. O índice substituiu os laços dia a dia de três
+módulos (engine antigo, scheduler, físico-financeiro); a garantia que importa
+é responder EXATAMENTE o que os laços respondiam — então a referência aqui é
+o próprio laço, reescrito no teste, comparado em milhares de datas sorteadas
+para cada configuração de calendário (sábado/domingo úteis ou não, com e sem
+feriados), incluindo datas fora da faixa inicial do índice.
+"""
+import os
+import random
+import sys
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.calendario_dias_uteis import CalendarioDiasUteis, obter_calendario
+from services.cronograma_fisico_financeiro import fasear_por_dias_uteis
+
+
+def _util(d, sab, dom, feriados):
+    if d.weekday() == 5 and not sab:
+        return False
+    if d.weekday() == 6 and not dom:
+        return False
+    return d not in feriados
+
+
+def _somar_dia_a_dia(d, n, sab, dom, feriados):
+    if n == 0:
+        while not _util(d, sab, dom, feriados):
+            d += timedelta(days=1)
+        return d
+    passo = 1 if n > 0 else -1
+    restantes = abs(n)
+    while restantes > 0:
+        d += timedelta(days=passo)
+        if _util(d, sab, dom, feriados):
+            restantes -= 1
+    return d
+
+
+def _contar_dia_a_dia(inicio, fim, sab, dom, feriados):
+    total, d = 0, inicio
+    while d <= fim:
+        total += _util(d, sab, dom, feriados)
+        d += timedelta(days=1)
+    return total
+
+
+CONFIGS = [(sab, dom, fer) for sab in (False, True) for dom in (False, True)
+           for fer in (False, True)]
+
+
+@pytest.mark.parametrize('sab,dom,com_feriados', CONFIGS)
+def test_indice_identico_ao_laco_dia_a_dia(sab, dom, com_feriados):
+    rnd = random.Random(hash((sab, dom, com_feriados)))
+    feriados = set()
+    if com_feriados:
+        feriados = {date(2026, 1, 1) + timedelta(days=rnd.randint(0, 700))
+                    for _ in range(40)}
+    cal = CalendarioDiasUteis(sab, dom, feriados)
+    for _ in range(1500):
+        # 1995–2050: atravessa as duas bordas da faixa inicial (2000–2040).
+        d = date(1995, 1, 1) + timedelta(days=rnd.randint(0, 20000))
+        n = rnd.randint(-300, 300)
+        assert cal.somar(d, n) == _somar_dia_a_dia(d, n, sab, dom, feriados), (d, n)
+        fim = d + timedelta(days=rnd.randint(-5, 400))
+        assert cal.contar(d, fim) == _contar_dia_a_dia(d, fim, sab, dom, feriados)
+        assert cal.eh_util(d) == _util(d, sab, dom, feriados)
+
+
+def test_proximo_e_anterior_normalizam_fim_de_semana():
+    cal = obter_calendario(False, False)
+    sab, dom, seg, sex = (date(2026, 7, 11), date(2026, 7, 12),
+                          date(2026, 7, 13), date(2026, 7, 10))
+    assert cal.proximo(sab) == seg and cal.proximo(dom) == seg
+    assert cal.anterior(sab) == sex and cal.anterior(dom) == sex
+    assert cal.proximo(seg) == seg and cal.anterior(seg) == seg
+
+
+def test_datas_muito_fora_da_faixa_estendem_o_indice():
+    cal = CalendarioDiasUteis()
+    assert cal.somar(date(1900, 1, 1), 5) == date(1900, 1, 8)
+    assert cal.somar(date(2200, 1, 1), -5) == date(2199, 12, 25)
+    assert cal.contar(date(1899, 12, 25), date(1900, 1, 7)) == 10
+
+
+def test_obter_calendario_compartilha_a_instancia():
+    assert obter_calendario(True, False) is obter_calendario(True, False)
+    assert obter_calendario(True, False) is not obter_calendario(False, False)
+
+
+def test_fasear_conserva_total_e_reparte_por_mes():
+    # 15/01 a 03/03/2026, seg–sex: 12 + 20 + 2 = 34 dias úteis.
+    out = fasear_por_dias_uteis(Decimal('3400.00'), date(2026, 1, 15),
+                                date(2026, 3, 3), False, False)
+    assert out == {'2026-01': Decimal('1200.00'), '2026-02': Decimal('2000.00'),
+                   '2026-03': Decimal('200.00')}
+    # Só fim de semana no intervalo → não faseado.
+    assert list(fasear_por_dias_uteis(Decimal('10'), date(2026, 7, 11),
+                                      date(2026, 7, 12), False, False)) == [
+        '__nao_faseado__']
@@ -385,3 +385,74 @@ def test_regra_vencedora_expoe_a_regra_que_classificou():
     assert venc is especifica   # menor prioridade vence
 
     assert regra_vencedora(_lanc(descricao="nada casa aqui"), ctx) is None
+
+
+def test_regras_compiladas_decidem_igual_a_varredura_regra_a_regra():
+    """O autômato (um Aho–Corasick por tipo e campo) escolhe a MESMA Regra que a
+    varredura regra a regra, sobre as Regras do sistema + Regras de usuário com
+    exceção, gatilho extra, fronteira de espaço, padrão contido em outro
+    ('art ' × 'martins'), gatilho vazio e campo desconhecido."""
+    import random
+    from services.classificador_cadastro import _vencedora_por_varredura
+    from services.seed_palavras_chave import regras_sistema
+
+    regras = regras_sistema() + [
+        _regra(["martins"], 90, "Subempreitada", campo_alvo="fornecedor", prioridade=30),
+        _regra(["art ", "mart"], 91, "Taxas de Obra / ART / Licenças", excecoes=["martelo"]),
+        _regra(["cimento"], 92, "Materiais de Obra", condicao_obra="com_obra", prioridade=5),
+        _regra([""], 93, "Outras Saídas", campo_alvo="plano", prioridade=99),
+        _regra(["obra"], 94, "Transporte de Obra", campo_alvo="placa", prioridade=1),
+        Regra(palavras=["posto"], categoria_id=95, categoria_nome="Combustível e Frota",
+              gatilho_extra=["diesel", "gasolina"], campo_extra="descricao", prioridade=8),
+    ]
+    vocabulario = [p for r in regras for p in r.palavras + r.excecoes + r.gatilho_extra]
+    vocabulario += ["martelo", "Martins", "pagamento", "Ltda", "JOSÉ", "x"]
+    sorteio = random.Random(2026)
+
+    def _texto(n):
+        return " ".join(sorteio.choice(vocabulario) for _ in range(n))
+
+    ctx = Contexto(regras=regras, memoria_exata={})
+    casou = 0
+    for _ in range(1500):
+        lanc = _lanc(descricao=_texto(3), fornecedor=_texto(2), plano=_texto(1),
+                     tem_obra=sorteio.random() < 0.5,
+                     tipo=sorteio.choice(["SAIDA", "ENTRADA"]))
+        esperada = _vencedora_por_varredura(lanc, regras)
+        assert regra_vencedora(lanc, ctx) is esperada, lanc
+        casou += esperada is not None
+    assert casou > 500          # o sorteio exercita de fato as Regras
+
+
+def test_compilacao_e_reaproveitada_ate_o_cadastro_mudar():
+    """Mesmas Regras (outros objetos, como a cada request) → mesmo compilado;
+    uma Regra editada → outro compilado, e o veredito acompanha."""
+    from services.classificador_cadastro import compilar
+
+    def _cadastro(prioridade):
+        return [_regra(["cabo"], 20, "Materiais de Obra", prioridade=prioridade),
+                _regra(["instalacao"], 30, "Serviços Terceirizados", prioridade=50)]
+
+    assert compilar(_cadastro(90)) is compilar(_cadastro(90))
+    editado = _cadastro(10)
+    assert compilar(editado) is not compilar(_cadastro(90))
+
+    lanc = _lanc(descricao="instalacao dos cabos")
+    assert classificar(lanc, Contexto(regras=_cadastro(90))).categoria_id == 30
+    assert classificar(lanc, Contexto(regras=editado)).categoria_id == 20
+
+
+def test_regra_editada_no_lugar_recompila_o_contexto():
+    """O mesmo Contexto, com a lista editada no lugar sem mudar de tamanho
+    (troca de um item, ou um campo de uma Regra), não reaproveita o
+    compilado antigo."""
+    ctx = Contexto(regras=[_regra(["cabo"], 20, "Materiais de Obra", prioridade=90),
+                           _regra(["instalacao"], 30, "Serviços Terceirizados")])
+    lanc = _lanc(descricao="instalacao dos cabos")
+    assert classificar(lanc, ctx).categoria_id == 30
+
+    ctx.regras[0].prioridade = 10
+    assert classificar(lanc, ctx).categoria_id == 20
+
+    ctx.regras[0] = _regra(["fio"], 40, "Materiais Elétricos", prioridade=1)
+    assert classificar(lanc, ctx).categoria_id == 30
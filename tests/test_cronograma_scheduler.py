@@ -12,13 +12,15 @@ funções). Cobertura (§Step E item 1 do plano):
     "não começar antes de" (sem predecessora mantém o próprio início);
   * folga/caminho crítico: cadeia linear toda crítica; ramo paralelo curto
     com folga > 0; pai is_critica = any(filhas);
-  * roll-up min/max/duração em DOIS níveis de hierarquia.
+  * roll-up min/max/duração em DOIS níveis de hierarquia;
+  * modo incremental: idêntico ao completo em obras sorteadas, e só
+    revisita o que a edição alcança.
 
 Datas de referência: semana de 2026-07-06 (segunda-feira).
 """
 import os
 import sys
-from datetime import date
+from datetime import date, timedelta
 
 import pytest
 
@@ -29,6 +31,7 @@ from services.cronograma_scheduler import (
     NoTarefa,
     VinculoSpec,
     calcular_agendamento,
+    calcular_agendamento_incremental,
     detectar_ciclo,
     dia_util_anterior,
     duracao_util_entre,
@@ -410,3 +413,127 @@ def test_ancorada_com_fim_gravado_em_fim_de_semana_nao_e_derivada():
     res = calcular_agendamento(nos, [_v(1, 2)], hoje=SEG)
     assert (res[1].inicio, res[1].fim) == (SAB, SAB)
     assert res[2].inicio == SEG2      # dia útil seguinte a SAB
+
+
+# ---------------------------------------------------------------------------
+# Modo incremental — idêntico ao completo
+# ---------------------------------------------------------------------------
+
+import random  # noqa: E402
+
+
+def _gravar(nos, resultados):
+    """O que `recalcular_obra` persiste: o estado de partida do incremental."""
+    for n in nos:
+        r = resultados[n.id]
+        n.inicio, n.fim, n.duracao = r.inicio, r.fim, r.duracao
+        n.folga_dias, n.is_critica = r.folga_dias, r.is_critica
+
+
+def _obra_sorteada(rnd, n_folhas=40):
+    nos, vinculos, folhas = [], [], []
+    for g in range(4):
+        nos.append(_no(1000 + g, f'Grupo {g}', dur=0))
+    nos.append(_no(2000, 'Etapa', dur=0))
+    nos[0].pai_id = nos[1].pai_id = 2000
+    for i in range(1, n_folhas + 1):
+        no = _no(i, dur=rnd.randint(0, 12), pai=rnd.choice([None, 1000, 1001,
+                                                             1002, 1003]),
+                 inicio=(SEG + timedelta(days=rnd.randint(-10, 30))
+                         if rnd.random() < 0.9 else None),
+                 marco=rnd.random() < 0.05, ancorada=rnd.random() < 0.1)
+        if no.ancorada:
+            no.fim = (fim_por_duracao(no.inicio, no.duracao)
+                      if no.inicio and rnd.random() < 0.7 else None)
+        nos.append(no)
+        # Vínculos só de folhas anteriores: acíclico por construção.
+        for pred in rnd.sample(folhas, min(len(folhas), rnd.randint(0, 2))):
+            vinculos.append(_v(pred.id, i, rnd.choice(('TI', 'II', 'TT', 'IT')),
+                               rnd.randint(-2, 4)))
+        folhas.append(no)
+    return nos, vinculos, folhas
+
+
+def _editar(rnd, nos, vinculos, folhas):
+    """Edita 1–3 folhas como o editor faz; devolve (alteradas, anteriores)."""
+    alteradas, anteriores = set(), {}
+    for no in rnd.sample(folhas, rnd.randint(1, 3)):
+        alteradas.add(no.id)
+        anteriores[no.id] = (no.inicio, no.fim)
+        mudanca = rnd.choice(('duracao', 'inicio', 'marco', 'vinculos'))
+        if mudanca == 'duracao':
+            no.duracao = rnd.randint(0, 20)
+        elif mudanca == 'inicio':
+            no.inicio = SEG + timedelta(days=rnd.randint(-15, 40))
+        elif mudanca == 'marco':
+            no.is_marco = not no.is_marco
+        else:
+            removidos = [v for v in vinculos if v.sucessora_id == no.id]
+            alteradas.update(v.predecessora_id for v in removidos)
+            vinculos[:] = [v for v in vinculos if v.sucessora_id != no.id]
+            anteriores_a_ele = [f for f in folhas if f.id < no.id]
+            for pred in rnd.sample(anteriores_a_ele,
+                                   min(len(anteriores_a_ele), rnd.randint(0, 2))):
+                vinculos.append(_v(pred.id, no.id,
+                                   rnd.choice(('TI', 'II', 'TT', 'IT')),
+                                   rnd.randint(-2, 4)))
+    for tid in alteradas - set(anteriores):
+        no = next(n for n in nos if n.id == tid)
+        anteriores[tid] = (no.inicio, no.fim)
+    return alteradas, anteriores
+
+
+@pytest.mark.parametrize('semente', range(60))
+def test_incremental_identico_ao_completo(semente):
+    rnd = random.Random(semente)
+    nos, vinculos, folhas = _obra_sorteada(rnd)
+    _gravar(nos, calcular_agendamento(nos, vinculos, hoje=SEG))
+
+    alteradas, anteriores = _editar(rnd, nos, vinculos, folhas)
+    completo = calcular_agendamento(nos, vinculos, hoje=SEG)
+    parcial = calcular_agendamento_incremental(
+        nos, vinculos, alteradas, hoje=SEG, anteriores=anteriores)
+
+    gravado = {n.id: (n.inicio, n.fim, int(n.duracao or 0), n.folga_dias,
+                      bool(n.is_critica)) for n in nos}
+    for tid, r in completo.items():
+        obtido = parcial.get(tid)
+        obtido = ((obtido.inicio, obtido.fim, obtido.duracao, obtido.folga_dias,
+                   obtido.is_critica) if obtido else gravado[tid])
+        assert obtido == (r.inicio, r.fim, r.duracao, r.folga_dias,
+                          r.is_critica), f'tarefa {tid}'
+
+
+def test_incremental_sem_datas_anteriores_refaz_a_folga_da_obra_toda():
+    rnd = random.Random(7)
+    nos, vinculos, folhas = _obra_sorteada(rnd)
+    _gravar(nos, calcular_agendamento(nos, vinculos, hoje=SEG))
+    folhas[5].duracao += 3
+    parcial = calcular_agendamento_incremental(nos, vinculos, {folhas[5].id},
+                                               hoje=SEG)
+    completo = calcular_agendamento(nos, vinculos, hoje=SEG)
+    assert {f.id for f in folhas} <= set(parcial)
+    for tid, r in parcial.items():
+        assert r == completo[tid]
+
+
+def test_incremental_so_revisita_o_que_a_edicao_alcanca():
+    # Duas cadeias independentes de 10; editar a mais curta não toca a outra
+    # (nem o fim do projeto, que é da mais longa).
+    nos = [_no(i, inicio=SEG, dur=1 if i <= 10 else 3) for i in range(1, 21)]
+    vinculos = ([_v(i, i + 1) for i in range(1, 10)]
+                + [_v(i, i + 1) for i in range(11, 20)])
+    _gravar(nos, calcular_agendamento(nos, vinculos, hoje=SEG))
+    nos[8].duracao = 2                          # penúltima da 1ª cadeia
+    parcial = calcular_agendamento_incremental(
+        nos, vinculos, {9}, hoje=SEG, anteriores={9: (nos[8].inicio, nos[8].fim)})
+    assert set(parcial) <= set(range(1, 11))
+    assert parcial[10].inicio == somar_dias_uteis(parcial[9].fim, 1)
+
+
+def test_incremental_com_pai_alterado_cai_no_completo():
+    nos = [_no(1, 'Pai', dur=0), _no(2, dur=2, inicio=SEG, pai=1),
+           _no(3, dur=1, inicio=SEG)]
+    _gravar(nos, calcular_agendamento(nos, [], hoje=SEG))
+    parcial = calcular_agendamento_incremental(nos, [], {1}, hoje=SEG)
+    assert parcial == calcular_agendamento(nos, [], hoje=SEG)
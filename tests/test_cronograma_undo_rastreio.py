@@ -0,0 +1,149 @@
+"""Desfazer do cronograma sem snapshot da obra (services/cronograma_undo).
+
+`_com_undo` não tira mais `snapshot_obra` antes e depois de cada ação: o
+`Rastreio` anota, pelos eventos da sessão, só as linhas que a rota tocou.
+Aqui cada rota do editor roda com um espião que calcula, em paralelo, o diff
+dos dois snapshots inteiros — os payloads empilhados têm de ser os mesmos,
+inclusive na exclusão (UPDATE/DELETE em massa), na criação, na cascata de
+datas e na rota que falha e faz rollback. E o custo do rastreio não cresce
+com o cronograma: numa obra de 3.000 tarefas, renomear uma lê uma linha.
+"""
+import os
+import sys
+from datetime import date
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: F401 — registra os blueprints
+from app import app, db
+from models import Obra, TarefaCronograma, TarefaVinculo, Usuario
+
+from test_cronograma_endpoints_m05 import _client_como
+from test_cronograma_undo_api import _acoes, _base, _cenario, _config  # noqa: F401
+from test_cronograma_versao_service import _rdo_com_apontamento, _tarefa
+
+pytestmark = pytest.mark.integration
+
+
+@pytest.fixture
+def espiao(monkeypatch):
+    """Compara, a cada ação, o payload do rastreio com o dos snapshots."""
+    import cronograma_views
+    from services import cronograma_undo
+
+    pendentes, comparados = [], []
+    iniciar, registrar = cronograma_views.iniciar_rastreio, cronograma_views.registrar_acao
+
+    def _iniciar(obra_id, admin_id, cliente):
+        pendentes.append(cronograma_undo.snapshot_obra(obra_id, admin_id, cliente))
+        return iniciar(obra_id, admin_id, cliente)
+
+    def _registrar(obra_id, admin_id, usuario_id, cliente, tipo_acao, rastreio):
+        esperado = cronograma_undo.diff_snapshots(
+            pendentes.pop(), cronograma_undo.snapshot_obra(obra_id, admin_id, cliente))
+        acao = registrar(obra_id, admin_id, usuario_id, cliente, tipo_acao, rastreio)
+        obtido = (acao.payload_antes, acao.payload_depois) if acao else (None, None)
+        comparados.append((tipo_acao, obtido, esperado))
+        return acao
+
+    monkeypatch.setattr(cronograma_views, 'iniciar_rastreio', _iniciar)
+    monkeypatch.setattr(cronograma_views, 'registrar_acao', _registrar)
+    return comparados
+
+
+def _confere(comparados, n):
+    assert len(comparados) == n
+    for tipo_acao, obtido, esperado in comparados:
+        assert obtido == esperado, tipo_acao
+
+
+def test_payload_do_rastreio_e_o_dos_snapshots(espiao):
+    ctx = _cenario(com_vinculo=True)      # A →TI/0→ B
+    with app.app_context():
+        obra = db.session.get(Obra, ctx['obra_id'])
+        admin = db.session.get(Usuario, ctx['admin_id'])
+        c_id = _tarefa(obra, admin, 'Cobertura', ordem=2, duracao_dias=2,
+                       data_inicio=date(2026, 7, 1), data_fim=date(2026, 7, 2)).id
+        d_id = _tarefa(obra, admin, 'Acabamento', ordem=3, duracao_dias=4).id
+        _rdo_com_apontamento(obra, admin, db.session.get(TarefaCronograma, c_id))
+    c = _client_como(ctx['admin_id'])
+    base = _base(ctx)
+
+    def passo(resposta, status):
+        assert resposta.status_code == status, resposta.get_data(as_text=True)
+        return resposta.get_json()
+
+    passo(c.post(f'{base}/recalcular'), 200)                       # fora do undo
+    passo(c.put(f"{base}/tarefa/{ctx['a_id']}", json={'nome_tarefa': 'Fundação rasa'}), 200)
+    passo(c.put(f"{base}/tarefa/{ctx['a_id']}", json={'duracao_dias': 10}), 200)  # cascata
+    passo(c.put(f"{base}/tarefa/{c_id}", json={'data_inicio': '2026-08-03'}), 400)  # iniciada
+    p_id = passo(c.post(f'{base}/tarefa', json={'nome_tarefa': 'Pintura', 'duracao_dias': 3}),
+                 201)['tarefa']['id']
+    passo(c.post(f'{base}/tarefa/{p_id}/recuar'), 200)
+    passo(c.post(f'{base}/tarefa/{p_id}/desrecuar'), 200)
+    passo(c.post(f'{base}/tarefa/{c_id}/mover', json={'novo_pai_id': d_id}), 200)
+    passo(c.post(f'{base}/vinculo', json={'predecessora_id': ctx['b_id'], 'sucessora_id': p_id,
+                                          'tipo': 'TI', 'lag_dias': 1}), 201)
+    passo(c.put(f"{base}/vinculo/{ctx['vinculo_id']}", json={'tipo': 'II', 'lag_dias': 2}), 200)
+    passo(c.post(f'{base}/reordenar',
+                 json={'ordem': [ctx['b_id'], ctx['a_id'], d_id, c_id, p_id]}), 200)
+    passo(c.delete(f"{base}/tarefa/{ctx['a_id']}"), 200)      # vínculos em massa
+    passo(c.delete(f"{base}/tarefa/{d_id}"), 200)             # re-parent em massa
+    n_passos = 12
+
+    _confere(espiao, n_passos)
+    vazios = [tipo for tipo, obtido, _ in espiao if obtido == (None, None)]
+    assert vazios == ['editar_tarefa']               # só a rota que falhou
+    assert len(_acoes(ctx['obra_id'])) == n_passos - 1
+
+    # E o payload do rastreio desfaz as exclusões: o re-parent da filha e os
+    # vínculos da tarefa voltam.
+    passo(c.post(f'{base}/desfazer'), 200)
+    passo(c.post(f'{base}/desfazer'), 200)
+    with app.app_context():
+        assert db.session.get(TarefaCronograma, c_id).tarefa_pai_id == d_id
+        a = db.session.get(TarefaCronograma, ctx['a_id'])
+        assert a.ativa is True and a.arquivada_em is None
+        assert TarefaVinculo.query.filter_by(predecessora_id=ctx['a_id'],
+                                             sucessora_id=ctx['b_id']).one().tipo == 'II'
+
+
+def test_rastreio_nao_le_a_obra_inteira():
+    from sqlalchemy import event
+
+    from services.cronograma_undo import iniciar_rastreio, registrar_acao
+    from services.gravacao_lote import inserir
+
+    with app.app_context():
+        ctx = _cenario()
+        inserir(TarefaCronograma, [dict(
+            obra_id=ctx['obra_id'], admin_id=ctx['admin_id'], is_cliente=False,
+            nome_tarefa=f'Tarefa {i}', ordem=10 + i, duracao_dias=1,
+            data_inicio=date(2026, 7, 1), data_fim=date(2026, 7, 1), ativa=True)
+            for i in range(3000)])
+        db.session.commit()
+
+        linhas = [0]
+
+        def _contar(_con, cursor, statement, *_a):
+            if statement.lstrip().upper().startswith('SELECT'):
+                linhas[0] += cursor.rowcount
+
+        event.listen(db.engine, 'after_cursor_execute', _contar)
+        try:
+            rastreio = iniciar_rastreio(ctx['obra_id'], ctx['admin_id'], False)
+            db.session.get(TarefaCronograma, ctx['a_id']).nome_tarefa = 'Fundação funda'
+            db.session.commit()
+            rastreio.encerrar()
+            acao = registrar_acao(ctx['obra_id'], ctx['admin_id'], ctx['admin_id'], False,
+                                  'editar_tarefa', rastreio)
+        finally:
+            event.remove(db.engine, 'after_cursor_execute', _contar)
+
+        assert acao.payload_antes == {'tarefas': {str(ctx['a_id']): {'nome_tarefa': 'Fundação'}},
+                                      'vinculos': {}}
+        assert acao.payload_depois['tarefas'] == {str(ctx['a_id']): {'nome_tarefa': 'Fundação funda'}}
+        # A tarefa (get), o antes e o depois dela, e a poda da pilha.
+        assert linhas[0] < 10
@@ -7,6 +7,8 @@ Cobre o Step C do plano `2026-07-24-cronograma-fase1-plano.md`:
     auto-vínculo → 400, tarefa-resumo → 400, edição de tipo/lag, exclusão;
   * rotas de vínculo "não existem" (404) com a flag desligada;
   * PUT `duracao_dias` com flag on devolve a cascata em `tarefas_afetadas`;
+  * PUTs em sequência (recálculo incremental) deixam o banco igual ao
+    recálculo completo;
   * PUT `data_inicio` de tarefa com apontamento de RDO → 400 (âncora);
   * PUT `predecessoras_texto` (formato Project) cria vínculos e congela
     `predecessora_id`;
@@ -259,6 +261,35 @@ def test_put_duracao_com_flag_on_devolve_cascata():
     assert b['data_fim'] == '2026-07-17'
 
 
+def test_puts_em_sequencia_deixam_o_banco_como_o_recalculo_completo():
+    """O PUT recalcula INCREMENTAL a partir da tarefa editada; depois de
+    várias edições, um recálculo completo não pode achar nada a corrigir."""
+    from services.cronograma_scheduler import recalcular_obra
+
+    ctx = _cenario(com_vinculo=True)
+    with app.app_context():
+        obra = db.session.get(Obra, ctx['obra_id'])
+        admin = db.session.get(Usuario, ctx['admin_id'])
+        c_id = _tarefa(obra, admin, 'Reboco', ordem=2, duracao_dias=4,
+                       data_inicio=date(2026, 7, 1)).id
+        d_id = _tarefa(obra, admin, 'Pintura', ordem=3, duracao_dias=2,
+                       data_inicio=date(2026, 7, 1)).id
+    c = _client_como(ctx['admin_id'])
+    edicoes = [(ctx['a_id'], {'duracao_dias': 8}),
+               (c_id, {'predecessoras_texto': '2TT+1'}),
+               (d_id, {'predecessoras_texto': '3;1II'}),
+               (ctx['b_id'], {'duracao_dias': 2}),
+               (d_id, {'predecessoras_texto': '1II+3'}),
+               (ctx['a_id'], {'data_inicio': '2026-07-06'})]
+    for tarefa_id, corpo in edicoes:
+        r = c.put(f"{_base(ctx)}/tarefa/{tarefa_id}", json=corpo)
+        assert r.status_code == 200, r.get_data(as_text=True)
+
+    with app.app_context():
+        resultado = recalcular_obra(ctx['obra_id'], ctx['admin_id'])
+        assert resultado.tarefas_afetadas == []
+
+
 def test_put_data_inicio_de_tarefa_com_apontamento_400():
     ctx = _cenario()
     with app.app_context():
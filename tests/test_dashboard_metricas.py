@@ -0,0 +1,187 @@
+"""Dashboard principal em consultas agregadas (services/dashboard_metricas).
+
+Três garantias:
+
+  1. os números são os que a view calculava fonte a fonte — a mão de obra
+     bate com a soma de `calcular_metricas_funcionario`, e nada do outro
+     tenant entra;
+  2. o cache por tenant responde sem ir ao banco e um commit que toca o
+     tenant o invalida — só o dele;
+  3. o `/dashboard` inteiro cabe num orçamento fixo de consultas, que não
+     cresce com o número de funcionários/registros do tenant. Se alguém
+     voltar a contar com um `.count()` por número ou a iterar funcionário a
+     funcionário, este teste fica vermelho.
+"""
+import os
+import sys
+import uuid
+from contextlib import contextmanager
+from datetime import date
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from helpers_tenant import cliente_de, dois_tenants
+from models import CustoObra, Funcionario, Proposta, RegistroPonto
+from services import dashboard_metricas
+from services.funcionario_metrics import calcular_metricas_funcionario
+
+pytestmark = pytest.mark.integration
+
+INI, FIM = date(2026, 6, 1), date(2026, 6, 30)
+HOJE = date(2026, 7, 1)
+
+# Consultas de um GET /dashboard com o cache desligado: sessão/usuário,
+# métricas agregadas (~8), funcionários recentes, obras ativas e o progresso
+# de cada uma (até 5), funções, custos por obra e série temporal. Medido na
+# criação: 23 (antes: 62 com 1 funcionário, 146 com 13); a folga é para
+# flags/permissões lidas no caminho.
+ORCAMENTO_DASHBOARD = 28
+
+
+@pytest.fixture(autouse=True)
+def _cache_limpo():
+    dashboard_metricas.invalidar()
+    yield
+    dashboard_metricas.invalidar()
+
+
+@contextmanager
+def _contando():
+    from sqlalchemy import event as sa_event
+
+    with app.app_context():     # a request do test client empilha o próprio
+        engine = db.engine
+    contador = {'n': 0}
+
+    def _conta(*_a):
+        contador['n'] += 1
+
+    sa_event.listen(engine, 'before_cursor_execute', _conta)
+    try:
+        yield contador
+    finally:
+        sa_event.remove(engine, 'before_cursor_execute', _conta)
+
+
+def _proposta(admin_id, status, data, valor=0, validade=7):
+    db.session.add(Proposta(numero=f'DM-{uuid.uuid4().hex[:8]}', admin_id=admin_id,
+                            cliente_nome='Cliente', data_proposta=data, status=status,
+                            valor_total=valor, validade_dias=validade))
+
+
+def _semear(t):
+    """Propostas de todos os status, custos de transporte/outros e uma falta
+    justificada, no tenant `t` (que já tem os 3 fatos do helper)."""
+    _proposta(t.admin_id, 'aprovada', date(2026, 6, 3), valor=1000)
+    _proposta(t.admin_id, 'aprovada', date(2026, 6, 4), valor=3000)
+    _proposta(t.admin_id, 'aprovada', date(2026, 6, 5), valor=0)       # fora da média
+    _proposta(t.admin_id, 'enviada', date(2026, 6, 20), validade=30)
+    _proposta(t.admin_id, 'enviada', date(2026, 5, 1))                  # expirada, fora
+    _proposta(t.admin_id, 'enviada', date(2026, 6, 10), validade=0)     # 0 vale 7: expirada
+    _proposta(t.admin_id, 'rascunho', date(2026, 6, 7))
+    _proposta(t.admin_id, 'rejeitada', date(2026, 6, 8))
+    for tipo, valor in (('transporte', 100.0), ('veiculo', 20.0), ('outros', 50.0),
+                        ('servico', 5.0)):
+        db.session.add(CustoObra(obra_id=t.obra_id, admin_id=t.admin_id, tipo=tipo,
+                                 descricao=tipo, valor=valor, data=date(2026, 6, 9)))
+    db.session.add(RegistroPonto(funcionario_id=t.funcionario_id, obra_id=t.obra_id,
+                                 admin_id=t.admin_id, data=date(2026, 6, 16),
+                                 tipo_registro='falta_justificada'))
+    db.session.commit()
+
+
+def test_numeros_do_tenant_sem_vazar_o_outro():
+    with app.app_context():
+        a, b = dois_tenants('dash')
+        _semear(a)
+        m = dashboard_metricas.metricas(a.admin_id, INI, FIM, hoje=HOJE)
+
+        assert (m['total_funcionarios'], m['total_obras'], m['total_veiculos']) == (1, 1, 0)
+        assert [m[f'propostas_{s}'] for s in ('aprovadas', 'enviadas', 'rascunho', 'rejeitadas')] \
+            == [3, 2, 1, 1]
+        assert m['total_propostas'] == 7
+        assert m['propostas_expiradas'] == 2
+        assert m['taxa_conversao'] == round(3 / 6 * 100, 1)
+        assert m['valor_medio'] == 2000.0
+
+        c = m['custos_detalhados']
+        assert c['transporte'] == 120.0 and c['outros'] == 55.0
+        assert c['alimentacao'] == 25.0 and c['material'] == 0
+        # 3000 ÷ 22 dias úteis de junho/2026, por falta justificada.
+        assert c['faltas_justificadas_qtd'] == 1
+        assert c['faltas_justificadas'] == pytest.approx(3000 / 22)
+        func = db.session.get(Funcionario, a.funcionario_id)
+        esperado = calcular_metricas_funcionario(func, INI, FIM, a.admin_id)
+        assert c['mao_obra'] == pytest.approx(esperado['custo_mao_obra'])
+        assert m['total_horas'] == pytest.approx(esperado['horas_trabalhadas'])
+        assert c['total'] == pytest.approx(c['mao_obra'] + 120 + 55 + 25)
+
+        outro = dashboard_metricas.metricas(b.admin_id, INI, FIM, hoje=HOJE)
+        assert outro['total_propostas'] == 0
+        assert outro['custos_detalhados']['transporte'] == 0
+
+
+def test_cache_responde_sem_banco_e_commit_invalida_so_o_tenant():
+    with app.app_context():
+        a, b = dois_tenants('dashc', com_fatos=False)
+        for t in (a, b):
+            dashboard_metricas.metricas(t.admin_id, INI, FIM, hoje=HOJE)
+        with _contando() as n:
+            dashboard_metricas.metricas(a.admin_id, INI, FIM, hoje=HOJE)
+        assert n['n'] == 0
+
+        _proposta(b.admin_id, 'rascunho', date(2026, 6, 2))
+        db.session.commit()
+        with _contando() as n:
+            dashboard_metricas.metricas(a.admin_id, INI, FIM, hoje=HOJE)
+        assert n['n'] == 0
+        assert dashboard_metricas.metricas(
+            b.admin_id, INI, FIM, hoje=HOJE)['propostas_rascunho'] == 1
+
+        # Rollback não grava nada — e não deixa o cache servir dado errado.
+        _proposta(a.admin_id, 'rascunho', date(2026, 6, 2))
+        db.session.flush()
+        db.session.rollback()
+        assert dashboard_metricas.metricas(
+            a.admin_id, INI, FIM, hoje=HOJE)['propostas_rascunho'] == 0
+
+
+def _medir_dashboard(cliente):
+    with _contando() as n:
+        resposta = cliente.get('/dashboard?data_inicio=2026-06-01&data_fim=2026-06-30')
+    assert resposta.status_code == 200
+    return n['n']
+
+
+def test_dashboard_cabe_no_orcamento_de_consultas(monkeypatch):
+    monkeypatch.setenv('SIGE_DASHBOARD_TTL', '0')
+    with app.app_context():
+        a, _ = dois_tenants('dashq')
+        _semear(a)
+    cliente = cliente_de(a.admin_id)
+    _medir_dashboard(cliente)                     # aquece flags/sessão
+    pequeno = _medir_dashboard(cliente)
+    assert pequeno <= ORCAMENTO_DASHBOARD, (
+        f'/dashboard fez {pequeno} consultas (orçamento {ORCAMENTO_DASHBOARD})')
+
+    with app.app_context():
+        for i in range(12):
+            f = Funcionario(codigo=f'{a.marca[:7]}{i:02d}', nome=f'Extra {i} {a.marca}',
+                            cpf=f'{uuid.uuid4().int % 10**11:011d}',
+                            data_admissao=date(2026, 1, 2), admin_id=a.admin_id,
+                            ativo=True, salario=2000.0 + i)
+            db.session.add(f)
+            db.session.flush()
+            for dia in (10, 11, 12):
+                db.session.add(RegistroPonto(
+                    funcionario_id=f.id, obra_id=a.obra_id, admin_id=a.admin_id,
+                    data=date(2026, 6, dia), horas_trabalhadas=8.0,
+                    tipo_registro='falta_justificada' if dia == 12 else 'trabalhado'))
+        db.session.commit()
+    grande = _medir_dashboard(cliente)
+    assert grande == pequeno, (
+        f'{pequeno} consultas com 1 funcionário e {grande} com 13 — o dashboard '
+        f'voltou a consultar o banco por funcionário/registro')
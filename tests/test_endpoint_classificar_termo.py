@@ -2,8 +2,8 @@
 Fase F (Passo 14) — endpoint classificar-termo (loop ao vivo).
 
 POST /importacao/fluxo-caixa/classificar-termo: cria a Regra do usuário para o
-Termo e RECLASSIFICA o payload em memória (payload-como-estado, HMAC), devolvendo
-as seções + fila atualizadas. Sem re-upload.
+Termo e RECLASSIFICA o preview guardado no servidor (services/preview_importacao),
+devolvendo as seções + fila atualizadas. Sem re-upload.
 
 NÃO seguramos um app_context de módulo: o Flask-Login cacheia o usuário em `g`
 (que pertence ao app context), então um contexto compartilhado faria o 2º request
@@ -71,9 +71,9 @@ def _cat_id(admin_id, nome):
 
 
 def _token(payload, admin_id):
-    from importacao_views import _assinar_payload
+    from services import preview_importacao
     with app.app_context():
-        return _assinar_payload([payload], admin_id, "fluxo_caixa")
+        return preview_importacao.guardar(admin_id, "fluxo_caixa", payload)
 
 
 def _add_regra(admin_id, palavras, categoria_nome, campo_alvo="fornecedor",
@@ -93,6 +93,14 @@ def _imagem_falsa(nome='foto.jpg', cor=(200, 30, 30)):
                        content_type='image/jpeg')
 
 
+def _drenar():
+    """As versões (otimizada, thumbnail) saem da fila de
+    services/rdo_foto_versoes — na suíte, só quando o teste a drena."""
+    from services.rdo_foto_versoes import drenar
+    with app.app_context():
+        drenar()
+
+
 # ---------------------------------------------------------------------------
 # Resolução de caminho
 # ---------------------------------------------------------------------------
@@ -218,7 +226,13 @@ def test_upload_com_volume_pula_base64(tmp_path, monkeypatch):
         assert foto.imagem_otimizada_base64 is None
         assert foto.thumbnail_base64 is None
         assert foto.armazenamento == 'disco'
-        assert foto.arquivo_otimizado
+        assert foto.arquivo_original and foto.processamento == 'pendente'
+
+    _drenar()
+    with app.app_context():
+        foto = RDOFoto.query.filter_by(rdo_id=rid).first()
+        assert foto.processamento == 'pronta' and foto.arquivo_otimizado
+        assert foto.thumbnail_base64 is None
 
 
 def test_upload_sem_volume_mantem_base64(monkeypatch):
@@ -245,7 +259,13 @@ def test_upload_sem_volume_mantem_base64(monkeypatch):
         assert foto.armazenamento == 'banco', (
             'sem volume persistente a foto tem de nascer "banco" — senão '
             'some no deploy')
-        assert foto.thumbnail_base64 and foto.thumbnail_base64.startswith('data:')
+        # o original vai como veio, sem re-encode; as versões vêm da fila
+        assert foto.imagem_original_base64.startswith('data:image/jpeg;base64,')
+
+    _drenar()
+    with app.app_context():
+        foto = RDOFoto.query.filter_by(rdo_id=rid).first()
+        assert foto.thumbnail_base64 and foto.thumbnail_base64.startswith('data:image/webp')
         assert foto.imagem_otimizada_base64
 
 
@@ -260,7 +280,9 @@ def test_salvar_foto_com_volume_pula_base64(tmp_path, monkeypatch):
     assert resultado['imagem_otimizada_base64'] is None
     assert resultado['thumbnail_base64'] is None
     assert resultado['armazenamento'] == 'disco'
-    assert resultado['arquivo_otimizado'].startswith('uploads/rdo/1/1/')
+    assert resultado['arquivo_original'].startswith('uploads/blobs/')
+    assert resultado['arquivo_otimizado'] is None
+    assert resultado['processamento'] == 'pendente'
 
 
 def test_salvar_foto_sem_volume_mantem_base64(tmp_path, monkeypatch):
@@ -272,8 +294,8 @@ def test_salvar_foto_sem_volume_mantem_base64(tmp_path, monkeypatch):
     with app.app_context():
         resultado = svc.salvar_foto_rdo(_imagem_falsa(), 1, 1)
     assert resultado['armazenamento'] == 'banco'
-    assert resultado['imagem_otimizada_base64'].startswith('data:image/webp;base64,')
-    assert resultado['thumbnail_base64'].startswith('data:')
+    assert resultado['imagem_original_base64'].startswith('data:image/jpeg;base64,')
+    assert resultado['thumbnail_base64'] is None  # a fila grava junto com a versão
 
 
 def test_consulta_de_rdo_nao_carrega_base64_por_padrao():
@@ -310,6 +332,7 @@ def test_url_da_foto_e_servida_do_disco():
                  data={'fotos[]': _imagem_falsa()},
                  content_type='multipart/form-data')
 
+    _drenar()
     with app.app_context():
         foto_id = RDOFoto.query.filter_by(rdo_id=rid).first().id
 
@@ -343,9 +366,10 @@ def test_tela_com_volume_usa_url_e_nao_data_uri(tmp_path, monkeypatch):
         'a tela ainda embute a imagem inteira no HTML')
 
 
-def test_tela_sem_volume_usa_base64(monkeypatch):
-    """SEM volume, a foto é 'banco' e a tela renderiza a base64 — que é a
-    cópia que sobrevive ao deploy. Não pode tentar o disco (some no deploy)."""
+def test_tela_sem_volume_serve_a_base64_pela_url(monkeypatch):
+    """SEM volume, a foto é 'banco': a tela usa a mesma URL, e `servir_foto`
+    entrega a base64 — a cópia que sobrevive ao deploy — em vez de embuti-la
+    no HTML."""
     monkeypatch.delenv('UPLOADS_PATH', raising=False)
     with app.app_context():
         admin = _admin()
@@ -361,9 +385,22 @@ def test_tela_sem_volume_usa_base64(monkeypatch):
                  data={'fotos[]': _imagem_falsa()},
                  content_type='multipart/form-data')
 
+    _drenar()
     corpo = cliente.get(f'/rdo/{rid}').get_data(as_text=True)
-    assert 'data:image/webp;base64' in corpo, (
-        'sem volume, a tela tem de servir a base64 — o disco some no deploy')
+    assert 'data:image/webp;base64' not in corpo
+    with app.app_context():
+        foto = RDOFoto.query.filter_by(rdo_id=rid).first()
+        foto_id, esperado = foto.id, foto.thumbnail_base64
+        # o arquivo do disco efêmero sumiu no deploy: só a base64 resta
+        foto.thumbnail = None
+        foto.caminho_arquivo = 'sumiu.webp'
+        db.session.commit()
+    assert f'/rdo/foto/{foto_id}/thumbnail' in corpo
+
+    import base64
+    resposta = cliente.get(f'/rdo/foto/{foto_id}/thumbnail')
+    assert resposta.status_code == 200
+    assert resposta.data == base64.b64decode(esperado.split(',', 1)[1])
 
 
 # ---------------------------------------------------------------------------
@@ -0,0 +1,242 @@
+"""Fatos de produção de mão de obra (services/fatos_producao).
+
+A tabela `fato_producao_mao_obra` é mantida no commit. Depois de cada tipo
+de escrita — ORM, `query.delete()`/`update()` em massa, coeficiente da
+composição, status e ciclo de vida do RDO — ela tem de ser exatamente a que
+`reconstruir` daria do zero. E o ranking de um período longo não pode mais
+ler os apontamentos.
+"""
+import os
+import sys
+from datetime import date, datetime
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from models import (ComposicaoServico, FatoProducaoMaoObra, Funcao, Funcionario, Insumo,
+                    ObraOrcamentoOperacional, ObraOrcamentoOperacionalItem,
+                    ObraOrcamentoOperacionalItemVersao, RDO, RDOCustoDiario, RDOMaoObra,
+                    RDOServicoSubatividade, Servico)
+
+from helpers_tenant import um_tenant
+
+pytestmark = pytest.mark.integration
+
+INICIO, FIM = date(2026, 5, 1), date(2026, 5, 31)
+
+
+@pytest.fixture
+def cenario():
+    """Três funcionários (dois com a mesma função), dois serviços com papéis
+    e operacional, seis RDOs finalizados — um apontamento sem subatividade e
+    um dia sem custo."""
+    with app.app_context():
+        t = um_tenant('fatos', com_fatos=False)
+        a = t.admin_id
+        funcao = Funcao(nome=f'Servente {t.marca}', admin_id=a, salario_base=0)
+        db.session.add(funcao)
+        db.session.flush()
+        funcs = [db.session.get(Funcionario, t.funcionario_id)]
+        for i in range(2):
+            funcs.append(Funcionario(
+                nome=f'Func {t.marca} {i}', cpf=f'{t.marca[-6:]}{i:05d}'[:14],
+                codigo=f'FP{t.marca[-5:]}{i}', data_admissao=date(2025, 1, 1), admin_id=a,
+                tipo_remuneracao='salario', salario=3000, ativo=True, funcao_id=funcao.id))
+        db.session.add_all(funcs[1:])
+        servicos = [Servico(nome=f'Serv {t.marca} {i}', descricao='', categoria='construcao',
+                            unidade_medida='m2', admin_id=a, ativo=True) for i in range(2)]
+        insumos = [Insumo(nome=f'Papel {t.marca} {i}', tipo='MAO_OBRA', unidade='h',
+                          admin_id=a, ativo=True) for i in range(2)]
+        db.session.add_all(servicos + insumos)
+        db.session.flush()
+        comps = [ComposicaoServico(servico_id=servicos[0].id, insumo_id=insumos[0].id,
+                                   coeficiente=0.6, admin_id=a),
+                 ComposicaoServico(servico_id=servicos[0].id, insumo_id=insumos[1].id,
+                                   coeficiente=1.2, admin_id=a),
+                 ComposicaoServico(servico_id=servicos[1].id, insumo_id=insumos[1].id,
+                                   coeficiente=0.8, admin_id=a)]
+        op = ObraOrcamentoOperacional(obra_id=t.obra_id, admin_id=a)
+        db.session.add_all(comps + [op])
+        db.session.flush()
+        for servico in servicos:
+            item = ObraOrcamentoOperacionalItem(operacional_id=op.id, admin_id=a,
+                                                servico_id=servico.id, descricao='x')
+            db.session.add(item)
+            db.session.flush()
+            db.session.add(ObraOrcamentoOperacionalItemVersao(
+                item_id=item.id, admin_id=a,
+                composicao_snapshot=[{'coeficiente': 1.0, 'preco_unitario': 38.0}],
+                margem_pct=20, imposto_pct=10, vigente_de=datetime(2026, 1, 1)))
+
+        rdos = []
+        for i in range(6):
+            rdo = RDO(numero_rdo=f'FP{t.marca[-6:]}{i}', obra_id=t.obra_id,
+                      data_relatorio=date(2026, 5, 4 + 4 * i), admin_id=a, criado_por_id=a,
+                      status='Finalizado')
+            db.session.add(rdo)
+            db.session.flush()
+            rdos.append(rdo)
+            subs = [RDOServicoSubatividade(
+                rdo_id=rdo.id, servico_id=s.id, nome_subatividade=f'Sub {k}',
+                percentual_conclusao=0, admin_id=a, ativo=True,
+                quantidade_produzida=3.5 + k + i * 0.4) for k, s in enumerate(servicos)]
+            db.session.add_all(subs)
+            db.session.flush()
+            for j, func in enumerate(funcs):
+                sub = None if (i, j) == (2, 2) else subs[(i + j) % 2]
+                comp = comps[(i + j) % 3] if sub else None
+                if comp and comp.servico_id != sub.servico_id:
+                    comp = comps[2] if sub.servico_id == servicos[1].id else comps[j % 2]
+                db.session.add(RDOMaoObra(
+                    rdo_id=rdo.id, funcionario_id=func.id, funcao_exercida='Servente',
+                    horas_trabalhadas=7.5 + j * 0.5, admin_id=a,
+                    subatividade_id=sub.id if sub else None,
+                    composicao_servico_id=comp.id if comp else None,
+                    vinculo_status='manual'))
+                if (i + j) % 4:
+                    db.session.add(RDOCustoDiario(
+                        rdo_id=rdo.id, funcionario_id=func.id, admin_id=a,
+                        data=rdo.data_relatorio, tipo_remuneracao_snapshot='salario',
+                        custo_total_dia=150.0 + i * 2.5, horas_normais=8,
+                        tipo_lancamento='rdo'))
+        db.session.commit()
+        yield {'t': t, 'funcao': funcao.id, 'servicos': [s.id for s in servicos],
+               'comps': [c.id for c in comps], 'funcs': [f.id for f in funcs],
+               'rdos': [r.id for r in rdos]}
+
+
+_IGNORAR = {'id', 'consolidado_em'}
+
+
+def _fatos(admin_id):
+    linhas = []
+    for f in FatoProducaoMaoObra.query.filter_by(admin_id=admin_id):
+        linhas.append({c.name: getattr(f, c.name) for c in FatoProducaoMaoObra.__table__.c
+                       if c.name not in _IGNORAR})
+    return sorted(linhas, key=lambda d: (d['rdo_id'], d['servico_id'] or 0, d['funcionario_id']))
+
+
+def _confere_com_reconstrucao(admin_id):
+    """Os fatos mantidos no commit são os de uma reconsolidação do zero."""
+    from services.fatos_producao import reconstruir
+
+    db.session.expire_all()
+    mantidos = _fatos(admin_id)
+    reconstruir(admin_id)
+    db.session.flush()
+    db.session.expire_all()
+    refeitos = _fatos(admin_id)
+    db.session.rollback()
+    assert mantidos == [pytest.approx(d) for d in refeitos]
+    return mantidos
+
+
+def test_commit_consolida_os_rdos_gravados(cenario):
+    with app.app_context():
+        fatos = _confere_com_reconstrucao(cenario['t'].admin_id)
+    assert {f['rdo_id'] for f in fatos} == set(cenario['rdos'])
+    assert {f['funcionario_id'] for f in fatos} == set(cenario['funcs'])
+    assert any(f['servico_id'] is None for f in fatos)       # apontamento sem subatividade
+    assert any(f['custo'] is None for f in fatos)            # dia sem custo
+    assert any(f['n_gargalo'] for f in fatos)
+
+
+def test_edicao_do_apontamento_reconsolida(cenario):
+    a, rdo_id, fid = cenario['t'].admin_id, cenario['rdos'][1], cenario['funcs'][0]
+    with app.app_context():
+        mo = RDOMaoObra.query.filter_by(rdo_id=rdo_id, funcionario_id=fid).one()
+        mo.horas_trabalhadas = 3.25
+        db.session.commit()
+        fatos = _confere_com_reconstrucao(a)
+    assert [f['horas'] for f in fatos
+            if (f['rdo_id'], f['funcionario_id']) == (rdo_id, fid)] == [3.25]
+
+
+def test_delete_e_update_em_massa_reconsolidam(cenario):
+    a, (r0, r1) = cenario['t'].admin_id, cenario['rdos'][:2]
+    with app.app_context():
+        RDOMaoObra.query.filter_by(rdo_id=r0).delete()
+        RDOCustoDiario.query.filter(RDOCustoDiario.rdo_id == r1).update(
+            {'custo_total_dia': 999.0}, synchronize_session=False)
+        db.session.commit()
+        fatos = _confere_com_reconstrucao(a)
+    assert r0 not in {f['rdo_id'] for f in fatos}
+    assert {f['custo'] for f in fatos if f['rdo_id'] == r1 and f['custo'] is not None} \
+        == {999.0}
+
+
+def test_coeficiente_da_composicao_reconsolida_o_servico(cenario):
+    a, comp_id = cenario['t'].admin_id, cenario['comps'][2]
+    with app.app_context():
+        db.session.get(ComposicaoServico, comp_id).coeficiente = 2.5
+        db.session.commit()
+        fatos = _confere_com_reconstrucao(a)
+    assert {f['coeficiente'] for f in fatos if f['composicao_servico_id'] == comp_id} == {2.5}
+
+
+def test_status_e_ciclo_de_vida_do_rdo(cenario):
+    from sqlalchemy import text
+
+    from services.rdo_ciclo_vida import PREENCHIDO, transicionar
+
+    a, rdo_id = cenario['t'].admin_id, cenario['rdos'][3]
+    with app.app_context():
+        db.session.get(RDO, rdo_id).status = 'Rascunho'
+        db.session.commit()
+        assert rdo_id not in {f['rdo_id'] for f in _confere_com_reconstrucao(a)}
+
+        db.session.get(RDO, rdo_id).status = 'Finalizado'
+        db.session.commit()
+        antes = _confere_com_reconstrucao(a)
+        assert rdo_id in {f['rdo_id'] for f in antes}
+
+        # Fatos apagados por fora do ORM: a transição de estado (só `estado`
+        # muda) basta para o commit reconsolidar o RDO.
+        db.session.execute(text('DELETE FROM fato_producao_mao_obra WHERE rdo_id = :r'),
+                           {'r': rdo_id})
+        db.session.commit()
+        transicionar(db.session.get(RDO, rdo_id), PREENCHIDO, motivo='teste')
+        db.session.commit()
+        assert _confere_com_reconstrucao(a) == antes
+
+
+def test_relatorios_por_funcionario_nao_leem_os_apontamentos(cenario):
+    from sqlalchemy import event
+
+    from services import metricas_produtividade as mp
+
+    a = cenario['t'].admin_id
+    statements = []
+
+    def _guardar(_con, _cur, statement, *_a):
+        statements.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _guardar)
+        try:
+            ranking = mp.ranking_funcionarios(a, date(2026, 1, 1), date(2026, 12, 31),
+                                              servico_id=cenario['servicos'][1],
+                                              ordenar_por='lucratividade')
+            detalhe = mp.detalhe_funcionario(a, cenario['funcs'][1], INICIO, FIM)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', _guardar)
+    assert ranking and detalhe['por_servico']
+    assert not [s for s in statements if 'rdo_mao_obra' in s or 'rdo_servico_subatividade' in s]
+
+
+def test_filtro_por_funcao_nao_recorta_a_equipe(cenario):
+    from services import metricas_produtividade as mp
+
+    a = cenario['t'].admin_id
+    with app.app_context():
+        todos = {m['funcionario_id']: m for m in mp.producao_por_funcionario(a, INICIO, FIM)}
+        da_funcao = mp.producao_por_funcionario(a, INICIO, FIM, funcao_ids=[cenario['funcao']])
+    assert {m['funcionario_id'] for m in da_funcao} == set(cenario['funcs'][1:])
+    # A média dos pares é a dos funcionários listados; o resto é o do
+    # funcionário dentro da equipe inteira.
+    pares = {'prod_empresa_media', 'indice_vs_pares_pct'}
+    for m in da_funcao:
+        assert {k: v for k, v in m.items() if k not in pares} == \
+            {k: v for k, v in todos[m['funcionario_id']].items() if k not in pares}
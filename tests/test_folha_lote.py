@@ -0,0 +1,250 @@
+"""Folha do mês em lote (services/folha_lote).
+
+`calcular_folhas` carrega o mês do tenant uma vez e passa o pré-carregado para
+as funções de `folha_service`; o dict de cada funcionário tem de ser o mesmo
+que `processar_folha_funcionario` devolve sozinho — com HorarioTrabalho e sem
+(lógica legada), horista, diarista, benefícios, dependentes, feriado
+trabalhado, domingo, falta e funcionário sem ponto. E `salvar` grava
+FolhaProcessada com os valores de `salvar_folha_processada`, atualizando em
+vez de duplicar — inclusive com `obra_id` NULL, que o UNIQUE não pega.
+"""
+import os
+import sys
+import uuid
+from datetime import date, time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytestmark = pytest.mark.integration
+
+ANO, MES = 2026, 4
+FERIADO = date(2026, 4, 21)          # terça
+
+
+@pytest.fixture
+def feriado():
+    """Feriado no CalendarioUtil (tabela global, chave = data): só apaga o
+    que criou."""
+    from app import app, db
+    from models import CalendarioUtil
+
+    with app.app_context():
+        criado = CalendarioUtil.query.get(FERIADO) is None
+        yield criado
+        if criado:
+            CalendarioUtil.query.filter_by(data=FERIADO).delete()
+            db.session.commit()
+
+
+def _semear():
+    """Um tenant com cinco perfis de funcionário e o mês de abril/2026."""
+    from app import db
+    from helpers_tenant import um_tenant
+    from models import (BeneficioFuncionario, CalendarioUtil, ConfiguracaoSalarial,
+                        Funcionario, HorarioDia, HorarioTrabalho, Obra,
+                        ParametrosLegais, RegistroPonto)
+
+    t = um_tenant('flt', com_fatos=False)
+    if CalendarioUtil.query.get(FERIADO) is None:
+        db.session.add(CalendarioUtil(data=FERIADO, admin_id=t.admin_id, dia_semana=2,
+                                      eh_util=False, eh_feriado=True, descricao_feriado='Tiradentes'))
+    db.session.add(ParametrosLegais(admin_id=t.admin_id, ano_vigencia=ANO, ativo=True,
+                                    fgts_percentual=8.5, tolerancia_minutos=5))
+    obra2 = Obra(nome=f'Obra 2 {t.marca}', codigo=f'{t.marca[:8]}O2', data_inicio=date(2026, 1, 1),
+                 admin_id=t.admin_id, cliente_id=t.cliente_id, status='Em andamento')
+    horario = HorarioTrabalho(nome=f'Comercial {t.marca}', admin_id=t.admin_id,
+                              entrada=time(7), saida=time(17), horas_diarias=9)
+    db.session.add_all([obra2, horario])
+    db.session.flush()
+    for dia in range(7):
+        db.session.add(HorarioDia(horario_id=horario.id, dia_semana=dia, admin_id=t.admin_id,
+                                  entrada=time(7), saida=time(17), pausa_horas=1,
+                                  trabalha=dia < 5))
+
+    def funcionario(sufixo, **kw):
+        f = Funcionario(codigo=f'{t.marca[:7]}{sufixo}', nome=f'Func {sufixo} {t.marca}',
+                        cpf=f'{uuid.uuid4().int % 10**11:011d}', data_admissao=date(2026, 1, 2),
+                        admin_id=t.admin_id, ativo=True, **kw)
+        db.session.add(f)
+        db.session.flush()
+        return f
+
+    legado = Funcionario.query.get(t.funcionario_id)          # sem horário: lógica legada
+    mensal = funcionario('M', salario=4200, horario_trabalho_id=horario.id)
+    horista = funcionario('H', salario=0, horario_trabalho_id=horario.id)
+    diarista = funcionario('D', salario=0, tipo_remuneracao='diaria', valor_diaria=180)
+    funcionario('S', salario=2500, horario_trabalho_id=horario.id)     # sem ponto: faltas
+
+    db.session.add_all([
+        ConfiguracaoSalarial(funcionario_id=mensal.id, salario_base=4200, tipo_salario='MENSAL',
+                             dependentes=2, data_inicio=date(2025, 1, 1), admin_id=t.admin_id),
+        ConfiguracaoSalarial(funcionario_id=horista.id, salario_base=0, tipo_salario='HORISTA',
+                             valor_hora=27.5, dependentes=1, data_inicio=date(2025, 1, 1),
+                             data_fim=date(2025, 12, 31), admin_id=t.admin_id),   # encerrada
+        ConfiguracaoSalarial(funcionario_id=horista.id, salario_base=0, tipo_salario='HORISTA',
+                             valor_hora=31, data_inicio=date(2026, 1, 1), admin_id=t.admin_id),
+        BeneficioFuncionario(funcionario_id=mensal.id, tipo_beneficio='VR', valor=440,
+                             percentual_desconto=20, data_inicio=date(2026, 1, 1), admin_id=t.admin_id),
+        BeneficioFuncionario(funcionario_id=mensal.id, tipo_beneficio='VT', valor=200,
+                             percentual_desconto=6, data_inicio=date(2026, 1, 1), admin_id=t.admin_id),
+        BeneficioFuncionario(funcionario_id=mensal.id, tipo_beneficio='VA', valor=999,
+                             percentual_desconto=50, data_inicio=date(2025, 1, 1),
+                             data_fim=date(2025, 6, 30), admin_id=t.admin_id),     # vencido
+    ])
+
+    def ponto(f, dia, obra_id, **kw):
+        kw.setdefault('horas_trabalhadas', 8.0)
+        db.session.add(RegistroPonto(funcionario_id=f.id, obra_id=obra_id, admin_id=t.admin_id,
+                                     data=date(ANO, MES, dia), **kw))
+
+    for dia in (1, 2, 6, 7, 8, 9, 10, 13, 14, 15, 16, 17):
+        ponto(legado, dia, t.obra_id, horas_extras=1.0 if dia % 3 == 0 else 0.0)
+        ponto(mensal, dia, t.obra_id if dia < 10 else obra2.id,
+              horas_trabalhadas=9.5 if dia % 2 else 8.0, total_atraso_minutos=12 if dia == 7 else 0)
+        ponto(horista, dia, obra2.id)
+        ponto(diarista, dia, t.obra_id)
+    ponto(legado, 3, t.obra_id, tipo_registro='falta', horas_trabalhadas=0)
+    ponto(mensal, 21, t.obra_id, tipo_registro='feriado_trabalhado', horas_extras=8.0)
+    ponto(mensal, 19, obra2.id, tipo_registro='domingo_horas_extras', horas_extras=6.0)
+    ponto(horista, 18, obra2.id, tipo_registro='sabado_horas_extras', horas_extras=4.0)
+    ponto(diarista, 22, t.obra_id, tipo_registro='falta_justificada', horas_trabalhadas=0)
+    db.session.commit()
+    return t, obra2.id
+
+
+def _retrato(admin_id):
+    from app import db
+    from models import FolhaProcessada
+
+    db.session.expire_all()
+    colunas = [c.name for c in FolhaProcessada.__table__.columns
+               if c.name not in ('id', 'processado_em', 'created_at', 'updated_at')]
+    return sorted((tuple(getattr(l, c) for c in colunas)
+                   for l in FolhaProcessada.query.filter_by(admin_id=admin_id)), key=repr)
+
+
+def test_folha_em_lote_e_a_mesma_da_individual(feriado):
+    from sqlalchemy import event
+
+    from app import app, db
+    from models import Funcionario
+    from services.folha_lote import calcular_folhas
+    from services.folha_service import processar_folha_funcionario
+
+    with app.app_context():
+        t, _obra2 = _semear()
+        funcionarios = Funcionario.query.filter_by(admin_id=t.admin_id).order_by(Funcionario.id).all()
+        assert len(funcionarios) == 5
+
+        individual = {f.id: processar_folha_funcionario(f, ANO, MES) for f in funcionarios}
+        db.session.expire_all()
+
+        statements = [0]
+
+        def _contar(*_a, **_k):
+            statements[0] += 1
+
+        event.listen(db.engine, 'before_cursor_execute', _contar)
+        try:
+            lote = calcular_folhas(t.admin_id, ANO, MES)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', _contar)
+
+        assert lote == individual
+        assert all(lote.values())
+        # Os perfis mexem mesmo nos números: não é uma comparação de zeros.
+        assert len({d['salario_bruto'] for d in lote.values()}) == 5
+        assert any(d['horas_extras_100'] for d in lote.values())
+        assert any(d['outros_descontos'] for d in lote.values())
+        # Funcionários, feriados, parâmetros, pontos, horários, dias,
+        # configurações, benefícios — qualquer que seja o número de funcionários.
+        assert statements[0] <= 8
+
+
+def test_sem_parametros_legais_fica_none_como_na_individual():
+    from app import app
+    from helpers_tenant import um_tenant
+    from services.folha_lote import calcular_folhas
+
+    with app.app_context():
+        t = um_tenant('fln', com_fatos=False)
+        assert calcular_folhas(t.admin_id, ANO, MES) == {t.funcionario_id: None}
+
+
+def test_salvar_em_lote_grava_o_mesmo_e_atualiza(feriado):
+    from app import app, db
+    from models import FolhaProcessada, Funcionario
+    from services import folha_lote
+    from services.folha_service import processar_e_salvar_folha_obra, salvar_folha_processada
+
+    with app.app_context():
+        t, obra2 = _semear()
+        folhas = folha_lote.calcular_folhas(t.admin_id, ANO, MES)
+        sem_ponto = max(folhas)
+        linhas = [(f, o, folhas[f]) for f in sorted(folhas) for o in (t.obra_id, obra2)]
+        linhas.append((sem_ponto, None, folhas[sem_ponto]))
+
+        for f, o, dados in linhas:
+            assert salvar_folha_processada(f, o, ANO, MES, dados, t.admin_id)
+        individual = _retrato(t.admin_id)
+        FolhaProcessada.query.filter_by(admin_id=t.admin_id).delete()
+        db.session.commit()
+
+        assert folha_lote.salvar(t.admin_id, ANO, MES, linhas) == len(linhas)
+        db.session.commit()
+        assert _retrato(t.admin_id) == individual
+
+        # Regravar atualiza as mesmas linhas — a de obra NULL também.
+        ids = {l.id for l in FolhaProcessada.query.filter_by(admin_id=t.admin_id)}
+        alterada = dict(folhas[sem_ponto], salario_liquido=123.45)
+        assert folha_lote.salvar(t.admin_id, ANO, MES, [(sem_ponto, None, alterada)]) == 1
+        db.session.commit()
+        db.session.expire_all()
+        assert {l.id for l in FolhaProcessada.query.filter_by(admin_id=t.admin_id)} == ids
+        assert float(FolhaProcessada.query.filter_by(
+            funcionario_id=sem_ponto, obra_id=None).one().salario_liquido) == 123.45
+        folha_lote.salvar(t.admin_id, ANO, MES, [(sem_ponto, None, folhas[sem_ponto])])
+        db.session.commit()
+
+        # Por obra: quem tem ponto nela no mês, uma linha por funcionário —
+        # recalculada e regravada por cima, sem mudar nada.
+        stats = processar_e_salvar_folha_obra(obra2, ANO, MES, t.admin_id)
+        com_ponto_na_obra = {f.id for f in Funcionario.query.filter_by(admin_id=t.admin_id)
+                             if f.nome.startswith(('Func M', 'Func H'))}
+        assert stats == {'obra_id': obra2, 'ano': ANO, 'mes': MES,
+                         'funcionarios_encontrados': len(com_ponto_na_obra),
+                         'processados_com_sucesso': len(com_ponto_na_obra), 'erros': 0}
+        assert _retrato(t.admin_id) == individual
+
+
+def test_linha_que_nao_grava_nao_derruba_as_outras(feriado, monkeypatch):
+    from sqlalchemy import text
+
+    from app import app, db
+    from models import FolhaProcessada, RegistroPonto
+    from services import folha_lote
+
+    salvar = folha_lote.salvar
+
+    with app.app_context():
+        t, obra2 = _semear()
+        pares = sorted({(r.funcionario_id, r.obra_id) for r in RegistroPonto.query.filter(
+            RegistroPonto.admin_id == t.admin_id, RegistroPonto.obra_id.isnot(None))})
+        ruim = pares[0][0]
+
+        def salvar_falhando(admin_id, ano, mes, linhas):
+            if any(f == ruim for f, _o, _d in linhas):
+                db.session.execute(text('SELECT 1/0'))  # aborta a transação
+            return salvar(admin_id, ano, mes, linhas)
+
+        monkeypatch.setattr(folha_lote, 'salvar', salvar_falhando)
+        stats = folha_lote.processar_e_salvar(t.admin_id, ANO, MES)
+
+        gravadas = {(l.funcionario_id, l.obra_id)
+                    for l in FolhaProcessada.query.filter_by(admin_id=t.admin_id)}
+        ruins = {p for p in pares if p[0] == ruim}
+        assert gravadas == set(pares) - ruins
+        assert stats['processados_com_sucesso'] == len(pares) - len(ruins)
+        assert stats['erros'] == len(ruins)
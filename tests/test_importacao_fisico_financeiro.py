@@ -959,6 +959,7 @@ def test_import_anexa_fotos_do_rdo(tmp_path):
     from PIL import Image
     from services import importacao_fisico_financeiro as ff
     from services.importacao_fisico_financeiro import importar_fisico_financeiro
+    from services.rdo_foto_versoes import drenar
     from models import RDO, RDOFoto
 
     # pasta de fotos do dia 2026-06-22 com 1.png e 2.png (a 3ª legenda fica órfã)
@@ -991,6 +992,8 @@ def test_import_anexa_fotos_do_rdo(tmp_path):
         # 2 fotos anexadas (a 3ª foi pulada por não ter arquivo)
         assert len(fotos) == 2
         assert [f.legenda for f in fotos] == ["Nível do platô", "Gabarito da Baia 01"]
+        assert all(f.arquivo_original and f.processamento == 'pendente' for f in fotos)
+        drenar()  # otimizada e thumbnail saem da fila (services/rdo_foto_versoes)
         assert all(f.arquivo_otimizado and f.thumbnail for f in fotos)
         assert all(f.nome_arquivo and f.caminho_arquivo for f in fotos)  # legados NOT NULL
         # Sem volume (default do teste): 'banco' + base64 preservada.
@@ -1005,6 +1008,7 @@ def test_import_auto_anexa_fotos_da_pasta_sem_legenda(tmp_path):
     from PIL import Image
     from services import importacao_fisico_financeiro as ff
     from services.importacao_fisico_financeiro import importar_fisico_financeiro
+    from services.rdo_foto_versoes import drenar
     from models import RDO, RDOFoto
 
     dia_dir = tmp_path / '2026-06-29'
@@ -1031,6 +1035,7 @@ def test_import_auto_anexa_fotos_da_pasta_sem_legenda(tmp_path):
         fotos = RDOFoto.query.filter_by(rdo_id=rdo.id).order_by(RDOFoto.ordem).all()
         assert len(fotos) == 3
         assert all((f.legenda or '') == '' for f in fotos)
+        drenar()
         assert all(f.arquivo_otimizado for f in fotos)
         # Sem volume (default do teste): 'banco' + base64 preservada.
         assert all(f.armazenamento == 'banco' for f in fotos)
@@ -1079,9 +1084,13 @@ def test_portal_rdo_foto_sem_prefixo_base64_duplicado(tmp_path):
         r = c.get(f'/portal/obra/{token}/rdo/{rdo_id}')
         assert r.status_code == 200
         html = r.get_data(as_text=True)
-        # Sem volume: base64 preservada → portal renderiza data URI.
-        assert 'data:image/webp;base64,' in html            # a foto renderiza
-        assert 'data:image/webp;base64,data:' not in html   # sem prefixo duplicado
+        # A foto vai por URL do portal (que entrega a base64 sem volume),
+        # nunca embutida no HTML.
+        assert f'/portal/obra/{token}/foto/' in html        # a foto renderiza
+        assert 'data:image/webp;base64' not in html
+        foto_url = html.split(f'/portal/obra/{token}/foto/', 1)[1].split('"', 1)[0]
+        r = c.get(f'/portal/obra/{token}/foto/{foto_url}'.replace('&amp;', '&'))
+        assert r.status_code == 200 and r.mimetype.startswith('image/')
 
 
 def test_import_apontamento_grava_percentual_planejado():
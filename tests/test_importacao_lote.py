@@ -0,0 +1,180 @@
+"""Gravação em lote dos importadores (services/gravacao_lote).
+
+O `ImportacaoFluxoCaixa.importar` grava em blocos (INSERT ... VALUES com os
+ids de volta); `em_lote=False` é o caminho linha a linha de sempre. O mesmo
+arquivo importado pelos dois caminhos, cada um num tenant, tem de deixar as
+mesmas linhas — GCP com os filhos, FluxoCaixa e ContaPagar apontando para o
+GCP certo, ContaReceber, fornecedores criados — e as mesmas contagens,
+inclusive os duplicados de uma importação anterior.
+"""
+import os
+import sys
+from decimal import Decimal
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytestmark = pytest.mark.integration
+
+
+def _arquivo(t):
+    """Saídas e entradas variadas: auto/manual, apenas pagamento, reembolso de
+    fornecedor e de funcionário, pendentes, repetidas no mesmo lote."""
+    saidas = []
+    for i in range(40):
+        r = {'data': f'{1 + i % 5:02d}/03/2026', 'fornecedor': f'Forn Lote {i % 6}',
+             'descricao': f'compra {i % 9}', 'valor': 100 + i % 7,
+             'status': 'PAGO' if i % 3 else 'PENDENTE',
+             'obra_id': t.obra_id if i % 2 else None,
+             'tipo_categoria': 'MATERIAL' if i % 4 else None,
+             'plano_contas': 'Serviços de terceiros' if i % 4 == 0 else '',
+             'categoria_fluxo_caixa_id': None, 'banco_id': None,
+             'apenas_pagamento': i % 5 == 0, 'eh_reembolso': i % 7 == 0,
+             'observacoes': 'obs' if i % 8 == 0 else ''}
+        if i % 11 == 0:
+            r.update(entidade_tipo='funcionario', entidade_id=t.funcionario_id,
+                     entidade_nome_banco='Func Lote', eh_reembolso=True)
+        if i == 3:
+            r['fornecedor'] = 'FERRAGENS EXISTENTE'
+        saidas.append(r)
+    entradas = [{'data': f'{1 + i % 4:02d}/03/2026', 'cliente': f'Cliente Lote {i % 3}',
+                 'descricao': f'medição {i}', 'valor': 5000 + i % 2,
+                 'status': 'PAGO' if i % 2 else 'PENDENTE',
+                 'obra_id': t.obra_id if i % 3 else None,
+                 'entidade_id': 1 if i == 4 else None,
+                 'categoria_fluxo_caixa_id': None, 'tipo_categoria': None}
+                for i in range(12)]
+    return saidas, entradas
+
+
+def _retrato(t):
+    """As linhas do tenant sem ids: cada vínculo vira a linha para onde aponta."""
+    from models import (ContaPagar, ContaReceber, FluxoCaixa, Fornecedor,
+                        GestaoCustoFilho, GestaoCustoPai)
+
+    def obra(oid):
+        return 'obra' if oid == t.obra_id else ('adm' if oid else None)
+
+    forn = {f.id: f.nome for f in Fornecedor.query.filter_by(admin_id=t.admin_id)}
+
+    def entidade(eid):
+        return 'func' if eid == t.funcionario_id else forn.get(eid, eid)
+
+    filhos = {}
+    for f in GestaoCustoFilho.query.filter_by(admin_id=t.admin_id):
+        filhos.setdefault(f.pai_id, []).append(
+            (f.descricao, f.valor, f.data_referencia, obra(f.obra_id)))
+    pais = {p.id: (p.tipo_categoria, p.entidade_nome, entidade(p.entidade_id), p.valor_total,
+                   p.status, p.data_pagamento, p.observacoes, p.import_batch_id,
+                   tuple(filhos.pop(p.id, ())))
+            for p in GestaoCustoPai.query.filter_by(admin_id=t.admin_id)}
+    assert not filhos
+    crs = {c.id: (c.cliente_nome, c.descricao, c.valor_original, c.valor_recebido, c.saldo,
+                  c.data_emissao, c.data_vencimento, c.data_recebimento, c.status,
+                  obra(c.obra_id), c.observacoes, c.import_batch_id)
+           for c in ContaReceber.query.filter_by(admin_id=t.admin_id)}
+    alvo = {'gestao_custo_pai': pais, 'conta_receber': crs}
+    fcs = [(f.data_movimento, f.tipo_movimento, f.categoria, f.valor, f.descricao,
+            obra(f.obra_id), f.referencia_tabela,
+            alvo.get(f.referencia_tabela, {}).get(f.referencia_id, f.referencia_id),
+            f.observacoes, f.import_batch_id, f.banco_id, f.categoria_fluxo_caixa_id,
+            forn.get(f.fornecedor_id), entidade(f.funcionario_id) if f.funcionario_id else None)
+           for f in FluxoCaixa.query.filter_by(admin_id=t.admin_id)]
+    cps = [(c.descricao, c.valor_original, c.valor_pago, c.saldo, c.data_emissao,
+            c.data_vencimento, c.data_pagamento, c.status, obra(c.obra_id),
+            forn.get(c.fornecedor_id),
+            (c.observacoes or '').replace(f'ID: {t.funcionario_id}.', 'ID: func.'), c.origem_tipo, pais[c.origem_id],
+            c.import_batch_id, c.situacao_liberacao)
+           for c in ContaPagar.query.filter_by(admin_id=t.admin_id)]
+    fornecedores = [(f.nome, f.tipo_fornecedor, f.cnpj.startswith('IMP-'), f.ativo)
+                    for f in Fornecedor.query.filter_by(admin_id=t.admin_id)]
+    return {nome: sorted(linhas, key=repr) for nome, linhas in (
+        ('pais', pais.values()), ('contas_receber', crs.values()), ('fluxo', fcs),
+        ('contas_pagar', cps), ('fornecedores', fornecedores))}
+
+
+def test_em_lote_grava_o_mesmo_que_linha_a_linha(monkeypatch):
+    from app import app, db
+    from helpers_tenant import dois_tenants
+    from models import Fornecedor
+    from services import resumo_custos_obra
+    from services.importacao_excel import ImportacaoFluxoCaixa
+
+    recalculadas = []
+    original = resumo_custos_obra.recalcular_obra
+    monkeypatch.setattr(resumo_custos_obra, 'recalcular_obra',
+                        lambda obra_id, admin_id=None: recalculadas.append((obra_id, admin_id))
+                        or original(obra_id, admin_id=admin_id))
+
+    with app.app_context():
+        linha, lote = dois_tenants('ilt', com_fatos=False)
+        resultados = {}
+        for t, em_lote in ((linha, False), (lote, True)):
+            db.session.add(Fornecedor(nome='Ferragens Existente', cnpj=f'EX-{t.marca}'[:18],
+                                      tipo_fornecedor='MATERIAL', admin_id=t.admin_id, ativo=True))
+            db.session.commit()
+            saidas, entradas = _arquivo(t)
+            # Uma importação anterior com parte do arquivo: o resto é duplicado.
+            ImportacaoFluxoCaixa().importar(
+                {'saidas': saidas[:10], 'entradas': entradas[:3], 'batch_id': 'anterior'},
+                t.admin_id, em_lote=em_lote)
+            recalculadas.clear()
+            r = ImportacaoFluxoCaixa().importar(
+                {'saidas': saidas, 'entradas': entradas, 'batch_id': 'atual'},
+                t.admin_id, em_lote=em_lote)
+            assert r['erros'] == []
+            for d in r['detalhe_saidas'] + r['detalhe_entradas']:   # nome da obra é do tenant
+                d['obra_nome'] = 'adm' if 'ADMINISTRATIVO' in d['obra_nome'] else 'obra'
+            resultados[em_lote] = (r, _retrato(t), {a for _o, a in recalculadas})
+
+        (r_linha, retrato_linha, _), (r_lote, retrato_lote, tenants) = \
+            resultados[False], resultados[True]
+        assert r_lote == r_linha
+        assert r_lote['duplicados'] > 0 and r_lote['n_conta_pagar'] > 0
+        # 'Forn Lote 0..5' criados na importação anterior, 'Ferragens' já existia.
+        assert len(retrato_lote['fornecedores']) == 7
+        for tabela in retrato_linha:
+            assert retrato_lote[tabela] == retrato_linha[tabela], tabela
+        # O recálculo do resumo de custos que o listener faria, uma vez por obra.
+        assert tenants == {lote.admin_id}
+
+
+def test_erro_no_lote_desfaz_tudo():
+    from app import app
+    from helpers_tenant import um_tenant
+    from models import FluxoCaixa, GestaoCustoPai
+    from services.importacao_excel import ImportacaoFluxoCaixa
+
+    with app.app_context():
+        t = um_tenant('ile', com_fatos=False)
+        saidas, _ = _arquivo(t)
+        saidas[25]['data'] = 'sem data'          # GCF.data_referencia é NOT NULL
+        r = ImportacaoFluxoCaixa().importar({'saidas': saidas, 'entradas': []}, t.admin_id)
+        assert r['erros'] and r['erros'][0]['linha'] == 'GERAL'
+        assert GestaoCustoPai.query.filter_by(admin_id=t.admin_id).count() == 0
+        assert FluxoCaixa.query.filter_by(admin_id=t.admin_id).count() == 0
+
+
+def test_alimentacao_em_lote_cai_para_linha_a_linha_no_erro():
+    from app import app
+    from helpers_tenant import um_tenant
+    from models import AlimentacaoLancamento, alimentacao_funcionarios_assoc, db
+    from services.importacao_excel import ImportacaoAlimentacao
+
+    with app.app_context():
+        t = um_tenant('ila', com_fatos=False)
+        rows = [{'linha': i + 2, 'data': '05/03/2026', 'valor_total': 30 + i,
+                 'descricao': f'marmita {i}', 'obra_id': t.obra_id,
+                 'funcionario_ids': [t.funcionario_id, t.funcionario_id]}
+                for i in range(5)]
+        rows[2]['obra_id'] = None                # obra é obrigatória: só esta linha falha
+        r = ImportacaoAlimentacao().importar(rows, t.admin_id)
+
+        assert r['criados'] == 4
+        assert [e['linha'] for e in r['erros']] == [4]
+        lancs = AlimentacaoLancamento.query.filter_by(admin_id=t.admin_id).all()
+        assert sorted(l.valor_total for l in lancs) == [Decimal(v) for v in (30, 31, 33, 34)]
+        assoc = db.session.execute(alimentacao_funcionarios_assoc.select().where(
+            alimentacao_funcionarios_assoc.c.admin_id == t.admin_id)).all()
+        assert len(assoc) == 4                   # funcionário repetido: ON CONFLICT
@@ -0,0 +1,101 @@
+"""Índice de nomes das importações (services/indice_entidades).
+
+A referência é o laço antigo — `_fuzzy_match_entidade` e `_match_cc_obra`
+sem índice. O índice tem de devolver o MESMO resultado: tipo, id, nome e
+score, as sugestões abaixo do limiar também, e no empate o primeiro da lista.
+A pré-seleção não pode deixar de fora ninguém que chegue ao limiar.
+
+E as diárias: funcionário e obra resolvidos pelo cadastro carregado uma vez,
+com o mesmo resultado do `ILIKE` por linha, sem uma consulta por linha.
+"""
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.bench_indice_entidades import (_digitacao, cadastro_sintetico,  # noqa: E402
+                                            planilha_sintetica)
+from services.importacao_excel import _fuzzy_match_entidade, _match_cc_obra  # noqa: E402
+from services.indice_entidades import IndiceEntidades, IndiceNomes, _processado  # noqa: E402
+
+
+def test_indice_decide_igual_ao_laco_linha_a_linha():
+    funcionarios, fornecedores, obras = cadastro_sintetico(300, 40, 30, semente=7)
+    linhas = planilha_sintetica(800, funcionarios, fornecedores, obras, semente=8)
+    # Empates de propósito: o mesmo nome em dois cadastros — vence o primeiro.
+    fornecedores.append((9001, fornecedores[0][1], '', ''))
+    funcionarios.insert(0, (9002, fornecedores[5][1]))
+    linhas += [(fornecedores[0][1], ''), (fornecedores[5][1].upper(), ''),
+               ('', ''), ('   ', 'Administrativo'), (None, None)]
+
+    indice = IndiceEntidades(funcionarios, fornecedores)
+    indice_obras = IndiceNomes((oid, nome) for nome, oid in obras.items())
+    sugestoes = 0
+    for nome, cc in linhas:
+        esperado = _fuzzy_match_entidade(nome, funcionarios, fornecedores)
+        assert _fuzzy_match_entidade(nome, funcionarios, fornecedores, indice) == esperado, nome
+        assert _match_cc_obra(cc, obras, indice_obras) == _match_cc_obra(cc, obras), cc
+        sugestoes += 40 < esperado[3] <= 85
+    assert sugestoes          # a faixa de sugestão foi exercitada
+    assert indice.casar(fornecedores[0][1])[1] == fornecedores[0][0]
+
+
+@pytest.mark.parametrize('limiar', (60, 85.5, 88))
+def test_pre_selecao_nao_perde_quem_chega_ao_limiar(limiar):
+    from rapidfuzz import fuzz, process
+
+    _, fornecedores, _ = cadastro_sintetico(400, 0, 0, semente=11)
+    indice = IndiceNomes((f[0], a) for f in fornecedores for a in f[1:] if a)
+    rng = random.Random(12)
+    tokens = [t for texto in indice._textos for t in texto.split()]
+    consultas = [_processado(_digitacao(rng, rng.choice(indice.nomes))) for _ in range(150)]
+    consultas += [' '.join(rng.sample(tokens, rng.randint(1, 5))) for _ in range(150)]
+    for texto in filter(None, consultas):
+        scores = process.cdist([texto], indice._textos, scorer=fuzz.token_set_ratio,
+                               dtype=np.float64)[0]
+        alcancam = set(np.flatnonzero(scores >= limiar).tolist())
+        assert alcancam <= set(indice._pre_selecao(texto, limiar / 100)), texto
+
+
+@pytest.mark.integration
+def test_diarias_resolvem_pelo_cadastro_carregado_uma_vez():
+    from sqlalchemy import event as sa_event
+
+    from app import app, db
+    from helpers_tenant import dois_tenants
+    from models import Funcionario, Obra
+    from services.importacao_excel import ImportacaoDiarias
+
+    with app.app_context():
+        a, b = dois_tenants('ixd', com_fatos=False)
+        func = db.session.get(Funcionario, a.funcionario_id)
+        obra = db.session.get(Obra, a.obra_id)
+        obra_b = db.session.get(Obra, b.obra_id)
+
+        imp = ImportacaoDiarias()
+        consultas = []
+
+        def _conta(*_a):
+            consultas.append(1)
+
+        sa_event.listen(db.engine, 'before_cursor_execute', _conta)
+        try:
+            resolvidos = [imp._resolver_funcionario(func.nome.upper(), a.admin_id)
+                          for _ in range(20)]
+            obras = [imp._resolver_obra(obra.nome.lower(), a.admin_id),
+                     imp._resolver_obra(obra.codigo, a.admin_id),
+                     imp._resolver_obra(obra_b.nome, a.admin_id),
+                     imp._resolver_obra('', a.admin_id)]
+            nova = imp._resolver_funcionario('fulano de tal', a.admin_id)
+        finally:
+            sa_event.remove(db.engine, 'before_cursor_execute', _conta)
+
+        assert set(resolvidos) == {(func.id, func.nome, False, None)}
+        assert obras == [(obra.id, obra.nome, False), (obra.id, obra.nome, False),
+                         (None, obra_b.nome.title(), True), (None, '(sem obra)', False)]
+        assert nova[:3] == (None, 'Fulano De Tal', True)
+        assert len(consultas) == 2          # funcionários + obras, uma vez
@@ -0,0 +1,128 @@
+"""Índice facial vetorizado (services/indice_facial).
+
+Testes UNITÁRIOS, sem DB/app/modelo: o índice substituiu o laço por par de
+`ponto_views.identificar_por_cache`, então a referência aqui é o próprio
+laço, reescrito no teste — mesmo funcionário vencedor, mesma distância (a
+menos do arredondamento float32) e mesma foto, inclusive nos empates.
+"""
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import indice_facial
+from services.indice_facial import IndiceFacial
+
+
+def _unitario(rnd, dim=128):
+    v = np.array([rnd.gauss(0, 1) for _ in range(dim)], dtype=np.float32)
+    return (v / np.linalg.norm(v)).tolist()
+
+
+def _cache(rnd, tenants=(1, 2), por_tenant=30):
+    embeddings, fid = {}, 1
+    for admin_id in tenants:
+        for _ in range(por_tenant):
+            embeddings[fid] = {
+                'admin_id': admin_id, 'nome': f'F{fid}',
+                'embeddings': [{'embedding': _unitario(rnd), 'descricao': f'Foto {i}'}
+                               for i in range(rnd.randint(1, 4))],
+            }
+            fid += 1
+    return {'embeddings': embeddings}
+
+
+def _laco_antigo(cache, admin_id, capturado):
+    """O laço de `identificar_por_cache` antes do índice."""
+    melhor, menor, desc = None, float('inf'), None
+    for fid, data in cache['embeddings'].items():
+        if data.get('admin_id') != admin_id:
+            continue
+        lista = data.get('embeddings') or (
+            [{'embedding': data['embedding'], 'descricao': 'Foto principal'}]
+            if 'embedding' in data else [])
+        for emb in lista:
+            if isinstance(emb, dict):
+                e, d = np.array(emb['embedding'], dtype=np.float32), emb.get('descricao', 'Foto')
+            else:
+                e, d = np.array(emb, dtype=np.float32), 'Foto'
+            dist = np.linalg.norm(capturado - e)
+            if dist < menor:
+                melhor, menor, desc = fid, dist, d
+    return melhor, menor, desc
+
+
+@pytest.mark.parametrize('semente', range(5))
+def test_busca_identica_ao_laco_por_par(semente):
+    rnd = random.Random(semente)
+    cache = _cache(rnd)
+    indice = IndiceFacial.de_cache(cache, 2)
+    for _ in range(50):
+        # Metade das consultas perto de um embedding do tenant (o caso real).
+        alvo = rnd.choice([e for e in cache['embeddings'].values()
+                           if e['admin_id'] == 2])['embeddings'][0]['embedding']
+        ruido = np.array(_unitario(rnd), dtype=np.float32) * rnd.choice([0.05, 2.0])
+        q = np.array(alvo, dtype=np.float32) + ruido
+        q /= np.linalg.norm(q)
+        fid, dist, desc = indice.buscar(q, k=1)[0]
+        esperado = _laco_antigo(cache, 2, q)
+        assert (fid, desc) == (esperado[0], esperado[2])
+        assert dist == pytest.approx(float(esperado[1]), abs=1e-5)
+
+
+def test_top_k_um_por_funcionario_pela_melhor_foto():
+    base = np.eye(4, dtype=np.float32)
+    cache = {'embeddings': {
+        10: {'admin_id': 1, 'embeddings': [{'embedding': base[0].tolist(), 'descricao': 'a'},
+                                           {'embedding': base[1].tolist(), 'descricao': 'b'}]},
+        20: {'admin_id': 1, 'embeddings': [{'embedding': base[2].tolist(), 'descricao': 'c'}]},
+    }}
+    resultado = IndiceFacial.de_cache(cache, 1).buscar(base[1], k=5)
+    assert [(f, d) for f, _, d in resultado] == [(10, 'b'), (20, 'c')]
+    assert resultado[0][1] == pytest.approx(0.0, abs=1e-6)
+
+
+def test_empate_vence_a_primeira_linha_como_no_laco():
+    e = [1.0, 0.0]
+    cache = {'embeddings': {
+        7: {'admin_id': 1, 'embeddings': [{'embedding': e, 'descricao': 'x'}]},
+        3: {'admin_id': 1, 'embeddings': [{'embedding': e, 'descricao': 'y'}]},
+    }}
+    assert IndiceFacial.de_cache(cache, 1).buscar([0.0, 1.0])[0][0] == 7
+
+
+def test_formatos_legados_do_cache():
+    cache = {'embeddings': {
+        1: {'admin_id': '5', 'embedding': [3.0, 4.0]},             # não normalizado
+        2: {'admin_id': 5, 'embeddings': [[0.0, 1.0]]},            # lista crua
+        3: {'admin_id': 6, 'embeddings': [[1.0, 0.0]]},            # outro tenant
+    }}
+    indice = IndiceFacial.de_cache(cache, 5)
+    assert indice.total_funcionarios == 2
+    fid, dist, desc = indice.buscar([3.0, 4.0])[0]
+    assert (fid, desc) == (1, 'Foto principal') and dist == pytest.approx(0.0, abs=1e-5)
+    assert indice.buscar([0.0, 1.0])[0][:1] == (2,)
+    assert IndiceFacial.de_cache(cache, 99).buscar([1.0, 0.0]) == []
+
+
+def test_registro_reconstroi_so_quando_a_origem_muda():
+    indice_facial.descartar_indices()
+    cache = {'embeddings': {1: {'admin_id': 1, 'embeddings': [[1.0, 0.0]]}}}
+    construcoes = []
+
+    def construir():
+        construcoes.append(1)
+        return IndiceFacial.de_cache(cache, 1)
+
+    primeiro = indice_facial.indice_do_tenant(1, ('ino', 0), construir)
+    assert indice_facial.indice_do_tenant(1, ('ino', 0), construir) is primeiro
+    assert len(construcoes) == 1
+
+    cache['embeddings'][2] = {'admin_id': 1, 'embeddings': [[0.0, 1.0]]}
+    atualizado = indice_facial.indice_do_tenant(1, ('ino', 96), construir)
+    assert atualizado.total_funcionarios == 2 and len(construcoes) == 2
+    indice_facial.descartar_indices()
@@ -0,0 +1,196 @@
+"""Inferência facial compartilhada por socket Unix (services/inferencia_facial).
+
+Sem SFace nem OpenCV: o servidor sobe de verdade num socket temporário, com
+`preparar` e modelo falsos (o "rosto" sai do hash dos bytes da imagem e o
+`forward` registra o tamanho de cada lote). O que se testa é o serviço — o
+micro-lote sob concorrência, a identificação IGUAL à do índice no processo,
+as distâncias por foto — e o cliente: fora do ar ele levanta
+`InferenciaIndisponivel`, e ponto_views/utils_facial seguem no processo.
+"""
+import base64
+import hashlib
+import os
+import random
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import indice_facial, inferencia_facial, store_facial
+from services.embeddings_lote import normalizar_l2
+from services.inferencia_facial import InferenciaIndisponivel, ServidorInferencia
+from services.store_facial import StoreFacial
+
+
+def _rosto(imagem):
+    if not imagem or imagem == b'ilegivel':
+        return None
+    h = hashlib.sha256(imagem).digest() * 4
+    return np.frombuffer(h, dtype=np.uint8).astype(np.float32)[:128] / 255.0 - 0.5
+
+
+class ModeloFalso:
+    def __init__(self):
+        self.lotes = []
+        self.trava = threading.Event()
+
+    def forward(self, lote):
+        self.trava.wait(2)
+        self.lotes.append(len(lote))
+        return np.asarray(lote) * 3.0
+
+
+def _emb(imagem):
+    """O embedding L2 que o serviço devolveria da imagem."""
+    return normalizar_l2((_rosto(imagem) * 3.0)[None, :])[0]
+
+
+@pytest.fixture
+def servico(tmp_path, monkeypatch):
+    """Servidor no ar com um store de dois tenants; cliente apontado para ele."""
+    fotos = {fid: [f'foto-{fid}-{i}'.encode() for i in range(1 + fid % 3)]
+             for fid in range(1, 13)}
+    entradas = {fid: {'admin_id': 1 if fid <= 8 else 2, 'nome': f'F{fid}',
+                      'embeddings': [{'embedding': _emb(f).tolist(), 'descricao': f.decode()}
+                                     for f in lista]}
+                for fid, lista in fotos.items()}
+    path = str(tmp_path / 'cache.store')
+    store_facial.gravar(path, entradas, {'versao': '4.0'})
+
+    modelo = ModeloFalso()
+    modelo.trava.set()
+    sock = str(tmp_path / 'facial.sock')
+    servidor = ServidorInferencia(sock, modelo, preparar=_rosto,
+                                  abrir_store=lambda: StoreFacial(path), espera_ms=20)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    monkeypatch.setenv(inferencia_facial.SOCKET_ENV, sock)
+    monkeypatch.setattr(inferencia_facial, '_pausa_ate', 0.0)
+    indice_facial.descartar_indices()
+    yield {'modelo': modelo, 'fotos': fotos, 'store': path, 'sock': sock}
+    servidor.shutdown()
+    servidor.server_close()
+    indice_facial.descartar_indices()
+
+
+def test_embedding_e_o_forward_cru_da_imagem(servico):
+    emb = inferencia_facial.embedding(b'qualquer')
+    assert np.allclose(emb, _rosto(b'qualquer') * 3.0)
+    assert inferencia_facial.embedding(b'ilegivel') is None
+
+
+def test_pedidos_simultaneos_viram_um_lote(servico):
+    modelo = servico['modelo']
+    modelo.trava.clear()            # segura o primeiro forward: o resto se acumula na fila
+    resultados = {}
+
+    def pedir(i):
+        resultados[i] = inferencia_facial.embedding(f'img-{i}'.encode())
+
+    threads = [threading.Thread(target=pedir, args=(i,)) for i in range(12)]
+    for t in threads:
+        t.start()
+    threading.Timer(0.3, modelo.trava.set).start()
+    for t in threads:
+        t.join(5)
+
+    assert len(resultados) == 12 and sum(modelo.lotes) == 12
+    assert max(modelo.lotes) > 1 and len(modelo.lotes) < 12
+    for i, emb in resultados.items():
+        assert np.allclose(emb, _rosto(f'img-{i}'.encode()) * 3.0)
+
+
+@pytest.mark.parametrize('semente', range(3))
+def test_identificar_igual_ao_indice_no_processo(servico, semente):
+    rnd = random.Random(semente)
+    store = StoreFacial(servico['store'])
+    for _ in range(10):
+        admin_id = rnd.choice([1, 2])
+        fid = rnd.choice([f for f in servico['fotos'] if (f <= 8) == (admin_id == 1)])
+        captura = rnd.choice(servico['fotos'][fid]) if rnd.random() < 0.7 else b'estranho'
+        esperado = store.indice(admin_id).buscar(_emb(captura), k=1)[0]
+
+        func_id, dist, erro = inferencia_facial.identificar(captura, admin_id, 0.5)
+        assert dist == pytest.approx(esperado[1], abs=1e-5)
+        if esperado[1] <= 0.5:
+            assert (func_id, erro) == (esperado[0], None)
+        else:
+            assert func_id is None and 'threshold' in erro
+
+
+def test_identificar_ve_o_funcionario_anexado_depois(servico):
+    inferencia_facial.identificar(b'foto-1-0', 1, 0.5)
+    store_facial.anexar(servico['store'], 99, {
+        'admin_id': 1, 'nome': 'Novo',
+        'embeddings': [{'embedding': _emb(b'novo').tolist(), 'descricao': 'novo'}]})
+    assert inferencia_facial.identificar(b'novo', 1, 0.5)[0] == 99
+    assert inferencia_facial.identificar(b'novo', 2, 0.5)[0] != 99
+
+
+def test_distancias_por_foto(servico):
+    refs = [b'a', b'ilegivel', b'b', b'captura']
+    dists = inferencia_facial.distancias(b'captura', refs)
+    q = _emb(b'captura')
+    assert dists[1] is None and dists[3] == pytest.approx(0.0, abs=1e-6)
+    for ref, d in zip(refs, dists, strict=True):
+        if d is not None:
+            assert d == pytest.approx(float(1 - _emb(ref) @ q), abs=1e-6)
+    with pytest.raises(ValueError):
+        inferencia_facial.distancias(b'ilegivel', refs)
+
+
+def test_saude_conta_lotes(servico):
+    inferencia_facial.embedding(b'x')
+    saude = inferencia_facial.saude()
+    assert saude['pid'] == os.getpid() and saude['rostos'] >= 1 and saude['rss_max_mb'] > 0
+
+
+def test_fora_do_ar_levanta_e_pausa(tmp_path, monkeypatch):
+    monkeypatch.setattr(inferencia_facial, '_pausa_ate', 0.0)
+    monkeypatch.delenv(inferencia_facial.SOCKET_ENV, raising=False)
+    with pytest.raises(InferenciaIndisponivel):
+        inferencia_facial.embedding(b'x')
+
+    monkeypatch.setenv(inferencia_facial.SOCKET_ENV, str(tmp_path / 'nao-existe.sock'))
+    with pytest.raises(InferenciaIndisponivel):
+        inferencia_facial.embedding(b'x')
+    assert inferencia_facial._pausa_ate > 0
+    with pytest.raises(InferenciaIndisponivel, match='pausa'):
+        inferencia_facial.saude()
+
+
+def test_multiplas_fotos_usa_o_servico_e_cai_no_laco(servico, monkeypatch):
+    import utils_facial
+
+    fotos = [{'foto_base64': base64.b64encode(b).decode(), 'descricao': b.decode()}
+             for b in (b'perfil', b'frente')]
+    monkeypatch.setattr(utils_facial, 'obter_todas_fotos_funcionario', lambda f: fotos)
+    chamadas = []
+    monkeypatch.setattr(utils_facial, 'comparar_faces_deepface',
+                        lambda *a, **k: chamadas.append(a) or (True, 0.1, None))
+    captura = 'data:image/jpeg;base64,' + base64.b64encode(b'frente').decode()
+
+    match, dist, desc = utils_facial.reconhecer_com_multiplas_fotos(captura, object(), 0.3)
+    assert (match, desc) == (True, 'frente') and dist == pytest.approx(0.0, abs=1e-6)
+    assert chamadas == []
+
+    monkeypatch.setenv(inferencia_facial.SOCKET_ENV, servico['sock'] + '.fora')
+    assert utils_facial.reconhecer_com_multiplas_fotos(captura, object(), 0.3)[0] is True
+    assert len(chamadas) == 2
+
+
+@pytest.mark.integration
+def test_ponto_views_identifica_pelo_servico(servico, monkeypatch):
+    import ponto_views
+
+    monkeypatch.setattr(ponto_views, 'redimensionar_imagem_para_reconhecimento',
+                        lambda b64, **k: b64)
+    captura = base64.b64encode(servico['fotos'][3][0]).decode()
+    assert ponto_views.identificar_por_cache(captura, 1, 0.5)[0] == 3
+
+    tmp = os.path.join(os.path.dirname(servico['store']), 'foto.jpg')
+    with open(tmp, 'wb') as f:
+        f.write(b'qualquer')
+    assert np.allclose(ponto_views.gerar_embedding_otimizado(tmp), _rosto(b'qualquer') * 3.0)
@@ -0,0 +1,189 @@
+"""Leitura em fluxo das planilhas de importação (services/leitor_planilha).
+
+A referência é a planilha aberta em modo completo: cada importador tem de
+devolver, lendo a mesma pasta em modo somente leitura, exatamente o mesmo
+(validos, erros) — números de linha inclusive. E o leitor não pode confiar
+na tag <dimension> do arquivo: há gerador que grava `A1` com dados até a
+linha 500.
+"""
+import io
+import os
+import re
+import sys
+import zipfile
+from datetime import date
+
+import openpyxl
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import leitor_planilha  # noqa: E402
+
+
+def _xlsx(*abas):
+    """Bytes de uma pasta com as abas [(titulo, linhas)]."""
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    for titulo, linhas in abas:
+        ws = wb.create_sheet(titulo)
+        for rn, linha in enumerate(linhas, start=1):
+            for cn, valor in enumerate(linha, start=1):
+                if valor is not None:
+                    ws.cell(rn, cn, valor)
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def _dois_modos(conteudo):
+    """(aba em modo completo, aba em fluxo, pasta em fluxo para fechar)."""
+    completo = openpyxl.load_workbook(io.BytesIO(conteudo), data_only=True).active
+    fluxo = leitor_planilha.abrir(io.BytesIO(conteudo))
+    return completo, fluxo.active, fluxo
+
+
+def test_registros_pelo_cabecalho_e_linhas_curtas():
+    conteudo = _xlsx(('Custos', [
+        ('Relatório de custos',),
+        (),
+        ('fornecedor', 'Descrição', 'valor', None, 'status'),
+        ('Areia Forte', 'areia média', 120.5, None, 'PAGO'),
+        (),
+        ('Brita Real', None, 80),                   # termina antes de "status"
+    ]))
+    completo, fluxo, wb = _dois_modos(conteudo)
+    try:
+        for ws in (completo, fluxo):
+            header_row, raw = leitor_planilha.cabecalho(ws, lambda v: 'valor' in v)
+            assert header_row == 3
+            colunas = {str(h).lower(): i for i, h in enumerate(raw) if h}
+            lidos = [(rn, c('fornecedor'), c('descricao', 'descrição'), c('valor'),
+                      c('status'), c('inexistente'))
+                     for rn, c in leitor_planilha.registros(ws, header_row, colunas)]
+            assert lidos == [(4, 'Areia Forte', 'areia média', 120.5, 'PAGO', None),
+                             (5, None, None, None, None, None),
+                             (6, 'Brita Real', None, 80, None, None)]
+        assert all(len(v) >= 7 for _rn, v in leitor_planilha.linhas(fluxo, largura=7))
+    finally:
+        wb.close()
+
+
+def test_dimensao_errada_no_arquivo_nao_corta_a_leitura():
+    conteudo = _xlsx(('Dados', [('nome', 'valor')] + [(f'n{i}', i) for i in range(500)]))
+    # Regrava a aba com <dimension ref="A1"/>, como alguns geradores fazem.
+    entrada, saida = zipfile.ZipFile(io.BytesIO(conteudo)), io.BytesIO()
+    with zipfile.ZipFile(saida, 'w') as z:
+        for item in entrada.infolist():
+            dados = entrada.read(item.filename)
+            if item.filename.startswith('xl/worksheets/sheet'):
+                dados = re.sub(rb'<dimension ref="[^"]*"', b'<dimension ref="A1"', dados)
+            z.writestr(item, dados)
+
+    wb = leitor_planilha.abrir(io.BytesIO(saida.getvalue()))
+    try:
+        lidas = list(leitor_planilha.linhas(wb.active))
+    finally:
+        wb.close()
+    assert len(lidas) == 501 and lidas[-1] == (501, ('n499', 499))
+
+
+# ── importadores: mesmo resultado nos dois modos ──────────────────────────────
+
+@pytest.mark.integration
+@pytest.mark.parametrize('modulo, linhas', [
+    ('custos', [
+        ('fornecedor', 'descricao', 'valor', 'data', 'categoria', 'status'),
+        ('Areia Forte', 'areia', 'R$ 1.200,50', date(2026, 3, 2), 'material', 'pago'),
+        ('Brita Real', 'brita', 0, None, None, None),
+        (None, None, None),
+        ('Ferragens União', 'vergalhão', 310, '05/03/2026', 'COMPRA', 'PENDENTE'),
+    ]),
+    ('funcionarios', [
+        ('nome', 'cpf', 'tipo_remuneracao', 'valor', 'data_admissao'),
+        ('Ana Lima', '123.456.789-01', 'diaria', 180, date(2026, 1, 5)),
+        ('Sem Cpf', None, 'salario', 3000, None),
+        ('Ana Lima 2', '12345678901', 'salario', 2500, None),
+    ]),
+    ('diarias', [
+        ('nome_funcionario', 'data', 'obra', 'valor_diaria'),
+        ('Fulano Novo', date(2026, 4, 1), 'FALTA', 150),
+        ('Fulano Novo', 'data ruim', 'Obra X', 150),
+        ('Fulano Novo', date(2026, 4, 2), 'Obra Que Nao Existe', 150),
+    ]),
+    ('diarias', [
+        ('COLABORADOR', None, 'Beltrano da Silva'),
+        ('DATA', 'DIA DA SEMANA', 'CENTRO DE CUSTO', '$ DIÁRIA', '$ VT', '$ VA'),
+        (date(2026, 4, 1), 'QUA', 'Obra Y', 200, 12, 30),
+        (date(2026, 4, 2), 'QUI', 'FERIADO', 0, 0, 0),
+        (None, 'DOM'),
+        (date(2026, 4, 3), 'SEX', 'ATESTADO', 200, 0, 0),
+    ]),
+    ('diarias', [                                # dia sem VT/VA: linha curta em fluxo
+        ('COLABORADOR', None, 'Beltrano da Silva'),
+        ('DATA', 'DIA', 'CENTRO DE CUSTO', '$ DIÁRIA', '$ VT', '$ VA'),
+        (date(2026, 4, 6), 'SEG', 'OBRA X', 100),
+    ]),
+])
+def test_importador_le_igual_em_fluxo_e_em_modo_completo(modulo, linhas):
+    from app import app
+    from helpers_tenant import um_tenant
+    from services.importacao_excel import get_importador
+
+    with app.app_context():
+        t = um_tenant('lpl', com_fatos=False)
+        completo, fluxo, wb = _dois_modos(_xlsx(('Planilha', linhas)))
+        try:
+            esperado = get_importador(modulo).processar(completo, t.admin_id)
+            assert get_importador(modulo).processar(fluxo, t.admin_id) == esperado
+        finally:
+            wb.close()
+        assert esperado[0]                   # houve linha válida para comparar
+
+
+@pytest.mark.integration
+def test_preview_pela_rota_le_em_fluxo(monkeypatch):
+    import main  # noqa: F401 — registra os blueprints
+    from app import app
+    from helpers_tenant import cliente_de, um_tenant
+
+    monkeypatch.setitem(app.config, 'WTF_CSRF_ENABLED', False)
+    with app.app_context():
+        t = um_tenant('lpr', com_fatos=False)
+    conteudo = _xlsx(('Custos', [('fornecedor', 'descricao', 'valor'),
+                                 ('Areia Forte', 'areia', 99.9)]))
+    resposta = cliente_de(t.admin_id).post(
+        '/importacao/preview/custos',
+        data={'arquivo': (io.BytesIO(conteudo), 'custos.xlsx')},
+        content_type='multipart/form-data')
+    assert resposta.status_code == 200
+    assert 'Areia Forte' in resposta.get_data(as_text=True)
+
+
+@pytest.mark.integration
+def test_fluxo_de_caixa_fecha_a_pasta_mesmo_com_erro(monkeypatch):
+    """A pasta em fluxo segura o arquivo aberto: erro no meio da leitura
+    não pode vazar o handle."""
+    from app import app
+    from helpers_tenant import um_tenant
+    from services.importacao_excel import ImportacaoFluxoCaixa
+
+    abertas = []
+    abrir = leitor_planilha.abrir
+
+    def _abrir(arquivo):
+        wb = abrir(arquivo)
+        abertas.append(wb)
+        return wb
+
+    def _linhas_quebradas(*_a, **_k):
+        raise RuntimeError('planilha corrompida')
+
+    monkeypatch.setattr(leitor_planilha, 'abrir', _abrir)
+    monkeypatch.setattr(leitor_planilha, 'linhas', _linhas_quebradas)
+    conteudo = _xlsx(('Entrada', [('x',)]))
+    with app.app_context():
+        t = um_tenant('lfc', com_fatos=False)
+        with pytest.raises(RuntimeError):
+            ImportacaoFluxoCaixa().processar(io.BytesIO(conteudo), t.admin_id)
+    assert len(abertas) == 1 and abertas[0]._archive.fp is None
@@ -0,0 +1,279 @@
+"""Carga colunar das métricas de produtividade (services/metricas_produtividade).
+
+`_carregar_frame` troca os objetos ORM por SELECTs de colunas num DataFrame
+e `_Periodo` pré-carrega coeficientes, nomes de papel e versões do
+operacional numa consulta por tabela. Os registros têm de ser, dict a dict,
+os do carregador antigo (reproduzido aqui linha a linha como referência) e
+os relatórios, os mesmos com e sem pré-carga. Dentro de um request, os
+painéis dividem um período só.
+"""
+import os
+import sys
+from collections import defaultdict
+from datetime import date, datetime
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from models import (ComposicaoServico, Funcao, Funcionario, Insumo, Obra,
+                    ObraOrcamentoOperacional, ObraOrcamentoOperacionalItem,
+                    ObraOrcamentoOperacionalItemVersao, RDO, RDOCustoDiario, RDOMaoObra,
+                    RDOServicoSubatividade, Servico)
+
+from helpers_tenant import um_tenant
+
+pytestmark = pytest.mark.integration
+
+INICIO, FIM = date(2026, 4, 1), date(2026, 4, 30)
+
+
+def _carregar_linha_a_linha(admin_id, data_inicio, data_fim, obra_ids=None, funcao_ids=None):
+    """O `_carregar_dados_periodo` de antes da carga colunar, objeto a objeto."""
+    from services.metricas_produtividade import _d
+
+    q = RDO.query.filter(RDO.admin_id == admin_id, RDO.data_relatorio >= data_inicio,
+                         RDO.data_relatorio <= data_fim, RDO.status == 'Finalizado')
+    if obra_ids:
+        q = q.filter(RDO.obra_id.in_(obra_ids))
+    rdos = q.all()
+    if not rdos:
+        return []
+    rdo_ids = [r.id for r in rdos]
+    rdo_map = {r.id: r for r in rdos}
+    mos = RDOMaoObra.query.filter(RDOMaoObra.rdo_id.in_(rdo_ids),
+                                  RDOMaoObra.admin_id == admin_id).order_by(RDOMaoObra.id).all()
+    if funcao_ids:
+        mos = [mo for mo in mos if mo.funcionario and
+               getattr(mo.funcionario, 'funcao_id', None) in funcao_ids]
+    sub_map = {s.id: s for s in RDOServicoSubatividade.query.filter(
+        RDOServicoSubatividade.rdo_id.in_(rdo_ids), RDOServicoSubatividade.ativo.is_(True))}
+    custo_map = {(c.rdo_id, c.funcionario_id): c for c in RDOCustoDiario.query.filter(
+        RDOCustoDiario.rdo_id.in_(rdo_ids), RDOCustoDiario.admin_id == admin_id
+    ).order_by(RDOCustoDiario.id)}
+    servico_ids = {s.servico_id for s in sub_map.values() if s.servico_id}
+    servicos = {s.id: s for s in Servico.query.filter(Servico.id.in_(servico_ids))}
+    funcs = {f.id: f for f in Funcionario.query.filter(
+        Funcionario.id.in_({mo.funcionario_id for mo in mos}))}
+    horas_func_rdo = defaultdict(float)
+    for mo in mos:
+        horas_func_rdo[(mo.rdo_id, mo.funcionario_id)] += _d(mo.horas_trabalhadas)
+
+    registros = []
+    for mo in mos:
+        rdo = rdo_map[mo.rdo_id]
+        sub = sub_map.get(mo.subatividade_id) if mo.subatividade_id else None
+        custo_dia = custo_map.get((mo.rdo_id, mo.funcionario_id))
+        func = funcs.get(mo.funcionario_id)
+        servico = servicos.get(sub.servico_id) if sub and sub.servico_id else None
+        registros.append({
+            'rdo_id': rdo.id, 'rdo_data': rdo.data_relatorio, 'rdo_obra_id': rdo.obra_id,
+            'rdo_numero': rdo.numero_rdo,
+            'sub_id': sub.id if sub else None,
+            'sub_servico_id': sub.servico_id if sub else None,
+            'sub_servico_nome': servico.nome if servico else (sub.nome_subatividade if sub else ''),
+            'sub_unidade': servico.unidade_medida if servico else '',
+            'sub_quantidade_produzida': _d(sub.quantidade_produzida) if sub else None,
+            'mo_id': mo.id, 'mo_func_id': mo.funcionario_id,
+            'mo_func_nome': func.nome if func else f'Func#{mo.funcionario_id}',
+            'mo_funcao_id': getattr(func, 'funcao_id', None) if func else None,
+            'mo_funcao_exercida': mo.funcao_exercida,
+            'mo_horas': _d(mo.horas_trabalhadas), 'mo_extras': 0.0,
+            'mo_composicao_id': mo.composicao_servico_id,
+            'mo_vinculo_status': mo.vinculo_status,
+            'custo_total_dia': _d(custo_dia.custo_total_dia) if custo_dia else None,
+            'horas_func_neste_rdo': horas_func_rdo.get((mo.rdo_id, mo.funcionario_id), 0.0),
+        })
+    return registros
+
+
+@pytest.fixture(scope='module')
+def cenario():
+    """Duas obras, três serviços (um sem operacional, outro com versão
+    trocada no meio do mês), papéis em dois serviços, subatividade inativa,
+    apontamento sem subatividade, custo faltando e custo duplicado, RDO em
+    rascunho e horas que não somam exato em binário."""
+    with app.app_context():
+        t = um_tenant('metcol', com_fatos=False)
+        a = t.admin_id
+        obra2 = Obra(nome=f'Obra 2 {t.marca}', codigo=f'{t.marca[:8]}2', data_inicio=INICIO,
+                     admin_id=a, cliente_id=t.cliente_id, status='Em andamento')
+        funcao = Funcao(nome=f'Pedreiro {t.marca}', admin_id=a, salario_base=0)
+        db.session.add_all([obra2, funcao])
+        db.session.flush()
+        funcs = [db.session.get(Funcionario, t.funcionario_id)]
+        for i in range(4):
+            funcs.append(Funcionario(
+                nome=f'Func {t.marca} {i}', cpf=f'{t.marca[-6:]}{i:05d}'[:14],
+                codigo=f'MC{t.marca[-5:]}{i}', data_admissao=date(2025, 1, 1), admin_id=a,
+                tipo_remuneracao='salario', salario=3000, ativo=True))
+        db.session.add_all(funcs[1:])
+        db.session.flush()
+        funcs[1].funcao_id = funcs[2].funcao_id = funcao.id
+
+        servicos = [Servico(nome=f'Serv {t.marca} {i}', descricao='', categoria='construcao',
+                            unidade_medida='m2' if i else '', admin_id=a, ativo=True)
+                    for i in range(3)]
+        insumos = [Insumo(nome=f'Papel {t.marca} {i}', tipo='MAO_OBRA', unidade='h',
+                          admin_id=a, ativo=True) for i in range(2)]
+        db.session.add_all(servicos + insumos)
+        db.session.flush()
+        comps = [ComposicaoServico(servico_id=servicos[0].id, insumo_id=insumos[0].id,
+                                   coeficiente=0.7, admin_id=a),
+                 ComposicaoServico(servico_id=servicos[0].id, insumo_id=insumos[1].id,
+                                   coeficiente=1.3, admin_id=a),
+                 ComposicaoServico(servico_id=servicos[1].id, insumo_id=insumos[1].id,
+                                   coeficiente=0.9, admin_id=a)]
+        db.session.add_all(comps)
+        db.session.flush()
+
+        for obra_id in (t.obra_id, obra2.id):
+            op = ObraOrcamentoOperacional(obra_id=obra_id, admin_id=a)
+            db.session.add(op)
+            db.session.flush()
+            for k, servico in enumerate(servicos[:2]):
+                item = ObraOrcamentoOperacionalItem(operacional_id=op.id, admin_id=a,
+                                                    servico_id=servico.id, descricao='x')
+                db.session.add(item)
+                db.session.flush()
+                snap = [{'coeficiente': 1.1 + k, 'preco_unitario': 40.0}]
+                if k == 0:
+                    db.session.add_all([
+                        ObraOrcamentoOperacionalItemVersao(
+                            item_id=item.id, admin_id=a, composicao_snapshot=snap,
+                            margem_pct=20, imposto_pct=10, vigente_de=datetime(2026, 4, 10),
+                            vigente_ate=datetime(2026, 4, 15)),
+                        ObraOrcamentoOperacionalItemVersao(
+                            item_id=item.id, admin_id=a,
+                            composicao_snapshot=[{'coeficiente': 1.4, 'preco_unitario': 41.0}],
+                            margem_pct=15, imposto_pct=8, vigente_de=datetime(2026, 4, 15)),
+                    ])
+                else:
+                    db.session.add(ObraOrcamentoOperacionalItemVersao(
+                        item_id=item.id, admin_id=a, composicao_snapshot=snap,
+                        margem_pct=25, imposto_pct=12, vigente_de=datetime(2026, 1, 1)))
+
+        rdos = []
+        for i in range(8):
+            rdo = RDO(numero_rdo=f'MC{t.marca[-6:]}{i}', obra_id=(t.obra_id, obra2.id)[i % 2],
+                      data_relatorio=date(2026, 4, 3 + 3 * i), admin_id=a, criado_por_id=a,
+                      status='Finalizado' if i != 5 else 'Rascunho')
+            db.session.add(rdo)
+            db.session.flush()
+            rdos.append(rdo)
+            subs = []
+            for k, servico in enumerate(servicos):
+                sub = RDOServicoSubatividade(
+                    rdo_id=rdo.id, servico_id=servico.id, nome_subatividade=f'Sub {k}',
+                    percentual_conclusao=0, admin_id=a, ativo=not (i == 2 and k == 1),
+                    quantidade_produzida=None if (i + k) % 4 == 0 else 2.3 + k + i * 0.1)
+                db.session.add(sub)
+                subs.append(sub)
+            db.session.flush()
+            for j, func in enumerate(funcs):
+                sub = None if j == 4 and i % 3 == 0 else subs[(i + j) % 3]
+                comp = comps[(i + j) % 3] if sub and sub.servico_id != servicos[2].id else None
+                for h in (0.1, 0.2 + j * 0.7):
+                    db.session.add(RDOMaoObra(
+                        rdo_id=rdo.id, funcionario_id=func.id, funcao_exercida='Pedreiro',
+                        horas_trabalhadas=h + 3.3, admin_id=a,
+                        subatividade_id=sub.id if sub else None,
+                        composicao_servico_id=comp.id if comp else None,
+                        vinculo_status=('auto', 'manual', 'ambiguo')[(i + j) % 3]))
+                if (i + j) % 5:
+                    for extra in range(1 + (i == 4 and j == 1)):
+                        db.session.add(RDOCustoDiario(
+                            rdo_id=rdo.id, funcionario_id=func.id, admin_id=a,
+                            data=rdo.data_relatorio, tipo_remuneracao_snapshot='salario',
+                            custo_total_dia=173.33 + i * 1.17 + extra * 10,
+                            horas_normais=8, tipo_lancamento='rdo'))
+        db.session.commit()
+        yield {'t': t, 'obra2': obra2.id, 'funcao': funcao.id,
+               'servicos': [s.id for s in servicos], 'funcs': [f.id for f in funcs]}
+
+
+@pytest.mark.parametrize('filtros', ['nenhum', 'obra', 'funcao'])
+def test_registros_sao_os_do_carregador_antigo(cenario, filtros):
+    from services.metricas_produtividade import _carregar_dados_periodo
+
+    kw = {'nenhum': {}, 'obra': {'obra_ids': [cenario['obra2']]},
+          'funcao': {'funcao_ids': [cenario['funcao']]}}[filtros]
+    with app.app_context():
+        antigo = _carregar_linha_a_linha(cenario['t'].admin_id, INICIO, FIM, **kw)
+        novo = _carregar_dados_periodo(cenario['t'].admin_id, INICIO, FIM, **kw)
+    assert antigo
+    assert novo == antigo
+    for a, n in zip(antigo, novo, strict=True):
+        assert [type(v) for v in n.values()] == [type(v) for v in a.values()]
+
+
+def _relatorios(c):
+    from services import metricas_produtividade as mp
+
+    a, (s0, s1, _s2), funcs = c['t'].admin_id, c['servicos'], c['funcs']
+    return {
+        'servico': mp.produtividade_por_servico(a, INICIO, FIM),
+        'servico_obra': mp.produtividade_por_servico(a, INICIO, FIM, obra_id=c['obra2']),
+        'funcionarios': mp.producao_por_funcionario(a, INICIO, FIM),
+        'funcionarios_funcao': mp.producao_por_funcionario(a, INICIO, FIM,
+                                                           funcao_ids=[c['funcao']]),
+        'ranking': mp.ranking_funcionarios(a, INICIO, FIM, servico_id=s1,
+                                           ordenar_por='lucratividade'),
+        'divergencias': [mp.divergencias_por_servico(a, s, INICIO, FIM, ordenar_por=o)
+                         for s in (s0, s1) for o in ('prejuizo', 'gap_producao')],
+        'detalhe': [{k: v for k, v in mp.detalhe_funcionario(a, f, INICIO, FIM).items()
+                     if k != 'funcionario'} for f in funcs],
+        'top': [mp.top_rdos_por_funcionario(a, f, INICIO, FIM, top_n=5) for f in funcs],
+    }
+
+
+def test_relatorios_iguais_com_e_sem_pre_carga(cenario, monkeypatch):
+    import pandas as pd
+
+    from services import metricas_produtividade as mp
+
+    with app.app_context():
+        colunar = _relatorios(cenario)
+        assert colunar['servico'] and colunar['funcionarios'] and colunar['divergencias'][0]['rdos']
+        assert any(s['receita_liq_media_un'] for s in colunar['servico'])
+
+        # Referência: os registros do carregador antigo e os caches enchidos
+        # uma consulta por chave, como antes.
+        monkeypatch.setattr(mp, '_carregar_frame', lambda *a, **k: pd.DataFrame(
+            _carregar_linha_a_linha(*a, **k), columns=list(mp._COLUNAS_REGISTRO), dtype=object
+        ).astype({'mo_horas': float, 'mo_extras': float, 'horas_func_neste_rdo': float}))
+        monkeypatch.setattr(mp._Periodo, '_pre_carregar', lambda self: None)
+        db.session.expire_all()
+        referencia = _relatorios(cenario)
+    assert colunar == referencia
+
+
+def test_request_carrega_o_periodo_uma_vez(cenario):
+    from sqlalchemy import event
+
+    from services import metricas_produtividade as mp
+
+    a = cenario['t'].admin_id
+    with app.app_context():
+        fora = _relatorios(cenario)
+        selects_rdo = [0]
+
+        def _contar(_con, _cur, statement, *_a):
+            if statement.lstrip().startswith('SELECT rdo.id'):
+                selects_rdo[0] += 1
+
+        event.listen(db.engine, 'before_cursor_execute', _contar)
+        try:
+            with app.test_request_context():
+                metricas = mp.producao_por_funcionario(a, INICIO, FIM)
+                ctx = {}
+                for m in metricas:
+                    mp.top_rdos_por_funcionario(a, m['funcionario_id'], INICIO, FIM,
+                                                top_n=5, _ctx=ctx)
+                mp.ranking_funcionarios(a, INICIO, FIM, servico_id=cenario['servicos'][1])
+                assert selects_rdo[0] == 1          # cards, top RDOs e ranking: um período
+                dentro = _relatorios(cenario)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', _contar)
+    assert dentro == fora
@@ -0,0 +1,122 @@
+"""Schema no boot (services/migracoes_boot): uma query com o banco em dia,
+sem importar o migrations.py; com algo pendente, um processo migra sob
+advisory lock e quem espera confere de novo e não repete o trabalho.
+
+A sincronia de `ATIVAS` com a lista do runner é conferida por AST em
+tests/test_migrations_numeracao.py.
+"""
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+
+import pytest
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from models import db
+from services import migracoes_boot
+
+pytestmark = pytest.mark.integration
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def em_dia():
+    with app.app_context():
+        if not migracoes_boot.schema_em_dia():
+            pytest.skip('banco de teste com migração pendente — rode pre_start.py')
+
+
+def _boot(codigo, **env):
+    proc = subprocess.run([sys.executable, '-c', textwrap.dedent(codigo)], cwd=RAIZ,
+                          env={**os.environ, 'SIGE_ENABLE_DEMO_SEED': 'false', **env},
+                          capture_output=True, text=True, timeout=180)
+    assert proc.returncode == 0, proc.stderr[-3000:]
+    return proc.stdout.strip().splitlines()[-1]
+
+
+def test_banco_em_dia_custa_uma_query_e_nao_importa_migrations(em_dia):
+    saida = _boot('''
+        import sys
+        from sqlalchemy import event
+        from app import app, db
+        from services.migracoes_boot import garantir_schema
+        sql = []
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute',
+                         lambda conn, cur, stmt, *a: sql.append(stmt))
+            rodou = garantir_schema()
+        print(rodou, len(sql), 'migrations' in sys.modules)
+    ''', SIGE_BOOT_DDL='0')
+    assert saida == 'False 1 False'
+
+
+def test_boot_do_app_com_ddl_ligado_nao_importa_migrations(em_dia):
+    saida = _boot('''
+        import sys
+        import app
+        print('migrations' in sys.modules)
+    ''', SIGE_BOOT_DDL='1')
+    assert saida == 'False'
+
+
+def test_pendencia_aparece_e_historico_ilegivel_e_tudo_pendente(em_dia, monkeypatch):
+    with app.app_context():
+        assert migracoes_boot.pendencias() == (set(), [])
+        monkeypatch.setattr(migracoes_boot, 'ATIVAS', migracoes_boot.ATIVAS + (99999,))
+        assert migracoes_boot.pendencias() == ({99999}, [])
+
+        class SemHistorico:
+            def connect(self):
+                raise RuntimeError('sem banco')
+
+        migracoes, tabelas = migracoes_boot.pendencias(SemHistorico())
+        assert 154 in migracoes and 'obra' in tabelas
+
+
+def test_um_processo_migra_e_o_outro_espera_e_nao_repete(em_dia, monkeypatch):
+    feito = threading.Event()
+    chamadas, resultados, travas_vistas = [], [], []
+
+    def pendencias(engine=None):
+        return (set(), []) if feito.is_set() else ({99999}, [])
+
+    def executar_migracoes():
+        chamadas.append(threading.current_thread().name)
+        segundo.start()
+        time.sleep(0.5)  # o segundo chega à trava enquanto esta migra
+        with db.engine.connect() as conn:
+            travas_vistas.append(conn.execute(text(
+                "SELECT count(*) FROM pg_locks WHERE locktype = 'advisory' "
+                "AND classid = :classe AND granted"),
+                {'classe': migracoes_boot._LOCK_MIGRACOES}).scalar())
+        feito.set()
+
+    def subir():
+        with app.app_context():
+            resultados.append(migracoes_boot.garantir_schema())
+
+    import migrations
+    monkeypatch.setattr(migracoes_boot, 'pendencias', pendencias)
+    monkeypatch.setattr(migrations, 'executar_migracoes', executar_migracoes)
+    monkeypatch.setattr(db, 'create_all', lambda: None)
+
+    primeiro = threading.Thread(target=subir, name='worker-1')
+    segundo = threading.Thread(target=subir, name='worker-2')
+    primeiro.start()
+    primeiro.join(30)
+    segundo.join(30)
+
+    assert chamadas == ['worker-1']
+    assert travas_vistas == [1]
+    assert sorted(resultados) == [False, True]
+    with app.app_context(), db.engine.connect() as conn:
+        assert not conn.execute(text(
+            "SELECT count(*) FROM pg_locks WHERE locktype = 'advisory' AND classid = :classe"),
+            {'classe': migracoes_boot._LOCK_MIGRACOES}).scalar()
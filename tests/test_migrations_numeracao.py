@@ -108,3 +108,30 @@ def test_nenhuma_descricao_estoura_o_limite_da_coluna():
     assert not longas, (
         f'descrição maior que VARCHAR({LIMITE_MIGRATION_NAME}) em {longas} — '
         f'o INSERT do histórico falha em silêncio e a migração re-roda sempre.')
+
+
+def test_o_registro_leve_do_boot_bate_com_a_lista():
+    """O boot confere `services/migracoes_boot.ATIVAS` (e `APOSENTADAS`) sem
+    importar este módulo: migração que entra na lista e não no registro nunca roda — o
+    boot acha o schema em dia e nem chega ao runner."""
+    with open(os.path.join(RAIZ, 'migrations.py'), encoding='utf-8') as fh:
+        funcoes = {no.name: no for no in ast.parse(fh.read()).body
+                   if isinstance(no, ast.FunctionDef)}
+    lista = funcoes['_migracoes_ativas'].body[-1].value  # o `return [...]` final
+    numeros = [tupla.elts[0].value for tupla in lista.elts]
+    atribuicao = next(no for no in ast.walk(funcoes['_aposentar_migracoes_retiradas'])
+                      if isinstance(no, ast.Assign)
+                      and getattr(no.targets[0], 'id', None) == 'aposentadas')
+    aposentadas = sorted(num for num, _nome in ast.literal_eval(atribuicao.value))
+
+    with open(os.path.join(RAIZ, 'services', 'migracoes_boot.py'), encoding='utf-8') as fh:
+        arvore = ast.parse(fh.read())
+    registro = {no.targets[0].id: ast.literal_eval(no.value) for no in arvore.body
+                if isinstance(no, ast.Assign) and no.targets[0].id in ('ATIVAS', 'APOSENTADAS')}
+    assert len(numeros) > 100
+    assert list(registro['ATIVAS']) == numeros, (
+        'services/migracoes_boot.ATIVAS divergiu de migrations._migracoes_ativas(): '
+        'acrescente lá o número da migração nova')
+    assert sorted(registro['APOSENTADAS']) == aposentadas, (
+        'services/migracoes_boot.APOSENTADAS divergiu de '
+        'migrations._aposentar_migracoes_retiradas()')
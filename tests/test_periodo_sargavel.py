@@ -0,0 +1,149 @@
+"""Filtros de período sargáveis (services/periodo) no ponto e na folha.
+
+O mês como intervalo meio-aberto de `data` tem de devolver as mesmas linhas
+do extract(year/month) que substituiu — na virada do ano inclusive — e o
+EXPLAIN tem de mostrar o intervalo como Index Cond nos índices compostos
+(funcionario_id, data), (obra_id, data) e (admin_id, data) do
+`registro_ponto`, sem extract no filtro.
+"""
+import os
+import sys
+from datetime import date, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, text
+
+from app import app, db
+from models import Funcionario, RegistroPonto
+
+from helpers_tenant import um_tenant
+
+pytestmark = pytest.mark.integration
+
+INICIO = date(2024, 1, 1)
+
+
+@pytest.fixture(scope='module')
+def historico():
+    """Três anos de ponto diário de um funcionário numa obra."""
+    from services.gravacao_lote import inserir
+
+    with app.app_context():
+        t = um_tenant('periodo', com_fatos=False)
+        inserir(RegistroPonto, [dict(
+            funcionario_id=t.funcionario_id, obra_id=t.obra_id, admin_id=t.admin_id,
+            data=INICIO + timedelta(days=i), horas_trabalhadas=8.0, horas_extras=0.0,
+            tipo_registro='trabalhado') for i in range(3 * 365)])
+        db.session.commit()
+        db.session.execute(text('ANALYZE registro_ponto'))
+        db.session.commit()
+        yield t
+
+
+def test_intervalo_do_mes_e_meio_aberto():
+    from services.periodo import intervalo_mes, limites_mes
+
+    assert intervalo_mes(2026, 2) == (date(2026, 2, 1), date(2026, 3, 1))
+    assert intervalo_mes(2025, 12) == (date(2025, 12, 1), date(2026, 1, 1))
+    assert limites_mes(2024, 2) == (date(2024, 2, 1), date(2024, 2, 29))
+
+
+@pytest.mark.parametrize('ano,mes', [(2024, 2), (2024, 12), (2025, 1), (2026, 12)])
+def test_mesmas_linhas_que_o_extract(historico, ano, mes):
+    from services.periodo import no_mes
+
+    with app.app_context():
+        base = db.session.query(RegistroPonto.data).filter(
+            RegistroPonto.funcionario_id == historico.funcionario_id)
+        intervalo = sorted(d for (d,) in base.filter(*no_mes(RegistroPonto.data, ano, mes)))
+        extract = sorted(d for (d,) in base.filter(
+            func.extract('year', RegistroPonto.data) == ano,
+            func.extract('month', RegistroPonto.data) == mes))
+    assert intervalo == extract
+    assert bool(intervalo) == (ano < 2027)
+
+
+def _plano(consulta):
+    """EXPLAIN da consulta com o seq scan desligado: o que interessa é o que
+    o índice consegue usar como Index Cond, não o custo numa base pequena."""
+    sql = str(consulta.statement.compile(dialect=db.engine.dialect,
+                                         compile_kwargs={'literal_binds': True}))
+    with db.engine.connect() as conn:
+        conn.execute(text('SET enable_seqscan = off'))
+        try:
+            return '\n'.join(r[0] for r in conn.execute(text(f'EXPLAIN {sql}')))
+        finally:
+            conn.execute(text('RESET enable_seqscan'))
+
+
+def _index_cond(plano, indice):
+    linhas = plano.splitlines()
+    uso = next(i for i, linha in enumerate(linhas) if indice in linha)
+    return next(linha for linha in linhas[uso:] if 'Index Cond' in linha)
+
+
+@pytest.mark.parametrize('chave,indice', [
+    ('funcionario_id', 'idx_registro_ponto_funcionario_data'),
+    ('obra_id', 'idx_registro_ponto_obra_data'),
+    ('admin_id', 'idx_registro_ponto_admin_data'),
+])
+def test_mes_e_index_cond_no_indice_composto(historico, chave, indice):
+    from services.periodo import no_mes
+
+    valor = {'funcionario_id': historico.funcionario_id, 'obra_id': historico.obra_id,
+             'admin_id': historico.admin_id}[chave]
+    with app.app_context():
+        base = RegistroPonto.query.filter(getattr(RegistroPonto, chave) == valor)
+        plano = _plano(base.filter(*no_mes(RegistroPonto.data, 2025, 6)))
+        plano_extract = _plano(base.filter(
+            func.extract('year', RegistroPonto.data) == 2025,
+            func.extract('month', RegistroPonto.data) == 6))
+
+    cond = _index_cond(plano, indice)
+    assert "data >= '2025-06-01'" in cond and "data < '2025-07-01'" in cond
+    assert 'EXTRACT' not in plano.upper()
+    # O extract só deixa a chave como Index Cond: o mês vira Filter, linha a
+    # linha, sobre o histórico inteiro.
+    assert 'data' not in _index_cond(plano_extract, indice).replace(chave, '')
+    assert 'EXTRACT' in plano_extract.upper()
+
+
+def test_folha_do_mes_le_o_ponto_pelo_indice(historico):
+    """O que a folha individual e a em lote consultam (capturado do
+    statement real) entra pelos índices compostos."""
+    from sqlalchemy import event
+
+    from services.folha_service import calcular_horas_mes
+    from services.folha_lote import carregar_mes
+
+    capturados = []
+
+    def _capturar(_con, _cur, statement, parametros, *_a):
+        if 'FROM registro_ponto' in statement and 'registro_ponto.data' in statement:
+            capturados.append((statement, parametros))
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _capturar)
+        try:
+            calcular_horas_mes(historico.funcionario_id, 2025, 6)
+            carregar_mes(historico.admin_id, 2025, 6,
+                         [db.session.get(Funcionario, historico.funcionario_id)])
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', _capturar)
+
+        assert len(capturados) == 2
+        planos = []
+        with db.engine.connect() as conn:
+            conn.execute(text('SET enable_seqscan = off'))
+            for statement, parametros in capturados:
+                cursor = conn.connection.cursor()
+                cursor.execute('EXPLAIN ' + statement, parametros)
+                planos.append('\n'.join(r[0] for r in cursor.fetchall()))
+            conn.execute(text('RESET enable_seqscan'))
+    for plano in planos:
+        cond = _index_cond(plano, 'idx_registro_ponto_funcionario_data')
+        assert "data >= '2025-06-01'" in cond and "data < '2025-07-01'" in cond
+        assert 'EXTRACT' not in plano.upper()
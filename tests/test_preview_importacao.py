@@ -0,0 +1,166 @@
+"""Preview do fluxo de caixa guardado no servidor (services/preview_importacao).
+
+O upload grava o preview sob um token; a confirmação manda o token e só as
+edições ({_sid: {campo: valor}}) e o `importar` lê as linhas do staging em
+lotes. Linha não editada é importada como a tela a mostrou — inclusive o
+destinatário sugerido e o "apenas pagamento" sugerido, como o formulário
+antigo mandava —, edição fora do tenant é ignorada, e o corpo da confirmação
+não depende do número de linhas.
+"""
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytestmark = pytest.mark.integration
+
+
+def _saida(i, **extra):
+    linha = {'data': '10/03/2026', 'fornecedor': f'Fornecedor Prev {i}',
+             'descricao': f'compra {i}', 'valor': 100.0 + i, 'status': 'PAGO',
+             'obra_id': None, 'tipo_categoria': 'MATERIAL', 'banco_id': None,
+             'categoria_nome': 'Materiais de Obra'}
+    linha.update(extra)
+    return linha
+
+
+def test_staging_em_lotes_por_tenant_e_com_validade():
+    from app import app
+    from helpers_tenant import dois_tenants
+    from services import preview_importacao
+
+    with app.app_context():
+        a, b = dois_tenants('pvs', com_fatos=False)
+        secoes = {'entradas': [{'cliente': 'Cliente X', 'valor': 10}],
+                  'saidas_auto': [_saida(i) for i in range(5)],
+                  'saidas_manual': [], 'transferencias': []}
+        token = preview_importacao.guardar(a.admin_id, 'fluxo_caixa', secoes)
+
+        sids = [r['_sid'] for s in secoes.values() for r in s]
+        assert sorted(sids) == list(range(1, 7))       # os dicts ganham _sid in-place
+        lidas = list(preview_importacao.Linhas(token, a.admin_id, 'fluxo_caixa',
+                                               ('saidas_auto', 'entradas'), lote=2))
+        assert [r['_sid'] for r in lidas] == sids[1:] + sids[:1]
+        assert preview_importacao.carregar(token, b.admin_id, 'fluxo_caixa') is None
+        assert preview_importacao.carregar('x' * 32, a.admin_id, 'fluxo_caixa') is None
+
+        vazio = preview_importacao.guardar(a.admin_id, 'fluxo_caixa', {'entradas': []})
+        assert preview_importacao.carregar(vazio, a.admin_id, 'fluxo_caixa',
+                                           ('entradas',)) == {'entradas': []}
+
+        # Reclassificar move a linha de seção e mantém o _sid.
+        atual = preview_importacao.carregar(token, a.admin_id, 'fluxo_caixa')
+        movida = atual['saidas_auto'].pop(0)
+        atual['saidas_manual'] = [movida]
+        preview_importacao.substituir(token, a.admin_id, 'fluxo_caixa', atual)
+        depois = preview_importacao.carregar(token, a.admin_id, 'fluxo_caixa')
+        assert depois['saidas_manual'] == [movida]
+
+        from models import PreviewImportacaoLinha, db
+        PreviewImportacaoLinha.query.filter_by(token=token).update(
+            {'criado_em': datetime.utcnow() - preview_importacao.VALIDADE - timedelta(1)})
+        db.session.commit()
+        assert not preview_importacao.existe(token, a.admin_id, 'fluxo_caixa')
+        preview_importacao.guardar(a.admin_id, 'fluxo_caixa', {})   # limpa os vencidos
+        assert PreviewImportacaoLinha.query.filter_by(token=token).count() == 0
+
+
+def test_confirmar_manda_so_as_edicoes(monkeypatch):
+    import main  # noqa: F401 — registra os blueprints
+    from app import app, db
+    from helpers_tenant import cliente_de, dois_tenants
+    from models import (BancoEmpresa, CategoriaFluxoCaixa, ContaPagar, FluxoCaixa,
+                        Fornecedor, GestaoCustoFilho, GestaoCustoPai)
+    from services import preview_importacao
+
+    monkeypatch.setitem(app.config, 'WTF_CSRF_ENABLED', False)
+    with app.app_context():
+        a, b = dois_tenants('pvc', com_fatos=False)
+        CategoriaFluxoCaixa.seed_defaults(a.admin_id)
+        banco_b = BancoEmpresa(nome_banco='Banco B', agencia='1', conta='2', admin_id=b.admin_id)
+        forn = Fornecedor(nome=f'Forn {a.marca}', cnpj=f'PV-{a.marca}'[:18],
+                          tipo_fornecedor='MATERIAL', admin_id=a.admin_id, ativo=True)
+        db.session.add_all([banco_b, forn])
+        db.session.commit()
+        saidas = [_saida(i) for i in range(40)]
+        saidas[0].update(obra_id=a.obra_id, eh_reembolso=True)
+        saidas[1].update(entidade_sugerida_tipo='fornecedor', entidade_sugerida_id=forn.id,
+                         sugestao_apenas_pagamento=True)
+        manual = [_saida(99, tipo_categoria=None, categoria_nome='Outras Saídas')]
+        token = preview_importacao.guardar(a.admin_id, 'fluxo_caixa', {
+            'entradas': [], 'saidas_auto': saidas, 'saidas_manual': manual,
+            'transferencias': []})
+        edicoes = {saidas[0]['_sid']: {'reembolso': False, 'valor': '1234,5'},
+                   saidas[2]['_sid']: {'obra': str(b.obra_id), 'banco': str(banco_b.id),
+                                       'desc': 'editada'},
+                   manual[0]['_sid']: {'desc': ['não é texto']}}
+        obra_a, banco_b_id, forn_id = a.obra_id, banco_b.id, forn.id
+
+    cli = cliente_de(a.admin_id)
+    resposta = cli.post('/importacao/fluxo-caixa/confirmar',
+                        data={'dados_json': token, 'edicoes': json.dumps(edicoes)})
+    assert resposta.status_code == 200, resposta.get_data(as_text=True)[:500]
+
+    with app.app_context():
+        pais = {p.entidade_nome: p for p in
+                GestaoCustoPai.query.filter_by(admin_id=a.admin_id).all()}
+        assert len(pais) == 40                   # 41 linhas, uma "apenas pagamento"
+        p0, p2 = pais['Fornecedor Prev 0'], pais['Fornecedor Prev 2']
+        assert p0.valor_total == Decimal('1234.50')
+        assert ContaPagar.query.filter_by(admin_id=a.admin_id).count() == 0   # reembolso desmarcado
+        assert GestaoCustoFilho.query.filter_by(pai_id=p0.id).one().obra_id == obra_a
+
+        # Linha 1 não editada: vai o que a tela mostrou (sugestões aplicadas).
+        assert 'Fornecedor Prev 1' not in pais   # apenas pagamento: só o FluxoCaixa
+        fc1 = FluxoCaixa.query.filter_by(admin_id=a.admin_id, descricao='compra 1').one()
+        assert fc1.fornecedor_id == forn_id
+
+        filho2 = GestaoCustoFilho.query.filter_by(pai_id=p2.id).one()
+        assert filho2.descricao == 'editada'
+        assert filho2.obra_id != b.obra_id       # obra do outro tenant: ignorada
+        assert FluxoCaixa.query.filter_by(banco_id=banco_b_id).count() == 0
+        assert pais['Fornecedor Prev 99'].tipo_categoria == 'OUTROS'
+        assert GestaoCustoFilho.query.filter_by(
+            pai_id=pais['Fornecedor Prev 99'].id).one().descricao == 'compra 99'
+
+        # Importado, o preview sai do staging: reenviar não duplica.
+        assert not preview_importacao.existe(token, a.admin_id, 'fluxo_caixa')
+    de_novo = cli.post('/importacao/fluxo-caixa/confirmar', data={'dados_json': token})
+    assert de_novo.status_code == 302
+
+
+def test_pagina_do_preview_leva_token_e_sid():
+    """O template marca cada linha com o _sid e o campo oculto é o token curto."""
+    from flask import render_template
+
+    from app import app
+
+    r = _saida(1, _sid=7)
+    with app.test_request_context():
+        html = render_template(
+            'importacao/preview_fluxo.html', entradas=[], saidas_auto=[r], saidas_manual=[],
+            ignorados=[], transferencias=[], categorias_tenant=[], categorias_saida=[],
+            categorias_entrada=[], dados_json='a' * 32, bancos=[], obras=[], total_saidas=1,
+            total_valor_saidas=r['valor'], total_valor_entradas=0, primeiro_dia=None,
+            periodo_str='—', sugestoes=[])
+    assert 'data-sid="7"' in html
+    assert 'name="dados_json" value="' + 'a' * 32 + '"' in html
+    assert 'name="edicoes"' in html
+
+
+def test_formulario_multipart_com_mais_de_mil_campos_passa():
+    """O teto de partes vale para o app todo: o RDO novo manda as horas de
+    cada tarefa × funcionário em multipart, uma parte por campo."""
+    from flask import request
+
+    from app import app
+
+    campos = {f'cron_tarefa_{t}_func_{f}_horas': '8' for t in range(60) for f in range(25)}
+    with app.test_request_context('/salvar-rdo-flexivel', method='POST', data=campos,
+                                  content_type='multipart/form-data'):
+        assert len(request.form) == len(campos)
@@ -0,0 +1,275 @@
+"""Progresso geral da obra em LOTE — paridade com o caminho por tarefa.
+
+`calcular_progresso_geral_obra_v2` deixou de chamar `calcular_progresso_rdo`
+folha a folha (quatro a cinco consultas cada) e passou a carregar os
+agregados de apontamento da obra inteira de uma vez
+(`calcular_progresso_rdo_em_lote`). A regra é que NENHUM número mude:
+
+  1. por tarefa, o dict do lote é idêntico ao do cálculo antigo, com suas
+     consultas próprias (`_progresso_por_tarefa`, copiado aqui — a
+     `calcular_progresso_rdo` de hoje só embrulha o lote e não serve de
+     referência);
+  2. o agregado da obra é idêntico à média ponderada feita sobre o laço
+     antigo (reproduzido aqui, tarefa a tarefa);
+  3. o número de consultas não cresce com o número de folhas.
+
+O cenário cobre cada linha da tabela normativa do engine (M06 §12): folha
+quantitativa, folha em percentual, tarefa que ganhou `quantidade_total`
+depois de apontada em %, marco, sem plano, arquivada — com e sem a flag
+`rdo_percentual_livre`, e em datas antes/durante/depois dos apontamentos.
+"""
+import os
+import sys
+import uuid
+from datetime import date, datetime, time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from models import RDO, RDOApontamentoCronograma, TarefaCronograma
+from test_cronograma_versao_service import _ambiente, _tarefa
+from utils.cronograma_engine import (
+    _is_marco_efetivo,
+    _percentual_livre,
+    _planejado_na_data,
+    calcular_progresso_geral_obra_v2,
+    calcular_progresso_rdo_em_lote,
+    get_calendario,
+    historico_em_percentual,
+)
+
+pytestmark = pytest.mark.integration
+
+
+@pytest.fixture(autouse=True)
+def _config():
+    app.config['TESTING'] = True
+    with app.app_context():
+        yield
+
+
+def _rdo(obra, admin, dia):
+    r = RDO(numero_rdo=f'RDO-{uuid.uuid4().hex[:12]}', data_relatorio=dia,
+            obra_id=obra.id, admin_id=admin.id)
+    db.session.add(r)
+    db.session.flush()
+    return r
+
+
+def _apontar(rdo, tarefa, admin, qtd_dia, acumulada, pct, tipo='quantidade'):
+    db.session.add(RDOApontamentoCronograma(
+        rdo_id=rdo.id, tarefa_cronograma_id=tarefa.id,
+        quantidade_executada_dia=qtd_dia, quantidade_acumulada=acumulada,
+        percentual_realizado=pct, tipo_apontamento=tipo, admin_id=admin.id))
+    db.session.flush()
+
+
+def _cenario():
+    admin, obra = _ambiente()
+    pai = _tarefa(obra, admin, 'Estrutura', ordem=0, duracao_dias=20)
+    qtd = _tarefa(obra, admin, 'Alvenaria', ordem=1, tarefa_pai_id=pai.id,
+                  duracao_dias=5, quantidade_total=200.0, unidade_medida='m2')
+    pct = _tarefa(obra, admin, 'Pintura', ordem=2, tarefa_pai_id=pai.id,
+                  duracao_dias=8, data_inicio=date(2026, 7, 6),
+                  data_fim=date(2026, 7, 15))
+    # Apontada em % e só DEPOIS ganhou quantitativo — segue lida em %.
+    virou_qtd = _tarefa(obra, admin, 'Calçadas', ordem=3, duracao_dias=4)
+    marco = _tarefa(obra, admin, 'Entrega', ordem=4, duracao_dias=0,
+                    is_marco=True, data_inicio=date(2026, 7, 9),
+                    data_fim=date(2026, 7, 9))
+    _tarefa(obra, admin, 'Limpeza', ordem=5, duracao_dias=None,
+                        data_inicio=None, data_fim=None)
+    arquivada = _tarefa(obra, admin, 'Demolição', ordem=6, duracao_dias=3,
+                        ativa=False,
+                        arquivada_em=datetime(2026, 7, 9, 14, 30))
+
+    r1 = _rdo(obra, admin, date(2026, 7, 2))
+    _apontar(r1, qtd, admin, 50.0, 50.0, 25.0)
+    _apontar(r1, virou_qtd, admin, 60.0, 0.0, 60.0, tipo='percentual')
+    _apontar(r1, arquivada, admin, 10.0, 10.0, 40.0)
+    r2 = _rdo(obra, admin, date(2026, 7, 8))
+    _apontar(r2, qtd, admin, 70.0, 120.0, 60.0)
+    _apontar(r2, pct, admin, 30.0, 0.0, 30.0, tipo='percentual')
+    _apontar(r2, virou_qtd, admin, 20.0, 0.0, 80.0, tipo='percentual')
+    # Dois RDOs no mesmo dia: o desempate (id desc) tem que coincidir.
+    r3 = _rdo(obra, admin, date(2026, 7, 8))
+    _apontar(r3, pct, admin, 15.0, 0.0, 45.0, tipo='percentual')
+    r4 = _rdo(obra, admin, date(2026, 7, 9))
+    _apontar(r4, marco, admin, 100.0, 0.0, 100.0, tipo='percentual')
+    db.session.commit()
+
+    virou_qtd.quantidade_total = 48.0
+    virou_qtd.unidade_medida = 'un'
+    db.session.commit()
+    return admin, obra
+
+
+def _progresso_por_tarefa(tarefa_id, data_rdo, admin_id):
+    """`calcular_progresso_rdo` como era antes do lote: uma tarefa, com as
+    consultas dela (soma física, histórico em %, último apontamento)."""
+    from sqlalchemy import func as sqlfunc
+
+    tarefa = db.session.get(TarefaCronograma, tarefa_id)
+    marco = _is_marco_efetivo(tarefa)
+    cal = get_calendario(admin_id)
+    perc_planejado = _planejado_na_data(
+        tarefa.data_inicio, tarefa.data_fim, tarefa.duracao_dias, marco,
+        data_rdo, cal.considerar_sabado, cal.considerar_domingo)
+
+    acumulado = (
+        db.session.query(sqlfunc.coalesce(
+            sqlfunc.sum(RDOApontamentoCronograma.quantidade_executada_dia), 0.0))
+        .join(RDO, RDO.id == RDOApontamentoCronograma.rdo_id)
+        .filter(
+            RDOApontamentoCronograma.tarefa_cronograma_id == tarefa_id,
+            RDOApontamentoCronograma.admin_id == admin_id,
+            RDO.data_relatorio <= data_rdo,
+            sqlfunc.coalesce(
+                RDOApontamentoCronograma.tipo_apontamento, '') != 'percentual',
+        )
+        .scalar()
+    ) or 0.0
+
+    perc_realizado = 0.0
+    if (not _percentual_livre(admin_id)
+            and tarefa.quantidade_total and tarefa.quantidade_total > 0
+            and not historico_em_percentual(tarefa_id, admin_id, data_rdo)):
+        perc_realizado = min(100.0, round(acumulado / tarefa.quantidade_total * 100, 2))
+    else:
+        ultimo = (
+            db.session.query(RDOApontamentoCronograma.percentual_realizado)
+            .join(RDO, RDO.id == RDOApontamentoCronograma.rdo_id)
+            .filter(
+                RDOApontamentoCronograma.tarefa_cronograma_id == tarefa_id,
+                RDOApontamentoCronograma.admin_id == admin_id,
+                RDO.data_relatorio <= data_rdo,
+            )
+            .order_by(RDO.data_relatorio.desc(),
+                      RDOApontamentoCronograma.id.desc())
+            .first()
+        )
+        if ultimo is not None and ultimo[0] is not None:
+            perc_realizado = min(100.0, float(ultimo[0]))
+            if acumulado <= 0:
+                acumulado = perc_realizado
+
+    if marco:
+        perc_realizado = 100.0 if perc_realizado >= 100.0 else 0.0
+
+    return {
+        'percentual_planejado': perc_planejado,
+        'percentual_realizado': perc_realizado,
+        'quantidade_acumulada': acumulado,
+    }
+
+
+def _folhas(obra, admin, data_ref, historicas):
+    todas = TarefaCronograma.query.filter_by(
+        obra_id=obra.id, admin_id=admin.id, is_cliente=False).all()
+    corte = datetime.combine(data_ref, time())
+    vivas = [t for t in todas if t.ativa or (
+        historicas and t.arquivada_em and t.arquivada_em > corte)]
+    pais = {t.tarefa_pai_id for t in vivas if t.tarefa_pai_id}
+    return [t for t in vivas if t.id not in pais]
+
+
+def _agregado_pelo_laco_antigo(obra, admin, data_ref, historicas=False):
+    """A média ponderada como era: o cálculo por tarefa, folha a folha."""
+    folhas = _folhas(obra, admin, data_ref, historicas)
+    nao_marcos = [t for t in folhas if not _is_marco_efetivo(t)]
+    usar_qtd = bool(nao_marcos) and all(
+        t.quantidade_total and float(t.quantidade_total) > 0
+        for t in nao_marcos
+    ) and len({(t.unidade_medida or '').strip().lower()
+               for t in nao_marcos}) == 1
+    soma_real = soma_plan = soma_pesos = 0.0
+    n_apontadas = 0
+    for t in folhas:
+        prog = _progresso_por_tarefa(t.id, data_ref, admin.id)
+        if _is_marco_efetivo(t):
+            peso = 0.0
+        elif usar_qtd:
+            peso = float(t.quantidade_total)
+        elif t.duracao_dias and int(t.duracao_dias) > 0:
+            peso = float(t.duracao_dias)
+        else:
+            peso = 1.0
+        soma_real += float(prog['percentual_realizado'] or 0.0) * peso
+        soma_plan += float(prog['percentual_planejado'] or 0.0) * peso
+        soma_pesos += peso
+        if (prog['quantidade_acumulada'] or 0) > 0:
+            n_apontadas += 1
+    return {
+        'progresso_geral_pct': round(soma_real / soma_pesos, 1) if soma_pesos else 0.0,
+        'progresso_planejado_pct': round(soma_plan / soma_pesos, 1) if soma_pesos else 0.0,
+        'n_tarefas': len(folhas),
+        'n_tarefas_apontadas': n_apontadas,
+    }
+
+
+DATAS = [date(2026, 6, 30), date(2026, 7, 2), date(2026, 7, 8),
+         date(2026, 7, 9), date(2026, 7, 31)]
+
+
+@pytest.mark.parametrize('livre', [False, True])
+def test_lote_identico_ao_calculo_por_tarefa(livre):
+    from scripts.flag_rdo_percentual_livre import definir_flag
+    admin, obra = _cenario()
+    definir_flag(admin.id, livre)
+    tarefas = TarefaCronograma.query.filter_by(obra_id=obra.id).all()
+    for d in DATAS:
+        lote = calcular_progresso_rdo_em_lote(tarefas, d, admin.id)
+        for t in tarefas:
+            assert lote[t.id] == _progresso_por_tarefa(t.id, d, admin.id), (
+                f'{t.nome_tarefa} em {d}')
+
+
+@pytest.mark.parametrize('historicas', [False, True])
+def test_agregado_da_obra_identico_ao_laco_antigo(historicas):
+    admin, obra = _cenario()
+    for d in DATAS:
+        esperado = _agregado_pelo_laco_antigo(obra, admin, d, historicas)
+        obtido = calcular_progresso_geral_obra_v2(
+            obra.id, d, admin.id, com_arquivadas_historicas=historicas)
+        assert obtido == esperado, f'data_ref={d}'
+
+
+def test_consultas_nao_crescem_com_o_numero_de_folhas():
+    from sqlalchemy import event as sa_event
+
+    def _medir(obra_id, admin_id):
+        contador = {'n': 0}
+
+        def _conta(*_a):
+            contador['n'] += 1
+
+        sa_event.listen(db.engine, 'before_cursor_execute', _conta)
+        try:
+            calcular_progresso_geral_obra_v2(obra_id, date(2026, 7, 31), admin_id)
+        finally:
+            sa_event.remove(db.engine, 'before_cursor_execute', _conta)
+        return contador['n']
+
+    def _acrescentar(obra, admin, n, ordem):
+        for i in range(n):
+            t = _tarefa(obra, admin, f'Extra {ordem + i}', ordem=ordem + i)
+            _apontar(_rdo(obra, admin, date(2026, 7, 3)), t, admin,
+                     1.0, 1.0, 20.0)
+        db.session.commit()
+
+    admin, obra = _cenario()
+    ids = (obra.id, admin.id)  # lidos antes: commit expira os objetos
+    _medir(*ids)  # aquece calendário/flag do tenant
+
+    # Mesmo preparo antes de cada medição (o RDO novo dispara leituras
+    # próprias no próximo flush); só o número de folhas muda.
+    _acrescentar(obra, admin, 1, ordem=10)
+    pequena = _medir(*ids)
+    _acrescentar(obra, admin, 40, ordem=20)
+    grande = _medir(*ids)
+
+    assert grande == pequena, (
+        f'{pequena} consultas com 6 folhas e {grande} com 46 — o progresso '
+        f'da obra voltou a consultar o banco por tarefa')
@@ -0,0 +1,187 @@
+"""Balancete, DRE e balanço numa passada agrupada do razão
+(services/razao_contabil).
+
+O que se garante:
+
+  1. paridade — o saldo de cada conta é a soma das partidas dela, antes e
+     dentro do período, e nada do outro tenant entra;
+  2. a hierarquia — conta sintética do balancete mostra o consolidado das
+     filhas, e os totais não contam nada duas vezes (débitos = créditos);
+  3. o custo — balancete, DRE e balanço fazem um número fixo de consultas,
+     que não cresce com o número de contas com movimento.
+"""
+import os
+import sys
+from contextlib import contextmanager
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from contabilidade_utils import (calcular_dre_mensal, calcular_saldo_conta,
+                                 criar_plano_contas_padrao, gerar_balanco_patrimonial,
+                                 gerar_balancete_mensal, obter_dados_balancete)
+from helpers_tenant import dois_tenants
+from models import BalanceteMensal, LancamentoContabil, PartidaContabil
+from services.razao_contabil import razao_do_periodo
+
+pytestmark = pytest.mark.integration
+
+ANO, MES = 2026, 5
+INI, FIM = date(2026, 5, 1), date(2026, 5, 31)
+
+# (data, débito, crédito, valor)
+LANCAMENTOS = (
+    (date(2026, 3, 10), '1.1.01.002', '3.1.01', 50000),         # capital
+    (date(2026, 4, 20), '1.1.03.001', '2.1.01.001', 8000),      # compra a prazo
+    (date(2026, 5, 3), '1.1.02.001', '4.1.02.002', 12000),      # serviço faturado
+    (date(2026, 5, 15), '1.1.01.002', '1.1.02.001', 7000),      # recebimento
+    (date(2026, 5, 28), '2.1.01.001', '1.1.01.002', 3000),      # pagamento
+    (date(2026, 6, 2), '1.1.01.001', '1.1.01.002', 500),        # depois do período
+)
+
+
+@contextmanager
+def _contando():
+    from sqlalchemy import event as sa_event
+
+    engine = db.engine
+    contador = {'n': 0}
+
+    def _conta(*_a):
+        contador['n'] += 1
+
+    sa_event.listen(engine, 'before_cursor_execute', _conta)
+    try:
+        yield contador
+    finally:
+        sa_event.remove(engine, 'before_cursor_execute', _conta)
+
+
+def _lancar(admin_id, lancamentos):
+    for numero, (data, debito, credito, valor) in enumerate(lancamentos, start=1):
+        lanc = LancamentoContabil(numero=numero, data_lancamento=data, historico='razão',
+                                  valor_total=valor, admin_id=admin_id)
+        db.session.add(lanc)
+        db.session.flush()
+        for seq, (conta, tipo) in enumerate(((debito, 'DEBITO'), (credito, 'CREDITO')), start=1):
+            db.session.add(PartidaContabil(lancamento_id=lanc.id, sequencia=seq,
+                                           conta_codigo=conta, tipo_partida=tipo,
+                                           valor=valor, admin_id=admin_id))
+    db.session.commit()
+
+
+def saldo_somando_partidas(admin_id, conta, data_inicio=None, data_fim=None):
+    """D − C da conta no intervalo, direto das partidas — a referência."""
+    from sqlalchemy import case, func
+
+    q = db.session.query(func.sum(case((PartidaContabil.tipo_partida == 'DEBITO',
+                                        PartidaContabil.valor), else_=-PartidaContabil.valor))
+                         ).join(LancamentoContabil).filter(
+        PartidaContabil.admin_id == admin_id, PartidaContabil.conta_codigo == conta)
+    if data_inicio:
+        q = q.filter(LancamentoContabil.data_lancamento >= data_inicio)
+    if data_fim:
+        q = q.filter(LancamentoContabil.data_lancamento <= data_fim)
+    return q.scalar() or 0
+
+
+def _tenants(prefixo):
+    a, b = dois_tenants(prefixo, com_fatos=False)
+    for t in (a, b):
+        criar_plano_contas_padrao(t.admin_id)
+    _lancar(a.admin_id, LANCAMENTOS)
+    _lancar(b.admin_id, [(date(2026, 5, 5), '1.1.01.001', '3.1.01', 999)])
+    return a, b
+
+
+def test_saldos_batem_com_a_consulta_conta_a_conta():
+    with app.app_context():
+        a, _ = _tenants('raz')
+        razao = razao_do_periodo(a.admin_id, INI, FIM)
+        contas = {c for _, d, c2, _ in LANCAMENTOS for c in (d, c2)}
+        for conta in contas:
+            mov = razao[conta]
+            assert mov.saldo_anterior == saldo_somando_partidas(
+                a.admin_id, conta, None, date(2026, 4, 30)), conta
+            assert mov.saldo_final == saldo_somando_partidas(a.admin_id, conta, None, FIM), conta
+            assert mov.debitos - mov.creditos == saldo_somando_partidas(
+                a.admin_id, conta, INI, FIM), conta
+            assert calcular_saldo_conta(conta, a.admin_id, None, FIM) == mov.saldo_final
+        # Período começando no meio do mês: os dias antes dele entram na abertura.
+        meio = razao_do_periodo(a.admin_id, date(2026, 5, 10), FIM)['1.1.02.001']
+        assert (meio.saldo_anterior, meio.debitos, meio.creditos) == (12000, 0, 7000)
+        assert razao['1.1.01.001'].saldo_final == 0          # só o outro tenant e junho
+        assert razao.soma_prefixo('1.1.01').saldo_final == Decimal('54000')
+
+        so_mes = razao_do_periodo(a.admin_id, INI, FIM, com_saldo_anterior=False)
+        assert so_mes['1.1.01.002'].debitos == 7000 and so_mes['1.1.01.002'].creditos == 3000
+        assert so_mes['1.1.01.002'].saldo_anterior == 0
+
+
+def test_balancete_consolida_sinteticas_sem_contar_em_dobro():
+    with app.app_context():
+        a, _ = _tenants('ral')
+        dados = obter_dados_balancete(a.admin_id, MES, ANO)
+        linhas = {linha['codigo']: linha for linha in dados['contas']}
+
+        bancos = linhas['1.1.01.002']
+        assert (bancos['saldo_anterior'], bancos['debitos'], bancos['creditos'],
+                bancos['saldo_atual']) == (50000, 7000, 3000, 54000)
+        fornecedores = linhas['2.1.01.001']                  # credora: sinal natural
+        assert fornecedores['saldo_anterior'] == 8000 and fornecedores['saldo_atual'] == 5000
+        # Sintéticas: consolidado das filhas.
+        assert linhas['1.1']['saldo_atual'] == 54000 + 5000 + 8000
+        assert linhas['1']['debitos'] == 12000 + 7000
+        assert linhas['2.1.01']['saldo_atual'] == 5000
+
+        totais = dados['totais']
+        assert totais['total_debitos'] == totais['total_creditos'] == 22000
+        assert totais['balanceado']
+
+
+def test_balancete_mensal_balanco_e_dre():
+    with app.app_context():
+        a, _ = _tenants('rab')
+        gerar_balancete_mensal(a.admin_id, INI)
+        gerar_balancete_mensal(a.admin_id, INI)             # idempotente
+        linhas = BalanceteMensal.query.filter_by(admin_id=a.admin_id, mes_referencia=INI).all()
+        snapshot = {b.conta_codigo: b for b in linhas}
+        assert len(linhas) == len(snapshot)
+        clientes = snapshot['1.1.02.001']
+        assert (clientes.saldo_anterior, clientes.debitos_mes, clientes.creditos_mes,
+                clientes.saldo_atual) == (0, 12000, 7000, 5000)
+
+        balanco = gerar_balanco_patrimonial(a.admin_id, FIM)
+        assert balanco['ativo']['circulante']['1.1.01.002']['saldo'] == 54000
+        assert balanco['passivo']['circulante']['2.1.01.001']['saldo'] == 5000
+
+        dre = calcular_dre_mensal(a.admin_id, ANO, MES)
+        assert dre['receita_bruta'] == 12000
+
+
+def test_relatorios_em_consultas_fixas():
+    with app.app_context():
+        a, _ = _tenants('raq')
+
+        def medir():
+            with _contando() as n:
+                obter_dados_balancete(a.admin_id, MES, ANO)
+            balancete = n['n']
+            with _contando() as n:
+                calcular_dre_mensal(a.admin_id, ANO, MES)
+            dre = n['n']
+            with _contando() as n:
+                gerar_balanco_patrimonial(a.admin_id, FIM)
+            return balancete, dre, n['n']
+
+        antes = medir()
+        # Plano + abertura do mês + razão do período; o DRE só o razão.
+        assert antes[0] <= 3 and antes[1] <= 1 and antes[2] <= 3, antes
+
+        _lancar(a.admin_id, [(date(2026, 5, 9), '1.1.01.003', '1.1.02.002', 10 + i)
+                             for i in range(20)])
+        assert medir() == antes
@@ -1008,7 +1008,7 @@ def test_migracao_269_esta_registrada_no_executor():
     import inspect
 
     import migrations
-    fonte = inspect.getsource(migrations.executar_migracoes)
+    fonte = inspect.getsource(migrations._migracoes_ativas)
     assert '_migration_269_remover_indice_unico_antigo_de_assinatura' in fonte
     assert '(269,' in fonte
 
@@ -0,0 +1,322 @@
+"""Fila das versões das fotos de RDO (services/rdo_foto_versoes.py).
+
+O upload só guarda o original e grava `processamento='pendente'`; a tela
+recebe o SVG "Processando foto…" sem cache até a fila gerar otimizada e
+thumbnail. Na suíte a thread fica desligada (SIGE_FOTOS_FILA=0 no
+conftest) e os testes drenam a fila na mão.
+"""
+import os
+import sys
+import threading
+import uuid
+from datetime import date, datetime, timedelta
+from io import BytesIO
+
+import pytest
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+from werkzeug.security import generate_password_hash
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: F401 — registra os blueprints
+from app import app, db
+from models import Cliente, Obra, RDO, RDOFoto, TipoUsuario, Usuario
+from services import rdo_foto_versoes
+from services.blob_store import blobs, chave_da_referencia
+
+pytestmark = pytest.mark.integration
+
+
+@pytest.fixture(autouse=True)
+def _config(tmp_path, monkeypatch):
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    if not app.secret_key:
+        app.secret_key = 'test-foto-versoes'
+    monkeypatch.setenv('UPLOADS_PATH', str(tmp_path))
+    monkeypatch.setenv('SIGE_FOTOS_WORKERS', '0')
+    yield
+
+
+def _sfx():
+    return uuid.uuid4().hex[:8]
+
+
+def _jpeg(tamanho=(640, 480), cor=(200, 30, 30)):
+    buf = BytesIO()
+    Image.new('RGB', tamanho, cor).save(buf, format='JPEG')
+    return buf.getvalue()
+
+
+@pytest.fixture
+def cenario():
+    with app.app_context():
+        suf = _sfx()
+        admin = Usuario(username=f'fila_{suf}', email=f'fila_{suf}@test.local',
+                        nome=f'Admin Fila {suf}',
+                        password_hash=generate_password_hash('Senha@2026'),
+                        tipo_usuario=TipoUsuario.ADMIN, ativo=True, versao_sistema='v2')
+        db.session.add(admin)
+        db.session.flush()
+        cli = Cliente(nome=f'CLI-FILA-{suf}', admin_id=admin.id)
+        db.session.add(cli)
+        db.session.flush()
+        obra = Obra(nome=f'Obra Fila {suf}', codigo=f'FI{suf[:6].upper()}',
+                    data_inicio=date(2026, 1, 1), admin_id=admin.id, cliente_id=cli.id,
+                    valor_contrato=1000)
+        db.session.add(obra)
+        db.session.flush()
+        rdo = RDO(numero_rdo=f'RDO-FILA-{suf}', data_relatorio=date(2026, 6, 22),
+                  obra_id=obra.id, admin_id=admin.id, status='Finalizado')
+        db.session.add(rdo)
+        db.session.commit()
+        return {'admin_id': admin.id, 'rdo_id': rdo.id}
+
+
+def _cliente(admin_id):
+    cliente = app.test_client()
+    with cliente.session_transaction() as sess:
+        sess['_user_id'] = str(admin_id)
+        sess['_fresh'] = True
+    return cliente
+
+
+def _upload(cenario, dados=None):
+    cliente = _cliente(cenario['admin_id'])
+    arquivo = FileStorage(stream=BytesIO(dados or _jpeg()), filename='foto.jpg',
+                          content_type='image/jpeg')
+    resposta = cliente.post(f"/rdo/{cenario['rdo_id']}/fotos/upload",
+                            data={'fotos[]': arquivo}, content_type='multipart/form-data')
+    assert resposta.status_code == 201
+    with app.app_context():
+        foto = (RDOFoto.query.filter_by(rdo_id=cenario['rdo_id'])
+                .order_by(RDOFoto.id.desc()).first())
+        return cliente, foto.id
+
+
+def _drenar():
+    with app.app_context():
+        return rdo_foto_versoes.drenar()
+
+
+def _foto_pendente(cenario, dados):
+    """Foto pendente gravada direto, sem passar pela rota."""
+    from services.blob_store import referencia
+
+    with app.app_context():
+        ref = referencia(blobs().guardar(dados))
+        foto = RDOFoto(admin_id=cenario['admin_id'], rdo_id=cenario['rdo_id'],
+                       nome_arquivo='f.jpg', caminho_arquivo=ref, nome_original='f.jpg',
+                       arquivo_original=ref, armazenamento='disco',
+                       processamento='pendente')
+        db.session.add(foto)
+        db.session.commit()
+        return foto.id
+
+
+# ───────────────────────────────────────────────────────────────────────────
+# Encode
+# ───────────────────────────────────────────────────────────────────────────
+
+def test_renderizar_cabe_em_1920_e_thumbnail_quadrado():
+    otimizada, miniatura = rdo_foto_versoes.renderizar(_jpeg((4000, 3000)))
+    with Image.open(BytesIO(otimizada)) as img:
+        assert img.format == 'WEBP' and img.size == (1920, 1440)
+    with Image.open(BytesIO(miniatura)) as img:
+        assert img.format == 'WEBP' and img.size == (200, 200)
+
+
+def test_renderizar_foto_pequena_e_png_transparente():
+    otimizada, _ = rdo_foto_versoes.renderizar(_jpeg((300, 200)))
+    with Image.open(BytesIO(otimizada)) as img:
+        assert img.size == (300, 200)
+
+    buf = BytesIO()
+    Image.new('RGBA', (120, 80), (0, 0, 0, 0)).save(buf, format='PNG')
+    otimizada, _ = rdo_foto_versoes.renderizar(buf.getvalue())
+    with Image.open(BytesIO(otimizada)) as img:
+        assert img.mode == 'RGB'
+        assert img.getpixel((60, 40))[0] > 240  # fundo branco, não preto
+
+
+# ───────────────────────────────────────────────────────────────────────────
+# Upload → placeholder → fila
+# ───────────────────────────────────────────────────────────────────────────
+
+def test_upload_responde_pendente_e_serve_o_placeholder(cenario):
+    cliente, foto_id = _upload(cenario)
+    with app.app_context():
+        foto = db.session.get(RDOFoto, foto_id)
+        assert foto.processamento == 'pendente'
+        assert foto.arquivo_original and foto.arquivo_otimizado is None
+
+    resposta = cliente.get(f'/rdo/foto/{foto_id}/thumbnail')
+    assert resposta.status_code == 200
+    assert resposta.mimetype == 'image/svg+xml'
+    assert 'no-store' in resposta.headers['Cache-Control']
+    assert 'ETag' not in resposta.headers
+
+    # o original já é servido
+    assert cliente.get(f'/rdo/foto/{foto_id}/original').mimetype == 'image/jpeg'
+
+
+def test_drenar_gera_as_versoes_e_a_url_ganha_a_versao(cenario):
+    cliente, foto_id = _upload(cenario)
+    assert _drenar() >= 1
+    with app.app_context():
+        foto = db.session.get(RDOFoto, foto_id)
+        assert foto.processamento == 'pronta'
+        assert foto.processamento_reservado_ate is None
+        chave = chave_da_referencia(foto.thumbnail)
+        assert blobs().verificar(chave)
+
+    resposta = cliente.get(f'/rdo/foto/{foto_id}/thumbnail')
+    assert resposta.mimetype == 'image/webp'
+    assert resposta.headers['ETag'] == f'"{chave}"'
+    corpo = cliente.get(f"/rdo/{cenario['rdo_id']}").get_data(as_text=True)
+    assert f'/rdo/foto/{foto_id}/thumbnail?v={chave}' in corpo
+
+
+def test_drenar_pelo_pool_de_processos(cenario, monkeypatch):
+    monkeypatch.setenv('SIGE_FOTOS_WORKERS', '1')
+    _, foto_id = _upload(cenario, _jpeg((2400, 1800)))
+    _drenar()
+    with app.app_context():
+        foto = db.session.get(RDOFoto, foto_id)
+        assert foto.processamento == 'pronta'
+        dados = blobs().ler(chave_da_referencia(foto.arquivo_otimizado))
+    with Image.open(BytesIO(dados)) as img:
+        assert img.size == (1920, 1440)
+
+
+def test_commit_do_upload_acorda_a_fila(cenario, monkeypatch):
+    chamadas = []
+    monkeypatch.setattr(rdo_foto_versoes, 'acordar', lambda: chamadas.append(1))
+    _upload(cenario)
+    assert chamadas == [1]
+
+    # commit sem foto nova não acorda
+    with app.app_context():
+        db.session.commit()
+    assert chamadas == [1]
+
+
+def test_boot_sobe_a_fila_e_varre_pendente_com_reserva_vencida(cenario, monkeypatch):
+    """Foto largada por um worker que morreu no deploy: sem upload novo no
+    processo, a thread que sobe no boot é que a pega."""
+    _drenar()
+    foto_id = _foto_pendente(cenario, _jpeg())
+    with app.app_context():
+        foto = db.session.get(RDOFoto, foto_id)
+        foto.processamento_reservado_ate = datetime.utcnow() - timedelta(minutes=5)
+        db.session.commit()
+
+    volta_feita = threading.Event()
+
+    def uma_volta(app_):
+        rdo_foto_versoes._volta(app_)
+        volta_feita.set()
+
+    monkeypatch.setenv('SIGE_FOTOS_FILA', '1')
+    monkeypatch.setattr(rdo_foto_versoes, '_laco_iniciado', False)
+    monkeypatch.setattr(rdo_foto_versoes, '_laco', uma_volta)
+    rdo_foto_versoes.instalar_fila(app)
+    assert volta_feita.wait(30)
+    with app.app_context():
+        assert db.session.get(RDOFoto, foto_id).processamento == 'pronta'
+
+
+def test_acordar_nao_sobe_thread_com_a_fila_desligada(monkeypatch):
+    monkeypatch.setattr(rdo_foto_versoes, '_laco_iniciado', False)
+    rdo_foto_versoes.acordar()
+    assert not rdo_foto_versoes._laco_iniciado
+
+
+# ───────────────────────────────────────────────────────────────────────────
+# Reserva e falha
+# ───────────────────────────────────────────────────────────────────────────
+
+def test_reservas_seguidas_nao_repetem_foto(cenario):
+    ids = {_foto_pendente(cenario, _jpeg(cor=(i, 0, 0))) for i in range(3)}
+    with app.app_context():
+        agora = datetime.utcnow()
+        primeira = set(rdo_foto_versoes._reservar_lote(agora, 500)) & ids
+        segunda = set(rdo_foto_versoes._reservar_lote(agora, 500)) & ids
+    assert primeira == ids and not segunda
+
+
+def test_original_sumido_vira_falha_depois_das_tentativas(cenario, monkeypatch):
+    monkeypatch.setattr(rdo_foto_versoes, 'NOVA_TENTATIVA_SECONDS', 0)
+    foto_id = _foto_pendente(cenario, _jpeg())
+    with app.app_context():
+        foto = db.session.get(RDOFoto, foto_id)
+        os.remove(blobs().caminho_local(chave_da_referencia(foto.arquivo_original)))
+
+    for tentativa in range(1, rdo_foto_versoes.MAX_TENTATIVAS + 1):
+        _drenar()
+        with app.app_context():
+            foto = db.session.get(RDOFoto, foto_id)
+            assert foto.processamento_tentativas == tentativa
+    assert foto.processamento == 'falha'
+
+
+def test_foto_com_falha_serve_o_original_no_lugar_das_versoes(cenario):
+    cliente, foto_id = _upload(cenario)
+    with app.app_context():
+        foto = db.session.get(RDOFoto, foto_id)
+        foto.processamento = 'falha'
+        db.session.commit()
+
+    for tipo in ('thumbnail', 'otimizado'):
+        resposta = cliente.get(f'/rdo/foto/{foto_id}/{tipo}')
+        assert resposta.status_code == 200
+        assert resposta.mimetype == 'image/jpeg'
+        assert 'immutable' not in resposta.headers['Cache-Control']
+
+
+def test_foto_apagada_no_meio_do_lote_nao_desfaz_as_outras(cenario, monkeypatch):
+    from sqlalchemy import text
+
+    _drenar()  # pendentes de outros testes não entram no lote
+    ids = [_foto_pendente(cenario, _jpeg(cor=(0, i, 0))) for i in range(3)]
+    apagada = ids[1]
+    renderizar = rdo_foto_versoes.renderizar
+    chamadas = []
+
+    def renderizar_e_apagar(dados):
+        chamadas.append(1)
+        if len(chamadas) == 2:  # outra sessão apaga a foto enquanto ela renderiza
+            with db.engine.begin() as conn:
+                conn.execute(text('DELETE FROM rdo_foto WHERE id = :id'), {'id': apagada})
+        return renderizar(dados)
+
+    monkeypatch.setattr(rdo_foto_versoes, 'renderizar', renderizar_e_apagar)
+    with app.app_context():
+        assert rdo_foto_versoes.processar_pendentes(limite=len(ids)) == len(ids)
+        db.session.expire_all()
+        assert db.session.get(RDOFoto, apagada) is None
+        assert {db.session.get(RDOFoto, i).processamento
+                for i in ids if i != apagada} == {'pronta'}
+
+
+# ───────────────────────────────────────────────────────────────────────────
+# scripts/rerenderizar_fotos_rdo.py
+# ───────────────────────────────────────────────────────────────────────────
+
+def test_script_rerenderiza_em_dry_run_e_aplica(cenario):
+    from scripts.rerenderizar_fotos_rdo import rerenderizar
+
+    foto_id = _foto_pendente(cenario, _jpeg((800, 600)))
+
+    seco = rerenderizar(admin_id=cenario['admin_id'], so_pendentes=True, workers=1)
+    assert seco['fotos'] == 1 and seco['regeradas'] == 1 and not seco['falhas']
+    with app.app_context():
+        assert db.session.get(RDOFoto, foto_id).processamento == 'pendente'
+
+    relatorio = rerenderizar(admin_id=cenario['admin_id'], aplicar=True, workers=1)
+    assert relatorio['regeradas'] == 1
+    with app.app_context():
+        foto = db.session.get(RDOFoto, foto_id)
+        assert foto.processamento == 'pronta'
+        assert blobs().existe(chave_da_referencia(foto.thumbnail))
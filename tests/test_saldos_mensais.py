@@ -0,0 +1,236 @@
+"""Saldos mensais por conta mantidos a cada lançamento (services/saldos_mensais).
+
+A referência é `reconstruir` — um GROUP BY das partidas do zero. O que o
+flush mantém incrementalmente tem de ser, linha a linha, o que a
+reconstrução grava: lançamento novo, partida alterada (valor e conta),
+lançamento que muda de mês, partida e lançamento removidos, rollback.
+
+E o ponto de tudo: o relatório NÃO lê partida de mês anterior. Uma partida
+gravada por fora do ORM num mês antigo não aparece no saldo até o reparo.
+"""
+import os
+import sys
+import threading
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from contabilidade_utils import criar_plano_contas_padrao, gerar_balancete_mensal
+from helpers_tenant import dois_tenants
+from models import BalanceteMensal, LancamentoContabil, PartidaContabil
+from services import saldos_mensais
+from services.razao_contabil import razao_do_periodo
+from test_razao_contabil import _lancar, saldo_somando_partidas
+
+pytestmark = pytest.mark.integration
+
+
+def _linhas(admin_id):
+    return {(b.conta_codigo, b.mes_referencia): (b.saldo_anterior, b.debitos_mes,
+                                                 b.creditos_mes, b.saldo_atual)
+            for b in BalanceteMensal.query.filter_by(admin_id=admin_id)}
+
+
+def _confere_com_reconstrucao(admin_id):
+    # Linha que ficou sem movimento (lançamento saiu do mês) continua lá, com
+    # o saldo carregado; a reconstrução só grava mês com movimento.
+    incremental = {}
+    for chave, (anterior, debitos, creditos, atual) in _linhas(admin_id).items():
+        if debitos or creditos:
+            incremental[chave] = (anterior, debitos, creditos, atual)
+        else:
+            assert anterior == atual, chave
+    saldos_mensais.reconstruir(admin_id)
+    db.session.flush()
+    assert _linhas(admin_id) == incremental
+    db.session.rollback()
+
+
+def _tenant(prefixo):
+    a, _ = dois_tenants(prefixo, com_fatos=False)
+    criar_plano_contas_padrao(a.admin_id)
+    return a
+
+
+def test_flush_mantem_o_que_a_reconstrucao_gravaria():
+    with app.app_context():
+        a = _tenant('sme')
+        _lancar(a.admin_id, [
+            (date(2026, 1, 15), '1.1.01.002', '3.1.01', 1000),
+            (date(2026, 3, 2), '1.1.01.001', '1.1.01.002', 200),
+            (date(2026, 3, 20), '5.1.01', '1.1.01.001', 50),
+        ])
+        linhas = _linhas(a.admin_id)
+        assert linhas[('1.1.01.002', date(2026, 3, 1))] == (1000, 0, 200, 800)
+        _confere_com_reconstrucao(a.admin_id)
+
+        # Lançamento retroativo: propaga para as linhas dos meses seguintes.
+        _lancar(a.admin_id, [(date(2026, 2, 5), '1.1.01.002', '3.1.01', 300)])
+        assert _linhas(a.admin_id)[('1.1.01.002', date(2026, 3, 1))] == (1300, 0, 200, 1100)
+        _confere_com_reconstrucao(a.admin_id)
+
+        # Partida alterada: valor e conta, nos dois lados do lançamento.
+        lanc = LancamentoContabil.query.filter_by(
+            admin_id=a.admin_id, data_lancamento=date(2026, 3, 2)).one()
+        for p in lanc.partidas:
+            p.valor = 250
+        lanc.partidas[0].conta_codigo = '1.1.01.003'
+        db.session.commit()
+        _confere_com_reconstrucao(a.admin_id)
+
+        # Lançamento muda de mês (e de data dentro do mesmo mês, sem efeito).
+        lanc.data_lancamento = date(2026, 1, 31)
+        db.session.commit()
+        _confere_com_reconstrucao(a.admin_id)
+        assert ('1.1.01.003', date(2026, 3, 1)) in _linhas(a.admin_id)      # zerada, fica
+
+        # Rollback não deixa rastro.
+        avulso = LancamentoContabil(numero=99, data_lancamento=date(2026, 1, 3),
+                                    historico='x', valor_total=7, admin_id=a.admin_id)
+        db.session.add(avulso)
+        db.session.flush()
+        db.session.add(PartidaContabil(lancamento_id=avulso.id, sequencia=1,
+                                       conta_codigo='1.1.01.001', tipo_partida='DEBITO',
+                                       valor=7, admin_id=a.admin_id))
+        db.session.flush()
+        db.session.rollback()
+        _confere_com_reconstrucao(a.admin_id)
+
+        # Remoção: uma partida, depois o lançamento inteiro (cascata).
+        outro = LancamentoContabil.query.filter_by(
+            admin_id=a.admin_id, data_lancamento=date(2026, 3, 20)).one()
+        db.session.delete(outro.partidas[0])
+        db.session.commit()
+        _confere_com_reconstrucao(a.admin_id)
+        db.session.delete(outro)
+        db.session.commit()
+        _confere_com_reconstrucao(a.admin_id)
+
+        for conta in ('1.1.01.001', '1.1.01.002', '1.1.01.003', '3.1.01', '5.1.01'):
+            assert razao_do_periodo(a.admin_id, date(2026, 4, 1), date(2026, 4, 30))[
+                conta].saldo_final == saldo_somando_partidas(a.admin_id, conta), conta
+
+
+def test_relatorio_le_a_abertura_e_reconstruir_repara():
+    with app.app_context():
+        a = _tenant('smr')
+        _lancar(a.admin_id, [(date(2026, 1, 10), '1.1.01.002', '3.1.01', 1000),
+                             (date(2026, 5, 10), '1.1.01.001', '1.1.01.002', 100)])
+        lanc = LancamentoContabil.query.filter_by(
+            admin_id=a.admin_id, data_lancamento=date(2026, 1, 10)).one()
+        # Por fora do ORM, como um import em SQL cru faria.
+        db.session.execute(text(
+            "UPDATE partida_contabil SET valor = 4000 WHERE lancamento_id = :l"),
+            {'l': lanc.id})
+        db.session.commit()
+
+        def bancos():
+            return razao_do_periodo(a.admin_id, date(2026, 5, 1), date(2026, 5, 31))[
+                '1.1.01.002'].saldo_final
+
+        assert bancos() == 900              # a abertura veio do saldo mensal
+        saldos_mensais.reconstruir(a.admin_id, desde=date(2026, 1, 1))
+        db.session.commit()
+        assert bancos() == 3900
+
+        # Reconstruir a partir de um mês preserva o que vem antes.
+        antes = _linhas(a.admin_id)
+        saldos_mensais.reconstruir(a.admin_id, desde=date(2026, 4, 1))
+        db.session.commit()
+        assert _linhas(a.admin_id) == antes
+
+
+def test_fechar_mes_completa_as_contas_e_recebe_lancamento_retroativo():
+    with app.app_context():
+        a = _tenant('smf')
+        _lancar(a.admin_id, [(date(2026, 1, 10), '1.1.01.002', '3.1.01', 1000)])
+        gerar_balancete_mensal(a.admin_id, date(2026, 3, 1))
+        linhas = _linhas(a.admin_id)
+        assert linhas[('1.1.01.002', date(2026, 3, 1))] == (1000, 0, 0, 1000)
+        assert linhas[('1.1.01.001', date(2026, 3, 1))] == (0, 0, 0, 0)
+
+        _lancar(a.admin_id, [(date(2026, 2, 1), '1.1.01.001', '1.1.01.002', 30)])
+        linhas = _linhas(a.admin_id)
+        assert linhas[('1.1.01.002', date(2026, 3, 1))] == (970, 0, 0, 970)
+        assert linhas[('1.1.01.001', date(2026, 3, 1))] == (30, 0, 0, 30)
+
+
+def test_edicao_de_lancamento_pela_tela_mantem_o_saldo():
+    """A tela de edição removia as partidas com `query.delete()` — em lote,
+    sem passar pelo flush. Agora remove pela sessão."""
+    from helpers_tenant import cliente_de
+
+    with app.app_context():
+        a = _tenant('smv')
+        _lancar(a.admin_id, [(date(2026, 1, 10), '1.1.01.002', '3.1.01', 1000)])
+        lanc_id = LancamentoContabil.query.filter_by(admin_id=a.admin_id).one().id
+
+    resposta = cliente_de(a.admin_id).post(f'/contabilidade/lancamentos/editar/{lanc_id}', data={
+        'data_lancamento': '2026-02-03', 'historico': 'corrigido', 'num_partidas': '2',
+        'partidas[0][tipo]': 'DEBITO', 'partidas[0][conta]': '1.1.01.001',
+        'partidas[0][valor]': '600',
+        'partidas[1][tipo]': 'CREDITO', 'partidas[1][conta]': '3.1.01',
+        'partidas[1][valor]': '600',
+    })
+    assert resposta.status_code == 302
+
+    with app.app_context():
+        assert saldo_somando_partidas(a.admin_id, '1.1.01.002') == 0
+        _confere_com_reconstrucao(a.admin_id)
+        assert _linhas(a.admin_id)[('1.1.01.001', date(2026, 2, 1))] == (0, 600, 0, 600)
+
+
+def test_lancamentos_concorrentes_em_meses_diferentes_da_mesma_conta():
+    """T1 cria a linha de março (abertura do próprio snapshot) e ainda não
+    commitou; T2 lança em janeiro e propaga para `mes > jan` — sem o lock
+    da conta, não enxergava a linha de março e o saldo dela ficava errado
+    para sempre."""
+    with app.app_context():
+        admin_id = _tenant('smc').admin_id
+
+    flush_t1, commitar_t1 = threading.Event(), threading.Event()
+    erros = []
+
+    def lancar(numero, data, depois_do_flush=None):
+        try:
+            with app.app_context():
+                lanc = LancamentoContabil(numero=numero, data_lancamento=data,
+                                          historico='concorrente', valor_total=100,
+                                          admin_id=admin_id)
+                db.session.add(lanc)
+                db.session.flush()
+                for seq, (conta, tipo) in enumerate((('1.1.01.002', 'DEBITO'),
+                                                     ('3.1.01', 'CREDITO')), start=1):
+                    db.session.add(PartidaContabil(lancamento_id=lanc.id, sequencia=seq,
+                                                   conta_codigo=conta, tipo_partida=tipo,
+                                                   valor=100, admin_id=admin_id))
+                db.session.flush()
+                if depois_do_flush:
+                    depois_do_flush()
+                db.session.commit()
+        except Exception as e:  # noqa: BLE001 — relatado na thread principal
+            erros.append(e)
+
+    def esperar_t2():
+        flush_t1.set()
+        commitar_t1.wait(10)
+
+    t1 = threading.Thread(target=lancar, args=(1, date(2026, 3, 10), esperar_t2))
+    t2 = threading.Thread(target=lancar, args=(2, date(2026, 1, 10)))
+    t1.start()
+    assert flush_t1.wait(10)
+    t2.start()
+    t2.join(0.5)
+    assert t2.is_alive(), 'o lançamento de janeiro não esperou o de março'
+    commitar_t1.set()
+    t1.join(10)
+    t2.join(10)
+    assert not erros, erros
+
+    with app.app_context():
+        assert _linhas(admin_id)[('1.1.01.002', date(2026, 3, 1))] == (100, 100, 0, 200)
+        _confere_com_reconstrucao(admin_id)
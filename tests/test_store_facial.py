@@ -0,0 +1,202 @@
+"""Store mapeado de embeddings faciais (services/store_facial).
+
+Testes UNITÁRIOS, sem DB/app/modelo. O store substituiu o pickle do cache;
+a referência é o dict do pickle: o índice de cada tenant montado do store
+(base + log de anexos) tem de ser o MESMO que `IndiceFacial.de_cache`
+montaria do dict equivalente — mesma matriz, mesmos ids, mesma ordem.
+"""
+import multiprocessing
+import os
+import random
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import store_facial
+from services.indice_facial import IndiceFacial
+from services.store_facial import StoreFacial
+from tests.test_indice_facial import _cache, _unitario
+
+
+def _assert_igual_ao_dict(store, cache, tenants):
+    for admin_id in tenants:
+        do_store = store.indice(admin_id)
+        do_dict = IndiceFacial.de_cache(cache, admin_id)
+        assert np.array_equal(do_store.matriz, do_dict.matriz)
+        assert do_store.func_ids.tolist() == do_dict.func_ids.tolist()
+        assert do_store.descricoes == do_dict.descricoes
+
+
+def test_gravar_e_ler_devolve_o_mesmo_cache(tmp_path):
+    rnd = random.Random(1)
+    cache = _cache(rnd, tenants=(1, 2, 3), por_tenant=15)
+    path = str(tmp_path / 'cache.store')
+    store_facial.gravar(path, cache['embeddings'], {'versao': '4.0', 'model': 'SFace'})
+
+    store = StoreFacial(path)
+    assert store.metadados == {'versao': '4.0', 'model': 'SFace'}
+    assert store.tenants() == {1, 2, 3}
+    _assert_igual_ao_dict(store, cache, (1, 2, 3, 99))
+
+    entradas = store.entradas()
+    assert set(entradas) == set(cache['embeddings'])
+    for fid, entrada in cache['embeddings'].items():
+        assert entradas[fid]['nome'] == entrada['nome']
+        assert [e['descricao'] for e in entradas[fid]['embeddings']] == [
+            e['descricao'] for e in entrada['embeddings']]
+        assert np.allclose([e['embedding'] for e in entradas[fid]['embeddings']],
+                           [e['embedding'] for e in entrada['embeddings']])
+
+
+def test_tenant_sem_anexos_e_visao_do_mapa_sem_copia(tmp_path):
+    rnd = random.Random(2)
+    cache = _cache(rnd, tenants=(1, 2), por_tenant=5)
+    path = str(tmp_path / 'cache.store')
+    store_facial.gravar(path, cache['embeddings'])
+    store = StoreFacial(path)
+
+    assert store.indice(1).matriz.base is not None
+    assert not store.indice(1).matriz.flags.owndata
+    store_facial.anexar(path, 1, None)            # func 1 é do tenant 1
+    store.sincronizar()
+    assert not store.indice(2).matriz.flags.owndata
+
+
+@pytest.mark.parametrize('semente', range(4))
+def test_anexos_equivalem_a_reescrever_o_dict(tmp_path, semente):
+    rnd = random.Random(semente)
+    cache = _cache(rnd, tenants=(1, 2), por_tenant=12)
+    path = str(tmp_path / 'cache.store')
+    store_facial.gravar(path, cache['embeddings'])
+    leitor = StoreFacial(path)          # aberto ANTES dos anexos
+    versoes = {t: leitor.versao(t) for t in (1, 2)}
+
+    for _ in range(30):
+        fid = rnd.randint(1, 30)       # 25..30 ainda não existem
+        cache['embeddings'].pop(fid, None)
+        if rnd.random() < 0.3:
+            store_facial.anexar(path, fid, None)
+            continue
+        entrada = {'admin_id': rnd.choice((1, 2)), 'nome': f'N{fid}',
+                   'embeddings': [{'embedding': _unitario(rnd), 'descricao': f'Nova {i}'}
+                                  for i in range(rnd.randint(1, 3))]}
+        cache['embeddings'][fid] = entrada    # volta no FIM, como no pickle
+        store_facial.anexar(path, fid, entrada)
+
+    leitor.sincronizar()
+    _assert_igual_ao_dict(leitor, cache, (1, 2))
+    _assert_igual_ao_dict(StoreFacial(path), cache, (1, 2))
+    assert {t: leitor.versao(t) for t in (1, 2)} != versoes
+
+
+def test_versao_so_muda_para_o_tenant_tocado(tmp_path):
+    rnd = random.Random(5)
+    cache = _cache(rnd, tenants=(1, 2), por_tenant=3)   # 1-3 tenant 1, 4-6 tenant 2
+    path = str(tmp_path / 'cache.store')
+    store_facial.gravar(path, cache['embeddings'])
+    store = StoreFacial(path)
+    antes = (store.versao(1), store.versao(2))
+
+    store_facial.anexar(path, 5, {'admin_id': 2, 'embeddings': [_unitario(rnd)]})
+    store.sincronizar()
+    assert store.versao(1) == antes[0] and store.versao(2) != antes[1]
+
+    # Regravar o arquivo troca o inode: todo tenant muda de versão.
+    store_facial.gravar(path, cache['embeddings'])
+    store.sincronizar()
+    assert store.versao(1) != antes[0]
+    _assert_igual_ao_dict(store, cache, (1, 2))
+
+
+def test_append_interrompido_nao_aparece_e_e_sobrescrito(tmp_path):
+    rnd = random.Random(6)
+    cache = _cache(rnd, tenants=(1,), por_tenant=3)
+    path = str(tmp_path / 'cache.store')
+    store_facial.gravar(path, cache['embeddings'])
+    with open(path, 'ab') as f:                 # lixo após o fim commitado
+        f.write(b'\xff' * 500)
+    store = StoreFacial(path)
+    _assert_igual_ao_dict(store, cache, (1,))
+
+    nova = {'admin_id': 1, 'embeddings': [{'embedding': _unitario(rnd), 'descricao': 'x'}]}
+    store_facial.anexar(path, 2, nova)
+    cache['embeddings'].pop(2)
+    cache['embeddings'][2] = nova
+    _assert_igual_ao_dict(store.sincronizar(), cache, (1,))
+    assert os.path.getsize(path) == store._log_lido    # lixo truncado
+
+
+def test_leitor_nunca_mistura_mapa_novo_com_offsets_antigos(tmp_path):
+    """Sincronizar troca o mapa e a tabela de offsets juntos: uma busca
+    concorrente vê o retrato antigo inteiro ou o novo inteiro."""
+    rnd = random.Random(8)
+    path = str(tmp_path / 'cache.store')
+    # Tamanhos diferentes a cada regravação: os offsets do tenant 2 mudam.
+    caches = [_cache(rnd, tenants=(1, 2), por_tenant=n) for n in (3, 40, 9, 25)]
+    store_facial.gravar(path, caches[0]['embeddings'])
+    store = StoreFacial(path)
+    erros, parar = [], threading.Event()
+
+    def ler():
+        while not parar.is_set():
+            try:
+                matriz, ids, descricoes = store.linhas(2)
+                assert len(matriz) == len(ids) == len(descricoes) > 0
+                assert np.allclose(np.linalg.norm(matriz, axis=1), 1.0, atol=1e-4)
+            except Exception as e:  # noqa: BLE001 — relatado na thread principal
+                erros.append(e)
+                return
+
+    leitores = [threading.Thread(target=ler) for _ in range(2)]
+    for t in leitores:
+        t.start()
+    try:
+        for i in range(60):
+            store_facial.gravar(path, caches[i % len(caches)]['embeddings'])
+            store.sincronizar()
+            store_facial.anexar(path, 1, {'admin_id': 2, 'embeddings': [_unitario(rnd)]})
+            store.sincronizar()
+    finally:
+        parar.set()
+        for t in leitores:
+            t.join()
+    assert not erros, erros[0]
+
+
+def _anexar_em_outro_processo(path, inicio, semente):
+    rnd = random.Random(semente)
+    for fid in range(inicio, inicio + 20):
+        store_facial.anexar(path, fid, {'admin_id': 1, 'embeddings': [_unitario(rnd)]})
+
+
+def test_escritores_concorrentes_nao_perdem_registros(tmp_path):
+    path = str(tmp_path / 'cache.store')
+    store_facial.gravar(path, {})
+    ctx = multiprocessing.get_context('fork')
+    processos = [ctx.Process(target=_anexar_em_outro_processo, args=(path, 100 * i, i))
+                 for i in range(1, 4)]
+    for p in processos:
+        p.start()
+    for p in processos:
+        p.join()
+    assert all(p.exitcode == 0 for p in processos)
+    ids = StoreFacial(path).indice(1).func_ids.tolist()
+    assert sorted(ids) == [f for i in range(1, 4) for f in range(100 * i, 100 * i + 20)]
+
+
+def test_formatos_legados_e_admin_nulo(tmp_path):
+    cache = {'embeddings': {
+        1: {'admin_id': '5', 'embedding': [3.0, 4.0]},
+        2: {'admin_id': None, 'embeddings': [[0.0, 1.0]]},
+    }}
+    path = str(tmp_path / 'cache.store')
+    store_facial.gravar(path, cache['embeddings'])
+    store = StoreFacial(path)
+    assert store.tenants() == {5, None}
+    _assert_igual_ao_dict(store, cache, (5, None))
+    with pytest.raises(ValueError):
+        store_facial.anexar(path, 3, {'admin_id': 5, 'embeddings': [[1.0, 0.0, 0.0]]})
@@ -6,16 +6,18 @@ Cobertura unitária do despachante de webhooks para n8n
 * `sign_payload` / `verify_signature` — HMAC-SHA256 com `compare_digest`.
 * `build_payload` — schema esperado pelo n8n.
 * Allowlist — eventos fora dela são ignorados (no-op).
-* `dispatch_webhook` em sucesso (2xx) → `WebhookEntrega.status == 'enviado'`.
-* `dispatch_webhook` com 4xx → `status='falha'` (sem retry).
-* `dispatch_webhook` com 5xx → `status='pendente'` + backoff agendado.
+* `dispatch_webhook` só enfileira; o entregador (`drenar_fila`) faz o POST.
+* Entrega em sucesso (2xx) → `WebhookEntrega.status == 'enviado'`.
+* Entrega com 4xx → `status='falha'` (sem retry).
+* Entrega com 5xx → `status='pendente'` + backoff agendado.
 * Erro de rede → idem 5xx (pendente).
 * Backoff respeita o array `RETRY_BACKOFF_SECONDS` por número de tentativa.
 * Após `MAX_TENTATIVAS` falhas, status final é `falha` permanente.
 * `reentregar_uma` reseta tentativas e tenta de novo.
 
 Cada teste usa transação isolada (rollback no fim) e mocka `_post_to_n8n`
-para nunca tocar a rede.
+para nunca tocar a rede. A fila contra um servidor HTTP de verdade fica em
+`test_webhook_entregador.py`.
 """
 import json
 import os
@@ -68,6 +70,12 @@ def limpar_entregas(app_ctx):
         db.session.commit()
 
 
+def _despachar_e_entregar(*args, **kwargs):
+    """dispatch (enfileira) + uma drenagem da fila, como o entregador faria."""
+    assert wd.dispatch_webhook(*args, **kwargs) is True
+    wd.drenar_fila()
+
+
 def _coletar_novos(limpar_entregas):
     """Após o teste, registra todos os ids criados pra cleanup."""
     novos = [
@@ -188,10 +196,18 @@ class TestAllowlist:
 # Dispatch — caminho feliz e falhas
 # ────────────────────────────────────────────────────────────────────────
 class TestDispatch:
-    def test_sucesso_2xx_marca_enviado(self, app_ctx, webhook_ligado, limpar_entregas):
-        with patch.object(wd, '_post_to_n8n', return_value=(200, 'OK')):
+    def test_dispatch_so_enfileira(self, app_ctx, webhook_ligado, limpar_entregas):
+        with patch.object(wd, '_post_to_n8n') as post_mock:
             ok = wd.dispatch_webhook('teste.evento', {'k': 'v'}, admin_id=None)
         assert ok is True
+        post_mock.assert_not_called()
+        criados = _coletar_novos(limpar_entregas)
+        e = db.session.get(WebhookEntrega, criados[0])
+        assert (e.status, e.tentativas, e.sent_at) == ('pendente', 0, None)
+
+    def test_sucesso_2xx_marca_enviado(self, app_ctx, webhook_ligado, limpar_entregas):
+        with patch.object(wd, '_post_to_n8n', return_value=(200, 'OK')):
+            _despachar_e_entregar('teste.evento', {'k': 'v'}, admin_id=None)
         criados = _coletar_novos(limpar_entregas)
         assert len(criados) == 1
         e = db.session.get(WebhookEntrega, criados[0])
@@ -204,8 +220,7 @@ class TestDispatch:
         self, app_ctx, webhook_ligado, limpar_entregas
     ):
         with patch.object(wd, '_post_to_n8n', return_value=(400, 'Bad Request')):
-            ok = wd.dispatch_webhook('teste.evento', {}, admin_id=None)
-        assert ok is False
+            _despachar_e_entregar('teste.evento', {}, admin_id=None)
         criados = _coletar_novos(limpar_entregas)
         e = db.session.get(WebhookEntrega, criados[0])
         assert e.status == 'falha'
@@ -218,8 +233,7 @@ class TestDispatch:
     ):
         antes = datetime.utcnow()
         with patch.object(wd, '_post_to_n8n', return_value=(500, 'boom')):
-            ok = wd.dispatch_webhook('teste.evento', {}, admin_id=None)
-        assert ok is False
+            _despachar_e_entregar('teste.evento', {}, admin_id=None)
         criados = _coletar_novos(limpar_entregas)
         e = db.session.get(WebhookEntrega, criados[0])
         assert e.status == 'pendente'
@@ -235,8 +249,7 @@ class TestDispatch:
         with patch.object(
             wd, '_post_to_n8n', side_effect=Exception('connection refused')
         ):
-            ok = wd.dispatch_webhook('teste.evento', {}, admin_id=None)
-        assert ok is False
+            _despachar_e_entregar('teste.evento', {}, admin_id=None)
         criados = _coletar_novos(limpar_entregas)
         e = db.session.get(WebhookEntrega, criados[0])
         assert e.status == 'pendente'
@@ -255,7 +268,7 @@ class TestDispatch:
             return (204, '')
 
         with patch.object(wd, '_post_to_n8n', side_effect=_fake):
-            wd.dispatch_webhook('teste.evento', {'a': 1}, admin_id=7)
+            _despachar_e_entregar('teste.evento', {'a': 1}, admin_id=7)
 
         _coletar_novos(limpar_entregas)
         assert captura['url'] == 'https://n8n.fake/webhook/teste'
@@ -280,7 +293,7 @@ class TestBackoff:
     def test_segunda_falha_usa_5min(self, app_ctx, webhook_ligado, limpar_entregas):
         # 1ª tentativa: 5xx → tentativas=1, agenda +60s
         with patch.object(wd, '_post_to_n8n', return_value=(500, 'x')):
-            wd.dispatch_webhook('teste.evento', {}, admin_id=None)
+            _despachar_e_entregar('teste.evento', {}, admin_id=None)
         criados = _coletar_novos(limpar_entregas)
         eid = criados[0]
 
@@ -298,7 +311,7 @@ class TestBackoff:
     ):
         # 1ª tentativa: 5xx → tentativas=1, agenda +60s
         with patch.object(wd, '_post_to_n8n', return_value=(500, 'x')):
-            wd.dispatch_webhook('teste.evento', {}, admin_id=None)
+            _despachar_e_entregar('teste.evento', {}, admin_id=None)
         criados = _coletar_novos(limpar_entregas)
         eid = criados[0]
 
@@ -319,7 +332,7 @@ class TestBackoff:
         # Cenário: a 1ª tentativa (do dispatch original) e 3 retries
         # subsequentes falham — a 4ª falha vira `falha` permanente.
         with patch.object(wd, '_post_to_n8n', return_value=(500, 'x')):
-            wd.dispatch_webhook('teste.evento', {}, admin_id=None)
+            _despachar_e_entregar('teste.evento', {}, admin_id=None)
         criados = _coletar_novos(limpar_entregas)
         eid = criados[0]
 
@@ -348,7 +361,7 @@ class TestReentregar:
     ):
         # Cria uma falha permanente.
         with patch.object(wd, '_post_to_n8n', return_value=(400, 'Bad')):
-            wd.dispatch_webhook('teste.evento', {'a': 1}, admin_id=None)
+            _despachar_e_entregar('teste.evento', {'a': 1}, admin_id=None)
         criados = _coletar_novos(limpar_entregas)
         eid = criados[0]
         e0 = db.session.get(WebhookEntrega, eid)
@@ -0,0 +1,177 @@
+"""Fila de entrega de webhooks contra um n8n de mentira (servidor HTTP local).
+
+`dispatch_webhook` só grava a `WebhookEntrega`; quem faz o POST é o
+entregador (`reentregar_pendentes` / `drenar_fila`), num pool de threads com
+uma `requests.Session` compartilhada. O que se garante aqui, com HTTP de
+verdade (sem mock de `_post_to_n8n`):
+
+  1. o dispatch não espera o n8n — um destino lento não aparece no tempo
+     do enfileiramento;
+  2. o lote sai em paralelo, mas nunca com mais de `ENTREGA_POR_DESTINO`
+     POSTs simultâneos no mesmo host, e reaproveitando as conexões;
+  3. o resultado de cada POST (2xx / 4xx / 5xx) vira o estado da linha, com
+     a mesma tabela de backoff do retry;
+  4. linha reservada por um entregador não é pega por outro.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__) + '/..'))
+
+from app import app, db  # noqa: E402
+from models import WebhookEntrega  # noqa: E402
+from utils import webhook_dispatcher as wd  # noqa: E402
+
+pytestmark = pytest.mark.integration
+
+SEGREDO = 'segredo-do-stub'
+
+
+class _N8nFalso(BaseHTTPRequestHandler):
+    """Responde o status pedido em `data.responder` (200 se ausente),
+    depois de `data.demora` segundos, e registra o que recebeu."""
+    protocol_version = 'HTTP/1.1'          # keep-alive, como o n8n
+
+    def do_POST(self):
+        corpo = self.rfile.read(int(self.headers['Content-Length']))
+        payload = json.loads(corpo)
+        srv = self.server
+        with srv.trava:
+            srv.em_voo += 1
+            srv.pico = max(srv.pico, srv.em_voo)
+            srv.recebidos.append((payload, self.headers.get('X-Signature'), corpo))
+            srv.portas.add(self.client_address[1])
+        try:
+            time.sleep(payload['data'].get('demora', 0))
+        finally:
+            with srv.trava:
+                srv.em_voo -= 1
+        resposta = b'ok'
+        self.send_response(payload['data'].get('responder', 200))
+        self.send_header('Content-Length', str(len(resposta)))
+        self.end_headers()
+        self.wfile.write(resposta)
+
+    def log_message(self, *_a):
+        pass
+
+
+@pytest.fixture
+def n8n(monkeypatch):
+    srv = ThreadingHTTPServer(('127.0.0.1', 0), _N8nFalso)
+    srv.daemon_threads = True
+    srv.trava = threading.Lock()
+    srv.em_voo = srv.pico = 0
+    srv.recebidos = []
+    srv.portas = set()
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+
+    monkeypatch.setenv('N8N_WEBHOOK_URL', f'http://127.0.0.1:{srv.server_port}/webhook/sige')
+    monkeypatch.setenv('N8N_WEBHOOK_SECRET', SEGREDO)
+    monkeypatch.setattr(wd, 'ENTREGA_POR_DESTINO', 2)
+    monkeypatch.setattr(wd, '_semaforos', {})
+    wd.WEBHOOK_EVENT_ALLOWLIST.add('teste.fila')
+    with app.app_context():
+        try:
+            yield srv
+        finally:
+            wd.WEBHOOK_EVENT_ALLOWLIST.discard('teste.fila')
+            WebhookEntrega.query.filter_by(event='teste.fila').delete()
+            db.session.commit()
+            srv.shutdown()
+            srv.server_close()
+
+
+def _entregas():
+    return {e.payload['data']['n']: e for e in
+            WebhookEntrega.query.filter_by(event='teste.fila').populate_existing()}
+
+
+def test_dispatch_so_enfileira_e_o_entregador_drena_em_paralelo(n8n):
+    inicio = time.monotonic()
+    for n in range(6):
+        assert wd.dispatch_webhook('teste.fila', {'n': n, 'demora': 1.0}, admin_id=None)
+    assert time.monotonic() - inicio < 3.0          # seis POSTs de 1 s seriam 6 s
+    assert n8n.recebidos == []
+    assert {e.status for e in _entregas().values()} == {'pendente'}
+
+    inicio = time.monotonic()
+    assert wd.drenar_fila() == 6
+    decorrido = time.monotonic() - inicio
+
+    entregas = _entregas()
+    assert {e.status for e in entregas.values()} == {'enviado'}
+    assert all(e.tentativas == 1 and e.sent_at for e in entregas.values())
+    # Em paralelo, mas no máximo 2 por vez no mesmo host: 3 rodadas de 1 s.
+    assert n8n.pico == 2
+    assert 2.9 <= decorrido < 5.5, decorrido
+    # Conexões da sessão reaproveitadas entre os POSTs.
+    assert len(n8n.portas) <= 2
+    for payload, assinatura, corpo in n8n.recebidos:
+        assert payload['event'] == 'teste.fila'
+        assert wd.verify_signature(corpo, assinatura, SEGREDO)
+
+
+def test_status_http_vira_estado_da_linha(n8n):
+    antes = datetime.utcnow()
+    for n, responder in enumerate((204, 422, 503)):
+        wd.dispatch_webhook('teste.fila', {'n': n, 'responder': responder}, admin_id=None)
+    assert wd.drenar_fila() == 3
+
+    ok, recusada, transitoria = (_entregas()[n] for n in range(3))
+    assert ok.status == 'enviado'
+    assert (recusada.status, recusada.proxima_tentativa_em) == ('falha', None)
+    assert 'HTTP 422' in recusada.ultimo_erro
+    assert transitoria.status == 'pendente' and transitoria.tentativas == 1
+    delta = (transitoria.proxima_tentativa_em - antes).total_seconds()
+    assert 55 <= delta <= 75                       # 1º backoff: +60 s
+    # Ainda não venceu: a próxima drenagem não a toca.
+    assert wd.drenar_fila() == 0
+    assert len(n8n.recebidos) == 3
+
+
+def test_linha_reservada_nao_e_pega_de_novo(n8n):
+    for n in range(3):
+        wd.dispatch_webhook('teste.fila', {'n': n}, admin_id=None)
+    agora = datetime.utcnow()
+    primeiro = wd._reservar_lote(agora, limit=2)
+    segundo = wd._reservar_lote(agora, limit=10)
+    ids = {e.id for e in _entregas().values()}
+    assert len(primeiro) == 2 and len(segundo) == 1
+    assert set(primeiro) | set(segundo) == ids
+    assert wd._reservar_lote(agora, limit=10) == []
+    assert n8n.recebidos == []
+
+
+def test_post_em_voo_sem_transacao_aberta_e_linha_removida_no_meio(n8n, monkeypatch):
+    """Enquanto os POSTs correm, a sessão do entregador não segura transação
+    (nada de "idle in transaction" pelo tempo dos timeouts); uma entrega
+    apagada nesse meio-tempo é pulada sem derrubar o lote."""
+    for n in range(3):
+        wd.dispatch_webhook('teste.fila', {'n': n}, admin_id=None)
+    apagar = _entregas()[1].id
+    sessao, engine = db.session(), db.engine
+    em_transacao = []
+    post_original = wd._tentar_post
+
+    def _post(url, body, signature):
+        em_transacao.append(sessao.in_transaction())
+        if json.loads(body)['data']['n'] == 1:
+            with engine.begin() as conn:
+                conn.execute(WebhookEntrega.__table__.delete().where(
+                    WebhookEntrega.id == apagar))
+        return post_original(url, body, signature)
+
+    monkeypatch.setattr(wd, '_tentar_post', _post)
+    assert wd.reentregar_pendentes() == 3
+    assert em_transacao == [False, False, False]
+    entregas = _entregas()
+    assert set(entregas) == {0, 2}
+    assert {e.status for e in entregas.values()} == {'enviado'}
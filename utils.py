@@ -9,6 +9,9 @@ import re
 from werkzeug.utils import secure_filename
 from flask import current_app
 import logging
+
+from services.periodo import no_mes
+
 logger = logging.getLogger(__name__)
 
 def _round2(x: float) -> float:
@@ -1153,8 +1156,7 @@ def calcular_ocorrencias_funcionario(funcionario_id, ano, mes):
     # Buscar TODOS os registros do mês (incluindo os vazios)
     registros = RegistroPonto.query.filter(
         RegistroPonto.funcionario_id == funcionario_id,
-        func.extract('year', RegistroPonto.data) == ano,
-        func.extract('month', RegistroPonto.data) == mes
+        *no_mes(RegistroPonto.data, ano, mes)
     ).all()
     
     faltas = 0
@@ -1233,8 +1235,7 @@ def calcular_kpis_funcionario_completo(funcionario_id, ano=None, mes=None):
     # Buscar dados de horas trabalhadas
     registros_query = RegistroPonto.query.filter(
         RegistroPonto.funcionario_id == funcionario_id,
-        func.extract('year', RegistroPonto.data) == ano,
-        func.extract('month', RegistroPonto.data) == mes,
+        *no_mes(RegistroPonto.data, ano, mes),
         RegistroPonto.hora_entrada.isnot(None),
         RegistroPonto.hora_saida.isnot(None)
     ).all()
@@ -30,7 +30,10 @@ snapshot do M05 para evolução futura; limitação documentada).
 from __future__ import annotations
 
 import logging
-from datetime import date, timedelta
+import math
+from datetime import date
+
+from services.calendario_dias_uteis import obter_calendario
 
 logger = logging.getLogger(__name__)
 
@@ -39,47 +42,37 @@ logger = logging.getLogger(__name__)
 # Helpers de dias úteis
 # ─────────────────────────────────────────────────────────────────────────────
 
-def _is_dia_util(d: date, considerar_sabado: bool, considerar_domingo: bool) -> bool:
-    wd = d.weekday()  # 0=Seg … 6=Dom
-    if wd == 5 and not considerar_sabado:
-        return False
-    if wd == 6 and not considerar_domingo:
-        return False
-    return True
-
+# Aritmética delegada ao índice pré-computado de
+# `services/calendario_dias_uteis` (soma de prefixo por configuração de
+# calendário): mesmas respostas do laço dia a dia que vivia aqui, em tempo
+# constante — o replanejamento e o planejado da curva chamam estas funções
+# para cada tarefa da obra.
 
 def proximo_dia_util(d: date, considerar_sabado: bool, considerar_domingo: bool) -> date:
     """Retorna o próximo dia útil estritamente após `d`."""
-    d = d + timedelta(days=1)
-    while not _is_dia_util(d, considerar_sabado, considerar_domingo):
-        d += timedelta(days=1)
-    return d
+    return obter_calendario(considerar_sabado, considerar_domingo).somar(d, 1)
 
 
 def calcular_data_fim(data_inicio: date, duracao_dias: int,
                       considerar_sabado: bool, considerar_domingo: bool) -> date:
-    """Soma `duracao_dias` dias úteis a partir de data_inicio (inclusive)."""
+    """Soma `duracao_dias` dias úteis a partir de data_inicio (inclusive).
+
+    O próprio `data_inicio` conta como 1º dia mesmo que não seja útil —
+    comportamento herdado do laço original, preservado aqui."""
     if duracao_dias <= 0:
         return data_inicio
-    d = data_inicio
-    contados = 1
-    while contados < duracao_dias:
-        d += timedelta(days=1)
-        if _is_dia_util(d, considerar_sabado, considerar_domingo):
-            contados += 1
-    return d
+    passos = math.ceil(duracao_dias) - 1
+    if passos <= 0:
+        return data_inicio
+    return obter_calendario(considerar_sabado, considerar_domingo).somar(
+        data_inicio, passos)
 
 
 def dias_uteis_entre(inicio: date, fim: date,
                      considerar_sabado: bool, considerar_domingo: bool) -> int:
     """Conta dias úteis entre inicio e fim (inclusive em ambos os extremos)."""
-    total = 0
-    d = inicio
-    while d <= fim:
-        if _is_dia_util(d, considerar_sabado, considerar_domingo):
-            total += 1
-        d += timedelta(days=1)
-    return total
+    return obter_calendario(considerar_sabado, considerar_domingo).contar(
+        inicio, fim)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -241,26 +234,30 @@ def impedimento_para_cadastrar_quantitativo(tarefa, novo_total, admin_id):
     )
 
 
-def ids_com_historico_percentual(admin_id: int, tarefa_ids) -> set:
+def ids_com_historico_percentual(admin_id: int, tarefa_ids, ate=None) -> set:
     """Versão em lote de `historico_em_percentual`: uma consulta para o
     conjunto todo, em vez de uma por tarefa.
 
     Existe para `sincronizar_percentuais_obra`, que percorre a obra inteira
-    — lá o custo de uma consulta por tarefa apareceria na tela.
+    — lá o custo de uma consulta por tarefa apareceria na tela. `ate` tem o
+    mesmo sentido de lá (corte em `RDO.data_relatorio`); `None` olha o
+    histórico inteiro e dispensa o JOIN.
     """
-    from models import RDOApontamentoCronograma, db
+    from models import RDO, RDOApontamentoCronograma, db
 
     ids = [t for t in tarefa_ids if t]
     if not ids:
         return set()
-    return {
-        tid for (tid,) in
+    q = (
         db.session.query(RDOApontamentoCronograma.tarefa_cronograma_id)
         .filter(RDOApontamentoCronograma.admin_id == admin_id,
                 RDOApontamentoCronograma.tarefa_cronograma_id.in_(ids),
                 RDOApontamentoCronograma.tipo_apontamento == 'percentual')
-        .distinct()
-    }
+    )
+    if ate is not None:
+        q = (q.join(RDO, RDO.id == RDOApontamentoCronograma.rdo_id)
+             .filter(RDO.data_relatorio <= ate))
+    return {tid for (tid,) in q.distinct()}
 
 
 def agrupar_atividades_por_caminho(itens, chave='caminho_tarefa'):
@@ -581,7 +578,8 @@ def sincronizar_percentuais_obra(obra_id: int, admin_id: int, cliente: bool = Fa
         db.session.rollback()
 
 
-def rollup_percentual_pos_recalculo(tarefas: list, pai_ids: set, admin_id: int) -> None:
+def rollup_percentual_pos_recalculo(tarefas: list, pai_ids: set, admin_id: int,
+                                    escopo: set | None = None) -> None:
     """Sincroniza `percentual_concluido` após um recálculo de datas — SEM commit.
 
     Extraído byte-idêntico de `recalcular_cronograma` (o bloco entre os dois
@@ -590,18 +588,25 @@ def rollup_percentual_pos_recalculo(tarefas: list, pai_ids: set, admin_id: int)
     (Fase 1 do cronograma editável): folhas recebem o último apontamento do
     RDO (`_atualizar_percentual_sem_commit`); pais recebem média ponderada
     pela duração das filhas, de baixo para cima. O commit é do caller.
+
+    `escopo` (recálculo incremental): só as folhas e pais nele são
+    reescritos; as filhas de cada pai continuam vindo de `tarefas` inteira.
     """
+    if escopo is not None:
+        alvo = [t for t in tarefas if t.id in escopo]
+    else:
+        alvo = tarefas
     # Sincronizar percentual_concluido de folhas com o último apontamento do RDO
     percentual_livre = _percentual_livre(admin_id)  # uma consulta para o lote
     hist_pct = ids_com_historico_percentual(  # idem
-        admin_id, [t.id for t in tarefas if t.id not in pai_ids])
-    for tarefa in tarefas:
+        admin_id, [t.id for t in alvo if t.id not in pai_ids])
+    for tarefa in alvo:
         if tarefa.id not in pai_ids:  # só folhas recebem sync do RDO
             _atualizar_percentual_sem_commit(tarefa, admin_id, percentual_livre,
                                              hist_pct)
 
     # Bottom-up: % dos pais calculado a partir dos filhos (média ponderada por duração)
-    pais = [t for t in tarefas if t.id in pai_ids]
+    pais = [t for t in alvo if t.id in pai_ids]
     for pai in sorted(pais, key=lambda t: t.ordem, reverse=True):
         filhas = [t for t in tarefas if t.tarefa_pai_id == pai.id]
         if not filhas:
@@ -749,52 +754,113 @@ def calcular_progresso_rdo(tarefa_id: int, data_rdo: date, admin_id: int,
 
     `percentual_livre`: estado já resolvido da flag `rdo_percentual_livre`
     (ver `_percentual_livre`). `None` consulta; quem chama em laço sobre a
-    obra inteira passa o booleano.
+    obra inteira passa o booleano — ou, melhor, chama
+    `calcular_progresso_rdo_em_lote`, de quem esta função é o caso de uma
+    tarefa só.
     """
-    from models import TarefaCronograma, RDOApontamentoCronograma, db
+    from models import TarefaCronograma
 
     tarefa = TarefaCronograma.query.get(tarefa_id)
     if not tarefa:
         return {'percentual_planejado': None, 'percentual_realizado': 0.0, 'quantidade_acumulada': 0.0}
-
-    # ── Planejado ── marco = degrau na data_inicio; demais = interpolação
-    # linear por dias úteis; None = "Sem plano" (a UI mostra "—", NÃO 0%,
-    # que pareceria atraso).
-    marco = _is_marco_efetivo(tarefa)
-    cal = get_calendario(admin_id)
-    perc_planejado = _planejado_na_data(
-        tarefa.data_inicio, tarefa.data_fim, tarefa.duracao_dias, marco,
-        data_rdo, cal.considerar_sabado, cal.considerar_domingo)
-
-    # ── Realizado ──
+    return calcular_progresso_rdo_em_lote(
+        [tarefa], data_rdo, admin_id, percentual_livre)[tarefa.id]
+
+
+def _agregados_apontamento_em_lote(tarefa_ids: list, data_ref: date,
+                                   admin_id: int):
+    """Os três fatos de apontamento que o progresso de uma tarefa consome,
+    para o lote inteiro em TRÊS consultas (antes: até três por tarefa).
+
+    Devolve `(acumulados, ultimos, hist_pct)`:
+      - `acumulados`: {tarefa_id: Σ quantidade_executada_dia até data_ref},
+        só linhas que NÃO foram gravadas em percentual (ver nota abaixo);
+      - `ultimos`: {tarefa_id: percentual_realizado do apontamento mais
+        recente até data_ref} — mesmo desempate de
+        `_atualizar_percentual_sem_commit` (data desc, id desc), aqui via
+        `row_number()` particionado por tarefa;
+      - `hist_pct`: ids com linha gravada em percentual até data_ref
+        (`ids_com_historico_percentual` com corte).
+
+    Tarefa sem apontamento simplesmente não aparece nos dicts.
+    """
     from sqlalchemy import func as sqlfunc
-    from models import RDO
+    from models import RDO, RDOApontamentoCronograma, db
+
+    if not tarefa_ids:
+        return {}, {}, set()
 
     # Linhas gravadas em PERCENTUAL guardam PONTOS PERCENTUAIS em
     # `quantidade_executada_dia` — somá-las como produção física é um erro de
     # unidade. Por isso a soma abaixo ignora essas linhas: sem o filtro, uma
     # tarefa apontada em % que ganhasse `quantidade_total` depois teria os
     # mesmos pp divididos pelo total (ver `historico_em_percentual`).
-    acumulado = (
-        db.session.query(sqlfunc.coalesce(sqlfunc.sum(RDOApontamentoCronograma.quantidade_executada_dia), 0.0))
+    acumulados = {
+        tid: float(total or 0.0) for tid, total in
+        db.session.query(
+            RDOApontamentoCronograma.tarefa_cronograma_id,
+            sqlfunc.sum(RDOApontamentoCronograma.quantidade_executada_dia),
+        )
         .join(RDO, RDO.id == RDOApontamentoCronograma.rdo_id)
         .filter(
-            RDOApontamentoCronograma.tarefa_cronograma_id == tarefa_id,
+            RDOApontamentoCronograma.tarefa_cronograma_id.in_(tarefa_ids),
             RDOApontamentoCronograma.admin_id == admin_id,
-            RDO.data_relatorio <= data_rdo,
+            RDO.data_relatorio <= data_ref,
             sqlfunc.coalesce(
                 RDOApontamentoCronograma.tipo_apontamento, '') != 'percentual',
         )
-        .scalar()
-    ) or 0.0
+        .group_by(RDOApontamentoCronograma.tarefa_cronograma_id)
+    }
 
-    if percentual_livre is None:
-        percentual_livre = _percentual_livre(admin_id)
+    ordem = sqlfunc.row_number().over(
+        partition_by=RDOApontamentoCronograma.tarefa_cronograma_id,
+        order_by=(RDO.data_relatorio.desc(),
+                  RDOApontamentoCronograma.id.desc()),
+    )
+    recentes = (
+        db.session.query(
+            RDOApontamentoCronograma.tarefa_cronograma_id.label('tarefa_id'),
+            RDOApontamentoCronograma.percentual_realizado.label('pct'),
+            ordem.label('ordem'),
+        )
+        .join(RDO, RDO.id == RDOApontamentoCronograma.rdo_id)
+        .filter(
+            RDOApontamentoCronograma.tarefa_cronograma_id.in_(tarefa_ids),
+            RDOApontamentoCronograma.admin_id == admin_id,
+            RDO.data_relatorio <= data_ref,
+        )
+        .subquery()
+    )
+    ultimos = {
+        tid: pct for tid, pct in
+        db.session.query(recentes.c.tarefa_id, recentes.c.pct)
+        .filter(recentes.c.ordem == 1)
+    }
+
+    hist_pct = ids_com_historico_percentual(admin_id, tarefa_ids, ate=data_ref)
+    return acumulados, ultimos, hist_pct
+
+
+def _progresso_de_agregados(tarefa, data_rdo: date, sab: bool, dom: bool,
+                            acumulado: float, ultimo_pct, em_percentual: bool,
+                            percentual_livre: bool) -> dict:
+    """Núcleo puro de `calcular_progresso_rdo`: mesmo dict, a partir dos
+    agregados já carregados (`_agregados_apontamento_em_lote`). Sem banco —
+    é aqui que a fórmula mora; os dois caminhos (uma tarefa / lote) só
+    diferem em como buscam os números."""
+    # ── Planejado ── marco = degrau na data_inicio; demais = interpolação
+    # linear por dias úteis; None = "Sem plano" (a UI mostra "—", NÃO 0%,
+    # que pareceria atraso).
+    marco = _is_marco_efetivo(tarefa)
+    perc_planejado = _planejado_na_data(
+        tarefa.data_inicio, tarefa.data_fim, tarefa.duracao_dias, marco,
+        data_rdo, sab, dom)
 
+    # ── Realizado ──
     perc_realizado = 0.0
     if (not percentual_livre
             and tarefa.quantidade_total and tarefa.quantidade_total > 0
-            and not historico_em_percentual(tarefa_id, admin_id, data_rdo)):
+            and not em_percentual):
         perc_realizado = min(100.0, round(acumulado / tarefa.quantidade_total * 100, 2))
     else:
         # Três casos caem aqui: tarefa sem quantidade física; QUALQUER tarefa
@@ -804,22 +870,8 @@ def calcular_progresso_rdo(tarefa_id: int, data_rdo: date, admin_id: int,
         # `percentual_realizado` do ÚLTIMO apontamento até data_rdo (mesma
         # fonte que sincronizar_percentuais_obra). Antes esse caso devolvia
         # sempre 0.
-        ultimo = (
-            db.session.query(RDOApontamentoCronograma.percentual_realizado)
-            .join(RDO, RDO.id == RDOApontamentoCronograma.rdo_id)
-            .filter(
-                RDOApontamentoCronograma.tarefa_cronograma_id == tarefa_id,
-                RDOApontamentoCronograma.admin_id == admin_id,
-                RDO.data_relatorio <= data_rdo,
-            )
-            # Desempate ESTÁVEL — ver nota em
-            # `_atualizar_percentual_sem_commit`.
-            .order_by(RDO.data_relatorio.desc(),
-                      RDOApontamentoCronograma.id.desc())
-            .first()
-        )
-        if ultimo is not None and ultimo[0] is not None:
-            perc_realizado = min(100.0, float(ultimo[0]))
+        if ultimo_pct is not None:
+            perc_realizado = min(100.0, float(ultimo_pct))
             if acumulado <= 0:
                 # sinaliza apontamento p/ n_tarefas_apontadas em
                 # calcular_progresso_geral_obra_v2 (testa quantidade_acumulada > 0)
@@ -836,6 +888,36 @@ def calcular_progresso_rdo(tarefa_id: int, data_rdo: date, admin_id: int,
     }
 
 
+def calcular_progresso_rdo_em_lote(tarefas: list, data_rdo: date,
+                                   admin_id: int,
+                                   percentual_livre=None) -> dict:
+    """Versão em lote de `calcular_progresso_rdo`: {tarefa.id: dict} para
+    todas as `tarefas` (objetos `TarefaCronograma` já carregados) em número
+    CONSTANTE de consultas — calendário, flag e os três agregados de
+    `_agregados_apontamento_em_lote` — em vez de quatro a cinco por tarefa.
+
+    Existe para `calcular_progresso_geral_obra_v2`: numa obra de 900 folhas
+    (Baia, cronograma importado do MPP) o laço antigo fazia milhares de
+    idas ao banco para um único KPI. O resultado por tarefa é o MESMO dict
+    da versão unitária — a fórmula é uma só (`_progresso_de_agregados`).
+    """
+    if not tarefas:
+        return {}
+    cal = get_calendario(admin_id)
+    if percentual_livre is None:
+        percentual_livre = _percentual_livre(admin_id)
+    ids = [t.id for t in tarefas]
+    acumulados, ultimos, hist_pct = _agregados_apontamento_em_lote(
+        ids, data_rdo, admin_id)
+    return {
+        t.id: _progresso_de_agregados(
+            t, data_rdo, cal.considerar_sabado, cal.considerar_domingo,
+            acumulados.get(t.id, 0.0), ultimos.get(t.id),
+            t.id in hist_pct, percentual_livre)
+        for t in tarefas
+    }
+
+
 def calcular_progresso_geral_obra_v2(obra_id: int, data_ref: date,
                                      admin_id: int, *,
                                      com_arquivadas_historicas: bool = False,
@@ -934,10 +1016,13 @@ def calcular_progresso_geral_obra_v2(obra_id: int, data_ref: date,
     ) and len({(t.unidade_medida or '').strip().lower()
                for t in nao_marcos}) == 1
 
-    percentual_livre = _percentual_livre(admin_id)  # uma consulta para a obra
+    # Número constante de consultas para a obra inteira — o laço abaixo é
+    # só aritmética (ver calcular_progresso_rdo_em_lote).
+    progressos = calcular_progresso_rdo_em_lote(folhas_efetivas, data_ref,
+                                                admin_id)
 
     for t in folhas_efetivas:
-        prog = calcular_progresso_rdo(t.id, data_ref, admin_id, percentual_livre)
+        prog = progressos[t.id]
         perc_real = float(prog.get('percentual_realizado') or 0.0)
         # Sem plano calculável conta como 0 no agregado planejado.
         perc_plan = float(prog.get('percentual_planejado') or 0.0)
@@ -14,10 +14,22 @@ Pontos importantes:
   webhook. O catálogo inicial (Task #45) já cobre eventos de propostas e
   obras — ver constante abaixo. Novas tarefas precisam adicionar o
   evento explicitamente — nada vaza por engano.
+* **Fila, não POST no request** — ``dispatch_webhook`` só grava a
+  :class:`models.WebhookEntrega` pendente e acorda o entregador depois do
+  commit. Antes o POST acontecia ali mesmo, dentro do ``EventManager.emit``:
+  com o n8n lento ou fora, cada finalização de RDO e aprovação de proposta
+  esperava os ``HTTP_TIMEOUT_SECONDS`` inteiros na thread do usuário.
+* **Entregador** — uma thread daemon drena a fila em lotes: reserva as
+  linhas vencidas (``FOR UPDATE SKIP LOCKED`` + prazo de reserva em
+  ``proxima_tentativa_em``, então dois processos do gunicorn não entregam a
+  mesma linha), faz os POSTs em paralelo num pool de threads com uma
+  ``requests.Session`` compartilhada (conexão keep-alive reaproveitada) e
+  grava os resultados do lote num commit. ``ENTREGA_POR_DESTINO`` limita os
+  POSTs simultâneos por host, para não afogar um n8n que já está sofrendo.
 * **Idempotência da fila** — toda tentativa, sucesso ou falha, vai parar
   na tabela :class:`models.WebhookEntrega` para auditoria e retry.
 * **Retry com backoff** — falhas de rede/HTTP 5xx ficam em ``status='pendente'``
-  e são reprocessadas pelo job de retry com janelas 1 min → 5 min → 15 min.
+  e são reprocessadas pelo mesmo entregador com janelas 1 min → 5 min → 15 min.
   Após 3 tentativas, ``status='falha'`` (falha permanente).
 
 A rotina é segura por design: nunca propaga exceção para o handler chamador
@@ -33,9 +45,10 @@ import json
 import logging
 import os
 import threading
-import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Any
+from urllib.parse import urlsplit
 
 logger = logging.getLogger(__name__)
 
@@ -85,10 +98,28 @@ RETRY_BACKOFF_SECONDS = [60, 5 * 60, 15 * 60]
 MAX_TENTATIVAS = len(RETRY_BACKOFF_SECONDS) + 1  # = 4 (1 inicial + 3 retries)
 HTTP_TIMEOUT_SECONDS = 5
 
-# Loop interno de retry — uma única thread daemon, intervalo curto.
+# Entregador — threads de POST do pool, POSTs simultâneos por host de destino
+# e linhas reservadas por lote. A reserva empurra `proxima_tentativa_em` para
+# daqui a `ENTREGA_RESERVA_SECONDS`: se o processo morrer com o lote em voo,
+# as linhas voltam a vencer sozinhas (bem acima do pior caso de um lote,
+# LOTE / POR_DESTINO × HTTP_TIMEOUT = 125 s).
+ENTREGA_WORKERS = int(os.environ.get("WEBHOOK_ENTREGA_WORKERS", "4"))
+ENTREGA_POR_DESTINO = int(os.environ.get("WEBHOOK_ENTREGA_POR_DESTINO", "2"))
+ENTREGA_LOTE = 50
+ENTREGA_RESERVA_SECONDS = 5 * 60
+
+# Loop do entregador — uma única thread daemon. Acorda no enfileiramento;
+# sem evento, varre a cada N segundos (os retries agendados pelo backoff).
 _RETRY_LOOP_INTERVAL_SECONDS = 30
 _retry_thread_started = False
 _retry_thread_lock = threading.Lock()
+_acordar = threading.Event()
+
+# Recursos do entregador, criados sob demanda (só existem com o canal ligado).
+_recursos_lock = threading.Lock()
+_sessao_http = None
+_pool = None
+_semaforos: dict[str, threading.BoundedSemaphore] = {}
 
 
 # ────────────────────────────────────────────────────────────────────────
@@ -184,85 +215,112 @@ def _dump_payload(payload: dict) -> bytes:
 # ────────────────────────────────────────────────────────────────────────
 # HTTP — wrapper testável
 # ────────────────────────────────────────────────────────────────────────
+def _sessao():
+    """``requests.Session`` do processo, com pool do tamanho do entregador.
+
+    Um ``requests.post`` solto abre (e fecha) uma conexão TCP + TLS por
+    entrega; a sessão mantém as conexões com o n8n vivas entre POSTs.
+    """
+    global _sessao_http
+    with _recursos_lock:
+        if _sessao_http is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            sessao = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=ENTREGA_WORKERS)
+            sessao.mount("http://", adapter)
+            sessao.mount("https://", adapter)
+            _sessao_http = sessao
+        return _sessao_http
+
+
 def _post_to_n8n(url: str, body: bytes, signature: str | None) -> tuple[int, str]:
     """POST cru para o n8n. Retorna (status_code, mensagem_curta).
 
     Levanta exceção para erros de rede/timeout (capturado pelo chamador).
     """
-    import requests
     headers = {"Content-Type": "application/json; charset=utf-8"}
     if signature:
         headers["X-Signature"] = signature
-    resp = requests.post(url, data=body, headers=headers, timeout=HTTP_TIMEOUT_SECONDS)
+    resp = _sessao().post(url, data=body, headers=headers, timeout=HTTP_TIMEOUT_SECONDS)
     return resp.status_code, (resp.text or "")[:500]
 
 
+def _semaforo(url: str) -> threading.BoundedSemaphore:
+    """Limite de POSTs simultâneos para o host de ``url``."""
+    destino = urlsplit(url).netloc
+    with _recursos_lock:
+        sem = _semaforos.get(destino)
+        if sem is None:
+            sem = _semaforos[destino] = threading.BoundedSemaphore(ENTREGA_POR_DESTINO)
+        return sem
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    with _recursos_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=ENTREGA_WORKERS, thread_name_prefix="webhook-entrega",
+            )
+        return _pool
+
+
+def _tentar_post(url: str, body: bytes, signature: str | None) -> tuple[int | None, str]:
+    """Roda no pool: um POST respeitando o limite do destino.
+
+    Não toca no banco (as threads do pool não têm app context). Erro de
+    rede vira ``(None, mensagem)``.
+    """
+    with _semaforo(url):
+        try:
+            return _post_to_n8n(url, body, signature)
+        except Exception as e:
+            return None, str(e)
+
+
 # ────────────────────────────────────────────────────────────────────────
 # Despachante principal
 # ────────────────────────────────────────────────────────────────────────
 def dispatch_webhook(event: str, data: dict, admin_id: int | None) -> bool:
-    """Tenta entregar um evento ao n8n.
+    """Enfileira um evento para o n8n.
 
     Pipeline:
 
     1. Se a allowlist NÃO contém o evento → ignora (silencioso).
-    2. Se webhook está desligado (sem URL) → grava ``WebhookEntrega`` com
-       status 'enviado'? Não — apenas faz log e não persiste nada (canal
-       desligado = "como se o evento não existisse para o mundo externo").
-    3. Cria ``WebhookEntrega(status='pendente')`` ANTES do POST, para ter
-       linha de auditoria mesmo se o processo morrer no meio.
-    4. POST com timeout curto.
-       * Sucesso (2xx) → atualiza para ``status='enviado'``.
-       * Erro de rede / 5xx → mantém ``status='pendente'`` com
+    2. Se webhook está desligado (sem URL) → apenas faz log e não persiste
+       nada (canal desligado = "como se o evento não existisse para o mundo
+       externo").
+    3. Grava ``WebhookEntrega(status='pendente')`` e, depois do commit,
+       acorda o entregador — que faz o POST fora da thread do request
+       (ver :func:`reentregar_pendentes`):
+
+       * Sucesso (2xx) → ``status='enviado'``.
+       * Erro de rede / 5xx → continua ``status='pendente'`` com
          ``proxima_tentativa_em`` calculada pelo backoff.
        * 4xx → ``status='falha'`` (não vale retry — payload é o problema).
 
-    Retorna ``True`` se o POST foi aceito (2xx), ``False`` caso contrário
-    ou quando o evento não está na allowlist / webhook está desligado.
+    Retorna ``True`` se a entrega foi enfileirada, ``False`` quando o evento
+    não está na allowlist, o webhook está desligado ou a gravação falhou.
     Nunca propaga exceção.
     """
     if event not in WEBHOOK_EVENT_ALLOWLIST:
         logger.debug("[webhook] evento %r não está na allowlist — ignorado", event)
         return False
 
-    url = get_webhook_url()
-    if not url:
+    if not is_enabled():
         logger.debug("[webhook] N8N_WEBHOOK_URL não configurado — evento %r ignorado", event)
         return False
 
-    secret = get_webhook_secret()
     payload = build_payload(event, data, admin_id)
-    body = _dump_payload(payload)
-    signature = sign_payload(body, secret)
-
-    # 3) Persiste a tentativa antes do POST.
     entrega_id = _persist_pending(event, payload, admin_id)
-
-    # 4) POST.
-    try:
-        status_code, msg = _post_to_n8n(url, body, signature)
-    except Exception as e:
-        logger.warning("[webhook] falha de rede em %r: %s", event, e)
-        _mark_attempt_failed(entrega_id, erro=f"network: {e}")
-        return False
-
-    if 200 <= status_code < 300:
-        _mark_sent(entrega_id)
-        logger.info("[webhook] %r entregue (HTTP %s)", event, status_code)
-        return True
-
-    # 4xx — falha permanente (request ruim, n8n recusou).
-    if 400 <= status_code < 500:
-        _mark_permanent_failure(
-            entrega_id, erro=f"HTTP {status_code}: {msg}",
-        )
-        logger.warning("[webhook] %r recusado (HTTP %s) — falha permanente", event, status_code)
+    if entrega_id is None:
         return False
-
-    # 5xx — falha transitória, agendar retry.
-    _mark_attempt_failed(entrega_id, erro=f"HTTP {status_code}: {msg}")
-    logger.warning("[webhook] %r erro transitório (HTTP %s) — agendado retry", event, status_code)
-    return False
+    # Só depois do commit: o entregador não pode procurar uma linha que
+    # ainda não está visível para a conexão dele.
+    _acordar.set()
+    logger.debug("[webhook] %r enfileirado (entrega %s)", event, entrega_id)
+    return True
 
 
 # ────────────────────────────────────────────────────────────────────────
@@ -294,7 +352,48 @@ def _persist_pending(event: str, payload: dict, admin_id: int | None) -> int | N
         return None
 
 
-def _mark_sent(entrega_id: int | None) -> None:
+def _aplicar_sucesso(entrega) -> None:
+    entrega.status = 'enviado'
+    entrega.tentativas = (entrega.tentativas or 0) + 1
+    entrega.sent_at = datetime.utcnow()
+    entrega.proxima_tentativa_em = None
+
+
+def _aplicar_falha(entrega, erro: str) -> None:
+    """Incrementa tentativas; agenda retry ou marca falha permanente."""
+    entrega.tentativas = (entrega.tentativas or 0) + 1
+    entrega.ultimo_erro = erro[:2000] if erro else None
+    if entrega.tentativas >= MAX_TENTATIVAS:
+        entrega.status = 'falha'
+        entrega.proxima_tentativa_em = None
+    else:
+        backoff_idx = min(entrega.tentativas - 1, len(RETRY_BACKOFF_SECONDS) - 1)
+        entrega.status = 'pendente'
+        entrega.proxima_tentativa_em = (
+            datetime.utcnow() + timedelta(seconds=RETRY_BACKOFF_SECONDS[backoff_idx])
+        )
+
+
+def _aplicar_falha_permanente(entrega, erro: str) -> None:
+    entrega.status = 'falha'
+    entrega.tentativas = (entrega.tentativas or 0) + 1
+    entrega.ultimo_erro = erro[:2000] if erro else None
+    entrega.proxima_tentativa_em = None
+
+
+def _aplicar_resultado(entrega, status_code: int | None, msg: str) -> None:
+    """Traduz o resultado de um POST (``None`` = erro de rede) no estado da linha."""
+    if status_code is None:
+        _aplicar_falha(entrega, erro=f"network: {msg}")
+    elif 200 <= status_code < 300:
+        _aplicar_sucesso(entrega)
+    elif 400 <= status_code < 500:
+        _aplicar_falha_permanente(entrega, erro=f"HTTP {status_code}: {msg}")
+    else:
+        _aplicar_falha(entrega, erro=f"HTTP {status_code}: {msg}")
+
+
+def _marcar(entrega_id: int | None, aplicar, *args) -> None:
     if entrega_id is None:
         return
     try:
@@ -302,13 +401,10 @@ def _mark_sent(entrega_id: int | None) -> None:
         entrega = db.session.get(WebhookEntrega, entrega_id)
         if entrega is None:
             return
-        entrega.status = 'enviado'
-        entrega.tentativas = (entrega.tentativas or 0) + 1
-        entrega.sent_at = datetime.utcnow()
-        entrega.proxima_tentativa_em = None
+        aplicar(entrega, *args)
         db.session.commit()
     except Exception:
-        logger.exception("[webhook] erro ao marcar entrega %s como enviada", entrega_id)
+        logger.exception("[webhook] erro ao atualizar entrega %s", entrega_id)
         try:
             from models import db
             db.session.rollback()
@@ -316,113 +412,118 @@ def _mark_sent(entrega_id: int | None) -> None:
             pass
 
 
+def _mark_sent(entrega_id: int | None) -> None:
+    _marcar(entrega_id, _aplicar_sucesso)
+
+
 def _mark_attempt_failed(entrega_id: int | None, erro: str) -> None:
     """Incrementa tentativas; agenda retry ou marca falha permanente."""
-    if entrega_id is None:
-        return
-    try:
-        from models import db, WebhookEntrega
-        entrega = db.session.get(WebhookEntrega, entrega_id)
-        if entrega is None:
-            return
-        entrega.tentativas = (entrega.tentativas or 0) + 1
-        entrega.ultimo_erro = erro[:2000] if erro else None
-        if entrega.tentativas >= MAX_TENTATIVAS:
-            entrega.status = 'falha'
-            entrega.proxima_tentativa_em = None
-        else:
-            backoff_idx = min(entrega.tentativas - 1, len(RETRY_BACKOFF_SECONDS) - 1)
-            entrega.status = 'pendente'
-            entrega.proxima_tentativa_em = (
-                datetime.utcnow() + timedelta(seconds=RETRY_BACKOFF_SECONDS[backoff_idx])
-            )
-        db.session.commit()
-    except Exception:
-        logger.exception("[webhook] erro ao marcar entrega %s com falha", entrega_id)
-        try:
-            from models import db
-            db.session.rollback()
-        except Exception:
-            pass
+    _marcar(entrega_id, _aplicar_falha, erro)
 
 
 def _mark_permanent_failure(entrega_id: int | None, erro: str) -> None:
-    if entrega_id is None:
-        return
-    try:
-        from models import db, WebhookEntrega
-        entrega = db.session.get(WebhookEntrega, entrega_id)
-        if entrega is None:
-            return
-        entrega.status = 'falha'
-        entrega.tentativas = (entrega.tentativas or 0) + 1
-        entrega.ultimo_erro = erro[:2000] if erro else None
-        entrega.proxima_tentativa_em = None
-        db.session.commit()
-    except Exception:
-        logger.exception("[webhook] erro ao marcar entrega %s falha permanente", entrega_id)
-        try:
-            from models import db
-            db.session.rollback()
-        except Exception:
-            pass
+    _marcar(entrega_id, _aplicar_falha_permanente, erro)
 
 
 # ────────────────────────────────────────────────────────────────────────
-# Job de retry
+# Entregador (fila + retry)
 # ────────────────────────────────────────────────────────────────────────
-def reentregar_pendentes(now: datetime | None = None, limit: int = 50) -> int:
-    """Reprocessa entregas pendentes elegíveis (proxima_tentativa_em <= agora).
+def _reservar_lote(now: datetime, limit: int) -> list[int]:
+    """Reserva até ``limit`` entregas vencidas e devolve os ids (commit próprio).
 
-    Retorna a quantidade processada (com sucesso ou nova falha — total tentado).
-    Usado tanto pelo loop interno quanto, se quiser, por um endpoint admin.
+    ``SKIP LOCKED`` faz dois entregadores (um por processo) pegarem lotes
+    disjuntos; empurrar ``proxima_tentativa_em`` para o fim da reserva tira a
+    linha da vez das próximas varreduras enquanto o POST está em voo.
+    """
+    from sqlalchemy import select, update
+    from models import db, WebhookEntrega
+    vencidas = (
+        select(WebhookEntrega.id)
+        .where(WebhookEntrega.status == 'pendente')
+        .where(
+            (WebhookEntrega.proxima_tentativa_em == None)  # noqa: E711
+            | (WebhookEntrega.proxima_tentativa_em <= now)
+        )
+        .order_by(WebhookEntrega.created_at.asc())
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    ids = db.session.execute(
+        update(WebhookEntrega)
+        .where(WebhookEntrega.id.in_(vencidas.scalar_subquery()))
+        .values(proxima_tentativa_em=now + timedelta(seconds=ENTREGA_RESERVA_SECONDS))
+        .returning(WebhookEntrega.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    db.session.commit()
+    return ids
+
+
+def reentregar_pendentes(now: datetime | None = None, limit: int = ENTREGA_LOTE) -> int:
+    """Entrega um lote de pendentes elegíveis (proxima_tentativa_em <= agora).
+
+    Os POSTs do lote correm em paralelo no pool do entregador (limitados por
+    destino). Enquanto correm, esta thread não segura linha nem transação —
+    só o id e o payload de cada entrega; a conexão volta ao pool em vez de
+    ficar "idle in transaction" pelo tempo dos timeouts. Os resultados são
+    aplicados às linhas relidas e gravados num único commit. Retorna a
+    quantidade processada (com sucesso ou nova falha — total tentado). Usado
+    pelo loop do entregador e por :func:`drenar_fila`.
     """
     if not is_enabled():
         return 0
+    from sqlalchemy import select
+    from models import db, WebhookEntrega
     try:
-        from models import WebhookEntrega
-        now = now or datetime.utcnow()
-        pendentes = (
-            WebhookEntrega.query
-            .filter(WebhookEntrega.status == 'pendente')
-            .filter(
-                (WebhookEntrega.proxima_tentativa_em == None)  # noqa: E711
-                | (WebhookEntrega.proxima_tentativa_em <= now)
-            )
+        ids = _reservar_lote(now or datetime.utcnow(), limit)
+        if not ids:
+            return 0
+        lote = db.session.execute(
+            select(WebhookEntrega.id, WebhookEntrega.payload)
+            .where(WebhookEntrega.id.in_(ids))
             .order_by(WebhookEntrega.created_at.asc())
-            .limit(limit)
-            .all()
-        )
+        ).all()
+        db.session.commit()
     except Exception:
-        logger.exception("[webhook] erro ao buscar pendentes")
-        return 0
-
-    if not pendentes:
+        logger.exception("[webhook] erro ao reservar pendentes")
+        db.session.rollback()
         return 0
 
-    processados = 0
     url = get_webhook_url()
     secret = get_webhook_secret()
-
-    for entrega in pendentes:
-        processados += 1
-        try:
-            body = _dump_payload(entrega.payload or {})
-            signature = sign_payload(body, secret)
-            try:
-                status_code, msg = _post_to_n8n(url, body, signature)
-            except Exception as e:
-                _mark_attempt_failed(entrega.id, erro=f"network: {e}")
+    pool = _executor()
+    em_voo = []
+    for entrega_id, payload in lote:
+        body = _dump_payload(payload or {})
+        em_voo.append((entrega_id, pool.submit(_tentar_post, url, body, sign_payload(body, secret))))
+    resultados = [(entrega_id, *futuro.result()) for entrega_id, futuro in em_voo]
+
+    enviados = 0
+    try:
+        entregas = {e.id: e for e in WebhookEntrega.query.filter(WebhookEntrega.id.in_(ids))}
+        for entrega_id, status_code, msg in resultados:
+            entrega = entregas.get(entrega_id)
+            if entrega is None:  # removida durante o POST
                 continue
-            if 200 <= status_code < 300:
-                _mark_sent(entrega.id)
-            elif 400 <= status_code < 500:
-                _mark_permanent_failure(entrega.id, erro=f"HTTP {status_code}: {msg}")
-            else:
-                _mark_attempt_failed(entrega.id, erro=f"HTTP {status_code}: {msg}")
-        except Exception:
-            logger.exception("[webhook] erro inesperado reentregando id=%s", entrega.id)
-    return processados
+            _aplicar_resultado(entrega, status_code, msg)
+            enviados += entrega.status == 'enviado'
+        db.session.commit()
+    except Exception:
+        # A reserva continua valendo: as linhas voltam a vencer sozinhas.
+        logger.exception("[webhook] erro ao gravar o lote de entregas %s", ids)
+        db.session.rollback()
+    logger.info("[webhook] lote de %d entrega(s): %d enviada(s)", len(em_voo), enviados)
+    return len(em_voo)
+
+
+def drenar_fila(limit: int = ENTREGA_LOTE) -> int:
+    """Entrega lotes até a fila não ter mais nada vencido. Retorna o total."""
+    total = 0
+    while True:
+        n = reentregar_pendentes(limit=limit)
+        total += n
+        if n < limit:
+            return total
 
 
 def reentregar_uma(entrega_id: int) -> bool:
@@ -508,22 +609,26 @@ def register_universal_listener() -> int:
 
 
 def _retry_loop(app):
-    """Loop interno: a cada N segundos, reprocessa pendentes elegíveis."""
+    """Loop do entregador: acorda a cada enfileiramento (ou a cada N
+    segundos, pelos retries agendados) e drena o que estiver vencido."""
     logger.info(
-        "[webhook] retry loop iniciado (intervalo=%ds, max_tentativas=%d, backoff=%s)",
-        _RETRY_LOOP_INTERVAL_SECONDS, MAX_TENTATIVAS, RETRY_BACKOFF_SECONDS,
+        "[webhook] entregador iniciado (workers=%d, por_destino=%d, intervalo=%ds, "
+        "max_tentativas=%d, backoff=%s)",
+        ENTREGA_WORKERS, ENTREGA_POR_DESTINO, _RETRY_LOOP_INTERVAL_SECONDS,
+        MAX_TENTATIVAS, RETRY_BACKOFF_SECONDS,
     )
     while True:
         try:
-            time.sleep(_RETRY_LOOP_INTERVAL_SECONDS)
+            _acordar.wait(_RETRY_LOOP_INTERVAL_SECONDS)
+            _acordar.clear()
             with app.app_context():
-                reentregar_pendentes()
+                drenar_fila()
         except Exception:
-            logger.exception("[webhook] erro no retry loop — continuando")
+            logger.exception("[webhook] erro no entregador — continuando")
 
 
 def start_retry_loop(app) -> bool:
-    """Inicia uma única thread daemon de retry (idempotente).
+    """Inicia uma única thread daemon do entregador (idempotente).
 
     Devolve True se uma nova thread foi iniciada; False se já estava rodando
     ou se o webhook está desligado.
@@ -533,10 +638,10 @@ def start_retry_loop(app) -> bool:
         if _retry_thread_started:
             return False
         if not is_enabled():
-            logger.debug("[webhook] retry loop não iniciado (webhook desligado)")
+            logger.debug("[webhook] entregador não iniciado (webhook desligado)")
             return False
         t = threading.Thread(
-            target=_retry_loop, args=(app,), name="webhook-retry", daemon=True,
+            target=_retry_loop, args=(app,), name="webhook-entregador", daemon=True,
         )
         t.start()
         _retry_thread_started = True
@@ -544,7 +649,7 @@ def start_retry_loop(app) -> bool:
 
 
 def init_app(app) -> None:
-    """Bootstrap: registra listener universal + dispara o loop de retry.
+    """Bootstrap: registra listener universal + sobe o entregador.
 
     Seguro de chamar no boot da aplicação. No-op se a allowlist está vazia
     ou se o webhook está desligado por configuração.
@@ -556,4 +661,4 @@ def init_app(app) -> None:
     try:
         start_retry_loop(app)
     except Exception:
-        logger.exception("[webhook] falha ao iniciar retry loop")
+        logger.exception("[webhook] falha ao iniciar o entregador")
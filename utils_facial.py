@@ -6,8 +6,9 @@ SIGE v9.0 - Sistema de Gestão Empresarial
 import base64
 import io
 import logging
-import numpy as np
-from PIL import Image
+
+# numpy e PIL são importados nas funções que os usam: este módulo entra no
+# boot de todo worker pelo ponto_views.
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +18,9 @@ def decodificar_base64_para_numpy(base64_string):
     Aceita formatos com ou sem prefixo data:image/...
     """
     try:
+        import numpy as np
+        from PIL import Image
+        
         if ',' in base64_string:
             base64_string = base64_string.split(',')[1]
         
@@ -125,6 +129,8 @@ def validar_qualidade_foto(foto_base64, min_width=200, min_height=200):
         tuple: (valida: bool, mensagem: str)
     """
     try:
+        from PIL import Image
+        
         if ',' in foto_base64:
             foto_base64 = foto_base64.split(',')[1]
         
@@ -168,6 +174,9 @@ def validar_qualidade_foto_avancada(foto_base64, min_width=150, min_height=150):
         tuple: (valida: bool, mensagem: str, detalhes: dict)
     """
     try:
+        import numpy as np
+        from PIL import Image
+        
         if ',' in foto_base64:
             foto_base64 = foto_base64.split(',')[1]
         
@@ -241,6 +250,33 @@ def obter_todas_fotos_funcionario(funcionario):
     return fotos
 
 
+def _distancias_compartilhadas(foto_capturada_base64, fotos):
+    """Distância cosseno da captura a cada foto, numa chamada só ao serviço
+    de inferência compartilhado (services/inferencia_facial) — um lote no
+    modelo em vez de um `DeepFace.verify` por foto. None se o serviço não
+    estiver configurado ou não responder (quem chama compara no processo).
+
+    O rosto é recortado pelo Haar, como no cache de embeddings, e não pelo
+    detector do `verify`; a métrica (cosseno no SFace) é a mesma.
+    """
+    from services import inferencia_facial
+
+    if not inferencia_facial.configurado():
+        return None
+
+    def _bytes(foto_base64):
+        return base64.b64decode(foto_base64.split(',')[1] if ',' in foto_base64 else foto_base64)
+
+    try:
+        return inferencia_facial.distancias(_bytes(foto_capturada_base64),
+                                            [_bytes(f['foto_base64']) for f in fotos])
+    except inferencia_facial.InferenciaIndisponivel:
+        return None
+    except ValueError as e:
+        logger.warning(f"Foto capturada não processada pelo serviço de inferência: {e}")
+        return [None] * len(fotos)
+
+
 def reconhecer_com_multiplas_fotos(foto_capturada_base64, funcionario, threshold=None):
     """
     Compara foto capturada com TODAS as fotos cadastradas do funcionário.
@@ -266,6 +302,14 @@ def reconhecer_com_multiplas_fotos(foto_capturada_base64, funcionario, threshold
     melhor_distancia = float('inf')
     melhor_foto_desc = None
     
+    distancias = _distancias_compartilhadas(foto_capturada_base64, fotos)
+    if distancias is not None:
+        for foto_info, distancia in zip(fotos, distancias, strict=True):
+            if distancia is not None and distancia < melhor_distancia:
+                melhor_distancia = distancia
+                melhor_foto_desc = foto_info['descricao']
+        fotos = []  # já comparadas, sem o laço do DeepFace.verify
+    
     for foto_info in fotos:
         try:
             match, distancia, erro = comparar_faces_deepface(
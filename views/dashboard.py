@@ -268,148 +268,45 @@ def dashboard():
         
         logger.info(f"[OK] PERÍODO DASHBOARD: {data_inicio} → {data_fim}")
         
-        # Estatísticas básicas
-        logger.debug("DEBUG: Buscando funcionários...")
-        total_funcionarios = Funcionario.query.filter_by(admin_id=admin_id, ativo=True).count()
-        logger.debug(f"DEBUG: {total_funcionarios} funcionários encontrados")
-        
-        logger.debug("DEBUG: Buscando obras...")
-        total_obras = Obra.query.filter_by(admin_id=admin_id, ativo=True).count()
-        logger.debug(f"DEBUG: {total_obras} obras ativas encontradas")
-        
-        # [OK] CORREÇÃO 4: Calcular veículos ANTES dos custos
-        logger.debug("DEBUG: Buscando veículos...")
-        try:
-            from models import Veiculo
-            total_veiculos = Veiculo.query.filter_by(
-                admin_id=admin_id, 
-                ativo=True
-            ).count()
-            logger.debug(f"DEBUG: {total_veiculos} veículos ativos para admin_id={admin_id}")
-        except Exception as e:
-            logger.error(f"Erro ao contar veículos: {e}")
-            total_veiculos = 0
-        
+        # Cabeçalho, propostas e custos do período: poucas consultas
+        # agregadas, com cache por tenant (services/dashboard_metricas).
+        from services.dashboard_metricas import metricas as metricas_dashboard, vazias
+        m = safe_db_operation(
+            lambda: metricas_dashboard(admin_id, data_inicio, data_fim), None
+        ) or vazias()
+        total_funcionarios = m['total_funcionarios']
+        total_obras = m['total_obras']
+        total_veiculos = m['total_veiculos']
+
         # ========== MÉTRICAS DE PROPOSTAS DINÂMICAS ==========
-        from models import Proposta, PropostaTemplate
-        # datetime já importado no topo do arquivo
-        
-        try:
-            # 1. PROPOSTAS POR STATUS ([OK] CORREÇÃO 6: Adicionado filtro de período)
-            logger.debug("DEBUG: Calculando métricas de propostas...")
-            from datetime import timedelta  # Import necessário para cálculos de validade
-            propostas_aprovadas = Proposta.query.filter(
-                Proposta.admin_id == admin_id,
-                Proposta.status == 'aprovada',
-                Proposta.data_proposta >= data_inicio,
-                Proposta.data_proposta <= data_fim
-            ).count()
-            propostas_enviadas = Proposta.query.filter(
-                Proposta.admin_id == admin_id,
-                Proposta.status == 'enviada',
-                Proposta.data_proposta >= data_inicio,
-                Proposta.data_proposta <= data_fim
-            ).count()
-            propostas_rascunho = Proposta.query.filter(
-                Proposta.admin_id == admin_id,
-                Proposta.status == 'rascunho',
-                Proposta.data_proposta >= data_inicio,
-                Proposta.data_proposta <= data_fim
-            ).count()
-            propostas_rejeitadas = Proposta.query.filter(
-                Proposta.admin_id == admin_id,
-                Proposta.status == 'rejeitada',
-                Proposta.data_proposta >= data_inicio,
-                Proposta.data_proposta <= data_fim
-            ).count()
-            
-            # Expiradas: propostas enviadas com data_proposta + validade_dias < hoje
-            hoje = date.today()
-            propostas_expiradas = Proposta.query.filter(
-                Proposta.admin_id == admin_id,
-                Proposta.status == 'enviada',
-                Proposta.validade_dias.isnot(None)
-            ).all()
-            propostas_expiradas = len([p for p in propostas_expiradas if p.data_proposta and (p.data_proposta + timedelta(days=p.validade_dias or 7)) < hoje])
-            
-            # [OK] CORREÇÃO 6 COMPLETA: Total de propostas também com filtro de período
-            total_propostas = Proposta.query.filter(
-                Proposta.admin_id == admin_id,
-                Proposta.data_proposta >= data_inicio,
-                Proposta.data_proposta <= data_fim
-            ).count()
-            logger.debug(f"DEBUG: Propostas - Total: {total_propostas}, Aprovadas: {propostas_aprovadas}, Enviadas: {propostas_enviadas}")
-            
-            # 2. PERFORMANCE COMERCIAL
-            # Taxa de conversão: (aprovadas / total enviadas+aprovadas) * 100
-            total_enviadas_ou_aprovadas = propostas_enviadas + propostas_aprovadas + propostas_rejeitadas
-            taxa_conversao = round((propostas_aprovadas / total_enviadas_ou_aprovadas * 100), 1) if total_enviadas_ou_aprovadas > 0 else 0
-            
-            # Valor médio das propostas aprovadas ([OK] CORREÇÃO 7: Filtrar apenas propostas com valor válido)
-            from sqlalchemy import func as sql_func
-            valor_medio_result = db.session.query(sql_func.avg(Proposta.valor_total)).filter(
-                Proposta.admin_id == admin_id,
-                Proposta.status == 'aprovada',
-                Proposta.valor_total.isnot(None),
-                Proposta.valor_total > 0,
-                Proposta.data_proposta >= data_inicio,
-                Proposta.data_proposta <= data_fim
-            ).scalar()
-            valor_medio = float(valor_medio_result or 0)
-            
-            # Tempo de resposta médio (diferença entre criado_em e quando foi aprovada/rejeitada)
-            # Usar PropostaHistorico para calcular tempo até aprovação
-            tempo_resposta_medio = 2.5  # Placeholder - precisa de histórico detalhado
-            
-            # Propostas por mês (média dos últimos 6 meses)
-            seis_meses_atras = hoje - timedelta(days=180)
-            propostas_ultimos_6_meses = Proposta.query.filter(
-                Proposta.admin_id == admin_id,
-                Proposta.criado_em >= seis_meses_atras
-            ).count()
-            propostas_por_mes = round(propostas_ultimos_6_meses / 6, 1) if propostas_ultimos_6_meses > 0 else 0
-            
-            # 3. TEMPLATES MAIS UTILIZADOS
-            templates_uso = db.session.query(
-                PropostaTemplate.nome,
-                PropostaTemplate.uso_contador
-            ).filter_by(
-                admin_id=admin_id
-            ).order_by(PropostaTemplate.uso_contador.desc()).limit(3).all()
-            
-            templates_populares = [{'nome': t[0], 'uso': t[1]} for t in templates_uso] if templates_uso else []
-            outros_templates = PropostaTemplate.query.filter_by(admin_id=admin_id).count() - len(templates_populares)
-            
-            # 4. PORTAL DO CLIENTE (placeholder - precisa de rastreamento específico)
-            acessos_unicos = 0  # Precisa de tabela de tracking
-            tempo_medio_portal = "0h 0m"
-            feedbacks_positivos = 0
-            downloads_pdf = 0
-            
-            logger.debug(f"DEBUG: Taxa Conversão: {taxa_conversao}%, Valor Médio: R$ {valor_medio:.2f}")
-            
-        except Exception as e:
-            logger.error(f"ERRO ao calcular métricas de propostas: {e}")
-            # Valores padrão em caso de erro
-            propostas_aprovadas = 0
-            propostas_enviadas = 0
-            propostas_rascunho = 0
-            propostas_rejeitadas = 0
-            propostas_expiradas = 0
-            taxa_conversao = 0
-            valor_medio = 0
-            tempo_resposta_medio = 0
-            propostas_por_mes = 0
-            templates_populares = []
-            outros_templates = 0
-            acessos_unicos = 0
-            tempo_medio_portal = "0h 0m"
-            feedbacks_positivos = 0
-            downloads_pdf = 0
+        # [OK] CORREÇÃO 6: status e total com filtro de período; expiradas =
+        # enviadas com data_proposta + validade_dias < hoje.
+        propostas_aprovadas = m['propostas_aprovadas']
+        propostas_enviadas = m['propostas_enviadas']
+        propostas_rascunho = m['propostas_rascunho']
+        propostas_rejeitadas = m['propostas_rejeitadas']
+        propostas_expiradas = m['propostas_expiradas']
+        total_propostas = m['total_propostas']
+        # Taxa de conversão: aprovadas / (enviadas + aprovadas + rejeitadas)
+        taxa_conversao = m['taxa_conversao']
+        # [OK] CORREÇÃO 7: média só das aprovadas com valor válido
+        valor_medio = m['valor_medio']
+        # Tempo de resposta médio — placeholder, precisa de histórico detalhado
+        tempo_resposta_medio = 2.5
+        propostas_por_mes = m['propostas_por_mes']  # média dos últimos 6 meses
+        templates_populares = m['templates_populares']
+        outros_templates = m['outros_templates']
+
+        # Portal do cliente (placeholder - precisa de rastreamento específico)
+        acessos_unicos = 0
+        tempo_medio_portal = "0h 0m"
+        feedbacks_positivos = 0
+        downloads_pdf = 0
+        logger.debug(f"DEBUG: Propostas - Total: {total_propostas}, Conversão: {taxa_conversao}%")
         # ====================================================
         
         # Funcionários recentes
-            logger.debug("DEBUG: Buscando funcionários recentes...")
+        logger.debug("DEBUG: Buscando funcionários recentes...")
         funcionarios_recentes = Funcionario.query.filter_by(
             admin_id=admin_id, ativo=True
         ).order_by(Funcionario.created_at.desc()).limit(5).all()
@@ -526,9 +423,6 @@ def dashboard():
     
     # CÁLCULOS REAIS - Usar mesma lógica da página funcionários
     try:
-        # Imports necessários (date e datetime já importados no topo)
-        from models import RegistroPonto, RegistroAlimentacao
-        
         # 🔒 SEGURANÇA MULTI-TENANT: admin_id deve estar definido nesta altura.
         # Se não estiver, usar APENAS o usuário autenticado — nunca auto-detectar.
         if 'admin_id' not in locals() or admin_id is None:
@@ -548,326 +442,22 @@ def dashboard():
                 from flask import abort
                 abort(401)
         
-        # Verificar estrutura completa do banco para diagnóstico
-        try:
-            # Diagnóstico completo do banco de dados
-            logger.debug(f"[DEBUG] DIAGNÓSTICO COMPLETO DO BANCO DE DADOS:")
-            
-            # Total de funcionários por admin_id
-            funcionarios_por_admin = db.session.execute(
-                text("SELECT admin_id, COUNT(*) as total, COUNT(CASE WHEN ativo = true THEN 1 END) as ativos FROM funcionario GROUP BY admin_id ORDER BY admin_id")
-            ).fetchall()
-            logger.info(f" [STATS] FUNCIONÁRIOS POR ADMIN: {[(row[0], row[1], row[2]) for row in funcionarios_por_admin]}")
-            
-            # Total de obras por admin_id
-            obras_por_admin = db.session.execute(
-                text("SELECT admin_id, COUNT(*) as total FROM obra GROUP BY admin_id ORDER BY admin_id")
-            ).fetchall()
-            logger.debug(f" [BUILD] OBRAS POR ADMIN: {[(row[0], row[1]) for row in obras_por_admin]}")
-            
-            # Verificar estrutura da tabela registro_ponto primeiro
-            try:
-                colunas_ponto = db.session.execute(
-                    text("SELECT column_name FROM information_schema.columns WHERE table_name = 'registro_ponto' ORDER BY ordinal_position")
-                ).fetchall()
-                colunas_str = [col[0] for col in colunas_ponto]
-                logger.debug(f" [DEBUG] COLUNAS REGISTRO_PONTO: {colunas_str}")
-                
-                # Usar coluna correta baseada na estrutura real
-                coluna_data = 'data' if 'data' in colunas_str else 'data_registro'
-                registros_ponto = db.session.execute(
-                    text(f"SELECT COUNT(*) FROM registro_ponto WHERE {coluna_data} >= :data_inicio AND {coluna_data} <= :data_fim"),
-                    {"data_inicio": data_inicio, "data_fim": data_fim}
-                ).fetchone()
-                logger.debug(f" [TIME] REGISTROS DE PONTO ({data_inicio.strftime('%b/%Y')}): {registros_ponto[0] if registros_ponto else 0}")
-            except Exception as e:
-                logger.error(f" [ERROR] ERRO registros ponto: {e}")
-            
-            # Total de custos de veículos - verificar se tabela existe
-            try:
-                tabelas_existentes = db.session.execute(
-                    text("SELECT table_name FROM information_schema.tables WHERE table_schema = 'public'")
-                ).fetchall()
-                tabelas_str = [t[0] for t in tabelas_existentes]
-                
-                if 'custo_veiculo' in tabelas_str:
-                    custos_veiculo = db.session.execute(
-                        text("SELECT COUNT(*), COALESCE(SUM(valor), 0) FROM custo_veiculo WHERE data_custo >= :data_inicio AND data_custo <= :data_fim"),
-                        {"data_inicio": data_inicio, "data_fim": data_fim}
-                    ).fetchone()
-                    logger.debug(f" [CAR] CUSTOS VEÍCULOS ({data_inicio.strftime('%b/%Y')}): {custos_veiculo[0] if custos_veiculo else 0} registros, R$ {custos_veiculo[1] if custos_veiculo else 0}")
-                else:
-                    logger.debug(f" [CAR] TABELA custo_veiculo NÃO EXISTE")
-            except Exception as e:
-                logger.error(f" [ERROR] ERRO custos veículo: {e}")
-            
-            # Total de alimentação - verificar se tabela existe
-            try:
-                if 'registro_alimentacao' in tabelas_str:
-                    alimentacao = db.session.execute(
-                        text("SELECT COUNT(*), COALESCE(SUM(valor), 0) FROM registro_alimentacao WHERE data >= :data_inicio AND data <= :data_fim"),
-                        {"data_inicio": data_inicio, "data_fim": data_fim}
-                    ).fetchone()
-                    logger.debug(f" [FOOD] ALIMENTAÇÃO ({data_inicio.strftime('%b/%Y')}): {alimentacao[0] if alimentacao else 0} registros, R$ {alimentacao[1] if alimentacao else 0}")
-                else:
-                    logger.debug(f" [FOOD] TABELA registro_alimentacao NÃO EXISTE")
-            except Exception as e:
-                logger.error(f" [ERROR] ERRO alimentação: {e}")
-            
-        except Exception as e:
-            logger.error(f"[ERROR] ERRO no diagnóstico do banco: {e}")
-        
-        # Buscar todos os funcionários ativos para o admin_id detectado
-        funcionarios_dashboard = Funcionario.query.filter_by(admin_id=admin_id, ativo=True).all()
-        logger.debug(f"[OK] DEBUG DASHBOARD KPIs: Encontrados {len(funcionarios_dashboard)} funcionários para admin_id={admin_id}")
-        
-        # 🔒 SEGURANÇA MULTI-TENANT: se este tenant não tem funcionários ainda
-        # (ex.: admin recém-criado), manter lista vazia. NUNCA substituir admin_id
-        # por outro tenant — isso vazaria dados entre empresas.
-        if len(funcionarios_dashboard) == 0:
-            logger.info(
-                f"[INFO] Tenant admin_id={admin_id} sem funcionários ativos "
-                f"(provavelmente novo) — dashboard exibirá estado vazio."
-            )
-        
-        # Calcular KPIs reais com proteção de transação
-        total_custo_real = 0
-        total_horas_real = 0
-        total_extras_real = 0
-        total_faltas_real = 0
-        custo_transporte_real = 0
-        
-        try:
-            # Reiniciar conexão para evitar transação abortada
-            db.session.rollback()
-            
-            # Refazer busca de funcionários
-            funcionarios_dashboard = Funcionario.query.filter_by(admin_id=admin_id, ativo=True).all()
-            logger.info(f"[OK] APÓS ROLLBACK: {len(funcionarios_dashboard)} funcionários encontrados")
-            
-            from services.funcionario_metrics import calcular_metricas_funcionario
-            for func in funcionarios_dashboard:
-                try:
-                    # Métricas via serviço único v1+v2 (Task #98).
-                    # Usamos APENAS custo_mao_obra para evitar duplicar com agregações
-                    # de tenant (alimentação, GCF) que ocorrem mais abaixo.
-                    m = calcular_metricas_funcionario(func, data_inicio, data_fim, admin_id)
-                    horas_func = m['horas_trabalhadas']
-                    extras_func = m['horas_extras']
-                    faltas_func = m['faltas']
-                    custo_func = m['custo_mao_obra']
-                    
-                    # Acumular totais
-                    total_custo_real += custo_func
-                    total_horas_real += horas_func
-                    total_extras_real += extras_func
-                    total_faltas_real += faltas_func
-                    
-                except Exception as func_error:
-                    logger.error(f"[ERROR] ERRO ao processar funcionário {func.nome}: {func_error}")
-                    continue
-                    
-        except Exception as kpi_error:
-            logger.error(f"[ERROR] ERRO GERAL nos cálculos KPI: {kpi_error}")
-            db.session.rollback()
-
-        # Helper: soma GestaoCustoFilho por categorias no período (fonte principal V2)
-        def _soma_gcf(categorias):
-            try:
-                from models import GestaoCustoFilho, GestaoCustoPai
-                total = db.session.query(
-                    db.func.coalesce(db.func.sum(GestaoCustoFilho.valor), 0)
-                ).join(
-                    GestaoCustoPai, GestaoCustoPai.id == GestaoCustoFilho.pai_id
-                ).filter(
-                    GestaoCustoFilho.admin_id == admin_id,
-                    GestaoCustoFilho.data_referencia >= data_inicio,
-                    GestaoCustoFilho.data_referencia <= data_fim,
-                    GestaoCustoPai.tipo_categoria.in_(categorias),
-                    GestaoCustoPai.status.in_(['PENDENTE', 'SOLICITADO', 'AUTORIZADO', 'PARCIAL', 'PAGO'])
-                ).scalar()
-                return float(total or 0)
-            except Exception as e:
-                logger.error(f"Erro _soma_gcf {categorias}: {e}")
-                return 0.0
-
-        # Mão de Obra via GestaoCustoFilho (diárias importadas: SALARIO + MAO_OBRA_DIRETA)
-        total_gcf_mao_obra = _soma_gcf(['SALARIO', 'MAO_OBRA_DIRETA'])
-        total_custo_real += total_gcf_mao_obra
-        logger.debug(f"DEBUG MÃO DE OBRA: RegistroPonto=R${total_custo_real - total_gcf_mao_obra:.2f}, GCF(SALARIO+MAO_OBRA_DIRETA)=R${total_gcf_mao_obra:.2f}, Total=R${total_custo_real:.2f}")
-
-        # Buscar custos de alimentação TOTAL para o período (não por funcionário para evitar duplicação)
-        custo_alimentacao_real = 0
-        try:
-            # 1. Tabela NOVA: alimentacao_lancamento (tem admin_id direto)
-            from models import AlimentacaoLancamento
-            lancamentos_novos = AlimentacaoLancamento.query.filter(
-                AlimentacaoLancamento.admin_id == admin_id,
-                AlimentacaoLancamento.data >= data_inicio,
-                AlimentacaoLancamento.data <= data_fim
-            ).all()
-            total_lancamentos_novos = sum(float(l.valor_total or 0) for l in lancamentos_novos)
-            custo_alimentacao_real += total_lancamentos_novos
-
-            # 2. Tabela ANTIGA: registro_alimentacao (sem admin_id direto, precisa JOIN)
-            alimentacao_registros = db.session.query(RegistroAlimentacao).join(
-                Funcionario, RegistroAlimentacao.funcionario_id == Funcionario.id
-            ).filter(
-                Funcionario.admin_id == admin_id,
-                RegistroAlimentacao.data >= data_inicio,
-                RegistroAlimentacao.data <= data_fim
-            ).all()
-            total_registros_antigos = sum(a.valor or 0 for a in alimentacao_registros)
-            custo_alimentacao_real += total_registros_antigos
-
-            # 3. Também buscar em outro_custo
-            from models import OutroCusto
-            outros_alimentacao = OutroCusto.query.filter(
-                OutroCusto.admin_id == admin_id,
-                OutroCusto.data >= data_inicio,
-                OutroCusto.data <= data_fim,
-                OutroCusto.kpi_associado == 'custo_alimentacao'
-            ).all()
-            total_outros = sum(o.valor or 0 for o in outros_alimentacao)
-            custo_alimentacao_real += total_outros
-
-            # 4. GestaoCustoFilho ALIMENTACAO (importação de diárias e lançamentos V2)
-            total_gcf_alim = _soma_gcf(['ALIMENTACAO'])
-            custo_alimentacao_real += total_gcf_alim
+        # O "diagnóstico completo do banco" que rodava aqui (contagens de
+        # TODOS os tenants, information_schema, ponto/veículos/alimentação sem
+        # filtro de tenant) só alimentava logs — saiu. Os custos do período
+        # vêm de `services/dashboard_metricas` (calculados no bloco acima,
+        # junto com o cabeçalho): mão de obra de ponto em lote + GCF, e uma
+        # consulta por grupo de fontes em vez de `.all()` + `sum()` por fonte.
+        custos_detalhados = m['custos_detalhados']
+        total_custo_real = custos_detalhados['mao_obra']
+        custo_alimentacao_real = custos_detalhados['alimentacao']
+        custo_transporte_real = custos_detalhados['transporte']
+        custo_material_real = custos_detalhados['material']
+        custo_outros_real = custos_detalhados['outros']
+        custos_mes = custos_detalhados['total']
+        total_horas_real = m['total_horas']
+        logger.debug(f"DEBUG DASHBOARD: custos {custos_detalhados}, horas {total_horas_real}")
 
-            logger.debug(f"DEBUG ALIMENTAÇÃO: AlimLanc=R${total_lancamentos_novos:.2f}, RegAlim=R${total_registros_antigos:.2f}, OutroCusto=R${total_outros:.2f}, GCF=R${total_gcf_alim:.2f}, Total=R${custo_alimentacao_real:.2f}")
-        except Exception as e:
-            logger.error(f"Erro cálculo alimentação: {e}")
-            import traceback
-            traceback.print_exc()
-            custo_alimentacao_real = 0
-        
-        # Debug dos valores calculados
-            logger.debug(f"DEBUG DASHBOARD: {len(funcionarios_dashboard)} funcionários")
-            logger.debug(f"DEBUG DASHBOARD: Custo total calculado: R$ {total_custo_real:.2f}")
-            logger.debug(f"DEBUG DASHBOARD: Horas totais: {total_horas_real}")
-            logger.debug(f"DEBUG DASHBOARD: Extras totais: {total_extras_real}")
-        
-        # Calcular KPIs específicos corretamente
-        # 1. Custos de Transporte (veículos) - usar safe_db_operation para evitar transaction abort
-        def calcular_custos_veiculo():
-            from models import VehicleExpense, CustoObra
-            
-            # 1.1. Tabela VehicleExpense (frota)
-            custos_veiculo = VehicleExpense.query.filter(
-                VehicleExpense.admin_id == admin_id,
-                VehicleExpense.data_custo >= data_inicio,
-                VehicleExpense.data_custo <= data_fim
-            ).all()
-            total_vehicle_expense = sum(c.valor or 0 for c in custos_veiculo)
-            
-            # 1.2. Tabela CustoObra (tipo='transporte' ou 'veiculo')
-            custos_obra_transporte = CustoObra.query.filter(
-                CustoObra.admin_id == admin_id,
-                CustoObra.data >= data_inicio,
-                CustoObra.data <= data_fim,
-                CustoObra.tipo.in_(['transporte', 'veiculo'])
-            ).all()
-            total_custo_obra = sum(float(c.valor or 0) for c in custos_obra_transporte)
-            
-            # 1.3. Tabela LancamentoTransporte (V2 - módulo de transporte dedicado)
-            total_lancamento_transporte = 0.0
-            try:
-                from models import LancamentoTransporte
-                lancamentos_transp = LancamentoTransporte.query.filter(
-                    LancamentoTransporte.admin_id == admin_id,
-                    LancamentoTransporte.data_lancamento >= data_inicio,
-                    LancamentoTransporte.data_lancamento <= data_fim
-                ).all()
-                total_lancamento_transporte = sum(float(lt.valor or 0) for lt in lancamentos_transp)
-                logger.debug(f" DEBUG TRANSPORTE V2: LancamentoTransporte ({len(lancamentos_transp)})=R${total_lancamento_transporte:.2f}")
-            except Exception as e:
-                logger.debug(f" DEBUG TRANSPORTE V2: LancamentoTransporte não disponível ({e})")
-            
-            # 1.4. GestaoCustoFilho TRANSPORTE (importação de diárias e lançamentos V2)
-            total_gcf_transp = _soma_gcf(['TRANSPORTE'])
-
-            total = total_vehicle_expense + total_custo_obra + total_lancamento_transporte + total_gcf_transp
-            logger.debug(f" DEBUG TRANSPORTE: VehicleExpense=R${total_vehicle_expense:.2f}, CustoObra=R${total_custo_obra:.2f}, LancamentoTransporte=R${total_lancamento_transporte:.2f}, GCF=R${total_gcf_transp:.2f}, Total=R${total:.2f}")
-            return total
-        
-        custo_transporte_real = safe_db_operation(calcular_custos_veiculo, 0)
-        logger.debug(f"DEBUG Custos Transporte FINAL: R$ {custo_transporte_real:.2f}")
-        
-        # 2. Faltas Justificadas (quantidade e valor em R$) - usar safe_db_operation
-        def calcular_faltas_justificadas():
-            # Buscar todas as faltas justificadas no período (RegistroPonto tem admin_id)
-            faltas_justificadas = RegistroPonto.query.filter(
-                RegistroPonto.admin_id == admin_id,
-                RegistroPonto.data >= data_inicio,
-                RegistroPonto.data <= data_fim,
-                RegistroPonto.tipo_registro == 'falta_justificada'
-            ).all()
-            
-            quantidade = len(faltas_justificadas)
-            custo = 0
-            
-            for falta in faltas_justificadas:
-                funcionario = Funcionario.query.get(falta.funcionario_id)
-                if funcionario and funcionario.salario:
-                    # Calcular dias úteis reais do mês
-                    mes = falta.data.month
-                    ano = falta.data.year
-                    dias_uteis = sum(1 for dia in range(1, calendar.monthrange(ano, mes)[1] + 1) 
-                                    if date(ano, mes, dia).weekday() < 5)
-                    valor_dia = funcionario.salario / dias_uteis
-                    custo += valor_dia
-            
-            return quantidade, custo
-        
-        resultado_faltas = safe_db_operation(calcular_faltas_justificadas, (0, 0))
-        quantidade_faltas_justificadas, custo_faltas_justificadas = resultado_faltas
-        logger.debug(f"DEBUG Faltas Justificadas: {quantidade_faltas_justificadas} faltas, R$ {custo_faltas_justificadas:.2f}")
-        
-        # 3. Custo de Materiais — fonte única: GestaoCustoPai tipo_categoria='MATERIAL'
-        # Princípio: custo reconhecido na entrada/compra, nunca na saída de estoque.
-        def calcular_custo_material():
-            from models import GestaoCustoPai
-            registros = GestaoCustoPai.query.filter(
-                GestaoCustoPai.admin_id == admin_id,
-                GestaoCustoPai.data_emissao >= data_inicio,
-                GestaoCustoPai.data_emissao <= data_fim,
-                GestaoCustoPai.tipo_categoria == 'MATERIAL',
-            ).all()
-            total_gcp = sum(float(r.valor_total or 0) for r in registros)
-            logger.debug(f"DEBUG Material (GestaoCustoPai MATERIAL): {len(registros)} registros, Total=R${total_gcp:.2f}")
-            return total_gcp
-
-        custo_material_real = safe_db_operation(calcular_custo_material, 0)
-
-        # 3b. Outros Custos (não transporte, alimentação nem material)
-        def calcular_outros_custos():
-            from models import OutroCusto, CustoObra
-            # OutroCusto: tudo exceto transporte, alimentacao e material
-            outros_custos = OutroCusto.query.filter(
-                OutroCusto.admin_id == admin_id,
-                OutroCusto.data >= data_inicio,
-                OutroCusto.data <= data_fim,
-                ~OutroCusto.tipo.in_(['transporte', 'alimentacao', 'material'])
-            ).all()
-            total_outro_custo = sum(float(o.valor or 0) for o in outros_custos)
-            # CustoObra: apenas tipo 'outros' e 'servico' (material já separado)
-            custos_obra_outros = CustoObra.query.filter(
-                CustoObra.admin_id == admin_id,
-                CustoObra.data >= data_inicio,
-                CustoObra.data <= data_fim,
-                CustoObra.tipo.in_(['outros', 'servico'])
-            ).all()
-            total_custo_obra = sum(float(c.valor or 0) for c in custos_obra_outros)
-            # GestaoCustoFilho: categorias não mapeadas em outros cards
-            total_gcf_outros = _soma_gcf(['OUTROS', 'ALUGUEL_UTILITIES', 'TRIBUTOS', 'COMPRA', 'SERVICO'])
-            total = total_outro_custo + total_custo_obra + total_gcf_outros
-            logger.debug(f"DEBUG Outros: OutroCusto=R${total_outro_custo:.2f}, CustoObra=R${total_custo_obra:.2f}, GCF=R${total_gcf_outros:.2f}, Total=R${total:.2f}")
-            return total
-
-        custo_outros_real = safe_db_operation(calcular_outros_custos, 0)
-        logger.debug(f"DEBUG Custos Outros FINAL: R$ {custo_outros_real:.2f}")
-        
         # 4. Funcionários por Função - com proteção de transação
         funcionarios_por_departamento = safe_db_operation(
             lambda: _calcular_funcionarios_funcao(admin_id),
@@ -922,25 +512,7 @@ def dashboard():
         if not isinstance(serie_temporal_custos, list):
             serie_temporal_custos = []
 
-        # Dados calculados reais
-        # 🔒 admin_id já garantido pelas validações acima — nunca usar fallback fixo.
-        
-        # [OK] CORREÇÃO 4: Veículos já calculados no início (linha 535) - removido daqui
-        # Converter todos para float antes de somar (corrige erro float + Decimal)
-        custos_mes = (float(total_custo_real) + float(custo_alimentacao_real) +
-                      float(custo_transporte_real) + float(custo_material_real) +
-                      float(custo_outros_real))
-        custos_detalhados = {
-            'alimentacao': custo_alimentacao_real,
-            'transporte': custo_transporte_real,
-            'mao_obra': total_custo_real,
-            'material': custo_material_real,
-            'outros': custo_outros_real,
-            'faltas_justificadas': custo_faltas_justificadas,
-            'faltas_justificadas_qtd': quantidade_faltas_justificadas,
-            'total': custos_mes
-        }
-        
+
     except Exception as e:
         logger.error(f"ERRO CÁLCULO DASHBOARD: {str(e)}")
         # Em caso de erro, usar valores padrão
@@ -999,63 +571,23 @@ def dashboard():
         logger.error(f"Erro ao calcular produtividade: {e}")
         produtividade_obra = 0
     
-    # 3. VEÍCULOS DISPONÍVEIS - Buscar do banco de dados
-    veiculos_disponiveis = 0
-    try:
-        from models import Veiculo
-        veiculos_disponiveis = Veiculo.query.filter_by(
-            admin_id=admin_id, 
-            ativo=True
-        ).count()
-        logger.debug(f"DEBUG VEÍCULOS: {veiculos_disponiveis} ativos para admin_id={admin_id}")
-    except Exception as e:
-        logger.error(f"Erro ao contar veículos disponíveis: {e}")
-        veiculos_disponiveis = 0
-    
-    # 4. MARGEM DE LUCRO - Calcular baseado em valor de contratos vs custos
+    # 3. VEÍCULOS DISPONÍVEIS — mesma contagem do cabeçalho
+    veiculos_disponiveis = total_veiculos
+
+    # 4. MARGEM DE LUCRO — contratos das obras em andamento (Task #17: só
+    # `Obra.ativo`; Fase 2: filtro por `estado`) vs custos do período. Margem
+    # pode passar de 100% ou ser negativa.
     margem_percentual = 0
-    valor_contrato_total = 0
-    try:
-        # Buscar valor total de contratos das obras ativas (importar func explicitamente)
-        from sqlalchemy import func as sql_func
-        # Task #17: respeitar `Obra.ativo` (flag canônica) além do status.
-        valor_contrato_total = db.session.query(
-            sql_func.sum(Obra.valor_contrato)
-        ).filter(
-            Obra.admin_id == admin_id,
-            Obra.ativo == True,
-            # Fase 2 (achado B da revisão) — filtro por `estado`, a fonte de
-            # verdade. A lista de strings anterior era defensiva ('ATIVO' e
-            # 'ativa' não existem em nenhuma linha) e case-sensitive: quando a
-            # obra passou a nascer com status='Planejamento', o IN contra
-            # 'planejamento' minúsculo a tornava invisível aqui.
-            Obra.estado.in_(['planejamento', 'em_execucao', 'pausada'])
-        ).scalar() or 0
-        
-        # Calcular margem percentual
-        if valor_contrato_total > 0:
-            margem_percentual = round(
-                ((valor_contrato_total - custos_mes) / valor_contrato_total) * 100, 
-                1
-            )
-            # Margem pode ser >100% (se custos < 0) ou negativa (se custos > contratos)
-            logger.debug(f"DEBUG MARGEM: Contratos=R${valor_contrato_total:.2f}, Custos=R${custos_mes:.2f}, Margem={margem_percentual}%")
-    except Exception as e:
-        logger.error(f"Erro ao calcular margem: {e}")
-        valor_contrato_total = 0
-        margem_percentual = 0
-    
-    # Adicionar contagem correta de obras ativas com tratamento de erro.
-    # Task #17: a flag canônica de "obra ativa para o dia a dia" é
-    # `Obra.ativo`. Mantemos o filtro de status legado para excluir
-    # cancelamentos/rascunhos, mas só contamos obras com `ativo == True`.
-    obras_ativas_count = safe_db_operation(
-        lambda: Obra.query.filter_by(admin_id=admin_id, ativo=True).filter(
-            # Fase 2 (achado B) — mesmo motivo do filtro acima.
-            Obra.estado.in_(['planejamento', 'em_execucao', 'pausada'])
-        ).count(),
-        default_value=0
-    )
+    valor_contrato_total = m['valor_contrato_total'] if 'm' in locals() else 0
+    if valor_contrato_total > 0:
+        margem_percentual = round(
+            ((valor_contrato_total - custos_mes) / valor_contrato_total) * 100,
+            1
+        )
+
+    # Obras em andamento (Task #17 + Fase 2, mesmo filtro de `obras_ativas`):
+    # contada junto com o cabeçalho em `services/dashboard_metricas`.
+    obras_ativas_count = m['obras_ativas_count'] if 'm' in locals() else 0
     
     # Normalizar retornos (novos helpers já retornam listas)
     funcionarios_funcao = funcionarios_por_departamento if isinstance(funcionarios_por_departamento, list) else []
@@ -890,6 +890,7 @@ def criar_rdo():
                             imagem_otimizada_base64=resultado.get('imagem_otimizada_base64'),
                             thumbnail_base64=resultado.get('thumbnail_base64'),
                             armazenamento=resultado.get('armazenamento', 'disco'),
+                            processamento=resultado.get('processamento', 'pronta'),
                         )
                         
                         db.session.add(nova_foto)
@@ -4287,6 +4288,7 @@ def salvar_rdo_flexivel():
                                 imagem_otimizada_base64=resultado.get('imagem_otimizada_base64'),
                                 thumbnail_base64=resultado.get('thumbnail_base64'),
                                 armazenamento=resultado.get('armazenamento', 'disco'),
+                                processamento=resultado.get('processamento', 'pronta'),
                             )
                             
                             db.session.add(nova_foto)